@@ -31,6 +31,19 @@ from configparser import ConfigParser
 # Профилирование initGui: включить для отладки времени загрузки плагина
 TIMING_ENABLED = False
 
+# Лог сессии M_38: фоновая пакетная запись (Msm_38_1_AsyncLogWriter).
+# Переполнение очереди - сообщения отбрасываются (счётчик dropped), вызывающий не ждёт.
+SESSION_LOG_QUEUE_SIZE = 20000        # Сообщений в очереди записи
+SESSION_LOG_BATCH_SIZE = 500          # Строк за одну запись в файл
+SESSION_LOG_FLUSH_INTERVAL = 0.5      # Сброс файла на диск, сек (WARNING/CRITICAL - сразу)
+# DEBUG-сообщения в файл сессии. False - log_debug() возвращается до форматирования
+SESSION_LOG_DEBUG_ENABLED = True
+
+# Запуск плагина (Msm_38_2_StartupProfiler): шаги initGui по зависимостям.
+# Отчёт замеров - <daman_logs>/<session_id>.startup.json (chrome://tracing)
+STARTUP_PROFILE_ENABLED = True
+STARTUP_BACKGROUND_WORKERS = 2        # Потоков для фоновых шагов (plugin_hash)
+
 # Имя плагина для логирования и сообщений
 # Используется: 50 файлов, ~65 использований
 PLUGIN_NAME = 'Daman_QGIS'
@@ -227,6 +240,12 @@ PROJECT_GPKG_NAME = "project.gpkg"
 # Используется: 1 файл (database/project_db.py), ~11 использований
 PROJECT_METADATA_TABLE = "_metadata"
 
+# Соединения ProjectDB с GeoPackage (database/project_db_pool.py):
+# одно sqlite3-соединение на файл, закрывается после паузы в обращениях
+PROJECT_DB_IDLE_CLOSE_SECONDS = 2.0   # Пауза до закрытия соединения (файл не держится открытым)
+PROJECT_DB_BUSY_TIMEOUT = 5.0         # Ожидание блокировки файла другим соединением, сек
+PROJECT_DB_WAL_ENABLED = True         # WAL для локальных файлов (не сетевой диск / UNC)
+
 # Префикс для служебных таблиц GPKG
 # Используется: 1 файл (database/project_db.py), ~1 использование
 GPKG_SYSTEM_TABLE_PREFIX = "gpkg_"
@@ -776,6 +795,39 @@ ROOT_TAG_TO_RECORD_MAP = {
 # Fsm_1_1_8_iboundary_importer.
 IBOUNDARY_ROOT_TAG = 'interact_entry_boundaries'
 
+# Параллельный парсинг КПТ (core.kpt.parser, ProcessPoolExecutor).
+# Пул включается только в сводном режиме для батча от KPT_PARALLEL_MIN_BATCH_BYTES:
+# запуск spawn-процесса с импортом QGIS стоит ~1-3 сек на воркер.
+KPT_PARSE_MAX_WORKERS = 4
+KPT_PARALLEL_MIN_BATCH_BYTES = 20 * 1024 * 1024
+# Сколько секунд процесс пула может разбирать один файл: дольше - процесс
+# считается зависшим, пул закрывается, незавершённые файлы разбираются
+# в текущем процессе.
+KPT_PARSE_WORKER_STALL_TIMEOUT = 600
+
+# Параллельная проверка топологии (F_0_4, Fsm_0_4_21, ProcessPoolExecutor).
+# Полигональные слои проверяются по отделённым WKB-снимкам в процессах пула.
+# Пул включается от TOPOLOGY_PARALLEL_MIN_LAYERS полигональных слоёв (запуск
+# spawn-процесса с импортом QGIS ~1-3 сек); 1 воркер - последовательно через M_17.
+TOPOLOGY_CHECK_MAX_WORKERS = 4
+TOPOLOGY_PARALLEL_MIN_LAYERS = 4
+
+# Потоковый импорт КПТ в GPKG (Fsm_1_1_5_4): размер пачки записи в SQLite-стейджинг
+# и чтения из него при заливке слоёв. Пиковая память ~ одна пачка объектов.
+KPT_STREAM_BATCH_SIZE = 5000
+
+# Кэш разобранных XML (Fsm_1_1_16): SQLite-файл рядом с project.gpkg.
+# Ключ - SHA-256 содержимого XML + версия импортера (PLUGIN_VERSION и номер ниже).
+# Номер импортера увеличивать при любом изменении результата парсинга
+# (геометрия, набор/имена атрибутов) - старые записи удаляются при открытии.
+XML_PARSE_CACHE_FILENAME = "xml_parse_cache.sqlite"
+XML_PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # LRU-вытеснение сверх лимита
+# Записи других версий удаляются, только если к ним не обращались дольше
+# этого срока (кэш в папке проекта общий - коллега с другой версией плагина)
+XML_PARSE_CACHE_STALE_SECONDS = 30 * 24 * 60 * 60
+VYPISKA_IMPORTER_VERSION = 3  # 2: наблюдения детектора Msm_4_17 в meta; 3: предупреждения разбора
+KPT_IMPORTER_VERSION = 2  # 2: предупреждения разбора в meta
+
 # ============================================================================
 # КОНСТАНТЫ СЕТЕВЫХ ЗАПРОСОВ И CONCURRENCY
 # ============================================================================
@@ -792,8 +844,33 @@ DEFAULT_MAX_RETRIES = 3               # Количество повторных
 # Задержка между повторными попытками (в секундах)
 DEFAULT_RETRY_DELAY = 1.0             # Используется в request handlers
 
-# Ограничение частоты запросов (запросов в секунду)
-DEFAULT_RATE_LIMIT = 5                # Защита от 429 ошибок и блокировки IP. Снижено с 10 (2026-04-30): на крупных территориях (ЯНАО ~30 км², Якутия) при параллельной загрузке 5 ОКС-потоков x ThreadPoolExecutor генерировались 13+ HTTP 429 за минуту.
+# Адаптивная параллельность запросов к НСПД (AIMD, Fsm_1_2_1_1)
+# Заменяет фиксированный rate limit 5 запросов/сек: на крупных территориях (ЯНАО ~30 км²,
+# Якутия) 5 ОКС-потоков x ThreadPoolExecutor генерировали 13+ HTTP 429 за минуту, на малых
+# фиксированный лимит простаивал. Лимит общий для всех потоков загрузчика ЕГРН.
+NSPD_AIMD_MIN_CONCURRENCY = 1         # Нижняя граница одновременных запросов
+NSPD_AIMD_MAX_CONCURRENCY = 8         # Верхняя граница (размер пула потоков ячеек)
+NSPD_AIMD_DECREASE_FACTOR = 0.5       # Множитель лимита при 429 / 5xx / таймауте
+NSPD_RETRY_AFTER_MAX_SECONDS = 60     # Максимальная пауза по заголовку Retry-After
+
+# Кэш ответов НСПД по ячейкам сетки (Fsm_1_2_1_2): SQLite-файл рядом с project.gpkg.
+# Повторная загрузка ЗУ/ОКС/ЗОУИТ запрашивает только ячейки без свежей записи.
+# Версию увеличивать при изменении формата запроса/ответа - старые записи не читаются.
+NSPD_CELL_CACHE_FILENAME = "nspd_cell_cache.sqlite"
+NSPD_CELL_CACHE_TTL_HOURS = 24        # Срок свежести ответа ячейки
+NSPD_CELL_CACHE_VERSION = 1
+
+# Потоковый импорт features НСПД (Fsm_1_2_1_3): размер пачки записи в memory-слой / GPKG.
+# Пиковая память записи ~ одна пачка QgsFeature.
+NSPD_INGEST_BATCH_SIZE = 2000
+
+# Пакетный поиск КН в НСПД (Msm_16_1.iter_multiple): загрузка не найденных КН из M_16.
+# Запросы к одному хосту ограничены семафором (общим для всех экземпляров загрузчика),
+# результаты (включая "не найден") кэшируются в памяти по нормализованному КН.
+NSPD_SEARCH_MAX_WORKERS = 6           # Потоков пакетной загрузки
+NSPD_SEARCH_HOST_LIMIT = 4            # Одновременных запросов на хост
+NSPD_SEARCH_CACHE_TTL_SECONDS = 600   # Срок жизни результата в кэше
+NSPD_SEARCH_CACHE_MAX_ENTRIES = 5000  # Предел кэша (старые записи вытесняются)
 
 # Пул Overpass API серверов для динамического выбора по латентности.
 # Пингуются параллельно POST запросом к /interpreter перед каждой загрузкой OSM.
@@ -859,6 +936,42 @@ API_TIMEOUT = DEFAULT_REQUEST_TIMEOUT  # Использует общий тай
 # Настройки кэша
 CACHE_MAX_AGE_HOURS = 24  # Максимальный возраст кэша без проверки версии
 
+# Дисковый кэш справочников BaseReferenceLoader (папка в профиле QGIS)
+REFERENCE_CACHE_DIR_NAME = "daman_reference_cache"
+# Параллельные загрузки справочников при старте (лимит CrowdSec - 50 запросов / 5 мин)
+REFERENCE_PREFETCH_WORKERS = 6
+# Справочники, загружаемые при старте плагина
+REFERENCE_PREFETCH_FILES = (
+    'Base_Functions.json',
+    'Base_layers.json',
+    'VRI.json',
+    'Base_labels.json',
+    'Base_selection_ZU.json',
+    'Base_selection_OKS.json',
+    'Base_cutting.json',
+    'Base_expressions.json',
+    'Base_zouit_classification.json',
+    'Base_negativ_classification.json',
+    'Base_rights_classification.json',
+    'Base_api_endpoints.json',
+    'Base_CRS.json',
+    'Work_types.json',
+    'Base_drawings.json',
+    'Base_drawings_background.json',
+    'Base_field_mapping_EGRN.json',
+    'Base_legal_abbreviations.json',
+    'Base_employee.json',
+    'Project_Metadata.json',
+    'Base_project_codes.json',
+    'Base_managers.json',
+    'Redline.json',
+    'Other.json',
+    'Public_easement.json',
+    'Offset_redline.json',
+    'Base_fun_zones_distribution.json',
+    'Base_terr_zones_distribution.json',
+)
+
 # Настройки JWT токенов
 ACCESS_TOKEN_LIFETIME_MINUTES = 15  # Время жизни access token
 TOKEN_REFRESH_THRESHOLD_SECONDS = 60  # Обновлять за 60 сек до истечения
@@ -875,6 +988,10 @@ AUTHED_REQUEST_BACKOFF_SECONDS = (2, 5, 10)  # Exponential backoff между п
 # этого таймаута. Покрывает backoff 2+5с + 2xHTTP, НЕ покрывает GUI-фазу и
 # вырожденный refresh-hang (после таймаута — fail-fast локальным AuthFailureError).
 AUTHED_REQUEST_RECOVERY_WAIT_SECONDS = 12  # Bounded-wait single-flight recovery
+# Пул keep-alive соединений авторизованных запросов (Msm_29_7_PooledTransport)
+AUTHED_POOL_HOSTS = 4      # Пулов (хостов) в HTTPAdapter
+AUTHED_POOL_MAXSIZE = 6    # Соединений на хост (= REFERENCE_PREFETCH_WORKERS)
+AUTHED_POOL_TIMEOUT = 30   # Секунд ожидания свободного соединения пула
 
 # Heartbeat: периодическая проверка статуса лицензии
 HEARTBEAT_INTERVAL_MS = 4 * 60 * 60 * 1000  # 4 часа в миллисекундах
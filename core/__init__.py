@@ -2,6 +2,14 @@
 """
 Core functionality for Daman_QGIS plugin
 """
-from Daman_QGIS.core.base_responsive_dialog import BaseResponsiveDialog
 
 __all__ = ['BaseResponsiveDialog']
+
+
+def __getattr__(name):
+    # Ленивый импорт диалога: core.math / core.topology / core.kpt загружаются
+    # в процессах пула (Fsm_0_4_21, парсинг КПТ) без qgis.gui и виджетов
+    if name == 'BaseResponsiveDialog':
+        from Daman_QGIS.core.base_responsive_dialog import BaseResponsiveDialog
+        return BaseResponsiveDialog
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
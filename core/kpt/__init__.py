@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Разбор КПТ (импортер Fsm_1_1_5): потоковый парсер, геометрия, атрибуты.
+
+Лёгкий пакет вне tools: импортируется процессами пула параллельного
+парсинга без инструментов, диалогов и processing. Зависимости -
+qgis.core, lxml, constants, utils.
+"""
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Извлечение атрибутов из КПТ (импортер Fsm_1_1_5).
+
+Рекурсивный обход XML элемента записи с сокращением имён по attribute_map.json.
+
+Класс без QGIS-состояния: экземпляр сериализуется (pickle) и передаётся
+в процессы пула параллельного парсинга (core.kpt.parser).
+"""
+
+from typing import Dict
+
+
+class KptAttributeExtractor:
+    """Извлечение атрибутов (element, attributes) -> None"""
+
+    # Теги, которые не являются атрибутами (геометрия, списки зон)
+    TAGS_TO_SKIP = frozenset({
+        "contours_location", "b_contours_location", "entity_spatial",
+        "permitted_uses", "included_parcels", "decisions_requisites",
+        "geopoint_opred", "delta_geopoint", "ord_nmb", "number_pp"
+    })
+
+    def __init__(self, attribute_map: Dict):
+        """
+        Args:
+            attribute_map: Маппинг полных путей тегов на короткие имена полей
+        """
+        self.attribute_map = attribute_map
+
+    def __call__(self, element, attributes: Dict):
+        """Извлечение атрибутов из XML элемента"""
+        self._extract_recursive(element, attributes, "")
+
+    def _extract_recursive(self, element, attributes: Dict, parent_path: str):
+        """Рекурсивное извлечение атрибутов"""
+        if element.tag in self.TAGS_TO_SKIP:
+            return
+
+        for child in element:
+            if child.tag in self.TAGS_TO_SKIP:
+                continue
+
+            full_path = f"{parent_path}_{child.tag}" if parent_path else child.tag
+
+            # Специальная обработка reg_numb_border
+            if element.tag == 'b_object' and child.tag == 'reg_numb_border':
+                if child.text and child.text.strip():
+                    attributes['numb_border'] = child.text.strip()
+                continue
+
+            if child.text and child.text.strip():
+                short_name = self.shorten_attribute_name(full_path)
+                attributes[short_name] = child.text.strip()
+
+            self._extract_recursive(child, attributes, full_path)
+
+    def shorten_attribute_name(self, full_path: str) -> str:
+        """Сокращение имени атрибута по маппингу"""
+        mapping = self.attribute_map.get(full_path)
+        short_name = ""
+
+        if isinstance(mapping, dict):
+            short_name = mapping.get("name")
+        elif isinstance(mapping, list) and len(mapping) > 0:
+            short_name = mapping[0]
+        elif isinstance(mapping, str):
+            short_name = mapping
+
+        if not short_name:
+            parts = full_path.split("_")
+            short_name = "_".join(parts[-2:]) if len(parts) > 2 else full_path
+
+        return short_name
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Извлечение геометрий из КПТ (импортер Fsm_1_1_5).
+
+Извлечение геометрий из XML элементов КПТ.
+Поддерживает MultiPolygon, MultiLineString, MultiPoint с M-координатами.
+
+Ключевые особенности:
+- Поддержка contours и spatial_elements
+- M-координаты (delta_geopoint) для точности измерений
+- Корректный SWAP координат X/Y для российских МСК
+- CLOSURE_TOLERANCE = 0.01м для определения замкнутости
+
+Быстрый путь (extract_geometry):
+- x/y/delta_geopoint spatial_element собираются скомпилированными XPath
+  (text() без прокси-элементов), float-конвертация пакетно через map()
+- кольцо строится сразу QgsLineString(xs, ys, [], ms), без QgsPoint на вершину
+- нестандартный spatial_element (пустой/битый текст, нет x или y у части
+  ordinate, delta_geopoint не у всех) декодируется поэлементно как в эталоне
+extract_geometry_reference - исходная реализация, эталон для тестов.
+"""
+
+from typing import Dict, List, Optional, Any, Tuple
+
+from qgis.core import (
+    QgsGeometry, QgsPoint, QgsLineString, QgsPolygon,
+    QgsMultiPolygon, QgsMultiLineString, QgsMultiPoint
+)
+
+from Daman_QGIS.utils import log_warning
+
+# lxml импортируется условно (без него - только эталонный путь)
+try:
+    from lxml import etree as _etree
+    _XP_ORDINATE_COUNT = _etree.XPath('count(.//ordinate)')
+    _XP_X = _etree.XPath('.//ordinate/x/text()', smart_strings=False)
+    _XP_Y = _etree.XPath('.//ordinate/y/text()', smart_strings=False)
+    _XP_DELTA = _etree.XPath('.//ordinate/delta_geopoint/text()', smart_strings=False)
+except ImportError:
+    _XP_ORDINATE_COUNT = None
+
+# Допуск замкнутости контура (метры)
+CLOSURE_TOLERANCE = 0.01
+
+# Декодированный spatial_element: (xs, ys, ms) в осях QGIS
+_Ordinates = Tuple[List[float], List[float], List[float]]
+
+
+def extract_geometry(record) -> Dict[str, Optional[QgsGeometry]]:
+    """
+    Извлечение геометрий из XML записи КПТ (быстрый путь)
+
+    Результат идентичен extract_geometry_reference.
+
+    Args:
+        record: XML элемент записи (land_record, build_record, etc.)
+
+    Returns:
+        Dict с геометриями по типам (см. extract_geometry_reference)
+    """
+    if _XP_ORDINATE_COUNT is None:
+        return extract_geometry_reference(record)
+
+    all_polygons: List[QgsPolygon] = []
+    all_lines: List[QgsLineString] = []
+    all_points: List[QgsPoint] = []
+    has_geometry = False
+
+    contours = record.findall('.//contour')
+    if contours:
+        element_groups = [contour.findall('.//spatial_element') for contour in contours]
+    else:
+        # Без contours все spatial_elements образуют один виртуальный контур
+        element_groups = [record.findall('.//spatial_element')]
+
+    closure_tolerance_sq = CLOSURE_TOLERANCE ** 2
+
+    for spatial_elements in element_groups:
+        if not spatial_elements:
+            continue
+
+        rings: List[_Ordinates] = []
+
+        for spatial_element in spatial_elements:
+            xs, ys, ms = _decode_ordinates(spatial_element)
+            count = len(xs)
+            if not count:
+                continue
+            has_geometry = True
+
+            # Классификация геометрии
+            if count == 1:
+                all_points.append(QgsPoint(xs[0], ys[0], m=ms[0]))
+            elif count >= 4 and (xs[0] - xs[-1])**2 + (ys[0] - ys[-1])**2 < closure_tolerance_sq:
+                rings.append((xs, ys, ms))
+            else:
+                all_lines.append(QgsLineString(xs, ys, [], ms))
+
+        # Собираем полигон из колец (первое - внешнее, остальные - дырки)
+        if rings:
+            xs, ys, ms = rings[0]
+            polygon = QgsPolygon(QgsLineString(xs, ys, [], ms))
+            for xs, ys, ms in rings[1:]:
+                polygon.addInteriorRing(QgsLineString(xs, ys, [], ms))
+            all_polygons.append(polygon)
+
+    geometries: Dict[str, Optional[QgsGeometry]] = {}
+
+    if all_polygons:
+        geometries["MultiPolygon"] = QgsGeometry(QgsMultiPolygon(all_polygons))
+
+    if all_lines:
+        geometries["MultiLineString"] = QgsGeometry(QgsMultiLineString(all_lines))
+
+    if all_points:
+        geometries["MultiPoint"] = QgsGeometry(QgsMultiPoint(all_points))
+
+    if not has_geometry:
+        geometries["NoGeometry"] = None
+
+    return geometries
+
+
+def _decode_ordinates(spatial_element) -> _Ordinates:
+    """
+    Пакетное декодирование координат spatial_element
+
+    SWAP: XML X (North) -> QGIS Y, XML Y (East) -> QGIS X.
+    Пакетный путь применим, только если у каждой ordinate ровно один
+    непустой x и y, а delta_geopoint есть у всех или ни у одной.
+    """
+    count = int(_XP_ORDINATE_COUNT(spatial_element))
+    x_texts = _XP_X(spatial_element)
+    y_texts = _XP_Y(spatial_element)
+    delta_texts = _XP_DELTA(spatial_element)
+
+    if len(x_texts) == count and len(y_texts) == count and len(delta_texts) in (0, count):
+        try:
+            xs = list(map(float, y_texts))
+            ys = list(map(float, x_texts))
+            ms = list(map(float, delta_texts)) if delta_texts else [0.0] * count
+            return xs, ys, ms
+        except ValueError:
+            pass
+
+    return _decode_ordinates_per_element(spatial_element)
+
+
+def _decode_ordinates_per_element(spatial_element) -> _Ordinates:
+    """Поэлементное декодирование (семантика extract_geometry_reference)"""
+    xs: List[float] = []
+    ys: List[float] = []
+    ms: List[float] = []
+
+    for ordinate in spatial_element.findall('.//ordinate'):
+        try:
+            x_text = ordinate.findtext("x")
+            y_text = ordinate.findtext("y")
+
+            if not x_text or not y_text:
+                continue
+
+            y = float(x_text)
+            x = float(y_text)
+            delta_str = ordinate.findtext("delta_geopoint")
+            m_val = float(delta_str) if delta_str else 0.0
+
+        except (TypeError, ValueError):
+            continue
+
+        xs.append(x)
+        ys.append(y)
+        ms.append(m_val)
+
+    return xs, ys, ms
+
+
+def extract_geometry_reference(record) -> Dict[str, Optional[QgsGeometry]]:
+    """
+    Извлечение геометрий из XML записи КПТ (эталонная реализация)
+
+    Args:
+        record: XML элемент записи (land_record, build_record, etc.)
+
+    Returns:
+        Dict с геометриями по типам:
+        - "MultiPolygon": QgsGeometry или None
+        - "MultiLineString": QgsGeometry или None
+        - "MultiPoint": QgsGeometry или None
+        - "NoGeometry": None (если нет геометрии)
+    """
+    all_polygons: List[QgsPolygon] = []
+    all_lines: List[QgsLineString] = []
+    all_points: List[QgsPoint] = []
+    has_geometry = False
+
+    # Ищем contours
+    contours = record.findall('.//contour')
+    if not contours:
+        # Если contours нет, ищем spatial_elements напрямую
+        spatial_elements_flat = record.findall('.//spatial_element')
+        if spatial_elements_flat:
+            # Создаем виртуальный contour
+            try:
+                from lxml import etree as ET
+                dummy_contour = ET.Element("dummy_contour")
+                for se in spatial_elements_flat:
+                    dummy_contour.append(se)
+                contours = [dummy_contour]
+            except ImportError:
+                pass
+
+    for contour in contours:
+        spatial_elements = contour.findall('.//spatial_element')
+        if not spatial_elements:
+            continue
+
+        rings: List[List[QgsPoint]] = []
+        lines_in_contour: List[List[QgsPoint]] = []
+        points_in_contour: List[QgsPoint] = []
+
+        for spatial_element in spatial_elements:
+            ring_points: List[QgsPoint] = []
+
+            for ordinate in spatial_element.findall('.//ordinate'):
+                try:
+                    # SWAP координат: X=North, Y=East в XML → X=East, Y=North в QGIS
+                    x_text = ordinate.findtext("x")
+                    y_text = ordinate.findtext("y")
+
+                    if not x_text or not y_text:
+                        continue
+
+                    y = float(x_text)  # XML X → QGIS Y (North)
+                    x = float(y_text)  # XML Y → QGIS X (East)
+
+                    # M-координата (delta_geopoint = точность измерения)
+                    delta_str = ordinate.findtext("delta_geopoint")
+                    m_val = float(delta_str) if delta_str else 0.0
+
+                    ring_points.append(QgsPoint(x, y, m=m_val))
+                    has_geometry = True
+
+                except (TypeError, ValueError):
+                    pass
+
+            if not ring_points:
+                continue
+
+            # Классификация геометрии
+            if len(ring_points) == 1:
+                # Точка
+                points_in_contour.append(ring_points[0])
+            elif len(ring_points) >= 4 and _is_ring_closed(ring_points):
+                # Замкнутый контур (полигон)
+                rings.append(ring_points)
+            else:
+                # Линия
+                lines_in_contour.append(ring_points)
+
+        # Собираем полигон из колец
+        if rings:
+            exterior_ring = QgsLineString(rings[0])
+            polygon = QgsPolygon(exterior_ring)
+
+            # Добавляем внутренние кольца (дырки)
+            for interior_points in rings[1:]:
+                interior_ring = QgsLineString(interior_points)
+                polygon.addInteriorRing(interior_ring)
+
+            all_polygons.append(polygon)
+
+        # Линии
+        if lines_in_contour:
+            for line_points in lines_in_contour:
+                all_lines.append(QgsLineString(line_points))
+
+        # Точки
+        if points_in_contour:
+            all_points.extend(points_in_contour)
+
+    # Формируем результат
+    geometries: Dict[str, Optional[QgsGeometry]] = {}
+
+    if all_polygons:
+        geometries["MultiPolygon"] = QgsGeometry(QgsMultiPolygon(all_polygons))
+
+    if all_lines:
+        geometries["MultiLineString"] = QgsGeometry(QgsMultiLineString(all_lines))
+
+    if all_points:
+        geometries["MultiPoint"] = QgsGeometry(QgsMultiPoint(all_points))
+
+    if not has_geometry:
+        geometries["NoGeometry"] = None
+
+    return geometries
+
+
+def _is_ring_closed(points: List[QgsPoint]) -> bool:
+    """
+    Проверка замкнутости контура
+
+    Args:
+        points: Список точек контура
+
+    Returns:
+        True если контур замкнут (первая и последняя точки совпадают с допуском)
+    """
+    if len(points) < 2:
+        return False
+
+    start_point = points[0]
+    end_point = points[-1]
+
+    dist_sq = (start_point.x() - end_point.x())**2 + (start_point.y() - end_point.y())**2
+    return dist_sq < (CLOSURE_TOLERANCE ** 2)
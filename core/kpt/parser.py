@@ -0,0 +1,986 @@
+# -*- coding: utf-8 -*-
+"""
+Потоковый парсер КПТ (iterparse) для импортера Fsm_1_1_5.
+
+Потоковый парсинг XML через lxml.iterparse для больших файлов (10-100+ MB).
+Оптимизирован для КПТ (Кадастровый План Территории).
+
+Ключевые особенности:
+- iterparse с events=('start', 'end') для потоковой обработки
+- elem.clear() + del elem.getparent()[0] для очистки памяти
+- Прогресс по байтам файла
+- Поддержка отмены операции
+- Параллельный режим (max_workers > 1): файлы парсятся в пуле процессов
+  (spawn, core.process_pool), каждый воркер возвращает WKB + dict
+  атрибутов; родитель сливает результаты в исходном порядке файлов с той
+  же дедупликацией. Процесс пула импортирует только core.kpt (без пакета
+  tools: инструментов, диалогов, processing)
+- Потоковый режим (feature_sink): объекты уходят пачками в SQLite-стейджинг
+  Fsm_1_1_5_4 (WKB + атрибуты) вместо cached_features, память не растёт
+- Кэш разбора (parse_cache, Fsm_1_1_16): файлы, уже разобранные в этом
+  проекте, берутся из кэша по SHA-256; остальные парсятся по одному файлу
+  (или в пуле) и сохраняются в кэш вместе с предупреждениями разбора
+"""
+
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple, Callable, Optional, Any
+
+from qgis.core import QgsGeometry
+
+from Daman_QGIS.constants import KPT_PARSE_WORKER_STALL_TIMEOUT
+from Daman_QGIS.core.process_pool import get_worker_executable, spawn_executable, terminate_workers
+from Daman_QGIS.utils import (
+    capture_log_messages, log_info, log_warning, log_error, set_session_log,
+)
+
+# lxml импортируется условно
+try:
+    from lxml import etree as ET
+except ImportError:
+    ET = None  # type: ignore
+
+
+class KptParser:
+    """Потоковый парсер КПТ с iterparse"""
+
+    # Типы записей с геометрией
+    RECORD_TYPES_GEOMETRY = {
+        "land_record": ["MultiPolygon", "NoGeometry"],
+        "build_record": ["MultiPolygon", "NoGeometry"],
+        "construction_record": ["MultiPolygon", "NoGeometry", "MultiLineString", "MultiPoint"],
+        "object_under_construction_record": ["MultiPolygon", "NoGeometry"],
+        "spatial_data": ["MultiPolygon"],
+        "subject_boundary_record": ["MultiPolygon", "MultiLineString"],
+        "municipal_boundary_record": ["MultiPolygon"],
+        "inhabited_locality_boundary_record": ["MultiPolygon"],
+        "coastline_record": ["MultiPolygon", "MultiLineString", "MultiPoint"],
+        "zones_and_territories_record": ["MultiPolygon"],
+        "surveying_project_record": ["MultiPolygon", "NoGeometry"],
+        "public_easement_record": ["MultiPolygon"]
+    }
+
+    # Записи с собственным кадастровым номером
+    RECORDS_WITH_OWN_CAD_NUMBER = [
+        "land_record", "build_record", "construction_record", "object_under_construction_record"
+    ]
+
+    def __init__(self, geometry_extractor, attribute_extractor):
+        """
+        Args:
+            geometry_extractor: Функция извлечения геометрии (record) -> dict
+            attribute_extractor: Функция извлечения атрибутов (element, attributes) -> None
+
+        Для параллельного режима оба экстрактора должны быть picklable
+        (функция модуля / экземпляр класса без QGIS-состояния).
+        """
+        self.geometry_extractor = geometry_extractor
+        self.attribute_extractor = attribute_extractor
+        # Файлы последнего вызова, упавшие при парсинге (результат неполный)
+        self.failed_files: List[str] = []
+
+    def parse_files(
+        self,
+        file_paths: List[str],
+        progress_callback: Optional[Callable[[int], None]] = None,
+        text_callback: Optional[Callable[[str], None]] = None,
+        is_cancelled_callback: Optional[Callable[[], bool]] = None,
+        total_batch_size: Optional[int] = None,
+        max_workers: int = 1,
+        feature_sink: Optional[Any] = None,
+        parse_cache: Optional[Any] = None
+    ) -> Tuple[Dict, Dict, int]:
+        """
+        Парсинг списка КПТ файлов с потоковой обработкой
+
+        Args:
+            file_paths: Список путей к XML файлам
+            progress_callback: Callback для прогресса (0-100)
+            text_callback: Callback для текста статуса
+            is_cancelled_callback: Callback проверки отмены
+            total_batch_size: Общий размер батча (для combined mode)
+            max_workers: Число процессов парсинга (1 = последовательно)
+            feature_sink: Приёмник объектов (Fsm_1_1_5_4_FeatureStage);
+                если задан, cached_features в результате пустой
+            parse_cache: Кэш разбора (Fsm_1_1_16_ParseCache) или None
+
+        Returns:
+            (cached_features, schemas, record_count)
+        """
+        if ET is None:
+            log_error("KptParser: lxml не установлен")
+            return {}, {}, 0
+
+        use_cache = parse_cache is not None and parse_cache.enabled
+        preparsed: Dict[int, Tuple] = {}
+        on_parsed = None
+        if use_cache:
+            preparsed, on_parsed = self._lookup_parse_cache(file_paths, parse_cache)
+
+        to_parse = len(file_paths) - len(preparsed)
+        workers = min(max_workers, to_parse, os.cpu_count() or 1)
+        if workers > 1:
+            result = self._parse_files_parallel(
+                file_paths, workers, progress_callback, text_callback,
+                is_cancelled_callback, total_batch_size, feature_sink,
+                preparsed, on_parsed
+            )
+            if result is not None:
+                return result
+            log_warning("KptParser: Пул процессов недоступен, последовательный парсинг")
+            if feature_sink is not None:
+                feature_sink.reset()
+
+        if use_cache:
+            return self._parse_files_per_file(
+                file_paths, preparsed, on_parsed, progress_callback, text_callback,
+                is_cancelled_callback, total_batch_size, feature_sink
+            )
+
+        return self._parse_files_sequential(
+            file_paths, progress_callback, text_callback,
+            is_cancelled_callback, total_batch_size, feature_sink
+        )
+
+    def _lookup_parse_cache(
+        self,
+        file_paths: List[str],
+        parse_cache: Any
+    ) -> Tuple[Dict[int, Tuple], Callable[[int, Tuple, List[Tuple[str, str]]], None]]:
+        """
+        Поиск файлов в кэше разбора
+
+        Returns:
+            ({индекс файла: результат файла}, on_parsed) - on_parsed(index,
+            result, messages) сохраняет в кэш результат, разобранный заново,
+            с предупреждениями и ошибками его разбора
+        """
+        digests: Dict[int, str] = {}
+        preparsed: Dict[int, Tuple] = {}
+        for index, file_path in enumerate(file_paths):
+            try:
+                digests[index] = parse_cache.file_digest(file_path)
+            except OSError as e:
+                log_warning(f"KptParser: Не удалось хэшировать {os.path.basename(file_path)}: {e}")
+                continue
+            entry = parse_cache.get(digests[index])
+            if entry is not None:
+                preparsed[index] = _file_result_from_cache(*entry)
+
+        if preparsed:
+            log_info(f"KptParser: Из кэша разбора: {len(preparsed)} из {len(file_paths)} файлов")
+
+        def on_parsed(index: int, file_result: Tuple, messages: List[Tuple[str, str]]) -> None:
+            features, schemas, record_count, parsed_ok = file_result
+            # Файл с ошибкой парсинга не кэшируем - при следующем импорте парсим заново
+            if parsed_ok and index in digests:
+                meta = {
+                    "schemas": {key: sorted(names) for key, names in schemas.items()},
+                    "record_count": record_count
+                }
+                rows = (
+                    (layer_key, wkb, attributes)
+                    for layer_key, items in features.items()
+                    for wkb, attributes in items
+                )
+                parse_cache.put(digests[index], meta, rows, messages)
+
+        return preparsed, on_parsed
+
+    def _parse_files_per_file(
+        self,
+        file_paths: List[str],
+        preparsed: Dict[int, Tuple],
+        on_parsed: Callable[[int, Tuple, List[Tuple[str, str]]], None],
+        progress_callback: Optional[Callable[[int], None]],
+        text_callback: Optional[Callable[[str], None]],
+        is_cancelled_callback: Optional[Callable[[], bool]],
+        total_batch_size: Optional[int],
+        feature_sink: Optional[Any] = None
+    ) -> Tuple[Dict, Dict, int]:
+        """
+        Последовательный парсинг с кэшем: результат каждого файла
+        собирается отдельно (для сохранения в кэш) и сливается в общий
+        в порядке файлов - дедупликация как в _parse_files_sequential
+        """
+        needs_deduplication = len(file_paths) > 1
+        file_sizes = [os.path.getsize(path) for path in file_paths]
+        total_bytes = total_batch_size or sum(file_sizes)
+        default_date = datetime(1970, 1, 1)
+
+        schemas: Dict[str, set] = {}
+        if needs_deduplication:
+            cached_features: Dict = defaultdict(lambda: {"keyed": {}, "unkeyed": []})
+        else:
+            cached_features = defaultdict(list)
+        record_counter = 0
+        bytes_done = 0
+
+        def _report(fraction: float) -> None:
+            if progress_callback and total_bytes > 0:
+                done = bytes_done + fraction * file_sizes[index]
+                progress_callback(min(5 + int(done * 90 / total_bytes), 95))
+
+        for index, file_path in enumerate(file_paths):
+            file_result = preparsed.get(index)
+            if file_result is None:
+                if text_callback:
+                    text_callback(f"Обработка файлов... ({index + 1}/{len(file_paths)})")
+                with capture_log_messages() as messages:
+                    file_result = self._parse_single_file(
+                        file_path, lambda p: _report((p - 5) / 90), is_cancelled_callback
+                    )
+                if is_cancelled_callback and is_cancelled_callback():
+                    return {}, {}, 0
+                on_parsed(index, file_result, messages)
+
+            record_counter += self._merge_file_result(
+                file_result, index, schemas,
+                None if feature_sink is not None else cached_features,
+                feature_sink, default_date, needs_deduplication
+            )
+            bytes_done += file_sizes[index]
+            _report(0.0)
+
+        if feature_sink is not None:
+            feature_sink.flush()
+
+        return dict(cached_features), schemas, record_counter
+
+    def _parse_single_file(
+        self,
+        file_path: str,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        is_cancelled_callback: Optional[Callable[[], bool]] = None
+    ) -> Tuple[Dict[str, List[Tuple[Optional[bytes], Dict[str, Any]]]], Dict[str, set], int, bool]:
+        """
+        Парсинг одного файла в результат воркера
+
+        Returns:
+            ({layer_key: [(wkb или None, attributes)]}, schemas, record_count, parsed_ok)
+        """
+        cached_features, schemas, record_count = self._parse_files_sequential(
+            [file_path], progress_callback, None, is_cancelled_callback, None
+        )
+        features = {
+            layer_key: [(_geometry_to_wkb(geom), attributes) for geom, attributes in items]
+            for layer_key, items in cached_features.items()
+        }
+        return features, schemas, record_count, not self.failed_files
+
+    def _parse_files_sequential(
+        self,
+        file_paths: List[str],
+        progress_callback: Optional[Callable[[int], None]],
+        text_callback: Optional[Callable[[str], None]],
+        is_cancelled_callback: Optional[Callable[[], bool]],
+        total_batch_size: Optional[int],
+        feature_sink: Optional[Any] = None
+    ) -> Tuple[Dict, Dict, int]:
+        """Последовательный парсинг файлов в текущем процессе"""
+        self.failed_files = []
+        needs_deduplication = len(file_paths) > 1
+        is_combined_mode = total_batch_size is not None
+
+        schemas: Dict[str, set] = {}
+        if needs_deduplication:
+            cached_features: Dict = defaultdict(lambda: {"keyed": {}, "unkeyed": []})
+        else:
+            cached_features = defaultdict(list)
+
+        record_counter = 0
+        total_bytes_processed = 0
+
+        for i, file_path in enumerate(file_paths):
+            temp_file_obj = None
+            try:
+                # Препроцессинг XML (фикс битых файлов)
+                path_to_process, temp_file_obj = self._preprocess_xml(file_path)
+                current_file_size = os.path.getsize(path_to_process)
+                default_date = datetime(1970, 1, 1)
+                if feature_sink is not None:
+                    feature_sink.begin_file(i)
+
+                with open(path_to_process, 'rb') as file_stream:
+                    context = ET.iterparse(file_stream, events=('start', 'end'), recover=True)
+                    last_progress = -1
+                    current_quarter_number = None
+
+                    for event, elem in context:
+                        # Проверка отмены
+                        if is_cancelled_callback and is_cancelled_callback():
+                            return {}, {}, 0
+
+                        # На start событии запоминаем номер квартала
+                        if event == 'start':
+                            if elem.tag == 'cadastral_block':
+                                cn_elem = elem.find('cadastral_number')
+                                if cn_elem is not None and cn_elem.text:
+                                    current_quarter_number = cn_elem.text.strip()
+                            continue
+
+                        # Прогресс
+                        if progress_callback:
+                            if is_combined_mode and total_batch_size:
+                                current_progress_bytes = total_bytes_processed + file_stream.tell()
+                                progress = 5 + int((current_progress_bytes * 90) / total_batch_size)
+                            else:
+                                progress = 5 + int((file_stream.tell() * 90) / current_file_size) if current_file_size > 0 else 5
+
+                            if progress > last_progress:
+                                if text_callback:
+                                    if is_combined_mode:
+                                        text_callback(f"Обработка файлов... ({i+1}/{len(file_paths)})")
+                                    else:
+                                        text_callback(f"Обработано {progress}%")
+                                progress_callback(min(progress, 95))
+                                last_progress = progress
+
+                        # Обработка записей с геометрией
+                        if elem.tag in self.RECORD_TYPES_GEOMETRY or elem.tag in ("zones_and_territories", "boundary_record"):
+                            record_counter += 1
+                            record_type, target_element = None, elem
+
+                            if elem.tag == "zones_and_territories":
+                                record_type = "zones_and_territories_record"
+                            elif elem.tag == "boundary_record":
+                                if len(elem) > 0:
+                                    target_element, record_type = elem[0], f"{elem[0].tag}_record"
+                            elif elem.tag in self.RECORD_TYPES_GEOMETRY:
+                                record_type = elem.tag
+
+                            if record_type:
+                                attributes: Dict[str, Any] = {}
+
+                                # Добавляем номер квартала для ЗУ и spatial_data
+                                if current_quarter_number and record_type in ("land_record", "spatial_data"):
+                                    attributes['cadastral_number'] = current_quarter_number
+
+                                # Извлекаем кадастровый номер объекта
+                                if record_type in self.RECORDS_WITH_OWN_CAD_NUMBER:
+                                    cad_elem = target_element.find(".//object/common_data/cad_number")
+                                    if cad_elem is not None and cad_elem.text:
+                                        attributes['cad_number'] = cad_elem.text.strip()
+
+                                # Извлекаем атрибуты
+                                self.attribute_extractor(target_element, attributes)
+
+                                # Дополнительная обработка зон
+                                if record_type == "zones_and_territories_record":
+                                    self._extract_zone_lists(target_element, attributes)
+
+                                # МСК
+                                sk_id_elem = target_element.find('.//sk_id')
+                                if sk_id_elem is not None and sk_id_elem.text:
+                                    attributes['msk'] = sk_id_elem.text.strip()
+
+                                # Извлекаем геометрии
+                                geometries = self.geometry_extractor(target_element)
+
+                                # Добавляем в кэш
+                                for geom_type, geom in geometries.items():
+                                    layer_key = f"{record_type}_{geom_type}"
+                                    if layer_key not in schemas:
+                                        schemas[layer_key] = set()
+                                    schemas[layer_key].update(attributes.keys())
+
+                                    if feature_sink is not None:
+                                        self._sink_feature(
+                                            feature_sink, layer_key, _geometry_to_wkb(geom),
+                                            attributes, default_date, needs_deduplication
+                                        )
+                                    else:
+                                        self._cache_feature(
+                                            cached_features, layer_key, geom, attributes,
+                                            default_date, needs_deduplication
+                                        )
+
+                            # Очистка памяти (критически важно для iterparse!)
+                            elem.clear()
+                            while elem.getprevious() is not None:
+                                del elem.getparent()[0]
+
+            except Exception as e:
+                log_error(f"KptParser: Ошибка парсинга {os.path.basename(file_path)}: {e}")
+                import traceback
+                log_error(f"KptParser: {traceback.format_exc()}")
+                self.failed_files.append(file_path)
+                continue
+            finally:
+                # Удаляем временный файл
+                if temp_file_obj:
+                    try:
+                        os.unlink(temp_file_obj.name)
+                    except OSError:
+                        pass
+
+            total_bytes_processed += current_file_size
+
+        if feature_sink is not None:
+            feature_sink.flush()
+
+        return dict(cached_features), schemas, record_counter
+
+    def _parse_files_parallel(
+        self,
+        file_paths: List[str],
+        workers: int,
+        progress_callback: Optional[Callable[[int], None]],
+        text_callback: Optional[Callable[[str], None]],
+        is_cancelled_callback: Optional[Callable[[], bool]],
+        total_batch_size: Optional[int],
+        feature_sink: Optional[Any] = None,
+        preparsed: Optional[Dict[int, Tuple]] = None,
+        on_parsed: Optional[Callable[[int, Tuple, List[Tuple[str, str]]], None]] = None
+    ) -> Optional[Tuple[Dict, Dict, int]]:
+        """
+        Параллельный парсинг файлов в пуле процессов
+
+        Воркеры возвращают (WKB, attributes) по layer_key. Слияние идёт строго
+        в порядке file_paths (по мере готовности префикса), поэтому
+        дедупликация даёт тот же результат, что и последовательный режим.
+        С feature_sink файл сливается сразу по готовности: порядок файлов
+        учитывает сам стейджинг (file_order в upsert).
+
+        preparsed - готовые результаты файлов (кэш разбора), в пул уходят
+        только остальные; on_parsed вызывается для каждого нового результата.
+
+        Файл, который воркер обрабатывает дольше KPT_PARSE_WORKER_STALL_TIMEOUT,
+        или сбой процесса пула: пул останавливается, незавершённые файлы
+        (и только они) парсятся в текущем процессе.
+
+        Returns:
+            (cached_features, schemas, record_count) или None если пул
+            не запустился (вызывающий переходит к последовательному режиму)
+        """
+        from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+        file_sizes = [os.path.getsize(path) for path in file_paths]
+        total_bytes = total_batch_size or sum(file_sizes)
+        default_date = datetime(1970, 1, 1)
+
+        schemas: Dict[str, set] = {}
+        cached_features: Dict = defaultdict(lambda: {"keyed": {}, "unkeyed": []})
+        record_counter = 0
+        ready: Dict[int, Tuple[Dict, Dict, int]] = {}
+        progress = {"bytes": 0, "files": 0, "next_to_merge": 0}
+        failed_files: List[str] = []
+        # Файлы для парсинга в текущем процессе (пул завис / упал)
+        unfinished: List[int] = []
+
+        log_info(f"KptParser: Параллельный парсинг {len(file_paths)} файлов, процессов: {workers}")
+
+        executable = get_worker_executable()
+        if executable is None:
+            log_warning("KptParser: Не найден python для процессов пула")
+            return None
+
+        try:
+            # Процессы spawn запускаются в submit() - внутри контекста
+            with spawn_executable(executable) as context:
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                futures = {
+                    executor.submit(
+                        _parse_file_worker, path, self.geometry_extractor, self.attribute_extractor
+                    ): index
+                    for index, path in enumerate(file_paths)
+                    if not preparsed or index not in preparsed
+                }
+        except Exception as e:
+            log_warning(f"KptParser: Не удалось создать пул процессов: {e}")
+            return None
+
+        def _accept(
+            index: int,
+            file_result: Tuple,
+            messages: Iterable[Tuple[str, str]] = (),
+            from_cache: bool = False
+        ) -> int:
+            """Готовый файл: в кэш разбора, в стейджинг или в очередь слияния"""
+            if on_parsed is not None and not from_cache:
+                on_parsed(index, file_result, messages)
+            progress["bytes"] += file_sizes[index]
+            progress["files"] += 1
+            if feature_sink is not None:
+                return self._merge_file_result(
+                    file_result, index, schemas, None, feature_sink, default_date
+                )
+            ready[index] = file_result
+            # Слияние готового префикса (порядок файлов = порядок дедупликации)
+            records = 0
+            while progress["next_to_merge"] in ready:
+                records += self._merge_file_result(
+                    ready.pop(progress["next_to_merge"]), progress["next_to_merge"],
+                    schemas, cached_features, None, default_date
+                )
+                progress["next_to_merge"] += 1
+            return records
+
+        def _report() -> None:
+            if progress_callback:
+                value = 5 + int((progress["bytes"] * 90) / total_bytes) if total_bytes > 0 else 5
+                if text_callback:
+                    text_callback(f"Обработка файлов... ({progress['files']}/{len(file_paths)})")
+                progress_callback(min(value, 95))
+
+        pending = set(futures)
+        # Начало обработки файла процессом (future.running()): срок считается
+        # для каждого файла отдельно, ожидание в очереди пула не учитывается
+        started: Dict[Any, float] = {}
+        stopped = False
+        broken = False
+
+        try:
+            for index, file_result in (preparsed or {}).items():
+                record_counter += _accept(index, file_result, from_cache=True)
+
+            while pending:
+                if is_cancelled_callback and is_cancelled_callback():
+                    return {}, {}, 0
+
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                for future in pending:
+                    if future not in started and future.running():
+                        started[future] = now
+                stalled = [
+                    future for future in pending
+                    if now - started.get(future, now) > KPT_PARSE_WORKER_STALL_TIMEOUT
+                ]
+                if stalled:
+                    names = ", ".join(os.path.basename(file_paths[futures[f]]) for f in stalled)
+                    log_warning(
+                        f"KptParser: Файл обрабатывается дольше "
+                        f"{KPT_PARSE_WORKER_STALL_TIMEOUT} сек ({names}), пул остановлен"
+                    )
+
+                for future in done:
+                    index = futures[future]
+                    try:
+                        # Ошибки парсинга файла перехватываются внутри воркера,
+                        # исключение здесь - сбой самого пула (процесс, pickle)
+                        file_result, messages = future.result()
+                    except Exception as e:
+                        log_warning(
+                            f"KptParser: Сбой процесса пула на {os.path.basename(file_paths[index])}: {e}"
+                        )
+                        broken = broken or isinstance(e, BrokenExecutor)
+                        unfinished.append(index)
+                        continue
+                    _replay_worker_messages(messages)
+                    if not file_result[3]:
+                        failed_files.append(file_paths[index])
+                    record_counter += _accept(index, file_result, messages)
+
+                if done:
+                    _report()
+
+                if stalled or broken:
+                    # Пул остановлен - оставшиеся файлы тоже в текущем процессе
+                    stopped = True
+                    unfinished.extend(futures[future] for future in pending)
+                    break
+
+        except Exception as e:
+            log_warning(f"KptParser: Сбой пула процессов: {e}")
+            return None
+        finally:
+            if stopped:
+                terminate_workers(executor)
+            # Все файлы к этому моменту готовы; при отмене/остановке не ждём воркеры
+            executor.shutdown(wait=not pending and not stopped, cancel_futures=True)
+
+        for index in sorted(unfinished):
+            if is_cancelled_callback and is_cancelled_callback():
+                return {}, {}, 0
+            if text_callback:
+                text_callback(f"Обработка файлов... ({progress['files'] + 1}/{len(file_paths)})")
+            with capture_log_messages() as messages:
+                file_result = self._parse_single_file(file_paths[index], None, is_cancelled_callback)
+            if is_cancelled_callback and is_cancelled_callback():
+                return {}, {}, 0
+            if not file_result[3]:
+                failed_files.append(file_paths[index])
+            record_counter += _accept(index, file_result, messages)
+            _report()
+
+        self.failed_files = failed_files
+
+        if feature_sink is not None:
+            feature_sink.flush()
+
+        return dict(cached_features), schemas, record_counter
+
+    def _merge_file_result(
+        self,
+        file_result: Tuple[Dict, Dict, int],
+        file_order: int,
+        schemas: Dict[str, set],
+        cached_features: Optional[Dict],
+        feature_sink: Optional[Any],
+        default_date: datetime,
+        needs_deduplication: bool = True
+    ) -> int:
+        """Слияние результата воркера в кэш или стейджинг, возвращает число записей"""
+        file_features, file_schemas, file_records, _ = file_result
+        for layer_key, keys in file_schemas.items():
+            schemas.setdefault(layer_key, set()).update(keys)
+
+        if feature_sink is not None:
+            feature_sink.begin_file(file_order)
+
+        for layer_key, wkb, attributes in _iter_file_features(file_features):
+            if feature_sink is not None:
+                self._sink_feature(
+                    feature_sink, layer_key, wkb, attributes,
+                    default_date, needs_deduplication
+                )
+            else:
+                self._cache_feature(
+                    cached_features, layer_key, _geometry_from_wkb(wkb),
+                    attributes, default_date, needs_deduplication
+                )
+        return file_records
+
+    def _sink_feature(
+        self,
+        feature_sink: Any,
+        layer_key: str,
+        wkb: Optional[bytes],
+        attributes: Dict[str, Any],
+        default_date: datetime,
+        needs_deduplication: bool
+    ) -> None:
+        """Передача объекта в стейджинг (дедупликация - upsert по ключу)"""
+        unique_key = self._get_feature_unique_key(attributes) if needs_deduplication else None
+        feature_sink.add_feature(layer_key, wkb, attributes, unique_key or None, default_date)
+
+    def _cache_feature(
+        self,
+        cached_features: Dict,
+        layer_key: str,
+        geom: Optional[QgsGeometry],
+        attributes: Dict[str, Any],
+        default_date: datetime,
+        needs_deduplication: bool
+    ) -> None:
+        """Добавление объекта в кэш слоя (с дедупликацией по уникальному ключу)"""
+        if not needs_deduplication:
+            cached_features[layer_key].append((geom, attributes))
+            return
+
+        feature_data = (geom, attributes, default_date)
+        unique_key = self._get_feature_unique_key(attributes)
+        if unique_key:
+            existing = cached_features[layer_key]["keyed"].get(unique_key)
+            if not existing or default_date > existing[2]:
+                cached_features[layer_key]["keyed"][unique_key] = feature_data
+        else:
+            cached_features[layer_key]["unkeyed"].append(feature_data)
+
+    def filter_files_by_date(self, file_paths: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Фильтрация файлов по дате - оставляем только новейшие версии
+
+        Args:
+            file_paths: Список путей к файлам
+
+        Returns:
+            (files_to_process, skipped_files_info)
+        """
+        if ET is None:
+            return file_paths, []
+
+        grouped_files: Dict[str, List[Dict]] = defaultdict(list)
+        default_date = datetime(1970, 1, 1)
+
+        for file_path in file_paths:
+            identifier, date_str = None, None
+            try:
+                with open(file_path, 'rb') as f:
+                    context = ET.iterparse(f, events=('start',), recover=True)
+                    found_identifier = False
+
+                    for _, elem in context:
+                        if elem.tag == "cadastral_number" and elem.text and elem.text.strip():
+                            identifier = elem.text.strip()
+                            found_identifier = True
+                        elif elem.tag == "reg_numb_border" and elem.text and elem.text.strip():
+                            identifier = elem.text.strip()
+                            found_identifier = True
+
+                        if elem.tag == "date_formation" and elem.text and elem.text.strip():
+                            date_str = elem.text.strip()
+
+                        elem.clear()
+                        if found_identifier and date_str:
+                            break
+
+                    if identifier is None:
+                        identifier = os.path.basename(file_path)
+
+                file_date = default_date
+                if date_str:
+                    try:
+                        file_date = datetime.strptime(date_str, '%Y-%m-%d')
+                    except ValueError:
+                        pass
+
+                grouped_files[identifier].append({'path': file_path, 'date': file_date})
+
+            except Exception as e:
+                log_warning(f"KptParser: Ошибка предобработки {os.path.basename(file_path)}: {e}")
+
+        files_to_process: List[str] = []
+        skipped_files_info: List[str] = []
+
+        for identifier, files in grouped_files.items():
+            files.sort(key=lambda x: x['date'], reverse=True)
+            newest_file = files[0]
+            files_to_process.append(newest_file['path'])
+
+            for old_file in files[1:]:
+                skipped_files_info.append(
+                    f"{os.path.basename(old_file['path'])} (заменен на {os.path.basename(newest_file['path'])})"
+                )
+
+        return files_to_process, skipped_files_info
+
+    def get_file_header_info(self, file_path: str) -> Tuple[str, str]:
+        """
+        Быстрое получение идентификатора и root tag из заголовка файла
+
+        Args:
+            file_path: Путь к файлу
+
+        Returns:
+            (suffix, root_tag)
+        """
+        if ET is None:
+            return "", ""
+
+        suffix = ""
+        root_tag = ""
+        chunk_size = 8 * 1024
+
+        try:
+            import io
+            with open(file_path, 'rb') as f:
+                chunk = f.read(chunk_size)
+
+            context = ET.iterparse(io.BytesIO(chunk), events=('start',), recover=True)
+
+            for _, elem in context:
+                if not root_tag:
+                    root_tag = elem.tag
+
+                if elem.tag in ("cadastral_number", "reg_numb_border") and elem.text and elem.text.strip():
+                    suffix = f"_{elem.text.strip()}"
+                    break
+
+                elem.clear()
+
+        except Exception as e:
+            log_warning(f"KptParser: Ошибка чтения заголовка {os.path.basename(file_path)}: {e}")
+            suffix = f"_{os.path.splitext(os.path.basename(file_path))[0]}"
+            if not root_tag:
+                root_tag = "extract_cadastral_plan_territory"
+
+        return suffix, root_tag
+
+    def _preprocess_xml(self, original_path: str) -> Tuple[str, Optional[Any]]:
+        """
+        Препроцессинг XML - фикс битых файлов с преждевременным закрытием тега
+
+        Args:
+            original_path: Путь к оригинальному файлу
+
+        Returns:
+            (path_to_process, temp_file_obj)
+        """
+        possible_root_tags = ['extract_cadastral_plan_territory', 'extract_about_zone', 'extract_about_boundary']
+        root_tag_name = None
+        needs_fixing = False
+
+        try:
+            with open(original_path, 'r', encoding='utf-8-sig', errors='ignore') as f:
+                for i, line in enumerate(f):
+                    if i < 10 and not root_tag_name:
+                        for tag in possible_root_tags:
+                            if f'<{tag}' in line:
+                                root_tag_name = tag
+                                break
+
+                    if root_tag_name:
+                        closing_tag = f'</{root_tag_name}>'
+                        if closing_tag in line:
+                            needs_fixing = True
+                            break
+        except Exception:
+            return original_path, None
+
+        if not needs_fixing:
+            return original_path, None
+
+        temp_file = None
+        try:
+            temp_file = tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', delete=False, suffix='.xml')
+            with open(original_path, 'r', encoding='utf-8-sig', errors='ignore') as source_file:
+                for line in source_file:
+                    if root_tag_name:
+                        cleaned_line = line.replace(f'</{root_tag_name}>', '')
+                        temp_file.write(cleaned_line)
+
+            if root_tag_name:
+                temp_file.write(f'</{root_tag_name}>')
+
+            temp_file.close()
+            return temp_file.name, temp_file
+
+        except Exception as e:
+            log_error(f"KptParser: Ошибка фикса XML {original_path}: {e}")
+            if temp_file:
+                temp_file.close()
+                try:
+                    os.unlink(temp_file.name)
+                except OSError:
+                    pass
+            return original_path, None
+
+    def _get_feature_unique_key(self, attributes: Dict) -> Optional[str]:
+        """Получение уникального ключа для дедупликации"""
+        return attributes.get('cad_number') or attributes.get('numb_border')
+
+    def _extract_zone_lists(self, record, attributes: Dict):
+        """Извлечение списков для zones_and_territories"""
+        # Основные виды разрешенного использования
+        primary_uses = [
+            t.text.strip() for t in record.findall(".//permitted_primary_uses//permitted_use_text")
+            if t.text and t.text.strip()
+        ]
+        if primary_uses:
+            attributes['permitted_uses_primary'] = "; ".join(primary_uses)
+
+        # Условно разрешенные виды
+        cond_uses = [
+            t.text.strip() for t in record.findall(".//permitted_conditionally_uses//permitted_use_text")
+            if t.text and t.text.strip()
+        ]
+        if cond_uses:
+            attributes['permitted_uses_cond'] = "; ".join(cond_uses)
+
+        # Входящие участки
+        parcels = [
+            t.text.strip() for t in record.findall(".//included_parcels/includ_parcel/cad_number")
+            if t.text and t.text.strip()
+        ]
+        if parcels:
+            attributes['included_parcels_list'] = "; ".join(parcels)
+
+        # Реквизиты документов
+        doc_names, doc_numbers, doc_dates, doc_issuers = [], [], [], []
+        for decision in record.findall(".//decisions_requisites/decision_requisites"):
+            doc_names.append(decision.findtext("document_name", "").strip())
+            doc_numbers.append(decision.findtext("document_number", "").strip())
+            doc_dates.append(decision.findtext("document_date", "").strip())
+            doc_issuers.append(decision.findtext("document_issuer", "").strip())
+
+        if any(doc_names):
+            attributes["doc_name"] = "; ".join(filter(None, doc_names))
+        if any(doc_numbers):
+            attributes["doc_number"] = "; ".join(filter(None, doc_numbers))
+        if any(doc_dates):
+            attributes["doc_date"] = "; ".join(filter(None, doc_dates))
+        if any(doc_issuers):
+            attributes["doc_issuer"] = "; ".join(filter(None, doc_issuers))
+
+
+
+class _WorkerLogCollector:
+    """
+    Получатель логов в процессе пула (вместо M_38 через set_session_log)
+
+    QgsMessageLog процесса пула никто не читает, поэтому предупреждения
+    и ошибки файла возвращаются вместе с результатом и пишутся в лог
+    родителем (_replay_worker_messages).
+    """
+
+    debug_enabled = False
+
+    def __init__(self) -> None:
+        self.messages: List[Tuple[str, str]] = []
+
+    def write(self, message: str, tag: str = "", level: str = "INFO") -> None:
+        if level in ("WARNING", "CRITICAL"):
+            self.messages.append((level, message))
+
+
+def _parse_file_worker(
+    file_path: str,
+    geometry_extractor: Callable,
+    attribute_extractor: Callable
+) -> Tuple[Tuple[Dict[str, List[Tuple[Optional[bytes], Dict[str, Any]]]], Dict[str, set], int, bool],
+           List[Tuple[str, str]]]:
+    """
+    Парсинг одного файла в процессе пула (функция модуля - picklable)
+
+    Returns:
+        (({layer_key: [(wkb или None, attributes)]}, schemas, record_count, parsed_ok),
+         [(level, message)] - предупреждения и ошибки парсинга файла)
+    """
+    collector = _WorkerLogCollector()
+    set_session_log(collector)
+    try:
+        parser = KptParser(geometry_extractor, attribute_extractor)
+        return parser._parse_single_file(file_path), collector.messages
+    finally:
+        set_session_log(None)
+
+
+def _replay_worker_messages(messages: List[Tuple[str, str]]) -> None:
+    """Запись в лог родителя предупреждений и ошибок воркера"""
+    for level, message in messages:
+        if level == "CRITICAL":
+            log_error(message)
+        else:
+            log_warning(message)
+
+
+def _file_result_from_cache(meta: Dict[str, Any], rows: Iterable[Tuple]) -> Tuple:
+    """
+    Результат файла из записи кэша разбора
+
+    Объекты - ленивый поток (layer_key, wkb, attributes) из кэша: сливаются
+    по одному, как объекты воркера, без сборки файла в памяти.
+    """
+    schemas = {key: set(names) for key, names in meta.get("schemas", {}).items()}
+    return rows, schemas, meta.get("record_count", 0), True
+
+
+def _iter_file_features(file_features: Any) -> Iterator[Tuple[str, Optional[bytes], Dict[str, Any]]]:
+    """(layer_key, wkb, attributes) результата файла: воркера (dict) или кэша (поток)"""
+    if isinstance(file_features, dict):
+        for layer_key, items in file_features.items():
+            for wkb, attributes in items:
+                yield layer_key, wkb, attributes
+    else:
+        yield from file_features
+
+
+def _geometry_to_wkb(geom: Optional[QgsGeometry]) -> Optional[bytes]:
+    """WKB геометрии (None для NoGeometry)"""
+    if geom is None or geom.isNull():
+        return None
+    return bytes(geom.asWkb())
+
+
+def _geometry_from_wkb(wkb: Optional[bytes]) -> Optional[QgsGeometry]:
+    """Восстановление QgsGeometry из WKB воркера"""
+    if wkb is None:
+        return None
+    geom = QgsGeometry()
+    geom.fromWkb(wkb)
+    return geom
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Классическое математическое округление координат.
+
+Pure math module - no QGIS dependencies.
+Used by M_6 (CoordinatePrecisionManager) and topology checkers (core.topology),
+which run in process pool workers without importing managers.
+"""
+
+import math
+
+
+def math_round(value: float, decimals: int) -> float:
+    """
+    Классическое математическое округление (round half away from zero).
+
+    Python round() использует банковское округление (round half to even):
+    - round(2.5) = 2 (к чётному)
+    - round(3.5) = 4 (к чётному)
+
+    Эта функция использует классическое округление:
+    - math_round(2.5, 0) = 3 (от нуля)
+    - math_round(3.5, 0) = 4 (от нуля)
+
+    Это совместимо с QGIS snappedToGrid() и PostGIS ST_SnapToGrid().
+
+    Args:
+        value: Значение для округления
+        decimals: Количество знаков после запятой
+
+    Returns:
+        Округлённое значение
+    """
+    multiplier = 10 ** decimals
+    if value >= 0:
+        return math.floor(value * multiplier + 0.5) / multiplier
+    else:
+        return math.ceil(value * multiplier - 0.5) / multiplier
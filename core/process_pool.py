@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Пул процессов (spawn) для тяжёлых фоновых вычислений.
+
+Используется параллельным парсингом КПТ (core.kpt) и параллельной
+проверкой топологии (Fsm_0_4_21). Функции процессов пула живут в лёгких
+пакетах core.* - процесс пула не импортирует пакет tools (инструменты,
+диалоги, processing).
+
+- get_worker_executable() - python для процессов пула (в QGIS
+  sys.executable - qgis-bin.exe)
+- spawn_executable() - временная установка интерпретатора spawn на время
+  запуска процессов (set_executable глобален для multiprocessing)
+- terminate_workers() - принудительная остановка процессов зависшего пула
+"""
+
+import multiprocessing
+import multiprocessing.spawn
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+
+def get_worker_executable() -> Optional[str]:
+    """
+    Интерпретатор для spawn-процессов пула
+
+    Внутри QGIS sys.executable указывает на qgis-bin.exe (Windows),
+    поэтому берём python.exe из установки QGIS. PipInstaller при неудаче
+    возвращает sys.executable - запуск qgis-bin.exe как воркера открыл бы
+    новый экземпляр QGIS, поэтому без python возвращаем None (без пула).
+    """
+    from Daman_QGIS.tools.F_4_plagin.submodules.Fsm_4_1_4_pip_installer import PipInstaller
+    executable = PipInstaller.get_python_executable()
+    if not executable or "python" not in os.path.basename(executable).lower():
+        return None
+    return executable
+
+
+@contextmanager
+def spawn_executable(executable: str) -> Iterator[Any]:
+    """
+    Контекст spawn с заданным интерпретатором
+
+    ProcessPoolExecutor запускает процессы spawn при первом submit(),
+    поэтому пул создаётся и задачи отправляются внутри контекста; на
+    выходе прежний интерпретатор возвращается (чужие пулы и multiprocessing
+    в QGIS не затрагиваются).
+
+    Yields:
+        multiprocessing context 'spawn' для ProcessPoolExecutor(mp_context=...)
+    """
+    previous_executable = multiprocessing.spawn.get_executable()
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(executable)
+    try:
+        yield context
+    finally:
+        multiprocessing.spawn.set_executable(previous_executable)
+
+
+def terminate_workers(executor: Any) -> None:
+    """
+    Остановка процессов пула, не завершившихся сами
+
+    Без terminate зависший процесс ждал бы atexit-обработчик
+    concurrent.futures при закрытии QGIS.
+    """
+    for process in list((getattr(executor, '_processes', None) or {}).values()):
+        try:
+            process.terminate()
+        except Exception:
+            pass
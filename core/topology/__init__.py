@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+Проверки топологии полигональных слоёв по снимку (F_0_4).
+
+Лёгкий пакет вне tools: импортируется процессами пула Fsm_0_4_21 без
+инструментов, диалогов и processing. Зависимости - qgis.core, constants,
+utils, core.math.
+
+- layer_snapshot: LayerSnapshot - снимок слоя, читается один раз за запуск
+- geometry_validity, duplicates, topology_errors, precision,
+  cross_feature_checker, gap_checker - checker'ы полигонов по снимку
+- duplicate_index: канонические ключи геометрий и сеточный хэш вершин
+- polygon_checks: PolygonCheckSuite - порядок запуска checker'ов
+  (базовый класс координатора Fsm_0_4_5)
+- snapshot_worker: проверка снимка в процессе пула Fsm_0_4_21
+
+Координатор, слои ошибок и диалог F_0_4 остаются в tools/F_0_project.
+"""
@@ -4,6 +4,7 @@
 
 Проверяет вершины на общих границах между соседними полигонами/линиями.
 Использует QgsSpatialIndex для оптимизации поиска соседей.
+Вершины берутся из общего снимка слоя (LayerSnapshot) - слой не перечитывается.
 
 Типичная проблема: точки на общей границе имеют микро-расхождения
 (например, 4927007.170 vs 4927007.160) из-за разных источников данных.
@@ -11,14 +12,15 @@
 
 from typing import List, Dict, Any, Tuple, Set, Optional
 from qgis.core import (
-    Qgis, QgsVectorLayer, QgsGeometry, QgsPointXY, QgsProject,
+    Qgis, QgsVectorLayer, QgsGeometry, QgsProject,
     QgsSpatialIndex, QgsFeatureRequest, QgsRectangle
 )
 from Daman_QGIS.constants import COORDINATE_PRECISION
 from Daman_QGIS.utils import log_info, log_warning
+from .layer_snapshot import LayerSnapshot, VertexArray
 
 
-class Fsm_0_4_10_CrossFeatureChecker:
+class CrossFeatureChecker:
     """
     Проверка близких точек между разными объектами слоя.
 
@@ -47,18 +49,23 @@ class Fsm_0_4_10_CrossFeatureChecker:
         self._point_layer: Optional[QgsVectorLayer] = None
         self._point_index: Optional[Dict[Tuple[float, float], int]] = None
 
-    def check(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
+    def check(self, layer: Optional[QgsVectorLayer],
+              snapshot: Optional[LayerSnapshot] = None,
+              point_index: Optional[Dict[Tuple[float, float], int]] = None) -> List[Dict[str, Any]]:
         """
         Проверка близких точек между разными объектами.
 
         Алгоритм:
-        1. Извлекаем все вершины всех объектов с их feature_id
+        1. Берём плоский массив вершин снимка (x, y, fid, индексы)
         2. Строим пространственный индекс по вершинам
         3. Для каждой вершины ищем соседей в пределах TOLERANCE
         4. Фильтруем пары из разных features
 
         Args:
-            layer: Проверяемый слой
+            layer: Проверяемый слой (None - только снимок, процесс пула)
+            snapshot: Снимок слоя от координатора (None - прочитать слой)
+            point_index: Готовый индекс ID точек (build_point_index); None -
+                         найти точечный слой в проекте
 
         Returns:
             Список ошибок cross_feature_close_points
@@ -66,143 +73,73 @@ class Fsm_0_4_10_CrossFeatureChecker:
         errors = []
 
         try:
-            geom_type = layer.geometryType()
+            geom_type = snapshot.geometry_type if snapshot is not None else layer.geometryType()
 
             if geom_type not in (Qgis.GeometryType.Polygon, Qgis.GeometryType.Line):
-                log_info("Fsm_0_4_10: Cross-feature проверка только для полигонов и линий")
+                log_info("CrossFeatureChecker: Cross-feature проверка только для полигонов и линий")
                 return []
 
-            # Ищем точечный слой для получения ID точек
-            self._point_layer = self._find_point_layer(layer.name())
-            if self._point_layer:
-                self._point_index = self._build_point_index(self._point_layer)
-            else:
-                self._point_index = None
+            # ID точек из точечного слоя (в процессе пула проекта нет - индекс передаётся)
+            if point_index is None:
+                point_index = self.build_point_index(layer.name())
+            self._point_index = point_index or None
+
+            if snapshot is None:
+                snapshot = LayerSnapshot(layer)
 
-            # Собираем все вершины с метаданными
-            all_vertices = self._extract_all_vertices(layer)
+            # Все вершины с метаданными (общий массив снимка)
+            vertices = snapshot.vertices()
 
-            if not all_vertices:
+            if not len(vertices):
                 return []
 
-            log_info(f"Fsm_0_4_10: Извлечено {len(all_vertices)} вершин для cross-feature проверки")
+            log_info(f"CrossFeatureChecker: Извлечено {len(vertices)} вершин для cross-feature проверки")
 
             # Строим пространственный индекс
-            spatial_index, vertex_map = self._build_vertex_index(all_vertices)
+            spatial_index = self._build_vertex_index(vertices)
 
             # Ищем близкие пары между разными объектами
-            errors = self._find_cross_feature_close_points(
-                all_vertices, spatial_index, vertex_map
-            )
+            errors = self._find_cross_feature_close_points(vertices, spatial_index)
 
             self.cross_feature_close_points = len(errors)
 
             if self.cross_feature_close_points > 0:
                 log_warning(
-                    f"Fsm_0_4_10: Найдено {self.cross_feature_close_points} "
+                    f"CrossFeatureChecker: Найдено {self.cross_feature_close_points} "
                     f"близких точек между объектами (расхождение {self.COINCIDENT_TOLERANCE*1000:.0f}-{self.SEARCH_TOLERANCE*1000:.0f} мм)"
                 )
             else:
-                log_info("Fsm_0_4_10: Близких точек между объектами не обнаружено")
+                log_info("CrossFeatureChecker: Близких точек между объектами не обнаружено")
 
             return errors
 
         except Exception as e:
-            log_warning(f"Fsm_0_4_10: Ошибка cross-feature проверки: {str(e)}")
+            log_warning(f"CrossFeatureChecker: Ошибка cross-feature проверки: {str(e)}")
             return []
 
-    def _extract_all_vertices(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
-        """
-        Извлечение всех вершин из слоя с метаданными.
-
-        Returns:
-            Список словарей: [{
-                'point': QgsPointXY,
-                'feature_id': int,
-                'vertex_index': int,
-                'part_idx': int,
-                'ring_idx': int
-            }, ...]
-        """
-        vertices = []
-        geom_type = layer.geometryType()
-
-        for feature in layer.getFeatures():
-            fid = feature.id()
-            geom = feature.geometry()
-
-            if not geom or geom.isEmpty():
-                continue
-
-            if geom_type == Qgis.GeometryType.Polygon:
-                polygons = geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()]
-                for part_idx, polygon in enumerate(polygons):
-                    if not polygon:
-                        continue
-                    for ring_idx, ring in enumerate(polygon):
-                        for v_idx, point in enumerate(ring):
-                            vertices.append({
-                                'point': point,
-                                'feature_id': fid,
-                                'vertex_index': v_idx,
-                                'part_idx': part_idx,
-                                'ring_idx': ring_idx
-                            })
-
-            elif geom_type == Qgis.GeometryType.Line:
-                lines = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
-                for part_idx, line in enumerate(lines):
-                    if not line:
-                        continue
-                    for v_idx, point in enumerate(line):
-                        vertices.append({
-                            'point': point,
-                            'feature_id': fid,
-                            'vertex_index': v_idx,
-                            'part_idx': part_idx,
-                            'ring_idx': 0
-                        })
-
-        return vertices
-
-    def _build_vertex_index(
-        self,
-        vertices: List[Dict[str, Any]]
-    ) -> Tuple[QgsSpatialIndex, Dict[int, int]]:
+    def _build_vertex_index(self, vertices: VertexArray) -> QgsSpatialIndex:
         """
         Построение пространственного индекса по вершинам.
 
-        Используем QgsSpatialIndex с точечными геометриями.
-        Каждой вершине присваиваем уникальный ID для индекса.
+        ID в индексе - позиция вершины в массиве снимка; вершина
+        добавляется вырожденным bbox (без QgsFeature / QgsGeometry на вершину).
 
         Returns:
-            (QgsSpatialIndex, {index_id: vertex_list_index})
+            QgsSpatialIndex
         """
-        from qgis.core import QgsFeature
-
         spatial_index = QgsSpatialIndex()
-        vertex_map = {}  # index_id -> index in vertices list
-
-        for i, vertex_data in enumerate(vertices):
-            point = vertex_data['point']
-
-            # Создаём feature для индекса
-            # ВАЖНО: сначала создать QgsFeature(), затем setId() и setGeometry()
-            # QgsFeature(id) может создать невалидный feature, вызывающий access violation
-            feat = QgsFeature()
-            feat.setId(i)
-            feat.setGeometry(QgsGeometry.fromPointXY(point))
+        xs, ys = vertices.xs, vertices.ys
 
-            spatial_index.addFeature(feat)
-            vertex_map[i] = i
+        for k in range(len(vertices)):
+            x, y = xs[k], ys[k]
+            spatial_index.addFeature(k, QgsRectangle(x, y, x, y))
 
-        return spatial_index, vertex_map
+        return spatial_index
 
     def _find_cross_feature_close_points(
         self,
-        vertices: List[Dict[str, Any]],
-        spatial_index: QgsSpatialIndex,
-        vertex_map: Dict[int, int]
+        vertices: VertexArray,
+        spatial_index: QgsSpatialIndex
     ) -> List[Dict[str, Any]]:
         """
         Поиск близких точек между разными объектами.
@@ -222,47 +159,47 @@ class Fsm_0_4_10_CrossFeatureChecker:
         coincident_count = 0  # Счётчик совпадающих точек (общие вершины)
         shared_vertex_skip_count = 0  # Счётчик пропущенных из-за общих вершин
 
+        xs, ys = vertices.xs, vertices.ys
+        fids, vertex_idx = vertices.fids, vertices.vertex_idx
+
         # Строим индекс координат -> set(feature_ids) для проверки общих вершин
         coord_to_features: Dict[Tuple[float, float], Set[int]] = {}
-        for vertex_data in vertices:
-            pt = vertex_data['point']
-            key = (round(pt.x(), 6), round(pt.y(), 6))
+        for k in range(len(vertices)):
+            key = (round(xs[k], 6), round(ys[k], 6))
             if key not in coord_to_features:
                 coord_to_features[key] = set()
-            coord_to_features[key].add(vertex_data['feature_id'])
+            coord_to_features[key].add(fids[k])
 
-        for i, vertex_data in enumerate(vertices):
-            point = vertex_data['point']
-            fid = vertex_data['feature_id']
+        for i in range(len(vertices)):
+            x, y = xs[i], ys[i]
+            fid = fids[i]
 
             # Создаём bbox для поиска соседей
             search_rect = QgsRectangle(
-                point.x() - self.SEARCH_TOLERANCE,
-                point.y() - self.SEARCH_TOLERANCE,
-                point.x() + self.SEARCH_TOLERANCE,
-                point.y() + self.SEARCH_TOLERANCE
+                x - self.SEARCH_TOLERANCE,
+                y - self.SEARCH_TOLERANCE,
+                x + self.SEARCH_TOLERANCE,
+                y + self.SEARCH_TOLERANCE
             )
 
-            # Ищем кандидатов в индексе
-            candidate_ids = spatial_index.intersects(search_rect)
+            # Ищем кандидатов в индексе (сортировка - детерминированный порядок ошибок)
+            candidate_ids = sorted(spatial_index.intersects(search_rect))
 
-            for cand_id in candidate_ids:
-                if cand_id == i:
+            for cand_idx in candidate_ids:
+                if cand_idx == i:
                     continue  # Пропускаем саму себя
 
-                cand_idx = vertex_map[cand_id]
-                cand_data = vertices[cand_idx]
-                cand_fid = cand_data['feature_id']
+                cand_fid = fids[cand_idx]
 
                 # Проверяем только пары из РАЗНЫХ features
                 if cand_fid == fid:
                     continue
 
-                cand_point = cand_data['point']
+                cand_x, cand_y = xs[cand_idx], ys[cand_idx]
 
                 # Точное вычисление расстояния
-                dx = point.x() - cand_point.x()
-                dy = point.y() - cand_point.y()
+                dx = x - cand_x
+                dy = y - cand_y
                 distance = (dx * dx + dy * dy) ** 0.5
 
                 if distance > self.SEARCH_TOLERANCE:
@@ -277,7 +214,7 @@ class Fsm_0_4_10_CrossFeatureChecker:
                 # Проверяем, является ли cand_point общей вершиной обоих объектов
                 # Если да - значит point и cand_point обе принадлежат одному контуру (fid),
                 # просто cand_point также используется соседним полигоном (cand_fid)
-                cand_key = (round(cand_point.x(), 6), round(cand_point.y(), 6))
+                cand_key = (round(cand_x, 6), round(cand_y, 6))
                 cand_features = coord_to_features.get(cand_key, set())
                 if fid in cand_features:
                     # cand_point существует и в объекте fid - это общая вершина,
@@ -286,7 +223,7 @@ class Fsm_0_4_10_CrossFeatureChecker:
                     continue
 
                 # Аналогично проверяем point - если она общая вершина
-                point_key = (round(point.x(), 6), round(point.y(), 6))
+                point_key = (round(x, 6), round(y, 6))
                 point_features = coord_to_features.get(point_key, set())
                 if cand_fid in point_features:
                     # point существует и в объекте cand_fid - это общая вершина
@@ -294,8 +231,8 @@ class Fsm_0_4_10_CrossFeatureChecker:
                     continue
 
                 # Создаём нормализованный ключ пары для дедупликации
-                v_idx1 = vertex_data['vertex_index']
-                v_idx2 = cand_data['vertex_index']
+                v_idx1 = vertex_idx[i]
+                v_idx2 = vertex_idx[cand_idx]
 
                 if fid < cand_fid:
                     pair_key = (fid, v_idx1, cand_fid, v_idx2)
@@ -308,8 +245,8 @@ class Fsm_0_4_10_CrossFeatureChecker:
                 checked_pairs.add(pair_key)
 
                 # Пытаемся получить ID точек из точечного слоя
-                point_id1 = self._get_point_id(point.x(), point.y())
-                point_id2 = self._get_point_id(cand_point.x(), cand_point.y())
+                point_id1 = self._get_point_id(x, y)
+                point_id2 = self._get_point_id(cand_x, cand_y)
 
                 # Формируем описание с ID точек или номерами вершин
                 if point_id1 is not None and point_id2 is not None:
@@ -320,7 +257,7 @@ class Fsm_0_4_10_CrossFeatureChecker:
                 # Добавляем ошибку
                 errors.append({
                     'type': 'cross_feature_close_points',
-                    'geometry': QgsGeometry.fromPointXY(point),
+                    'geometry': QgsGeometry.fromPointXY(vertices.point(i)),
                     'feature_id': fid,
                     'feature_id2': cand_fid,
                     'vertex_index': v_idx1,
@@ -332,27 +269,38 @@ class Fsm_0_4_10_CrossFeatureChecker:
                         f'расстояние {distance*1000:.1f} мм '
                         f'{vertex_desc}'
                     ),
-                    'coords': (point.x(), point.y()),
-                    'coords2': (cand_point.x(), cand_point.y()),
+                    'coords': (x, y),
+                    'coords2': (cand_x, cand_y),
                     'distance': distance
                 })
 
         # Логируем совпадающие точки (общие вершины - это норма)
         if coincident_count > 0:
             log_info(
-                f"Fsm_0_4_10: Пропущено {coincident_count} совпадающих точек "
+                f"CrossFeatureChecker: Пропущено {coincident_count} совпадающих точек "
                 f"(общие вершины смежных полигонов)"
             )
 
         # Логируем пропущенные из-за соседства с общими вершинами
         if shared_vertex_skip_count > 0:
             log_info(
-                f"Fsm_0_4_10: Пропущено {shared_vertex_skip_count} пар точек "
+                f"CrossFeatureChecker: Пропущено {shared_vertex_skip_count} пар точек "
                 f"(соседние с общими вершинами смежных полигонов)"
             )
 
         return errors
 
+    def build_point_index(self, polygon_layer_name: str) -> Dict[Tuple[float, float], int]:
+        """
+        Индекс координат -> ID точки для полигонального / линейного слоя.
+
+        Пустой словарь - точечного слоя нет (ID в описании не подставляются).
+        """
+        self._point_layer = self._find_point_layer(polygon_layer_name)
+        if not self._point_layer:
+            return {}
+        return self._build_point_index(self._point_layer)
+
     def get_errors_count(self) -> int:
         """Возвращает количество найденных cross-feature близких точек"""
         return self.cross_feature_close_points
@@ -388,7 +336,7 @@ class Fsm_0_4_10_CrossFeatureChecker:
             layer_name = layer.name()
             if '_Т_' in layer_name and suffix in layer_name:
                 if isinstance(layer, QgsVectorLayer) and layer.isValid():
-                    log_info(f"Fsm_0_4_10: Найден точечный слой '{layer_name}' для '{polygon_layer_name}'")
+                    log_info(f"CrossFeatureChecker: Найден точечный слой '{layer_name}' для '{polygon_layer_name}'")
                     return layer
 
         return None
@@ -411,7 +359,7 @@ class Fsm_0_4_10_CrossFeatureChecker:
         # Проверяем наличие поля ID
         field_names = [f.name() for f in point_layer.fields()]
         if 'ID' not in field_names:
-            log_warning("Fsm_0_4_10: Поле 'ID' не найдено в точечном слое")
+            log_warning("CrossFeatureChecker: Поле 'ID' не найдено в точечном слое")
             return index
 
         for feature in point_layer.getFeatures():
@@ -436,7 +384,7 @@ class Fsm_0_4_10_CrossFeatureChecker:
                 key = (round(pt.x(), 6), round(pt.y(), 6))
                 index[key] = point_id
 
-        log_info(f"Fsm_0_4_10: Построен индекс точек ({len(index)} записей)")
+        log_info(f"CrossFeatureChecker: Построен индекс точек ({len(index)} записей)")
         return index
 
     def _get_point_id(self, x: float, y: float) -> Optional[int]:
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Хэш-индексы для проверки дублей (DuplicatesChecker)
+
+1. Канонический ключ геометрии - дубли полигонов группируются одним
+   проходом по словарю {ключ: [fid, ...]}. Ключ не зависит от:
+   - начальной вершины замкнутого кольца
+   - направления обхода кольца / линии
+   - порядка дырок в полигоне и порядка частей мультигеометрии
+   Координаты сравниваются точно (без допуска) - как прежнее сравнение WKB.
+
+2. Сеточный хэш (grid hash) для поиска близких вершин: ячейка со стороной
+   допуска, соседи ищутся только в 3x3 ячейках вокруг точки. O(n) в среднем,
+   без QgsSpatialIndex / rtree и без QgsFeature на каждую вершину.
+
+Зависимости: только стандартная библиотека (без qgis) - модуль работает
+с кортежами координат (x, y).
+"""
+
+import math
+from array import array
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+Point = Tuple[float, float]
+Ring = Tuple[Point, ...]
+
+# Запас размера ячейки над допуском: точки на расстоянии ровно tolerance
+# не должны разъехаться через ячейку из-за округления x / cell
+_CELL_MARGIN = 1.000001
+
+
+def _min_rotation(points: Sequence[Point]) -> Ring:
+    """Циклический сдвиг, начинающийся с наименьшей (лексикографически) вершины"""
+    n = len(points)
+    start = min(points)
+    best = None
+    for k in range(n):
+        if points[k] != start:
+            continue
+        rotated = tuple(points[k:]) + tuple(points[:k])
+        if best is None or rotated < best:
+            best = rotated
+    return best
+
+
+def canonical_ring(points: Sequence[Point]) -> Ring:
+    """
+    Каноническое замкнутое кольцо (без замыкающей вершины).
+
+    Начало - наименьшая вершина, направление - лексикографически меньшее
+    из двух обходов.
+    """
+    pts = list(points)
+    if len(pts) > 1 and pts[0] == pts[-1]:
+        pts.pop()
+    if not pts:
+        return ()
+    forward = _min_rotation(pts)
+    backward = _min_rotation(pts[::-1])
+    return min(forward, backward)
+
+
+def canonical_line(points: Sequence[Point]) -> Ring:
+    """Каноническая линия: замкнутая - как кольцо, открытая - меньшее из направлений"""
+    pts = tuple(points)
+    if len(pts) >= 4 and pts[0] == pts[-1]:
+        return canonical_ring(pts)
+    return min(pts, pts[::-1])
+
+
+def geometry_key(parts: Sequence[Sequence], is_polygon: bool) -> bytes:
+    """
+    Канонический ключ геометрии по частям.
+
+    Args:
+        parts: полигон - [[кольцо, ...], ...], линия - [[вершины], ...];
+               вершины - кортежи (x, y)
+        is_polygon: Части - полигоны (иначе линии)
+
+    Returns:
+        bytes - равен для геометрий, отличающихся только началом / направлением
+        колец, порядком дырок и частей
+    """
+    if is_polygon:
+        canonical_parts = []
+        for polygon in parts:
+            if not polygon:
+                continue
+            exterior = canonical_ring(polygon[0])
+            holes = sorted(canonical_ring(ring) for ring in polygon[1:])
+            canonical_parts.append((exterior,) + tuple(holes))
+    else:
+        canonical_parts = [(canonical_line(line),) for line in parts if line]
+    canonical_parts.sort()
+
+    # Плоская упаковка: счётчики частей / колец / вершин + координаты
+    packed = array('d', [len(canonical_parts)])
+    for part in canonical_parts:
+        packed.append(len(part))
+        for ring in part:
+            packed.append(len(ring))
+            for x, y in ring:
+                packed.append(x)
+                packed.append(y)
+    return packed.tobytes()
+
+
+def group_duplicates(keys: Sequence[bytes], fids: Sequence[int]) -> List[List[int]]:
+    """
+    Группы одинаковых ключей (один проход по словарю).
+
+    Returns:
+        Списки fid групп из 2+ объектов; fid внутри группы и группы -
+        в порядке первого появления
+    """
+    groups: Dict[bytes, List[int]] = {}
+    for key, fid in zip(keys, fids):
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [fid]
+        else:
+            group.append(fid)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def close_pairs(points: Sequence[Point], tolerance: float) -> Iterator[Tuple[int, int, float]]:
+    """
+    Пары вершин на расстоянии <= tolerance (сеточный хэш).
+
+    Args:
+        points: Вершины (x, y)
+        tolerance: Допуск расстояния
+
+    Yields:
+        (i, j, distance) с i < j, по возрастанию (i, j) - порядок полного перебора
+    """
+    if tolerance <= 0:
+        return
+    cell = tolerance * _CELL_MARGIN
+    grid: Dict[Tuple[int, int], List[int]] = {}
+    cells = []
+    for index, (x, y) in enumerate(points):
+        key = (math.floor(x / cell), math.floor(y / cell))
+        cells.append(key)
+        grid.setdefault(key, []).append(index)
+
+    for i, (x1, y1) in enumerate(points):
+        cx, cy = cells[i]
+        neighbours = []
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                bucket = grid.get((gx, gy))
+                if bucket:
+                    neighbours.extend(j for j in bucket if j > i)
+        neighbours.sort()
+        for j in neighbours:
+            x2, y2 = points[j]
+            dx = abs(x2 - x1)
+            dy = abs(y2 - y1)
+            distance = (dx * dx + dy * dy) ** 0.5
+            if distance <= tolerance:
+                yield i, j, distance
@@ -1,21 +1,24 @@
 # -*- coding: utf-8 -*-
 """
 Модуль проверки дублей геометрий и вершин
-Использует native:removeduplicatevertices и qgis:deleteduplicategeometries
 
-ВАЖНО: При работе в background thread необходимо передавать QgsProcessingContext
-созданный в main thread, так как processing.run() обращается к iface.mapCanvas()
+Дубли геометрий - один проход по снимку слоя с группировкой по каноническому
+ключу (duplicate_index: начало и направление колец, порядок дырок и частей не
+влияют). Близкие точки в больших контурах - сеточный хэш (duplicate_index).
+processing не вызывается, слой повторно не читается.
 """
 
 from typing import List, Dict, Any, Tuple, Optional
 from qgis.core import (
-    QgsVectorLayer, QgsGeometry, QgsProcessingContext, QgsProcessingFeedback
+    Qgis, QgsVectorLayer, QgsGeometry, QgsWkbTypes,
+    QgsProcessingContext, QgsProcessingFeedback
 )
-import processing
 from Daman_QGIS.constants import COORDINATE_PRECISION
 from Daman_QGIS.utils import log_info
+from .layer_snapshot import LayerSnapshot
+from .duplicate_index import geometry_key, group_duplicates, close_pairs
 
-class Fsm_0_4_2_DuplicatesChecker:
+class DuplicatesChecker:
     """Проверка дублей геометрий и вершин"""
 
     # Допуск для дублей вершин (последовательных)
@@ -34,7 +37,8 @@ class Fsm_0_4_2_DuplicatesChecker:
         """
         Args:
             processing_context: QgsProcessingContext созданный в main thread
-                               для thread-safe вызовов processing.run()
+                               (сохранён для совместимости: processing.run()
+                               больше не вызывается)
         """
         self.duplicate_geometries_found = 0
         self.duplicate_vertices_found = 0
@@ -42,22 +46,33 @@ class Fsm_0_4_2_DuplicatesChecker:
         self.processing_context = processing_context
         self.feedback = QgsProcessingFeedback()
 
-    def check(self, layer: QgsVectorLayer) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    def check(self, layer: QgsVectorLayer,
+              snapshot: Optional[LayerSnapshot] = None) -> Tuple[List[Dict], List[Dict], List[Dict]]:
         """
         Комплексная проверка дублей
 
+        Args:
+            layer: Проверяемый слой
+            snapshot: Снимок слоя от координатора (None - прочитать слой)
+
         Returns:
             Tuple из (geometry_duplicates, vertex_duplicates, close_points)
         """
-        geom_duplicates = self._check_duplicate_geometries(layer)
-        vertex_duplicates = self._check_duplicate_vertices(layer)
-        close_points = self._check_close_points(layer)
+        if snapshot is None:
+            snapshot = LayerSnapshot(layer)
+
+        geom_duplicates = self._check_duplicate_geometries(snapshot)
+        vertex_duplicates = self._check_duplicate_vertices(snapshot)
+        close_points = self._check_close_points(snapshot)
 
         return geom_duplicates, vertex_duplicates, close_points
 
-    def _check_duplicate_geometries(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
+    def _check_duplicate_geometries(self, snapshot: LayerSnapshot) -> List[Dict[str, Any]]:
         """
-        Проверка дублей полигонов через deleteduplicategeometries
+        Проверка дублей полигонов: группировка по каноническому ключу геометрии
+
+        Один проход по снимку: ключ каждой геометрии -> словарь групп.
+        Первая копия группы (в порядке слоя) - эталон, остальные - дубли.
 
         Returns:
             Список дублей геометрий
@@ -65,62 +80,58 @@ class Fsm_0_4_2_DuplicatesChecker:
         errors = []
 
         try:
-            orig_count = layer.featureCount()
-
-            # Используем context для thread-safe вызова
-            result = processing.run(
-                "qgis:deleteduplicategeometries",
-                {'INPUT': layer, 'OUTPUT': 'memory:'},
-                context=self.processing_context,
-                feedback=self.feedback
-            )
+            keys = [self._geometry_key(snapshot, i) for i in range(len(snapshot))]
 
-            unique_layer = result['OUTPUT']
-            unique_count = unique_layer.featureCount()
-
-            duplicates_count = orig_count - unique_count
-
-            if duplicates_count > 0:
-                log_info(f"Fsm_0_4_2: Найдено {duplicates_count} дублей геометрий")
-                # Находим какие именно объекты дубли через подсчёт вхождений
-                # ВАЖНО: используем WKB для точного сравнения геометрий
-                geom_count = {}  # {wkb: [list of feature_ids]}
-
-                for feature in layer.getFeatures():
-                    geom = feature.geometry()
-                    if geom:
-                        wkb = geom.asWkb()
-                        if wkb not in geom_count:
-                            geom_count[wkb] = []
-                        geom_count[wkb].append(feature.id())
-
-                # Находим геометрии, которые встречаются больше 1 раза
-                for wkb, fids in geom_count.items():
-                    if len(fids) > 1:
-                        # Помечаем ВСЕ копии как дубли (кроме первой для наглядности)
-                        for fid in fids[1:]:  # Пропускаем первую копию
-                            # Получаем геометрию из первой копии
-                            first_feature = next(f for f in layer.getFeatures() if f.id() == fids[0])
-                            geom = first_feature.geometry()
-
-                            errors.append({
-                                'type': 'duplicate_geometry',
-                                'geometry': geom,
-                                'feature_id': fid,
-                                'feature_id2': fids[0],  # ID первой копии
-                                'description': f'Полный дубль полигона (объекты {fid} и {fids[0]})',
-                                'area': geom.area()
-                            })
+            for fids in group_duplicates(keys, snapshot.fids):
+                # Геометрия первой копии (из снимка, без чтения слоя)
+                geom = snapshot.geometry_by_fid(fids[0])
+                # Помечаем ВСЕ копии как дубли (кроме первой для наглядности)
+                for fid in fids[1:]:
+                    errors.append({
+                        'type': 'duplicate_geometry',
+                        'geometry': geom,
+                        'feature_id': fid,
+                        'feature_id2': fids[0],  # ID первой копии
+                        'description': f'Полный дубль полигона (объекты {fid} и {fids[0]})',
+                        'area': geom.area()
+                    })
+
+            if errors:
+                log_info(f"DuplicatesChecker: Найдено {len(errors)} дублей геометрий")
 
             self.duplicate_geometries_found = len(errors)
             return errors
 
         except Exception as e:
-            # При ошибке (например, проблемы с полями) возвращаем пустой список
-            log_info(f"Fsm_0_4_2: Проверка дублей геометрий пропущена: {str(e)}")
+            log_info(f"DuplicatesChecker: Проверка дублей геометрий пропущена: {str(e)}")
             self.duplicate_geometries_found = 0
             return []
-    def _check_duplicate_vertices(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
+
+    @staticmethod
+    def _geometry_key(snapshot: LayerSnapshot, i: int) -> bytes:
+        """
+        Ключ группировки дублей.
+
+        Полигоны и линии 2D - канонический ключ по частям снимка; прочие
+        (точки, Z/M, пустые) - исходный WKB, т.е. точное совпадение.
+        """
+        geom = snapshot.geometry(i)
+        wkb_type = geom.wkbType()
+        parts = snapshot.parts(i)
+        if not parts or QgsWkbTypes.hasZ(wkb_type) or QgsWkbTypes.hasM(wkb_type):
+            return b'W' + snapshot.wkb[i]
+
+        if geom.type() == Qgis.GeometryType.Polygon:
+            coords = [
+                [[(pt.x(), pt.y()) for pt in ring] for ring in polygon]
+                for polygon in parts
+            ]
+            return b'P' + geometry_key(coords, is_polygon=True)
+
+        coords = [[(pt.x(), pt.y()) for pt in line] for line in parts]
+        return b'L' + geometry_key(coords, is_polygon=False)
+
+    def _check_duplicate_vertices(self, snapshot: LayerSnapshot) -> List[Dict[str, Any]]:
         """
         Проверка дублей вершин ВНУТРИ каждой геометрии отдельно.
 
@@ -138,20 +149,19 @@ class Fsm_0_4_2_DuplicatesChecker:
         try:
             from qgis.core import Qgis, QgsPointXY
 
-            for feature in layer.getFeatures():
-                fid = feature.id()
-                geom = feature.geometry()
+            for i, fid in enumerate(snapshot.fids):
+                geom = snapshot.geometry(i)
 
-                if not geom or geom.isEmpty():
+                if geom.isEmpty():
                     continue
 
                 # Получаем тип геометрии
                 geom_type = geom.type()
 
-                # Извлекаем вершины в зависимости от типа геометрии
+                # Вершины в зависимости от типа геометрии (части разобраны в снимке)
                 if geom_type == Qgis.GeometryType.Polygon:
                     # Полигон: проверяем каждое кольцо
-                    polygons = geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()]
+                    polygons = snapshot.parts(i)
                     for poly_idx, polygon in enumerate(polygons):
                         if not polygon:
                             continue
@@ -162,7 +172,7 @@ class Fsm_0_4_2_DuplicatesChecker:
 
                 elif geom_type == Qgis.GeometryType.Line:
                     # Линия: проверяем каждую часть
-                    lines = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+                    lines = snapshot.parts(i)
                     for line_idx, line in enumerate(lines):
                         if not line:
                             continue
@@ -173,14 +183,14 @@ class Fsm_0_4_2_DuplicatesChecker:
             self.duplicate_vertices_found = len(errors)
 
             if self.duplicate_vertices_found > 0:
-                log_info(f"Fsm_0_4_2: Найдено {self.duplicate_vertices_found} дублей вершин")
+                log_info(f"DuplicatesChecker: Найдено {self.duplicate_vertices_found} дублей вершин")
             else:
-                log_info(f"Fsm_0_4_2: Дубли вершин не обнаружены")
+                log_info(f"DuplicatesChecker: Дубли вершин не обнаружены")
 
             return errors
 
         except Exception as e:
-            log_info(f"Fsm_0_4_2: Проверка дублей вершин пропущена: {str(e)}")
+            log_info(f"DuplicatesChecker: Проверка дублей вершин пропущена: {str(e)}")
             self.duplicate_vertices_found = 0
             return []
 
@@ -231,7 +241,7 @@ class Fsm_0_4_2_DuplicatesChecker:
                     'distance': distance
                 })
 
-    def _check_close_points(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
+    def _check_close_points(self, snapshot: LayerSnapshot) -> List[Dict[str, Any]]:
         """
         Проверка близких точек в контурах (СТРОГИЙ режим).
 
@@ -249,17 +259,16 @@ class Fsm_0_4_2_DuplicatesChecker:
         try:
             from qgis.core import Qgis, QgsPointXY, QgsGeometry
 
-            for feature in layer.getFeatures():
-                fid = feature.id()
-                geom = feature.geometry()
+            for i, fid in enumerate(snapshot.fids):
+                geom = snapshot.geometry(i)
 
-                if not geom or geom.isEmpty():
+                if geom.isEmpty():
                     continue
 
                 geom_type = geom.type()
 
                 if geom_type == Qgis.GeometryType.Polygon:
-                    polygons = geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()]
+                    polygons = snapshot.parts(i)
                     for poly_idx, polygon in enumerate(polygons):
                         if not polygon:
                             continue
@@ -269,7 +278,7 @@ class Fsm_0_4_2_DuplicatesChecker:
                             )
 
                 elif geom_type == Qgis.GeometryType.Line:
-                    lines = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+                    lines = snapshot.parts(i)
                     for line_idx, line in enumerate(lines):
                         if not line:
                             continue
@@ -280,19 +289,19 @@ class Fsm_0_4_2_DuplicatesChecker:
             self.close_points_found = len(errors)
 
             if self.close_points_found > 0:
-                log_info(f"Fsm_0_4_2: Найдено {self.close_points_found} пар близких точек (< 1см)")
+                log_info(f"DuplicatesChecker: Найдено {self.close_points_found} пар близких точек (< 1см)")
 
             return errors
 
         except Exception as e:
-            log_info(f"Fsm_0_4_2: Проверка близких точек пропущена: {str(e)}")
+            log_info(f"DuplicatesChecker: Проверка близких точек пропущена: {str(e)}")
             self.close_points_found = 0
             return []
 
-    # Порог для переключения на R-Tree оптимизацию
-    # При n < 100: O(n²) = 10000 операций - быстрее без индекса
-    # При n >= 100: O(n²) = 10000+ операций - индекс окупается
-    RTREE_THRESHOLD = 100
+    # Порог для переключения на сеточный хэш
+    # При n < 100: O(n²) = 10000 операций - быстрее без построения сетки
+    # При n >= 100: сетка (O(n) в среднем) окупается
+    GRID_THRESHOLD = 100
 
     def _find_close_points_in_ring(
         self,
@@ -307,7 +316,9 @@ class Fsm_0_4_2_DuplicatesChecker:
 
         Использует адаптивный алгоритм:
         - Для контуров < 100 вершин: O(n²) brute-force (быстрее без накладных расходов)
-        - Для контуров >= 100 вершин: O(n log n) через QgsSpatialIndex
+        - Для контуров >= 100 вершин: сеточный хэш с ячейкой = допуску (duplicate_index)
+
+        Оба варианта дают одинаковые пары в одинаковом порядке (i, j).
 
         Args:
             vertices: Список вершин (QgsPointXY)
@@ -321,8 +332,8 @@ class Fsm_0_4_2_DuplicatesChecker:
             return
 
         # Адаптивный выбор алгоритма
-        if n >= self.RTREE_THRESHOLD:
-            self._find_close_points_rtree(
+        if n >= self.GRID_THRESHOLD:
+            self._find_close_points_grid(
                 vertices, feature_id, part_idx, ring_idx, errors
             )
         else:
@@ -342,8 +353,6 @@ class Fsm_0_4_2_DuplicatesChecker:
         O(n²) brute-force поиск близких точек.
         Оптимален для небольших контуров (< 100 вершин).
         """
-        from qgis.core import QgsGeometry, QgsPointXY
-
         n = len(vertices)
 
         # Проверяем все пары точек (i, j) где j > i + 1 (не последовательные)
@@ -361,25 +370,11 @@ class Fsm_0_4_2_DuplicatesChecker:
                 distance = (dx * dx + dy * dy) ** 0.5
 
                 if distance <= self.CLOSE_POINTS_TOLERANCE:
-                    errors.append({
-                        'type': 'close_points',
-                        'geometry': QgsGeometry.fromPointXY(QgsPointXY(p1.x(), p1.y())),
-                        'feature_id': feature_id,
-                        'vertex_index': i,
-                        'vertex_index2': j,
-                        'description': (
-                            f'Близкие точки в объекте {feature_id}: '
-                            f'вершины {i} и {j} на расстоянии {distance*1000:.1f} мм '
-                            f'(часть {part_idx}, кольцо {ring_idx})'
-                        ),
-                        'coords': (p1.x(), p1.y()),
-                        'coords2': (p2.x(), p2.y()),
-                        'distance': distance,
-                        'dx': dx,
-                        'dy': dy
-                    })
+                    errors.append(self._close_points_error(
+                        vertices, i, j, distance, feature_id, part_idx, ring_idx
+                    ))
 
-    def _find_close_points_rtree(
+    def _find_close_points_grid(
         self,
         vertices: list,
         feature_id: int,
@@ -388,75 +383,55 @@ class Fsm_0_4_2_DuplicatesChecker:
         errors: list
     ) -> None:
         """
-        O(n log n) поиск близких точек через QgsSpatialIndex.
+        Поиск близких точек через сеточный хэш (без пространственного индекса).
         Оптимален для больших контуров (>= 100 вершин).
         """
-        from qgis.core import QgsGeometry, QgsPointXY, QgsSpatialIndex, QgsFeature, QgsRectangle
-
         n = len(vertices)
-
-        # Строим пространственный индекс
-        # ВАЖНО: QgsFeature должен быть корректно инициализирован
-        # QgsFeature(id) устанавливает id, но feature может быть невалидным
-        # Правильно: создать feature, установить геометрию, затем setId()
-        spatial_index = QgsSpatialIndex()
-        for i, point in enumerate(vertices):
-            feat = QgsFeature()
-            feat.setId(i)
-            feat.setGeometry(QgsGeometry.fromPointXY(point))
-            spatial_index.addFeature(feat)
-
-        # Множество проверенных пар для дедупликации
-        checked_pairs = set()
-
-        # Для каждой вершины ищем соседей в bbox
-        for i, p1 in enumerate(vertices):
-            search_rect = QgsRectangle(
-                p1.x() - self.CLOSE_POINTS_TOLERANCE,
-                p1.y() - self.CLOSE_POINTS_TOLERANCE,
-                p1.x() + self.CLOSE_POINTS_TOLERANCE,
-                p1.y() + self.CLOSE_POINTS_TOLERANCE
-            )
-
-            candidate_ids = spatial_index.intersects(search_rect)
-
-            for j in candidate_ids:
-                # Пропускаем саму себя и последовательные вершины
-                if j <= i + 1:
-                    continue
-                # Пропускаем пару (первая, последняя) для замкнутых колец
-                if i == 0 and j == n - 1:
-                    continue
-
-                # Дедупликация
-                pair_key = (min(i, j), max(i, j))
-                if pair_key in checked_pairs:
-                    continue
-                checked_pairs.add(pair_key)
-
-                p2 = vertices[j]
-                dx = abs(p2.x() - p1.x())
-                dy = abs(p2.y() - p1.y())
-                distance = (dx * dx + dy * dy) ** 0.5
-
-                if distance <= self.CLOSE_POINTS_TOLERANCE:
-                    errors.append({
-                        'type': 'close_points',
-                        'geometry': QgsGeometry.fromPointXY(QgsPointXY(p1.x(), p1.y())),
-                        'feature_id': feature_id,
-                        'vertex_index': i,
-                        'vertex_index2': j,
-                        'description': (
-                            f'Близкие точки в объекте {feature_id}: '
-                            f'вершины {i} и {j} на расстоянии {distance*1000:.1f} мм '
-                            f'(часть {part_idx}, кольцо {ring_idx})'
-                        ),
-                        'coords': (p1.x(), p1.y()),
-                        'coords2': (p2.x(), p2.y()),
-                        'distance': distance,
-                        'dx': dx,
-                        'dy': dy
-                    })
+        points = [(pt.x(), pt.y()) for pt in vertices]
+
+        for i, j, distance in close_pairs(points, self.CLOSE_POINTS_TOLERANCE):
+            # Пропускаем последовательные вершины
+            if j <= i + 1:
+                continue
+            # Пропускаем пару (первая, последняя) для замкнутых колец
+            if i == 0 and j == n - 1:
+                continue
+            errors.append(self._close_points_error(
+                vertices, i, j, distance, feature_id, part_idx, ring_idx
+            ))
+
+    @staticmethod
+    def _close_points_error(
+        vertices: list,
+        i: int,
+        j: int,
+        distance: float,
+        feature_id: int,
+        part_idx: int,
+        ring_idx: int
+    ) -> Dict[str, Any]:
+        """Ошибка 'close_points' для пары вершин (i, j) контура"""
+        from qgis.core import QgsPointXY
+
+        p1 = vertices[i]
+        p2 = vertices[j]
+        return {
+            'type': 'close_points',
+            'geometry': QgsGeometry.fromPointXY(QgsPointXY(p1.x(), p1.y())),
+            'feature_id': feature_id,
+            'vertex_index': i,
+            'vertex_index2': j,
+            'description': (
+                f'Близкие точки в объекте {feature_id}: '
+                f'вершины {i} и {j} на расстоянии {distance*1000:.1f} мм '
+                f'(часть {part_idx}, кольцо {ring_idx})'
+            ),
+            'coords': (p1.x(), p1.y()),
+            'coords2': (p2.x(), p2.y()),
+            'distance': distance,
+            'dx': abs(p2.x() - p1.x()),
+            'dy': abs(p2.y() - p1.y())
+        }
 
     def get_errors_count(self) -> Tuple[int, int, int]:
         """Возвращает (geometry_duplicates, vertex_duplicates, close_points)"""
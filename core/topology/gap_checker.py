@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """
-Fsm_0_4_14: Анализ покрытия — per-layer детектор проблем coverage
+Анализ покрытия — per-layer детектор проблем coverage (GapChecker)
 
 ДВА КОМПЛЕМЕНТАРНЫХ МЕТОДА (per-layer):
 
@@ -35,14 +35,15 @@ from typing import List, Dict, Any, Tuple, Optional
 
 from qgis.core import (
     Qgis, QgsVectorLayer, QgsGeometry, QgsPointXY,
-    QgsWkbTypes, QgsRectangle, QgsSpatialIndex, QgsFeature
+    QgsWkbTypes, QgsRectangle
 )
 
 from Daman_QGIS.utils import log_info, log_warning, log_error
 from Daman_QGIS.constants import COORDINATE_PRECISION
+from .layer_snapshot import LayerSnapshot
 
 
-class Fsm_0_4_14_GapChecker:
+class GapChecker:
     """
     Анализ покрытия территории - обнаружение зазоров между полигонами.
 
@@ -62,7 +63,7 @@ class Fsm_0_4_14_GapChecker:
     ENVELOPE_BUFFER_RATIO = 0.2
 
     # Порог spike-угла для границы union (градусы)
-    # 1° соответствует Fsm_0_4_3 — не ловим легитимные треугольные участки
+    # 1° соответствует TopologyErrorsChecker — не ловим легитимные треугольные участки
     DEFAULT_SPIKE_THRESHOLD = 1.0
 
     # Максимальная ширина зазора для GEOS CoverageValidator (м)
@@ -92,64 +93,68 @@ class Fsm_0_4_14_GapChecker:
         self.coverage_invalid_edges_found = 0
         self.spikes_found = 0
 
-    def check(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
+    def check(self, layer: Optional[QgsVectorLayer],
+              snapshot: Optional[LayerSnapshot] = None) -> List[Dict[str, Any]]:
         """
         Анализ покрытия слоя: invalid edges + spike-узлы на union boundary.
 
         Args:
-            layer: Полигональный слой для проверки
+            layer: Полигональный слой для проверки (None - только снимок, процесс пула)
+            snapshot: Снимок слоя от координатора (None - прочитать слой)
 
         Returns:
             Список ошибок (type='coverage_invalid_edge' и type='gap_spike')
         """
         errors: List[Dict[str, Any]] = []
 
+        # Имя, тип и число объектов - из снимка (слой может быть не передан)
+        if snapshot is None:
+            snapshot = LayerSnapshot(layer)
+        layer_name = snapshot.layer_name
+
         # 1. Проверка типа геометрии
-        if layer.geometryType() != Qgis.GeometryType.Polygon:
+        if snapshot.geometry_type != Qgis.GeometryType.Polygon:
             log_info(
-                f"Fsm_0_4_14: Слой '{layer.name()}' не полигональный, пропуск"
+                f"GapChecker: Слой '{layer_name}' не полигональный, пропуск"
             )
             return errors
 
-        feature_count = layer.featureCount()
+        feature_count = snapshot.feature_count
         if feature_count < 2:
             log_info(
-                f"Fsm_0_4_14: Слой '{layer.name()}' содержит < 2 объектов, "
+                f"GapChecker: Слой '{layer_name}' содержит < 2 объектов, "
                 "анализ покрытия невозможен"
             )
             return errors
 
         log_info(
-            f"Fsm_0_4_14: Анализ покрытия для '{layer.name()}' "
+            f"GapChecker: Анализ покрытия для '{layer_name}' "
             f"({feature_count} объектов)"
         )
         log_info(
-            f"Fsm_0_4_14: Параметры: gap_width={self.gap_width}м, "
+            f"GapChecker: Параметры: gap_width={self.gap_width}м, "
             f"spike_threshold={self.spike_angle_threshold}°"
         )
 
-        # Spatial index features для маппинга edges/gaps/spikes к feature_id.
-        feature_index, feature_map = self._build_feature_index(layer)
-
+        # Геометрии, makeValid и spatial index для маппинга spikes к
+        # feature_id - из общего снимка (слой не перечитывается).
         # МЕТОД 1 (PRIMARY): GEOS CoverageValidator
         # Находит junction problems и sliver gaps через invalid edges на границах.
-        coverage_errors, invalid_edges_union = self._check_coverage_validator(
-            layer, feature_map
-        )
+        coverage_errors, invalid_edges_union = self._check_coverage_validator(snapshot)
         errors.extend(coverage_errors)
         self.coverage_invalid_edges_found = len(coverage_errors)
 
         # 2. Построение union для МЕТОДА 3 (spike-анализ одного слоя).
         # envelope больше не используется для метода 2 (вынесен в класс C),
         # но _build_union_and_envelope СОХРАНЁН — union нужен для spike.
-        union_geom, _envelope_geom = self._build_union_and_envelope(layer)
+        union_geom, _envelope_geom = self._build_union_and_envelope(snapshot)
         if union_geom is None:
             self._log_summary()
             return errors
 
         if union_geom.type() != Qgis.GeometryType.Polygon:
             log_warning(
-                f"Fsm_0_4_14: Union вернул не-полигональную геометрию "
+                f"GapChecker: Union вернул не-полигональную геометрию "
                 f"({union_geom.wkbType()}), spike-анализ невозможен"
             )
             self._log_summary()
@@ -158,7 +163,7 @@ class Fsm_0_4_14_GapChecker:
         # МЕТОД 3: spike-углы на union boundary
         # (дедуп: фильтруем точки лежащие на invalid edges)
         spike_errors = self._check_union_spikes(
-            union_geom, feature_index, feature_map,
+            union_geom, snapshot,
             invalid_edges_union=invalid_edges_union
         )
         errors.extend(spike_errors)
@@ -171,25 +176,25 @@ class Fsm_0_4_14_GapChecker:
         """Логирование итоговой статистики по 2 методам (per-layer)."""
         if self.coverage_invalid_edges_found > 0:
             log_warning(
-                f"Fsm_0_4_14: Coverage invalid edges: "
+                f"GapChecker: Coverage invalid edges: "
                 f"{self.coverage_invalid_edges_found}"
             )
         if self.spikes_found > 0:
             log_warning(
-                f"Fsm_0_4_14: Spike-узлы (вне junction): {self.spikes_found}"
+                f"GapChecker: Spike-узлы (вне junction): {self.spikes_found}"
             )
         if (self.coverage_invalid_edges_found == 0 and
                 self.spikes_found == 0):
-            log_info("Fsm_0_4_14: Проблем покрытия не обнаружено")
+            log_info("GapChecker: Проблем покрытия не обнаружено")
 
     def _build_union_and_envelope(
-        self, layer: QgsVectorLayer
+        self, snapshot: LayerSnapshot
     ) -> Tuple[Optional[QgsGeometry], Optional[QgsGeometry]]:
         """
         Объединение всех геометрий слоя и построение envelope.
 
         Args:
-            layer: Полигональный слой
+            snapshot: Снимок полигонального слоя
 
         Returns:
             (union_geom, envelope_geom) или (None, None) при ошибке
@@ -197,35 +202,33 @@ class Fsm_0_4_14_GapChecker:
         geometries = []
         invalid_count = 0
 
-        for feature in layer.getFeatures():
-            geom = feature.geometry()
-            if not geom or geom.isEmpty():
+        for i in range(len(snapshot)):
+            if snapshot.geometry(i).isEmpty():
                 continue
 
-            # Валидация геометрии перед union
-            if not geom.isGeosValid():
-                geom = geom.makeValid()
-                if not geom or geom.isEmpty():
-                    invalid_count += 1
-                    continue
+            # Валидация геометрии перед union (makeValid кэшируется в снимке)
+            geom = snapshot.valid_geometry(i)
+            if geom.isEmpty():
+                invalid_count += 1
+                continue
 
             geometries.append(geom)
 
         if invalid_count > 0:
             log_warning(
-                f"Fsm_0_4_14: Пропущено {invalid_count} "
+                f"GapChecker: Пропущено {invalid_count} "
                 "невалидных геометрий"
             )
 
         if len(geometries) < 2:
             log_info(
-                "Fsm_0_4_14: Недостаточно валидных геометрий "
+                "GapChecker: Недостаточно валидных геометрий "
                 "для анализа покрытия"
             )
             return None, None
 
         log_info(
-            f"Fsm_0_4_14: Объединение {len(geometries)} геометрий..."
+            f"GapChecker: Объединение {len(geometries)} геометрий..."
         )
 
         # Объединение всех геометрий
@@ -233,7 +236,7 @@ class Fsm_0_4_14_GapChecker:
 
         if union_geom is None or union_geom.isEmpty():
             log_warning(
-                "Fsm_0_4_14: unaryUnion вернул пустой результат"
+                "GapChecker: unaryUnion вернул пустой результат"
             )
             return None, None
 
@@ -242,7 +245,7 @@ class Fsm_0_4_14_GapChecker:
             union_geom = union_geom.makeValid()
 
         log_info(
-            f"Fsm_0_4_14: Union успешен, "
+            f"GapChecker: Union успешен, "
             f"площадь: {union_geom.area():.2f} м2"
         )
 
@@ -255,7 +258,7 @@ class Fsm_0_4_14_GapChecker:
         envelope_geom = QgsGeometry.fromRect(buffered_rect)
 
         log_info(
-            f"Fsm_0_4_14: Envelope построен "
+            f"GapChecker: Envelope построен "
             f"(буфер {buffer_dist:.2f} м)"
         )
 
@@ -263,8 +266,7 @@ class Fsm_0_4_14_GapChecker:
 
     def _check_coverage_validator(
         self,
-        layer: QgsVectorLayer,
-        feature_map: Dict[int, QgsFeature]
+        snapshot: LayerSnapshot
     ) -> Tuple[List[Dict[str, Any]], Optional[QgsGeometry]]:
         """МЕТОД 1: GEOS CoverageValidator.
 
@@ -307,15 +309,13 @@ class Fsm_0_4_14_GapChecker:
         # Собираем features в нужном порядке для маппинга result[i] → fid
         fids_ordered: List[int] = []
         geometries: List[QgsGeometry] = []
-        for feat in layer.getFeatures():
-            geom = feat.geometry()
-            if not geom or geom.isEmpty():
+        for i, fid in enumerate(snapshot.fids):
+            if snapshot.geometry(i).isEmpty():
                 continue
-            if not geom.isGeosValid():
-                geom = geom.makeValid()
-                if geom.isEmpty():
-                    continue
-            fids_ordered.append(feat.id())
+            geom = snapshot.valid_geometry(i)
+            if geom.isEmpty():
+                continue
+            fids_ordered.append(fid)
             geometries.append(geom)
 
         if len(geometries) < 2:
@@ -329,16 +329,16 @@ class Fsm_0_4_14_GapChecker:
             result_enum, invalid_edges = collection.validateCoverage(self.gap_width)
         except Exception as e:
             log_warning(
-                f"Fsm_0_4_14: CoverageValidator недоступен (нужен GEOS >= 3.12): {e}"
+                f"GapChecker: CoverageValidator недоступен (нужен GEOS >= 3.12): {e}"
             )
             return errors, None
 
         if result_enum == Qgis.CoverageValidityResult.Valid:
-            log_info("Fsm_0_4_14: CoverageValidator: покрытие валидно")
+            log_info("GapChecker: CoverageValidator: покрытие валидно")
             return errors, None
 
         if invalid_edges is None or invalid_edges.isEmpty():
-            log_info("Fsm_0_4_14: CoverageValidator: invalid но edges пусты")
+            log_info("GapChecker: CoverageValidator: invalid но edges пусты")
             return errors, None
 
         # invalid_edges — GeometryCollection того же размера что input
@@ -374,39 +374,23 @@ class Fsm_0_4_14_GapChecker:
 
         if errors:
             log_info(
-                f"Fsm_0_4_14: CoverageValidator нашёл {len(errors)} "
+                f"GapChecker: CoverageValidator нашёл {len(errors)} "
                 f"полигонов с invalid edges"
             )
 
         return errors, invalid_edges_union
 
-    @staticmethod
-    def _build_feature_index(
-        layer: QgsVectorLayer
-    ) -> Tuple[QgsSpatialIndex, Dict[int, QgsFeature]]:
-        """Spatial index features слоя для маппинга union→feature_id.
-
-        Используется в _check_union_spikes чтобы привязать spike-ошибку к
-        конкретному feature, а не оставлять feature_id=-1.
-        """
-        index = QgsSpatialIndex()
-        feature_map: Dict[int, QgsFeature] = {}
-        for feat in layer.getFeatures():
-            if feat.hasGeometry() and not feat.geometry().isEmpty():
-                index.addFeature(feat)
-                feature_map[feat.id()] = feat
-        return index, feature_map
-
     @staticmethod
     def _find_feature_at_point(
         point: QgsPointXY,
-        index: QgsSpatialIndex,
-        feature_map: Dict[int, QgsFeature],
+        snapshot: LayerSnapshot,
         tolerance: float = COORDINATE_PRECISION
     ) -> int:
         """Найти fid feature к границе/нутру которого относится точка.
 
-        Поиск через bbox tolerance + точное вычисление distance к геометрии.
+        Поиск через spatial index снимка (bbox tolerance) + точное вычисление
+        distance к геометрии. Кандидаты перебираются по возрастанию fid -
+        при равном расстоянии результат не зависит от устройства индекса.
         Возвращает -1 только если ни один feature не найден (теоретически
         не должно происходить для vertex'ов union'а).
         """
@@ -414,15 +398,15 @@ class Fsm_0_4_14_GapChecker:
             point.x() - tolerance, point.y() - tolerance,
             point.x() + tolerance, point.y() + tolerance
         )
-        candidate_ids = index.intersects(search_rect)
+        candidate_ids = sorted(snapshot.spatial_index().intersects(search_rect))
         point_geom = QgsGeometry.fromPointXY(point)
         best_fid = -1
         best_distance = float('inf')
         for fid in candidate_ids:
-            feat = feature_map.get(fid)
-            if not feat:
+            geom = snapshot.geometry_by_fid(fid)
+            if geom is None:
                 continue
-            d = feat.geometry().distance(point_geom)
+            d = geom.distance(point_geom)
             if d < best_distance:
                 best_distance = d
                 best_fid = fid
@@ -431,8 +415,7 @@ class Fsm_0_4_14_GapChecker:
     def _check_union_spikes(
         self,
         union_geom: QgsGeometry,
-        feature_index: QgsSpatialIndex,
-        feature_map: Dict[int, QgsFeature],
+        snapshot: LayerSnapshot,
         invalid_edges_union: Optional[QgsGeometry] = None
     ) -> List[Dict[str, Any]]:
         """
@@ -443,6 +426,7 @@ class Fsm_0_4_14_GapChecker:
 
         Args:
             union_geom: Объединенная геометрия слоя
+            snapshot: Снимок слоя (привязка spike к feature_id)
 
         Returns:
             Список ошибок type='gap_spike'
@@ -501,9 +485,7 @@ class Fsm_0_4_14_GapChecker:
                             continue
 
                         # Привязка к конкретному feature
-                        spike_fid = self._find_feature_at_point(
-                            p2, feature_index, feature_map
-                        )
+                        spike_fid = self._find_feature_at_point(p2, snapshot)
                         errors.append({
                             'type': 'gap_spike',
                             'geometry': spike_point,
@@ -522,7 +504,7 @@ class Fsm_0_4_14_GapChecker:
                         })
 
         log_info(
-            f"Fsm_0_4_14: Проверено {total_rings} колец, "
+            f"GapChecker: Проверено {total_rings} колец, "
             f"{total_vertices} вершин на union boundary"
         )
 
@@ -535,7 +517,7 @@ class Fsm_0_4_14_GapChecker:
         """
         Вычисление острого угла в вершине p2.
 
-        Паттерн из Fsm_0_4_3_TopologyErrorsChecker._calculate_angle().
+        Паттерн из TopologyErrorsChecker._calculate_angle().
 
         Args:
             p1, p2, p3: Три последовательные точки контура
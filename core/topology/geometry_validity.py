@@ -4,14 +4,14 @@
 Использует qgis:checkvalidity и QgsGeometry.validateGeometry()
 """
 
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from qgis.core import (
     QgsVectorLayer, QgsGeometry, QgsPointXY
 )
-import processing
-from Daman_QGIS.utils import log_info, log_warning
+from Daman_QGIS.utils import log_info, log_warning, log_debug
+from .layer_snapshot import LayerSnapshot
 
-class Fsm_0_4_1_GeometryValidityChecker:
+class GeometryValidityChecker:
     """Проверка валидности геометрии и самопересечений"""
 
     def __init__(self):
@@ -37,20 +37,43 @@ class Fsm_0_4_1_GeometryValidityChecker:
                 return value if value is not None else default
             return default
         except Exception as e:
-            log_info(f"Fsm_0_4_1: Не удалось получить поле {field_name}: {e}")
+            log_info(f"GeometryValidityChecker: Не удалось получить поле {field_name}: {e}")
             return default
 
-    def check(self, layer: QgsVectorLayer) -> Tuple[List[Dict], List[Dict]]:
+    def check(self, layer: Optional[QgsVectorLayer],
+              snapshot: Optional[LayerSnapshot] = None) -> Tuple[List[Dict], List[Dict]]:
         """
         Комплексная проверка валидности
 
+        Args:
+            layer: Проверяемый слой (для qgis:checkvalidity). None - только
+                   самопересечения по снимку (процесс пула, Fsm_0_4_21)
+            snapshot: Снимок слоя от координатора (None - прочитать слой)
+
         Returns:
             Tuple из (validity_errors, self_intersection_errors)
         """
-        validity_errors = self._check_validity(layer)
-        self_int_errors = self._check_self_intersections(layer)
+        if snapshot is None:
+            snapshot = LayerSnapshot(layer)
+
+        validity_errors = self.check_validity(layer, snapshot) if layer is not None else []
+        self_int_errors = self._check_self_intersections(snapshot)
 
         return validity_errors, self_int_errors
+
+    def check_validity(self, layer: QgsVectorLayer,
+                       snapshot: Optional[LayerSnapshot] = None) -> List[Dict[str, Any]]:
+        """
+        Только qgis:checkvalidity (читает слой сам - учитывается в снимке)
+
+        Returns:
+            Список ошибок валидности
+        """
+        validity_errors = self._check_validity(layer)
+        if snapshot is not None:
+            snapshot.count_read('qgis:checkvalidity')
+        return validity_errors
+
     def _check_validity(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
         """
         Проверка валидности через qgis:checkvalidity
@@ -58,6 +81,10 @@ class Fsm_0_4_1_GeometryValidityChecker:
         Returns:
             Список ошибок валидности
         """
+        # processing - только здесь: процессы пула Fsm_0_4_21 проверяют
+        # снимок без qgis:checkvalidity и не загружают плагин Processing
+        import processing
+
         errors = []
 
         result = processing.run("qgis:checkvalidity", {
@@ -74,7 +101,7 @@ class Fsm_0_4_1_GeometryValidityChecker:
         error_count = result['ERROR_COUNT']
 
         if error_count > 0:
-            log_info(f"Fsm_0_4_1: checkvalidity нашел {error_count} ошибок валидности")
+            log_info(f"GeometryValidityChecker: checkvalidity нашел {error_count} ошибок валидности")
 
         # Парсим error layer (точки с описанием ошибок)
         # ВАЖНО: ERROR_OUTPUT содержит только поле 'message', без FID.
@@ -88,7 +115,7 @@ class Fsm_0_4_1_GeometryValidityChecker:
             message = self._safe_get_field(error_feat, 'message', 'Неизвестная ошибка валидности')
             translated_message = self._translate_validity_message(message)
 
-            log_info(f"Fsm_0_4_1: Ошибка валидности: {message}")
+            log_debug("GeometryValidityChecker: Ошибка валидности: %s", message)
 
             errors.append({
                 'type': 'validity',
@@ -104,7 +131,7 @@ class Fsm_0_4_1_GeometryValidityChecker:
         error_layer_count = len(errors)
         if error_layer_count < error_count:
             log_info(
-                f"Fsm_0_4_1: error_layer={error_layer_count}, "
+                f"GeometryValidityChecker: error_layer={error_layer_count}, "
                 f"error_count={error_count}, проверяем invalid_layer"
             )
             for invalid_feat in invalid_layer.getFeatures():
@@ -141,7 +168,7 @@ class Fsm_0_4_1_GeometryValidityChecker:
         self.validity_errors_found = len(errors)
         return errors
 
-    def _check_self_intersections(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
+    def _check_self_intersections(self, snapshot: LayerSnapshot) -> List[Dict[str, Any]]:
         """
         Проверка самопересечений через QgsGeometry.validateGeometry()
 
@@ -150,9 +177,8 @@ class Fsm_0_4_1_GeometryValidityChecker:
         """
         errors = []
 
-        for feature in layer.getFeatures():
-            geom = feature.geometry()
-            if not geom or geom.isEmpty():
+        for fid, geom in snapshot.items():
+            if geom.isEmpty():
                 continue
 
             # Используем validateGeometry для поиска самопересечений
@@ -181,7 +207,7 @@ class Fsm_0_4_1_GeometryValidityChecker:
                     errors.append({
                         'type': 'self_intersection',
                         'geometry': error_geom,
-                        'feature_id': feature.id(),
+                        'feature_id': fid,
                         'description': f'Самопересечение: {translated_error}',
                         'error_detail': val_error.what()
                     })
@@ -189,7 +215,7 @@ class Fsm_0_4_1_GeometryValidityChecker:
         self.self_intersection_errors_found = len(errors)
 
         if self.self_intersection_errors_found > 0:
-            log_info(f"Fsm_0_4_1: Найдено {self.self_intersection_errors_found} самопересечений")
+            log_info(f"GeometryValidityChecker: Найдено {self.self_intersection_errors_found} самопересечений")
 
         return errors
 
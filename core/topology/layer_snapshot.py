@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Снимок слоя для проверок топологии (F_0_4)
+
+Координатор (Fsm_0_4_5) запускает на полигональном слое до шести checker'ов;
+раньше каждый заново читал layer.getFeatures(), пересобирал геометрии,
+свой QgsSpatialIndex по объектам (TopologyErrorsChecker, GapChecker) и
+индекс вершин (CrossFeatureChecker). Снимок читает слой ОДИН раз за запуск
+и отдаёт checker'ам общие данные только для чтения:
+
+- fids / WKB / bbox объектов с геометрией (в порядке layer.getFeatures())
+- геометрии (QgsGeometry - implicit sharing, копия не создаётся)
+- части геометрий (asMultiPolygon / asMultiPolyline) - лениво, один раз
+- валидная геометрия (makeValid только для невалидных) - лениво, один раз
+- пространственный индекс объектов по bbox - лениво
+- плоский массив вершин (x, y, fid, часть, кольцо, индекс) - лениво
+
+Checker'ы НЕ изменяют геометрии снимка: makeValid / intersection
+возвращают новые объекты. Чтения источника считаются в reads
+(getFeatures снимка + processing-алгоритмы, которые сами читают слой).
+
+Снимок отделён от слоя и сериализуется (pickle) без объектов QGIS:
+fids, WKB и bbox как кортежи - для проверки в процессах пула (Fsm_0_4_21).
+Геометрии и ленивые структуры восстанавливаются из WKB на месте.
+"""
+
+import time
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from qgis.core import (
+    Qgis, QgsVectorLayer, QgsGeometry, QgsPointXY,
+    QgsFeatureRequest, QgsRectangle, QgsSpatialIndex
+)
+
+
+class VertexArray:
+    """Плоский массив вершин снимка (порядок: объект -> часть -> кольцо -> вершина)"""
+
+    def __init__(self) -> None:
+        self.xs = array('d')
+        self.ys = array('d')
+        self.fids = array('q')
+        self.part_idx = array('i')
+        self.ring_idx = array('i')
+        self.vertex_idx = array('i')
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def append(self, x: float, y: float, fid: int, part: int, ring: int, index: int) -> None:
+        self.xs.append(x)
+        self.ys.append(y)
+        self.fids.append(fid)
+        self.part_idx.append(part)
+        self.ring_idx.append(ring)
+        self.vertex_idx.append(index)
+
+    def point(self, k: int) -> QgsPointXY:
+        """Вершина k как QgsPointXY"""
+        return QgsPointXY(self.xs[k], self.ys[k])
+
+
+class LayerSnapshot:
+    """Однократное чтение слоя для всех checker'ов одного запуска"""
+
+    def __init__(self, layer: QgsVectorLayer):
+        """
+        Чтение слоя (без атрибутов - checker'ам нужны только геометрии)
+
+        Args:
+            layer: Проверяемый слой
+        """
+        start = time.perf_counter()
+
+        self.layer_name = layer.name()
+        self.geometry_type = layer.geometryType()
+        self.feature_count = layer.featureCount()
+
+        self.fids: List[int] = []
+        self.wkb: List[bytes] = []
+        self.bboxes: List[QgsRectangle] = []
+        self._geometries: List[Optional[QgsGeometry]] = []
+        self._positions: Dict[int, int] = {}
+
+        self._parts: Optional[List[Optional[list]]] = None
+        self._valid: Optional[List[Optional[QgsGeometry]]] = None
+        self._index: Optional[QgsSpatialIndex] = None
+        self._vertices: Optional[VertexArray] = None
+
+        self.reads: Dict[str, int] = {}
+
+        request = QgsFeatureRequest().setNoAttributes()
+        for feature in layer.getFeatures(request):
+            if not feature.hasGeometry():
+                continue
+            geom = feature.geometry()
+            self._positions[feature.id()] = len(self.fids)
+            self.fids.append(feature.id())
+            self.wkb.append(bytes(geom.asWkb()))
+            self.bboxes.append(geom.boundingBox())
+            self._geometries.append(geom)
+        self.count_read('getFeatures')
+
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    # ------------------------------------------------------------------
+    # Сериализация (процессы пула)
+    # ------------------------------------------------------------------
+
+    def __getstate__(self) -> dict:
+        return {
+            'layer_name': self.layer_name,
+            # enum sip / Python enum (Qt6) - в int для любой сборки QGIS
+            'geometry_type': int(getattr(self.geometry_type, 'value', self.geometry_type)),
+            'feature_count': self.feature_count,
+            'fids': self.fids,
+            'wkb': self.wkb,
+            'bboxes': [
+                (r.xMinimum(), r.yMinimum(), r.xMaximum(), r.yMaximum()) for r in self.bboxes
+            ],
+            'reads': self.reads,
+            'build_ms': self.build_ms,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.layer_name = state['layer_name']
+        self.geometry_type = Qgis.GeometryType(state['geometry_type'])
+        self.feature_count = state['feature_count']
+        self.fids = state['fids']
+        self.wkb = state['wkb']
+        self.bboxes = [QgsRectangle(*bbox) for bbox in state['bboxes']]
+        self.reads = state['reads']
+        self.build_ms = state['build_ms']
+        # Геометрии - лениво из WKB (geometry())
+        self._geometries = [None] * len(self.fids)
+        self._positions = {fid: i for i, fid in enumerate(self.fids)}
+        self._parts = None
+        self._valid = None
+        self._index = None
+        self._vertices = None
+
+    # ------------------------------------------------------------------
+    # Объекты
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.fids)
+
+    def count_read(self, source: str) -> None:
+        """Учесть полное чтение слоя (getFeatures / processing-алгоритм)"""
+        self.reads[source] = self.reads.get(source, 0) + 1
+
+    @property
+    def read_count(self) -> int:
+        """Всего полных чтений слоя за запуск"""
+        return sum(self.reads.values())
+
+    def geometry(self, i: int) -> QgsGeometry:
+        """Геометрия объекта по позиции в снимке"""
+        geom = self._geometries[i]
+        if geom is None:
+            geom = QgsGeometry()
+            geom.fromWkb(self.wkb[i])
+            self._geometries[i] = geom
+        return geom
+
+    def geometry_by_fid(self, fid: int) -> Optional[QgsGeometry]:
+        """Геометрия объекта по fid (None если объекта нет в снимке)"""
+        i = self._positions.get(fid)
+        return self.geometry(i) if i is not None else None
+
+    def items(self) -> Iterator[Tuple[int, QgsGeometry]]:
+        """(fid, геометрия) в порядке layer.getFeatures()"""
+        for i, fid in enumerate(self.fids):
+            yield fid, self.geometry(i)
+
+    def parts(self, i: int) -> list:
+        """
+        Части геометрии: полигон -> [[кольцо, ...], ...], линия -> [[вершины], ...]
+
+        Тот же разбор, что asMultiPolygon() / [asPolygon()] в checker'ах.
+        """
+        if self._parts is None:
+            self._parts = [None] * len(self.fids)
+        parts = self._parts[i]
+        if parts is None:
+            geom = self.geometry(i)
+            if geom.isEmpty():
+                parts = []
+            elif geom.type() == Qgis.GeometryType.Polygon:
+                parts = geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()]
+            elif geom.type() == Qgis.GeometryType.Line:
+                parts = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+            else:
+                parts = []
+            self._parts[i] = parts
+        return parts
+
+    def valid_geometry(self, i: int) -> QgsGeometry:
+        """Геометрия после makeValid (исходная, если она GEOS-валидна)"""
+        if self._valid is None:
+            self._valid = [None] * len(self.fids)
+        geom = self._valid[i]
+        if geom is None:
+            geom = self.geometry(i)
+            if not geom.isEmpty() and not geom.isGeosValid():
+                geom = geom.makeValid()
+            self._valid[i] = geom
+        return geom
+
+    # ------------------------------------------------------------------
+    # Индексы
+    # ------------------------------------------------------------------
+
+    def spatial_index(self) -> QgsSpatialIndex:
+        """Индекс объектов с непустой геометрией по bbox (id = fid)"""
+        if self._index is None:
+            index = QgsSpatialIndex()
+            for i, fid in enumerate(self.fids):
+                if not self.geometry(i).isEmpty():
+                    index.addFeature(fid, self.bboxes[i])
+            self._index = index
+        return self._index
+
+    def vertices(self) -> VertexArray:
+        """Все вершины полигонов / линий снимка одним массивом"""
+        if self._vertices is None:
+            vertices = VertexArray()
+            is_polygon = self.geometry_type == Qgis.GeometryType.Polygon
+            for i, fid in enumerate(self.fids):
+                for part_idx, part in enumerate(self.parts(i)):
+                    if not part:
+                        continue
+                    rings = part if is_polygon else [part]
+                    for ring_idx, ring in enumerate(rings):
+                        for v_idx, point in enumerate(ring):
+                            vertices.append(point.x(), point.y(), fid, part_idx, ring_idx, v_idx)
+            self._vertices = vertices
+        return self._vertices
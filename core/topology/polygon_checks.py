@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Checker'ы полигонального слоя и порядок их запуска (F_0_4)
+
+PolygonCheckSuite - общая часть координатора Fsm_0_4_5 (наследует suite)
+и процесса пула Fsm_0_4_21 (check_snapshot_worker): в процессе создаются
+только checker'ы полигонов, без слоёв ошибок, стилей и processing.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from qgis.core import QgsVectorLayer, QgsProcessingContext
+
+from Daman_QGIS.utils import log_info, log_error
+from .layer_snapshot import LayerSnapshot
+from .geometry_validity import GeometryValidityChecker
+from .duplicates import DuplicatesChecker
+from .topology_errors import TopologyErrorsChecker
+from .precision import PrecisionChecker
+from .cross_feature_checker import CrossFeatureChecker
+from .gap_checker import GapChecker
+
+
+class PolygonCheckSuite:
+    """Checker'ы полигонов core.topology и их запуск по снимку"""
+
+    def __init__(self, processing_context: Optional[QgsProcessingContext] = None):
+        """
+        Args:
+            processing_context: QgsProcessingContext для checker'ов
+                (см. Fsm_0_4_5_TopologyCoordinator)
+        """
+        self.validity_checker = GeometryValidityChecker()
+        self.duplicates_checker = DuplicatesChecker(processing_context)
+        self.topology_checker = TopologyErrorsChecker()
+        self.precision_checker = PrecisionChecker(processing_context)
+        self.cross_feature_checker = CrossFeatureChecker()
+
+        # Gap checker — встроен в pipeline, выполняется всегда
+        self.gap_checker = GapChecker()
+
+    def run_polygon_checks(self,
+                           layer: Optional[QgsVectorLayer],
+                           snapshot: Optional[LayerSnapshot],
+                           check_types: List[str],
+                           progress_callback=None,
+                           point_index: Optional[Dict] = None):
+        """
+        Checker'ы полигонального слоя без создания слоя ошибок
+
+        Args:
+            layer: Слой. None - проверка только по снимку (процесс пула
+                   Fsm_0_4_21): qgis:checkvalidity не выполняется
+            snapshot: Снимок слоя (обязателен при layer=None)
+            check_types: Типы проверок
+            progress_callback: Функция прогресса (0-100)
+            point_index: Индекс ID точек для cross-feature (при layer=None)
+
+        Returns:
+            (errors_by_type, timings): ошибки по типам в порядке проверок,
+            время каждого checker'а в мс
+        """
+        errors_by_type = {}
+        # Время каждого checker'а, мс (ключ - этап проверки)
+        timings: Dict[str, float] = {}
+
+        # 1. Проверка валидности и самопересечений
+        if 'validity' in check_types or 'self_intersection' in check_types:
+            log_info("PolygonCheckSuite: Проверка валидности геометрии...")
+
+            started = time.perf_counter()
+            try:
+                validity_errors, self_int_errors = self.validity_checker.check(layer, snapshot)
+
+                if 'validity' in check_types and layer is not None:
+                    errors_by_type['validity'] = validity_errors
+
+                if 'self_intersection' in check_types:
+                    errors_by_type['self_intersection'] = self_int_errors
+            except Exception as e:
+                log_error(f"PolygonCheckSuite: Ошибка проверки валидности: {e}")
+            timings['validity'] = (time.perf_counter() - started) * 1000
+
+            if progress_callback:
+                progress_callback(25)
+
+        # 2. Проверка дублей и близких точек
+        if ('duplicate_geometries' in check_types or
+            'duplicate_vertices' in check_types or
+            'close_points' in check_types):
+
+            started = time.perf_counter()
+            try:
+                geom_duplicates, vertex_duplicates, close_points = self.duplicates_checker.check(layer, snapshot)
+
+                if 'duplicate_geometries' in check_types:
+                    errors_by_type['duplicate_geometry'] = geom_duplicates
+
+                if 'duplicate_vertices' in check_types:
+                    errors_by_type['duplicate_vertex'] = vertex_duplicates
+
+                if 'close_points' in check_types:
+                    errors_by_type['close_points'] = close_points
+            except Exception as e:
+                log_error(f"PolygonCheckSuite: Ошибка проверки дублей: {e}")
+            timings['duplicates'] = (time.perf_counter() - started) * 1000
+
+            if progress_callback:
+                progress_callback(50)
+
+        # 3. Проверка топологических ошибок
+        if 'overlaps' in check_types or 'spikes' in check_types:
+            started = time.perf_counter()
+            try:
+                overlaps, spikes = self.topology_checker.check(layer, snapshot)
+
+                if 'overlaps' in check_types:
+                    errors_by_type['overlap'] = overlaps
+
+                if 'spikes' in check_types:
+                    errors_by_type['spike'] = spikes
+            except Exception as e:
+                log_error(f"PolygonCheckSuite: Ошибка проверки топологии: {e}")
+            timings['topology'] = (time.perf_counter() - started) * 1000
+
+            if progress_callback:
+                progress_callback(75)
+
+        # 4. Проверка точности
+        if 'precision' in check_types:
+            log_info("PolygonCheckSuite: Проверка точности координат...")
+
+            started = time.perf_counter()
+            try:
+                precision_errors = self.precision_checker.check(layer, snapshot)
+
+                errors_by_type['precision'] = precision_errors
+            except Exception as e:
+                log_error(f"PolygonCheckSuite: Ошибка проверки точности: {e}")
+            timings['precision'] = (time.perf_counter() - started) * 1000
+
+            if progress_callback:
+                progress_callback(80)
+
+        # 5. Проверка близких точек между объектами (cross-feature)
+        if 'cross_feature_close_points' in check_types:
+            log_info("PolygonCheckSuite: Проверка близких точек между объектами...")
+
+            started = time.perf_counter()
+            try:
+                cross_feature_errors = self.cross_feature_checker.check(layer, snapshot, point_index)
+
+                errors_by_type['cross_feature_close_points'] = cross_feature_errors
+            except Exception as e:
+                log_error(f"PolygonCheckSuite: Ошибка проверки cross-feature: {e}")
+            timings['cross_feature'] = (time.perf_counter() - started) * 1000
+
+            if progress_callback:
+                progress_callback(85)
+
+        # 6-7. Проверка sliver-полигонов ОТКЛЮЧЕНА
+        # Причина: Ложные срабатывания на узких, но корректных объектах
+        # (охранные зоны, санитарно-защитные зоны, полосы отвода и т.п.)
+        # Формула Polsby-Popper (4*pi*area/perimeter^2) даёт низкие значения
+        # для любых вытянутых полигонов, независимо от их корректности.
+        #
+        # if 'slivers_polsby_popper' in check_types:
+        #     log_info("PolygonCheckSuite: Проверка sliver-полигонов (Polsby-Popper)...")
+        #     try:
+        #         sliver_pp_errors = self.sliver_checker.check(layer)
+        #         errors_by_type['sliver_polsby_popper'] = sliver_pp_errors
+        #         all_errors.extend(sliver_pp_errors)
+        #     except Exception as e:
+        #         log_error(f"PolygonCheckSuite: Ошибка проверки slivers (Polsby-Popper): {e}")
+        #     if progress_callback:
+        #         progress_callback(90)
+        #
+        # if 'slivers_qgis_native' in check_types:
+        #     log_info("PolygonCheckSuite: Проверка sliver-полигонов (QGIS native)...")
+        #     try:
+        #         sliver_native_errors = self.sliver_native_checker.check(layer)
+        #         errors_by_type['sliver_qgis_native'] = sliver_native_errors
+        #         all_errors.extend(sliver_native_errors)
+        #     except Exception as e:
+        #         log_error(f"PolygonCheckSuite: Ошибка проверки slivers (QGIS native): {e}")
+
+            if progress_callback:
+                progress_callback(90)
+
+        # 8. Анализ покрытия (зазоры) - всегда в pipeline
+        if self.gap_checker:
+            log_info("PolygonCheckSuite: Анализ покрытия (зазоры)...")
+
+            started = time.perf_counter()
+            try:
+                gap_errors = self.gap_checker.check(layer, snapshot)
+
+                # Два типа ошибок из гибридного gap-checker'а (INV-1):
+                # coverage_invalid_edge — GEOS CoverageValidator (primary), per-layer
+                # gap_spike — spike-узлы union boundary (после дедупа), per-layer
+                # Тип 'gap' (envelope-diff) ВЫНЕСЕН в whole-project класс C
+                # (Fsm_0_4_16, тип 'coverage_gap') — межслойный феномен.
+                for err_type in ('coverage_invalid_edge', 'gap_spike'):
+                    filtered = [e for e in gap_errors if e['type'] == err_type]
+                    if filtered:
+                        errors_by_type[err_type] = filtered
+            except Exception as e:
+                log_error(f"PolygonCheckSuite: Ошибка анализа покрытия: {e}")
+            timings['gaps'] = (time.perf_counter() - started) * 1000
+
+            if progress_callback:
+                progress_callback(95)
+
+        return errors_by_type, timings
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль проверки точности округления координат до 0.01м (сантиметры)
+Для кадастровых работ критична точность координат
+
+Вершины берутся из снимка слоя (LayerSnapshot) в порядке native:extractvertices
+(vertex_index - сквозной номер вершины в геометрии); processing не вызывается.
+"""
+
+from typing import List, Dict, Any, Optional
+from qgis.core import (
+    QgsVectorLayer, QgsPointXY,
+    QgsGeometry, QgsFeature, QgsWkbTypes,
+    QgsProcessingContext, QgsProcessingFeedback
+)
+from Daman_QGIS.core.math.rounding import math_round
+from Daman_QGIS.constants import COORDINATE_PRECISION, PRECISION_DECIMALS
+from Daman_QGIS.utils import log_info
+from .layer_snapshot import LayerSnapshot
+
+class PrecisionChecker:
+    """Проверка округления координат"""
+
+    PRECISION = COORDINATE_PRECISION  # Точность в метрах (сантиметры)
+
+    def __init__(self, processing_context: Optional[QgsProcessingContext] = None):
+        """
+        Args:
+            processing_context: QgsProcessingContext созданный в main thread
+                               (сохранён для совместимости: processing.run()
+                               больше не вызывается)
+        """
+        self.errors_found = 0
+        self.processing_context = processing_context
+        self.feedback = QgsProcessingFeedback()
+
+    def check(self, layer: QgsVectorLayer,
+              snapshot: Optional[LayerSnapshot] = None) -> List[Dict[str, Any]]:
+        """
+        Проверка округления координат до 0.01м
+
+        Args:
+            layer: Проверяемый слой
+            snapshot: Снимок слоя от координатора (None - прочитать слой)
+
+        Returns:
+            Список словарей с информацией об ошибках:
+            {
+                'type': 'precision',
+                'geometry': QgsGeometry (точка),
+                'feature_id': int,
+                'vertex_index': int,
+                'description': str,
+                'current_coords': (x, y),
+                'rounded_coords': (x, y)
+            }
+        """
+        errors = []
+        self.errors_found = 0
+
+        if snapshot is None:
+            snapshot = LayerSnapshot(layer)
+
+        for fid, feature_geom in snapshot.items():
+            # Сквозной обход вершин всех частей и колец (как native:extractvertices)
+            for vertex_index, vertex in enumerate(feature_geom.vertices()):
+                x, y = vertex.x(), vertex.y()
+
+                # Проверяем округление
+                x_rounded = math_round(x, PRECISION_DECIMALS)
+                y_rounded = math_round(y, PRECISION_DECIMALS)
+
+                # Если координаты не округлены до 0.01
+                if abs(x - x_rounded) > 0.0001 or abs(y - y_rounded) > 0.0001:
+                    errors.append({
+                        'type': 'precision',
+                        'geometry': QgsGeometry(vertex.clone()),
+                        'feature_id': fid,
+                        'vertex_index': vertex_index,
+                        'description': f'Координаты не округлены до 0.01 м: X={x:.6f}, Y={y:.6f}',
+                        'current_coords': (x, y),
+                        'rounded_coords': (x_rounded, y_rounded)
+                    })
+
+        self.errors_found = len(errors)
+
+        log_info(f"PrecisionChecker: Найдено {self.errors_found} вершин с неокругленными координатами")
+
+        return errors
+
+    def get_errors_count(self) -> int:
+        """
+        Возвращает количество найденных ошибок точности.
+
+        Returns:
+            int: Количество вершин с неокругленными координатами
+        """
+        return self.errors_found
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Проверка снимка слоя в процессе пула Fsm_0_4_21
+
+Процесс пула (spawn) импортирует только этот пакет: функция, снимок
+(LayerSnapshot, pickle) и отделённые ошибки определены в core.topology,
+поэтому ни передача задачи, ни результат не загружают tools.
+
+Ошибки возвращаются с геометриями в WKB (QgsGeometry не сериализуется
+pickle); attach_errors восстанавливает их в потоке задачи.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from qgis.core import QgsGeometry, QgsPointXY
+
+from .layer_snapshot import LayerSnapshot
+from .polygon_checks import PolygonCheckSuite
+
+
+class _DetachedValue(NamedTuple):
+    """Геометрия ошибки без объекта QGIS (передача между процессами)"""
+    kind: str  # 'geometry' - WKB, 'point' - (x, y)
+    data: Any
+
+
+def detach_errors(errors_by_type: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """QgsGeometry / QgsPointXY в ошибках -> WKB / (x, y) для pickle"""
+    detached = {}
+    for error_type, errors in errors_by_type.items():
+        items = []
+        for error in errors:
+            item = {}
+            for key, value in error.items():
+                if isinstance(value, QgsGeometry):
+                    value = _DetachedValue('geometry', bytes(value.asWkb()) if not value.isNull() else b'')
+                elif isinstance(value, QgsPointXY):
+                    value = _DetachedValue('point', (value.x(), value.y()))
+                item[key] = value
+            items.append(item)
+        detached[error_type] = items
+    return detached
+
+
+def attach_errors(errors_by_type: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Обратное detach_errors: WKB / (x, y) -> QgsGeometry / QgsPointXY"""
+    attached = {}
+    for error_type, errors in errors_by_type.items():
+        items = []
+        for error in errors:
+            item = {}
+            for key, value in error.items():
+                if isinstance(value, _DetachedValue):
+                    if value.kind == 'geometry':
+                        geom = QgsGeometry()
+                        if value.data:
+                            geom.fromWkb(value.data)
+                        value = geom
+                    else:
+                        value = QgsPointXY(*value.data)
+                item[key] = value
+            items.append(item)
+        attached[error_type] = items
+    return attached
+
+
+def check_snapshot_worker(snapshot: LayerSnapshot, check_types: List[str],
+                          point_index: Dict[Tuple[float, float], int]) -> Tuple[Dict, Dict[str, float], Dict[str, int]]:
+    """
+    Проверки полигонального слоя по снимку (функция модуля - picklable)
+
+    Returns:
+        (ошибки по типам с отделёнными геометриями, замеры checker'ов в мс,
+         чтения снимка)
+    """
+    errors_by_type, timings = PolygonCheckSuite().run_polygon_checks(
+        None, snapshot, check_types, point_index=point_index
+    )
+    return detach_errors(errors_by_type), timings, dict(snapshot.reads)
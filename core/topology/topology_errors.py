@@ -5,17 +5,18 @@
 """
 
 import math
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from qgis.core import (
     Qgis, QgsVectorLayer, QgsGeometry,
-    QgsPointXY, QgsSpatialIndex, QgsFeatureRequest, QgsRectangle,
+    QgsPointXY, QgsFeatureRequest, QgsRectangle,
     QgsWkbTypes, QgsGeometryUtils
 )
-from Daman_QGIS.utils import log_info, log_warning
-from Daman_QGIS.managers import CoordinatePrecisionManager as CPM
-from Daman_QGIS.constants import COORDINATE_PRECISION
+from Daman_QGIS.utils import log_info, log_warning, log_debug, is_debug_logging
+from Daman_QGIS.core.math.rounding import math_round
+from Daman_QGIS.constants import COORDINATE_PRECISION, PRECISION_DECIMALS
+from .layer_snapshot import LayerSnapshot
 
-class Fsm_0_4_3_TopologyErrorsChecker:
+class TopologyErrorsChecker:
     """Проверка наложений и острых углов"""
 
     # Минимальная площадь наложения (м²)
@@ -43,46 +44,52 @@ class Fsm_0_4_3_TopologyErrorsChecker:
         self.overlaps_found = 0
         self.spikes_found = 0
 
-    def check(self, layer: QgsVectorLayer) -> Tuple[List[Dict], List[Dict]]:
+    def check(self, layer: Optional[QgsVectorLayer],
+              snapshot: Optional[LayerSnapshot] = None) -> Tuple[List[Dict], List[Dict]]:
         """
         Комплексная проверка топологических ошибок
 
+        Args:
+            layer: Проверяемый слой (None - только снимок, процесс пула)
+            snapshot: Снимок слоя от координатора (None - прочитать слой)
+
         Returns:
             Tuple из (overlaps, spikes)
         """
-        log_info(f"Fsm_0_4_3: Запуск проверки наложений и spike углов для слоя '{layer.name()}'")
+        if snapshot is None:
+            snapshot = LayerSnapshot(layer)
 
-        overlaps = self._check_overlaps(layer)
-        spikes = self._check_spikes(layer)
+        log_info(f"TopologyErrorsChecker: Запуск проверки наложений и spike углов для слоя '{snapshot.layer_name}'")
 
-        log_info(f"Fsm_0_4_3: Результаты - наложений: {len(overlaps)}, spike углов: {len(spikes)}")
+        overlaps = self._check_overlaps(snapshot)
+        spikes = self._check_spikes(snapshot)
+
+        log_info(f"TopologyErrorsChecker: Результаты - наложений: {len(overlaps)}, spike углов: {len(spikes)}")
         return overlaps, spikes
 
-    def _check_overlaps(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
+    def _check_overlaps(self, snapshot: LayerSnapshot) -> List[Dict[str, Any]]:
         """
-        Проверка наложений через spatial index
+        Проверка наложений через spatial index снимка
 
         Returns:
             Список наложений
         """
         errors = []
         filtered_count = 0
-        log_info(f"Fsm_0_4_3: Начало проверки наложений для слоя '{layer.name()}'")
-
-        # Создаем пространственный индекс для оптимизации
-        index = QgsSpatialIndex(layer.getFeatures())
+        log_info(f"TopologyErrorsChecker: Начало проверки наложений для слоя '{snapshot.layer_name}'")
 
-        features = {f.id(): f for f in layer.getFeatures()}
+        # Пространственный индекс снимка (общий для checker'ов запуска)
+        index = snapshot.spatial_index()
         checked_pairs = set()
 
-        for fid, feature in features.items():
-            geom = feature.geometry()
-            if not geom or geom.isEmpty():
+        for i, fid in enumerate(snapshot.fids):
+            geom = snapshot.geometry(i)
+            if geom.isEmpty():
                 continue
 
             # Находим потенциально пересекающиеся объекты через индекс
-            bbox = geom.boundingBox()
-            candidate_ids = index.intersects(bbox)
+            # (сортировка - порядок ошибок не зависит от устройства R-tree)
+            candidate_ids = sorted(index.intersects(snapshot.bboxes[i]))
 
             for candidate_id in candidate_ids:
                 if candidate_id == fid:
@@ -94,8 +101,8 @@ class Fsm_0_4_3_TopologyErrorsChecker:
                     continue
                 checked_pairs.add(pair)
 
-                candidate_geom = features[candidate_id].geometry()
-                if not candidate_geom or candidate_geom.isEmpty():
+                candidate_geom = snapshot.geometry_by_fid(candidate_id)
+                if candidate_geom is None or candidate_geom.isEmpty():
                     continue
 
                 # Проверяем пересечение
@@ -127,16 +134,16 @@ class Fsm_0_4_3_TopologyErrorsChecker:
         self.overlaps_found = len(errors)
 
         if filtered_count > 0:
-            log_info(f"Fsm_0_4_3: Отфильтровано {filtered_count} микро-наложений (< {self.MIN_OVERLAP_AREA} м²)")
+            log_info(f"TopologyErrorsChecker: Отфильтровано {filtered_count} микро-наложений (< {self.MIN_OVERLAP_AREA} м²)")
 
         if self.overlaps_found > 0:
-            log_info(f"Fsm_0_4_3: Найдено {self.overlaps_found} наложений")
+            log_info(f"TopologyErrorsChecker: Найдено {self.overlaps_found} наложений")
         else:
-            log_info(f"Fsm_0_4_3: Наложения не обнаружены")
+            log_info(f"TopologyErrorsChecker: Наложения не обнаружены")
 
         return errors
 
-    def _check_spikes(self, layer: QgsVectorLayer) -> List[Dict[str, Any]]:
+    def _check_spikes(self, snapshot: LayerSnapshot) -> List[Dict[str, Any]]:
         """
         Проверка острых углов через извлечение вершин и анализ углов
         Работает только для полигональных слоев
@@ -145,11 +152,11 @@ class Fsm_0_4_3_TopologyErrorsChecker:
             Список острых углов
         """
         errors = []
-        log_info(f"Fsm_0_4_3: Начало проверки spike углов для слоя '{layer.name()}'")
+        log_info(f"TopologyErrorsChecker: Начало проверки spike углов для слоя '{snapshot.layer_name}'")
 
         # Проверяем что слой полигональный
-        if layer.geometryType() != Qgis.GeometryType.Polygon:
-            log_info(f"Fsm_0_4_3: Слой '{layer.name()}' не является полигональным, проверка острых углов пропущена")
+        if snapshot.geometry_type != Qgis.GeometryType.Polygon:
+            log_info(f"TopologyErrorsChecker: Слой '{snapshot.layer_name}' не является полигональным, проверка острых углов пропущена")
             self.spikes_found = 0
             return errors
 
@@ -165,17 +172,16 @@ class Fsm_0_4_3_TopologyErrorsChecker:
             # Для защиты от дубликатов (может быть несколько частей MultiPolygon)
             processed_spikes = set()  # (fid, x, y, angle) для уникальности
 
-            for feature in layer.getFeatures():
-                fid = feature.id()
-                geom = feature.geometry()
+            for i, fid in enumerate(snapshot.fids):
+                geom = snapshot.geometry(i)
 
-                if not geom or geom.isEmpty():
+                if geom.isEmpty():
                     continue
 
                 total_features += 1
 
-                # Извлекаем полигоны из MultiPolygon (UNIFIED PATTERN)
-                polygons = geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()]
+                # Полигоны из MultiPolygon (UNIFIED PATTERN, разобраны в снимке)
+                polygons = snapshot.parts(i)
 
                 # Обрабатываем каждый полигон ОТДЕЛЬНО
                 for polygon_idx, polygon in enumerate(polygons):
@@ -229,9 +235,13 @@ class Fsm_0_4_3_TopologyErrorsChecker:
                         # Проверяем порог (spike = острый угол ≤ 1°)
                         if angle <= self.SPIKE_ANGLE_THRESHOLD:
                             # Защита от дубликатов: проверяем координаты + angle
-                            # Используем CPM для математического округления координат
-                            rounded_coords = CPM.round_point_tuple(p2)
-                            spike_key = (fid, rounded_coords[0], rounded_coords[1], round(angle, 4))
+                            # Математическое округление координат (как CPM.round_point_tuple)
+                            spike_key = (
+                                fid,
+                                math_round(p2.x(), PRECISION_DECIMALS),
+                                math_round(p2.y(), PRECISION_DECIMALS),
+                                round(angle, 4)
+                            )
 
                             if spike_key not in processed_spikes:
                                 processed_spikes.add(spike_key)
@@ -245,18 +255,18 @@ class Fsm_0_4_3_TopologyErrorsChecker:
                                 })
 
             # Итоговая статистика
-            log_info(f"Fsm_0_4_3: Обработано {total_features} объектов, {total_vertices} вершин, проверено {angles_checked} углов")
+            log_info(f"TopologyErrorsChecker: Обработано {total_features} объектов, {total_vertices} вершин, проверено {angles_checked} углов")
 
             self.spikes_found = len(errors)
             if self.spikes_found > 0:
-                log_info(f"Fsm_0_4_3: ✓ Найдено {self.spikes_found} spike вершин (острый угол ≤ {self.SPIKE_ANGLE_THRESHOLD}°)")
+                log_info(f"TopologyErrorsChecker: ✓ Найдено {self.spikes_found} spike вершин (острый угол ≤ {self.SPIKE_ANGLE_THRESHOLD}°)")
             else:
-                log_info(f"Fsm_0_4_3: Spike вершины не обнаружены")
+                log_info(f"TopologyErrorsChecker: Spike вершины не обнаружены")
             return errors
 
         except Exception as e:
             # При ошибке возвращаем то что успели найти
-            log_warning(f"Fsm_0_4_3: Check spike angles: {str(e)}")
+            log_warning(f"TopologyErrorsChecker: Check spike angles: {str(e)}")
             self.spikes_found = len(errors)
             return errors
 
@@ -309,10 +319,12 @@ class Fsm_0_4_3_TopologyErrorsChecker:
         # Вычисляем минимальное расстояние до 0° или 360°
         spike_angle = min(angle_deg, 360.0 - angle_deg)
 
-        # DEBUG: Логируем детали вычисления для анализа
-        if spike_angle <= self.SPIKE_ANGLE_THRESHOLD:
-            log_info(f"Fsm_0_4_3: DEBUG spike: p2=({p2.x():.2f},{p2.y():.2f}), "
-                     f"внутр.угол={angle_deg:.2f}°, острый={spike_angle:.4f}°")
+        # Детали вычисления - только в DEBUG лога сессии (вызов на каждую вершину)
+        if spike_angle <= self.SPIKE_ANGLE_THRESHOLD and is_debug_logging():
+            log_debug(
+                "TopologyErrorsChecker: spike: p2=(%.2f,%.2f), внутр.угол=%.2f°, острый=%.4f°",
+                p2.x(), p2.y(), angle_deg, spike_angle
+            )
 
         return spike_angle
 
@@ -2,20 +2,27 @@
 """
 Базовый класс для загрузки справочных данных из JSON через Daman API.
 
-Требует интернет-соединение. Кэширование только в памяти на время сессии.
+Первый запуск требует интернет-соединение. Кэширование в памяти на время сессии
+и на диске в профиле QGIS (ReferenceDiskStore).
 
 Предоставляет общую функциональность для всех менеджеров справочных данных:
 - Загрузка JSON через API (daman.tools)
 - Кэширование в памяти на время сессии
-- Построение индексов для быстрого поиска
+- Дисковый кэш с валидаторами сервера (ETag / Last-Modified): тёплый старт
+  берёт справочники с диска, актуальность проверяется в фоне условным GET (304)
+- Параллельная предзагрузка справочников при старте (prefetch)
+- Построение индексов и каталогов (ReferenceCatalog) для быстрого поиска
 
 API URL: constants.API_BASE_URL
 Формат запроса: /data/{filename} или ?action=data&file={filename}
 """
 
+import functools
 import json
-from typing import Dict, List, Any, Optional
-from Daman_QGIS.utils import log_warning, log_error
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from Daman_QGIS.utils import log_info, log_warning, log_error
 
 
 class BaseReferenceLoader:
@@ -33,6 +40,21 @@ class BaseReferenceLoader:
     # vs permanent (файла действительно нет) в _load_from_remote.
     _seen_remote_success: bool = False
 
+    # Дисковый кэш (ReferenceDiskStore, резолвится лениво из профиля QGIS)
+    _disk_store: Optional[Any] = None
+    _disk_store_resolved: bool = False
+    _disk_lock = threading.Lock()
+    # Справочники, уже отправленные на фоновую проверку в этой сессии
+    _revalidated: set = set()
+    _background_executor: Optional[ThreadPoolExecutor] = None
+
+    # Статусы _fetch_remote
+    FETCH_OK = 'ok'
+    FETCH_NOT_MODIFIED = 'not_modified'
+    FETCH_FAILED = 'failed'
+    FETCH_FORBIDDEN = 'forbidden'
+    FETCH_VERSION_MISMATCH = 'version_mismatch'
+
     def __init__(self):
         """Инициализация базового загрузчика.
 
@@ -42,9 +64,9 @@ class BaseReferenceLoader:
 
     def _load_json(self, filename: str) -> Any:
         """
-        Загружает JSON файл через Daman API с кэшированием в памяти.
+        Загружает JSON файл с кэшированием в памяти и на диске.
 
-        Требует интернет-соединение. Кэш хранится только на время сессии.
+        Порядок: память -> диск (с фоновой проверкой актуальности) -> Daman API.
 
         Args:
             filename: Имя JSON файла
@@ -61,11 +83,19 @@ class BaseReferenceLoader:
         if filename in BaseReferenceLoader._shared_cache:
             return BaseReferenceLoader._shared_cache[filename]
 
+        # Дисковый кэш: тёплый старт без запроса к API
+        data = self._load_from_disk(filename)
+        if data is not None:
+            BaseReferenceLoader._shared_cache[filename] = data
+            self._schedule_revalidation(filename)
+            return data
+
         # Загрузка через Daman API (требует интернет)
-        data = self._load_from_remote(filename)
+        data, _status, validators = self._fetch_remote(filename)
 
         if data is not None:
             BaseReferenceLoader._shared_cache[filename] = data
+            self._store_to_disk(filename, data, validators)
 
         return data
 
@@ -80,6 +110,40 @@ class BaseReferenceLoader:
     _REMOTE_BACKOFF_SECONDS = (1.0, 3.0)  # перед попытками 2 и 3
 
     def _load_from_remote(self, filename: str) -> Optional[Any]:
+        """
+        Загрузить JSON через Daman API (без дискового кэша).
+
+        Args:
+            filename: Имя JSON файла (с или без .json расширения)
+
+        Returns:
+            Данные из файла или None при permanent ошибке / исчерпанных попытках
+        """
+        return self._fetch_remote(filename)[0]
+
+    def _send_request(self, url: str, headers: Optional[Dict[str, str]] = None) -> Any:
+        """GET справочника через AuthedRequestManager (JWT, refresh, circuit breaker)"""
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_29_6_authed_request import (
+            AuthedRequestManager,
+        )
+
+        kwargs: Dict[str, Any] = {}
+        if headers:
+            kwargs['headers'] = headers
+        return AuthedRequestManager.get_instance().request(
+            "GET",
+            url,
+            # Один endpoint_key на все Base_*.json — общая квота на auth-уровне.
+            endpoint_key="/api/plugin/data",
+            **kwargs
+        )
+
+    def _fetch_remote(
+        self,
+        filename: str,
+        validators: Optional[Dict[str, str]] = None,
+        background: bool = False
+    ) -> Tuple[Optional[Any], str, Dict[str, str]]:
         """
         Загрузить JSON через Daman API с JWT авторизацией и retry на transient.
 
@@ -102,15 +166,22 @@ class BaseReferenceLoader:
           - status 404 при отсутствии prior success (реально нет файла)
           - прочие requests.exceptions.RequestException (DNS, SSL, ...)
 
+        Условный запрос: при переданных validators отправляются If-None-Match /
+        If-Modified-Since, ответ 304 возвращается как FETCH_NOT_MODIFIED.
+
         Args:
             filename: Имя JSON файла (с или без .json расширения)
+            validators: {'etag', 'last_modified'} сохранённой копии (ReferenceDiskStore)
+            background: Вызов не из основного потока - без повторной JWT-валидации
+                при version mismatch: статус FETCH_VERSION_MISMATCH, валидацию
+                выполняет вызывающий поток (один раз на пачку запросов)
 
         Returns:
-            Данные из файла или None при permanent ошибке / исчерпанных попытках
+            (data, status, validators ответа): data = None при 304 и при ошибке;
+            status = FETCH_FORBIDDEN при отказе в доступе (401 / 403)
         """
         from Daman_QGIS.constants import get_api_url
         from Daman_QGIS.managers.infrastructure.submodules.Msm_29_6_authed_request import (
-            AuthedRequestManager,
             AuthFailureError,
             CircuitBreakerError,
             VersionMismatchError,
@@ -120,7 +191,7 @@ class BaseReferenceLoader:
             import requests
         except ImportError:
             log_warning("BaseReferenceLoader: requests не установлен, remote загрузка недоступна")
-            return None
+            return None, self.FETCH_FAILED, {}
 
         import time
 
@@ -128,6 +199,14 @@ class BaseReferenceLoader:
         file_param = filename.replace('.json', '')
         url = get_api_url("data", file=file_param)
 
+        headers: Dict[str, str] = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        failed = (None, self.FETCH_FAILED, {})
+
         last_transient_reason: Optional[str] = None
 
         for attempt in range(1, self._MAX_REMOTE_ATTEMPTS + 1):
@@ -140,26 +219,23 @@ class BaseReferenceLoader:
                 time.sleep(delay)
 
             try:
-                response = AuthedRequestManager.get_instance().request(
-                    "GET",
-                    url,
-                    # Один endpoint_key на все Base_*.json — общая квота на auth-уровне.
-                    endpoint_key="/api/plugin/data",
-                )
+                response = self._send_request(url, headers)
             except CircuitBreakerError as e:
                 # Тихо — не спамить запросами и не пугать юзера повторно.
                 log_warning(f"BaseReferenceLoader: {filename} skipped: {e}")
-                return None
+                return failed
             except AuthFailureError as e:
                 # UI-сообщение «Требуется повторная активация» уже показано
                 # из AuthedRequestManager (через registered callback).
                 log_error(f"BaseReferenceLoader: Auth failure для {filename}: {e}")
-                return None
+                return None, self.FETCH_FORBIDDEN, {}
             except VersionMismatchError as e:
                 # M_42 hot update detected — токены инвалидированы, форсим re-validate.
                 log_warning(f"BaseReferenceLoader: {filename} version mismatch: {e}")
+                if background:
+                    return None, self.FETCH_VERSION_MISMATCH, {}
                 self._handle_jwt_version_mismatch()
-                return None
+                return failed
             except requests.exceptions.Timeout:
                 last_transient_reason = "timeout"
                 continue
@@ -169,14 +245,18 @@ class BaseReferenceLoader:
             except requests.exceptions.RequestException as e:
                 # DNS/SSL/прочие — permanent, retry не поможет.
                 log_warning(f"BaseReferenceLoader: Ошибка сети при загрузке {filename}: {e}")
-                return None
+                return failed
 
             if response is None:
                 # AuthedRequestManager уже залогировал причину.
-                return None
+                return failed
 
             status = response.status_code
 
+            if status == 304 and headers:
+                BaseReferenceLoader._seen_remote_success = True
+                return None, self.FETCH_NOT_MODIFIED, dict(validators or {})
+
             if status == 200:
                 try:
                     response_json = response.json()
@@ -192,7 +272,7 @@ class BaseReferenceLoader:
                     else response_json
                 )
                 BaseReferenceLoader._seen_remote_success = True
-                return data
+                return data, self.FETCH_OK, self._response_validators(response)
 
             if status == 403:
                 # 403 не-AUTH_FAILED (ACCOUNT_PENDING_DELETION, INTEGRITY_MISMATCH,
@@ -206,7 +286,7 @@ class BaseReferenceLoader:
                     f"BaseReferenceLoader: Доступ запрещён к {filename} "
                     f"(reason: {error_code})"
                 )
-                return None
+                return None, self.FETCH_FORBIDDEN, {}
 
             if status == 404:
                 if BaseReferenceLoader._seen_remote_success:
@@ -215,20 +295,215 @@ class BaseReferenceLoader:
                     last_transient_reason = "404 (suspect transient, prior success in session)"
                     continue
                 log_warning(f"BaseReferenceLoader: Файл {filename} не найден на сервере")
-                return None
+                return failed
 
             if 500 <= status < 600:
                 last_transient_reason = f"HTTP {status}"
                 continue
 
             log_warning(f"BaseReferenceLoader: HTTP {status} для {filename}")
-            return None
+            return failed
 
         log_warning(
             f"BaseReferenceLoader: {filename} не загружен после "
             f"{self._MAX_REMOTE_ATTEMPTS} попыток (последняя причина: {last_transient_reason})"
         )
-        return None
+        return failed
+
+    @staticmethod
+    def _response_validators(response: Any) -> Dict[str, str]:
+        """ETag / Last-Modified ответа (только строковые значения)"""
+        headers = getattr(response, 'headers', None)
+        if headers is None:
+            return {}
+        validators = {}
+        for key, header in (('etag', 'ETag'), ('last_modified', 'Last-Modified')):
+            try:
+                value = headers.get(header)
+            except Exception:
+                value = None
+            if isinstance(value, str) and value:
+                validators[key] = value
+        return validators
+
+    # ------------------------------------------------------------------
+    # Дисковый кэш
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _get_disk_store(cls) -> Optional[Any]:
+        """ReferenceDiskStore профиля QGIS (None вне QGIS)"""
+        with cls._disk_lock:
+            if not BaseReferenceLoader._disk_store_resolved:
+                from Daman_QGIS.database.reference_disk_store import ReferenceDiskStore
+                BaseReferenceLoader._disk_store = ReferenceDiskStore.for_profile()
+                BaseReferenceLoader._disk_store_resolved = True
+            return BaseReferenceLoader._disk_store
+
+    @classmethod
+    def set_disk_store(cls, store: Optional[Any]) -> None:
+        """Подменить дисковое хранилище (None - отключить дисковый кэш)"""
+        with cls._disk_lock:
+            BaseReferenceLoader._disk_store = store
+            BaseReferenceLoader._disk_store_resolved = True
+        BaseReferenceLoader._revalidated.clear()
+
+    @classmethod
+    def _load_from_disk(cls, filename: str) -> Optional[Any]:
+        store = cls._get_disk_store()
+        if store is None:
+            return None
+        entry = store.get(filename)
+        return entry[0] if entry is not None else None
+
+    @classmethod
+    def _store_to_disk(cls, filename: str, data: Any, validators: Dict[str, str]) -> bool:
+        """Сохранить справочник на диск. Returns: True если содержимое изменилось"""
+        store = cls._get_disk_store()
+        if store is None:
+            return False
+        try:
+            return store.put(
+                filename, data,
+                etag=validators.get('etag'),
+                last_modified=validators.get('last_modified')
+            )
+        except (TypeError, ValueError) as e:
+            log_warning(f"BaseReferenceLoader: {filename} не сохранён на диск: {e}")
+            return False
+
+    @classmethod
+    def _executor(cls) -> ThreadPoolExecutor:
+        with cls._disk_lock:
+            if BaseReferenceLoader._background_executor is None:
+                from Daman_QGIS.constants import REFERENCE_PREFETCH_WORKERS
+                BaseReferenceLoader._background_executor = ThreadPoolExecutor(
+                    max_workers=REFERENCE_PREFETCH_WORKERS,
+                    thread_name_prefix="daman_reference"
+                )
+            return BaseReferenceLoader._background_executor
+
+    def _schedule_revalidation(self, filename: str) -> None:
+        """Фоновая проверка актуальности дисковой копии (один раз за сессию)"""
+        if filename in BaseReferenceLoader._revalidated:
+            return
+        BaseReferenceLoader._revalidated.add(filename)
+        try:
+            self._executor().submit(self._revalidate, filename)
+        except RuntimeError:
+            # Executor остановлен (выгрузка плагина)
+            pass
+
+    def _revalidate(self, filename: str) -> str:
+        """
+        Условный GET дисковой копии.
+
+        Изменившийся справочник записывается только на диск: данные текущей
+        сессии (и построенные по ним индексы менеджеров) не подменяются,
+        новая версия применяется при следующем запуске. При отказе в доступе
+        (401 / 403) дисковая копия удаляется - без доступа к справочнику
+        следующий запуск не должен брать его с диска.
+
+        Returns:
+            Статус _fetch_remote
+        """
+        store = self._get_disk_store()
+        if store is None:
+            return self.FETCH_FAILED
+        try:
+            data, status, validators = self._fetch_remote(
+                filename, validators=store.validators(filename), background=True
+            )
+            if status == self.FETCH_NOT_MODIFIED:
+                store.touch(filename)
+            elif status == self.FETCH_OK and self._store_to_disk(filename, data, validators):
+                log_info(f"BaseReferenceLoader: {filename} обновлён на сервере, применится при следующем запуске")
+            elif status == self.FETCH_FORBIDDEN:
+                store.remove(filename)
+                log_warning(f"BaseReferenceLoader: {filename} удалён из дискового кэша (доступ запрещён)")
+            return status
+        except Exception as e:
+            log_warning(f"BaseReferenceLoader: Фоновая проверка {filename} не удалась: {e}")
+            return self.FETCH_FAILED
+
+    @classmethod
+    def prefetch(cls, filenames: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Предзагрузка справочников при старте.
+
+        Дисковые копии сразу попадают в память (проверка актуальности - в фоне),
+        отсутствующие загружаются параллельно (REFERENCE_PREFETCH_WORKERS потоков).
+        Кэш в памяти заполняется в вызывающем потоке; version mismatch из потоков
+        загрузки обрабатывается там же один раз после завершения пула.
+
+        Args:
+            filenames: Список справочников. None - REFERENCE_PREFETCH_FILES
+                + всё, что уже есть в дисковом кэше
+
+        Returns:
+            Статистика {'memory', 'disk', 'remote', 'failed'}
+        """
+        from Daman_QGIS.constants import REFERENCE_PREFETCH_FILES, REFERENCE_PREFETCH_WORKERS
+
+        store = cls._get_disk_store()
+        if filenames is None:
+            names = list(REFERENCE_PREFETCH_FILES)
+            if store is not None:
+                names += [name for name in store.known_files() if name not in names]
+        else:
+            names = list(filenames)
+
+        loader = cls()
+        stats = {'memory': 0, 'disk': 0, 'remote': 0, 'failed': 0}
+        missing = []
+        for filename in names:
+            if filename in BaseReferenceLoader._shared_cache:
+                stats['memory'] += 1
+                continue
+            data = cls._load_from_disk(filename)
+            if data is not None:
+                BaseReferenceLoader._shared_cache[filename] = data
+                loader._schedule_revalidation(filename)
+                stats['disk'] += 1
+            else:
+                missing.append(filename)
+
+        if missing:
+            workers = min(REFERENCE_PREFETCH_WORKERS, len(missing))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="daman_prefetch") as pool:
+                fetch = functools.partial(loader._fetch_remote, background=True)
+                results = list(zip(missing, pool.map(fetch, missing)))
+            if any(status == cls.FETCH_VERSION_MISMATCH for _, (_, status, _) in results):
+                cls._handle_jwt_version_mismatch()
+            for filename, (data, _status, validators) in results:
+                if data is None:
+                    stats['failed'] += 1
+                    continue
+                BaseReferenceLoader._shared_cache[filename] = data
+                cls._store_to_disk(filename, data, validators)
+                stats['remote'] += 1
+
+        log_info(
+            f"BaseReferenceLoader: Предзагрузка справочников - память {stats['memory']}, "
+            f"диск {stats['disk']}, сервер {stats['remote']}, ошибок {stats['failed']}"
+        )
+        return stats
+
+    @classmethod
+    def shutdown_background(cls) -> None:
+        """Остановить фоновые проверки (выгрузка плагина)
+
+        Статистика использованных каталогов пишется в лог - один раз за сессию.
+        """
+        with cls._disk_lock:
+            executor = BaseReferenceLoader._background_executor
+            BaseReferenceLoader._background_executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        for key, catalog in list(BaseReferenceLoader._shared_index_cache.items()):
+            if key.startswith("catalog:") and catalog.lookups:
+                log_info(f"BaseReferenceLoader: Каталог {catalog.report()}")
 
     @staticmethod
     def _handle_jwt_version_mismatch() -> None:
@@ -286,6 +561,39 @@ class BaseReferenceLoader:
 
         return BaseReferenceLoader._shared_index_cache[index_key].get(value)
 
+    def _get_catalog(
+        self,
+        filename: str,
+        unique_keys: tuple = (),
+        multi_keys: tuple = ()
+    ) -> Any:
+        """
+        Индексированный каталог справочника (ReferenceCatalog)
+
+        Строится при первом обращении после загрузки и хранится в общем
+        индексном кэше - сбрасывается вместе с ним (clear_cache / reload).
+
+        Args:
+            filename: Имя JSON файла справочника
+            unique_keys: Поля с уникальными значениями
+            multi_keys: Поля для выборки групп записей
+
+        Returns:
+            ReferenceCatalog (пустой, если справочник не загрузился)
+        """
+        from Daman_QGIS.database.reference_catalog import ReferenceCatalog
+
+        index_key = f"catalog:{filename}"
+        catalog = BaseReferenceLoader._shared_index_cache.get(index_key)
+        if catalog is None:
+            data = self._load_json(filename)
+            items = data if isinstance(data, list) else []
+            catalog = ReferenceCatalog(filename, items, unique_keys, multi_keys)
+            # Не кэшируем пустой каталог - справочник мог не загрузиться (сеть)
+            if items:
+                BaseReferenceLoader._shared_index_cache[index_key] = catalog
+        return catalog
+
     @classmethod
     def clear_cache(cls):
         """Очистить весь общий кэш (данные и индексы)"""
@@ -305,6 +613,12 @@ class BaseReferenceLoader:
             if filename in cls._shared_cache:
                 del cls._shared_cache[filename]
 
+            # Дисковая копия тоже сбрасывается - следующая загрузка пойдёт на сервер
+            store = cls._get_disk_store()
+            if store is not None:
+                store.remove(filename)
+            BaseReferenceLoader._revalidated.discard(filename)
+
             # Очищаем связанные индексы (они будут пересозданы при следующем обращении)
             cls._shared_index_cache.clear()
         else:
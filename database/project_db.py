@@ -8,7 +8,8 @@ import os
 import re
 import json
 import sqlite3
-from typing import List, Optional, Dict, Any
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
 from datetime import datetime
 
 from qgis.core import (
@@ -24,6 +25,7 @@ from Daman_QGIS.constants import (
     GPKG_SYSTEM_TABLE_PREFIX, GPKG_INIT_LAYER_NAME, GPKG_SETTINGS_SUFFIX
 )
 from ..database.schemas import LayerInfo, ProjectSettings
+from ..database.project_db_pool import GpkgState, get_connection_pool
 
 class ProjectDB:
     """Менеджер базы данных проекта (GeoPackage)"""
@@ -51,6 +53,9 @@ class ProjectDB:
         # Создаем папку если не существует
         os.makedirs(os.path.dirname(self.gpkg_path), exist_ok=True)
 
+        # Соединение пула со старым файлом по этому пути больше не годится
+        get_connection_pool().close(self.gpkg_path, restore_journal=False)
+
         # Создаем пустой GeoPackage через создание временного слоя
         # Это стандартный способ в QGIS
         if not crs:
@@ -350,9 +355,8 @@ class ProjectDB:
         Returns:
             True если создание успешно
         """
-        # Используем sqlite3 напрямую для создания пользовательской таблицы
-        with sqlite3.connect(self.gpkg_path) as conn:
-            cursor = conn.cursor()
+        with get_connection_pool().transaction(self.gpkg_path) as state:
+            cursor = state.conn.cursor()
 
             # Удаляем таблицу если она уже существует (могла быть создана автоматически QGIS)
             cursor.execute(f"DROP TABLE IF EXISTS {PROJECT_METADATA_TABLE}")
@@ -365,11 +369,83 @@ class ProjectDB:
                     description TEXT
                 )
             """)
-            # commit() вызывается автоматически при выходе из with
+            state.has_metadata_table = True
+            state.metadata = {}
 
         log_info("Таблица метаданных создана")
         return True
-    
+
+    @staticmethod
+    def _load_metadata(state: GpkgState) -> Dict[str, Tuple[str, str]]:
+        """
+        Кэш метаданных соединения (таблица читается один раз).
+
+        Returns:
+            key -> (value, description); пустой словарь если таблицы нет
+        """
+        if state.metadata is not None:
+            return state.metadata
+
+        if state.has_metadata_table is None:
+            state.has_metadata_table = state.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                (PROJECT_METADATA_TABLE,)
+            ).fetchone() is not None
+
+        metadata: Dict[str, Tuple[str, str]] = {}
+        if state.has_metadata_table:
+            for key, value, description in state.conn.execute(
+                f"SELECT key, value, description FROM {PROJECT_METADATA_TABLE}"
+            ):
+                metadata[key] = (value, description)
+        state.metadata = metadata
+        return metadata
+
+    @staticmethod
+    def _write_metadata(state: GpkgState, key: str, value: str, description: str) -> None:
+        """INSERT OR REPLACE одного ключа с обновлением кэша."""
+        state.conn.execute(f"""
+            INSERT OR REPLACE INTO {PROJECT_METADATA_TABLE} (key, value, description)
+            VALUES (?, ?, ?)
+        """, (key, value, description))
+        state.has_metadata_table = True
+        if state.metadata is not None:
+            state.metadata[key] = (value, description)
+
+    @contextmanager
+    def metadata_batch(self) -> Iterator['ProjectDB']:
+        """
+        Одна транзакция на серию set/delete_metadata.
+
+        Все вызовы внутри блока (из этого потока) фиксируются одним COMMIT;
+        при исключении изменения откатываются целиком. Вложенные блоки
+        входят во внешнюю транзакцию.
+
+        Пример:
+            with db.metadata_batch():
+                db.set_metadata('1_0_working_name', name, 'Рабочее название')
+                db.delete_metadata('1_2_1_object_type_value')
+        """
+        with get_connection_pool().transaction(self.gpkg_path):
+            yield self
+
+    def set_metadata_many(self, entries: Iterable[Tuple[str, str, str]]) -> int:
+        """
+        Установка нескольких значений метаданных одной транзакцией
+
+        Args:
+            entries: Кортежи (key, value, description)
+
+        Returns:
+            Количество записанных ключей
+        """
+        count = 0
+        with get_connection_pool().transaction(self.gpkg_path) as state:
+            for key, value, description in entries:
+                self._write_metadata(state, key, value, description)
+                count += 1
+        return count
+
     def set_metadata(self, key: str, value: str, description: str = "") -> bool:
         """
         Установка значения метаданных
@@ -382,18 +458,12 @@ class ProjectDB:
         Returns:
             True если успешно
         """
-        # Используем sqlite3 для работы с метаданными
-        with sqlite3.connect(self.gpkg_path) as conn:
-            cursor = conn.cursor()
-
+        with get_connection_pool().connection(self.gpkg_path) as state:
             # Вставляем или обновляем значение
-            cursor.execute(f"""
-                INSERT OR REPLACE INTO {PROJECT_METADATA_TABLE} (key, value, description)
-                VALUES (?, ?, ?)
-            """, (key, value, description))
+            self._write_metadata(state, key, value, description)
 
         return True
-    
+
     def get_metadata(self, key: str) -> Optional[Dict[str, str]]:
         """
         Получение значения метаданных
@@ -404,31 +474,18 @@ class ProjectDB:
         Returns:
             Словарь с value и description или None
         """
-        # Используем sqlite3 для чтения метаданных
-        with sqlite3.connect(self.gpkg_path) as conn:
-            cursor = conn.cursor()
-
-            # Проверяем существование таблицы
-            cursor.execute(f"""
-                SELECT name FROM sqlite_master
-                WHERE type='table' AND name='{PROJECT_METADATA_TABLE}'
-            """)
-
-            if not cursor.fetchone():
-                return None
+        if not self.exists():
+            return None
 
-            cursor.execute(
-                f"SELECT value, description FROM {PROJECT_METADATA_TABLE} WHERE key = ?",
-                (key,)
-            )
-            result = cursor.fetchone()
+        with get_connection_pool().connection(self.gpkg_path) as state:
+            entry = self._load_metadata(state).get(key)
 
-            if result:
-                return {
-                    'value': result[0],
-                    'description': result[1] if result[1] else ''
-                }
-        return None
+        if entry is None:
+            return None
+        return {
+            'value': entry[0],
+            'description': entry[1] if entry[1] else ''
+        }
 
     def delete_metadata(self, key: str) -> bool:
         """
@@ -440,66 +497,48 @@ class ProjectDB:
         Returns:
             True если удаление успешно, False если ключ не найден
         """
-        with sqlite3.connect(self.gpkg_path) as conn:
-            cursor = conn.cursor()
+        if not self.exists():
+            log_warning(f"Таблица метаданных не существует")
+            return False
 
+        with get_connection_pool().connection(self.gpkg_path) as state:
             # Проверяем существование таблицы
-            cursor.execute(f"""
-                SELECT name FROM sqlite_master
-                WHERE type='table' AND name='{PROJECT_METADATA_TABLE}'
-            """)
-
-            if not cursor.fetchone():
+            self._load_metadata(state)
+            if not state.has_metadata_table:
                 log_warning(f"Таблица метаданных не существует")
                 return False
 
             # Удаляем запись
-            cursor.execute(
+            cursor = state.conn.execute(
                 f"DELETE FROM {PROJECT_METADATA_TABLE} WHERE key = ?",
                 (key,)
             )
-            conn.commit()
-
             deleted = cursor.rowcount > 0
-            if deleted:
-                log_info(f"Метаданные '{key}' удалены")
-            else:
-                log_warning(f"Метаданные '{key}' не найдены для удаления")
+            state.metadata.pop(key, None)
+
+        if deleted:
+            log_info(f"Метаданные '{key}' удалены")
+        else:
+            log_warning(f"Метаданные '{key}' не найдены для удаления")
 
-            return deleted
+        return deleted
 
     def get_all_metadata(self) -> Dict[str, Any]:
         """
         Получение всех метаданных проекта
 
         Returns:
-            Словарь метаданных
+            Словарь метаданных (копия - изменение не затрагивает кэш)
         """
-        # Используем sqlite3 для чтения всех метаданных
-        with sqlite3.connect(self.gpkg_path) as conn:
-            cursor = conn.cursor()
-
-            # Проверяем существование таблицы
-            cursor.execute(f"""
-                SELECT name FROM sqlite_master
-                WHERE type='table' AND name='{PROJECT_METADATA_TABLE}'
-            """)
-
-            if not cursor.fetchone():
-                return {}
-
-            # Загружаем все метаданные
-            cursor.execute(
-                f"SELECT key, value, description FROM {PROJECT_METADATA_TABLE}"
-            )
-            result = cursor.fetchall()
+        if not self.exists():
+            return {}
 
-            metadata = {}
-            for row in result:
-                metadata[row[0]] = {
-                    'value': row[1],
-                    'description': row[2]
-                }
+        with get_connection_pool().connection(self.gpkg_path) as state:
+            cached = self._load_metadata(state)
+            metadata = {
+                key: {'value': value, 'description': description}
+                for key, (value, description) in cached.items()
+            }
 
         return metadata
 
@@ -523,6 +562,9 @@ class ProjectDB:
             finally:
                 conn.close()
 
+        Изменения через это соединение видны методам *_metadata сразу:
+        кэш пула сбрасывается по PRAGMA data_version.
+
         Returns:
             sqlite3.Connection: Открытое соединение с GeoPackage
         """
@@ -534,7 +576,8 @@ class ProjectDB:
 
         ВАЖНО: Вызывать перед удалением/перемещением файла GPKG!
 
-        Очищает кэш слоёв, что позволяет:
+        Очищает кэш слоёв и закрывает соединение пула метаданных
+        (checkpoint WAL, journal_mode=DELETE), что позволяет:
         - Перемещать/удалять файл GPKG
         - Избежать блокировки файла в Windows
         """
@@ -550,4 +593,5 @@ class ProjectDB:
 
         # Принудительный сброс кэша
         self.layers = {}
+        get_connection_pool().close(self.gpkg_path)
         log_info("ProjectDB: Соединение закрыто")
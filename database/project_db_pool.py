@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+Пул соединений ProjectDB с GeoPackage проекта.
+
+Прежде каждый set/get/delete/get_all_metadata открывал новое
+sqlite3-соединение и заново проверял sqlite_master. Открытие проекта,
+выпуск и синхронизация читают / пишут десятки ключей подряд и платили
+за открытие файла и проверку схемы на каждом ключе.
+
+Поведение:
+    - одно соединение на файл (нормализованный путь), общее для всех
+      экземпляров ProjectDB; потоки работают с ним по очереди (RLock),
+      внутри connection() поток владеет соединением целиком
+    - WAL + synchronous=NORMAL только для локальных файлов, доступных на
+      запись (не UNC / сетевой диск - WAL там небезопасен) и не открытых
+      другими соединениями (слои QGIS/OGR): из WAL такой файл не вернуть
+      в DELETE, пока его держат открытым
+    - наличие таблицы метаданных и сами метаданные кэшируются в состоянии
+      файла; запись через ProjectDB обновляет кэш сразу (write-through)
+    - изменение файла другим соединением (QGIS/OGR, get_connection(),
+      другой процесс) видно по PRAGMA data_version - кэш сбрасывается;
+      подмена файла (пересоздание) - по (st_dev, st_ino)
+    - после PROJECT_DB_IDLE_CLOSE_SECONDS без обращений соединение
+      закрывается, файл не держится открытым
+    - любое закрытие (close(path), простой, пересоздание файла) - checkpoint
+      и возврат journal_mode=DELETE (файл проекта самодостаточен для
+      копирования / переноса папки)
+
+Зависимости: только стандартная библиотека (без qgis).
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from Daman_QGIS.utils import log_warning
+from Daman_QGIS.constants import (
+    PROJECT_DB_IDLE_CLOSE_SECONDS, PROJECT_DB_BUSY_TIMEOUT, PROJECT_DB_WAL_ENABLED,
+)
+
+__all__ = ['GpkgConnectionPool', 'GpkgState', 'get_connection_pool', 'is_local_path', 'is_file_in_use']
+
+# GetDriveTypeW: сетевой диск
+_DRIVE_REMOTE = 4
+# CreateFileW: чтение, открыть существующий, нарушение совместного доступа
+_GENERIC_READ = 0x80000000
+_OPEN_EXISTING = 3
+_ERROR_SHARING_VIOLATION = 32
+
+
+def is_local_path(path: str) -> bool:
+    """Файл на локальном диске (не UNC и не подключённый сетевой диск)."""
+    normalized = os.path.abspath(path)
+    if normalized.startswith(('\\\\', '//')):
+        return False
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            root = os.path.splitdrive(normalized)[0] + '\\'
+            return ctypes.windll.kernel32.GetDriveTypeW(root) != _DRIVE_REMOTE
+        except Exception:
+            return False
+    return True
+
+
+def is_file_in_use(path: str) -> bool:
+    """
+    Файл открыт другим дескриптором (слой QGIS/OGR, другое соединение).
+
+    Windows - пробное открытие без совместного доступа (откажет, если файл
+    открыт любым процессом). Linux - дескрипторы текущего процесса
+    (/proc/self/fd): слои проекта открыты в процессе QGIS. Где проверить
+    нельзя - файл считается занятым.
+    """
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+            kernel32.CreateFileW.restype = ctypes.c_void_p
+            handle = kernel32.CreateFileW(
+                os.path.abspath(path), _GENERIC_READ, 0, None, _OPEN_EXISTING, 0, None
+            )
+            if handle is None or handle == ctypes.c_void_p(-1).value:
+                return ctypes.get_last_error() == _ERROR_SHARING_VIOLATION
+            kernel32.CloseHandle(ctypes.c_void_p(handle))
+            return False
+        except Exception:
+            return True
+
+    fd_dir = '/proc/self/fd'
+    if not os.path.isdir(fd_dir):
+        return True
+    try:
+        st = os.stat(path)
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return True
+    for fd in fds:
+        try:
+            fd_st = os.stat(os.path.join(fd_dir, fd))
+        except OSError:
+            continue
+        if (fd_st.st_dev, fd_st.st_ino) == (st.st_dev, st.st_ino):
+            return True
+    return False
+
+
+class GpkgState:
+    """Соединение с одним GeoPackage и кэш метаданных."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.identity: Optional[Tuple[int, int]] = None
+        self.data_version: Optional[int] = None
+        self.wal = False
+        self.depth = 0
+        self.last_used = 0.0
+        self.timer: Optional[threading.Timer] = None
+        # None - неизвестно (проверить sqlite_master)
+        self.has_metadata_table: Optional[bool] = None
+        # key -> (value, description); None - не загружено
+        self.metadata: Optional[Dict[str, Tuple[str, str]]] = None
+
+    def invalidate(self) -> None:
+        """Сбросить кэш схемы и метаданных."""
+        self.has_metadata_table = None
+        self.metadata = None
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.conn is not None and self.conn.in_transaction
+
+
+class GpkgConnectionPool:
+    """Общие соединения с GeoPackage проекта (по одному на файл)."""
+
+    def __init__(
+        self,
+        idle_close: float = PROJECT_DB_IDLE_CLOSE_SECONDS,
+        busy_timeout: float = PROJECT_DB_BUSY_TIMEOUT,
+        wal_enabled: bool = PROJECT_DB_WAL_ENABLED
+    ) -> None:
+        """
+        Args:
+            idle_close: Пауза в обращениях до закрытия соединения, сек
+            busy_timeout: Ожидание блокировки файла, сек
+            wal_enabled: Включать WAL для локальных файлов
+        """
+        self.idle_close = idle_close
+        self.busy_timeout = busy_timeout
+        self.wal_enabled = wal_enabled
+        self._states: Dict[str, GpkgState] = {}
+        self._lock = threading.Lock()
+        self._stats = {'opens': 0, 'operations': 0, 'invalidations': 0}
+
+    # ------------------------------------------------------------------
+    # Публичный API
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def connection(self, path: str) -> Iterator[GpkgState]:
+        """
+        Захватить соединение с файлом на время блока.
+
+        Соединение в autocommit (isolation_level=None): одиночные запросы
+        фиксируются сразу, транзакция - явный BEGIN / COMMIT (см. transaction).
+
+        Raises:
+            sqlite3.OperationalError: Файл не существует или не открывается
+        """
+        state = self._state(path)
+        with state.lock:
+            state.depth += 1
+            try:
+                if state.depth == 1:
+                    self._prepare(state)
+                self._stats['operations'] += 1
+                yield state
+            finally:
+                state.depth -= 1
+                if state.depth == 0:
+                    state.last_used = time.monotonic()
+                    self._arm_idle_timer(state)
+
+    @contextmanager
+    def transaction(self, path: str) -> Iterator[GpkgState]:
+        """
+        Одна транзакция записи на весь блок (BEGIN IMMEDIATE / COMMIT).
+
+        Вложенный вызов входит во внешнюю транзакцию. При исключении -
+        ROLLBACK и сброс кэша метаданных (write-through уже обновил его).
+        """
+        with self.connection(path) as state:
+            if state.in_transaction:
+                yield state
+                return
+            state.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield state
+            except BaseException:
+                if state.conn.in_transaction:
+                    state.conn.execute("ROLLBACK")
+                state.invalidate()
+                raise
+            # Собственный COMMIT не меняет data_version этого соединения - кэш остаётся
+            state.conn.execute("COMMIT")
+
+    def close(self, path: str, restore_journal: bool = True) -> None:
+        """
+        Закрыть соединение с файлом (перед переносом / удалением GPKG).
+
+        Args:
+            path: Путь к GeoPackage
+            restore_journal: Вернуть journal_mode=DELETE (без -wal/-shm рядом);
+                False - только если файл сразу пересоздаётся
+        """
+        key = self._key(path)
+        with self._lock:
+            state = self._states.pop(key, None)
+        if state is None:
+            return
+        with state.lock:
+            if state.timer is not None:
+                state.timer.cancel()
+                state.timer = None
+            self._close_state(state, restore_journal=restore_journal)
+
+    def close_all(self) -> None:
+        """Закрыть все соединения пула."""
+        with self._lock:
+            paths = list(self._states)
+        for path in paths:
+            self.close(path)
+
+    def is_open(self, path: str) -> bool:
+        """Соединение с файлом сейчас открыто."""
+        state = self._states.get(self._key(path))
+        return state is not None and state.conn is not None
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики: открытий файла, операций, сбросов кэша, открытых соединений."""
+        with self._lock:
+            open_count = sum(1 for state in self._states.values() if state.conn is not None)
+        return dict(self._stats, open=open_count)
+
+    # ------------------------------------------------------------------
+    # Внутренние методы
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def _state(self, path: str) -> GpkgState:
+        key = self._key(path)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = GpkgState(key)
+                self._states[key] = state
+            return state
+
+    @staticmethod
+    def _identity(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    @staticmethod
+    def _data_version(conn: sqlite3.Connection) -> int:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _prepare(self, state: GpkgState) -> None:
+        """Открыть / проверить соединение перед первой операцией блока."""
+        identity = self._identity(state.path)
+        if identity is None:
+            # sqlite3.connect создал бы пустой файл на месте отсутствующего GPKG
+            self._close_state(state, restore_journal=False)
+            raise sqlite3.OperationalError(f"unable to open database file: {state.path}")
+        if state.conn is not None and identity != state.identity:
+            # Файл удалён или пересоздан - старое соединение смотрит в прежний файл
+            # (journal_mode прежнего файла уже не важен)
+            self._close_state(state, restore_journal=False)
+            self._stats['invalidations'] += 1
+        if state.conn is None:
+            self._open(state)
+            state.identity = identity
+            return
+        version = self._data_version(state.conn)
+        if version != state.data_version:
+            state.data_version = version
+            if state.has_metadata_table is not None or state.metadata is not None:
+                self._stats['invalidations'] += 1
+            state.invalidate()
+
+    def _open(self, state: GpkgState) -> None:
+        # Проверка до connect: собственный дескриптор соединения тоже занял бы файл
+        use_wal = (
+            self.wal_enabled and is_local_path(state.path)
+            and os.access(state.path, os.W_OK) and not is_file_in_use(state.path)
+        )
+        conn = sqlite3.connect(
+            state.path, timeout=self.busy_timeout,
+            isolation_level=None, check_same_thread=False
+        )
+        try:
+            pragma = "PRAGMA journal_mode=WAL" if use_wal else "PRAGMA journal_mode"
+            mode = conn.execute(pragma).fetchone()[0]
+            # Файл мог остаться в WAL с прошлого раза - тогда закрытие тоже вернёт DELETE
+            state.wal = str(mode).lower() == 'wal'
+            if state.wal:
+                conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            # Файл занят другим соединением - остаёмся в текущем режиме
+            state.wal = False
+            log_warning(f"ProjectDB: WAL не включён для {os.path.basename(state.path)}: {e}")
+        state.conn = conn
+        state.data_version = self._data_version(conn)
+        state.invalidate()
+        self._stats['opens'] += 1
+
+    def _close_state(self, state: GpkgState, restore_journal: bool) -> None:
+        conn, state.conn = state.conn, None
+        state.identity = None
+        state.data_version = None
+        state.invalidate()
+        if conn is None:
+            return
+        try:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if state.wal:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                if restore_journal:
+                    conn.execute("PRAGMA journal_mode=DELETE")
+        except sqlite3.Error:
+            pass  # Файл занят QGIS - WAL закроет последнее соединение
+        finally:
+            conn.close()
+            state.wal = False
+
+    def _arm_idle_timer(self, state: GpkgState) -> None:
+        """Один таймер на файл: перевзводится, пока к файлу обращаются."""
+        if self.idle_close <= 0:
+            self._close_state(state, restore_journal=True)
+            return
+        if state.timer is None and state.conn is not None:
+            self._start_timer(state, self.idle_close)
+
+    def _start_timer(self, state: GpkgState, delay: float) -> None:
+        timer = threading.Timer(delay, self._on_idle, args=(state,))
+        timer.daemon = True
+        state.timer = timer
+        timer.start()
+
+    def _on_idle(self, state: GpkgState) -> None:
+        with state.lock:
+            state.timer = None
+            # Блок connection() ещё идёт - таймер взведёт его завершение
+            if state.depth > 0 or state.conn is None:
+                return
+            remaining = self.idle_close - (time.monotonic() - state.last_used)
+            if remaining > 0.01:
+                self._start_timer(state, remaining)
+            else:
+                self._close_state(state, restore_journal=True)
+
+
+_pool: Optional[GpkgConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> GpkgConnectionPool:
+    """Общий пул соединений ProjectDB."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = GpkgConnectionPool()
+    return _pool
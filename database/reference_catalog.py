@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Индексированный каталог справочника (BaseReferenceLoader._get_catalog).
+
+Строится один раз на загрузку справочника: хэш-индексы по уникальным ключам
+(full_name, ...) и многозначные индексы (section_num, creating_function, group, ...).
+Хранится в BaseReferenceLoader._shared_index_cache, поэтому сбрасывается
+вместе с кэшем загрузчика (clear_cache / reload).
+
+Счётчики lookups / lookup_seconds показывают экономию относительно линейного
+перебора списка: каждый запрос - один несостоявшийся проход по записям (report).
+BaseReferenceLoader пишет report() в лог при выгрузке плагина.
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from Daman_QGIS.utils import log_warning
+
+
+class ReferenceCatalog:
+    """Справочник (список словарей) с хэш-индексами по ключам"""
+
+    def __init__(
+        self,
+        name: str,
+        items: List[Dict[str, Any]],
+        unique_keys: Iterable[str] = (),
+        multi_keys: Iterable[str] = ()
+    ) -> None:
+        """
+        Args:
+            name: Имя справочника (для лога)
+            items: Записи справочника в исходном порядке
+            unique_keys: Поля с уникальным значением (при дубликатах get/mapping
+                отдают первую запись - как линейный поиск, с last=True -
+                последнюю, как словарь {значение: запись})
+            multi_keys: Поля, по которым выбираются группы записей
+                (порядок внутри группы - исходный)
+        """
+        start = time.perf_counter()
+        self.name = name
+        self.items = items
+        self._unique: Dict[str, Dict[Any, Dict[str, Any]]] = {key: {} for key in unique_keys}
+        self._multi: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {key: {} for key in multi_keys}
+        # Последняя запись для повторяющихся значений уникальных ключей
+        self._last: Dict[str, Dict[Any, Dict[str, Any]]] = {key: {} for key in unique_keys}
+
+        unhashable = 0
+        for item in items:
+            for key, index in self._unique.items():
+                value = item.get(key)
+                if value is None:
+                    continue
+                try:
+                    if value in index:
+                        self._last[key][value] = item
+                        continue
+                    index[value] = item
+                except TypeError:
+                    unhashable += 1
+            for key, index in self._multi.items():
+                value = item.get(key)
+                if value is None:
+                    continue
+                try:
+                    index.setdefault(value, []).append(item)
+                except TypeError:
+                    unhashable += 1
+
+        for key, repeated in self._last.items():
+            if repeated:
+                shown = ", ".join(str(value) for value in list(repeated)[:5])
+                more = f" и ещё {len(repeated) - 5}" if len(repeated) > 5 else ""
+                log_warning(
+                    f"ReferenceCatalog: {name} - повторяющиеся {key} ({len(repeated)}): {shown}{more}"
+                )
+        if unhashable:
+            log_warning(f"ReferenceCatalog: {name} - {unhashable} нехэшируемых значений ключей не проиндексировано")
+
+        self.build_seconds = time.perf_counter() - start
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, key: str, value: Any, last: bool = False) -> Optional[Dict[str, Any]]:
+        """Запись по уникальному ключу (None если нет; last - последняя из дубликатов)"""
+        start = time.perf_counter()
+        result = None
+        if last:
+            result = self._last[key].get(value)
+        if result is None:
+            result = self._unique[key].get(value)
+        self._count(start)
+        return result
+
+    def select(self, key: str, value: Any) -> List[Dict[str, Any]]:
+        """Записи с указанным значением многозначного ключа (новый список)"""
+        start = time.perf_counter()
+        result = list(self._multi[key].get(value, ()))
+        self._count(start)
+        return result
+
+    def values(self, key: str) -> List[Any]:
+        """Все значения многозначного ключа (в порядке первого появления)"""
+        return list(self._multi[key])
+
+    def mapping(self, key: str, last: bool = False) -> Dict[Any, Dict[str, Any]]:
+        """Копия уникального индекса {значение: запись} (last - последняя из дубликатов)"""
+        result = dict(self._unique[key])
+        if last:
+            result.update(self._last[key])
+        return result
+
+    def _count(self, start: float) -> None:
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - start
+
+    def report(self) -> str:
+        """Строка статистики для лога"""
+        return (
+            f"{self.name}: {len(self.items)} записей, построение {self.build_seconds * 1000:.1f} мс, "
+            f"запросов {self.lookups} ({self.lookup_seconds * 1000:.2f} мс), "
+            f"не выполнено переборов списка {self.lookups}"
+        )
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Дисковое хранилище справочников BaseReferenceLoader (профиль QGIS).
+
+Тёплый старт QGIS берёт справочные JSON с диска вместо ~25 запросов к API;
+актуальность проверяется в фоне условным GET (BaseReferenceLoader._revalidate).
+
+Структура папки (QgsApplication.qgisSettingsDirPath() / REFERENCE_CACHE_DIR_NAME):
+    index.json        - {filename: {etag, last_modified, sha256, plugin_version, stored_at}}
+    <filename>        - данные справочника (JSON, как вернул сервер в поле 'data')
+
+Запись с другой PLUGIN_VERSION считается отсутствующей (формат справочников
+привязан к версии плагина). Запись атомарная (tmp + os.replace): обрыв
+посреди записи не оставляет битый файл. Отсутствующий или испорченный файл
+удаляется из индекса при чтении - следующая загрузка с сервера запишет его
+заново.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from Daman_QGIS.utils import log_warning
+
+
+class ReferenceDiskStore:
+    """Файловый кэш справочников с валидаторами сервера (ETag / Last-Modified)"""
+
+    INDEX_FILENAME = "index.json"
+
+    def __init__(self, directory: str) -> None:
+        """
+        Args:
+            directory: Папка хранилища (создаётся при первой записи)
+        """
+        from Daman_QGIS.constants import PLUGIN_VERSION
+
+        self.directory = Path(directory)
+        self.plugin_version = PLUGIN_VERSION
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @classmethod
+    def for_profile(cls) -> Optional['ReferenceDiskStore']:
+        """Хранилище в активном профиле QGIS (None вне QGIS)"""
+        try:
+            from qgis.core import QgsApplication
+            from Daman_QGIS.constants import REFERENCE_CACHE_DIR_NAME
+
+            settings_dir = QgsApplication.qgisSettingsDirPath()
+        except Exception as e:
+            log_warning(f"ReferenceDiskStore: Профиль QGIS недоступен: {e}")
+            return None
+        if not settings_dir:
+            return None
+        return cls(str(Path(settings_dir) / REFERENCE_CACHE_DIR_NAME))
+
+    # ------------------------------------------------------------------
+    # Чтение
+    # ------------------------------------------------------------------
+
+    def get(self, filename: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        Справочник с диска
+
+        Returns:
+            (data, meta) или None (нет записи / другая версия плагина / файл битый)
+        """
+        with self._lock:
+            meta = self._load_index().get(filename)
+        if not meta or meta.get('plugin_version') != self.plugin_version:
+            return None
+
+        try:
+            raw = (self.directory / filename).read_bytes()
+        except OSError:
+            log_warning(f"ReferenceDiskStore: Файл {filename} не читается, запись удалена")
+            self.remove(filename)
+            return None
+        if hashlib.sha256(raw).hexdigest() != meta.get('sha256'):
+            log_warning(f"ReferenceDiskStore: Контрольная сумма {filename} не совпадает, запись удалена")
+            self.remove(filename)
+            return None
+        try:
+            return json.loads(raw.decode('utf-8')), dict(meta)
+        except ValueError:
+            self.remove(filename)
+            return None
+
+    def validators(self, filename: str) -> Dict[str, str]:
+        """Валидаторы записи для условного запроса (etag, last_modified)"""
+        with self._lock:
+            meta = self._load_index().get(filename) or {}
+        if meta.get('plugin_version') != self.plugin_version:
+            return {}
+        return {key: meta[key] for key in ('etag', 'last_modified') if meta.get(key)}
+
+    def known_files(self) -> List[str]:
+        """Все справочники, когда-либо сохранённые в хранилище"""
+        with self._lock:
+            return sorted(self._load_index())
+
+    # ------------------------------------------------------------------
+    # Запись
+    # ------------------------------------------------------------------
+
+    def put(
+        self,
+        filename: str,
+        data: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> bool:
+        """
+        Сохранение справочника
+
+        Файл переписывается и при неизменном содержимом, если его нет на
+        диске (удалён вручную, антивирус).
+
+        Returns:
+            True если содержимое изменилось относительно прежней записи
+        """
+        raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self.directory / filename
+
+        with self._lock:
+            index = self._load_index()
+            previous = index.get(filename) or {}
+            changed = previous.get('sha256') != digest or previous.get('plugin_version') != self.plugin_version
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                if changed or not path.is_file():
+                    self._write_atomic(path, raw)
+                index[filename] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'sha256': digest,
+                    'plugin_version': self.plugin_version,
+                    'stored_at': time.time(),
+                }
+                self._save_index(index)
+            except OSError as e:
+                log_warning(f"ReferenceDiskStore: Не удалось сохранить {filename}: {e}")
+                return False
+        return changed
+
+    def touch(self, filename: str) -> None:
+        """Сервер подтвердил актуальность (304) - обновляем время проверки"""
+        with self._lock:
+            index = self._load_index()
+            if filename in index:
+                index[filename]['stored_at'] = time.time()
+                try:
+                    self._save_index(index)
+                except OSError:
+                    pass
+
+    def remove(self, filename: str) -> None:
+        """Удаление записи (следующая загрузка пойдёт на сервер)"""
+        with self._lock:
+            index = self._load_index()
+            if index.pop(filename, None) is None:
+                return
+            try:
+                self._save_index(index)
+            except OSError:
+                pass
+            try:
+                (self.directory / filename).unlink()
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Индекс
+    # ------------------------------------------------------------------
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if self._index is None:
+            try:
+                with open(self.directory / self.INDEX_FILENAME, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                self._index = loaded if isinstance(loaded, dict) else {}
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        self._write_atomic(
+            self.directory / self.INDEX_FILENAME,
+            json.dumps(index, ensure_ascii=False, indent=1).encode('utf-8')
+        )
+
+    @staticmethod
+    def _write_atomic(path: Path, raw: bytes) -> None:
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
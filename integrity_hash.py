@@ -12,16 +12,32 @@ upload_channel_hash). Server-side вычисляет хеш по тому же 
 - НЕ добавлять third-party зависимости (requests, lxml и т.п.) —
   scripts/main.py временно вставляет QGIS_PLUGIN_DIR.parent в sys.path
   для импорта; третий-party imports могут зацепить sibling-плагины.
-- РАЗРЕШЕНО ТОЛЬКО stdlib (hashlib, os, pathlib, typing).
+- РАЗРЕШЕНО ТОЛЬКО stdlib (hashlib, os, pathlib, typing, json, time).
 
 Для logging skipped files — использовать hook `_on_skip` (см. ниже),
 который плагин monkey-patch'ит в main_plugin.initGui (`_ih._on_skip = ...`).
+
+Инкрементальный режим (compute_plugin_hash_incremental, используется
+get_cached_or_compute на старте сессии и в heartbeat): manifest
+(path, size, mtime_ns, ctime_ns, file_sha256) рядом с каталогом плагина;
+перечитываются только файлы с изменившимся stat. Итоговый хеш тот же,
+что у compute_plugin_hash. Manifest без валидной контрольной суммы,
+другой версии или от другого каталога игнорируется -> полный пересчёт.
+CLI (scripts/main.py) по-прежнему вызывает compute_plugin_hash.
+
+Контрольная сумма manifest - несекретный SHA-256: она ловит порчу файла
+(обрыв записи, битый диск), но НЕ защищает от намеренной подделки -
+manifest с подобранными file_sha256 и пересчитанной суммой будет принят.
+Хеш плагина считается на стороне клиента и от локального злоумышленника
+не защищён в принципе (он может изменить и сам код расчёта).
 """
 
 import hashlib
+import json
 import os
+import time
 from pathlib import Path
-from typing import Callable, List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 
 def compute_plugin_hash(plugin_dir: str) -> str:
@@ -42,40 +58,217 @@ def compute_plugin_hash(plugin_dir: str) -> str:
     Returns:
         64-символьный lowercase hex SHA-256.
     """
-    EXCLUDE_DIRS = {"__pycache__", ".git"}
-    EXCLUDE_SUFFIX = (".pyc",)
-
     plugin_path = Path(plugin_dir)
     items: List[str] = []
+    for rel, filepath in _iter_plugin_files(plugin_path):
+        file_hash = _hash_file(filepath, rel)
+        if file_hash is not None:
+            items.append(f"{rel}:{file_hash}")
+    return _combine(items)
+
+
+_EXCLUDE_DIRS = {"__pycache__", ".git"}
+_EXCLUDE_SUFFIX = (".pyc",)
+
+
+def _iter_plugin_files(plugin_path: Path) -> Iterator[Tuple[str, Path]]:
+    """(POSIX rel path, абсолютный путь) файлов, входящих в хеш."""
     for root, dirs, files in os.walk(plugin_path):
         # In-place prune для скорости (не спускаемся в исключённые)
-        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
+        dirs[:] = [d for d in dirs if d not in _EXCLUDE_DIRS]
         for filename in files:
-            if filename.endswith(EXCLUDE_SUFFIX):
+            if filename.endswith(_EXCLUDE_SUFFIX):
                 continue
             filepath = Path(root) / filename
-            try:
-                rel = filepath.relative_to(plugin_path).as_posix()
-                with open(filepath, "rb") as f:
-                    file_hash = hashlib.sha256(f.read()).hexdigest()
-                items.append(f"{rel}:{file_hash}")
-            except (OSError, IOError) as e:
-                # Не можем прочитать файл (lock, AV scan, deny-read ACL).
-                # Сохраняем lenient semantics (skip — продолжаем строить
-                # hash из остальных файлов), но эмитим signal для debug
-                # + dashboard alerting на mass-skip events.
-                # FIX-4 (review 2026-05-09): hook вместо silent pass.
-                try:
-                    rel_for_log = filepath.relative_to(plugin_path).as_posix()
-                except (ValueError, OSError):
-                    rel_for_log = str(filepath)
-                _on_skip(rel_for_log, e)
+            yield filepath.relative_to(plugin_path).as_posix(), filepath
+
+
+def _hash_file(filepath: Path, rel: str) -> Optional[str]:
+    """SHA-256 файла или None (файл не читается -> _on_skip)."""
+    try:
+        with open(filepath, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except (OSError, IOError) as e:
+        # Не можем прочитать файл (lock, AV scan, deny-read ACL).
+        # Сохраняем lenient semantics (skip — продолжаем строить
+        # hash из остальных файлов), но эмитим signal для debug
+        # + dashboard alerting на mass-skip events.
+        # FIX-4 (review 2026-05-09): hook вместо silent pass.
+        _on_skip(rel, e)
+        return None
 
+
+def _combine(items: List[str]) -> str:
+    """Финальный хеш: SHA-256 от sorted "{path}:{file_sha256}" через \\n."""
     items.sort()
     blob = "\n".join(items).encode("utf-8")
     return hashlib.sha256(blob).hexdigest()
 
 
+# ---------------------------------------------------------------------------
+# Инкрементальный хеш с manifest
+# ---------------------------------------------------------------------------
+
+MANIFEST_VERSION = 1
+
+# Файлы с mtime ближе RACY_WINDOW_NS к моменту записи manifest не доверяются
+# (изменение в пределах гранулярности mtime ФС не меняет stat; FAT/SMB - 2 сек)
+RACY_WINDOW_NS = 2_000_000_000
+
+# Статистика последнего compute_plugin_hash_incremental (для log_timing плагина):
+# files, rehashed, reused, full (manifest не использован), seconds, manifest_saved,
+# full_seconds (последний полный пересчёт по manifest; None - неизвестно)
+last_stats: Dict[str, object] = {}
+
+
+def manifest_path_for(plugin_dir: str) -> str:
+    """Manifest рядом с каталогом плагина (вне дерева - не входит в хеш).
+
+    <plugins>/.Daman_QGIS.hash_manifest.json для <plugins>/Daman_QGIS.
+    """
+    plugin_path = Path(plugin_dir).resolve()
+    return str(plugin_path.parent / f".{plugin_path.name}.hash_manifest.json")
+
+
+def _manifest_checksum(plugin_dir: str, written_ns: int, entries: Dict[str, list]) -> str:
+    """Контрольная сумма содержимого manifest (только порча, не подделка)."""
+    payload = json.dumps(
+        [MANIFEST_VERSION, plugin_dir, written_ns, entries],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_manifest(
+    path: str, plugin_dir: str
+) -> Optional[Tuple[int, Dict[str, list], Optional[float]]]:
+    """(written_ns, entries, full_seconds) или None: нет файла, не JSON, чужой/испорченный."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return None
+        if data.get("plugin_dir") != plugin_dir:
+            return None
+        written_ns = data["written_ns"]
+        entries = data["entries"]
+        if not isinstance(written_ns, int) or not isinstance(entries, dict):
+            return None
+        if data.get("checksum") != _manifest_checksum(plugin_dir, written_ns, entries):
+            return None
+        full_seconds = data.get("full_seconds")
+        if not isinstance(full_seconds, (int, float)):
+            full_seconds = None
+        return written_ns, entries, full_seconds
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_manifest(
+    path: str, plugin_dir: str, entries: Dict[str, list], full_seconds: Optional[float]
+) -> bool:
+    """Атомарная запись manifest (tmp + os.replace). False при ошибке.
+
+    full_seconds - длительность последнего полного пересчёта (для
+    сравнения в log_timing), в контрольную сумму не входит.
+    """
+    written_ns = time.time_ns()
+    data = {
+        "version": MANIFEST_VERSION,
+        "plugin_dir": plugin_dir,
+        "written_ns": written_ns,
+        "entries": entries,
+        "full_seconds": full_seconds,
+        "checksum": _manifest_checksum(plugin_dir, written_ns, entries),
+    }
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def compute_plugin_hash_incremental(plugin_dir: str, manifest_path: Optional[str] = None) -> str:
+    """Хеш дерева плагина с переиспользованием file_sha256 из manifest.
+
+    Результат идентичен compute_plugin_hash(plugin_dir). Файл перечитывается,
+    если его нет в manifest, изменился (size, mtime_ns, ctime_ns) или его
+    mtime попадает в RACY_WINDOW_NS до записи manifest. ctime_ns меняется
+    и при откате mtime через os.utime (распаковка архива, синхронизация
+    с сохранением времени) - такое изменение тоже перечитывается.
+
+    Args:
+        plugin_dir: абсолютный путь к корню плагина
+        manifest_path: путь к manifest (по умолчанию manifest_path_for)
+
+    Returns:
+        64-символьный lowercase hex SHA-256.
+    """
+    start = time.perf_counter()
+    plugin_path = Path(plugin_dir)
+    dir_key = str(plugin_path.resolve())
+    if manifest_path is None:
+        manifest_path = manifest_path_for(plugin_dir)
+
+    loaded = _load_manifest(manifest_path, dir_key)
+    written_ns, old_entries, full_seconds = loaded if loaded is not None else (0, {}, None)
+
+    items: List[str] = []
+    entries: Dict[str, list] = {}
+    rehashed = 0
+    for rel, filepath in _iter_plugin_files(plugin_path):
+        try:
+            st = os.stat(filepath)
+        except OSError as e:
+            _on_skip(rel, e)
+            continue
+        key = [st.st_size, st.st_mtime_ns, st.st_ctime_ns]
+        cached = old_entries.get(rel)
+        if (
+            cached is not None
+            and cached[:3] == key
+            and written_ns - st.st_mtime_ns > RACY_WINDOW_NS
+            and written_ns - st.st_ctime_ns > RACY_WINDOW_NS
+        ):
+            file_hash = cached[3]
+        else:
+            file_hash = _hash_file(filepath, rel)
+            rehashed += 1
+            if file_hash is None:
+                continue
+        entries[rel] = key + [file_hash]
+        items.append(f"{rel}:{file_hash}")
+
+    result = _combine(items)
+    seconds = time.perf_counter() - start
+    if loaded is None:
+        full_seconds = seconds
+
+    # Manifest переписывается только при изменениях (read-only профиль - не ошибка)
+    saved = False
+    if rehashed or loaded is None or len(entries) != len(old_entries):
+        saved = _save_manifest(manifest_path, dir_key, entries, full_seconds)
+
+    last_stats.clear()
+    last_stats.update({
+        "files": len(items),
+        "rehashed": rehashed,
+        "reused": len(items) - rehashed,
+        "full": loaded is None,
+        "manifest_saved": saved,
+        "seconds": seconds,
+        "full_seconds": full_seconds,
+    })
+    return result
+
+
 def _default_on_skip(rel_path: str, error: Exception) -> None:
     """No-op default. Сохраняет stdlib-only constraint модуля."""
     pass
@@ -106,11 +299,12 @@ def get_cached_or_compute(plugin_dir: str) -> str:
     должен использовать эту функцию вместо compute_plugin_hash напрямую,
     чтобы получить пользу cache. compute_plugin_hash остаётся public для
     scripts/main.py CLI usage где cache не нужен (скрипт = single shot).
+    Miss вычисляется инкрементально (manifest), статистика - last_stats.
     """
     global _cached_hash, _cached_dir
     if _cached_hash is not None and _cached_dir == plugin_dir:
         return _cached_hash
-    _cached_hash = compute_plugin_hash(plugin_dir)
+    _cached_hash = compute_plugin_hash_incremental(plugin_dir)
     _cached_dir = plugin_dir
     return _cached_hash
 
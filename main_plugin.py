@@ -37,7 +37,8 @@ warnings.filterwarnings("ignore", category=DeprecationWarning, module="ezdxf")
 warnings.filterwarnings("ignore", category=DeprecationWarning, module="pyparsing")
 # -----------------------------------------------------------------------------
 
-from typing import Dict, Tuple, Optional, Callable, Any, List
+from contextlib import nullcontext
+from typing import Dict, Tuple, Optional, Callable, Any, List, ContextManager
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication, Qt, QTimer
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction, QToolBar, QMenu, QMessageBox, QWidget
@@ -64,6 +65,11 @@ from Daman_QGIS.managers import (
     track_exception
 )
 
+# Оркестрация и замеры запуска initGui (M_38)
+from Daman_QGIS.managers.infrastructure.submodules.Msm_38_2_startup_profiler import (
+    StartupOrchestrator, StartupProfiler
+)
+
 # Import dependency checker (ПОСЛЕ полной загрузки managers)
 from Daman_QGIS.tools.F_4_plagin.F_4_1_plugin_diagnostics import F_4_1_PluginDiagnostics
 
@@ -186,6 +192,19 @@ class DamanQGIS:
         # Реестр подключенных Qt сигналов для корректного отключения
         self._signal_connections = []
 
+        # NSPD WMTS preprocessor (id для снятия при unload)
+        self._nspd_preprocessor_id = None
+
+        # Замеры запуска (Msm_38_2): отчёт сохраняется после initGui
+        # и всех отложенных этапов (_schedule_deferred)
+        self._startup_profiler: Optional[StartupProfiler] = None
+        self._startup_outcome: Optional[str] = None
+        self._startup_deferred_pending = 0
+        self._startup_profile_saved = False
+
+        # Пропуски файлов фонового prewarm plugin_hash (телеметрия - из GUI-потока)
+        self._integrity_skips: List[Tuple[str, str]] = []
+
     def _get_plugin_version(self) -> str:
         """Получение версии плагина из metadata.txt"""
         try:
@@ -289,9 +308,14 @@ class DamanQGIS:
 
         return action
     def initGui(self) -> None:
-        """Создание элементов меню и панели инструментов."""
-        from time import perf_counter
+        """Создание элементов меню и панели инструментов.
 
+        Шаги запуска объявлены с зависимостями (Msm_38_2_StartupOrchestrator):
+        GUI-шаги выполняются по порядку на GUI-потоке, prewarm plugin_hash -
+        в фоне параллельно с F_4_1, менеджерами и сетевыми фильтрами.
+        Телеметрия и обновление профиля - после появления тулбара.
+        Замеры: log_timing + <daman_logs>/<session_id>.startup.json.
+        """
         # --- Platform Check ---
         if sys.platform != 'win32':
             self.iface.messageBar().pushMessage(
@@ -301,28 +325,60 @@ class DamanQGIS:
             )
             return
 
-        _t_total = perf_counter()
+        self._startup_profiler = StartupProfiler(
+            on_span=lambda path, seconds: log_timing(f"Daman_QGIS: [TIMING] {path}: {seconds:.3f}s")
+        )
 
-        # --- Session Logging (M_38) --- MUST be first
-        _t = perf_counter()
-        from Daman_QGIS.managers._registry import registry
+        startup = StartupOrchestrator(self._startup_profiler)
+        # M_38 MUST be first
+        startup.add('session_log', self._startup_session_log)
+        startup.add('profile', self._startup_profile, requires=('session_log',), optional=False)
+        startup.add('auto_update', self._startup_auto_update, requires=('profile',))
+        # Хеш дерева - после M_42 (обновление заменяет файлы плагина)
+        startup.add('plugin_hash', self._startup_plugin_hash, requires=('auto_update',), background=True)
+        startup.add('deps_check', self._startup_deps_check, requires=('auto_update',))
+        startup.add('managers', self._init_managers, requires=('deps_check',), optional=False)
+        startup.add('nspd_preprocessor', self._register_nspd_preprocessor, requires=('managers',))
+        startup.add('nam_cache', self._setup_nam_cache, requires=('managers',))
+        startup.add('wms_filter', self._setup_wms_retry_filter, requires=('managers',))
+        startup.add('license', self._startup_license, requires=('managers', 'plugin_hash'), optional=False)
+        startup.add('toolbar', self._build_full_toolbar, requires=('license',), optional=False)
+
+        outcome = "error"
+        completed = False
         try:
-            session_log = registry.get('M_38')
-            session_log.initialize()
-        except Exception as e:
-            log_warning(f"Daman_QGIS: Session logging init failed: {e}")
-        log_timing(f"Daman_QGIS: [TIMING] M_38 session log: {perf_counter() - _t:.3f}s")
+            completed = startup.run()
+            outcome = "toolbar" if completed else f"stopped:{startup.stopped_at}"
+        finally:
+            self._startup_outcome = outcome
+            self._save_startup_profile()
 
-        # --- Profile Setup (M_37) ---
-        _t = perf_counter()
+        if not completed:
+            return
+
+        # --- Default tool: Select Features (instead of Pan) ---
+        # Pan available via mouse wheel, Select is more useful as default
+        self._register_signal(
+            QgsProject.instance().readProject,
+            lambda _: QTimer.singleShot(0, self.iface.actionSelect().trigger)
+        )
+
+    # === Шаги запуска (Msm_38_2): STOP - прервать initGui ===
+
+    def _startup_session_log(self) -> None:
+        """Session Logging (M_38)."""
+        session_log = registry.get('M_38')
+        session_log.initialize()
+
+    def _startup_profile(self) -> Any:
+        """Profile Setup (M_37), миграция repo URL, hook integrity_hash, настройка M_43."""
         profile_mgr = registry.get('M_37')
         profile_mgr.apply_pending_ini()
 
         profile_status = profile_mgr.check_and_setup_profile()
-        log_timing(f"Daman_QGIS: [TIMING] M_37 profile: {perf_counter() - _t:.3f}s")
         if profile_status in ("setup_done", "sync_done", "wrong_profile"):
             self._profile_only_mode = True
-            return  # НЕ инициализировать основной плагин
+            return StartupOrchestrator.STOP  # НЕ инициализировать основной плагин
 
         self._profile_only_mode = False
 
@@ -339,6 +395,7 @@ class DamanQGIS:
         # в log + M_32 telemetry. integrity_hash модуль stdlib-only, поэтому
         # hook monkey-patch'ится отсюда (плагин imports utils + managers).
         try:
+            import threading
             from Daman_QGIS import integrity_hash as _ih
 
             def _integrity_skip_hook(rel_path: str, error: Exception) -> None:
@@ -346,30 +403,17 @@ class DamanQGIS:
                     f"integrity_hash: skipped unreadable {rel_path} "
                     f"({type(error).__name__}: {error})"
                 )
-                try:
-                    telemetry_mgr = registry.get('M_32')
-                    if telemetry_mgr is not None:
-                        telemetry_mgr.track_event('integrity_hash_skip', {
-                            'rel_path': rel_path,
-                            'error_type': type(error).__name__,
-                        })
-                except Exception:
-                    pass
+                if threading.current_thread() is not threading.main_thread():
+                    # Фоновый prewarm: M_32 не создаём вне GUI-потока,
+                    # события отправит шаг license после ожидания plugin_hash
+                    self._integrity_skips.append((rel_path, type(error).__name__))
+                    return
+                self._track_integrity_skip(rel_path, type(error).__name__)
 
             _ih._on_skip = _integrity_skip_hook
         except Exception as e:
             log_warning(f"Daman_QGIS: integrity_hash hook setup failed: {e}")
 
-        # FIX-5: prewarm cache plugin_hash. Compute один раз при initGui
-        # → переиспользуем для всех validate/heartbeat в течение сессии.
-        # Также seed log хеша для диагностики.
-        try:
-            from Daman_QGIS.integrity_hash import get_cached_or_compute
-            _cached = get_cached_or_compute(self.plugin_dir)
-            log_info(f"Daman_QGIS: cached plugin_hash {_cached[:16]}...")
-        except Exception as e:
-            log_warning(f"Daman_QGIS: plugin_hash prewarm failed: {e}")
-
         # Настройка M_43 (до первого использования fallback тулбаров)
         self._fallback_mgr.configure(
             show_forced_activation=self._show_forced_activation,
@@ -378,36 +422,66 @@ class DamanQGIS:
             register_signal=self._register_signal,
             init_telemetry=self._init_telemetry,
         )
-        # --- Конец Profile Setup ---
+        return None
 
-        # --- Auto-Update Check (M_42) ---
-        _t = perf_counter()
+    def _track_integrity_skip(self, rel_path: str, error_type: str) -> None:
+        """Событие M_32 о пропущенном при хешировании файле."""
         try:
-            auto_update = registry.get('M_42')
-            if auto_update.check_and_update():
-                self._update_pending = True
-                log_info("Daman_QGIS: Update installed, scheduling QGIS restart...")
-                QTimer.singleShot(0, self._restart_qgis_after_update)
-                return
-        except Exception as e:
-            log_warning(f"Daman_QGIS: Auto-update check failed: {e}")
-        log_timing(f"Daman_QGIS: [TIMING] M_42 auto-update: {perf_counter() - _t:.3f}s")
-        # --- End Auto-Update ---
+            telemetry_mgr = registry.get('M_32')
+            if telemetry_mgr is not None:
+                telemetry_mgr.track_event('integrity_hash_skip', {
+                    'rel_path': rel_path,
+                    'error_type': error_type,
+                })
+        except Exception:
+            pass
+
+    def _startup_plugin_hash(self) -> str:
+        """FIX-5: prewarm cache plugin_hash (фоновый поток, только stdlib).
+
+        Compute один раз при initGui → переиспользуем для всех
+        validate/heartbeat в течение сессии. Хеш инкрементальный (manifest
+        рядом с каталогом плагина): перечитываются только изменённые файлы,
+        полный пересчёт - без валидного manifest.
+        """
+        from Daman_QGIS.integrity_hash import get_cached_or_compute, last_stats
+        _cached = get_cached_or_compute(self.plugin_dir)
+        log_info(f"Daman_QGIS: cached plugin_hash {_cached[:16]}...")
+        if last_stats:
+            # До (полный пересчёт по всем файлам) и после (по manifest)
+            full_seconds = last_stats.get('full_seconds')
+            before = f"{full_seconds:.3f}s" if full_seconds is not None else "н/д"
+            log_timing(
+                f"Daman_QGIS: [TIMING] plugin_hash: полный {before}, "
+                f"{'полный' if last_stats['full'] else 'инкрементальный'} сейчас "
+                f"{last_stats['seconds']:.3f}s "
+                f"(перечитано {last_stats['rehashed']} из {last_stats['files']} файлов)"
+            )
+        return _cached
+
+    def _startup_auto_update(self) -> Any:
+        """Auto-Update Check (M_42); лог предыдущего обновления."""
+        auto_update = registry.get('M_42')
+        if auto_update.check_and_update():
+            self._update_pending = True
+            log_info("Daman_QGIS: Update installed, scheduling QGIS restart...")
+            QTimer.singleShot(0, self._restart_qgis_after_update)
+            return StartupOrchestrator.STOP
 
         # Лог предыдущего обновления (передан через QSettings из прошлого экземпляра)
         _update_log = QSettings().value("Daman_QGIS/update_log", "", type=str)
         if _update_log:
             log_info(f"Daman_QGIS: Предыдущее обновление: {_update_log}")
             QSettings().remove("Daman_QGIS/update_log")
+        return None
 
-        # Быстрая проверка зависимостей при запуске
-        _t = perf_counter()
+    def _startup_deps_check(self) -> Any:
+        """Быстрая проверка зависимостей при запуске (F_4_1) и DEPENDENCY GATE."""
         deps_ok = True
         try:
             deps_ok = F_4_1_PluginDiagnostics.quick_check()
         except Exception as e:
             log_warning(f"Не удалось проверить зависимости: {str(e)}")
-        log_timing(f"Daman_QGIS: [TIMING] F_4_1 deps check: {perf_counter() - _t:.3f}s")
 
         # --- DEPENDENCY GATE: критические зависимости нужны для работы ---
         # Ветка "deps_ok=False" — первый запуск после установки плагина
@@ -425,75 +499,99 @@ class DamanQGIS:
             self._init_managers()
             self._fallback_mgr.show_emergency(reason="deps_install")
             self._start_background_dep_install()
-            return
+            return StartupOrchestrator.STOP
+        return None
 
-        # Инициализация менеджеров
-        _t = perf_counter()
-        self._init_managers()
-        log_timing(f"Daman_QGIS: [TIMING] _init_managers: {perf_counter() - _t:.3f}s")
-
-        # NSPD WMTS preprocessor (подмена User-Agent для обхода WAF)
-        self._nspd_preprocessor_id = None
-        try:
-            self._register_nspd_preprocessor()
-        except Exception as e:
-            log_warning(f"Daman_QGIS: NSPD preprocessor failed: {e}")
+    def _startup_license(self) -> Any:
+        """LICENSE GATE: JWT токены нужны для загрузки конфигурации."""
+        # Пропуски файлов фонового prewarm plugin_hash -> M_32 (GUI-поток)
+        skipped, self._integrity_skips = self._integrity_skips, []
+        for rel_path, error_type in skipped:
+            self._track_integrity_skip(rel_path, error_type)
 
-        # NAM disk cache (1 ГБ) — для XYZ тайлов НСПД basemap (L_1_3_2, L_1_3_3)
-        try:
-            self._setup_nam_cache()
-        except Exception as e:
-            log_warning(f"Daman_QGIS: NAM cache setup failed: {e}")
+        has_license = self._acquire_jwt_tokens()
+        if has_license:
+            return None
 
-        # WMS retry filter — блокируем перехват фокуса таба MessageLog на retry-логах ядра
+        # Self-heal: verify мог вернуть False из-за update_required /
+        # DEV_HASH_MISMATCH (integrity mismatch на стартовом пути), а не из-за
+        # отсутствия лицензии. Обработать force-update ДО диалога активации —
+        # иначе пользователь видит бесполезный диалог, плагин заблокирован.
         try:
-            self._setup_wms_retry_filter()
+            license_mgr = registry.get('M_29')
+            last_validate = getattr(license_mgr, "_last_validate_result", None)
+            if last_validate and (
+                last_validate.get("status") == "update_required"
+                or last_validate.get("error_code") == "DEV_HASH_MISMATCH"
+            ):
+                if not self._handle_validate_result(last_validate):
+                    # Force update запущен/заблокирован — диалог уже показан.
+                    return StartupOrchestrator.STOP
         except Exception as e:
-            log_warning(f"Daman_QGIS: WMS retry filter setup failed: {e}")
-
-        # --- LICENSE GATE: JWT токены нужны для загрузки конфигурации ---
-        _t = perf_counter()
-        has_license = self._acquire_jwt_tokens()
-        log_timing(f"Daman_QGIS: [TIMING] _acquire_jwt_tokens: {perf_counter() - _t:.3f}s")
-
-        if not has_license:
-            # Self-heal: verify мог вернуть False из-за update_required /
-            # DEV_HASH_MISMATCH (integrity mismatch на стартовом пути), а не из-за
-            # отсутствия лицензии. Обработать force-update ДО диалога активации —
-            # иначе пользователь видит бесполезный диалог, плагин заблокирован.
+            log_error(f"Daman_QGIS: startup self-heal handler error: {e}")
+
+        # Нет лицензии -- принудительно показать диалог активации
+        activated = self._show_forced_activation()
+        if not activated:
+            # Пользователь закрыл без активации -- минимальная панель
+            self._show_activation_only_toolbar()
+            return StartupOrchestrator.STOP
+        # Активация успешна -- продолжаем нормальный запуск
+        return None
+
+    def _startup_span(self, name: str) -> ContextManager[None]:
+        """Замер этапа запуска (Msm_38_2) или пустой контекст до initGui."""
+        if self._startup_profiler is None:
+            return nullcontext()
+        return self._startup_profiler.span(name)
+
+    def _schedule_deferred(self, name: str, func: Callable[[], None], delay_ms: int = 0) -> None:
+        """Отложенный этап запуска: после возврата в event loop, с замером."""
+        self._startup_deferred_pending += 1
+
+        def _run() -> None:
             try:
-                license_mgr = registry.get('M_29')
-                last_validate = getattr(license_mgr, "_last_validate_result", None)
-                if last_validate and (
-                    last_validate.get("status") == "update_required"
-                    or last_validate.get("error_code") == "DEV_HASH_MISMATCH"
-                ):
-                    if not self._handle_validate_result(last_validate):
-                        # Force update запущен/заблокирован — диалог уже показан.
-                        return
+                with self._startup_span(f"{name} (deferred)"):
+                    func()
             except Exception as e:
-                log_error(f"Daman_QGIS: startup self-heal handler error: {e}")
-
-            # Нет лицензии -- принудительно показать диалог активации
-            activated = self._show_forced_activation()
-            if not activated:
-                # Пользователь закрыл без активации -- минимальная панель
-                self._show_activation_only_toolbar()
-                return
-            # Активация успешна -- продолжаем нормальный запуск
+                log_warning(f"Daman_QGIS: {name} (deferred) failed: {e}")
+            finally:
+                self._startup_deferred_pending -= 1
+                self._save_startup_profile()
+
+        QTimer.singleShot(delay_ms, _run)
+
+    def _save_startup_profile(self) -> None:
+        """Отчёт замеров запуска - после initGui и всех отложенных этапов (один раз)."""
+        profiler = self._startup_profiler
+        if (
+            profiler is None
+            or self._startup_outcome is None
+            or self._startup_deferred_pending > 0
+            or self._startup_profile_saved
+        ):
+            return
+        self._startup_profile_saved = True
+        try:
+            # Ленивые создания менеджеров registry - вложенными замерами
+            for manager_id, start, end, thread in registry.creation_log(profiler.origin):
+                profiler.add_event(f"create {manager_id}", start, end, thread=thread)
 
-        # --- Полная инициализация тулбара ---
-        _t = perf_counter()
-        self._build_full_toolbar()
-        log_timing(f"Daman_QGIS: [TIMING] _build_full_toolbar: {perf_counter() - _t:.3f}s")
-        log_timing(f"Daman_QGIS: [TIMING] TOTAL initGui: {perf_counter() - _t_total:.3f}s")
+            toolbar_ms = profiler.elapsed_ms('toolbar')
+            log_info(
+                f"Daman_QGIS: Запуск ({self._startup_outcome}): "
+                f"тулбар {'-' if toolbar_ms is None else f'{toolbar_ms:.0f} мс'}, "
+                f"всего {profiler.elapsed_ms():.0f} мс"
+            )
 
-        # --- Default tool: Select Features (instead of Pan) ---
-        # Pan available via mouse wheel, Select is more useful as default
-        self._register_signal(
-            QgsProject.instance().readProject,
-            lambda _: QTimer.singleShot(0, self.iface.actionSelect().trigger)
-        )
+            from Daman_QGIS.constants import STARTUP_PROFILE_ENABLED
+            if not STARTUP_PROFILE_ENABLED or not registry.is_initialized('M_38'):
+                return
+            path = registry.get('M_38').get_startup_profile_path()
+            if path is not None:
+                profiler.save(str(path), outcome=self._startup_outcome)
+        except Exception as e:
+            log_warning(f"Daman_QGIS: startup profile save failed: {e}")
 
     def _init_nspd_statusbar(self) -> None:
         """Инициализация индикатора авторизации НСПД в statusbar."""
@@ -982,9 +1080,8 @@ class DamanQGIS:
         # Менеджер версий
         self.version_manager = VersionManager(self.iface)
 
-        # Менеджер справочных данных (M_4 — фабрика, не синглтон)
-        from Daman_QGIS.managers._registry import get_reference_managers
-        self.reference_managers = get_reference_managers()
+        # Менеджер справочных данных (M_4 — фабрика, не синглтон) создаётся
+        # в _build_full_toolbar после сброса кэшей справочников
 
     def _init_common_tools(self) -> None:
         """Инициализация общих инструментов (контекстное меню)"""
@@ -1186,21 +1283,29 @@ class DamanQGIS:
         Если Base_Functions.json не загрузился (401, сеть, и т.д.) --
         показывает аварийную панель с F_4_1 и F_4_3.
         """
-        from time import perf_counter
         global TOOLS_CONFIG
 
         # Очищаем кэши чтобы загрузка прошла с JWT
-        _t = perf_counter()
-        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
-        from Daman_QGIS.managers._registry import reset_reference_managers
-        BaseReferenceLoader.clear_cache()
-        reset_reference_managers()
-        log_timing(f"Daman_QGIS: [TIMING] toolbar/clear_cache: {perf_counter() - _t:.3f}s")
+        with self._startup_span("clear_cache"):
+            from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+            from Daman_QGIS.managers._registry import reset_reference_managers
+            BaseReferenceLoader.clear_cache()
+            reset_reference_managers()
+
+        # Справочники: дисковый кэш + параллельная загрузка недостающих
+        with self._startup_span("reference_prefetch"):
+            try:
+                BaseReferenceLoader.prefetch()
+            except Exception as e:
+                log_warning(f"Daman_QGIS: Reference prefetch failed: {e}")
+
+        # M_4 - после сброса кэшей (инструменты получают его в register_tool)
+        from Daman_QGIS.managers._registry import get_reference_managers
+        self.reference_managers = get_reference_managers()
 
         # Загружаем конфигурацию инструментов (теперь с JWT)
-        _t = perf_counter()
-        TOOLS_CONFIG = _load_tools_config()  # pyright: ignore[reportConstantRedefinition]
-        log_timing(f"Daman_QGIS: [TIMING] toolbar/load_tools_config: {perf_counter() - _t:.3f}s")
+        with self._startup_span("load_tools_config"):
+            TOOLS_CONFIG = _load_tools_config()  # pyright: ignore[reportConstantRedefinition]
 
         # Если конфигурация пуста -- аварийная панель
         if not TOOLS_CONFIG:
@@ -1212,24 +1317,19 @@ class DamanQGIS:
         # DEV_HASH_MISMATCH / registry_unavailable.
         # Msm_29_3.verify() уже отправил plugin_hash и сравнил его с эталоном
         # на сервере. Результат лежит в M_29._last_validate_result.
-        _t = perf_counter()
-        try:
-            license_mgr = registry.get('M_29')
-            last_validate = getattr(license_mgr, "_last_validate_result", None)
-            if last_validate:
-                if not self._handle_validate_result(last_validate):
-                    return  # Плагин блокирует себя; пользователь видит диалог
-        except Exception as e:
-            log_error(f"Daman_QGIS: validate_result handler error: {e}")
-        log_timing(
-            f"Daman_QGIS: [TIMING] toolbar/handle_validate_result: "
-            f"{perf_counter() - _t:.3f}s"
-        )
+        with self._startup_span("handle_validate_result"):
+            try:
+                license_mgr = registry.get('M_29')
+                last_validate = getattr(license_mgr, "_last_validate_result", None)
+                if last_validate:
+                    if not self._handle_validate_result(last_validate):
+                        return  # Плагин блокирует себя; пользователь видит диалог
+            except Exception as e:
+                log_error(f"Daman_QGIS: validate_result handler error: {e}")
 
         # Инициализация общих инструментов (контекстное меню)
-        _t = perf_counter()
-        self._init_common_tools()
-        log_timing(f"Daman_QGIS: [TIMING] toolbar/init_common_tools: {perf_counter() - _t:.3f}s")
+        with self._startup_span("init_common_tools"):
+            self._init_common_tools()
 
         # Создание панели инструментов
         self.toolbar = self.iface.addToolBar(PLUGIN_NAME)
@@ -1243,14 +1343,12 @@ class DamanQGIS:
         self.main_toolbar.set_deps_ready_check(self._deps_ready_gate)
 
         # Сначала регистрируем инструменты
-        _t = perf_counter()
-        self._register_tools()
-        log_timing(f"Daman_QGIS: [TIMING] toolbar/register_tools: {perf_counter() - _t:.3f}s")
+        with self._startup_span("register_tools"):
+            self._register_tools()
 
         # Теперь создаем меню когда инструменты уже зарегистрированы
-        _t = perf_counter()
-        self.main_toolbar.create_menu()
-        log_timing(f"Daman_QGIS: [TIMING] toolbar/create_menu: {perf_counter() - _t:.3f}s")
+        with self._startup_span("create_menu"):
+            self.main_toolbar.create_menu()
 
         # Утилитарные кнопки (после всех секций функций)
         self.labels_toggle = LabelsToggleManager(self.iface)
@@ -1265,6 +1363,8 @@ class DamanQGIS:
 
         # Обновляем состояние меню после его создания
         self.main_toolbar.update_menu_state()
+        if self._startup_profiler is not None:
+            self._startup_profiler.mark('toolbar')
 
         # Подключаем обработчики событий закрытия проекта
         self._connect_project_signals()
@@ -1272,34 +1372,24 @@ class DamanQGIS:
         # StatusBar: индикатор авторизации НСПД
         self._init_nspd_statusbar()
 
-        # Инициализация телеметрии
-        _t = perf_counter()
-        self._init_telemetry()
-        log_timing(f"Daman_QGIS: [TIMING] toolbar/init_telemetry: {perf_counter() - _t:.3f}s")
-
         # Heartbeat: периодическая проверка статуса лицензии
         self._start_heartbeat()
 
+        # Телеметрия (M_32 + глобальный перехват исключений) - после появления тулбара
+        self._schedule_deferred("init_telemetry", self._init_telemetry)
+
+        # M_37 и синхронизация CRS и раньше выполнялись через QTimer.singleShot(0);
+        # _schedule_deferred добавляет только замер в отчёт запуска
         # Deferred profile reference download (результат применяется при следующем запуске)
         def _deferred_profile_update():
-            _t = perf_counter()
             _profile_mgr = registry.get('M_37')
             _profile_mgr.ensure_reference_profile_applied()
             _profile_mgr.check_profile_update()
-            log_timing(f"Daman_QGIS: [TIMING] toolbar/M_37_profile_deferred (deferred): {perf_counter() - _t:.3f}s")
 
-        QTimer.singleShot(0, _deferred_profile_update)
+        self._schedule_deferred("M_37_profile", _deferred_profile_update)
 
         # Синхронизация USER CRS реестра с Base_CRS.json (CRS из прошлой сессии уже в SQLite)
-        def _deferred_crs_sync():
-            _t = perf_counter()
-            try:
-                self.reference_managers.crs.sync_crs_from_json()
-            except Exception as e:
-                log_warning(f"Daman_QGIS: CRS sync failed: {e}")
-            log_timing(f"Daman_QGIS: [TIMING] toolbar/crs_sync (deferred): {perf_counter() - _t:.3f}s")
-
-        QTimer.singleShot(0, _deferred_crs_sync)
+        self._schedule_deferred("crs_sync", self.reference_managers.crs.sync_crs_from_json)
 
         # Welcome dialog при первом запуске в Daman_QGIS
         _profile_mgr_welcome = registry.get('M_37')
@@ -1778,6 +1868,22 @@ class DamanQGIS:
             self._heartbeat_timer.stop()
             self._heartbeat_timer = None
 
+        # Остановить фоновую проверку справочников
+        try:
+            from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+            BaseReferenceLoader.shutdown_background()
+        except Exception:
+            pass
+
+        # Закрыть keep-alive соединения авторизованных запросов
+        try:
+            from Daman_QGIS.managers.infrastructure.submodules.Msm_29_7_pooled_transport import (
+                PooledTransport,
+            )
+            PooledTransport.reset_instance()
+        except Exception:
+            pass
+
         # Flush телеметрии перед выгрузкой (синхронно, до 2 сек)
         try:
             from Daman_QGIS.managers._registry import registry
@@ -16,7 +16,9 @@
 - https://dev.to/dentedlogic/stop-writing-giant-if-else-chains-master-the-python-registry-pattern-ldm
 - https://www.geeksforgeeks.org/system-design/registry-pattern/
 """
-from typing import Dict, Any, Callable, TypeVar, Optional, List
+import threading
+import time
+from typing import Dict, Any, Callable, TypeVar, Optional, List, Tuple
 
 T = TypeVar('T')
 
@@ -47,12 +49,15 @@ class ManagerRegistry:
         # Информация
         registry.list_registered()   # ['M_1', 'M_2', ...]
         registry.list_by_domain()    # {'infrastructure': ['M_17', ...], ...}
+        registry.creation_log(t0)    # [('M_38', start, end, 'MainThread'), ...]
     """
 
     _instances: Dict[str, Any] = {}
     _factories: Dict[str, Callable[[], Any]] = {}
     _domains: Dict[str, str] = {}  # M_X -> domain
     _aliases: Dict[str, str] = {}  # alias -> M_X
+    # (M_X, perf_counter начала, конца, поток) - создание экземпляров (отчёт запуска Msm_38_2)
+    _creation_log: List[Tuple[str, float, float, str]] = []
 
     @classmethod
     def register(
@@ -127,12 +132,16 @@ class ManagerRegistry:
                     f"Доступные: {sorted(cls._factories.keys())}"
                 )
             # FIX: Менеджеры требуют iface - получаем из qgis.utils
+            started = time.perf_counter()
             try:
                 from qgis.utils import iface
                 cls._instances[manager_id] = cls._factories[manager_id](iface)
             except TypeError:
                 # Менеджер не требует iface (например, справочники)
                 cls._instances[manager_id] = cls._factories[manager_id]()
+            cls._creation_log.append(
+                (manager_id, started, time.perf_counter(), threading.current_thread().name)
+            )
             try:
                 from utils import log_info
                 log_info(f"ManagerRegistry: создан '{manager_id}' (lazy)")
@@ -190,6 +199,16 @@ class ManagerRegistry:
             return 0
         return sorted(cls._factories.keys(), key=sort_key)
 
+    @classmethod
+    def creation_log(cls, since: float = 0.0) -> List[Tuple[str, float, float, str]]:
+        """
+        Создания экземпляров (ленивые get()) начиная с момента since.
+
+        Returns:
+            [(M_X, perf_counter начала, конца, имя потока)]
+        """
+        return [entry for entry in cls._creation_log if entry[1] >= since]
+
     @classmethod
     def list_initialized(cls) -> List[str]:
         """Список инициализированных менеджеров."""
@@ -11,9 +11,11 @@ M_20_PointNumberingManager - Менеджер нумерации точек ко
    - ВСЕ кольца (exterior + hole): CW в мат. СК (signed_area < 0)
    - Единый стандарт, согласован с M_47 физической нормализацией (стадия ДПТ)
    - История: до 2026-05-31 hole шёл CCW (П/0592 — стандарт межевого плана)
-3. Первый проход: собираем уникальные точки (ключ = округлённые координаты)
-4. Присваиваем номера в порядке обхода
-5. Второй проход: формируем данные для точечного слоя
+3. Один проход: кольца извлекаются один раз на контур, номер точке
+   присваивается при первой встрече (ключ = округлённые координаты) —
+   порядок тот же, что у прежних двух проходов
+4. Данные точечного слоя копятся в PointStore (параллельные массивы),
+   dict точек собираются лениво при записи точечного слоя
 
 Особенности:
 - Замыкающая точка НЕ отображается на графике (только для перечней координат)
@@ -23,11 +25,10 @@ M_20_PointNumberingManager - Менеджер нумерации точек ко
 - CW проверяется через Shoelace formula (signed_area < 0 в мат. СК)
 """
 
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional, Sequence
 
 from qgis.core import (
     Qgis,
-    QgsPointXY,
     QgsGeometry,
     QgsVectorLayer,
 )
@@ -35,6 +36,7 @@ from qgis.core import (
 from Daman_QGIS.constants import PRECISION_DECIMALS
 from Daman_QGIS.utils import log_info, log_warning, log_error, sort_by_northwest
 from . import _ring_utils
+from ._point_store import PointStore
 
 __all__ = ['PointNumberingManager', 'number_layer_points']
 
@@ -64,7 +66,7 @@ class PointNumberingManager:
         auto_reset: bool = True,
         sort_northwest: bool = True,
         per_ring_numbering: bool = False
-    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    ) -> Tuple[List[Dict[str, Any]], Sequence[Dict[str, Any]]]:
         """
         Обработка полигональных объектов и формирование точечных данных
 
@@ -89,7 +91,8 @@ class PointNumberingManager:
         Returns:
             Tuple:
             - Обновлённый features_data с добавленным полем 'Точки'
-            - Список точек для точечного слоя:
+            - Точки для точечного слоя (PointStore, read-only последовательность
+              dict, собираемых лениво при обращении):
               [{'id': int, 'contour_point_index': int, 'contour_id': int,
                 'uslov_kn': str, 'kn': str,
                 'contour_type': str ('Внешний'/'Внутренний'),
@@ -103,27 +106,16 @@ class PointNumberingManager:
         if per_ring_numbering:
             return self._process_per_ring(features_data, precision, sort_northwest)
 
-        points_data: List[Dict[str, Any]] = []
+        points_data = PointStore()
+        unique_points = self._unique_points
 
         # Сортировка контуров от СЗ к ЮВ
         if sort_northwest:
             features_data = sort_by_northwest(features_data)
 
-        # Первый проход: собираем уникальные точки (включая внутренние контуры)
-        for item in features_data:
-            geom = item.get('geometry')
-            if not geom or geom.isEmpty():
-                continue
-
-            # Используем новый метод для получения точек по кольцам
-            rings_data = self._extract_polygon_points_by_ring(geom, precision)
-            for ring_info in rings_data:
-                for point_tuple in ring_info['points']:
-                    if point_tuple not in self._unique_points:
-                        self._point_counter += 1
-                        self._unique_points[point_tuple] = self._point_counter
-
-        # Второй проход: формируем данные точек и строки номеров
+        # Один проход: кольца извлекаются один раз, номер присваивается при первой
+        # встрече точки. Порядок обхода тот же, что у прежнего первого прохода,
+        # поэтому номера и строки 'Точки' не меняются.
         for item in features_data:
             geom = item.get('geometry')
             # ВАЖНО: .get() возвращает None если ключ существует но значение None
@@ -152,25 +144,23 @@ class PointNumberingManager:
                 contour_type = ring_info['contour_type']
                 contour_number = ring_info['contour_number']
                 ring_numbers = []
+                ring_ref = points_data.add_ring(
+                    contour_id, uslov_kn, kn, contour_type, contour_number
+                )
 
                 for contour_point_idx, point_tuple in enumerate(ring_info['points'], start=1):
-                    point_num = self._unique_points.get(point_tuple, 0)
+                    point_num = unique_points.get(point_tuple)
+                    if point_num is None:
+                        self._point_counter += 1
+                        point_num = self._point_counter
+                        unique_points[point_tuple] = point_num
                     ring_numbers.append(point_num)
 
-                    # Добавляем данные для точечного слоя
-                    # X и Y в геодезическом порядке (Y -> X графы, X -> Y графы)
-                    points_data.append({
-                        'id': point_num,
-                        'contour_point_index': contour_point_idx,  # Номер точки внутри контура
-                        'contour_id': contour_id,
-                        'uslov_kn': uslov_kn,  # Условный КН контура
-                        'kn': kn,  # КН контура
-                        'contour_type': contour_type,  # 'Внешний' или 'Внутренний'
-                        'contour_number': contour_number,  # Параллельная нумерация
-                        'x_geodetic': point_tuple[1],  # Y математический = X геодезический
-                        'y_geodetic': point_tuple[0],  # X математический = Y геодезический
-                        'point': QgsPointXY(point_tuple[0], point_tuple[1])
-                    })
+                    # Данные для точечного слоя (X/Y геодезические - при материализации)
+                    points_data.add_point(
+                        ring_ref, point_num, contour_point_idx,
+                        point_tuple[0], point_tuple[1]
+                    )
 
                 if contour_type == 'Внешний':
                     exterior_numbers_list.append(ring_numbers)
@@ -197,7 +187,7 @@ class PointNumberingManager:
         features_data: List[Dict[str, Any]],
         precision: int,
         sort_northwest: bool
-    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    ) -> Tuple[List[Dict[str, Any]], Sequence[Dict[str, Any]]]:
         """
         Per-ring нумерация: каждое кольцо нумеруется с 1 независимо.
 
@@ -212,7 +202,7 @@ class PointNumberingManager:
         Returns:
             Tuple: (features_data с point_numbers_str, points_data)
         """
-        points_data: List[Dict[str, Any]] = []
+        points_data = PointStore()
         total_points = 0
 
         if sort_northwest:
@@ -241,23 +231,17 @@ class PointNumberingManager:
                 contour_type = ring_info['contour_type']
                 contour_number = ring_info['contour_number']
                 ring_numbers: List[int] = []
+                ring_ref = points_data.add_ring(
+                    contour_id, uslov_kn, kn, contour_type, contour_number
+                )
 
                 for contour_point_idx, point_tuple in enumerate(ring_info['points'], start=1):
                     # Per-ring: id = номер точки внутри кольца (всегда с 1)
                     ring_numbers.append(contour_point_idx)
-
-                    points_data.append({
-                        'id': contour_point_idx,
-                        'contour_point_index': contour_point_idx,
-                        'contour_id': contour_id,
-                        'uslov_kn': uslov_kn,
-                        'kn': kn,
-                        'contour_type': contour_type,
-                        'contour_number': contour_number,
-                        'x_geodetic': point_tuple[1],
-                        'y_geodetic': point_tuple[0],
-                        'point': QgsPointXY(point_tuple[0], point_tuple[1])
-                    })
+                    points_data.add_point(
+                        ring_ref, contour_point_idx, contour_point_idx,
+                        point_tuple[0], point_tuple[1]
+                    )
                     total_points += 1
 
                 if contour_type == 'Внешний':
@@ -354,6 +338,9 @@ class PointNumberingManager:
                    if geometry.isMultipart()
                    else [geometry.asPolygon()])
 
+        # Lazy-импорт CPM один раз на геометрию, а не на каждую вершину
+        round_point_tuple = _get_cpm().round_point_tuple
+
         # Счётчики для параллельной нумерации
         exterior_counter = 0
         hole_counter = 0
@@ -381,15 +368,12 @@ class PointNumberingManager:
                 # Убираем замыкающую точку
                 ring_points = ring
                 if len(ring) > 1:
-                    first_rounded = _get_cpm().round_point_tuple(ring[0], precision)
-                    last_rounded = _get_cpm().round_point_tuple(ring[-1], precision)
+                    first_rounded = round_point_tuple(ring[0], precision)
+                    last_rounded = round_point_tuple(ring[-1], precision)
                     if first_rounded == last_rounded:
                         ring_points = ring[:-1]
 
-                points = []
-                for point in ring_points:
-                    point_tuple = _get_cpm().round_point_tuple(point, precision)
-                    points.append(point_tuple)
+                points = [round_point_tuple(point, precision) for point in ring_points]
 
                 if points and len(points) >= 3:
                     is_exterior = (contour_type == 'Внешний')
@@ -602,7 +586,7 @@ def number_layer_points(
     layer: QgsVectorLayer,
     contour_id_field: str = 'ID',
     precision: int = PRECISION_DECIMALS
-) -> Tuple[Dict[int, str], List[Dict[str, Any]]]:
+) -> Tuple[Dict[int, str], Sequence[Dict[str, Any]]]:
     """
     Утилита для нумерации точек существующего слоя
 
@@ -614,7 +598,7 @@ def number_layer_points(
     Returns:
         Tuple:
         - Dict[fid, point_numbers_str]: словарь {feature_id: строка_номеров}
-        - List[Dict]: список точек для точечного слоя
+        - Sequence[Dict]: точки для точечного слоя (PointStore, read-only)
     """
     if not layer or not layer.isValid():
         log_warning("M_20: Слой недействителен")
@@ -437,6 +437,11 @@ class CuttingManager:
             self._cutting_engine.attribute_mapper.reset_kn_counters()
             log_info("M_26: Сброс глобальных счётчиков КН/ЕЗ")
 
+        # Кэш геометрий Msm_26_1 живёт один прогон: ЗУ/overlay общие для всех
+        # типов ЗПР, но между прогонами слои могли быть отредактированы
+        if self._geometry_processor:
+            self._geometry_processor.clear_cache()
+
         # Обработка каждого типа ЗПР
         for zpr_type in zpr_types:
             zpr_config = config[zpr_type]
@@ -484,6 +489,14 @@ class CuttingManager:
                 # Валидация минимальных площадей для типа ЗПР
                 self._validate_min_areas(zpr_type)
 
+        if self._geometry_processor:
+            cache_stats = self._geometry_processor.get_cache_statistics()
+            log_info(f"M_26: Кэш геометрий: {cache_stats['geometry_hits']} попаданий, "
+                    f"{cache_stats['geometry_misses']} промахов, "
+                    f"prepared engine {cache_stats['engine_hits']}/{cache_stats['engine_misses']}")
+            result['geometry_cache'] = cache_stats
+            self._geometry_processor.clear_cache()
+
         # Сортировка слоёв
         if self.layer_manager and result['types_processed']:
             self.layer_manager.sort_all_layers()
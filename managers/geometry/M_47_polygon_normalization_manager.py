@@ -47,8 +47,10 @@ LEVEL-AWARE ТОЧКА ВРЕЗКИ (КЛЮЧЕВОЙ урок — метод п
   на geom ДО M_20 (иначе «Точки» рассогласуются с .gpkg). Это F_2_3, F_2_4,
   Msm_26_4, Fsm_2_2_2.
 - consumer вызывает M_20 НА СЛОЕ или пишет .gpkg без M_20 → `normalize_layer`.
-  Это M_35, Fsm_2_5_2, Fsm_1_2_1, F_1_1.
+  Это M_35, Fsm_2_5_2, F_1_1.
 - builder отдаёт голую geom → `normalize_geometry` (Fsm_1_1_12, Fsm_1_2_4 memory).
+- потоковый импорт из координат → `_ring_utils.normalize_ring` при кодировании
+  WKB (Fsm_1_2_1_3 для Fsm_1_2_1: memory-слой M_47 пропускает).
 - read-only reader → M_47 не нужен (excel_exporter ре-нормализует сам).
 EDIT-SESSION ГОЧА (Fsm_2_7_2): strict isEditable guard ПРОПУСКАЕТ editable-слой
 (см. ПРИМЕНЯЕМОСТЬ) — если M_20 вызывается на слое В edit-сессии (addFeature без
@@ -8,7 +8,6 @@
 Это критично для топологической совместимости между модулями.
 """
 
-import math
 from typing import Tuple, Optional
 from qgis.PyQt.QtWidgets import QMessageBox
 from qgis.core import (
@@ -16,38 +15,11 @@ from qgis.core import (
 )
 from Daman_QGIS.constants import PRECISION_DECIMALS, COORDINATE_TOLERANCE, CLOSURE_TOLERANCE
 from Daman_QGIS.utils import log_info, log_warning
+from Daman_QGIS.core.math.rounding import math_round as _math_round
 
 __all__ = ['CoordinatePrecisionManager']
 
 
-def _math_round(value: float, decimals: int) -> float:
-    """
-    Классическое математическое округление (round half away from zero).
-
-    Python round() использует банковское округление (round half to even):
-    - round(2.5) = 2 (к чётному)
-    - round(3.5) = 4 (к чётному)
-
-    Эта функция использует классическое округление:
-    - _math_round(2.5, 0) = 3 (от нуля)
-    - _math_round(3.5, 0) = 4 (от нуля)
-
-    Это совместимо с QGIS snappedToGrid() и PostGIS ST_SnapToGrid().
-
-    Args:
-        value: Значение для округления
-        decimals: Количество знаков после запятой
-
-    Returns:
-        Округлённое значение
-    """
-    multiplier = 10 ** decimals
-    if value >= 0:
-        return math.floor(value * multiplier + 0.5) / multiplier
-    else:
-        return math.ceil(value * multiplier - 0.5) / multiplier
-
-
 class CoordinatePrecisionManager:
     """Менеджер контроля точности координат"""
 
@@ -7,7 +7,8 @@ Geometry managers - геометрия и координаты.
 
 Автоматически импортирует все M_*.py и регистрирует singleton-менеджеры.
 Утилита _ring_utils.py (canonical ring-helpers) импортируется явно в M_20/M_47,
-не подпадает под glob M_*.py.
+не подпадает под glob M_*.py. Так же _point_store.py (PointStore — компактное
+хранилище points_data M_20).
 """
 from pathlib import Path
 from .._domain_loader import load_domain
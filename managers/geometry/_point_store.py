@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Компактное хранилище характерных точек (geometry primitive layer).
+
+PointStore — read-only последовательность points_data для M_20:
+- координаты/номера точек в параллельных массивах array ('d' / 'q' / 'l')
+- атрибуты кольца (contour_id, Услов_КН, КН, тип, номер) — один кортеж
+  на кольцо, а не копия в каждой точке
+- dict точки (формат points_data M_20) собирается лениво при обращении,
+  т.е. фактически при записи точечного слоя (Msm_26_6 / Fsm_2_1_6 / M_35)
+
+Мотивация: на крупной нарезке 200k+ точек; dict + QgsPointXY на каждую
+точку доминировали по памяти в Msm_26_4._number_points.
+
+Потребители используют points_data только на чтение (len, итерация,
+фильтрация list comprehension) — контракт Sequence этого достаточно.
+Для мутаций — materialize() (обычный list of dict).
+"""
+
+from array import array
+from typing import Any, Dict, Iterator, List, Tuple, Union, overload
+from collections.abc import Sequence
+
+from qgis.core import QgsPointXY
+
+__all__ = ['PointStore']
+
+
+class PointStore(Sequence):
+    """Последовательность точек с ленивой материализацией dict"""
+
+    __slots__ = ('_ids', '_indexes', '_xs', '_ys', '_ring_refs', '_rings')
+
+    def __init__(self) -> None:
+        self._ids = array('q')          # Номер точки (id)
+        self._indexes = array('l')      # Номер точки внутри контура
+        self._xs = array('d')           # X математический (округлённый)
+        self._ys = array('d')           # Y математический (округлённый)
+        self._ring_refs = array('l')    # Индекс кольца в self._rings
+        # (contour_id, uslov_kn, kn, contour_type, contour_number)
+        self._rings: List[Tuple[Any, str, str, str, int]] = []
+
+    def add_ring(
+        self,
+        contour_id: Any,
+        uslov_kn: str,
+        kn: str,
+        contour_type: str,
+        contour_number: int
+    ) -> int:
+        """Регистрация кольца, возвращает ссылку для add_point"""
+        self._rings.append((contour_id, uslov_kn, kn, contour_type, contour_number))
+        return len(self._rings) - 1
+
+    def add_point(
+        self,
+        ring_ref: int,
+        point_id: int,
+        contour_point_index: int,
+        x: float,
+        y: float
+    ) -> None:
+        """Добавление точки кольца (координаты уже округлены)"""
+        self._ids.append(point_id)
+        self._indexes.append(contour_point_index)
+        self._xs.append(x)
+        self._ys.append(y)
+        self._ring_refs.append(ring_ref)
+
+    def _materialize_one(self, i: int) -> Dict[str, Any]:
+        """dict точки в формате points_data M_20"""
+        contour_id, uslov_kn, kn, contour_type, contour_number = self._rings[self._ring_refs[i]]
+        x = self._xs[i]
+        y = self._ys[i]
+        return {
+            'id': self._ids[i],
+            'contour_point_index': self._indexes[i],
+            'contour_id': contour_id,
+            'uslov_kn': uslov_kn,
+            'kn': kn,
+            'contour_type': contour_type,
+            'contour_number': contour_number,
+            'x_geodetic': y,  # Y математический = X геодезический
+            'y_geodetic': x,  # X математический = Y геодезический
+            'point': QgsPointXY(x, y)
+        }
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @overload
+    def __getitem__(self, index: int) -> Dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Dict[str, Any]]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self._materialize_one(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PointStore index out of range")
+        return self._materialize_one(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self._ids)):
+            yield self._materialize_one(i)
+
+    def materialize(self) -> List[Dict[str, Any]]:
+        """Полный list of dict (для потребителей, которым нужна мутация)"""
+        return list(self)
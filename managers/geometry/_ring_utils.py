@@ -6,6 +6,8 @@ Canonical ring-helpers (geometry primitive layer).
 - is_clockwise(points) — Shoelace formula, CW в мат.СК = signed_area*2 < 0
 - find_nw_point_index(points) — индекс ближайшей к (min_x, max_y) точки
 - rotate_to_nw(points) — ротация кольца к старту с NW-точки
+- normalize_ring(points) — CW + старт с NW, замкнутое кольцо (инвариант M_47
+  для координат без QgsGeometry: потоковый импорт NSPD Fsm_1_2_1_3)
 
 Используется M_20 (виртуальная нумерация) и M_47 (физическая нормализация).
 Без зависимостей на QGIS API — чистые tuples/lists координат (x, y).
@@ -17,7 +19,7 @@ facade, делегирующими сюда.
 
 from typing import List, Tuple
 
-__all__ = ['is_clockwise', 'find_nw_point_index', 'rotate_to_nw']
+__all__ = ['is_clockwise', 'find_nw_point_index', 'rotate_to_nw', 'normalize_ring']
 
 
 def is_clockwise(points: List[Tuple[float, float]]) -> bool:
@@ -94,3 +96,29 @@ def rotate_to_nw(points: List[Tuple[float, float]]) -> List[Tuple[float, float]]
     if idx == 0:
         return list(points)
     return points[idx:] + points[:idx]
+
+
+def normalize_ring(points: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Нормализация кольца по конвенции M_47: обход CW, старт с NW-точки.
+
+    Повторяет per-ring шаги M_47.normalize_geometry: кольца короче 4 точек
+    (с замыкающей) не меняются; замыкающая снимается, кольцо разворачивается
+    на CW и ротируется к NW-точке.
+
+    Args:
+        points: Кортежи (x, y) кольца (замкнутого или нет).
+
+    Returns:
+        Новый замкнутый список (последняя точка = первая). Исходный не мутируется.
+    """
+    if len(points) < 4:
+        work = list(points)
+    else:
+        work = list(points[:-1]) if points[0] == points[-1] else list(points)
+        if not is_clockwise(work):
+            work.reverse()
+        work = rotate_to_nw(work)
+
+    if work and work[0] != work[-1]:
+        work.append(work[0])
+    return work
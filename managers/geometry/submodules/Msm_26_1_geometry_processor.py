@@ -70,19 +70,31 @@ QgsGeometryParameters(gridSize=0.01) в native QGIS API. GEOS 3.9+
 - intersection — пересечение ЗПР с ЗУ (snap-rounding)
 - difference — разность ЗПР минус ЗУ (snap-rounding)
 - create_union — unaryUnion слоя (snap-rounding)
+- union_geometries — unaryUnion списка геометрий (snap-rounding)
 - need_additional_cut — pre-check нужна ли overlay-нарезка
 - extract_polygons — split MultiPolygon на отдельные части
 - resolve_pinch_points — обработка self-touching boundary
 - validate_and_fix — makeValid wrapper
+- get_fixed_geometry — кэш validate_and_fix + CRS-трансформа по (layer id, fid)
+- get_prepared_engine — кэш подготовленного GEOS engine (ЗПР) по (layer id, fid)
+
+КЭШ ГЕОМЕТРИЙ (на один прогон нарезки)
+============================================================
+Один ЗУ/overlay-объект совпадает с 5–20 ЗПР (и фрагментами), и без кэша
+makeValid + transform выполняются на каждое совпадение. Кэш хранит уже
+исправленную и трансформированную в CRS проекта геометрию. Жизненный цикл:
+M_26 вызывает clear_cache() в начале и в конце прогона — слои между
+прогонами могут быть отредактированы, fid переиспользуются.
 """
 
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from qgis.core import (
     QgsGeometry,
     QgsVectorLayer,
     QgsFeature,
     QgsGeometryParameters,
+    QgsCoordinateTransform,
 )
 
 from Daman_QGIS.utils import log_info, log_warning
@@ -102,6 +114,112 @@ class Msm_26_1_GeometryProcessor:
 
     def __init__(self) -> None:
         """Инициализация процессора"""
+        # Кэш исправленных (и трансформированных) геометрий: (layer_id, fid) -> geom
+        self._geometry_cache: Dict[Tuple[str, int], QgsGeometry] = {}
+        # Кэш подготовленных GEOS engine: (layer_id, fid) -> (geom, engine).
+        # Геометрия хранится рядом: engine ссылается на её constGet()
+        self._engine_cache: Dict[Tuple[str, int], Tuple[QgsGeometry, Any]] = {}
+        self._cache_stats: Dict[str, int] = {}
+        self._reset_cache_stats()
+
+    def _reset_cache_stats(self) -> None:
+        """Сброс счётчиков кэша"""
+        self._cache_stats = {
+            'geometry_hits': 0,
+            'geometry_misses': 0,
+            'engine_hits': 0,
+            'engine_misses': 0,
+        }
+
+    def clear_cache(self) -> None:
+        """Очистка кэша геометрий и engine (начало/конец прогона нарезки)"""
+        self._geometry_cache.clear()
+        self._engine_cache.clear()
+        self._reset_cache_stats()
+
+    def get_cache_statistics(self) -> Dict[str, int]:
+        """Счётчики попаданий/промахов кэша
+
+        Returns:
+            Dict: geometry_hits/misses, engine_hits/misses, geometry_cached
+        """
+        stats = dict(self._cache_stats)
+        stats['geometry_cached'] = len(self._geometry_cache)
+        return stats
+
+    def get_fixed_geometry(
+        self,
+        layer_id: str,
+        fid: int,
+        geom: QgsGeometry,
+        transform: Optional[QgsCoordinateTransform] = None
+    ) -> QgsGeometry:
+        """Исправленная геометрия объекта с кэшем по (layer id, fid)
+
+        validate_and_fix и CRS-трансформа выполняются один раз на объект
+        за прогон. Возвращаемую геометрию нельзя менять на месте (общая
+        для всех вызовов) — для модификаций делать копию.
+
+        Args:
+            layer_id: ID слоя-источника
+            fid: ID объекта
+            geom: Исходная геометрия (используется только при промахе)
+            transform: Трансформ в CRS проекта (None если не нужен)
+
+        Returns:
+            QgsGeometry: Валидная геометрия в CRS проекта (пустая если не исправить)
+        """
+        key = (layer_id, fid)
+        cached = self._geometry_cache.get(key)
+        if cached is not None:
+            self._cache_stats['geometry_hits'] += 1
+            return cached
+
+        self._cache_stats['geometry_misses'] += 1
+        if geom is None or geom.isEmpty():
+            fixed = QgsGeometry()
+        else:
+            fixed = self.validate_and_fix(geom)
+            if transform is not None and not fixed.isEmpty():
+                fixed = QgsGeometry(fixed)
+                fixed.transform(transform)
+
+        self._geometry_cache[key] = fixed
+        return fixed
+
+    def get_prepared_engine(self, layer_id: str, fid: int, geom: QgsGeometry) -> Optional[Any]:
+        """Подготовленный GEOS engine геометрии с кэшем по (layer id, fid)
+
+        QgsGeometry.createGeometryEngine + prepareGeometry: повторные
+        intersects против многих кандидатов идут по prepared-индексу GEOS.
+
+        Args:
+            layer_id: ID слоя-источника
+            fid: ID объекта
+            geom: Геометрия для подготовки (используется только при промахе)
+
+        Returns:
+            QgsGeometryEngine или None (пустая геометрия / ошибка GEOS)
+        """
+        key = (layer_id, fid)
+        cached = self._engine_cache.get(key)
+        if cached is not None:
+            self._cache_stats['engine_hits'] += 1
+            return cached[1]
+
+        self._cache_stats['engine_misses'] += 1
+        if geom is None or geom.isEmpty():
+            return None
+
+        try:
+            engine = QgsGeometry.createGeometryEngine(geom.constGet())
+            engine.prepareGeometry()
+        except Exception as e:
+            log_warning(f"Msm_26_1: Не удалось подготовить GEOS engine: {e}")
+            return None
+
+        self._engine_cache[key] = (geom, engine)
+        return engine
 
     def _make_params(self) -> QgsGeometryParameters:
         """QgsGeometryParameters со snap-rounding precision.
@@ -203,12 +321,30 @@ class Msm_26_1_GeometryProcessor:
         if not geometries:
             return QgsGeometry()
 
+        result = self.union_geometries(geometries)
+        log_info(f"Msm_26_1: Создан union из {len(geometries)} геометрий")
+        return result
+
+    def union_geometries(self, geometries: List[QgsGeometry]) -> QgsGeometry:
+        """unaryUnion списка геометрий со снап-роундингом.
+
+        Общее ядро create_union и локального union кандидатов ЗУ
+        (Msm_26_4, режим НГС 'local'). Входы должны быть уже валидны.
+
+        Args:
+            geometries: Список непустых валидных геометрий
+
+        Returns:
+            QgsGeometry: Объединённая геометрия (валидная, snap'нутая к gridSize).
+        """
+        if not geometries:
+            return QgsGeometry()
+
         result = QgsGeometry.unaryUnion(geometries, self._make_params())
 
         if not result.isEmpty() and not result.isGeosValid():
             result = result.makeValid()
 
-        log_info(f"Msm_26_1: Создан union из {len(geometries)} геометрий")
         return result
 
     def need_additional_cut(self, fragment: QgsGeometry, boundary: QgsGeometry) -> bool:
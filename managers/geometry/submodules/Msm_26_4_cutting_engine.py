@@ -3,7 +3,7 @@
 Msm_26_4 - Движок нарезки ЗПР
 
 Основной движок выполнения нарезки:
-- Первичная нарезка по ЗУ (Раздел и НГС)
+- Первичная нарезка по ЗУ (Раздел и НГС; НГС по локальному union ЗУ)
 - Автоматическая классификация ЗУ (Изменяемые/Без_Меж)
 - Индивидуальная нарезка по overlay слоям (ЗК РФ ст. 11.9 п. 3)
 - Маппинг названий МО/НП/Лес/Вода из overlay features
@@ -26,7 +26,7 @@ from qgis.core import (
 )
 
 from Daman_QGIS.constants import POINTS_FIELD_NONE
-from Daman_QGIS.utils import log_info, log_warning, log_error, sort_by_northwest
+from Daman_QGIS.utils import log_info, log_warning, log_error, log_debug, sort_by_northwest
 
 # Lazy imports для избежания циклических зависимостей
 def _get_managers():
@@ -57,6 +57,16 @@ from .Msm_26_6_point_layer_creator import Msm_26_6_PointLayerCreator
 # или реестровую ошибку, что требует внимания оператора.
 MIN_NGS_AREA = 0.0
 
+# Режимы вычисления НГС (ЗПР минус ЗУ)
+# 'union' - эталон: difference(ЗПР, union всего слоя Выборка_ЗУ).
+# 'local' - difference(ЗПР, union только кандидатов ЗУ из пространственного
+#           индекса по bbox ЗПР). ЗУ вне bbox ЗПР не пересекают ЗПР и на
+#           разность не влияют, поэтому результат совпадает с 'union' в
+#           пределах MIN_NGS_AREA. На районных проектах (десятки тысяч ЗУ)
+#           снимает стоимость difference с многотысячным union на каждый ЗПР.
+NGS_MODE_UNION = 'union'
+NGS_MODE_LOCAL = 'local'
+
 
 class Msm_26_4_CuttingEngine:
     """Движок выполнения нарезки ЗПР"""
@@ -65,7 +75,8 @@ class Msm_26_4_CuttingEngine:
         self,
         geometry_processor: 'Msm_26_1_GeometryProcessor',
         attribute_mapper: 'Msm_26_2_AttributeMapper',
-        layer_creator: 'Msm_26_3_LayerCreator'
+        layer_creator: 'Msm_26_3_LayerCreator',
+        ngs_mode: str = NGS_MODE_LOCAL
     ) -> None:
         """Инициализация движка
 
@@ -73,10 +84,15 @@ class Msm_26_4_CuttingEngine:
             geometry_processor: Процессор геометрий
             attribute_mapper: Маппер атрибутов
             layer_creator: Создатель слоёв
+            ngs_mode: Режим вычисления НГС (NGS_MODE_LOCAL / NGS_MODE_UNION)
         """
+        if ngs_mode not in (NGS_MODE_LOCAL, NGS_MODE_UNION):
+            raise ValueError(f"Msm_26_4: неизвестный режим НГС '{ngs_mode}'")
+
         self.geometry_processor = geometry_processor
         self.attribute_mapper = attribute_mapper
         self.layer_creator = layer_creator
+        self.ngs_mode = ngs_mode
 
         # Создатель точечных слоёв (использует тот же GPKG)
         self.point_layer_creator = Msm_26_6_PointLayerCreator(layer_creator.gpkg_path)
@@ -133,6 +149,9 @@ class Msm_26_4_CuttingEngine:
             'izm_created': 0,
             'bez_mezh_created': 0,
             'overlay_cuts': 0,
+            'ngs_mode': self.ngs_mode,
+            'ngs_local_unions': 0,
+            'ngs_local_union_cache_hits': 0,
             'processing_time': 0.0,
         }
 
@@ -327,8 +346,8 @@ class Msm_26_4_CuttingEngine:
                     m36_cat = feat['attributes'].get('План_категория', '-')
                     if original_cat != m36_cat and m36_cat != '-':
                         feat.setdefault('_izm_flags', {})['category'] = True
-                        log_info(f"Msm_26_4: Изм (VRI): категория также изменилась "
-                                f"'{original_cat}' -> '{m36_cat}'")
+                        log_debug("Msm_26_4: Изм (VRI): категория также изменилась '%s' -> '%s'",
+                                  original_cat, m36_cat)
 
             # 3.3.2 Пост-проверка категории для Без_Меж
             # Если M_36 назначила категорию, отличную от исходной ЗУ -> переносим в Изм
@@ -345,8 +364,8 @@ class Msm_26_4_CuttingEngine:
                         feat['attributes']['Точки'] = POINTS_FIELD_NONE
                         feat.setdefault('_izm_flags', {})['category'] = True
                         moved_to_izm.append(feat)
-                        log_info(f"Msm_26_4: Без_Меж -> Изм: категория изменилась "
-                                f"'{original_cat}' -> '{m36_cat}'")
+                        log_debug("Msm_26_4: Без_Меж -> Изм: категория изменилась '%s' -> '%s'",
+                                  original_cat, m36_cat)
                     else:
                         # Категория совпала -> остаётся Без_Меж
                         # Восстанавливаем исходную категорию из ЗУ (Без_Меж = без изменений)
@@ -378,8 +397,8 @@ class Msm_26_4_CuttingEngine:
                     if round(egrn_area) != round(actual_area):
                         feat.setdefault('_izm_flags', {})['area'] = True
                         feat['attributes']['Площадь_ОЗУ'] = int(round(actual_area))
-                        log_info(f"Msm_26_4: Изм: реестровая ошибка площади "
-                                f"ЕГРН={round(egrn_area)} м2 -> факт={round(actual_area)} м2")
+                        log_debug("Msm_26_4: Изм: реестровая ошибка площади ЕГРН=%.0f м2 -> факт=%.0f м2",
+                                  egrn_area, actual_area)
 
             # 3.3.4 Пост-проверка площади для Без_Меж
             # Фактическая площадь геометрии сравнивается со сведениями ЕГРН (поле
@@ -411,8 +430,8 @@ class Msm_26_4_CuttingEngine:
                         feat['attributes']['Площадь_ОЗУ'] = int(round(actual_area))
                         feat.setdefault('_izm_flags', {})['area'] = True
                         moved_area.append(feat)
-                        log_info(f"Msm_26_4: Без_Меж -> Изм: площадь изменилась "
-                                f"ЕГРН={round(egrn_area)} м2 -> факт={round(actual_area)} м2")
+                        log_debug("Msm_26_4: Без_Меж -> Изм: площадь изменилась ЕГРН=%.0f м2 -> факт=%.0f м2",
+                                  egrn_area, actual_area)
                     else:
                         remaining_area.append(feat)
 
@@ -458,19 +477,24 @@ class Msm_26_4_CuttingEngine:
                     feat.pop('_izm_flags', None)
 
             # 3.4 Присвоение План_ВРИ и Общая_земля по геометрическому пересечению с ЗПР
-            if razdel_features:
-                razdel_features = self.vri_manager.reassign_vri_by_geometry(
-                    razdel_features, zpr_layer
-                )
-            if ngs_features:
-                ngs_features = self.vri_manager.reassign_vri_by_geometry(
-                    ngs_features, zpr_layer
-                )
-            # Для ИЗМ с несовпавшим ВРИ - пересчитываем ВРИ по геометрии ЗПР
-            if izm_need_vri_reassign:
-                izm_need_vri_reassign = self.vri_manager.reassign_vri_by_geometry(
-                    izm_need_vri_reassign, zpr_layer
-                )
+            # Индекс ЗПР (bbox + prepared) строится один раз на все три пересчёта
+            if razdel_features or ngs_features or izm_need_vri_reassign:
+                zpr_index = self.vri_manager.build_zpr_index(zpr_layer)
+                if zpr_index is not None:
+                    if razdel_features:
+                        razdel_features = self.vri_manager.reassign_vri_by_geometry(
+                            razdel_features, zpr_layer, zpr_index=zpr_index
+                        )
+                    if ngs_features:
+                        ngs_features = self.vri_manager.reassign_vri_by_geometry(
+                            ngs_features, zpr_layer, zpr_index=zpr_index
+                        )
+                    # Для ИЗМ с несовпавшим ВРИ - пересчитываем ВРИ по геометрии ЗПР
+                    if izm_need_vri_reassign:
+                        izm_need_vri_reassign = self.vri_manager.reassign_vri_by_geometry(
+                            izm_need_vri_reassign, zpr_layer, zpr_index=zpr_index
+                        )
+                    log_info(f"Msm_26_4: Геометрический ВРИ: {zpr_index.report()}")
             # Для ИЗМ с совпавшим ВРИ (только категория/площадь) - ВРИ остаётся как у ЗУ
             # Аналогично Без_Меж: мягкая валидация прошла, План_ВРИ = исходный ВРИ
             izm_features = izm_need_vri_reassign + izm_keep_vri
@@ -573,6 +597,7 @@ class Msm_26_4_CuttingEngine:
             self.statistics['bez_mezh_created'] = len(bez_mezh_features) if bez_mezh_features else 0
             self.statistics['razdel_points'] = len(razdel_points_data)
             self.statistics['ngs_points'] = len(ngs_points_data)
+            self.statistics['geometry_cache'] = self.geometry_processor.get_cache_statistics()
 
             log_info(f"Msm_26_4: {zpr_type} завершено за "
                     f"{self.statistics['processing_time']:.2f} сек. "
@@ -638,15 +663,22 @@ class Msm_26_4_CuttingEngine:
         project_to_zu = QgsCoordinateTransform(project_crs, zu_crs, QgsProject.instance()) if need_zu_transform else None
         zpr_to_project = QgsCoordinateTransform(zpr_crs, project_crs, QgsProject.instance()) if need_zpr_transform else None
 
-        # Создаём union всех ЗУ
-        zu_union = self.geometry_processor.create_union(zu_layer)
-        if zu_to_project and not zu_union.isEmpty():
-            zu_union = QgsGeometry(zu_union)
-            zu_union.transform(zu_to_project)
-
         # Индекс ЗУ для быстрого поиска пересечений (в native CRS слоя)
         zu_index = self._build_spatial_index(zu_layer)
 
+        # Вычитаемое для НГС: union всех ЗУ (эталон) либо локальные union
+        # кандидатов по bbox каждого ЗПР (кэш по набору кандидатов)
+        zu_union = QgsGeometry()
+        local_union_cache: Dict[frozenset, QgsGeometry] = {}
+        if self.ngs_mode == NGS_MODE_UNION:
+            zu_union = self.geometry_processor.create_union(zu_layer)
+            if zu_to_project and not zu_union.isEmpty():
+                zu_union = QgsGeometry(zu_union)
+                zu_union.transform(zu_to_project)
+            has_zu = not zu_union.isEmpty()
+        else:
+            has_zu = bool(zu_index[1])
+
         # Обрабатываем каждый полигон ЗПР
         for zpr_feature in zpr_layer.getFeatures():
             zpr_geom = zpr_feature.geometry()
@@ -654,16 +686,13 @@ class Msm_26_4_CuttingEngine:
             if not zpr_geom or zpr_geom.isEmpty():
                 continue
 
-            # Валидация геометрии
-            zpr_geom = self.geometry_processor.validate_and_fix(zpr_geom)
+            # Валидация геометрии и трансформация ЗПР в CRS проекта (кэш Msm_26_1)
+            zpr_geom = self.geometry_processor.get_fixed_geometry(
+                zpr_layer.id(), zpr_feature.id(), zpr_geom, zpr_to_project
+            )
             if zpr_geom.isEmpty():
                 continue
 
-            # Трансформация ЗПР в CRS проекта
-            if zpr_to_project:
-                zpr_geom = QgsGeometry(zpr_geom)
-                zpr_geom.transform(zpr_to_project)
-
             # Извлекаем ВРИ из ЗПР для передачи в Раздел/НГС
             zpr_vri = None
             for vri_field in ['ВРИ', 'VRI', 'vri']:
@@ -676,9 +705,15 @@ class Msm_26_4_CuttingEngine:
                 query_geom = QgsGeometry(zpr_geom)
                 if project_to_zu:
                     query_geom.transform(project_to_zu)
-                intersecting_zu = self._find_intersecting_features(query_geom, zu_layer, zu_index)
             else:
-                intersecting_zu = self._find_intersecting_features(zpr_geom, zu_layer, zu_index)
+                query_geom = zpr_geom
+            # Подготовленный GEOS engine ЗПР: intersects против всех кандидатов
+            zpr_engine = self.geometry_processor.get_prepared_engine(
+                zpr_layer.id(), zpr_feature.id(), query_geom
+            )
+            intersecting_zu = self._find_intersecting_features(
+                query_geom, zu_layer, zu_index, engine=zpr_engine
+            )
 
             # Нарезка по каждому пересекающемуся ЗУ
             for zu_feature in intersecting_zu:
@@ -686,18 +721,14 @@ class Msm_26_4_CuttingEngine:
                 if zu_feature.id() in excluded_zu_ids:
                     continue
 
-                zu_geom = zu_feature.geometry()
-
-                if not zu_geom or zu_geom.isEmpty():
+                # Валидация и трансформация ЗУ в CRS проекта (кэш Msm_26_1:
+                # один ЗУ совпадает с несколькими ЗПР)
+                zu_geom = self.geometry_processor.get_fixed_geometry(
+                    zu_layer.id(), zu_feature.id(), zu_feature.geometry(), zu_to_project
+                )
+                if zu_geom.isEmpty():
                     continue
 
-                zu_geom = self.geometry_processor.validate_and_fix(zu_geom)
-
-                # Трансформация ЗУ в CRS проекта
-                if zu_to_project:
-                    zu_geom = QgsGeometry(zu_geom)
-                    zu_geom.transform(zu_to_project)
-
                 # Пересечение ЗПР с этим ЗУ
                 intersection = self.geometry_processor.intersection(zpr_geom, zu_geom)
 
@@ -719,8 +750,13 @@ class Msm_26_4_CuttingEngine:
                         'overlays': {}  # Заполняется при overlay нарезке
                     })
 
-            # НГС = ЗПР минус union всех ЗУ
-            if not zu_union.isEmpty():
+            # НГС = ЗПР минус union всех ЗУ (в режиме 'local' - минус union
+            # ЗУ-кандидатов по bbox ЗПР, результат тот же)
+            if has_zu:
+                if self.ngs_mode == NGS_MODE_LOCAL:
+                    zu_union = self._get_local_zu_union(
+                        query_geom, zu_layer.id(), zu_index, zu_to_project, local_union_cache
+                    )
                 ngs_geom = self.geometry_processor.difference(zpr_geom, zu_union)
 
                 if not ngs_geom.isEmpty():
@@ -748,11 +784,11 @@ class Msm_26_4_CuttingEngine:
                         # Фильтрация микро-НГС (артефакты округления координат)
                         if poly_area < MIN_NGS_AREA:
                             filtered_count += 1
-                            log_info(f"Msm_26_4: НГС #{idx} от ЗПР ID={zpr_id}: "
-                                    f"площадь={poly_area:.6f} м2 < {MIN_NGS_AREA} м2, пропуск (артефакт)")
+                            log_debug("Msm_26_4: НГС #%s от ЗПР ID=%s: площадь=%.6f м2 < %s м2, пропуск (артефакт)",
+                                      idx, zpr_id, poly_area, MIN_NGS_AREA)
                             continue
 
-                        log_info(f"Msm_26_4: НГС #{idx} от ЗПР ID={zpr_id}: площадь={poly_area:.4f} м2")
+                        log_debug("Msm_26_4: НГС #%s от ЗПР ID=%s: площадь=%.4f м2", idx, zpr_id, poly_area)
 
                         # Пустые атрибуты для НГС
                         ngs_attrs = self.attribute_mapper.create_empty_attributes()
@@ -768,8 +804,65 @@ class Msm_26_4_CuttingEngine:
                         log_info(f"Msm_26_4: НГС от ЗПР ID={zpr_id}: отфильтровано {filtered_count} "
                                 f"микро-полигонов (площадь < {MIN_NGS_AREA} м2)")
 
+        if self.ngs_mode == NGS_MODE_LOCAL:
+            log_info(f"Msm_26_4: НГС (local): {self.statistics.get('ngs_local_unions', 0)} "
+                    f"локальных union, {self.statistics.get('ngs_local_union_cache_hits', 0)} "
+                    f"из кэша")
+
         return razdel_data, ngs_data
 
+    def _get_local_zu_union(
+        self,
+        query_geom: QgsGeometry,
+        zu_layer_id: str,
+        index_data: Tuple[QgsSpatialIndex, Dict[int, QgsFeature]],
+        zu_to_project: Optional[QgsCoordinateTransform],
+        cache: Dict[frozenset, QgsGeometry]
+    ) -> QgsGeometry:
+        """Union ЗУ-кандидатов по bbox ЗПР (режим НГС 'local')
+
+        Кандидаты берутся из того же индекса, что и для Раздела, без
+        исключения Изм/Без_Меж: эталонный union тоже строится по всему слою.
+        Смежные ЗПР одного участка часто дают тот же набор кандидатов,
+        поэтому union кэшируется по набору fid.
+
+        Args:
+            query_geom: Геометрия ЗПР в native CRS слоя ЗУ
+            zu_layer_id: ID слоя ЗУ (ключ кэша геометрий Msm_26_1)
+            index_data: Кортеж (QgsSpatialIndex, {fid: QgsFeature}) слоя ЗУ
+            zu_to_project: Трансформ ЗУ -> CRS проекта (None если не нужен)
+            cache: Кэш {frozenset(fid): union} на время одного _cut_by_zu
+
+        Returns:
+            QgsGeometry: Union кандидатов в CRS проекта (пустой если их нет)
+        """
+        spatial_index, features_dict = index_data
+        candidate_ids = frozenset(spatial_index.intersects(query_geom.boundingBox()))
+
+        cached = cache.get(candidate_ids)
+        if cached is not None:
+            self.statistics['ngs_local_union_cache_hits'] = \
+                self.statistics.get('ngs_local_union_cache_hits', 0) + 1
+            return cached
+
+        # Геометрии из кэша Msm_26_1 уже исправлены и в CRS проекта
+        geometries = []
+        for fid in sorted(candidate_ids):
+            feature = features_dict.get(fid)
+            if feature is None:
+                continue
+            geom = self.geometry_processor.get_fixed_geometry(
+                zu_layer_id, fid, feature.geometry(), zu_to_project
+            )
+            if not geom.isEmpty():
+                geometries.append(geom)
+
+        union = self.geometry_processor.union_geometries(geometries)
+
+        cache[candidate_ids] = union
+        self.statistics['ngs_local_unions'] = self.statistics.get('ngs_local_unions', 0) + 1
+        return union
+
     def _detect_and_process_no_change(
         self,
         zpr_layer: QgsVectorLayer,
@@ -1056,15 +1149,15 @@ class Msm_26_4_CuttingEngine:
                     if remaining.isEmpty():
                         break
 
-                    ov_geom = ov_feature.geometry()
+                    # Валидация и трансформация overlay геометрии в CRS проекта
+                    # (кэш Msm_26_1: один МО/НП режет десятки фрагментов)
+                    ov_geom = self.geometry_processor.get_fixed_geometry(
+                        overlay_layer.id(), ov_feature.id(), ov_feature.geometry(),
+                        overlay_to_project
+                    )
                     if ov_geom.isEmpty():
                         continue
 
-                    # Трансформация overlay геометрии в CRS проекта
-                    if overlay_to_project:
-                        ov_geom = QgsGeometry(ov_geom)
-                        ov_geom.transform(overlay_to_project)
-
                     # Извлечение названия из overlay feature
                     ov_name = self._get_overlay_name(ov_feature, name_field)
 
@@ -1228,7 +1321,8 @@ class Msm_26_4_CuttingEngine:
         self,
         geom: QgsGeometry,
         layer: QgsVectorLayer,
-        index_data: Tuple[QgsSpatialIndex, Dict[int, QgsFeature]]
+        index_data: Tuple[QgsSpatialIndex, Dict[int, QgsFeature]],
+        engine: Optional[Any] = None
     ) -> List[QgsFeature]:
         """Поиск объектов слоя, пересекающих геометрию
 
@@ -1239,6 +1333,7 @@ class Msm_26_4_CuttingEngine:
             geom: Геометрия для поиска
             layer: Слой для поиска (не используется, для совместимости)
             index_data: Кортеж (QgsSpatialIndex, {fid: QgsFeature})
+            engine: Подготовленный GEOS engine для geom (Msm_26_1.get_prepared_engine)
 
         Returns:
             List[QgsFeature]: Список пересекающихся объектов
@@ -1259,8 +1354,11 @@ class Msm_26_4_CuttingEngine:
             if feature_geom.isEmpty():
                 continue
 
-            # Точная проверка пересечения
-            if geom.intersects(feature_geom):
+            # Точная проверка пересечения (prepared engine если передан)
+            if engine is not None:
+                if engine.intersects(feature_geom.constGet()):
+                    result.append(feature)
+            elif geom.intersects(feature_geom):
                 result.append(feature)
 
         return result
@@ -30,6 +30,7 @@ from qgis.gui import QgsHighlight
 from Daman_QGIS.core.base_responsive_dialog import BaseResponsiveDialog
 from Daman_QGIS.utils import log_info, log_warning, log_error, path_for_display
 from .submodules.Msm_16_1_nspd_fetcher import Msm_16_1_NspdFetcher, NspdSearchResult
+from .submodules.Msm_16_2_cadnum_index import Msm_16_2_CadnumIndex
 
 __all__ = ['CadnumSearchManager', 'CadnumSearchDialog']
 
@@ -97,6 +98,8 @@ class CadnumSearchManager:
         if self.dialog and self.dialog.isVisible():
             self.dialog.close()
 
+        Msm_16_2_CadnumIndex.reset_instance()
+
         log_info("CadnumSearchManager: Инструмент поиска выгружен")
 
     def add_to_context_menu(self, menu):
@@ -354,14 +357,10 @@ class CadnumSearchManager:
             log_warning(f"CadnumSearchManager: Слой {layer.name()} не содержит поля кадастрового номера")
             return found_features, found_cadnums
 
-        # Создаем SQL выражение для поиска
-        # Используем QgsExpression.quotedValue() для безопасного экранирования
-        formatted_values = ', '.join([QgsExpression.quotedValue(c) for c in cadnums])
-        expression = f'"{field_name}" IN ({formatted_values})'
-
         try:
-            # Выполняем поиск
-            layer.selectByExpression(expression, QgsVectorLayer.SetSelection)
+            # fid по индексу КН (Msm_16_2) вместо выражения IN по всему слою
+            fids = Msm_16_2_CadnumIndex.get_instance().lookup(layer, field_name, cadnums)
+            layer.selectByIds(fids, QgsVectorLayer.SetSelection)
 
             # Получаем найденные объекты
             for feature in layer.selectedFeatures():
@@ -434,6 +433,7 @@ class CadnumSearchManager:
 
         suggestions = set()
         layers = CadnumSearchManager.get_layers_with_cadnum()
+        index = Msm_16_2_CadnumIndex.get_instance()
 
         for layer in layers:
             # Определяем имя поля кадастрового номера в слое
@@ -442,15 +442,13 @@ class CadnumSearchManager:
                 continue
 
             try:
-                for feature in layer.getFeatures():
-                    cad_num = feature.attribute(field_name)
-                    if cad_num and str(cad_num).startswith(partial_cadnum):
-                        suggestions.add(str(cad_num))
-
-                        # Если нашли больше max_suggestions - прерываем
-                        if len(suggestions) >= max_suggestions:
-                            log_info(f"CadnumSearchManager: Найдено {len(suggestions)}+ вариантов автодополнения - не показываем")
-                            return []
+                total, found = index.complete(layer, field_name, partial_cadnum, max_suggestions)
+                suggestions.update(found)
+
+                # Если нашли больше max_suggestions - не показываем
+                if total >= max_suggestions or len(suggestions) >= max_suggestions:
+                    log_info(f"CadnumSearchManager: Найдено {max(total, len(suggestions))}+ вариантов автодополнения - не показываем")
+                    return []
             except Exception as e:
                 log_warning(f"CadnumSearchManager: Ошибка автодополнения в слое {layer.name()}: {str(e)}")
 
@@ -569,8 +567,15 @@ class CadnumSearchDialog(BaseResponsiveDialog):
         # НСПД загрузчик
         self.nspd_fetcher = Msm_16_1_NspdFetcher()
 
-        # Completer для автодополнения
+        # Completer для автодополнения (варианты из индекса КН Msm_16_2)
         self.completer = None
+        self.completion_prefix = ''
+
+        # Таймер автодополнения (короче подсветки - подсказка при наборе)
+        self.completion_timer = QTimer()
+        self.completion_timer.setSingleShot(True)
+        self.completion_timer.setInterval(150)
+        self.completion_timer.timeout.connect(self.update_completion)
 
         # Таймер для дебаунсинга подсветки (избегаем лагов при вводе)
         self.highlight_timer = QTimer()
@@ -610,6 +615,12 @@ class CadnumSearchDialog(BaseResponsiveDialog):
         self.input_text.textChanged.connect(self.on_text_changed)
         layout.addWidget(self.input_text)
 
+        self.completer = QCompleter(self)
+        self.completer.setModel(QStringListModel(self.completer))
+        self.completer.setWidget(self.input_text)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.activated.connect(self.insert_completion)
+
         # Информация о формате
         format_label = QLabel(
             "КН: Регион(1-2):Район(1-2):Квартал(4-7):Участок(1+)  |  "
@@ -673,23 +684,53 @@ class CadnumSearchDialog(BaseResponsiveDialog):
         self.setLayout(layout)
 
     def on_text_changed(self):
-        """Обработчик изменения текста - только валидация без автодополнения"""
-        # ОТКЛЮЧЕНО: Автодополнение вызывает зависание при большом количестве объектов
+        """Обработчик изменения текста - валидация и автодополнение"""
         # Валидация с задержкой 500мс (дебаунсинг) - избегаем лагов при быстром вводе
         self.highlight_timer.stop()
         self.highlight_timer.start()
+        # Автодополнение - из префиксного дерева индекса КН, без перебора слоёв
+        self.completion_timer.stop()
+        self.completion_timer.start()
+
+    def update_completion(self):
+        """Показать варианты автодополнения для номера под курсором"""
+        cursor = self.input_text.textCursor()
+        line = cursor.block().text()[:cursor.positionInBlock()]
+        tokens = re.split(r'[,;\s]+', line)
+        prefix = tokens[-1] if tokens else ''
+
+        suggestions = CadnumSearchManager.get_autocomplete_suggestions(prefix)
+        if not suggestions or suggestions == [prefix]:
+            self.completer.popup().hide()
+            return
+
+        self.completion_prefix = prefix
+        self.completer.model().setStringList(suggestions)
+        rect = self.input_text.cursorRect()
+        rect.setWidth(
+            self.completer.popup().sizeHintForColumn(0)
+            + self.completer.popup().verticalScrollBar().sizeHint().width()
+        )
+        self.completer.complete(rect)
 
     def insert_completion(self, completion):
         """
         Вставка выбранного варианта автодополнения
 
+        Заменяет набранное начало номера под курсором (остальные номера
+        строки не затрагиваются).
+
         Args:
             completion: Выбранный вариант
         """
         cursor = self.input_text.textCursor()
-        cursor.select(QTextCursor.SelectionType.LineUnderCursor)
-        cursor.removeSelectedText()
+        cursor.movePosition(
+            QTextCursor.MoveOperation.Left,
+            QTextCursor.MoveMode.KeepAnchor,
+            len(self.completion_prefix)
+        )
         cursor.insertText(completion)
+        self.input_text.setTextCursor(cursor)
 
     def highlight_invalid_identifiers(self):
         """Подсветка невалидных номеров (КН и ЗОУИТ) красным цветом"""
@@ -1103,9 +1144,14 @@ class CadnumSearchDialog(BaseResponsiveDialog):
         errors = []
         
         try:
-            for cadnum in not_found_cadnums_only:
-                result = self.nspd_fetcher.fetch_by_cadnum(cadnum)
-                
+            # Результаты приходят по мере готовности (параллельная загрузка),
+            # добавление в слои и обновление кнопки - в главном потоке
+            for done, (cadnum, result) in enumerate(
+                self.nspd_fetcher.iter_multiple(not_found_cadnums_only), start=1
+            ):
+                self.nspd_button.setText(f"Загрузка... {done}/{count}")
+                QApplication.processEvents()
+
                 if result.error:
                     errors.append((cadnum, result.error))
                     continue
@@ -1202,4 +1248,6 @@ class CadnumSearchDialog(BaseResponsiveDialog):
     def closeEvent(self, event):
         """Обработчик закрытия диалога"""
         self.clear_highlights()
+        self.completion_timer.stop()
+        self.nspd_fetcher.close()
         super().closeEvent(event)
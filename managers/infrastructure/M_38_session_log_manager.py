@@ -3,27 +3,29 @@
 M_38_SessionLogManager - Менеджер файлового логирования сессий.
 
 Обеспечивает:
-- Запись всех QgsMessageLog сообщений в файл (crash-safe)
+- Запись всех QgsMessageLog сообщений в файл (фоновый поток Msm_38_1:
+  пакетная запись, flush раз в SESSION_LOG_FLUSH_INTERVAL и сразу после
+  WARNING/CRITICAL; segfault перехватывает faulthandler)
 - Ротацию логов: хранение только 3 последних сессий
 - faulthandler для перехвата C-level crashes (segfault)
 - Сбор логов для отправки через feedback (F_4_4)
 
 Хранилище: QgsApplication.qgisSettingsDirPath() / "daman_logs/"
 Формат файлов: session_YYYY-MM-DD_HH-MM-SS.log
+Отчёт замеров запуска (Msm_38_2): session_YYYY-MM-DD_HH-MM-SS.startup.json
 """
 
 __all__ = ['SessionLogManager']
 
-import os
-import logging
 import faulthandler
-import threading
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
 
 from qgis.core import QgsApplication, Qgis
 
+from .submodules.Msm_38_1_async_log_writer import AsyncLogWriter
+
 
 class SessionLogManager:
     """
@@ -36,6 +38,7 @@ class SessionLogManager:
     MAX_SESSIONS = 3
     SESSION_PREFIX = "session_"
     CRASH_FILE = "crash_trace.log"
+    STARTUP_PROFILE_SUFFIX = ".startup.json"
 
     # Маппинг Qgis.MessageLevel -> строковый уровень
     _LEVEL_MAP = {
@@ -50,13 +53,14 @@ class SessionLogManager:
         self._log_dir: Optional[Path] = None
         self._session_id: Optional[str] = None
         self._log_file: Optional[Path] = None
-        self._logger: Optional[logging.Logger] = None
-        self._file_handler: Optional[logging.FileHandler] = None
+        self._writer: Optional[AsyncLogWriter] = None
         self._crash_file_handle = None
         self._initialized: bool = False
-        self._lock = threading.Lock()
         self._message_log_connected: bool = False
 
+        from Daman_QGIS.constants import SESSION_LOG_DEBUG_ENABLED
+        self.debug_enabled: bool = SESSION_LOG_DEBUG_ENABLED
+
     def initialize(self) -> bool:
         """
         Инициализация системы логирования.
@@ -86,8 +90,8 @@ class SessionLogManager:
             self._session_id = f"{self.SESSION_PREFIX}{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}"
             self._log_file = self._log_dir / f"{self._session_id}.log"
 
-            # 4. Настраиваем Python logging
-            self._setup_logger()
+            # 4. Фоновая запись в файл
+            self._writer = AsyncLogWriter(str(self._log_file))
 
             # 5. Включаем faulthandler для C-level crashes
             self._setup_faulthandler()
@@ -97,6 +101,10 @@ class SessionLogManager:
 
             self._initialized = True
 
+            # utils.log_* пишут напрямую в этот менеджер (без registry на каждое сообщение)
+            from Daman_QGIS.utils import set_session_log
+            set_session_log(self)
+
             # Первая запись в лог
             self.write(
                 f"M_38: Session log started: {self._session_id}",
@@ -118,31 +126,28 @@ class SessionLogManager:
         """
         Записать сообщение в лог-файл.
 
-        Thread-safe. Каждое сообщение записывается немедленно (flush).
+        Thread-safe, не блокирует: сообщение ставится в очередь фонового
+        потока Msm_38_1 (время фиксируется в момент вызова).
 
         Args:
             message: Текст сообщения
             tag: Источник сообщения (имя плагина/модуля)
             level: Уровень логирования (INFO, WARNING, CRITICAL, SUCCESS, DEBUG)
         """
-        if not self._initialized or self._logger is None:
+        writer = self._writer
+        if not self._initialized or writer is None:
             return
+        writer.write(message, tag, level)
 
-        with self._lock:
-            try:
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                tag_str = f" [{tag}]" if tag else ""
-                formatted = f"{timestamp} [{level}]{tag_str} {message}"
-
-                # Используем logging для записи (автоматический flush через handler)
-                self._logger.info(formatted)
-
-                # Принудительный flush для crash-safety
-                if self._file_handler:
-                    self._file_handler.flush()
+    def flush(self, timeout: float = 2.0) -> bool:
+        """Дождаться записи на диск всех сообщений в очереди."""
+        writer = self._writer
+        return writer.flush(timeout) if writer is not None else False
 
-            except Exception:
-                pass  # Не ломаем основной код при ошибках записи
+    def stats(self) -> Dict[str, int]:
+        """Счётчики записи: written, dropped, batches, queued."""
+        writer = self._writer
+        return writer.stats() if writer is not None else {}
 
     def get_session_logs(self, max_lines: int = 500) -> List[Dict[str, str]]:
         """
@@ -164,12 +169,8 @@ class SessionLogManager:
             self.write("M_38: get_session_logs: log_dir не существует", level="WARNING")
             return []
 
-        # Принудительный flush текущей сессии перед чтением
-        if self._file_handler:
-            try:
-                self._file_handler.flush()
-            except Exception:
-                pass
+        # Дописываем очередь текущей сессии перед чтением
+        self.flush()
 
         result = []
         session_files = sorted(
@@ -238,6 +239,12 @@ class SessionLogManager:
         """ID текущей сессии."""
         return self._session_id
 
+    def get_startup_profile_path(self) -> Optional[Path]:
+        """Путь к отчёту замеров запуска текущей сессии (None - лог не инициализирован)."""
+        if not self._log_dir or not self._session_id:
+            return None
+        return self._log_dir / f"{self._session_id}{self.STARTUP_PROFILE_SUFFIX}"
+
     def shutdown(self) -> None:
         """
         Корректное завершение: flush, close handlers, disable faulthandler.
@@ -258,14 +265,22 @@ class SessionLogManager:
         # Отключаем QgsMessageLog
         self._disconnect_message_log()
 
-        # Закрываем file handler
-        if self._file_handler:
-            try:
-                self._file_handler.flush()
-                self._file_handler.close()
-            except Exception:
-                pass
-            self._file_handler = None
+        # utils.log_* больше не пишут в файл
+        try:
+            from Daman_QGIS.utils import set_session_log
+            set_session_log(None)
+        except Exception:
+            pass
+
+        # Дописываем очередь и закрываем файл
+        if self._writer:
+            stats = self._writer.stats()
+            if stats.get('dropped'):
+                self._writer.write(
+                    f"M_38: Session log stats: {stats}", tag="Daman_QGIS", level="INFO"
+                )
+            self._writer.close()
+            self._writer = None
 
         # Отключаем faulthandler
         try:
@@ -281,15 +296,6 @@ class SessionLogManager:
                 pass
             self._crash_file_handle = None
 
-        # Удаляем logger
-        if self._logger:
-            try:
-                for handler in self._logger.handlers[:]:
-                    self._logger.removeHandler(handler)
-            except Exception:
-                pass
-            self._logger = None
-
         self._initialized = False
 
     # ========================================================================
@@ -301,43 +307,17 @@ class SessionLogManager:
         if not self._log_dir:
             return
 
-        session_files = sorted(self._log_dir.glob(f"{self.SESSION_PREFIX}*.log"))
-
         # Оставляем MAX_SESSIONS - 1 = 2 файла (3-й = текущая сессия)
         files_to_keep = self.MAX_SESSIONS - 1
-        files_to_delete = session_files[:-files_to_keep] if len(session_files) > files_to_keep else []
-
-        for old_file in files_to_delete:
-            try:
-                old_file.unlink()
-            except Exception:
-                pass  # Файл может быть заблокирован другим процессом
-
-    def _setup_logger(self) -> None:
-        """Настроить Python logging с FileHandler."""
-        # Используем уникальное имя логгера для избежания конфликтов
-        logger_name = f"daman_session_{os.getpid()}"
-        self._logger = logging.getLogger(logger_name)
-        self._logger.setLevel(logging.DEBUG)
-
-        # Убираем все существующие handlers (на случай повторной инициализации)
-        for handler in self._logger.handlers[:]:
-            self._logger.removeHandler(handler)
-
-        # FileHandler: пишет каждое сообщение сразу
-        self._file_handler = logging.FileHandler(
-            str(self._log_file),
-            mode='a',
-            encoding='utf-8'
-        )
-        # Формат минимальный — основное форматирование в write()
-        self._file_handler.setFormatter(logging.Formatter('%(message)s'))
-        self._file_handler.setLevel(logging.DEBUG)
-
-        self._logger.addHandler(self._file_handler)
-
-        # Отключаем propagation чтобы не дублировать в root logger
-        self._logger.propagate = False
+        for pattern in (f"{self.SESSION_PREFIX}*.log", f"{self.SESSION_PREFIX}*{self.STARTUP_PROFILE_SUFFIX}"):
+            session_files = sorted(self._log_dir.glob(pattern))
+            files_to_delete = session_files[:-files_to_keep] if len(session_files) > files_to_keep else []
+
+            for old_file in files_to_delete:
+                try:
+                    old_file.unlink()
+                except Exception:
+                    pass  # Файл может быть заблокирован другим процессом
 
     def _setup_faulthandler(self) -> None:
         """Включить faulthandler для перехвата segfault."""
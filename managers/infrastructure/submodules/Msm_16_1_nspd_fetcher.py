@@ -4,11 +4,31 @@ Msm_16_1_NspdFetcher - Загрузка геометрии объектов из
 
 Использует API v2/search/geoportal для поиска объектов по КН.
 Поддерживает ЗУ и ОКС (Здания, Сооружения, ОНС).
+
+Пакетная загрузка (iter_multiple / fetch_multiple):
+    - ThreadPoolExecutor на NSPD_SEARCH_MAX_WORKERS потоков, одновременных
+      запросов к одному хосту не больше NSPD_SEARCH_HOST_LIMIT (семафор
+      общий для всех экземпляров загрузчика)
+    - дубли КН в списке (в т.ч. с пробелами) объединяются в один запрос
+    - результаты отдаются по мере готовности - вызывающий (диалог M_16)
+      добавляет объекты в слои в главном потоке, не дожидаясь всего списка
+    - кэш результатов в памяти по нормализованному КН на
+      NSPD_SEARCH_CACHE_TTL_SECONDS; ошибки сети/сервера не кэшируются
+    - keep-alive Session: TCP+TLS handshake один раз на соединение, а не на КН
+    - повтор на 429 / 5xx / сетевых ошибках с экспоненциальной паузой
+      (Retry-After сервера, если есть); 403 (блокировка IP) и прочие 4xx
+      не повторяются
 """
 
 import json
-from typing import Optional, Dict, List, Tuple, Any
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Iterator, List, Tuple, Any
 from dataclasses import dataclass
+from urllib.parse import urlsplit
 
 import requests
 import urllib3
@@ -17,12 +37,21 @@ from qgis.core import (
     QgsProject, QgsVectorLayer, QgsFeature, QgsGeometry,
     QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsFields
 )
-from Daman_QGIS.constants import DEFAULT_MAX_RETRIES, NSPD_SEARCH_URL
+from Daman_QGIS.constants import (
+    DEFAULT_MAX_RETRIES, DEFAULT_RETRY_DELAY, NSPD_RETRY_AFTER_MAX_SECONDS,
+    NSPD_SEARCH_URL, NSPD_SEARCH_MAX_WORKERS,
+    NSPD_SEARCH_HOST_LIMIT, NSPD_SEARCH_CACHE_TTL_SECONDS, NSPD_SEARCH_CACHE_MAX_ENTRIES,
+)
 from Daman_QGIS.utils import log_info, log_warning, log_error
 
 # Отключаем предупреждения о SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Ответы API, которые кэшируются наряду с успешными (окончательный ответ сервера)
+NOT_FOUND_ERROR = "Объект не найден в НСПД"
+POINT_ONLY_ERROR = "Объект без координат границ (только точка)"
+_CACHEABLE_ERRORS = (NOT_FOUND_ERROR, POINT_ONLY_ERROR)
+
 
 @dataclass
 class NspdSearchResult:
@@ -71,11 +100,94 @@ class Msm_16_1_NspdFetcher:
     # Таймаут запроса (секунды)
     TIMEOUT = 15
     MAX_RETRIES = DEFAULT_MAX_RETRIES  # Используется из constants.py
+    RETRY_BASE_DELAY = DEFAULT_RETRY_DELAY  # Пауза перед 2-й попыткой, далее x2
+
+    # Кэш результатов {КН: (время, результат)} - общий для всех экземпляров
+    _result_cache: 'OrderedDict[str, Tuple[float, NspdSearchResult]]' = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    # Семафоры одновременных запросов {хост: Semaphore}
+    _host_semaphores: Dict[str, threading.Semaphore] = {}
+    _host_lock = threading.Lock()
 
     def __init__(self):
         """Инициализация загрузчика"""
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0}
         log_info("Msm_16_1_NspdFetcher: Инициализация")
 
+    @staticmethod
+    def normalize_cadnum(cadnum: str) -> str:
+        """КН без пробелов (ключ запроса и кэша)"""
+        return cadnum.strip().replace(' ', '')
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Очистить кэш результатов"""
+        with cls._cache_lock:
+            cls._result_cache.clear()
+
+    def close(self) -> None:
+        """Закрыть соединения Session"""
+        with self._session_lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+    def _get_session(self) -> requests.Session:
+        """Keep-alive Session с пулом на NSPD_SEARCH_HOST_LIMIT соединений"""
+        with self._session_lock:
+            if self._session is None:
+                from http.cookiejar import DefaultCookiePolicy
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                # Cookies авторизации передаются в каждый запрос, ответные не сохраняются
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(
+                    pool_connections=2,
+                    pool_maxsize=NSPD_SEARCH_HOST_LIMIT,
+                    max_retries=0,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    @classmethod
+    def _host_semaphore(cls, url: str) -> threading.Semaphore:
+        """Семафор хоста URL"""
+        host = urlsplit(url).netloc
+        with cls._host_lock:
+            semaphore = cls._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.Semaphore(NSPD_SEARCH_HOST_LIMIT)
+                cls._host_semaphores[host] = semaphore
+            return semaphore
+
+    def _cache_get(self, cadnum: str) -> Optional[NspdSearchResult]:
+        with self._cache_lock:
+            entry = self._result_cache.get(cadnum)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > NSPD_SEARCH_CACHE_TTL_SECONDS:
+                del self._result_cache[cadnum]
+                return None
+        with self._stats_lock:
+            self.stats['cache_hits'] += 1
+        return entry[1]
+
+    def _cache_put(self, cadnum: str, result: NspdSearchResult) -> None:
+        if result.error is not None and result.error not in _CACHEABLE_ERRORS:
+            return
+        with self._cache_lock:
+            self._result_cache[cadnum] = (time.monotonic(), result)
+            self._result_cache.move_to_end(cadnum)
+            while len(self._result_cache) > NSPD_SEARCH_CACHE_MAX_ENTRIES:
+                self._result_cache.popitem(last=False)
+
     def _get_auth_cookies(self) -> dict:
         """Получить cookies авторизации НСПД (если доступны).
 
@@ -101,11 +213,21 @@ class Msm_16_1_NspdFetcher:
         Returns:
             NspdSearchResult: Результат поиска
         """
-        log_info(f"Msm_16_1_NspdFetcher: Поиск КН {cadnum}")
-        
         # Убираем пробелы
-        cadnum = cadnum.strip().replace(' ', '')
-        
+        cadnum = self.normalize_cadnum(cadnum)
+
+        cached = self._cache_get(cadnum)
+        if cached is not None:
+            log_info(f"Msm_16_1_NspdFetcher: КН {cadnum} из кэша")
+            return cached
+
+        log_info(f"Msm_16_1_NspdFetcher: Поиск КН {cadnum}")
+        result = self._fetch_remote(cadnum)
+        self._cache_put(cadnum, result)
+        return result
+
+    def _fetch_remote(self, cadnum: str) -> NspdSearchResult:
+        """Запрос КН к API с повторными попытками"""
         # Формируем URL
         url = f"{self.API_URL}?query={cadnum}&thematicSearchId={self.THEMATIC_ID_REALTY}"
         
@@ -113,19 +235,40 @@ class Msm_16_1_NspdFetcher:
         auth_cookies = self._get_auth_cookies()
 
         # Пробуем запрос с retry
+        session = self._get_session()
+        semaphore = self._host_semaphore(url)
+        retry_after = None
         for attempt in range(self.MAX_RETRIES):
+            if attempt > 0:
+                # Пауза вне семафора - слот хоста не простаивает
+                time.sleep(self._retry_delay(attempt, retry_after))
+                retry_after = None
             try:
-                response = requests.get(
-                    url,
-                    headers=self.HEADERS,
-                    cookies=auth_cookies if auth_cookies else None,
-                    timeout=self.TIMEOUT,
-                    verify=False  # Сертификаты Минцифры
-                )
+                with semaphore:
+                    with self._stats_lock:
+                        self.stats['requests'] += 1
+                    response = session.get(
+                        url,
+                        headers=self.HEADERS,
+                        cookies=auth_cookies if auth_cookies else None,
+                        timeout=self.TIMEOUT,
+                        verify=False  # Сертификаты Минцифры
+                    )
                 
                 if response.status_code != 200:
                     log_warning(f"Msm_16_1_NspdFetcher: HTTP {response.status_code} для КН {cadnum}")
-                    continue
+                    if response.status_code == 429 or response.status_code >= 500:
+                        retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+                        continue
+                    # 403 - блокировка IP, прочие 4xx - повтор не поможет
+                    return NspdSearchResult(
+                        cadnum=cadnum,
+                        geometry=None,
+                        attributes={},
+                        object_type='unknown',
+                        target_layer_name='',
+                        error=f"НСПД отклонил запрос (HTTP {response.status_code})"
+                    )
                 
                 data = response.json()
                 return self._parse_response(cadnum, data)
@@ -170,6 +313,27 @@ class Msm_16_1_NspdFetcher:
             error="Превышено количество попыток подключения к НСПД"
         )
 
+    def _retry_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """
+        Пауза перед повторной попыткой
+
+        Экспоненциальная (RETRY_BASE_DELAY * 2^(attempt-1)) со случайной
+        добавкой; Retry-After сервера - не меньше указанного, не больше
+        NSPD_RETRY_AFTER_MAX_SECONDS.
+        """
+        delay = self.RETRY_BASE_DELAY * (2 ** (attempt - 1)) + random.uniform(0, self.RETRY_BASE_DELAY)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return min(delay, NSPD_RETRY_AFTER_MAX_SECONDS)
+
+    @staticmethod
+    def _parse_retry_after(value: Any) -> Optional[float]:
+        """Retry-After в секундах (разбор - как у загрузчика ЕГРН Fsm_1_2_1_1)"""
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_1_concurrency_controller import (
+            parse_retry_after,
+        )
+        return parse_retry_after(value)
+
     def _parse_response(self, cadnum: str, data: dict) -> NspdSearchResult:
         """
         Парсинг ответа API
@@ -204,7 +368,7 @@ class Msm_16_1_NspdFetcher:
                 attributes={},
                 object_type='unknown',
                 target_layer_name='',
-                error="Объект не найден в НСПД"
+                error=NOT_FOUND_ERROR
             )
         
         # Берём первый feature
@@ -222,7 +386,7 @@ class Msm_16_1_NspdFetcher:
                 attributes=properties,
                 object_type='unknown',
                 target_layer_name='',
-                error="Объект без координат границ (только точка)"
+                error=POINT_ONLY_ERROR
             )
         
         # Создаём геометрию QGIS из GeoJSON
@@ -303,21 +467,93 @@ class Msm_16_1_NspdFetcher:
         # По умолчанию считаем ЗУ
         return 'ZU'
 
-    def fetch_multiple(self, cadnums: List[str]) -> List[NspdSearchResult]:
+    def iter_multiple(
+        self,
+        cadnums: List[str],
+        max_workers: int = NSPD_SEARCH_MAX_WORKERS
+    ) -> Iterator[Tuple[str, NspdSearchResult]]:
+        """
+        Параллельная загрузка списка КН с выдачей результатов по мере готовности
+
+        Дубли (после нормализации) запрашиваются один раз, результат выдаётся
+        для каждого вхождения. КН из кэша выдаются сразу, без запроса.
+        Генератор выполняется в потоке вызывающего - результаты можно сразу
+        добавлять в слои (add_to_layer) и обновлять интерфейс.
+
+        Args:
+            cadnums: Список кадастровых номеров
+            max_workers: Потоков загрузки
+
+        Yields:
+            (КН из входного списка, NspdSearchResult)
+        """
+        # Нормализованный КН -> вхождения во входном списке
+        pending: Dict[str, List[str]] = OrderedDict()
+        for cadnum in cadnums:
+            pending.setdefault(self.normalize_cadnum(cadnum), []).append(cadnum)
+        coalesced = len(cadnums) - len(pending)
+        if coalesced:
+            with self._stats_lock:
+                self.stats['coalesced'] += coalesced
+
+        to_fetch = []
+        for key, originals in pending.items():
+            cached = self._cache_get(key)
+            if cached is None:
+                to_fetch.append(key)
+                continue
+            for original in originals:
+                yield original, cached
+
+        if not to_fetch:
+            return
+
+        log_info(
+            f"Msm_16_1_NspdFetcher: Пакетная загрузка {len(to_fetch)} КН "
+            f"(всего {len(cadnums)}, из кэша {len(pending) - len(to_fetch)}, дублей {coalesced})"
+        )
+        workers = max(1, min(max_workers, len(to_fetch)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.fetch_by_cadnum, key): key for key in to_fetch}
+            try:
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        log_error(f"Msm_16_1_NspdFetcher: Ошибка загрузки КН {key}: {str(e)}")
+                        result = NspdSearchResult(
+                            cadnum=key,
+                            geometry=None,
+                            attributes={},
+                            object_type='unknown',
+                            target_layer_name='',
+                            error=f"Ошибка: {str(e)}"
+                        )
+                    for original in pending[key]:
+                        yield original, result
+            finally:
+                # Вызывающий прервал итерацию - не запускаем оставшиеся запросы
+                for future in futures:
+                    future.cancel()
+
+    def fetch_multiple(
+        self,
+        cadnums: List[str],
+        max_workers: int = NSPD_SEARCH_MAX_WORKERS
+    ) -> List[NspdSearchResult]:
         """
         Загрузить геометрию для списка кадастровых номеров
         
         Args:
             cadnums: Список кадастровых номеров
+            max_workers: Потоков загрузки
             
         Returns:
-            List[NspdSearchResult]: Список результатов
+            List[NspdSearchResult]: Список результатов (в порядке cadnums)
         """
-        results = []
-        for cadnum in cadnums:
-            result = self.fetch_by_cadnum(cadnum)
-            results.append(result)
-        return results
+        by_cadnum = dict(self.iter_multiple(cadnums, max_workers))
+        return [by_cadnum[cadnum] for cadnum in cadnums]
 
     def add_to_layer(self, result: NspdSearchResult) -> Tuple[bool, str]:
         """
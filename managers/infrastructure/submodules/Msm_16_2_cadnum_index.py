@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+Msm_16_2_CadnumIndex - Индекс кадастровых номеров слоёв проекта для M_16
+
+Заменяет в M_16 полный перебор слоёв:
+    - search_in_layer: selectByExpression('"КН" IN (...)') -> selectByIds
+      по fid из словаря КН -> [fid]
+    - get_autocomplete_suggestions: getFeatures() всего слоя на каждое
+      нажатие клавиши -> префиксное дерево КН слоя
+
+Индекс слоя строится лениво при первом обращении (запрос только поля КН,
+без геометрии) и поддерживается инкрементально по сигналам слоя:
+    featureAdded / featureDeleted / attributeValueChanged - правка буфера
+    afterCommitChanges / afterRollBack / dataChanged - полная перестройка
+        при следующем обращении (fid новых объектов меняются при сохранении)
+Дополнительная защита: расхождение featureCount() с числом проиндексированных
+объектов (запись в провайдер в обход буфера правки) - перестройка.
+
+Префиксное дерево - по сегментам КН (регион:район:квартал:участок): узел
+хранит число КН в поддереве и отсортированные имена дочерних сегментов,
+неполный последний сегмент префикса ищется bisect. Узлов ~ число КН, а не
+число символов.
+"""
+
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from qgis.core import QgsFeatureRequest, QgsProject, QgsVectorLayer
+
+from Daman_QGIS.utils import log_info
+
+SEPARATOR = ':'
+
+
+class _TrieNode:
+    """Узел дерева: дочерние сегменты, число КН в поддереве"""
+
+    __slots__ = ('children', 'keys', 'count', 'terminal')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.keys: List[str] = []  # Отсортированные имена children
+        self.count = 0
+        self.terminal = False
+
+
+class CadnumPrefixTrie:
+    """Префиксное дерево КН по сегментам через ':'"""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def __len__(self) -> int:
+        return self.root.count
+
+    def insert(self, cadnum: str) -> None:
+        """Добавить КН (повторная вставка игнорируется)"""
+        if self.contains(cadnum):
+            return
+        node = self.root
+        node.count += 1
+        for segment in cadnum.split(SEPARATOR):
+            child = node.children.get(segment)
+            if child is None:
+                child = _TrieNode()
+                node.children[segment] = child
+                insort(node.keys, segment)
+            child.count += 1
+            node = child
+        node.terminal = True
+
+    def remove(self, cadnum: str) -> None:
+        """Удалить КН (отсутствующий игнорируется)"""
+        if not self.contains(cadnum):
+            return
+        node = self.root
+        node.count -= 1
+        for segment in cadnum.split(SEPARATOR):
+            child = node.children[segment]
+            child.count -= 1
+            if child.count == 0:
+                # Поддерево опустело целиком
+                del node.children[segment]
+                del node.keys[bisect_left(node.keys, segment)]
+                return
+            node = child
+        node.terminal = False
+
+    def contains(self, cadnum: str) -> bool:
+        node = self.root
+        for segment in cadnum.split(SEPARATOR):
+            node = node.children.get(segment)
+            if node is None:
+                return False
+        return node.terminal
+
+    def complete(self, prefix: str, limit: int) -> Tuple[int, List[str]]:
+        """
+        КН, начинающиеся с prefix
+
+        Args:
+            prefix: Начало КН (последний сегмент может быть неполным)
+            limit: Сколько КН вернуть (в порядке сортировки)
+
+        Returns:
+            (всего КН с префиксом, первые limit КН)
+        """
+        *complete_segments, partial = prefix.split(SEPARATOR)
+        node = self.root
+        for segment in complete_segments:
+            node = node.children.get(segment)
+            if node is None:
+                return 0, []
+
+        base = SEPARATOR.join(complete_segments)
+        total = 0
+        result: List[str] = []
+        start = bisect_left(node.keys, partial)
+        for segment in node.keys[start:]:
+            if not segment.startswith(partial):
+                break
+            child = node.children[segment]
+            total += child.count
+            if len(result) < limit:
+                self._collect(child, f"{base}{SEPARATOR}{segment}" if complete_segments else segment,
+                              limit, result)
+        return total, result
+
+    def _collect(self, node: _TrieNode, path: str, limit: int, result: List[str]) -> None:
+        if node.terminal:
+            result.append(path)
+        for segment in node.keys:
+            if len(result) >= limit:
+                return
+            self._collect(node.children[segment], f"{path}{SEPARATOR}{segment}", limit, result)
+
+
+class _LayerIndex:
+    """Индекс одного слоя: КН -> fid, fid -> КН, префиксное дерево"""
+
+    def __init__(self, layer: QgsVectorLayer, field_name: str):
+        self.field_name = field_name
+        self.by_cadnum: Dict[str, List[int]] = {}
+        self.by_fid: Dict[int, str] = {}
+        self.trie = CadnumPrefixTrie()
+        self.feature_count = 0  # Проиндексировано объектов (включая без КН)
+        self.dirty = False
+        self._build(layer)
+
+    def _build(self, layer: QgsVectorLayer) -> None:
+        request = QgsFeatureRequest()
+        request.setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([self.field_name], layer.fields())
+        for feature in layer.getFeatures(request):
+            self.feature_count += 1
+            self.add(feature.id(), feature.attribute(self.field_name))
+
+    def add(self, fid: int, value) -> None:
+        if value is None or value == '':
+            return
+        cadnum = str(value)
+        if cadnum == 'NULL':
+            return
+        self.by_fid[fid] = cadnum
+        fids = self.by_cadnum.get(cadnum)
+        if fids is None:
+            self.by_cadnum[cadnum] = [fid]
+            self.trie.insert(cadnum)
+        elif fid not in fids:
+            fids.append(fid)
+
+    def discard(self, fid: int) -> None:
+        cadnum = self.by_fid.pop(fid, None)
+        if cadnum is None:
+            return
+        fids = self.by_cadnum.get(cadnum, [])
+        if fid in fids:
+            fids.remove(fid)
+        if not fids:
+            self.by_cadnum.pop(cadnum, None)
+            self.trie.remove(cadnum)
+
+
+class Msm_16_2_CadnumIndex:
+    """Индексы КН слоёв проекта (singleton, поддерживается сигналами слоёв)"""
+
+    MODULE_ID = "Msm_16_2"
+
+    _instance: Optional['Msm_16_2_CadnumIndex'] = None
+
+    def __init__(self):
+        self._indexes: Dict[str, _LayerIndex] = {}
+        # {layer_id: [(сигнал, обработчик)]} - для точечного отключения
+        self._connections: Dict[str, List[Tuple[Any, Callable]]] = {}
+        self._project_connected = False
+        self.builds = 0
+
+    @classmethod
+    def get_instance(cls) -> 'Msm_16_2_CadnumIndex':
+        """Получить singleton"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        """Отключить сигналы и сбросить индексы (выгрузка плагина, тесты)"""
+        if cls._instance is not None:
+            cls._instance.clear()
+        cls._instance = None
+
+    # ------------------------------------------------------------------
+    # Публичный API
+    # ------------------------------------------------------------------
+
+    def lookup(self, layer: QgsVectorLayer, field_name: str, cadnums: List[str]) -> List[int]:
+        """fid объектов слоя с КН из списка"""
+        index = self._get_index(layer, field_name)
+        fids: List[int] = []
+        for cadnum in set(cadnums):
+            fids.extend(index.by_cadnum.get(cadnum, ()))
+        return fids
+
+    def complete(self, layer: QgsVectorLayer, field_name: str, prefix: str,
+                 limit: int) -> Tuple[int, List[str]]:
+        """Автодополнение КН слоя: (всего вариантов, первые limit)"""
+        return self._get_index(layer, field_name).trie.complete(prefix, limit)
+
+    def invalidate(self, layer_id: Optional[str] = None) -> None:
+        """Пометить индекс слоя (или все) для перестройки"""
+        targets = [layer_id] if layer_id else list(self._indexes)
+        for target in targets:
+            index = self._indexes.get(target)
+            if index is not None:
+                index.dirty = True
+
+    def clear(self) -> None:
+        """Удалить все индексы и отключить сигналы"""
+        project = QgsProject.instance()
+        for layer_id in list(self._connections):
+            self._disconnect_layer(layer_id)
+        self._indexes.clear()
+        if self._project_connected:
+            try:
+                project.layersWillBeRemoved.disconnect(self._on_layers_removed)
+            except (TypeError, RuntimeError):
+                pass
+            self._project_connected = False
+
+    # ------------------------------------------------------------------
+    # Построение
+    # ------------------------------------------------------------------
+
+    def _get_index(self, layer: QgsVectorLayer, field_name: str) -> _LayerIndex:
+        layer_id = layer.id()
+        index = self._indexes.get(layer_id)
+        if (
+            index is None
+            or index.dirty
+            or index.field_name != field_name
+            or 0 <= layer.featureCount() != index.feature_count
+        ):
+            index = _LayerIndex(layer, field_name)
+            self._indexes[layer_id] = index
+            self.builds += 1
+            self._connect_layer(layer)
+            log_info(
+                f"{self.MODULE_ID}: Индекс КН слоя {layer.name()}: "
+                f"{index.feature_count} объектов, {len(index.by_cadnum)} КН"
+            )
+        return index
+
+    def _connect_layer(self, layer: QgsVectorLayer) -> None:
+        layer_id = layer.id()
+        if layer_id in self._connections:
+            return
+
+        def invalidate(*_args, lid=layer_id):
+            self.invalidate(lid)
+
+        connections = [
+            (layer.featureAdded, lambda fid, lid=layer_id: self._on_feature_added(lid, fid)),
+            (layer.featureDeleted, lambda fid, lid=layer_id: self._on_feature_deleted(lid, fid)),
+            (layer.attributeValueChanged,
+             lambda fid, idx, value, lid=layer_id: self._on_attribute_changed(lid, fid, idx, value)),
+            (layer.afterCommitChanges, invalidate),
+            (layer.afterRollBack, invalidate),
+            (layer.dataChanged, invalidate),
+        ]
+        for signal, slot in connections:
+            signal.connect(slot)
+        self._connections[layer_id] = connections
+
+        if not self._project_connected:
+            QgsProject.instance().layersWillBeRemoved.connect(self._on_layers_removed)
+            self._project_connected = True
+
+    def _disconnect_layer(self, layer_id: str) -> None:
+        for signal, slot in self._connections.pop(layer_id, []):
+            try:
+                signal.disconnect(slot)
+            except (TypeError, RuntimeError):
+                # Слой уже удалён
+                pass
+
+    # ------------------------------------------------------------------
+    # Сигналы
+    # ------------------------------------------------------------------
+
+    def _layer(self, layer_id: str) -> Optional[QgsVectorLayer]:
+        layer = QgsProject.instance().mapLayer(layer_id)
+        return layer if isinstance(layer, QgsVectorLayer) else None
+
+    def _on_feature_added(self, layer_id: str, fid: int) -> None:
+        index = self._indexes.get(layer_id)
+        layer = self._layer(layer_id)
+        if index is None or index.dirty or layer is None:
+            return
+        feature = layer.getFeature(fid)
+        index.feature_count += 1
+        index.add(fid, feature.attribute(index.field_name) if feature.isValid() else None)
+
+    def _on_feature_deleted(self, layer_id: str, fid: int) -> None:
+        index = self._indexes.get(layer_id)
+        if index is None or index.dirty:
+            return
+        index.feature_count -= 1
+        index.discard(fid)
+
+    def _on_attribute_changed(self, layer_id: str, fid: int, field_idx: int, value) -> None:
+        index = self._indexes.get(layer_id)
+        layer = self._layer(layer_id)
+        if index is None or index.dirty or layer is None:
+            return
+        if layer.fields().indexFromName(index.field_name) != field_idx:
+            return
+        index.discard(fid)
+        index.add(fid, value)
+
+    def _on_layers_removed(self, layer_ids: List[str]) -> None:
+        for layer_id in layer_ids:
+            if self._indexes.pop(layer_id, None) is not None:
+                log_info(f"{self.MODULE_ID}: Индекс КН слоя {layer_id} удалён")
+            # Слой удаляется вместе с соединениями
+            self._connections.pop(layer_id, None)
+
@@ -30,6 +30,7 @@ Msm_29_6_AuthedRequestManager - Единая точка для авторизо
 
 Зависимости:
     - Msm_29_4_TokenManager — auth headers, refresh token
+    - Msm_29_7_PooledTransport — общий keep-alive пул соединений
     - constants — PLUGIN_VERSION, API_TIMEOUT, AUTHED_REQUEST_*
     - utils — log_info, log_warning, log_error
 """
@@ -738,7 +739,21 @@ class AuthedRequestManager:
         else:
             headers.update(self._get_auth_headers())
 
-        return requests_module.request(
+        # Общий keep-alive пул (Msm_29_7): соединение переиспользуется между
+        # запросами, retry/refresh/circuit breaker остаются здесь. Без пула -
+        # прямой запрос через переданный модуль requests.
+        transport = requests_module
+        try:
+            from Daman_QGIS.managers.infrastructure.submodules.Msm_29_7_pooled_transport import (
+                PooledTransport,
+            )
+            pooled = PooledTransport.get_instance()
+            if pooled.get_session() is not None:
+                transport = pooled
+        except Exception as e:
+            log_warning(f"{self.MODULE_ID}: Pooled transport unavailable: {e}")
+
+        return transport.request(
             method, url, headers=headers, timeout=timeout, **request_kwargs
         )
 
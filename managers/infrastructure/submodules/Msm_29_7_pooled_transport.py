@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Msm_29_7_PooledTransport - Общий keep-alive транспорт авторизованных запросов.
+
+Назначение:
+    Msm_29_6_AuthedRequestManager._raw_request отправляет запросы через один
+    requests.Session с пулом соединений вместо requests.request(): при старте
+    и загрузке справочников (десятки запросов к одному хосту) TCP+TLS
+    handshake выполняется один раз на соединение пула, а не на каждый запрос.
+
+Поведение:
+    - HTTPAdapter: AUTHED_POOL_HOSTS пулов (хостов), до AUTHED_POOL_MAXSIZE
+      соединений на хост; pool_block=True - лишние потоки ждут свободное
+      соединение, а не открывают новые сверх лимита. Ожидание ограничено
+      AUTHED_POOL_TIMEOUT: по истечении - requests.ConnectionError (как
+      сетевой сбой), поток не блокируется навсегда.
+    - Retry на уровне адаптера отключён: retry/refresh/circuit breaker
+      остаются в Msm_29_6 и у вызывающих (BaseReferenceLoader).
+    - Cookies не сохраняются (авторизация - только JWT headers), состояние
+      Session не переносится между запросами разных потоков.
+    - Метрики: connections_opened / connections_reused (счётчики urllib3 пулов),
+      пишутся в лог при закрытии пула (выгрузка плагина).
+
+Зависимости:
+    - requests (опционально: без него get_session() = None, Msm_29_6
+      отправляет запрос напрямую через requests)
+    - constants — AUTHED_POOL_HOSTS, AUTHED_POOL_MAXSIZE, AUTHED_POOL_TIMEOUT
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional
+
+from Daman_QGIS.utils import log_info, log_warning
+
+
+__all__ = ['PooledTransport']
+
+
+def _with_pool_timeout(pool_class: Any, pool_timeout: float) -> Any:
+    """Пул urllib3 с ограниченным ожиданием свободного соединения.
+
+    requests не передаёт pool_timeout в urlopen(), и при block=True
+    _get_conn() ждёт без ограничения - подставляем таймаут по умолчанию.
+    """
+    class _TimedPool(pool_class):
+        def _get_conn(self, timeout=None):
+            return super()._get_conn(timeout=pool_timeout if timeout is None else timeout)
+
+    _TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return _TimedPool
+
+
+class PooledTransport:
+    """Singleton requests.Session с ограниченным пулом соединений на хост."""
+
+    MODULE_ID = "Msm_29_7"
+
+    _instance: Optional['PooledTransport'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, pool_timeout: Optional[float] = None) -> None:
+        from Daman_QGIS.constants import AUTHED_POOL_TIMEOUT
+
+        self._pool_timeout = AUTHED_POOL_TIMEOUT if pool_timeout is None else pool_timeout
+        self._session: Any = None
+        self._adapter: Any = None
+        self._session_lock = threading.Lock()
+        self._requests_sent = 0
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'PooledTransport':
+        """Получить singleton."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        """Закрыть соединения и сбросить singleton (выгрузка плагина, тесты)."""
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.close()
+            cls._instance = None
+
+    # ------------------------------------------------------------------
+    # Публичный API
+    # ------------------------------------------------------------------
+
+    def get_session(self) -> Any:
+        """Ленивая инициализация Session (None если requests недоступен)."""
+        if self._session is not None:
+            return self._session
+
+        with self._session_lock:
+            if self._session is None:
+                try:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+                    from http.cookiejar import DefaultCookiePolicy
+                except ImportError:
+                    log_warning(f"{self.MODULE_ID}: requests library not available")
+                    return None
+
+                from Daman_QGIS.constants import AUTHED_POOL_HOSTS, AUTHED_POOL_MAXSIZE
+
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(
+                    pool_connections=AUTHED_POOL_HOSTS,
+                    pool_maxsize=AUTHED_POOL_MAXSIZE,
+                    max_retries=0,
+                    pool_block=True,
+                )
+                adapter.poolmanager.pool_classes_by_scheme = {
+                    'http': _with_pool_timeout(HTTPConnectionPool, self._pool_timeout),
+                    'https': _with_pool_timeout(HTTPSConnectionPool, self._pool_timeout),
+                }
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._adapter = adapter
+                self._session = session
+        return self._session
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """HTTP запрос через пул (аргументы - как у requests.request).
+
+        Вызывающий проверяет get_session() до вызова: без requests пула нет.
+
+        Raises:
+            requests.ConnectionError: нет свободного соединения за pool_timeout
+        """
+        import requests
+        from urllib3.exceptions import EmptyPoolError
+
+        session = self.get_session()
+        with self._stats_lock:
+            self._requests_sent += 1
+        try:
+            return session.request(method, url, **kwargs)
+        except EmptyPoolError as e:
+            raise requests.ConnectionError(
+                f"No free pooled connection within {self._pool_timeout}s: {e}"
+            ) from e
+
+    def close(self) -> None:
+        """Закрыть все соединения пула (метрики пула пишутся в лог)."""
+        if self._session is not None and self._requests_sent:
+            stats = self.stats()
+            log_info(
+                f"{self.MODULE_ID}: запросов {stats['requests']}, "
+                f"соединений открыто {stats['connections_opened']}, "
+                f"переиспользовано {stats['connections_reused']}"
+            )
+        with self._session_lock:
+            session, self._session, self._adapter = self._session, None, None
+        if session is not None:
+            try:
+                session.close()
+            except Exception as e:
+                log_warning(f"{self.MODULE_ID}: Session close failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Метрики пула: запросы, открытые и переиспользованные соединения.
+
+        connections_opened / pool_requests - счётчики urllib3 по живым пулам
+        (num_connections / num_requests); reused = запросы - открытия.
+        """
+        opened = 0
+        pool_requests = 0
+        adapter = self._adapter
+        if adapter is not None:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened += getattr(pool, 'num_connections', 0)
+                pool_requests += getattr(pool, 'num_requests', 0)
+
+        return {
+            'requests': self._requests_sent,
+            'connections_opened': opened,
+            'connections_reused': max(0, pool_requests - opened),
+        }
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Msm_38_1_AsyncLogWriter - Фоновая пакетная запись лога сессии (M_38)
+
+Прежняя запись: каждый log_info/log_debug -> registry.get('M_38') ->
+lock -> logging.FileHandler.emit -> flush() на каждое сообщение. Циклы
+нарезки, парсера КПТ и проверок топологии логируют на каждый объект -
+запись в файл становилась заметной долей времени выполнения.
+
+Поведение:
+    - write() кладёт (время, уровень, тег, сообщение) в ограниченную очередь
+      SESSION_LOG_QUEUE_SIZE и сразу возвращает управление; форматирование
+      строки выполняется в фоновом потоке
+    - фоновый поток пишет пачками до SESSION_LOG_BATCH_SIZE строк,
+      flush() файла - раз в SESSION_LOG_FLUSH_INTERVAL сек, а также сразу
+      после WARNING / CRITICAL (crash-safety для ошибок)
+    - очередь переполнена - сообщение отбрасывается (вызывающий не
+      блокируется), счётчик dropped; число потерянных строк пишется в файл
+    - flush(timeout) - дождаться записи всего, что уже в очереди (чтение
+      лога для feedback F_4_4); close() - дописать очередь и закрыть файл;
+      при выходе интерпретатора без close() - atexit
+
+Зависимости: только стандартная библиотека (без qgis).
+"""
+
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from Daman_QGIS.constants import (
+    SESSION_LOG_QUEUE_SIZE, SESSION_LOG_BATCH_SIZE, SESSION_LOG_FLUSH_INTERVAL,
+)
+
+__all__ = ['AsyncLogWriter']
+
+# Уровни, после которых файл сбрасывается на диск немедленно
+_URGENT_LEVELS = frozenset(("WARNING", "CRITICAL"))
+
+# Служебные элементы очереди
+_STOP = object()
+
+
+class AsyncLogWriter:
+    """Запись строк лога в файл из фонового потока."""
+
+    MODULE_ID = "Msm_38_1"
+
+    def __init__(
+        self,
+        path: str,
+        queue_size: int = SESSION_LOG_QUEUE_SIZE,
+        batch_size: int = SESSION_LOG_BATCH_SIZE,
+        flush_interval: float = SESSION_LOG_FLUSH_INTERVAL
+    ) -> None:
+        """
+        Args:
+            path: Файл лога (открывается на дозапись)
+            queue_size: Предел очереди сообщений
+            batch_size: Строк за одну запись в файл
+            flush_interval: Период сброса файла на диск, сек
+        """
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=max(1, queue_size))
+        self._stream = open(path, 'a', encoding='utf-8')
+        self._stats_lock = threading.Lock()
+        self._written = 0
+        self._dropped = 0
+        self._reported_dropped = 0
+        self._batches = 0
+        self._closed = False
+
+        self._thread = threading.Thread(
+            target=self._run, name="Daman_SessionLogWriter", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Публичный API
+    # ------------------------------------------------------------------
+
+    def write(self, message: str, tag: str = "", level: str = "INFO") -> bool:
+        """
+        Поставить сообщение в очередь записи (не блокирует).
+
+        Returns:
+            False если очередь переполнена или writer закрыт (сообщение отброшено)
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait((time.time(), level, tag, message))
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += 1
+            return False
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        """
+        Дождаться записи на диск всех сообщений, поставленных до вызова.
+
+        Returns:
+            True если запись завершена за timeout
+        """
+        if self._closed or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Дописать очередь, остановить поток и закрыть файл (идемпотентно)."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            atexit.unregister(self.close)
+        except Exception:
+            pass
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Поток не успел - файл закроет сам при выходе из цикла
+            return
+        self._close_stream()
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики: записано строк, отброшено, пачек, в очереди."""
+        with self._stats_lock:
+            return {
+                'written': self._written,
+                'dropped': self._dropped,
+                'batches': self._batches,
+                'queued': self._queue.qsize(),
+            }
+
+    # ------------------------------------------------------------------
+    # Фоновый поток
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        dirty = False
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush)) if dirty else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush_stream()
+                last_flush = time.monotonic()
+                dirty = False
+                continue
+
+            items = [item]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines: List[str] = []
+            waiters: List[threading.Event] = []
+            urgent = stop = False
+            for entry in items:
+                if entry is _STOP:
+                    stop = True
+                elif isinstance(entry, threading.Event):
+                    waiters.append(entry)
+                else:
+                    lines.append(self._format(*entry))
+                    urgent = urgent or entry[1] in _URGENT_LEVELS
+
+            self._write_lines(lines)
+            dirty = dirty or bool(lines)
+
+            if urgent or waiters or stop or time.monotonic() - last_flush >= self.flush_interval:
+                self._flush_stream()
+                last_flush = time.monotonic()
+                dirty = False
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                self._close_stream()
+                return
+
+    @staticmethod
+    def _format(timestamp: float, level: str, tag: str, message: str) -> str:
+        tag_str = f" [{tag}]" if tag else ""
+        return f"{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')} [{level}]{tag_str} {message}\n"
+
+    def _write_lines(self, lines: List[str]) -> None:
+        with self._stats_lock:
+            lost = self._dropped - self._reported_dropped
+            self._reported_dropped = self._dropped
+        if lost:
+            lines.append(self._format(
+                time.time(), "WARNING", "",
+                f"{self.MODULE_ID}: Очередь лога переполнена, пропущено сообщений: {lost}"
+            ))
+        if not lines:
+            return
+        try:
+            self._stream.write(''.join(lines))
+        except Exception:
+            return  # Не ломаем основной код при ошибках записи
+        with self._stats_lock:
+            self._written += len(lines)
+            self._batches += 1
+
+    def _flush_stream(self) -> None:
+        try:
+            if not self._stream.closed:
+                self._stream.flush()
+        except Exception:
+            pass
+
+    def _close_stream(self) -> None:
+        try:
+            if not self._stream.closed:
+                self._stream.flush()
+                self._stream.close()
+        except Exception:
+            pass
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+Msm_38_2_StartupProfiler - Оркестрация и профилирование запуска плагина (initGui)
+
+Прежний initGui - последовательная цепочка на GUI-потоке (M_38, M_37,
+prewarm plugin_hash, M_42, F_4_1, _init_managers, NSPD preprocessor,
+NAM cache, WMS filter, JWT, тулбар) с плоскими строками log_timing.
+
+StartupOrchestrator:
+    - шаги объявляются с зависимостями (requires), порядок выполнения -
+      топологический (при равенстве - порядок объявления), цикл - ValueError
+    - background=True - шаг без GUI/Qt выполняется в пуле потоков, как
+      только готовы его GUI-зависимости; GUI-шаг, которому нужен результат
+      фонового, ждёт его (ожидание видно в отчёте как wait:<шаг>)
+    - шаг возвращает STOP - цепочка прерывается (профиль, обновление,
+      нет зависимостей/лицензии), run() возвращает False
+    - optional=True - исключение шага пишется в лог, результат None,
+      зависимые шаги выполняются; optional=False - исключение пробрасывается
+
+StartupProfiler:
+    - span(name) - замер с вложенностью (стек на поток), mark(name) - точка
+      (например, 'toolbar' - время до тулбара), add_event() - внешние замеры
+      (создание менеджеров ManagerRegistry)
+    - менеджеры registry и так создаются при первом get() (lazy по
+      умолчанию); профилировщик их не откладывает, а только показывает по
+      creation_log, какой шаг вызвал создание
+    - report() - иерархия по вложенности интервалов в каждом потоке
+      (duration/self, flame-style) и traceEvents (открывается в
+      chrome://tracing / Perfetto / speedscope)
+
+Зависимости: стандартная библиотека (utils.log_warning - лениво, при ошибке шага).
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from Daman_QGIS.constants import STARTUP_BACKGROUND_WORKERS
+
+__all__ = ['StartupProfiler', 'StartupOrchestrator']
+
+REPORT_VERSION = 1
+
+
+class StartupProfiler:
+    """Иерархические замеры запуска."""
+
+    MODULE_ID = "Msm_38_2"
+
+    def __init__(
+        self,
+        name: str = "initGui",
+        on_span: Optional[Callable[[str, float], None]] = None
+    ) -> None:
+        """
+        Args:
+            name: Имя запуска (корень отчёта)
+            on_span: Вызывается по завершении замера: (путь 'a/b', секунды)
+        """
+        self.name = name
+        self.on_span = on_span
+        self.origin = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._events: List[Dict[str, Any]] = []
+        self._marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Замеры
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def span(self, name: str, **meta: Any) -> Iterator[None]:
+        """Замер блока; вложенные span того же потока - дочерние."""
+        stack = self._stack()
+        stack.append(name)
+        path = '/'.join(stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            self.add_event(name, start, end, **meta)
+            if self.on_span is not None:
+                try:
+                    self.on_span(path, end - start)
+                except Exception:
+                    pass
+
+    def add_event(self, name: str, start: float, end: float,
+                  thread: Optional[str] = None, **meta: Any) -> None:
+        """Добавить готовый замер (perf_counter начала и конца)."""
+        event = {
+            'name': name,
+            'thread': thread or threading.current_thread().name,
+            'start': start,
+            'end': end,
+        }
+        if meta:
+            event['meta'] = meta
+        with self._lock:
+            self._events.append(event)
+
+    def mark(self, name: str) -> float:
+        """Отметка момента (мс от начала запуска); повторная - не перезаписывает."""
+        now = time.perf_counter()
+        with self._lock:
+            self._marks.setdefault(name, now)
+            return (self._marks[name] - self.origin) * 1000.0
+
+    def elapsed_ms(self, mark: Optional[str] = None) -> Optional[float]:
+        """мс от начала до отметки (или до текущего момента)."""
+        if mark is None:
+            return (time.perf_counter() - self.origin) * 1000.0
+        value = self._marks.get(mark)
+        return None if value is None else (value - self.origin) * 1000.0
+
+    # ------------------------------------------------------------------
+    # Отчёт
+    # ------------------------------------------------------------------
+
+    def report(self, outcome: str = "") -> Dict[str, Any]:
+        """Отчёт: дерево замеров по потокам, отметки, traceEvents."""
+        now = time.perf_counter()
+        with self._lock:
+            events = sorted(self._events, key=lambda e: (e['start'], -e['end']))
+            marks = dict(self._marks)
+
+        def ms(value: float) -> float:
+            return round((value - self.origin) * 1000.0, 3)
+
+        tree: List[Dict[str, Any]] = []
+        stacks: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            node = {
+                'name': event['name'],
+                'thread': event['thread'],
+                'start_ms': ms(event['start']),
+                'duration_ms': round((event['end'] - event['start']) * 1000.0, 3),
+                '_end': event['end'],
+                'children': [],
+            }
+            if 'meta' in event:
+                node['meta'] = event['meta']
+            stack = stacks.setdefault(event['thread'], [])
+            while stack and stack[-1]['_end'] <= event['start']:
+                stack.pop()
+            (stack[-1]['children'] if stack else tree).append(node)
+            stack.append(node)
+
+        def finalize(node: Dict[str, Any]) -> None:
+            del node['_end']
+            for child in node['children']:
+                finalize(child)
+            node['self_ms'] = round(
+                max(0.0, node['duration_ms'] - sum(c['duration_ms'] for c in node['children'])), 3
+            )
+
+        for node in tree:
+            finalize(node)
+
+        thread_ids = {name: i for i, name in enumerate(dict.fromkeys(e['thread'] for e in events))}
+        trace_events: List[Dict[str, Any]] = [
+            {
+                'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                'args': {'name': name},
+            }
+            for name, tid in thread_ids.items()
+        ]
+        for event in events:
+            trace_events.append({
+                'name': event['name'], 'cat': 'startup', 'ph': 'X', 'pid': 1,
+                'tid': thread_ids[event['thread']],
+                'ts': round((event['start'] - self.origin) * 1e6, 1),
+                'dur': round((event['end'] - event['start']) * 1e6, 1),
+                'args': event.get('meta', {}),
+            })
+        for name, value in marks.items():
+            trace_events.append({
+                'name': name, 'cat': 'mark', 'ph': 'i', 's': 'g', 'pid': 1, 'tid': 0,
+                'ts': round((value - self.origin) * 1e6, 1),
+            })
+
+        return {
+            'version': REPORT_VERSION,
+            'name': self.name,
+            'started_at': self.started_at,
+            'outcome': outcome,
+            'total_ms': ms(now),
+            'time_to_toolbar_ms': ms(marks['toolbar']) if 'toolbar' in marks else None,
+            'marks': {name: ms(value) for name, value in marks.items()},
+            'tree': tree,
+            'traceEvents': trace_events,
+        }
+
+    def save(self, path: str, outcome: str = "") -> Dict[str, Any]:
+        """Записать отчёт в JSON (атомарно). Ошибка записи - не исключение."""
+        report = self.report(outcome)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return report
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+class _Step:
+    """Объявленный шаг запуска"""
+
+    __slots__ = ('step_id', 'func', 'requires', 'background', 'optional')
+
+    def __init__(self, step_id: str, func: Callable[[], Any], requires: Sequence[str],
+                 background: bool, optional: bool) -> None:
+        self.step_id = step_id
+        self.func = func
+        self.requires = tuple(requires)
+        self.background = background
+        self.optional = optional
+
+
+class StartupOrchestrator:
+    """Выполнение шагов запуска по зависимостям (GUI-поток + фоновый пул)."""
+
+    MODULE_ID = "Msm_38_2"
+
+    # Значение шага: прервать запуск (остальные GUI-шаги не выполняются)
+    STOP = object()
+
+    def __init__(self, profiler: StartupProfiler,
+                 max_workers: int = STARTUP_BACKGROUND_WORKERS) -> None:
+        self.profiler = profiler
+        self.max_workers = max(1, max_workers)
+        self._steps: Dict[str, _Step] = {}
+        self._results: Dict[str, Any] = {}
+        self._errors: Dict[str, BaseException] = {}
+        self._futures: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stopped_at: Optional[str] = None
+
+    def add(self, step_id: str, func: Callable[[], Any], requires: Sequence[str] = (),
+            background: bool = False, optional: bool = True) -> None:
+        """
+        Объявить шаг.
+
+        Args:
+            step_id: Имя шага (уникальное, имя замера в отчёте)
+            func: Функция без аргументов; STOP - прервать запуск
+            requires: Шаги, которые должны завершиться раньше
+            background: Выполнить в фоновом потоке (без GUI/Qt-объектов)
+            optional: Исключение только логируется (результат None)
+        """
+        if step_id in self._steps:
+            raise ValueError(f"{self.MODULE_ID}: шаг '{step_id}' уже объявлен")
+        self._steps[step_id] = _Step(step_id, func, requires, background, optional)
+
+    def order(self) -> List[str]:
+        """Порядок выполнения: топологический, устойчивый к порядку объявления."""
+        for step in self._steps.values():
+            unknown = [dep for dep in step.requires if dep not in self._steps]
+            if unknown:
+                raise ValueError(
+                    f"{self.MODULE_ID}: шаг '{step.step_id}' зависит от необъявленных: {unknown}"
+                )
+        done: List[str] = []
+        pending = list(self._steps)
+        while pending:
+            for step_id in pending:
+                if all(dep in done for dep in self._steps[step_id].requires):
+                    done.append(step_id)
+                    pending.remove(step_id)
+                    break
+            else:
+                raise ValueError(f"{self.MODULE_ID}: циклические зависимости шагов: {pending}")
+        return done
+
+    def run(self) -> bool:
+        """
+        Выполнить шаги.
+
+        Returns:
+            False если шаг вернул STOP (stopped_at - его имя)
+        """
+        order = self.order()
+        try:
+            for step_id in order:
+                step = self._steps[step_id]
+                if step.background:
+                    # GUI-зависимости уже выполнены (топологический порядок);
+                    # фоновые ждёт сам поток - они поставлены в очередь раньше
+                    self._futures[step_id] = self._pool().submit(self._run_background, step)
+                    continue
+                for dep in step.requires:
+                    if dep in self._futures:
+                        self._join(dep)
+                result = self._execute(step)
+                if result is self.STOP:
+                    self.stopped_at = step_id
+                    return False
+            return True
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=self.stopped_at is not None)
+
+    def result(self, step_id: str) -> Any:
+        """Результат шага (фоновый - с ожиданием)."""
+        if step_id in self._futures:
+            self._join(step_id)
+        return self._results.get(step_id)
+
+    def error(self, step_id: str) -> Optional[BaseException]:
+        """Исключение optional-шага (None - без ошибки)."""
+        return self._errors.get(step_id)
+
+    # ------------------------------------------------------------------
+    # Выполнение
+    # ------------------------------------------------------------------
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="Daman_Startup"
+            )
+        return self._executor
+
+    def _execute(self, step: _Step) -> Any:
+        with self.profiler.span(step.step_id, background=step.background):
+            try:
+                result = step.func()
+            except Exception as e:
+                if not step.optional:
+                    raise
+                self._errors[step.step_id] = e
+                result = None
+                from Daman_QGIS.utils import log_warning
+                log_warning(
+                    f"{self.MODULE_ID}: Шаг запуска '{step.step_id}' завершился ошибкой: "
+                    f"{type(e).__name__}: {e}"
+                )
+        self._results[step.step_id] = result
+        return result
+
+    def _run_background(self, step: _Step) -> Any:
+        for dep in step.requires:
+            future = self._futures.get(dep)
+            if future is not None:
+                future.result()
+        return self._execute(step)
+
+    def _join(self, step_id: str) -> None:
+        future = self._futures[step_id]
+        if future.done():
+            future.result()
+            return
+        with self.profiler.span(f"wait:{step_id}"):
+            future.result()
@@ -80,6 +80,8 @@ class FieldMappingManager(BaseReferenceLoader):
         self._uncovered_branches: Dict[str, Dict[str, Any]] = {}
         self._checked_holders: int = 0
         self._checked_objects: Set[str] = set()
+        # Запись наблюдений детектора для кэша разбора (None - не пишется)
+        self._coverage_capture: Optional[List[Dict[str, Any]]] = None
 
     def get_all_mappings(self) -> List[Dict]:
         """
@@ -429,31 +431,78 @@ class FieldMappingManager(BaseReferenceLoader):
         """
         cad_number = context.get('cad_number') if context else None
         object_id = str(cad_number).strip() if cad_number else UNKNOWN_OBJECT_ID
+        labels = [self._holder_branch_label(elem) for elem in uncovered_elements]
 
-        if elements:
-            self._checked_holders += len(elements)
+        self._apply_holder_coverage(
+            object_id, mapping.get('working_name', 'без имени'), len(elements), labels
+        )
+
+    def _apply_holder_coverage(self, object_id: str, working_name: str,
+                               holders: int, labels: List[str]) -> None:
+        """
+        Учесть одно наблюдение детектора: агрегат + предупреждение
+
+        Args:
+            object_id: КН объекта
+            working_name: Рабочее имя поля
+            holders: Число холдеров в контейнере
+            labels: Метки веток непокрытых холдеров
+        """
+        if self._coverage_capture is not None and (holders or labels):
+            self._coverage_capture.append({
+                'object_id': object_id, 'working_name': working_name,
+                'holders': holders, 'labels': list(labels)
+            })
+
+        if holders:
+            self._checked_holders += holders
             self._checked_objects.add(object_id)
 
-        if not uncovered_elements:
+        if not labels:
             return
 
         branch_counts: Dict[str, int] = {}
-        for elem in uncovered_elements:
-            label = self._holder_branch_label(elem)
+        for label in labels:
             branch_counts[label] = branch_counts.get(label, 0) + 1
 
             stats = self._uncovered_branches.setdefault(label, {'holders': 0, 'objects': set()})
             stats['holders'] += 1
             stats['objects'].add(object_id)
 
-        working_name = mapping.get('working_name', 'без имени')
         branches = ', '.join(f"{label} - {count}" for label, count in sorted(branch_counts.items()))
         log_warning(
             f"Msm_4_17 (_register_holder_coverage): Объект {object_id}, поле '{working_name}': "
-            f"{len(uncovered_elements)} из {len(elements)} холдеров не покрыты ни одним xpath маппинга. "
+            f"{len(labels)} из {holders} холдеров не покрыты ни одним xpath маппинга. "
             f"Непокрытые ветки: {branches}"
         )
 
+    def start_holder_coverage_capture(self) -> None:
+        """
+        Начать запись наблюдений детектора (разбор одного файла)
+
+        Записанные наблюдения сохраняются в кэш разбора (Fsm_1_1_16) и
+        воспроизводятся при попадании - сводка прогона не зависит от кэша.
+        """
+        self._coverage_capture = []
+
+    def stop_holder_coverage_capture(self) -> List[Dict[str, Any]]:
+        """
+        Закончить запись наблюдений детектора
+
+        Returns:
+            JSON-совместимый список наблюдений для replay_holder_coverage()
+        """
+        events = self._coverage_capture or []
+        self._coverage_capture = None
+        return events
+
+    def replay_holder_coverage(self, events: List[Dict[str, Any]]) -> None:
+        """Воспроизвести наблюдения детектора из кэша разбора (без разбора XML)"""
+        for event in events:
+            self._apply_holder_coverage(
+                event['object_id'], event['working_name'], event['holders'], event['labels']
+            )
+
     def reset_uncovered_branch_stats(self) -> None:
         """Сбросить агрегат детектора непокрытых веток холдера (начало прогона)"""
         self._uncovered_branches = {}
@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
-"""Менеджер справочных данных слоев"""
+"""Менеджер справочных данных слоев
+
+Поиск идёт по индексированному каталогу Base_layers (ReferenceCatalog):
+хэш-индекс full_name и групповые индексы section_num / creating_function /
+group / graphics_selectable. Каталог строится один раз на загрузку справочника
+и сбрасывается вместе с кэшем BaseReferenceLoader.
+"""
 
 import os
 import json
@@ -12,6 +18,8 @@ class LayerReferenceManager(BaseReferenceLoader):
     """Менеджер для работы с иерархической структурой слоев"""
 
     FILE_NAME = 'Base_layers.json'
+    UNIQUE_KEYS = ('full_name',)
+    MULTI_KEYS = ('section_num', 'creating_function', 'group', 'graphics_selectable')
 
     def get_base_layers(self) -> List[Dict]:
         """
@@ -25,22 +33,32 @@ class LayerReferenceManager(BaseReferenceLoader):
         """
         return self._load_json(self.FILE_NAME) or []
 
+    def get_catalog(self):
+        """
+        Индексированный каталог слоёв (ReferenceCatalog)
+
+        Returns:
+            Каталог с индексами UNIQUE_KEYS / MULTI_KEYS и счётчиками запросов
+        """
+        return self._get_catalog(self.FILE_NAME, self.UNIQUE_KEYS, self.MULTI_KEYS)
+
     def get_layer_params(self) -> Dict:
         """
         Получить параметры слоев в виде словаря БЕЗ кэширования
 
         ВАЖНО: Всегда возвращает актуальные данные из Base_layers.json
+        (новый словарь на каждый вызов; каталог сбрасывается при reload).
+        При повторе full_name берётся последняя запись (дубликаты - в логе
+        построения каталога).
 
         Returns:
             Словарь {full_name: layer_data}
         """
-        layers = self.get_base_layers()
-        # Преобразуем список слоев в словарь с ключом full_name
-        result = {}
-        for layer in layers:
-            if layer.get('full_name'):
-                result[layer['full_name']] = layer
-        return result
+        return {
+            name: layer
+            for name, layer in self.get_catalog().mapping('full_name', last=True).items()
+            if name
+        }
 
     def get_layer_param(self, layer_id: str) -> Optional[Dict]:
         """
@@ -52,8 +70,8 @@ class LayerReferenceManager(BaseReferenceLoader):
         Returns:
             Словарь с параметрами слоя или None
         """
-        layers = self.get_layer_params()
-        return layers.get(layer_id)
+        # Как get_layer_params: при повторе full_name - последняя запись
+        return self.get_catalog().get('full_name', layer_id, last=True)
 
     def get_layer_by_full_name(self, full_name: str) -> Optional[Dict]:
         """
@@ -69,12 +87,8 @@ class LayerReferenceManager(BaseReferenceLoader):
         Returns:
             Словарь с данными слоя или None
         """
-        layers = self.get_base_layers()
-        for layer in layers:
-            # ТОЛЬКО точное совпадение! Не использовать startswith() или in
-            if layer.get('full_name') == full_name:
-                return layer
-        return None
+        # ТОЛЬКО точное совпадение (хэш-индекс)! Не использовать startswith() или in
+        return self.get_catalog().get('full_name', full_name)
 
     def get_layers_by_section(self, section_num: str) -> List[Dict]:
         """
@@ -86,8 +100,7 @@ class LayerReferenceManager(BaseReferenceLoader):
         Returns:
             Список слоев раздела
         """
-        layers = self.get_base_layers()
-        return [layer for layer in layers if layer.get('section_num') == str(section_num)]
+        return self.get_catalog().select('section_num', str(section_num))
 
     def get_layer_groups(self) -> List[str]:
         """
@@ -96,12 +109,7 @@ class LayerReferenceManager(BaseReferenceLoader):
         Returns:
             Отсортированный список уникальных групп
         """
-        layers = self.get_base_layers()
-        groups = set()
-        for layer_data in layers:
-            if 'group' in layer_data and layer_data['group']:
-                groups.add(layer_data['group'])
-        return sorted(list(groups))
+        return sorted(group for group in self.get_catalog().values('group') if group)
 
     def get_layers_by_creating_function(self, function_name: str) -> List[Dict]:
         """
@@ -116,11 +124,7 @@ class LayerReferenceManager(BaseReferenceLoader):
         Returns:
             Список слоёв с указанной creating_function
         """
-        layers = self.get_base_layers()
-        return [
-            layer for layer in layers
-            if layer.get('creating_function') == function_name
-        ]
+        return self.get_catalog().select('creating_function', function_name)
 
     def get_layer_names_by_creating_function(self, function_name: str) -> List[str]:
         """
@@ -145,8 +149,4 @@ class LayerReferenceManager(BaseReferenceLoader):
         Returns:
             Список слоёв с graphics_selectable=1
         """
-        layers = self.get_base_layers()
-        return [
-            layer for layer in layers
-            if layer.get('graphics_selectable') == 1
-        ]
+        return self.get_catalog().select('graphics_selectable', 1)
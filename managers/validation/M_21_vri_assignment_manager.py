@@ -22,7 +22,7 @@ M_21_VRIAssignmentManager - Менеджер присвоения ВРИ
 import json
 import os
 import threading
-from typing import Dict, List, Optional, Set, Tuple, Any
+from typing import Dict, List, Optional, Set, Tuple, Any, TYPE_CHECKING
 
 from qgis.core import QgsVectorLayer, QgsFeature
 
@@ -33,6 +33,9 @@ from Daman_QGIS.utils import (
     normalize_for_classification,
 )
 
+if TYPE_CHECKING:
+    from .submodules.Msm_21_2_zpr_geometry_index import Msm_21_2_ZPRGeometryIndex
+
 __all__ = ['VRIAssignmentManager']
 
 
@@ -727,47 +730,8 @@ class VRIAssignmentManager:
             if vri.get('is_public_territory', False)
         }
 
-    def assign_vri_by_zpr_geometry(
-        self,
-        features_data: List[Dict[str, Any]],
-        zpr_layer: QgsVectorLayer
-    ) -> List[Dict[str, Any]]:
-        """Присвоение План_ВРИ для контуров 1 этапа на основе геометрического пересечения с ЗПР
-
-        Для контуров с ID != zpr_id (которые будут объединяться на 2 этапе):
-        1. Находит все контуры ЗПР, с которыми пересекается участок
-        2. Выбирает ЗПР с максимальной площадью пересечения
-        3. Присваивает План_ВРИ и Общая_земля из этого контура ЗПР
-
-        Вызывается ПОСЛЕ assign_vri_to_features() для замены План_ВРИ
-        у объединяемых контуров.
-
-        Args:
-            features_data: Список словарей с данными контуров 1 этапа
-            zpr_layer: Слой ЗПР для геометрического определения
-
-        Returns:
-            Обновлённый список features_data
-        """
-        if not features_data:
-            return features_data
-
-        if not zpr_layer or not zpr_layer.isValid():
-            log_warning("M_21: Слой ЗПР не передан или невалиден для геометрического ВРИ")
-            return features_data
-
-        # Загружаем базу ВРИ
-        if not self._load_vri_database():
-            log_error("M_21: Не удалось загрузить базу VRI.json для геометрического ВРИ")
-            return features_data
-
-        # Ищем поле ВРИ в слое ЗПР
-        vri_field = self._find_vri_field(zpr_layer)
-        if not vri_field:
-            log_warning(f"M_21: Поле VRI не найдено в слое ЗПР {zpr_layer.name()}")
-            return features_data
-
-        # Кэшируем данные ЗПР (геометрия, ID, ВРИ)
+    def _collect_zpr_entries(self, zpr_layer: QgsVectorLayer, vri_field: str) -> List[Dict]:
+        """Контуры ЗПР с валидным ВРИ: [{'id', 'geometry', 'vri_data_list'}] в порядке слоя"""
         zpr_cache: List[Dict] = []
         for zpr_feature in zpr_layer.getFeatures():
             zpr_geom = zpr_feature.geometry()
@@ -796,9 +760,84 @@ class VRIAssignmentManager:
                     'geometry': zpr_geom,
                     'vri_data_list': vri_data_list
                 })
+        return zpr_cache
 
+    def build_zpr_index(self, zpr_layer: QgsVectorLayer) -> Optional['Msm_21_2_ZPRGeometryIndex']:
+        """Пространственный индекс ЗПР для геометрического ВРИ
+
+        Строится один раз на прогон нарезки и передаётся в
+        assign_vri_by_zpr_geometry / reassign_vri_by_geometry (zpr_index=...),
+        чтобы не перечитывать слой и не пересчитывать bbox/prepared геометрии.
+
+        Args:
+            zpr_layer: Слой ЗПР
+
+        Returns:
+            Msm_21_2_ZPRGeometryIndex или None (слой невалиден / нет ЗПР с ВРИ)
+        """
+        from .submodules.Msm_21_2_zpr_geometry_index import Msm_21_2_ZPRGeometryIndex
+
+        if not zpr_layer or not zpr_layer.isValid():
+            log_warning("M_21: Слой ЗПР не передан или невалиден для геометрического ВРИ")
+            return None
+
+        # Загружаем базу ВРИ
+        if not self._load_vri_database():
+            log_error("M_21: Не удалось загрузить базу VRI.json для геометрического ВРИ")
+            return None
+
+        # Ищем поле ВРИ в слое ЗПР
+        vri_field = self._find_vri_field(zpr_layer)
+        if not vri_field:
+            log_warning(f"M_21: Поле VRI не найдено в слое ЗПР {zpr_layer.name()}")
+            return None
+
+        zpr_cache = self._collect_zpr_entries(zpr_layer, vri_field)
         if not zpr_cache:
             log_warning("M_21: Нет валидных ЗПР с ВРИ для геометрического определения")
+            return None
+
+        return Msm_21_2_ZPRGeometryIndex(zpr_cache)
+
+    def _apply_zpr_vri(self, item: Dict[str, Any], zpr: Dict) -> None:
+        """План_ВРИ и Общая_земля контура из записи ЗПР"""
+        vri_data_list = zpr['vri_data_list']
+        attrs = item.get('attributes', {})
+
+        # План_ВРИ - объединяем все full_name через ", "
+        full_names = [vri.get('full_name', '') for vri in vri_data_list if vri.get('full_name')]
+        attrs['План_ВРИ'] = ', '.join(full_names) if full_names else '-'
+
+        # Общая_земля - только если ВСЕ ВРИ относятся к территории общего пользования
+        is_public = all(vri.get('is_public_territory', False) for vri in vri_data_list)
+        attrs['Общая_земля'] = self.PUBLIC_TERRITORY_YES if is_public else self.PUBLIC_TERRITORY_NO
+
+    def assign_vri_by_zpr_geometry(
+        self,
+        features_data: List[Dict[str, Any]],
+        zpr_layer: QgsVectorLayer,
+        zpr_index: Optional['Msm_21_2_ZPRGeometryIndex'] = None
+    ) -> List[Dict[str, Any]]:
+        """Присвоение План_ВРИ для контуров 1 этапа на основе геометрического пересечения с ЗПР
+
+        Для контуров с ID != zpr_id (которые будут объединяться на 2 этапе):
+        1. Находит все контуры ЗПР, с которыми пересекается участок
+        2. Выбирает ЗПР с максимальной площадью пересечения
+        3. Присваивает План_ВРИ и Общая_земля из этого контура ЗПР
+
+        Вызывается ПОСЛЕ assign_vri_to_features() для замены План_ВРИ
+        у объединяемых контуров.
+
+        Args:
+            features_data: Список словарей с данными контуров 1 этапа
+            zpr_layer: Слой ЗПР для геометрического определения
+            zpr_index: Индекс ЗПР (build_zpr_index), общий для прогона;
+                None - строится по zpr_layer
+
+        Returns:
+            Обновлённый список features_data
+        """
+        if not features_data:
             return features_data
 
         # Собираем индексы контуров, которые будут объединяться (ID != zpr_id)
@@ -816,7 +855,13 @@ class VRIAssignmentManager:
         if not merging_indices:
             return features_data
 
+        if zpr_index is None:
+            zpr_index = self.build_zpr_index(zpr_layer)
+            if zpr_index is None:
+                return features_data
+
         assigned_count = 0
+        pruned_before = zpr_index.pairs_pruned
 
         # Для каждого объединяемого контура находим ЗПР по геометрии
         for idx in merging_indices:
@@ -827,40 +872,20 @@ class VRIAssignmentManager:
                 continue
 
             # Находим ЗПР с максимальной площадью пересечения
-            best_zpr = None
-            best_intersection_area = 0.0
-
-            for zpr in zpr_cache:
-                intersection = geom.intersection(zpr['geometry'])
-                if intersection.isEmpty():
-                    continue
-
-                intersection_area = intersection.area()
-                if intersection_area > best_intersection_area:
-                    best_intersection_area = intersection_area
-                    best_zpr = zpr
-
+            best_zpr = zpr_index.best_match(geom)
             if best_zpr:
-                vri_data_list = best_zpr['vri_data_list']
-                attrs = item.get('attributes', {})
-
-                # План_ВРИ - объединяем все full_name через ", "
-                full_names = [vri.get('full_name', '') for vri in vri_data_list if vri.get('full_name')]
-                attrs['План_ВРИ'] = ', '.join(full_names) if full_names else '-'
-
-                # Общая_земля - только если ВСЕ ВРИ относятся к территории общего пользования
-                is_public = all(vri.get('is_public_territory', False) for vri in vri_data_list)
-                attrs['Общая_земля'] = self.PUBLIC_TERRITORY_YES if is_public else self.PUBLIC_TERRITORY_NO
-
+                self._apply_zpr_vri(item, best_zpr)
                 assigned_count += 1
 
-        log_info(f"M_21: Геометрический ВРИ по ЗПР присвоен {assigned_count} из {len(merging_indices)} контурам")
+        log_info(f"M_21: Геометрический ВРИ по ЗПР присвоен {assigned_count} из {len(merging_indices)} контурам "
+                f"(отсечено индексом пар: {zpr_index.pairs_pruned - pruned_before}; {zpr_index.report()})")
         return features_data
 
     def reassign_vri_by_geometry(
         self,
         features_data: List[Dict[str, Any]],
-        zpr_layer: QgsVectorLayer
+        zpr_layer: QgsVectorLayer,
+        zpr_index: Optional['Msm_21_2_ZPRGeometryIndex'] = None
     ) -> List[Dict[str, Any]]:
         """Пересчёт План_ВРИ и Общая_земля для ВСЕХ контуров по геометрическому пересечению с ЗПР
 
@@ -875,6 +900,8 @@ class VRIAssignmentManager:
         Args:
             features_data: Список словарей с данными контуров
             zpr_layer: Слой ЗПР для геометрического определения
+            zpr_index: Индекс ЗПР (build_zpr_index), общий для прогона;
+                None - строится по zpr_layer
 
         Returns:
             Обновлённый список features_data с пересчитанными План_ВРИ и Общая_земля
@@ -882,57 +909,14 @@ class VRIAssignmentManager:
         if not features_data:
             return features_data
 
-        if not zpr_layer or not zpr_layer.isValid():
-            log_warning("M_21: Слой ЗПР не передан или невалиден для пересчёта ВРИ")
-            return features_data
-
-        # Загружаем базу ВРИ
-        if not self._load_vri_database():
-            log_error("M_21: Не удалось загрузить базу VRI.json для пересчёта ВРИ")
-            return features_data
-
-        # Ищем поле ВРИ в слое ЗПР
-        vri_field = self._find_vri_field(zpr_layer)
-        if not vri_field:
-            log_warning(f"M_21: Поле VRI не найдено в слое ЗПР {zpr_layer.name()}")
-            return features_data
-
-        # Кэшируем данные ЗПР (геометрия, ID, ВРИ)
-        zpr_cache: List[Dict] = []
-        for zpr_feature in zpr_layer.getFeatures():
-            zpr_geom = zpr_feature.geometry()
-            if zpr_geom.isEmpty():
-                continue
-
-            zpr_id = zpr_feature['ID'] if 'ID' in zpr_feature.fields().names() else zpr_feature.id()
-            vri_value = zpr_feature[vri_field]
-
-            if not vri_value or str(vri_value).strip() in ('', '-', 'NULL', 'None'):
-                continue
-
-            vri_str = str(vri_value).strip()
-            # Парсим множественные ВРИ
-            vri_list = self._parse_multiple_vri(vri_str)
-
-            vri_data_list = []
-            for single_vri in vri_list:
-                vri_data = self._get_vri_data_for_single(single_vri)
-                if vri_data:
-                    vri_data_list.append(vri_data)
-
-            if vri_data_list:
-                zpr_cache.append({
-                    'id': int(zpr_id) if zpr_id else zpr_feature.id(),
-                    'geometry': zpr_geom,
-                    'vri_data_list': vri_data_list
-                })
-
-        if not zpr_cache:
-            log_warning("M_21: Нет валидных ЗПР с ВРИ для пересчёта")
-            return features_data
+        if zpr_index is None:
+            zpr_index = self.build_zpr_index(zpr_layer)
+            if zpr_index is None:
+                return features_data
 
         assigned_count = 0
         skipped_count = 0
+        pruned_before = zpr_index.pairs_pruned
 
         # Для каждого контура находим ЗПР по геометрии
         for item in features_data:
@@ -943,35 +927,14 @@ class VRIAssignmentManager:
                 continue
 
             # Находим ЗПР с максимальной площадью пересечения
-            best_zpr = None
-            best_intersection_area = 0.0
-
-            for zpr in zpr_cache:
-                intersection = geom.intersection(zpr['geometry'])
-                if intersection.isEmpty():
-                    continue
-
-                intersection_area = intersection.area()
-                if intersection_area > best_intersection_area:
-                    best_intersection_area = intersection_area
-                    best_zpr = zpr
-
+            best_zpr = zpr_index.best_match(geom)
             if best_zpr:
-                vri_data_list = best_zpr['vri_data_list']
-                attrs = item.get('attributes', {})
-
-                # План_ВРИ - объединяем все full_name через ", "
-                full_names = [vri.get('full_name', '') for vri in vri_data_list if vri.get('full_name')]
-                attrs['План_ВРИ'] = ', '.join(full_names) if full_names else '-'
-
-                # Общая_земля - только если ВСЕ ВРИ относятся к территории общего пользования
-                is_public = all(vri.get('is_public_territory', False) for vri in vri_data_list)
-                attrs['Общая_земля'] = self.PUBLIC_TERRITORY_YES if is_public else self.PUBLIC_TERRITORY_NO
-
+                self._apply_zpr_vri(item, best_zpr)
                 assigned_count += 1
             else:
                 skipped_count += 1
 
         log_info(f"M_21: Пересчёт ВРИ по геометрии ЗПР: присвоено {assigned_count}, "
-                f"пропущено {skipped_count} (нет пересечения с ЗПР)")
+                f"пропущено {skipped_count} (нет пересечения с ЗПР), "
+                f"отсечено индексом пар: {zpr_index.pairs_pruned - pruned_before}")
         return features_data
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Msm_21_2_ZPRGeometryIndex - Пространственный индекс контуров ЗПР для геометрического ВРИ
+
+НАЗНАЧЕНИЕ:
+    Поиск контура ЗПР с максимальной площадью пересечения для контура нарезки
+    (M_21.assign_vri_by_zpr_geometry, M_21.reassign_vri_by_geometry).
+
+ЛОГИКА:
+    1. QgsSpatialIndex по bbox ЗПР - кандидаты по bbox контура
+    2. Prepared GEOS engine ЗПР - быстрый intersects для кандидатов
+    3. intersection().area() - только для пар, прошедших оба фильтра
+
+    Строится один раз на прогон нарезки (M_21.build_zpr_index) и переиспользуется
+    всеми вызовами: вместо O(контуры x ЗПР) полных пересечений GEOS считаются
+    только реальные пары. Отсечённые пары учитываются в статистике (report).
+
+ИСПОЛЬЗОВАНИЕ:
+    zpr_index = vri_manager.build_zpr_index(zpr_layer)
+    features = vri_manager.reassign_vri_by_geometry(features, zpr_layer, zpr_index=zpr_index)
+"""
+
+from typing import Any, Dict, List, Optional
+
+from qgis.core import QgsGeometry, QgsSpatialIndex
+
+from Daman_QGIS.utils import log_warning
+
+
+class Msm_21_2_ZPRGeometryIndex:
+    """
+    Индекс ЗПР: bbox (QgsSpatialIndex) + prepared geometry
+
+    Записи ЗПР - словари {'id', 'geometry', 'vri_data_list'} (формат кэша M_21).
+    """
+
+    def __init__(self, zpr_entries: List[Dict[str, Any]]) -> None:
+        """
+        Args:
+            zpr_entries: Контуры ЗПР с ВРИ в порядке слоя (порядок определяет
+                победителя при равной площади пересечения)
+        """
+        self.entries = zpr_entries
+        self._index = QgsSpatialIndex()
+        self._engines: List[Optional[Any]] = []
+
+        for position, entry in enumerate(zpr_entries):
+            geom: QgsGeometry = entry['geometry']
+            self._index.addFeature(position, geom.boundingBox())
+            try:
+                engine = QgsGeometry.createGeometryEngine(geom.constGet())
+                engine.prepareGeometry()
+            except Exception as e:
+                log_warning(f"Msm_21_2: Не удалось подготовить GEOS engine ЗПР ID={entry.get('id')}: {e}")
+                engine = None
+            self._engines.append(engine)
+
+        # Статистика пар (контур, ЗПР)
+        self.pairs_total = 0
+        self.pairs_bbox_pruned = 0
+        self.pairs_prepared_pruned = 0
+        self.pairs_computed = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def best_match(self, geom: QgsGeometry) -> Optional[Dict[str, Any]]:
+        """
+        ЗПР с максимальной площадью пересечения
+
+        Args:
+            geom: Геометрия контура нарезки
+
+        Returns:
+            Запись ЗПР или None (нет пересечения с ненулевой площадью)
+        """
+        self.pairs_total += len(self.entries)
+
+        # Порядок слоя: при равной площади побеждает первый ЗПР (как при полном переборе)
+        candidates = sorted(self._index.intersects(geom.boundingBox()))
+        self.pairs_bbox_pruned += len(self.entries) - len(candidates)
+
+        best_zpr = None
+        best_intersection_area = 0.0
+        geom_const = geom.constGet()
+
+        for position in candidates:
+            engine = self._engines[position]
+            if engine is not None and not engine.intersects(geom_const):
+                self.pairs_prepared_pruned += 1
+                continue
+
+            zpr = self.entries[position]
+            self.pairs_computed += 1
+            intersection = geom.intersection(zpr['geometry'])
+            if intersection.isEmpty():
+                continue
+
+            intersection_area = intersection.area()
+            if intersection_area > best_intersection_area:
+                best_intersection_area = intersection_area
+                best_zpr = zpr
+
+        return best_zpr
+
+    @property
+    def pairs_pruned(self) -> int:
+        return self.pairs_bbox_pruned + self.pairs_prepared_pruned
+
+    def report(self) -> str:
+        """Строка статистики для лога"""
+        return (
+            f"пар контур-ЗПР {self.pairs_total}, пересечений посчитано {self.pairs_computed}, "
+            f"отсечено {self.pairs_pruned} (bbox {self.pairs_bbox_pruned}, "
+            f"prepared {self.pairs_prepared_pruned})"
+        )
@@ -196,13 +196,15 @@ class F_0_1_NewProject(BaseTool):
         # Сохранение метаданных
         if self.project_manager and self.project_manager.project_db:
             db = self.project_manager.project_db
-            self._save_required_metadata(db, project_data, safe_name)
-            self._save_optional_metadata(db, project_data)
-
-            db.set_metadata('created_date', datetime.now().isoformat(),
-                           'Дата создания проекта')
-            db.set_metadata('modified_date', datetime.now().isoformat(),
-                           'Дата последнего изменения проекта')
+            # Все ключи одной транзакцией
+            with db.metadata_batch():
+                self._save_required_metadata(db, project_data, safe_name)
+                self._save_optional_metadata(db, project_data)
+
+                db.set_metadata('created_date', datetime.now().isoformat(),
+                               'Дата создания проекта')
+                db.set_metadata('modified_date', datetime.now().isoformat(),
+                               'Дата последнего изменения проекта')
 
         # Конфигурация QGIS проекта
         self._configure_qgis_project(project_data)
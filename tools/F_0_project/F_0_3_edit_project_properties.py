@@ -422,23 +422,25 @@ class F_0_3_EditProjectProperties(BaseTool):
         if not db:
             raise ValueError("База данных проекта не инициализирована")
 
-        # 2. Обновление основных метаданных
-        self._update_core_metadata(db, updated_data, changed_fields)
+        # 2-6. Метаданные - одной транзакцией
+        with db.metadata_batch():
+            # 2. Обновление основных метаданных
+            self._update_core_metadata(db, updated_data, changed_fields)
 
-        # 3. Обновление метаданных СК
-        crs_changed = self._update_crs_metadata(db, updated_data, changed_fields)
+            # 3. Обновление метаданных СК
+            crs_changed = self._update_crs_metadata(db, updated_data, changed_fields)
 
-        # 4. Обновление дополнительных метаданных
-        self._update_additional_metadata(db, updated_data, changed_fields)
+            # 4. Обновление дополнительных метаданных
+            self._update_additional_metadata(db, updated_data, changed_fields)
 
-        # 5. Сохранение пути к папке проекта (только если не было перемещения)
-        if 'project_folder' in changed_fields and not project_folder_changed:
-            db.set_metadata('1_3_project_folder', updated_data['project_folder'],
-                          'Путь к папке проекта')
+            # 5. Сохранение пути к папке проекта (только если не было перемещения)
+            if 'project_folder' in changed_fields and not project_folder_changed:
+                db.set_metadata('1_3_project_folder', updated_data['project_folder'],
+                              'Путь к папке проекта')
 
-        # 6. Обновление даты модификации
-        db.set_metadata('modified_date', datetime.now().isoformat(),
-                       'Дата последнего изменения проекта')
+            # 6. Обновление даты модификации
+            db.set_metadata('modified_date', datetime.now().isoformat(),
+                           'Дата последнего изменения проекта')
 
         # 7. Обновление настроек менеджера
         self._update_project_manager_settings(updated_data, changed_fields)
@@ -36,12 +36,15 @@ from .submodules.Fsm_0_4_5_coordinator import Fsm_0_4_5_TopologyCoordinator
 from .submodules.Fsm_0_4_6_fixer import Fsm_0_4_6_TopologyFixer
 from .submodules.Fsm_0_4_7_dialog import Fsm_0_4_7_TopologyCheckDialog
 from .submodules.Fsm_0_4_15_async_task import Fsm_0_4_15_TopologyCheckTask
+from .submodules.Fsm_0_4_21_parallel_scheduler import Fsm_0_4_21_ParallelTopologyTask
 from .submodules.Fsm_0_4_16_coverage_gap import Fsm_0_4_16_CoverageGapChecker
 from .submodules.Fsm_0_4_17_point_outside import Fsm_0_4_17_PointOutsideChecker
 from .submodules.Fsm_0_4_18_zpr_vertex_outside import (
     Fsm_0_4_18_ZprVertexOutsideChecker
 )
-from Daman_QGIS.constants import PLUGIN_NAME
+from Daman_QGIS.constants import (
+    PLUGIN_NAME, TOPOLOGY_CHECK_MAX_WORKERS, TOPOLOGY_PARALLEL_MIN_LAYERS
+)
 # registry already imported above
 from Daman_QGIS.utils import log_info, log_warning, log_error, log_success
 import os
@@ -53,11 +56,12 @@ class F_0_4_TopologyCheck(BaseTool):
 
     Архитектура:
     - Использует координатор (Fsm_0_4_5) с checker модулями:
-      Полигоны:
-      * Fsm_0_4_1: Проверка валидности и самопересечений
-      * Fsm_0_4_2: Проверка дублей геометрий и вершин
-      * Fsm_0_4_3: Проверка наложений и острых углов
-      * Fsm_0_4_4: Проверка точности координат
+      Полигоны (core.topology, по снимку слоя LayerSnapshot):
+      * GeometryValidityChecker: Проверка валидности и самопересечений
+      * DuplicatesChecker: Проверка дублей геометрий и вершин
+      * TopologyErrorsChecker: Проверка наложений и острых углов
+      * PrecisionChecker: Проверка точности координат
+      * CrossFeatureChecker, GapChecker: близкие точки между объектами, покрытие
       Линии:
       * Fsm_0_4_8: Самопересечения, наложения, висячие концы
       Точки:
@@ -168,7 +172,9 @@ class F_0_4_TopologyCheck(BaseTool):
 
         ВАЖНО: Задачи запускаются ПОСЛЕДОВАТЕЛЬНО (одна за другой), так как
         processing.run() не является thread-safe. Параллельный запуск вызывает
-        access violation crash.
+        access violation crash. От TOPOLOGY_PARALLEL_MIN_LAYERS полигональных
+        слоёв проверки снимков (без processing) идут в пуле процессов -
+        _run_stage1_parallel().
 
         ВАЖНО: QgsProcessingContext создаётся здесь (в main thread) и передаётся
         в каждый task, так как processing.run() внутри себя обращается к
@@ -196,6 +202,15 @@ class F_0_4_TopologyCheck(BaseTool):
         processing_context = QgsProcessingContext()
         processing_context.setProject(QgsProject.instance())
 
+        # Много полигональных слоёв - проверки снимков в пуле процессов (Fsm_0_4_21)
+        workers = min(TOPOLOGY_CHECK_MAX_WORKERS, os.cpu_count() or 1)
+        polygon_count = sum(
+            1 for layer in layers if layer.geometryType() == Qgis.GeometryType.Polygon
+        )
+        if workers > 1 and polygon_count >= TOPOLOGY_PARALLEL_MIN_LAYERS:
+            self._run_stage1_parallel(layers, workers, processing_context)
+            return
+
         log_info(f"F_0_4: Запуск ПОСЛЕДОВАТЕЛЬНОЙ асинхронной проверки для {len(layers)} слоёв")
 
         # Создаём список задач
@@ -229,6 +244,80 @@ class F_0_4_TopologyCheck(BaseTool):
             on_all_completed=self._check_async_completion
         )
 
+    def _run_stage1_parallel(self,
+                             layers: List[QgsVectorLayer],
+                             workers: int,
+                             processing_context: QgsProcessingContext):
+        """
+        Проверка всех слоёв одной задачей с пулом процессов (Fsm_0_4_21)
+
+        Полигональные слои проверяются по снимкам параллельно, processing
+        (qgis:checkvalidity) и слои ошибок - в потоке задачи. Результаты
+        приходят списком в порядке слоёв и обрабатываются теми же
+        callbacks, что и в sequential mode.
+
+        Args:
+            layers: Список слоёв для проверки
+            workers: Процессов в пуле
+            processing_context: QgsProcessingContext созданный в main thread
+        """
+        log_info(f"F_0_4: Запуск ПАРАЛЛЕЛЬНОЙ проверки для {len(layers)} слоёв, процессов: {workers}")
+
+        self._layer_id_map = {}
+        task = Fsm_0_4_21_ParallelTopologyTask(
+            layer_ids=[layer.id() for layer in layers],
+            max_workers=workers,
+            processing_context=processing_context
+        )
+        self.async_manager.run(
+            task,
+            show_progress=True,
+            silent_completion=True,
+            on_completed=self._on_parallel_completed,
+            on_failed=self._on_parallel_failed,
+            on_cancelled=self._on_parallel_cancelled
+        )
+
+    def _on_parallel_completed(self, results: Optional[List]):
+        """
+        Callback при завершении параллельной проверки.
+
+        Args:
+            results: [(layer_id, result, error), ...] в порядке слоёв;
+                     None - задача отменена во время проверки
+        """
+        if results is None:
+            self._on_parallel_cancelled()
+            return
+
+        for layer_id, result, error in results:
+            if error is not None:
+                self._on_async_layer_failed(layer_id, error)
+            else:
+                self._on_async_layer_completed(layer_id, result)
+
+        self._check_async_completion()
+
+    def _on_parallel_failed(self, error: str):
+        """
+        Callback при ошибке параллельной проверки (сбой задачи целиком).
+
+        Args:
+            error: Сообщение об ошибке
+        """
+        for layer_id in self.async_pending_layers:
+            self._on_async_layer_failed(layer_id, error)
+
+        self._check_async_completion()
+
+    def _on_parallel_cancelled(self):
+        """Callback при отмене параллельной проверки"""
+        for layer_id in self.async_pending_layers:
+            if layer_id not in self.async_results:
+                self._on_async_layer_cancelled(layer_id)
+
+        self._check_async_completion()
+
     def _on_sequential_layer_completed(self, task_desc: str, result: dict):
         """
         Callback при завершении проверки слоя (sequential mode).
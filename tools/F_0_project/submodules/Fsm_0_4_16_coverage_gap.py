@@ -6,7 +6,7 @@ Fsm_0_4_16: Whole-project детектор зазоров покрытия на
 КОНТЕКСТ (план F_0_4 2026-06-16, INV-3 / класс C / класс E):
 Зазор покрытия — МЕЖСЛОЙНЫЙ феномен: если просуммировать все полигоны нарезки
 одного типа внутри зоны планируемого размещения (ЗПР) этого типа, оставшиеся
-дырки = ошибки. Внутрислойный envelope-diff (бывший метод 2 Fsm_0_4_14) давал
+дырки = ошибки. Внутрислойный envelope-diff (бывший метод 2 GapChecker, core.topology.gap_checker) давал
 ложные срабатывания и вынесен сюда.
 
 Класс C — «Зазор покрытия нарезки» (тип 'coverage_gap'):
@@ -50,7 +50,7 @@ class Fsm_0_4_16_CoverageGapChecker:
     """
 
     # Минимальная площадь зазора для отсечения шума float-арифметики (м²).
-    # Наследовано из Fsm_0_4_14 (INV-5). MAX-порог намеренно НЕ вводится.
+    # Наследовано из GapChecker (INV-5). MAX-порог намеренно НЕ вводится.
     MIN_GAP_AREA = 0.0001
 
     # Секция слоёв нарезки в Base_layers.
@@ -518,7 +518,7 @@ class Fsm_0_4_16_CoverageGapChecker:
         layer: QgsVectorLayer
     ) -> List[QgsGeometry]:
         """Валидные геометрии слоя (makeValid для невалидных, наследовано из
-        Fsm_0_4_14 стр.225-230).
+        GapChecker._build_union_and_envelope).
 
         Returns:
             Список QgsGeometry (копии), пустые/вырожденные отброшены.
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_0_4_21: Параллельная проверка топологии слоёв в пуле процессов
+
+Последовательный режим (Fsm_0_4_15 через M_17.run_sequential) проверяет
+слои по одному, и на проектах с десятками полигональных слоёв время
+проверки - сумма времён слоёв. Checker'ы core.topology на снимке
+(LayerSnapshot) - чистый Python + GEOS без обращения к проекту, поэтому
+полигональные слои проверяются в процессах пула одновременно.
+
+Разделение работы:
+- Поток задачи (QgsTask): снимки слоёв, индекс ID точек (CrossFeatureChecker),
+  qgis:checkvalidity (processing - только с контекстом из main thread),
+  линейные / точечные слои, слои ошибок (memory-слой в процессе пула
+  не создать и не передать)
+- Процесс пула: core.topology.snapshot_worker (run_polygon_checks по
+  снимку) - самопересечения, дубли, наложения, spike, точность,
+  cross-feature, покрытие. Процесс импортирует только core.topology:
+  пакет tools (все инструменты, диалоги, processing) в нём не загружается.
+  Запуск процессов - core.process_pool (python QGIS, spawn)
+
+Ошибки возвращаются из процесса с геометриями в WKB (QgsGeometry не
+сериализуется pickle) и собираются в порядке слоёв - результат тот же,
+что у последовательного режима. Пул не запустился - те же проверки
+выполняются в потоке задачи.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from qgis.core import Qgis, QgsProject, QgsProcessingContext, QgsVectorLayer
+
+from Daman_QGIS.core.process_pool import get_worker_executable, spawn_executable
+from Daman_QGIS.core.topology.layer_snapshot import LayerSnapshot
+from Daman_QGIS.core.topology.snapshot_worker import attach_errors, check_snapshot_worker
+from Daman_QGIS.managers import BaseAsyncTask
+from Daman_QGIS.utils import log_info, log_warning, log_error, log_timing
+
+
+class Fsm_0_4_21_ParallelTopologyTask(BaseAsyncTask):
+    """
+    Task проверки топологии всех слоёв с пулом процессов для полигонов.
+
+    Результат execute() - список (layer_id, result, error) в порядке
+    layer_ids: result - словарь check_layer() координатора, error - текст
+    ошибки (result=None). При отмене - None.
+    """
+
+    def __init__(self,
+                 layer_ids: List[str],
+                 max_workers: int,
+                 check_types: Optional[List[str]] = None,
+                 processing_context: Optional[QgsProcessingContext] = None):
+        """
+        Args:
+            layer_ids: ID слоёв для проверки (НЕ layer objects!)
+            max_workers: Процессов в пуле
+            check_types: Типы проверок полигонов (None = все)
+            processing_context: QgsProcessingContext созданный в main thread
+        """
+        super().__init__(f"Проверка топологии: {len(layer_ids)} слоёв", can_cancel=True)
+
+        self.layer_ids = layer_ids
+        self.max_workers = max_workers
+        self.check_types = check_types
+        self.processing_context = processing_context
+        # Слоёв, проверенных в процессах пула (остальные - в потоке задачи)
+        self.pool_checked = 0
+
+    def execute(self):
+        """
+        Проверка слоёв: полигоны - в пуле, остальное - в потоке задачи.
+
+        Выполняется в background thread.
+        """
+        from .Fsm_0_4_5_coordinator import Fsm_0_4_5_TopologyCoordinator
+
+        started = time.perf_counter()
+        check_types = self.check_types or list(Fsm_0_4_5_TopologyCoordinator.POLYGON_CHECK_TYPES)
+        total = len(self.layer_ids)
+
+        results: Dict[str, Tuple[Optional[Dict], Optional[str]]] = {}
+        # layer_id -> (слой, снимок, индекс ID точек)
+        polygon_jobs: Dict[str, Tuple[QgsVectorLayer, Any, Dict]] = {}
+        layer_ms: Dict[str, float] = {}
+
+        # 1. Снимки полигональных слоёв (чтение слоёв - только в потоке задачи)
+        self.report_progress(0, "Чтение слоёв...")
+        for layer_id in self.layer_ids:
+            if self.is_cancelled():
+                return None
+            layer = QgsProject.instance().mapLayer(layer_id)
+            if not layer or not isinstance(layer, QgsVectorLayer):
+                results[layer_id] = (None, f"Слой не найден или не является векторным (id={layer_id})")
+                continue
+            if layer.geometryType() != Qgis.GeometryType.Polygon:
+                continue
+            try:
+                layer_started = time.perf_counter()
+                snapshot = LayerSnapshot(layer)
+                point_index = {}
+                if 'cross_feature_close_points' in check_types:
+                    point_index = Fsm_0_4_5_TopologyCoordinator().cross_feature_checker.build_point_index(
+                        layer.name()
+                    )
+                polygon_jobs[layer_id] = (layer, snapshot, point_index)
+                layer_ms[layer_id] = (time.perf_counter() - layer_started) * 1000
+            except Exception as e:
+                log_error(f"Fsm_0_4_21: Ошибка чтения слоя '{layer.name()}': {e}")
+                results[layer_id] = (None, str(e))
+
+        # 2. Пул процессов: проверки по снимкам
+        executor, futures = self._start_pool(polygon_jobs, check_types)
+        if futures:
+            log_info(
+                f"Fsm_0_4_21: Параллельная проверка {len(futures)} полигональных слоёв, "
+                f"процессов: {self.max_workers}"
+            )
+
+        try:
+            # 3. Пока пул считает - qgis:checkvalidity и линии / точки в потоке задачи
+            validity: Dict[str, Tuple[List[Dict], float]] = {}
+            done_count = 0
+            for layer_id in self.layer_ids:
+                if self.is_cancelled():
+                    return None
+                if layer_id in results:
+                    continue
+                layer = QgsProject.instance().mapLayer(layer_id)
+                coordinator = Fsm_0_4_5_TopologyCoordinator(processing_context=self.processing_context)
+                layer_started = time.perf_counter()
+                try:
+                    if layer_id in polygon_jobs:
+                        if 'validity' in check_types:
+                            snapshot = polygon_jobs[layer_id][1]
+                            errors = coordinator.validity_checker.check_validity(layer, snapshot)
+                            validity[layer_id] = (errors, (time.perf_counter() - layer_started) * 1000)
+                    else:
+                        results[layer_id] = (coordinator.check_layer(layer), None)
+                except Exception as e:
+                    log_error(f"Fsm_0_4_21: Ошибка проверки слоя '{layer.name()}': {e}")
+                    results[layer_id] = (None, str(e))
+                layer_ms[layer_id] = layer_ms.get(layer_id, 0.0) + (time.perf_counter() - layer_started) * 1000
+                done_count += 1
+                self.report_progress(int(done_count * 50 / total), f"Проверка слоёв... ({done_count}/{total})")
+
+            # 4. Результаты пула -> слои ошибок, строго в порядке слоёв
+            for layer_id in self.layer_ids:
+                if layer_id not in polygon_jobs or layer_id in results:
+                    continue
+                if self.is_cancelled():
+                    return None
+                layer, snapshot, point_index = polygon_jobs[layer_id]
+                try:
+                    worker_result, worker_ms = self._collect(
+                        futures.get(layer_id), snapshot, check_types, point_index
+                    )
+                    if worker_result is None:
+                        return None
+                    results[layer_id] = (
+                        self._finalize_layer(layer, snapshot, check_types, worker_result, validity.get(layer_id)),
+                        None
+                    )
+                    layer_ms[layer_id] = layer_ms.get(layer_id, 0.0) + worker_ms
+                except Exception as e:
+                    log_error(f"Fsm_0_4_21: Ошибка проверки слоя '{layer.name()}': {e}")
+                    results[layer_id] = (None, str(e))
+                done_count += 1
+                self.report_progress(50 + int(done_count * 50 / total), f"Проверка слоёв... ({done_count}/{total})")
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        ordered = []
+        for layer_id in self.layer_ids:
+            result, error = results.get(layer_id, (None, "Слой не проверен"))
+            if result is not None:
+                result['statistics']['check_ms'] = round(layer_ms.get(layer_id, 0.0), 1)
+            ordered.append((layer_id, result, error))
+
+        total_ms = (time.perf_counter() - started) * 1000
+        log_timing(
+            f"Fsm_0_4_21: Проверка {total} слоёв ({len(polygon_jobs)} полигональных, "
+            f"процессов: {self.max_workers if futures else 0}): {total_ms:.0f} мс"
+        )
+        return ordered
+
+    def _start_pool(self, polygon_jobs: Dict[str, Tuple], check_types: List[str]):
+        """
+        Пул процессов с задачами по снимкам
+
+        Returns:
+            (executor, {layer_id: future}) или (None, {}) - пул не запустился,
+            проверки выполнятся в потоке задачи
+        """
+        if self.max_workers <= 1 or not polygon_jobs:
+            return None, {}
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        executable = get_worker_executable()
+        if executable is None:
+            log_warning("Fsm_0_4_21: Не найден python для процессов пула, проверка в потоке")
+            return None, {}
+
+        executor = None
+        try:
+            # Процессы spawn запускаются в submit() - внутри контекста
+            with spawn_executable(executable) as context:
+                executor = ProcessPoolExecutor(
+                    max_workers=min(self.max_workers, len(polygon_jobs)), mp_context=context
+                )
+                futures = {
+                    layer_id: executor.submit(check_snapshot_worker, snapshot, check_types, point_index)
+                    for layer_id, (_, snapshot, point_index) in polygon_jobs.items()
+                }
+        except Exception as e:
+            log_warning(f"Fsm_0_4_21: Не удалось запустить пул процессов: {e}")
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            return None, {}
+        return executor, futures
+
+    def _collect(self, future, snapshot, check_types: List[str],
+                 point_index: Dict) -> Tuple[Optional[Tuple], float]:
+        """
+        Результат проверки снимка: из процесса пула или (без пула / при сбое
+        пула) в потоке задачи
+
+        Returns:
+            ((errors_by_type, timings, reads) или None при отмене, время в мс)
+        """
+        from concurrent.futures import wait
+
+        if future is not None:
+            while True:
+                if self.is_cancelled():
+                    return None, 0.0
+                done, _ = wait([future], timeout=0.5)
+                if done:
+                    break
+            try:
+                # Время процесса - сумма замеров checker'ов (ожидание в очереди не учитывается)
+                errors_by_type, timings, reads = future.result()
+                self.pool_checked += 1
+                return (attach_errors(errors_by_type), timings, reads), sum(timings.values())
+            except Exception as e:
+                # Ошибки checker'ов перехватываются в координаторе,
+                # исключение здесь - сбой самого пула (spawn, pickle)
+                log_warning(f"Fsm_0_4_21: Сбой пула процессов ({snapshot.layer_name}), проверка в потоке: {e}")
+
+        layer_started = time.perf_counter()
+        errors_by_type, timings, reads = check_snapshot_worker(snapshot, check_types, point_index)
+        return (attach_errors(errors_by_type), timings, reads), (time.perf_counter() - layer_started) * 1000
+
+    @staticmethod
+    def _finalize_layer(layer: QgsVectorLayer, snapshot, check_types: List[str],
+                        worker_result: Tuple, validity: Optional[Tuple[List[Dict], float]]) -> Dict[str, Any]:
+        """Слияние qgis:checkvalidity (поток) и проверок снимка (пул) + слой ошибок"""
+        from .Fsm_0_4_5_coordinator import Fsm_0_4_5_TopologyCoordinator
+
+        worker_errors, timings, reads = worker_result
+
+        # Порядок типов - как в run_polygon_checks: validity первой
+        errors_by_type: Dict[str, List[Dict]] = {}
+        if validity is not None:
+            errors_by_type['validity'] = validity[0]
+            timings['validity'] = timings.get('validity', 0.0) + validity[1]
+        errors_by_type.update(worker_errors)
+
+        # Чтения: getFeatures снимка (общий) + qgis:checkvalidity (поток)
+        for source, count in reads.items():
+            snapshot.reads[source] = max(snapshot.reads.get(source, 0), count)
+
+        coordinator = Fsm_0_4_5_TopologyCoordinator()
+        return coordinator.finalize_polygon_check(layer, snapshot, check_types, errors_by_type, timings)
@@ -16,21 +16,17 @@ from qgis.core import (
 from qgis.PyQt.QtCore import QMetaType
 from qgis.PyQt.QtGui import QColor
 
-from .Fsm_0_4_1_geometry_validity import Fsm_0_4_1_GeometryValidityChecker
-from .Fsm_0_4_2_duplicates import Fsm_0_4_2_DuplicatesChecker
-from .Fsm_0_4_3_topology_errors import Fsm_0_4_3_TopologyErrorsChecker
-from .Fsm_0_4_4_precision import Fsm_0_4_4_PrecisionChecker
 from .Fsm_0_4_8_line_checker import Fsm_0_4_8_LineChecker
 from .Fsm_0_4_9_point_checker import Fsm_0_4_9_PointChecker
-from .Fsm_0_4_10_cross_feature_checker import Fsm_0_4_10_CrossFeatureChecker
 from .Fsm_0_4_12_sliver_checker import Fsm_0_4_12_SliverChecker
 from .Fsm_0_4_13_sliver_native_checker import Fsm_0_4_13_SliverNativeChecker
-from .Fsm_0_4_14_gap_checker import Fsm_0_4_14_GapChecker
+from Daman_QGIS.core.topology.layer_snapshot import LayerSnapshot
+from Daman_QGIS.core.topology.polygon_checks import PolygonCheckSuite
 from Daman_QGIS.constants import PLUGIN_NAME
-from Daman_QGIS.utils import log_info, log_warning, log_error, log_success
+from Daman_QGIS.utils import log_info, log_warning, log_error, log_success, log_timing
 
 
-class Fsm_0_4_5_TopologyCoordinator:
+class Fsm_0_4_5_TopologyCoordinator(PolygonCheckSuite):
     """
     Координатор проверки топологии через native QGIS алгоритмы
 
@@ -93,6 +89,17 @@ class Fsm_0_4_5_TopologyCoordinator:
         'duplicate_point'
     }
 
+    # Типы проверок полигонов по умолчанию
+    POLYGON_CHECK_TYPES = [
+        'validity', 'self_intersection',
+        'duplicate_geometries', 'duplicate_vertices', 'close_points',
+        'cross_feature_close_points',  # Близкие точки между объектами
+        'overlaps', 'spikes', 'precision',
+        # ОТКЛЮЧЕНО: Sliver-проверки дают ложные срабатывания на узких,
+        # но корректных объектах (охранные зоны, полосы отвода и т.п.)
+        # 'slivers_polsby_popper', 'slivers_qgis_native'
+    ]
+
     def __init__(self, processing_context: Optional[QgsProcessingContext] = None):
         """
         Инициализация координатора
@@ -108,12 +115,9 @@ class Fsm_0_4_5_TopologyCoordinator:
         self.last_check_result = None
         self.processing_context = processing_context
 
-        # Инициализируем checker'ы для полигонов с processing_context
-        self.validity_checker = Fsm_0_4_1_GeometryValidityChecker()
-        self.duplicates_checker = Fsm_0_4_2_DuplicatesChecker(processing_context)
-        self.topology_checker = Fsm_0_4_3_TopologyErrorsChecker()
-        self.precision_checker = Fsm_0_4_4_PrecisionChecker(processing_context)
-        self.cross_feature_checker = Fsm_0_4_10_CrossFeatureChecker()
+        # Checker'ы полигонов с processing_context (PolygonCheckSuite:
+        # валидность, дубли, топология, точность, cross-feature, покрытие)
+        super().__init__(processing_context)
 
         # Инициализируем sliver checker'ы
         self.sliver_checker = Fsm_0_4_12_SliverChecker()
@@ -121,9 +125,6 @@ class Fsm_0_4_5_TopologyCoordinator:
             processing_context=processing_context
         )
 
-        # Gap checker — встроен в pipeline, выполняется всегда
-        self.gap_checker = Fsm_0_4_14_GapChecker()
-
         # Инициализируем checker'ы для линий и точек
         self.line_checker = Fsm_0_4_8_LineChecker()
         self.point_checker = Fsm_0_4_9_PointChecker()
@@ -192,16 +193,38 @@ class Fsm_0_4_5_TopologyCoordinator:
 
         # Определяем типы проверок по умолчанию для полигонов
         if check_types is None:
-            check_types = [
-                'validity', 'self_intersection',
-                'duplicate_geometries', 'duplicate_vertices', 'close_points',
-                'cross_feature_close_points',  # Близкие точки между объектами
-                'overlaps', 'spikes', 'precision',
-                # ОТКЛЮЧЕНО: Sliver-проверки дают ложные срабатывания на узких,
-                # но корректных объектах (охранные зоны, полосы отвода и т.п.)
-                # 'slivers_polsby_popper', 'slivers_qgis_native'
-            ]
+            check_types = list(self.POLYGON_CHECK_TYPES)
+
+        # Снимок слоя: одно чтение на все checker'ы запуска
+        snapshot = None
+        try:
+            snapshot = LayerSnapshot(layer)
+        except Exception as e:
+            log_error(f"Fsm_0_4_5: Ошибка чтения слоя в снимок: {e}")
+
+        if progress_callback:
+            progress_callback(5)
+
+        errors_by_type, timings = self.run_polygon_checks(
+            layer, snapshot, check_types, progress_callback
+        )
+
+        return self.finalize_polygon_check(
+            layer, snapshot, check_types, errors_by_type, timings, progress_callback
+        )
 
+    def finalize_polygon_check(self,
+                               layer: QgsVectorLayer,
+                               snapshot: Optional[LayerSnapshot],
+                               check_types: List[str],
+                               errors_by_type: Dict[str, List[Dict]],
+                               timings: Dict[str, float],
+                               progress_callback=None) -> Dict[str, Any]:
+        """
+        Статистика, отчёт и слой ошибок по результатам run_polygon_checks
+
+        Вызывается в потоке проверки (не в процессе пула): создаёт memory-слой.
+        """
         # Инициализация статистики
         self.statistics[layer.name()] = {
             'total_features': layer.featureCount(),
@@ -216,160 +239,37 @@ class Fsm_0_4_5_TopologyCoordinator:
         self.report.append(f"Типы проверок: {', '.join(check_types)}")
         self.report.append("")
 
-        if progress_callback:
-            progress_callback(5)
-
-        # Собираем все ошибки
+        # Все ошибки - в порядке проверок (порядок errors_by_type)
         all_errors = []
-        errors_by_type = {}
+        for errors in errors_by_type.values():
+            all_errors.extend(errors)
 
-        # 1. Проверка валидности и самопересечений
-        if 'validity' in check_types or 'self_intersection' in check_types:
-            log_info("Fsm_0_4_5: Проверка валидности геометрии...")
-
-            try:
-                validity_errors, self_int_errors = self.validity_checker.check(layer)
-
-                if 'validity' in check_types:
-                    errors_by_type['validity'] = validity_errors
-                    all_errors.extend(validity_errors)
-
-                if 'self_intersection' in check_types:
-                    errors_by_type['self_intersection'] = self_int_errors
-                    all_errors.extend(self_int_errors)
-            except Exception as e:
-                log_error(f"Fsm_0_4_5: Ошибка проверки валидности: {e}")
-
-            if progress_callback:
-                progress_callback(25)
-
-        # 2. Проверка дублей и близких точек
-        if ('duplicate_geometries' in check_types or
-            'duplicate_vertices' in check_types or
-            'close_points' in check_types):
-
-            try:
-                geom_duplicates, vertex_duplicates, close_points = self.duplicates_checker.check(layer)
-
-                if 'duplicate_geometries' in check_types:
-                    errors_by_type['duplicate_geometry'] = geom_duplicates
-                    all_errors.extend(geom_duplicates)
-
-                if 'duplicate_vertices' in check_types:
-                    errors_by_type['duplicate_vertex'] = vertex_duplicates
-                    all_errors.extend(vertex_duplicates)
-
-                if 'close_points' in check_types:
-                    errors_by_type['close_points'] = close_points
-                    all_errors.extend(close_points)
-            except Exception as e:
-                log_error(f"Fsm_0_4_5: Ошибка проверки дублей: {e}")
-
-            if progress_callback:
-                progress_callback(50)
-
-        # 3. Проверка топологических ошибок
-        if 'overlaps' in check_types or 'spikes' in check_types:
-            try:
-                overlaps, spikes = self.topology_checker.check(layer)
-
-                if 'overlaps' in check_types:
-                    errors_by_type['overlap'] = overlaps
-                    all_errors.extend(overlaps)
-
-                if 'spikes' in check_types:
-                    errors_by_type['spike'] = spikes
-                    all_errors.extend(spikes)
-            except Exception as e:
-                log_error(f"Fsm_0_4_5: Ошибка проверки топологии: {e}")
-
-            if progress_callback:
-                progress_callback(75)
-
-        # 4. Проверка точности
-        if 'precision' in check_types:
-            log_info("Fsm_0_4_5: Проверка точности координат...")
-
-            try:
-                precision_errors = self.precision_checker.check(layer)
-
-                errors_by_type['precision'] = precision_errors
-                all_errors.extend(precision_errors)
-            except Exception as e:
-                log_error(f"Fsm_0_4_5: Ошибка проверки точности: {e}")
-
-            if progress_callback:
-                progress_callback(80)
-
-        # 5. Проверка близких точек между объектами (cross-feature)
-        if 'cross_feature_close_points' in check_types:
-            log_info("Fsm_0_4_5: Проверка близких точек между объектами...")
-
-            try:
-                cross_feature_errors = self.cross_feature_checker.check(layer)
-
-                errors_by_type['cross_feature_close_points'] = cross_feature_errors
-                all_errors.extend(cross_feature_errors)
-            except Exception as e:
-                log_error(f"Fsm_0_4_5: Ошибка проверки cross-feature: {e}")
-
-            if progress_callback:
-                progress_callback(85)
-
-        # 6-7. Проверка sliver-полигонов ОТКЛЮЧЕНА
-        # Причина: Ложные срабатывания на узких, но корректных объектах
-        # (охранные зоны, санитарно-защитные зоны, полосы отвода и т.п.)
-        # Формула Polsby-Popper (4*pi*area/perimeter^2) даёт низкие значения
-        # для любых вытянутых полигонов, независимо от их корректности.
-        #
-        # if 'slivers_polsby_popper' in check_types:
-        #     log_info("Fsm_0_4_5: Проверка sliver-полигонов (Polsby-Popper)...")
-        #     try:
-        #         sliver_pp_errors = self.sliver_checker.check(layer)
-        #         errors_by_type['sliver_polsby_popper'] = sliver_pp_errors
-        #         all_errors.extend(sliver_pp_errors)
-        #     except Exception as e:
-        #         log_error(f"Fsm_0_4_5: Ошибка проверки slivers (Polsby-Popper): {e}")
-        #     if progress_callback:
-        #         progress_callback(90)
-        #
-        # if 'slivers_qgis_native' in check_types:
-        #     log_info("Fsm_0_4_5: Проверка sliver-полигонов (QGIS native)...")
-        #     try:
-        #         sliver_native_errors = self.sliver_native_checker.check(layer)
-        #         errors_by_type['sliver_qgis_native'] = sliver_native_errors
-        #         all_errors.extend(sliver_native_errors)
-        #     except Exception as e:
-        #         log_error(f"Fsm_0_4_5: Ошибка проверки slivers (QGIS native): {e}")
-
-            if progress_callback:
-                progress_callback(90)
-
-        # 8. Анализ покрытия (зазоры) - всегда в pipeline
-        if self.gap_checker:
-            log_info("Fsm_0_4_5: Анализ покрытия (зазоры)...")
-
-            try:
-                gap_errors = self.gap_checker.check(layer)
-
-                # Два типа ошибок из гибридного gap-checker'а (INV-1):
-                # coverage_invalid_edge — GEOS CoverageValidator (primary), per-layer
-                # gap_spike — spike-узлы union boundary (после дедупа), per-layer
-                # Тип 'gap' (envelope-diff) ВЫНЕСЕН в whole-project класс C
-                # (Fsm_0_4_16, тип 'coverage_gap') — межслойный феномен.
-                for err_type in ('coverage_invalid_edge', 'gap_spike'):
-                    filtered = [e for e in gap_errors if e['type'] == err_type]
-                    if filtered:
-                        errors_by_type[err_type] = filtered
-                        all_errors.extend(filtered)
-            except Exception as e:
-                log_error(f"Fsm_0_4_5: Ошибка анализа покрытия: {e}")
-
-            if progress_callback:
-                progress_callback(95)
+        self._record_timings(layer, snapshot, timings)
 
         return self._finalize_check(layer, all_errors, errors_by_type, 'polygon', progress_callback)
 
+    def _record_timings(self,
+                        layer: QgsVectorLayer,
+                        snapshot: Optional[LayerSnapshot],
+                        timings: Dict[str, float]) -> None:
+        """Замеры checker'ов и число чтений слоя - в статистику и отчёт"""
+        stats = self.statistics[layer.name()]
+        stats['timings_ms'] = {key: round(value, 1) for key, value in timings.items()}
+        if snapshot is not None:
+            stats['snapshot_ms'] = round(snapshot.build_ms, 1)
+            stats['layer_reads'] = snapshot.read_count
+            stats['layer_reads_by_source'] = dict(snapshot.reads)
+
+        parts = [f"{key} {value:.0f}" for key, value in timings.items()]
+        if snapshot is not None:
+            parts.insert(0, f"снимок {snapshot.build_ms:.0f}")
+        self.report.append(f"Замеры, мс: {', '.join(parts)}")
+        if snapshot is not None:
+            self.report.append(f"Чтений слоя: {snapshot.read_count}")
+
+        reads = snapshot.read_count if snapshot is not None else '-'
+        log_timing(f"Fsm_0_4_5: Замеры '{layer.name()}', мс: {', '.join(parts)}; чтений слоя: {reads}")
+
     def _check_line_layer(self,
                          layer: QgsVectorLayer,
                          check_types: Optional[List[str]] = None,
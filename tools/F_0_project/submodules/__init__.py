@@ -4,10 +4,11 @@ Native QGIS версия (без GRASS)
 """
 
 # Новые native QGIS модули проверки топологии
-from .Fsm_0_4_1_geometry_validity import Fsm_0_4_1_GeometryValidityChecker
-from .Fsm_0_4_2_duplicates import Fsm_0_4_2_DuplicatesChecker
-from .Fsm_0_4_3_topology_errors import Fsm_0_4_3_TopologyErrorsChecker
-from .Fsm_0_4_4_precision import Fsm_0_4_4_PrecisionChecker
+# (checker'ы полигонов - в core.topology, импортируются процессами пула Fsm_0_4_21)
+from Daman_QGIS.core.topology.geometry_validity import GeometryValidityChecker
+from Daman_QGIS.core.topology.duplicates import DuplicatesChecker
+from Daman_QGIS.core.topology.topology_errors import TopologyErrorsChecker
+from Daman_QGIS.core.topology.precision import PrecisionChecker
 from .Fsm_0_4_5_coordinator import Fsm_0_4_5_TopologyCoordinator
 from .Fsm_0_4_6_fixer import Fsm_0_4_6_TopologyFixer
 
@@ -35,10 +36,10 @@ from .Fsm_0_6_3_transform_applicator import TransformApplicator
 
 __all__ = [
     # Native QGIS topology modules
-    'Fsm_0_4_1_GeometryValidityChecker',
-    'Fsm_0_4_2_DuplicatesChecker',
-    'Fsm_0_4_3_TopologyErrorsChecker',
-    'Fsm_0_4_4_PrecisionChecker',
+    'GeometryValidityChecker',
+    'DuplicatesChecker',
+    'TopologyErrorsChecker',
+    'PrecisionChecker',
     'Fsm_0_4_5_TopologyCoordinator',
     'Fsm_0_4_6_TopologyFixer',
 
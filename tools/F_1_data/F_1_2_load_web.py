@@ -135,6 +135,9 @@ class F_1_2_LoadWeb(BaseTool):
         pre_dialog = Fsm_1_2_12_AuthPreDialog(self.iface.mainWindow())
         if pre_dialog.exec() != QDialog.Accepted:
             return  # Пользователь отменил
+        # Флажок пре-диалога: перезапросить все ячейки НСПД
+        # (по умолчанию свежие ячейки берутся из кэша Fsm_1_2_1_2)
+        refresh_cell_cache = pre_dialog.refresh_cell_cache()
 
         # Автоматическая очистка слоёв
         self.auto_cleanup_layers()
@@ -168,7 +171,8 @@ class F_1_2_LoadWeb(BaseTool):
             iface=self.iface,
             project_manager=self.project_manager,
             layer_manager=self.layer_manager,
-            boundary_extents=boundary_extents
+            boundary_extents=boundary_extents,
+            refresh_cell_cache=refresh_cell_cache
         )
 
         # Запускаем через AsyncTaskManager
@@ -275,6 +279,10 @@ class F_1_2_LoadWeb(BaseTool):
         message = f"Загрузка завершена! ЕГРН: {egrn}, ФГИС ЛК: {fgislk}, OSM: {osm}, ЗОУИТ: {zouit}, КЛ: {redline}, ПС: {servitude}, WMS: {wms}"
         if selection_layers > 0:
             message += f", Выборка: {selection_layers}"
+        cells_cache = statistics.get('nspd_cells_cache', 0)
+        cells_network = statistics.get('nspd_cells_network', 0)
+        if cells_cache or cells_network:
+            message += f" | Ячейки НСПД: из кэша {cells_cache}, из сети {cells_network}"
         if errors:
             message += f" | Ошибок: {len(errors)}"
 
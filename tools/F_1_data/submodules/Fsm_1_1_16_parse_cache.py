@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_1_1_16: Кэш разобранных XML ЕГРН (выписки, КПТ)
+
+SQLite-файл XML_PARSE_CACHE_FILENAME рядом с project.gpkg. Повторный импорт
+тех же файлов (перезапуск проекта, проект у коллеги) берёт объекты из кэша
+и не парсит XML.
+
+Ключ записи - (импортер, SHA-256 содержимого файла). Версия импортера
+(PLUGIN_VERSION + номер импортера из constants) хранится в записи: запись
+другой версии не выдаётся, а удаляется при открытии кэша, только если к ней
+не обращались дольше XML_PARSE_CACHE_STALE_SECONDS - папку проекта могут
+открывать коллеги с другой версией плагина. Объекты хранятся строками
+(layer_key, WKB, атрибуты JSON) - без pickle, файл можно безопасно
+переносить между машинами. Размер ограничен XML_PARSE_CACHE_MAX_BYTES,
+сверх лимита вытесняются записи с самым давним обращением (LRU).
+Объекты записи читаются лениво пачками (get() -> итератор), импорт КПТ
+из кэша не держит файл целиком в памяти - как при потоковом парсинге.
+Предупреждения и ошибки разбора файла (put(messages=...)) хранятся в meta
+и повторяются в логе при попадании - как при парсинге.
+
+Кэш не должен ломать импорт: любая ошибка SQLite отключает его до конца
+сессии (импорт продолжается с парсингом).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from Daman_QGIS.constants import (
+    PLUGIN_VERSION, XML_PARSE_CACHE_FILENAME, XML_PARSE_CACHE_MAX_BYTES,
+    XML_PARSE_CACHE_STALE_SECONDS,
+)
+from Daman_QGIS.utils import log_error, log_info, log_warning
+
+# Строка объекта кэша: (layer_key, WKB или None, атрибуты)
+CachedRow = Tuple[str, Optional[bytes], Dict[str, Any]]
+
+
+class Fsm_1_1_16_ParseCache:
+    """Кэш результатов парсинга XML по SHA-256 содержимого"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS parse_entries (
+            entry_id INTEGER PRIMARY KEY,
+            importer TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            version TEXT NOT NULL,
+            meta TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL,
+            UNIQUE (importer, digest)
+        );
+        CREATE INDEX IF NOT EXISTS idx_parse_entries_access
+            ON parse_entries(last_access);
+        CREATE TABLE IF NOT EXISTS parse_features (
+            entry_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            layer_key TEXT NOT NULL,
+            wkb BLOB,
+            attributes TEXT NOT NULL,
+            PRIMARY KEY (entry_id, seq)
+        );
+    """
+
+    _HASH_CHUNK = 1024 * 1024
+    # Объектов за один SELECT при ленивом чтении записи
+    _FETCH_BATCH = 1000
+
+    def __init__(
+        self,
+        cache_path: str,
+        importer: str,
+        importer_version: int,
+        variant: str = "",
+        max_bytes: int = XML_PARSE_CACHE_MAX_BYTES
+    ):
+        """
+        Args:
+            cache_path: Путь к файлу кэша (создаётся при отсутствии)
+            importer: Идентификатор импортера ('vypiska', 'kpt')
+            importer_version: Номер версии импортера (constants)
+            variant: Доп. часть версии (напр. хэш маппинга полей) - результат
+                парсинга зависит не только от кода
+            max_bytes: Лимит суммарного размера объектов в кэше
+        """
+        self.cache_path = cache_path
+        self.importer = importer
+        self.version = f"{PLUGIN_VERSION}/{importer_version}"
+        if variant:
+            self.version += f"/{variant}"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        # Записи, выданные get() и ещё не дочитанные - не вытесняются
+        self._pinned: Set[int] = set()
+
+        try:
+            self._conn = sqlite3.connect(cache_path, timeout=10)
+            self._conn.executescript(self._SCHEMA)
+            self._purge_other_versions()
+        except sqlite3.Error as e:
+            log_warning(f"Fsm_1_1_16: Кэш разбора XML недоступен ({cache_path}): {e}")
+            self._disable()
+
+    @classmethod
+    def for_directory(
+        cls,
+        directory: str,
+        importer: str,
+        importer_version: int,
+        variant: str = ""
+    ) -> Optional['Fsm_1_1_16_ParseCache']:
+        """Кэш в папке проекта (None если папка не задана)"""
+        if not directory or not os.path.isdir(directory):
+            return None
+        return cls(os.path.join(directory, XML_PARSE_CACHE_FILENAME), importer, importer_version, variant)
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    @classmethod
+    def file_digest(cls, file_path: str) -> str:
+        """SHA-256 содержимого файла (hex)"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls._HASH_CHUNK), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, digest: str) -> Optional[Tuple[Dict[str, Any], Iterator[CachedRow]]]:
+        """
+        Объекты файла из кэша
+
+        Returns:
+            (meta, итератор (layer_key, wkb, attributes) в порядке записи)
+            или None (промах). Объекты читаются пачками по мере обхода;
+            до конца обхода запись не вытесняется. Сохранённые сообщения
+            разбора пишутся в лог при попадании.
+        """
+        if self._conn is None:
+            return None
+
+        try:
+            row = self._conn.execute(
+                "SELECT entry_id, meta FROM parse_entries "
+                "WHERE importer = ? AND digest = ? AND version = ?",
+                (self.importer, digest, self.version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            entry_id, meta = row
+            meta = json.loads(meta)
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE parse_entries SET last_access = ? WHERE entry_id = ?",
+                    (time.time(), entry_id)
+                )
+        except (sqlite3.Error, ValueError) as e:
+            log_warning(f"Fsm_1_1_16: Ошибка чтения кэша разбора XML: {e}")
+            self._disable()
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._replay_messages(meta.pop("messages", ()))
+        self._pinned.add(entry_id)
+        return meta, self._iter_rows(entry_id)
+
+    def _iter_rows(self, entry_id: int) -> Iterator[CachedRow]:
+        """
+        Объекты записи пачками по _FETCH_BATCH
+
+        Каждая пачка - отдельный SELECT по seq: курсор не остаётся открытым
+        между пачками, пока импортер пишет новые записи (put).
+        """
+        next_seq = 0
+        try:
+            while True:
+                if self._conn is None:
+                    raise sqlite3.OperationalError("кэш разбора XML закрыт")
+                try:
+                    batch = self._conn.execute(
+                        "SELECT seq, layer_key, wkb, attributes FROM parse_features "
+                        "WHERE entry_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                        (entry_id, next_seq, self._FETCH_BATCH)
+                    ).fetchall()
+                except sqlite3.Error as e:
+                    # Часть объектов уже отдана - файл нельзя молча оборвать
+                    log_warning(f"Fsm_1_1_16: Ошибка чтения кэша разбора XML: {e}")
+                    self._disable()
+                    raise
+                for seq, layer_key, wkb, attributes in batch:
+                    yield layer_key, wkb, json.loads(attributes)
+                if len(batch) < self._FETCH_BATCH:
+                    return
+                next_seq = batch[-1][0] + 1
+        finally:
+            self._pinned.discard(entry_id)
+
+    def put(
+        self,
+        digest: str,
+        meta: Dict[str, Any],
+        rows: Iterable[CachedRow],
+        messages: Iterable[Tuple[str, str]] = ()
+    ) -> bool:
+        """
+        Сохранение объектов файла (заменяет прежнюю запись)
+
+        Args:
+            digest: SHA-256 файла (file_digest)
+            meta: JSON-совместимые сведения импортера (схемы, счётчики)
+            rows: Объекты (layer_key, wkb, attributes)
+            messages: Предупреждения и ошибки разбора файла [(level, message)]
+                (capture_log_messages) - повторяются в логе при попадании
+
+        Returns:
+            True если запись сохранена
+        """
+        if self._conn is None:
+            return False
+
+        try:
+            encoded = []
+            size = 0
+            for seq, (layer_key, wkb, attributes) in enumerate(rows):
+                attributes_json = json.dumps(attributes, ensure_ascii=False)
+                size += len(attributes_json) + (len(wkb) if wkb else 0)
+                encoded.append((seq, layer_key, wkb, attributes_json))
+            messages = [list(item) for item in messages]
+            if messages:
+                meta = dict(meta, messages=messages)
+            meta_json = json.dumps(meta, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            # Атрибуты не сериализуются в JSON - такой файл не кэшируем
+            log_warning(f"Fsm_1_1_16: Результат парсинга не кэшируется: {e}")
+            return False
+
+        if size > self.max_bytes:
+            return False
+
+        try:
+            with self._conn:
+                self._delete_entry(digest)
+                cursor = self._conn.execute(
+                    "INSERT INTO parse_entries (importer, digest, version, meta, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.importer, digest, self.version, meta_json, size, time.time())
+                )
+                entry_id = cursor.lastrowid
+                self._conn.executemany(
+                    "INSERT INTO parse_features (entry_id, seq, layer_key, wkb, attributes) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(entry_id,) + item for item in encoded]
+                )
+                self._evict(keep_entry_id=entry_id)
+        except sqlite3.Error as e:
+            log_warning(f"Fsm_1_1_16: Ошибка записи кэша разбора XML: {e}")
+            self._disable()
+            return False
+
+        self.stored += 1
+        return True
+
+    def report(self) -> str:
+        """Строка для сводки импорта"""
+        return f"кэш разбора XML: попаданий {self.hits}, промахов {self.misses}"
+
+    def close(self) -> None:
+        """Закрытие соединения (файл кэша остаётся)"""
+        if self.hits or self.misses:
+            log_info(
+                f"Fsm_1_1_16: {self.importer}: {self.report()}, "
+                f"сохранено {self.stored}, вытеснено {self.evicted}"
+            )
+        self._disable()
+
+    def _replay_messages(self, messages: Iterable[Tuple[str, str]]) -> None:
+        """Сообщения разбора файла из записи кэша (телеметрия - только при разборе)"""
+        for level, message in messages:
+            if level == "CRITICAL":
+                log_error(message, send_telemetry=False)
+            else:
+                log_warning(message)
+
+    def _purge_other_versions(self) -> None:
+        """
+        Удаление записей импортера с другой версией, к которым давно не обращались
+
+        Свежие записи другой версии остаются: их использует коллега с другой
+        версией плагина в той же папке проекта (объём ограничивает LRU).
+        """
+        stale = [
+            row[0] for row in self._conn.execute(
+                "SELECT entry_id FROM parse_entries "
+                "WHERE importer = ? AND version != ? AND last_access < ?",
+                (self.importer, self.version, time.time() - XML_PARSE_CACHE_STALE_SECONDS)
+            )
+        ]
+        if not stale:
+            return
+        with self._conn:
+            self._delete_entries(stale)
+        log_info(f"Fsm_1_1_16: Удалено устаревших записей кэша ({self.importer}): {len(stale)}")
+
+    def _evict(self, keep_entry_id: int) -> None:
+        """LRU-вытеснение до лимита max_bytes (внутри транзакции put)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        victims = []
+        for entry_id, size in self._conn.execute(
+            "SELECT entry_id, size FROM parse_entries WHERE entry_id != ? ORDER BY last_access",
+            (keep_entry_id,)
+        ):
+            if entry_id in self._pinned:
+                continue
+            victims.append(entry_id)
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._delete_entries(victims)
+        self.evicted += len(victims)
+
+    def _delete_entry(self, digest: str) -> None:
+        row = self._conn.execute(
+            "SELECT entry_id FROM parse_entries WHERE importer = ? AND digest = ?",
+            (self.importer, digest)
+        ).fetchone()
+        if row is not None:
+            self._delete_entries([row[0]])
+
+    def _delete_entries(self, entry_ids: List[int]) -> None:
+        params = [(entry_id,) for entry_id in entry_ids]
+        self._conn.executemany("DELETE FROM parse_features WHERE entry_id = ?", params)
+        self._conn.executemany("DELETE FROM parse_entries WHERE entry_id = ?", params)
+
+    def _disable(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
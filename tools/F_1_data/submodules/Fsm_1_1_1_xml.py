@@ -185,6 +185,8 @@ class Fsm_1_1_1_XmlImportSubmodule(BaseImporter):
             message_parts.append(f'Обработано записей: {total_records}')
         if skipped_files:
             message_parts.append(f'Пропущено устаревших файлов: {len(skipped_files)}')
+        if self.kpt_importer and self.kpt_importer.parse_cache_report:
+            message_parts.append(self.kpt_importer.parse_cache_report)
 
         # Логируем ошибки парсинга
         if self.parsing_errors:
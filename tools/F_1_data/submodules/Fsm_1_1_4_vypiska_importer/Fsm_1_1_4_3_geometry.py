@@ -21,21 +21,180 @@ Fsm_1_1_4_3 - Извлечение геометрии из XML выписок Е
 M-КООРДИНАТЫ:
 - delta_geopoint сохраняется в M-координате каждой точки
 - Позволяет анализировать точность межевания
+
+БЫСТРЫЙ ПУТЬ (extract_geometry):
+- x/y/delta_geopoint spatial_element собираются тремя findall (ElementPath),
+  float-конвертация пакетно, кольцо = QgsLineString(xs, ys, [], ms)
+- нестандартный spatial_element декодируется поэлементно как в эталоне
+extract_geometry_reference - исходная реализация, эталон для тестов.
 """
 
-from typing import Dict
+import math
+from typing import Dict, List, Tuple
 from qgis.core import (
     QgsGeometry, QgsPoint, QgsPointXY, QgsLineString, QgsPolygon,
     QgsMultiPolygon, QgsMultiLineString, QgsMultiPoint
 )
 
+from Daman_QGIS.constants import CLOSURE_TOLERANCE
 from Daman_QGIS.managers import CoordinatePrecisionManager
 from Daman_QGIS.utils import log_info, log_error, log_warning
 
+# Декодированный spatial_element: (xs, ys, ms) в осях QGIS
+_Ordinates = Tuple[List[float], List[float], List[float]]
+
 
 def extract_geometry(geometry_root_element) -> Dict[str, QgsGeometry]:
     """
-    Извлечение геометрии из XML элемента (БЕЗ ВАЛИДАЦИИ!)
+    Извлечение геометрии из XML элемента (быстрый путь, БЕЗ ВАЛИДАЦИИ!)
+
+    Результат идентичен extract_geometry_reference: координаты, порядок
+    точек, ориентация и разбиение на outer/holes не меняются.
+
+    Args:
+        geometry_root_element: XML элемент с contours_location или contours
+
+    Returns:
+        Dict[geom_type, QgsGeometry]: Словарь геометрий по типам
+    """
+    if geometry_root_element is None:
+        return {}
+
+    all_polygons, all_lines, all_points = [], [], []
+
+    contours = geometry_root_element.findall('.//contour')
+    if contours:
+        element_groups = [contour.findall('.//spatial_element') for contour in contours]
+    else:
+        # Каждый spatial_element = отдельный "виртуальный" контур
+        element_groups = [[se] for se in geometry_root_element.findall('.//spatial_element')]
+
+    for spatial_elements in element_groups:
+        rings: List[_Ordinates] = []
+
+        for spatial_element in spatial_elements:
+            xs, ys, ms = _decode_ordinates(spatial_element)
+            count = len(xs)
+            if not count:
+                continue
+
+            if count == 1:
+                all_points.append(QgsPoint(xs[0], ys[0], m=ms[0]))
+            elif count >= 4 and _is_ring_closed(xs, ys):
+                rings.append((xs, ys, ms))
+            else:
+                all_lines.append(QgsLineString(xs, ys, [], ms))
+
+        if not rings:
+            continue
+
+        if len(rings) == 1:
+            xs, ys, ms = rings[0]
+            all_polygons.append(QgsPolygon(QgsLineString(xs, ys, [], ms)))
+            continue
+
+        # Несколько rings: внешний = наибольшая площадь, дыры - если все внутри
+        ring_geoms = []
+        for xs, ys, ms in rings:
+            geom = QgsGeometry(QgsPolygon(QgsLineString(xs, ys)))
+            ring_geoms.append(((xs, ys, ms), geom, geom.area()))
+        ring_geoms.sort(key=lambda x: x[2], reverse=True)
+
+        outer_ring, outer_geom, _ = ring_geoms[0]
+        potential_holes = ring_geoms[1:]
+
+        if all(outer_geom.contains(hole_geom) for _, hole_geom, _ in potential_holes):
+            xs, ys, ms = outer_ring
+            polygon = QgsPolygon(QgsLineString(xs, ys, [], ms))
+            for (xs, ys, ms), _, _ in potential_holes:
+                polygon.addInteriorRing(QgsLineString(xs, ys, [], ms))
+            all_polygons.append(polygon)
+        else:
+            for xs, ys, ms in rings:
+                all_polygons.append(QgsPolygon(QgsLineString(xs, ys, [], ms)))
+
+    geometries = {}
+
+    if all_polygons:
+        try:
+            multi_polygon = QgsMultiPolygon()
+            for polygon in all_polygons:
+                multi_polygon.addGeometry(polygon)
+            geometries["MultiPolygonM"] = QgsGeometry(multi_polygon)
+        except Exception as e:
+            log_error(f"Fsm_1_1_4_3: Ошибка создания MultiPolygon: {e}")
+            import traceback
+            log_error(f"Fsm_1_1_4_3: {traceback.format_exc()}")
+
+    if all_lines:
+        geometries["MultiLineStringM"] = QgsGeometry(QgsMultiLineString(all_lines))
+
+    if all_points:
+        geometries["MultiPointM"] = QgsGeometry(QgsMultiPoint(all_points))
+
+    if not geometries:
+        return {"NoGeometry": None}
+
+    return geometries
+
+
+def _decode_ordinates(spatial_element) -> _Ordinates:
+    """
+    Пакетное декодирование координат spatial_element
+
+    SWAP: XML X (North) -> QGIS Y, XML Y (East) -> QGIS X.
+    Пакетный путь применим, только если у каждой ordinate ровно один
+    непустой x и y, а delta_geopoint есть у всех или ни у одной.
+    """
+    ordinate_count = len(spatial_element.findall('.//ordinates/ordinate'))
+    x_texts = [e.text for e in spatial_element.findall('.//ordinates/ordinate/x')]
+    y_texts = [e.text for e in spatial_element.findall('.//ordinates/ordinate/y')]
+    delta_texts = [e.text for e in spatial_element.findall('.//ordinates/ordinate/delta_geopoint')]
+
+    if (
+        len(x_texts) == ordinate_count and len(y_texts) == ordinate_count
+        and len(delta_texts) in (0, ordinate_count)
+        and all(x_texts) and all(y_texts)
+    ):
+        try:
+            xs = list(map(float, y_texts))
+            ys = list(map(float, x_texts))
+            ms = [float(t) if t else 0.0 for t in delta_texts] if delta_texts else [0.0] * ordinate_count
+            return xs, ys, ms
+        except ValueError:
+            pass
+
+    return _decode_ordinates_per_element(spatial_element)
+
+
+def _decode_ordinates_per_element(spatial_element) -> _Ordinates:
+    """Поэлементное декодирование (семантика extract_geometry_reference)"""
+    xs: List[float] = []
+    ys: List[float] = []
+    ms: List[float] = []
+
+    for ordinate in spatial_element.findall('.//ordinates/ordinate'):
+        x_text = ordinate.findtext("x")
+        y_text = ordinate.findtext("y")
+        if x_text and y_text:
+            delta_text = ordinate.findtext("delta_geopoint")
+            ms.append(float(delta_text) if delta_text else 0.0)
+            xs.append(float(y_text))
+            ys.append(float(x_text))
+
+    return xs, ys, ms
+
+
+def _is_ring_closed(xs: List[float], ys: List[float]) -> bool:
+    """Замкнутость кольца (как CoordinatePrecisionManager.is_ring_closed)"""
+    dx = xs[0] - xs[-1]
+    dy = ys[0] - ys[-1]
+    return math.sqrt(dx * dx + dy * dy) < CLOSURE_TOLERANCE
+
+
+def extract_geometry_reference(geometry_root_element) -> Dict[str, QgsGeometry]:
+    """
+    Извлечение геометрии из XML элемента (эталон, БЕЗ ВАЛИДАЦИИ!)
 
     ВАЖНО: Геометрия импортируется "как есть" из XML.
     НЕТ валидации, НЕТ исправлений (как в оригинальном kd_on).
@@ -53,6 +53,14 @@ GEOM_TO_SUBLAYER_SUFFIX_ZU = {
     'NoGeometry': ('2', 'not')
 }
 
+# FIX (2025-12-17): При дедупликации сохраняем важные поля из старого feature
+# Проблема: обособленные участки ЕЗ создаются БЕЗ площади, но WFS содержит корректную площадь
+# Решение: если в новом feature поле пустое, а в старом заполнено - переносим значение
+PRESERVE_IF_EMPTY_FIELDS = ['Площадь', 'Значение']  # Площадь для ЗУ, Значение для ОКС
+
+# Размер пачки ключей в одном SELECT ... IN (...) инкрементального upsert
+_KEY_LOOKUP_CHUNK = 500
+
 
 def _apply_layer_visibility(layer: QgsVectorLayer, layer_name: str) -> None:
     """
@@ -519,13 +527,9 @@ def _update_layer_with_deduplication(existing_layer: QgsVectorLayer,
     """
     Обновление слоя с автоматической проверкой и заменой дублей по ключевым полям
 
-    Алгоритм:
-    1. Загружаем все существующие features
-    2. Определяем ключевые поля для дедупликации (КН или КН_родителя+Номер_части)
-    3. Строим индекс: {composite_key: feature}
-    4. Для каждого нового feature: если ключ существует → удаляем старый
-    5. Объединяем: оставшиеся старые + все новые
-    6. Перезаписываем слой в GPKG
+    Основной путь - инкрементальный upsert в GPKG (_upsert_layer_incremental):
+    стоимость зависит от размера пачки, а не слоя. При его сбое - полная
+    перезапись слоя (_rewrite_layer_with_deduplication).
 
     Args:
         existing_layer: Существующий слой
@@ -540,25 +544,262 @@ def _update_layer_with_deduplication(existing_layer: QgsVectorLayer,
     Returns:
         Обновлённый QgsVectorLayer или None
     """
+    # Определяем ключевые поля для дедупликации
+    key_fields = _get_unique_key_fields(layer_name, existing_layer.fields())
+
+    if not key_fields:
+        # Ключевые поля не найдены → добавляем БЕЗ проверки дублей
+        log_warning(f"Fsm_1_1_4_6: Ключевые поля для дедупликации не найдены в слое '{layer_name}', добавление БЕЗ проверки дублей")
+        return _append_without_check(
+            existing_layer, new_features_data, layer_name,
+            gpkg_path, crs, layer_geom_type
+        )
+
+    # Логируем используемые ключевые поля
+    log_info(f"Fsm_1_1_4_6: Дедупликация слоя '{layer_name}' по полям: {', '.join(key_fields)}")
+
+    updated_layer = _upsert_layer_incremental(
+        new_features_data, key_fields, layer_name, gpkg_path,
+        layer_geom_type, field_mapper, record_type
+    )
+    if updated_layer is not None:
+        return updated_layer
+
+    log_warning(f"Fsm_1_1_4_6: Инкрементальный upsert слоя '{layer_name}' не выполнен, полная перезапись слоя")
+    return _rewrite_layer_with_deduplication(
+        existing_layer, new_features_data, key_fields, layer_name,
+        gpkg_path, crs, layer_geom_type, field_mapper, record_type
+    )
+
+
+def _make_key(values: List[Any]) -> Optional[str]:
+    """
+    Составной ключ дедупликации или None
+
+    Все части ключа должны быть не пустыми и не 'NULL'
+    (явная проверка на None ДО преобразования в str()).
+    """
+    key_values = ['' if val is None else str(val) for val in values]
+    if all(val and val != 'NULL' for val in key_values):
+        return "::".join(key_values)
+    return None
+
+
+def _is_geometry_compatible(geom: QgsGeometry, layer_geom_type: str) -> bool:
+    """Совместимость геометрии с типом слоя (0=Point, 1=Line, 2=Polygon)"""
+    if not hasattr(geom, 'type'):
+        return False
+    geom_type = geom.type()
+    return ((layer_geom_type == 'MultiPolygon' and geom_type == 2) or
+            (layer_geom_type == 'MultiLineString' and geom_type == 1) or
+            (layer_geom_type == 'MultiPoint' and geom_type == 0))
+
+
+def _sql_literal(value: Any) -> str:
+    """Строковый литерал SQLite (ExecuteSQL в GDAL не поддерживает параметры)"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _sql_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _upsert_layer_incremental(new_features_data: List[Dict[str, Any]],
+                              key_fields: List[str],
+                              layer_name: str,
+                              gpkg_path: str,
+                              layer_geom_type: str,
+                              field_mapper=None,
+                              record_type: Optional[str] = None) -> Optional[QgsVectorLayer]:
+    """
+    Инкрементальный upsert пачки в слой GPKG (одна транзакция OGR)
+
+    Алгоритм:
+    1. CREATE INDEX IF NOT EXISTS по ключевым полям (КН или КН_родителя+Номер_части)
+    2. Поиск существующих строк с ключами пачки - индексный IN по первому
+       ключевому полю, вместе с PRESERVE_IF_EMPTY_FIELDS
+    3. Перенос PRESERVE_IF_EMPTY_FIELDS из старой строки в новую (если в новой пусто)
+    4. Удаление только совпавших строк и вставка пачки
+    Если совпадений нет, а слой не пуст - это реимпорт новых данных:
+    старые строки удаляются целиком (как в полной перезаписи).
+
+    Returns:
+        Обновлённый QgsVectorLayer или None (вызывающий делает полную перезапись)
+    """
     try:
-        # DEBUG: Входные данные
+        from osgeo import ogr
+    except ImportError:
+        return None
 
-        # 1. Читаем существующие features
-        existing_features_list = list(existing_layer.getFeatures())
+    ds = ogr.Open(gpkg_path, 1)
+    if ds is None:
+        return None
 
-        # 2. Определяем ключевые поля для дедупликации
-        key_fields = _get_unique_key_fields(layer_name, existing_layer.fields())
+    try:
+        ogr_layer = ds.GetLayerByName(layer_name)
+        if ogr_layer is None:
+            return None
+
+        layer_defn = ogr_layer.GetLayerDefn()
+        layer_field_names = {layer_defn.GetFieldDefn(i).GetName() for i in range(layer_defn.GetFieldCount())}
+        if any(field not in layer_field_names for field in key_fields):
+            return None
+        preserve_fields = [f for f in PRESERVE_IF_EMPTY_FIELDS if f in layer_field_names]
+        fid_column = ogr_layer.GetFIDColumn() or 'fid'
+        table = _sql_identifier(layer_name)
+
+        # 1. Индекс по ключевым полям (создаётся один раз, дальше поиск O(log n))
+        index_name = _sql_identifier(f"idx_{layer_name}_dedup_key")
+        key_columns = ", ".join(_sql_identifier(f) for f in key_fields)
+        ds.ExecuteSQL(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({key_columns})")
 
-        if not key_fields:
-            # Ключевые поля не найдены → добавляем БЕЗ проверки дублей
-            log_warning(f"Fsm_1_1_4_6: Ключевые поля для дедупликации не найдены в слое '{layer_name}', добавление БЕЗ проверки дублей")
-            return _append_without_check(
-                existing_layer, new_features_data, layer_name,
-                gpkg_path, crs, layer_geom_type
+        # Ключи пачки
+        new_keys = set()
+        for data in new_features_data:
+            key = _make_key([data.get(field) for field in key_fields])
+            if key:
+                new_keys.add(key)
+        lead_values = sorted({key.split("::", 1)[0] for key in new_keys})
+
+        # 2. Существующие строки с ключами пачки
+        select_columns = ", ".join(
+            [_sql_identifier(fid_column)] + [_sql_identifier(f) for f in key_fields + preserve_fields]
+        )
+        matched: Dict[str, Dict[str, Any]] = {}
+        matched_fids: List[int] = []
+        for i in range(0, len(lead_values), _KEY_LOOKUP_CHUNK):
+            chunk = lead_values[i:i + _KEY_LOOKUP_CHUNK]
+            result = ds.ExecuteSQL(
+                f"SELECT {select_columns} FROM {table} "
+                f"WHERE {_sql_identifier(key_fields[0])} IN ({', '.join(_sql_literal(v) for v in chunk)})"
             )
+            if result is None:
+                return None
+            try:
+                for row in result:
+                    key = _make_key([row.GetField(field) for field in key_fields])
+                    if key not in new_keys:
+                        continue
+                    matched_fids.append(row.GetField(0))
+                    matched[key] = {field: row.GetField(field) for field in preserve_fields}
+            finally:
+                ds.ReleaseResultSet(result)
+
+        # 3. Перенос заполненных полей из старых строк (FIX 2025-12-17, см. PRESERVE_IF_EMPTY_FIELDS)
+        if matched:
+            for data in new_features_data:
+                key = _make_key([data.get(field) for field in key_fields])
+                old_values = matched.get(key)
+                if not old_values:
+                    continue
+                for field_name, old_value in old_values.items():
+                    new_value = data.get(field_name)
+                    is_new_empty = new_value is None or new_value == '' or new_value == '-'
+                    is_old_filled = old_value is not None and old_value != '' and old_value != '-'
+                    if is_new_empty and is_old_filled:
+                        data[field_name] = old_value
+                        log_info(
+                            f"Fsm_1_1_4_6: Сохранено поле '{field_name}' из существующего feature: "
+                            f"'{old_value}' для КН={key}"
+                        )
+            log_info(f"Fsm_1_1_4_6: Найдено и заменено {len(matched)} дубликатов в слое '{layer_name}'")
+        else:
+            existing_count = ogr_layer.GetFeatureCount()
+            if existing_count > 0:
+                log_warning(f"Fsm_1_1_4_6: Дубликатов не найдено, но слой содержит {existing_count} features")
+                log_warning("Fsm_1_1_4_6: Это означает РЕИМПОРТ новых данных. Старые features будут УДАЛЕНЫ, новые добавлены.")
+                result = ds.ExecuteSQL(f"SELECT {_sql_identifier(fid_column)} FROM {table}")
+                if result is None:
+                    return None
+                try:
+                    matched_fids = [row.GetField(0) for row in result]
+                finally:
+                    ds.ReleaseResultSet(result)
+
+        # 4. Удаление совпавших строк и вставка пачки - одна транзакция
+        if ds.StartTransaction() != 0:
+            return None
+        try:
+            for fid in matched_fids:
+                if ogr_layer.DeleteFeature(fid) != 0:
+                    raise RuntimeError(f"DeleteFeature({fid})")
+
+            added_count = 0
+            skipped_count = 0
+            for data in new_features_data:
+                geom = data.get('geometry')
+                if geom and not geom.isEmpty() and not _is_geometry_compatible(geom, layer_geom_type):
+                    skipped_count += 1
+                    continue
+
+                ogr_feature = ogr.Feature(layer_defn)
+                for field_name, value in data.items():
+                    if field_name in RESERVED_FIELDS or field_name not in layer_field_names or value is None:
+                        continue
+                    ogr_feature.SetField(field_name, value)
+                if geom and not geom.isEmpty():
+                    ogr_feature.SetGeometry(ogr.CreateGeometryFromWkb(bytes(geom.asWkb())))
+
+                if ogr_layer.CreateFeature(ogr_feature) != 0:
+                    raise RuntimeError("CreateFeature")
+                added_count += 1
+        except Exception as e:
+            ds.RollbackTransaction()
+            log_warning(f"Fsm_1_1_4_6: Откат upsert слоя '{layer_name}': {e}")
+            return None
+
+        if ds.CommitTransaction() != 0:
+            return None
+
+        log_info(
+            f"Fsm_1_1_4_6: {layer_name} - upsert: удалено {len(matched_fids)}, "
+            f"добавлено {added_count}, пропущено {skipped_count}"
+        )
+    except Exception as e:
+        log_warning(f"Fsm_1_1_4_6: Ошибка инкрементального upsert слоя '{layer_name}': {e}")
+        return None
+    finally:
+        ds = None  # Закрываем
+
+    updated_layer = QgsVectorLayer(f"{gpkg_path}|layername={layer_name}", layer_name, "ogr")
+    if not updated_layer.isValid():
+        log_error(f"Fsm_1_1_4_6: Не удалось загрузить обновлённый слой '{layer_name}'")
+        return None
+
+    log_info(f"Fsm_1_1_4_6: Слой '{layer_name}' обновлён ({updated_layer.featureCount()} features)")
+
+    # Устанавливаем алиасы полей (если включено)
+    if field_mapper and record_type:
+        set_field_aliases(updated_layer, field_mapper, record_type)
 
-        # Логируем используемые ключевые поля
-        log_info(f"Fsm_1_1_4_6: Дедупликация слоя '{layer_name}' по полям: {', '.join(key_fields)}")
+    return updated_layer
+
+
+def _rewrite_layer_with_deduplication(existing_layer: QgsVectorLayer,
+                                      new_features_data: List[Dict[str, Any]],
+                                      key_fields: List[str],
+                                      layer_name: str,
+                                      gpkg_path: str,
+                                      crs: QgsCoordinateReferenceSystem,
+                                      layer_geom_type: str,
+                                      field_mapper=None,
+                                      record_type: Optional[str] = None) -> Optional[QgsVectorLayer]:
+    """
+    Полная перезапись слоя с заменой дублей (fallback инкрементального upsert)
+
+    Алгоритм:
+    1. Загружаем все существующие features
+    2. Строим индекс: {composite_key: feature}
+    3. Для каждого нового feature: если ключ существует → удаляем старый
+    4. Объединяем: оставшиеся старые + все новые
+    5. Перезаписываем слой в GPKG
+
+    Returns:
+        Обновлённый QgsVectorLayer или None
+    """
+    try:
+        # 1-2. Читаем существующие features (ключевые поля определены вызывающим)
+        existing_features_list = list(existing_layer.getFeatures())
 
         # 3. Строим индекс существующих features по составному ключу
         existing_by_key = {}
@@ -579,11 +820,7 @@ def _update_layer_with_deduplication(existing_layer: QgsVectorLayer,
                 existing_by_key[composite_key] = feat
 
         # 4. Обрабатываем новые features: удаляем дубликаты из индекса
-        # FIX (2025-12-17): При дедупликации сохраняем важные поля из старого feature
-        # Проблема: обособленные участки ЕЗ создаются БЕЗ площади, но WFS содержит корректную площадь
-        # Решение: если в новом feature поле пустое, а в старом заполнено - переносим значение
-        PRESERVE_IF_EMPTY_FIELDS = ['Площадь', 'Значение']  # Площадь для ЗУ, Значение для ОКС
-
+        # (с переносом PRESERVE_IF_EMPTY_FIELDS из старого feature)
         duplicates_count = 0
         for new_data in new_features_data:
             # Формируем составной ключ из новых данных
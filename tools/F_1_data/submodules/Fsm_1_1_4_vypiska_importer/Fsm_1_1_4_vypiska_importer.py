@@ -11,18 +11,21 @@ Fsm_1_1_4 - Импорт XML выписок ЕГРН (DATABASE-DRIVEN VERSION)
 Использует модульную структуру субсубмодулей.
 """
 
+import hashlib
+import json
 import os
 import xml.etree.ElementTree as ET
-from typing import Union, List, Dict, Any
+from typing import Union, List, Dict, Any, Optional
 from datetime import datetime
 from collections import defaultdict
 
-from qgis.core import QgsProject
+from qgis.core import QgsGeometry, QgsProject
 from qgis.PyQt.QtWidgets import QMessageBox
 
-from Daman_QGIS.utils import log_info, log_error, log_warning
-from Daman_QGIS.constants import ROOT_TAG_TO_RECORD_MAP
+from Daman_QGIS.utils import capture_log_messages, log_info, log_error, log_warning
+from Daman_QGIS.constants import ROOT_TAG_TO_RECORD_MAP, VYPISKA_IMPORTER_VERSION
 from ...core import BaseImporter
+from ..Fsm_1_1_16_parse_cache import Fsm_1_1_16_ParseCache
 
 # Импорт субмодулей
 from .Fsm_1_1_4_3_geometry import extract_geometry
@@ -154,22 +157,30 @@ class Fsm_1_1_4_VypiskaImporter(BaseImporter):
         error_count = 0
         invalid_geometries = []  # Список КН с невалидными геометриями
 
-        for i, file_path in enumerate(file_paths, 1):
-            try:
-                features = self._parse_vypiska_xml(file_path, output_gpkg_path)
+        # Кэш разбора XML рядом с project.gpkg (Fsm_1_1_16)
+        parse_cache = self._open_parse_cache(output_gpkg_path)
+        try:
+            for i, file_path in enumerate(file_paths, 1):
+                try:
+                    features = self._parse_vypiska_cached(file_path, output_gpkg_path, parse_cache)
 
-                if features:
-                    all_features.extend(features)
-                    success_count += 1
-                else:
-                    log_warning(f"Fsm_1_1_4: Файл {os.path.basename(file_path)} не содержит данных")
-                    error_count += 1
+                    if features:
+                        all_features.extend(features)
+                        success_count += 1
+                    else:
+                        log_warning(f"Fsm_1_1_4: Файл {os.path.basename(file_path)} не содержит данных")
+                        error_count += 1
 
-            except Exception as e:
-                log_error(f"Fsm_1_1_4: Ошибка парсинга {os.path.basename(file_path)}: {e}")
-                import traceback
-                log_error(f"Fsm_1_1_4: {traceback.format_exc()}")
-                error_count += 1
+                except Exception as e:
+                    log_error(f"Fsm_1_1_4: Ошибка парсинга {os.path.basename(file_path)}: {e}")
+                    import traceback
+                    log_error(f"Fsm_1_1_4: {traceback.format_exc()}")
+                    error_count += 1
+        finally:
+            cache_report = ""
+            if parse_cache is not None:
+                cache_report = parse_cache.report()
+                parse_cache.close()
 
         # Сводка детектора непокрытых веток холдера (Msm_4_17).
         # Точка вывода - сразу после разбора всех файлов: извлечение значений
@@ -253,6 +264,8 @@ class Fsm_1_1_4_VypiskaImporter(BaseImporter):
 
                 if result.get('success'):
                     log_info(f"Fsm_1_1_4: Импорт завершен. Успешно: {success_count}, Ошибок: {error_count}")
+                    if cache_report and result.get('message'):
+                        result['message'] = f"{result['message']} ({cache_report})"
                     if invalid_geometries:
                         log_warning(f"Fsm_1_1_4: Невалидная геометрия у {len(invalid_geometries)} объектов: {', '.join(invalid_geometries[:10])}{' ...' if len(invalid_geometries) > 10 else ''}")
 
@@ -297,7 +310,8 @@ class Fsm_1_1_4_VypiskaImporter(BaseImporter):
                     return {
                         'success': True,
                         'layers': layer_objects,
-                        'message': f'Импортировано: {len(all_features)} объектов',
+                        'message': f'Импортировано: {len(all_features)} объектов'
+                                   + (f' ({cache_report})' if cache_report else ''),
                         'errors': []
                     }
                 else:
@@ -443,6 +457,73 @@ class Fsm_1_1_4_VypiskaImporter(BaseImporter):
 
         log_info(f"Fsm_1_1_4: Показан диалог с {len(self.skipped_info)} пропущенными файлами")
 
+    def _open_parse_cache(self, output_gpkg_path: str) -> Optional[Fsm_1_1_16_ParseCache]:
+        """
+        Кэш разбора выписок в папке project.gpkg
+
+        Результат парсинга зависит от Base_field_mapping_EGRN.json, поэтому
+        хэш маппинга входит в версию записи кэша.
+        """
+        try:
+            mappings = json.dumps(self.field_mapper.get_all_mappings(), sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            log_warning(f"Fsm_1_1_4: Кэш разбора отключен (маппинг полей не сериализуется): {e}")
+            return None
+        mapping_digest = hashlib.sha256(mappings.encode('utf-8')).hexdigest()[:16]
+        return Fsm_1_1_16_ParseCache.for_directory(
+            os.path.dirname(output_gpkg_path), "vypiska", VYPISKA_IMPORTER_VERSION, mapping_digest
+        )
+
+    def _parse_vypiska_cached(self, file_path: str, gpkg_path: str,
+                              parse_cache: Optional[Fsm_1_1_16_ParseCache]) -> List[Dict[str, Any]]:
+        """
+        Парсинг выписки с кэшем разбора (Fsm_1_1_16)
+
+        ЕЗ не кэшируется: площадь берётся из данных WFS в GPKG
+        (Fsm_1_1_4_7) и меняется без изменения XML.
+
+        Наблюдения детектора непокрытых веток холдера (Msm_4_17) и
+        предупреждения разбора хранятся в записи и воспроизводятся при
+        попадании - сводка прогона и лог одинаковы с кэшем и без него.
+        """
+        if parse_cache is None or not parse_cache.enabled:
+            return self._parse_vypiska_xml(file_path, gpkg_path)
+
+        digest = parse_cache.file_digest(file_path)
+        entry = parse_cache.get(digest)
+        if entry is not None:
+            meta, rows = entry
+            self.field_mapper.replay_holder_coverage(meta.get('holder_coverage', []))
+            features = []
+            for _, wkb, feature_data in rows:
+                # Ключ 'geometry' сохранён (None) - порядок ключей как при парсинге
+                feature_data['geometry'] = _geometry_from_wkb(wkb)
+                features.append(feature_data)
+
+            # Статистика частей - как в _parse_vypiska_xml
+            parts_count = sum(1 for f in features if f.get('record_type') == 'object_part')
+            if parts_count > 0:
+                self.total_parts_count += parts_count
+                self.zu_with_parts_count += 1
+            return features
+
+        self.field_mapper.start_holder_coverage_capture()
+        try:
+            with capture_log_messages() as messages:
+                features = self._parse_vypiska_xml(file_path, gpkg_path)
+        finally:
+            holder_coverage = self.field_mapper.stop_holder_coverage_capture()
+        if features and not any(f.get('record_type') == 'unified_land_record' for f in features):
+            parse_cache.put(digest, {'holder_coverage': holder_coverage}, (
+                (
+                    feature_data.get('record_type', ''),
+                    _geometry_to_wkb(feature_data.get('geometry')),
+                    {key: (None if key == 'geometry' else value) for key, value in feature_data.items()}
+                )
+                for feature_data in features
+            ), messages)
+        return features
+
     def _parse_vypiska_xml(self, file_path: str, gpkg_path: str = None) -> List[Dict[str, Any]]:
         """
         Парсинг одного XML файла выписки (DATABASE-DRIVEN)
@@ -762,3 +843,19 @@ class Fsm_1_1_4_VypiskaImporter(BaseImporter):
                 log_warning(f"Fsm_1_1_4 (_extract_all_attributes): Ошибка деривации '__Форма_тех': {e}")
 
         return attributes
+
+
+def _geometry_to_wkb(geom: Optional[QgsGeometry]) -> Optional[bytes]:
+    """WKB геометрии для кэша разбора (None без геометрии)"""
+    if geom is None or geom.isNull():
+        return None
+    return bytes(geom.asWkb())
+
+
+def _geometry_from_wkb(wkb: Optional[bytes]) -> Optional[QgsGeometry]:
+    """QgsGeometry из WKB кэша разбора"""
+    if wkb is None:
+        return None
+    geom = QgsGeometry()
+    geom.fromWkb(wkb)
+    return geom
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_1_1_5_4: SQLite-стейджинг объектов КПТ для потокового импорта
+
+Парсер (core.kpt.parser) пишет объекты сюда пачками вместо cached_features,
+импортер затем переливает их курсором в слои GPKG. Память не зависит
+от объёма батча: в Python живёт только текущая пачка.
+
+Дедупликация (многофайловый режим) - UNIQUE индекс (layer_key, unique_key)
+и upsert: побеждает более новая дата, при равной дате - более ранний файл.
+Это та же семантика, что у dict в KptParser._cache_feature
+(все файлы имеют дату по умолчанию, поэтому выигрывает первый файл).
+Порядок выдачи: сначала объекты с ключом, затем без ключа, внутри -
+по (file_order, seq), что совпадает с порядком in-memory режима.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from Daman_QGIS.utils import log_warning
+
+
+class Fsm_1_1_5_4_FeatureStage:
+    """Стейджинг объектов (WKB + атрибуты) в SQLite-файле"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS staged_features (
+            layer_key TEXT NOT NULL,
+            unique_key TEXT,
+            feature_date TEXT NOT NULL,
+            file_order INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            wkb BLOB,
+            attributes TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_staged_unique
+            ON staged_features(layer_key, unique_key) WHERE unique_key IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_staged_layer
+            ON staged_features(layer_key);
+    """
+
+    _UPSERT = """
+        INSERT INTO staged_features
+            (layer_key, unique_key, feature_date, file_order, seq, wkb, attributes)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(layer_key, unique_key) WHERE unique_key IS NOT NULL DO UPDATE SET
+            feature_date = excluded.feature_date,
+            file_order = excluded.file_order,
+            seq = excluded.seq,
+            wkb = excluded.wkb,
+            attributes = excluded.attributes
+        WHERE excluded.feature_date > staged_features.feature_date
+           OR (excluded.feature_date = staged_features.feature_date
+               AND excluded.file_order < staged_features.file_order)
+    """
+
+    def __init__(self, staging_path: str, batch_size: int = 5000):
+        """
+        Args:
+            staging_path: Путь к файлу стейджинга (пересоздаётся)
+            batch_size: Размер пачки записи/чтения
+        """
+        self.staging_path = staging_path
+        self.batch_size = batch_size
+        self._buffer: List[Tuple] = []
+        self._file_order = 0
+        self._seq = 0
+
+        if os.path.exists(staging_path):
+            os.unlink(staging_path)
+
+        self._conn = sqlite3.connect(staging_path)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(self._SCHEMA)
+
+    def begin_file(self, file_order: int) -> None:
+        """Начало объектов файла с порядковым номером file_order"""
+        self._file_order = file_order
+        self._seq = 0
+
+    def add_feature(
+        self,
+        layer_key: str,
+        wkb: Optional[bytes],
+        attributes: Dict[str, Any],
+        unique_key: Optional[str],
+        feature_date: datetime
+    ) -> None:
+        """Добавление объекта (unique_key=None - без дедупликации)"""
+        self._buffer.append((
+            layer_key,
+            unique_key,
+            feature_date.isoformat(),
+            self._file_order,
+            self._seq,
+            wkb,
+            json.dumps(attributes, ensure_ascii=False)
+        ))
+        self._seq += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Запись текущей пачки"""
+        if not self._buffer:
+            return
+        with self._conn:
+            self._conn.executemany(self._UPSERT, self._buffer)
+        self._buffer.clear()
+
+    def reset(self) -> None:
+        """Очистка стейджинга (повторный парсинг после сбоя пула)"""
+        self._buffer.clear()
+        with self._conn:
+            self._conn.execute("DELETE FROM staged_features")
+
+    def layer_keys(self) -> List[str]:
+        """Ключи слоёв в порядке первого появления"""
+        self.flush()
+        rows = self._conn.execute(
+            "SELECT layer_key FROM staged_features "
+            "GROUP BY layer_key ORDER BY MIN(file_order), MIN(rowid)"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def feature_count(self, layer_key: str) -> int:
+        """Число объектов слоя после дедупликации"""
+        self.flush()
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM staged_features WHERE layer_key = ?", (layer_key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def iter_batches(self, layer_key: str) -> Iterator[List[Tuple[Optional[bytes], Dict[str, Any]]]]:
+        """Пачки (wkb, attributes) слоя в порядке in-memory режима"""
+        self.flush()
+        cursor = self._conn.execute(
+            "SELECT wkb, attributes FROM staged_features WHERE layer_key = ? "
+            "ORDER BY unique_key IS NULL, file_order, seq",
+            (layer_key,)
+        )
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            yield [(wkb, json.loads(attributes)) for wkb, attributes in rows]
+
+    def close(self) -> None:
+        """Закрытие и удаление файла стейджинга"""
+        self._buffer.clear()
+        try:
+            self._conn.close()
+        except sqlite3.Error:
+            pass
+        try:
+            os.unlink(self.staging_path)
+        except OSError as e:
+            log_warning(f"Fsm_1_1_5_4: Не удалось удалить стейджинг {self.staging_path}: {e}")
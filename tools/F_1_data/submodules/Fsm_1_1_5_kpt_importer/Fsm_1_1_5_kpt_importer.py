@@ -8,24 +8,34 @@ Fsm_1_1_5: Импортер КПТ (Кадастровый План Террит
 Ключевые особенности:
 - Потоковый парсинг через lxml.iterparse (для файлов 10-100+ MB)
 - Фильтрация дубликатов по дате
+- Параллельный парсинг батча в пуле процессов (сводный режим)
+- Потоковая запись в GeoPackage через SQLite-стейджинг (без cached_features)
 - Сохранение в GeoPackage
 - Интеграция с layer_handler для переименования слоев
 """
 
+import hashlib
 import os
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Callable
 
 from qgis.core import (
-    QgsProject, QgsVectorLayer, QgsFeature, QgsField, QgsFields,
-    QgsCoordinateReferenceSystem, QgsVectorFileWriter, NULL)
+    QgsProject, QgsVectorLayer, QgsFeature, QgsField, QgsFields, QgsGeometry,
+    QgsCoordinateReferenceSystem, QgsVectorFileWriter, QgsWkbTypes, NULL)
 from qgis.PyQt.QtCore import QMetaType, QDate, QDateTime
 
+from Daman_QGIS.constants import (
+    KPT_PARSE_MAX_WORKERS, KPT_PARALLEL_MIN_BATCH_BYTES, KPT_STREAM_BATCH_SIZE,
+    KPT_IMPORTER_VERSION
+)
 from Daman_QGIS.utils import log_info, log_warning, log_error
 
-from .Fsm_1_1_5_1_parser import Fsm_1_1_5_1_Parser
-from .Fsm_1_1_5_2_geometry import extract_geometry
+from Daman_QGIS.core.kpt.attributes import KptAttributeExtractor
+from Daman_QGIS.core.kpt.geometry import extract_geometry
+from Daman_QGIS.core.kpt.parser import KptParser
+from ..Fsm_1_1_16_parse_cache import Fsm_1_1_16_ParseCache
+from .Fsm_1_1_5_4_feature_stage import Fsm_1_1_5_4_FeatureStage
 
 
 class Fsm_1_1_5_KptImporter:
@@ -77,11 +87,12 @@ class Fsm_1_1_5_KptImporter:
         # Результаты последнего импорта
         self.skipped_info: List[str] = []
         self.total_records_processed = 0
+        self.parse_cache_report = ""
 
-        # Парсер
-        self.parser = Fsm_1_1_5_1_Parser(
+        # Парсер (экстракторы picklable - для пула процессов)
+        self.parser = KptParser(
             geometry_extractor=extract_geometry,
-            attribute_extractor=self._extract_attributes
+            attribute_extractor=KptAttributeExtractor(self.attribute_map)
         )
 
     def run_import(
@@ -103,6 +114,12 @@ class Fsm_1_1_5_KptImporter:
                 - output_name: str - имя группы/файла
                 - split: bool - разбивать по кварталам
                 - filter_duplicate: bool - фильтровать дубликаты
+                - max_workers: int - процессов парсинга в сводном режиме
+                  (по умолчанию KPT_PARSE_MAX_WORKERS, 1 = последовательно)
+                - streaming: bool - потоковая запись в GPKG через стейджинг
+                  (по умолчанию True, действует только при save_to_file)
+                - use_parse_cache: bool - кэш разбора XML в output_dir
+                  (Fsm_1_1_16, по умолчанию True)
             progress_callback: Callback для прогресса
             text_callback: Callback для текста статуса
             is_cancelled_callback: Callback проверки отмены
@@ -121,6 +138,9 @@ class Fsm_1_1_5_KptImporter:
         output_name = options.get("output_name", "Импорт_КПТ")
         split_by_quarter = options.get("split", False)
         filter_duplicate = options.get("filter_duplicate", True)
+        max_workers = options.get("max_workers", KPT_PARSE_MAX_WORKERS)
+        streaming = options.get("streaming", True)
+        use_parse_cache = options.get("use_parse_cache", True)
 
         # Фильтрация дубликатов
         if filter_duplicate:
@@ -135,8 +155,49 @@ class Fsm_1_1_5_KptImporter:
             log_warning("Fsm_1_1_5: Нет файлов после фильтрации")
             return []
 
-        created_layers: List[QgsVectorLayer] = []
         self.total_records_processed = 0
+        self.parse_cache_report = ""
+        parse_cache = (
+            Fsm_1_1_16_ParseCache.for_directory(
+                output_dir, "kpt", KPT_IMPORTER_VERSION, self._attribute_map_digest()
+            )
+            if use_parse_cache else None
+        )
+
+        try:
+            created_layers = self._run_groups(
+                files_to_process, target_crs, save_to_file, output_dir, output_name,
+                split_by_quarter, max_workers, streaming, parse_cache,
+                progress_callback, text_callback, is_cancelled_callback
+            )
+        finally:
+            if parse_cache is not None:
+                self.parse_cache_report = parse_cache.report()
+                parse_cache.close()
+
+        log_info(
+            f"Fsm_1_1_5: Импортировано слоев: {len(created_layers)}, записей: {self.total_records_processed}"
+            + (f", {self.parse_cache_report}" if self.parse_cache_report else "")
+        )
+        return created_layers
+
+    def _run_groups(
+        self,
+        files_to_process: List[str],
+        target_crs: QgsCoordinateReferenceSystem,
+        save_to_file: bool,
+        output_dir: str,
+        output_name: str,
+        split_by_quarter: bool,
+        max_workers: int,
+        streaming: bool,
+        parse_cache: Optional[Fsm_1_1_16_ParseCache],
+        progress_callback: Optional[Callable[[int], None]],
+        text_callback: Optional[Callable[[str], None]],
+        is_cancelled_callback: Optional[Callable[[], bool]]
+    ) -> List[QgsVectorLayer]:
+        """Импорт по файлам (split) или сводной группой"""
+        created_layers: List[QgsVectorLayer] = []
 
         if split_by_quarter:
             # Режим разбивки по файлам
@@ -155,11 +216,17 @@ class Fsm_1_1_5_KptImporter:
                     output_dir,
                     progress_callback,
                     text_callback,
-                    is_cancelled_callback
+                    is_cancelled_callback,
+                    streaming=streaming,
+                    parse_cache=parse_cache
                 )
                 created_layers.extend(layers)
         else:
             # Сводный режим
+            total_batch_size = sum(os.path.getsize(f) for f in files_to_process)
+            if total_batch_size < KPT_PARALLEL_MIN_BATCH_BYTES:
+                max_workers = 1
+
             layers = self._process_file_group(
                 files_to_process,
                 output_name,
@@ -169,11 +236,13 @@ class Fsm_1_1_5_KptImporter:
                 progress_callback,
                 text_callback,
                 is_cancelled_callback,
-                total_batch_size=sum(os.path.getsize(f) for f in files_to_process)
+                total_batch_size=total_batch_size,
+                max_workers=max_workers,
+                streaming=streaming,
+                parse_cache=parse_cache
             )
             created_layers.extend(layers)
 
-        log_info(f"Fsm_1_1_5: Импортировано слоев: {len(created_layers)}, записей: {self.total_records_processed}")
         return created_layers
 
     def _process_file_group(
@@ -186,29 +255,13 @@ class Fsm_1_1_5_KptImporter:
         progress_callback: Optional[Callable[[int], None]] = None,
         text_callback: Optional[Callable[[str], None]] = None,
         is_cancelled_callback: Optional[Callable[[], bool]] = None,
-        total_batch_size: Optional[int] = None
+        total_batch_size: Optional[int] = None,
+        max_workers: int = 1,
+        streaming: bool = False,
+        parse_cache: Optional[Fsm_1_1_16_ParseCache] = None
     ) -> List[QgsVectorLayer]:
         """Обработка группы файлов"""
 
-        # Парсинг файлов
-        cached_features, schemas, record_count = self.parser.parse_files(
-            file_paths,
-            progress_callback,
-            text_callback,
-            is_cancelled_callback,
-            total_batch_size
-        )
-
-        self.total_records_processed += record_count
-
-        if not cached_features:
-            return []
-
-        created_layers: List[QgsVectorLayer] = []
-
-        # Создаем группу в проекте
-        root_group = self._create_unique_group(group_name)
-
         # Путь к GeoPackage
         gpkg_path = ""
         if save_to_file and output_dir:
@@ -217,57 +270,106 @@ class Fsm_1_1_5_KptImporter:
             os.makedirs(target_dir, exist_ok=True)
             gpkg_path = os.path.join(target_dir, f"{file_system_name}.gpkg")
 
-        # Определяем формат данных (с дедупликацией или без)
-        is_deduplicated = isinstance(next(iter(cached_features.values()), None), dict)
-
-        # Создаем слои
-        for layer_key, layer_cache in cached_features.items():
-            fields_set = schemas.get(layer_key, set())
-            if not fields_set:
-                continue
+        # Потоковый режим: объекты копятся в SQLite-стейджинге рядом с GPKG
+        stage = None
+        if streaming and gpkg_path:
+            stage = Fsm_1_1_5_4_FeatureStage(f"{gpkg_path}.staging.sqlite", KPT_STREAM_BATCH_SIZE)
 
-            # Извлекаем features
-            if is_deduplicated:
-                keyed_values = list(layer_cache.get("keyed", {}).values()) if isinstance(layer_cache, dict) else []
-                unkeyed_values = layer_cache.get("unkeyed", []) if isinstance(layer_cache, dict) else []
-                features_to_write = [data[:2] for data in (keyed_values + unkeyed_values)]
-            else:
-                features_to_write = layer_cache
-
-            if not features_to_write:
-                continue
-
-            # Разбираем layer_key
-            record_type, geom_str = layer_key.rsplit('_', 1)
-
-            # Создаем поля
-            qgs_fields = QgsFields()
-            for field_name in sorted(list(fields_set)):
-                field_type = self._get_field_type(field_name)
-                qgs_fields.append(QgsField(field_name, field_type))
-
-            # Создаем слой
-            layer = self._create_layer_and_write_features(
-                record_type,
-                geom_str,
-                qgs_fields,
-                features_to_write,
-                target_crs,
-                save_to_file,
-                gpkg_path
+        try:
+            # Парсинг файлов
+            cached_features, schemas, record_count = self.parser.parse_files(
+                file_paths,
+                progress_callback,
+                text_callback,
+                is_cancelled_callback,
+                total_batch_size,
+                max_workers=max_workers,
+                feature_sink=stage,
+                parse_cache=parse_cache
             )
 
-            if layer:
-                # Применяем layer_handler если есть
-                if self.layer_handler:
-                    geom_abbr = self.GEOM_ABBREVIATIONS.get(geom_str, "geom")
-                    layer = self.layer_handler(layer, record_type, geom_abbr)
-
-                QgsProject.instance().addMapLayer(layer, False)
-                root_group.addLayer(layer)
-                created_layers.append(layer)
+            self.total_records_processed += record_count
+
+            # Отмена: стейджинг может содержать часть батча - слои не создаём
+            if stage is not None and is_cancelled_callback and is_cancelled_callback():
+                return []
+
+            layer_keys = stage.layer_keys() if stage is not None else list(cached_features.keys())
+            if not layer_keys:
+                return []
+
+            created_layers: List[QgsVectorLayer] = []
+
+            # Создаем группу в проекте
+            root_group = self._create_unique_group(group_name)
+
+            # Определяем формат данных (с дедупликацией или без)
+            is_deduplicated = isinstance(next(iter(cached_features.values()), None), dict)
+
+            # Создаем слои
+            for layer_key in layer_keys:
+                fields_set = schemas.get(layer_key, set())
+                if not fields_set:
+                    continue
+
+                # Разбираем layer_key
+                record_type, geom_str = layer_key.rsplit('_', 1)
+
+                # Создаем поля
+                qgs_fields = QgsFields()
+                for field_name in sorted(list(fields_set)):
+                    field_type = self._get_field_type(field_name)
+                    qgs_fields.append(QgsField(field_name, field_type))
+
+                if stage is not None:
+                    layer = self._write_staged_layer(
+                        record_type,
+                        geom_str,
+                        qgs_fields,
+                        stage,
+                        layer_key,
+                        target_crs,
+                        gpkg_path
+                    )
+                else:
+                    # Извлекаем features
+                    layer_cache = cached_features[layer_key]
+                    if is_deduplicated:
+                        keyed_values = list(layer_cache.get("keyed", {}).values()) if isinstance(layer_cache, dict) else []
+                        unkeyed_values = layer_cache.get("unkeyed", []) if isinstance(layer_cache, dict) else []
+                        features_to_write = [data[:2] for data in (keyed_values + unkeyed_values)]
+                    else:
+                        features_to_write = layer_cache
+
+                    if not features_to_write:
+                        continue
 
-        return created_layers
+                    # Создаем слой
+                    layer = self._create_layer_and_write_features(
+                        record_type,
+                        geom_str,
+                        qgs_fields,
+                        features_to_write,
+                        target_crs,
+                        save_to_file,
+                        gpkg_path
+                    )
+
+                if layer:
+                    # Применяем layer_handler если есть
+                    if self.layer_handler:
+                        geom_abbr = self.GEOM_ABBREVIATIONS.get(geom_str, "geom")
+                        layer = self.layer_handler(layer, record_type, geom_abbr)
+
+                    QgsProject.instance().addMapLayer(layer, False)
+                    root_group.addLayer(layer)
+                    created_layers.append(layer)
+
+            return created_layers
+
+        finally:
+            if stage is not None:
+                stage.close()
 
     def _create_layer_and_write_features(
         self,
@@ -344,56 +446,78 @@ class Fsm_1_1_5_KptImporter:
 
         return temp_layer
 
-    def _extract_attributes(self, element, attributes: Dict):
-        """Извлечение атрибутов из XML элемента"""
-        tags_to_skip = {
-            "contours_location", "b_contours_location", "entity_spatial",
-            "permitted_uses", "included_parcels", "decisions_requisites",
-            "geopoint_opred", "delta_geopoint", "ord_nmb", "number_pp"
-        }
-
-        self._extract_attributes_recursive(element, attributes, "", tags_to_skip)
-
-    def _extract_attributes_recursive(self, element, attributes: Dict, parent_path: str, tags_to_skip: set):
-        """Рекурсивное извлечение атрибутов"""
-        if element.tag in tags_to_skip:
-            return
-
-        for child in element:
-            if child.tag in tags_to_skip:
-                continue
-
-            full_path = f"{parent_path}_{child.tag}" if parent_path else child.tag
-
-            # Специальная обработка reg_numb_border
-            if element.tag == 'b_object' and child.tag == 'reg_numb_border':
-                if child.text and child.text.strip():
-                    attributes['numb_border'] = child.text.strip()
-                continue
-
-            if child.text and child.text.strip():
-                short_name = self._shorten_attribute_name(full_path)
-                attributes[short_name] = child.text.strip()
-
-            self._extract_attributes_recursive(child, attributes, full_path, tags_to_skip)
-
-    def _shorten_attribute_name(self, full_path: str) -> str:
-        """Сокращение имени атрибута по маппингу"""
-        mapping = self.attribute_map.get(full_path)
-        short_name = ""
+    def _write_staged_layer(
+        self,
+        record_type: str,
+        geom_type: str,
+        fields: QgsFields,
+        stage: Fsm_1_1_5_4_FeatureStage,
+        layer_key: str,
+        target_crs: QgsCoordinateReferenceSystem,
+        gpkg_path: str
+    ) -> Optional[QgsVectorLayer]:
+        """Прямая запись слоя из стейджинга в GPKG пачками (без memory layer)"""
 
-        if isinstance(mapping, dict):
-            short_name = mapping.get("name")
-        elif isinstance(mapping, list) and len(mapping) > 0:
-            short_name = mapping[0]
-        elif isinstance(mapping, str):
-            short_name = mapping
+        layer_name = f"{self.CUSTOM_LAYER_NAMES.get(record_type, record_type)}_{self.GEOM_ABBREVIATIONS.get(geom_type, 'geom')}"
+        wkb_type = QgsWkbTypes.NoGeometry if geom_type == "NoGeometry" else QgsWkbTypes.parseType(geom_type)
+
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "GPKG"
+        options.layerName = layer_name
+        options.actionOnExistingFile = (
+            QgsVectorFileWriter.CreateOrOverwriteLayer
+            if os.path.exists(gpkg_path)
+            else QgsVectorFileWriter.CreateOrOverwriteFile
+        )
 
-        if not short_name:
-            parts = full_path.split("_")
-            short_name = "_".join(parts[-2:]) if len(parts) > 2 else full_path
+        writer = QgsVectorFileWriter.create(
+            gpkg_path, fields, wkb_type, target_crs,
+            QgsProject.instance().transformContext(), options
+        )
+        if writer is None or writer.hasError() != QgsVectorFileWriter.NoError:
+            error = writer.errorMessage() if writer is not None else ""
+            log_error(f"Fsm_1_1_5: Ошибка записи слоя {layer_name}: {error}")
+            return None
+
+        field_types = [fields.field(idx).type() for idx in range(fields.count())]
+        expected_count = 0
+        failed_batches = 0
+
+        for batch in stage.iter_batches(layer_key):
+            features = []
+            for wkb, attrs in batch:
+                feature = QgsFeature(fields)
+                if wkb:
+                    geom = QgsGeometry()
+                    geom.fromWkb(wkb)
+                    feature.setGeometry(geom)
+                for field_name, value in attrs.items():
+                    idx = fields.lookupField(field_name)
+                    if idx != -1:
+                        feature.setAttribute(idx, self._convert_value(value, field_types[idx]))
+                features.append(feature)
+
+            if not writer.addFeatures(features):
+                failed_batches += 1
+            expected_count += len(features)
+
+        # Закрытие writer (сброс буфера в GPKG)
+        del writer
+
+        if failed_batches:
+            log_error(f"Fsm_1_1_5: Ошибки записи в слой {layer_name}: пачек с ошибкой {failed_batches}")
+
+        saved_layer = QgsVectorLayer(f"{gpkg_path}|layername={layer_name}", layer_name, "ogr")
+
+        # Верификация: количество объектов после записи в GPKG
+        saved_count = saved_layer.featureCount() if saved_layer.isValid() else 0
+        if saved_count != expected_count:
+            log_error(
+                f"Fsm_1_1_5: ПОТЕРЯ ДАННЫХ при записи GPKG слоя {layer_name}: "
+                f"ожидалось {expected_count}, в GPKG {saved_count}"
+            )
 
-        return short_name
+        return saved_layer if saved_layer.isValid() else None
 
     def _load_attribute_map(self) -> Dict:
         """Загрузка маппинга атрибутов из JSON"""
@@ -405,6 +529,16 @@ class Fsm_1_1_5_KptImporter:
             log_warning(f"Fsm_1_1_5: Не удалось загрузить attribute_map.json: {e}")
             return {}
 
+    def _attribute_map_digest(self) -> str:
+        """
+        Хэш attribute_map.json для версии записей кэша разбора
+
+        Имена атрибутов в кэше заданы маппингом: после его изменения
+        записи кэша устаревают.
+        """
+        mapping = json.dumps(self.attribute_map, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(mapping.encode('utf-8')).hexdigest()[:16]
+
     def _create_field_type_cache(self) -> Dict[str, str]:
         """Создание кэша типов полей"""
         cache = {}
@@ -5,7 +5,7 @@ Fsm_1_1_8_2 - Извлечение геометрии из XML interact_entry_bo
 Тонкая обёртка над Fsm_1_1_4_3.extract_geometry из импортёра выписок ЕГРН.
 
 EntitySpatial v2.0.1 - один и тот же XML-формат для геометрии в:
-- КПТ (Fsm_1_1_5_2_geometry)
+- КПТ (core.kpt.geometry)
 - Выписках ЕГРН (Fsm_1_1_4_3_geometry)
 - Уведомлениях о границах (этот модуль)
 
@@ -23,7 +23,7 @@ surveying_project=ПМТ / coastline / zones_and_territories / public_easement /
 land_reserve / agricultural_land), типизированных через type_boundary (22 значения
 dBoundaryType v3). Геометрия = стандартный EntitySpatial v2.0.1 (тот же, что в
 КПТ/выписках) — `extract_geometry` из Fsm_1_1_4_3 переиспользуется как есть. 5 из 8
-типов уже есть как record types в Fsm_1_1_5_1.RECORD_TYPES_GEOMETRY (public_easement,
+типов уже есть как record types в KptParser.RECORD_TYPES_GEOMETRY (core.kpt.parser) (public_easement,
 surveying_project, zones_and_territories, inhabited_locality_boundary, coastline) —
 Росреестр выгружает те же сущности в КПТ.
 
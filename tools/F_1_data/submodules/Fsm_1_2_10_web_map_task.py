@@ -26,6 +26,7 @@ from qgis.core import QgsProject, QgsVectorLayer, QgsRasterLayer
 from Daman_QGIS.managers import BaseAsyncTask
 from Daman_QGIS.managers import APIManager, DataCleanupManager
 from Daman_QGIS.utils import log_info, log_error, log_warning, log_success
+from Daman_QGIS.constants import PROVIDER_OGR
 
 if TYPE_CHECKING:
     from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_0_layer_config_builder import Fsm_1_2_0_LayerConfigBuilder
@@ -70,7 +71,8 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
                  project_manager,
                  layer_manager,
                  load_groups: Optional[List[str]] = None,
-                 boundary_extents: Optional[Dict[str, Any]] = None):
+                 boundary_extents: Optional[Dict[str, Any]] = None,
+                 refresh_cell_cache: bool = False):
         """
         Args:
             boundary_layer_id: ID слоя границ работ (L_1_1_2_Границы_работ_10_м)
@@ -82,6 +84,8 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
                          ['egrn', 'fgislk', 'osm', 'zouit', 'wms']
             boundary_extents: Предвычисленные boundary extents из main thread
                               {'default': ..., '500m': ..., 'no_buffer': ...}
+            refresh_cell_cache: Принудительно перезапросить все ячейки НСПД
+                                (кэш ячеек Fsm_1_2_1_2 только перезаписывается)
         """
         super().__init__("Загрузка Web карт", can_cancel=True)
 
@@ -92,6 +96,7 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
         self.layer_manager = layer_manager
         self.load_groups = load_groups or ['egrn', 'fgislk', 'osm', 'zouit', 'wms']
         self.boundary_extents = boundary_extents or {}
+        self.refresh_cell_cache = refresh_cell_cache
 
         # Инициализируем менеджеры
         self.api_manager: Optional[APIManager] = None
@@ -135,7 +140,9 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
                 'fgislk': 0,
                 'osm': 0,
                 'zouit': 0,
-                'wms': 0
+                'wms': 0,
+                'nspd_cells_cache': 0,
+                'nspd_cells_network': 0
             },
             'errors': [],
             'gpkg_path': self.gpkg_path
@@ -145,8 +152,17 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
         self.report_progress(2, "Инициализация компонентов...")
         self._init_components()
 
+        try:
+            self._load_groups(boundary_layer, results)
+        finally:
+            self._close_cell_cache(results)
+
+        return results
+
+    def _load_groups(self, boundary_layer, results: Dict[str, Any]) -> None:
+        """Загрузка групп self.load_groups с заполнением results"""
         if self.is_cancelled():
-            return results
+            return
 
         total_groups = len(self.load_groups)
 
@@ -155,7 +171,7 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
             if self.is_cancelled():
                 log_warning("Fsm_1_2_10: Загрузка отменена пользователем")
                 results['errors'].append("Загрузка отменена пользователем")
-                return results
+                return
 
             # Обновляем прогресс
             base_progress = int(5 + (idx / total_groups) * 90)
@@ -193,7 +209,15 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
 
         self.report_progress(100, "Загрузка данных завершена")
 
-        return results
+    def _close_cell_cache(self, results: Dict[str, Any]) -> None:
+        """Сводка ячеек НСПД (кэш / сеть) в статистику и закрытие кэша ячеек"""
+        if not self.egrn_loader:
+            return
+        results['statistics']['nspd_cells_cache'] = self.egrn_loader.cell_stats['cache']
+        results['statistics']['nspd_cells_network'] = self.egrn_loader.cell_stats['network']
+        if self.egrn_loader.cell_cache is not None:
+            self.egrn_loader.cell_cache.close()
+            self.egrn_loader.set_cell_cache(None)
 
     def _init_components(self):
         """Инициализация компонентов загрузки (lazy imports)"""
@@ -215,6 +239,12 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
             # Это предотвращает обращения к QgsProject из background thread
             if self.boundary_extents:
                 self.egrn_loader.set_boundary_cache(self.boundary_extents)
+            # Дисковый кэш ячеек сетки в папке проекта (повторная загрузка - только новые ячейки)
+            from .Fsm_1_2_1_2_cell_cache import Fsm_1_2_1_2_CellCache
+            self.egrn_loader.set_cell_cache(Fsm_1_2_1_2_CellCache.for_directory(
+                os.path.dirname(self.gpkg_path) if self.gpkg_path else "",
+                refresh=self.refresh_cell_cache
+            ))
 
         # Geometry processor
         if not self.geometry_processor:
@@ -305,6 +335,7 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
 
                 try:
                     layer_name = config['layer_name']
+                    clean_name = self.data_cleanup_manager.sanitize_filename(layer_name)
 
                     # АТД слои (используем предзагруженные данные)
                     if config.get('layer') == 'WFS_АТД':
@@ -333,7 +364,9 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
                         layer, feature_count = self.egrn_loader.load_oks_combined(
                             layer_name=config['layer_name'],
                             geometry_provider=geometry_provider,
-                            progress_task=None
+                            progress_task=None,
+                            gpkg_path=self.gpkg_path,
+                            table_name=clean_name
                         )
 
                     # ЗОУИТ - пропускаем (отдельная группа)
@@ -360,17 +393,21 @@ class Fsm_1_2_10_WebMapLoadTask(BaseAsyncTask):
                         layer, feature_count = self.egrn_loader.load_layer(
                             layer_name=config['layer_name'],
                             geometry_provider=geometry_provider,
-                            progress_task=None
+                            progress_task=None,
+                            gpkg_path=self.gpkg_path,
+                            table_name=clean_name
                         )
 
-                    # Сохраняем в GeoPackage
+                    # Сохраняем в GeoPackage (ЕГРН/ОКС уже записаны потоково Fsm_1_2_1_3)
                     if layer and feature_count > 0:
-                        clean_name = self.data_cleanup_manager.sanitize_filename(config['layer_name'])
                         layer.setName(clean_name)
 
-                        saved_layer = self.geometry_processor.save_to_geopackage(
-                            layer, self.gpkg_path, clean_name
-                        )
+                        if layer.providerType() == PROVIDER_OGR:
+                            saved_layer = layer
+                        else:
+                            saved_layer = self.geometry_processor.save_to_geopackage(
+                                layer, self.gpkg_path, clean_name
+                            )
                         if saved_layer:
                             loaded_layer_names.append(clean_name)
                             loaded_count += 1
@@ -6,6 +6,7 @@ Fsm_1_2_12_AuthPreDialog - Пре-диалог авторизации перед
 - Увидеть статус авторизации НСПД
 - Войти через Госуслуги (открывает Msm_40_1 browser dialog)
 - Выйти из сессии НСПД
+- Перезапросить все ячейки НСПД, минуя кэш ячеек (Fsm_1_2_1_2)
 - Начать загрузку (с авторизацией или без)
 
 Зависимости:
@@ -16,7 +17,7 @@ from typing import Optional, Any
 
 from qgis.PyQt.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QGroupBox
+    QPushButton, QGroupBox, QCheckBox
 )
 from qgis.PyQt.QtCore import Qt
 
@@ -78,6 +79,14 @@ class Fsm_1_2_12_AuthPreDialog(BaseResponsiveDialog):
         info_label.setWordWrap(True)
         layout.addWidget(info_label)
 
+        # Кэш ячеек НСПД: по умолчанию свежие ячейки берутся с диска
+        self._refresh_cache_checkbox = QCheckBox("Перезапросить все ячейки НСПД (без кэша)")
+        self._refresh_cache_checkbox.setToolTip(
+            "Игнорировать сохранённые ответы НСПД по ячейкам сетки и загрузить\n"
+            "все ячейки заново (если данные на сервере обновились)"
+        )
+        layout.addWidget(self._refresh_cache_checkbox)
+
         # Кнопки
         btn_layout = QHBoxLayout()
 
@@ -97,6 +106,10 @@ class Fsm_1_2_12_AuthPreDialog(BaseResponsiveDialog):
         # Обновить статус
         self._update_status()
 
+    def refresh_cell_cache(self) -> bool:
+        """Перезапросить все ячейки НСПД, минуя кэш ячеек."""
+        return self._refresh_cache_checkbox.isChecked()
+
     def _update_status(self) -> None:
         """Обновление отображения статуса авторизации."""
         try:
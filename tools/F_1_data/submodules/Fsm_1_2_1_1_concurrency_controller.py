@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_1_2_1_1 - Адаптивный (AIMD) контроллер параллельности запросов к НСПД
+
+Используется Fsm_1_2_1_EgrnLoader.send_request: каждый HTTP-запрос занимает
+слот контроллера на время обращения к серверу (паузы retry - вне слота).
+
+АЛГОРИТМ (AIMD, как окно перегрузки TCP):
+    - Успех: лимит += 1 / лимит (≈ +1 слот за «окно» успешных ответов)
+    - Перегрузка (403, 429, 5xx, таймаут): лимит *= NSPD_AIMD_DECREASE_FACTOR,
+      не чаще одного раза на «поколение» запросов - ответы на запросы,
+      отправленные до предыдущего снижения, лимит повторно не режут
+    - Retry-After: новые слоты не выдаются до указанного момента
+    - Прочие ошибки (401/404, обрыв соединения) лимит не меняют
+    - Верхняя граница - max_workers endpoint'а (set_max_limit), не выше
+      NSPD_AIMD_MAX_CONCURRENCY
+
+Лимит общий для всех потоков загрузчика (ячейки сетки, дробление, 3 типа ОКС).
+"""
+
+import math
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from Daman_QGIS.utils import log_info
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """
+    Значение заголовка Retry-After в секундах
+
+    Args:
+        value: Секунды ("120") или HTTP-дата ("Wed, 21 Oct 2015 07:28:00 GMT")
+
+    Returns:
+        Секунды ожидания (>= 0) или None если заголовок отсутствует / некорректен
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class Fsm_1_2_1_1_AIMDController:
+    """Потокобезопасный AIMD-ограничитель одновременных запросов"""
+
+    SUCCESS = 'success'
+    OVERLOAD = 'overload'
+    NEUTRAL = 'neutral'
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        decrease_factor: float = 0.5,
+        max_pause: float = 60.0
+    ) -> None:
+        """
+        Args:
+            initial_limit: Стартовый лимит одновременных запросов
+            min_limit: Нижняя граница лимита
+            max_limit: Верхняя граница лимита (размер пула потоков)
+            decrease_factor: Множитель лимита при перегрузке
+            max_pause: Максимальная пауза по Retry-After, сек
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._ceiling = self.max_limit
+        self.decrease_factor = decrease_factor
+        self.max_pause = max_pause
+
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+        # Статистика
+        self.successes = 0
+        self.overloads = 0
+        self.neutral = 0
+        self.decreases = 0
+        self.peak_limit = self.limit
+        self.peak_in_flight = 0
+        self.paused_seconds = 0.0
+        self.history: List[Tuple[float, int]] = [(0.0, self.limit)]
+        self._started_at = time.monotonic()
+
+    @property
+    def limit(self) -> int:
+        """Текущий лимит одновременных запросов"""
+        return max(self.min_limit, int(math.floor(self._limit)))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def set_max_limit(self, max_limit: int) -> None:
+        """
+        Ограничить верхнюю границу лимита (max_workers endpoint'а)
+
+        Граница не поднимается выше max_limit конструктора; текущий лимит
+        выше новой границы сразу опускается до неё.
+        """
+        with self._cond:
+            self.max_limit = max(self.min_limit, min(max_limit, self._ceiling))
+            self._limit = min(self._limit, float(self.max_limit))
+            self._cond.notify_all()
+
+    def acquire(self) -> float:
+        """
+        Занять слот (блокирует поток до освобождения слота / конца паузы)
+
+        Returns:
+            Момент выдачи слота (передаётся в release)
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self._pause_until:
+                    self._cond.wait(self._pause_until - now)
+                    continue
+                if self._in_flight < self.limit:
+                    break
+                self._cond.wait(0.5)
+
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+            return now
+
+    def release(self, started: float, outcome: str, retry_after: Optional[float] = None) -> None:
+        """
+        Освободить слот и скорректировать лимит
+
+        Args:
+            started: Значение, возвращённое acquire
+            outcome: SUCCESS / OVERLOAD / NEUTRAL
+            retry_after: Пауза сервера (Retry-After), сек
+        """
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            previous = self.limit
+            now = time.monotonic()
+
+            if outcome == self.SUCCESS:
+                self.successes += 1
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            elif outcome == self.OVERLOAD:
+                self.overloads += 1
+                # Одно снижение на поколение: запросы, выданные до снижения,
+                # отражают уже учтённую перегрузку
+                if started >= self._last_decrease:
+                    self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self.decreases += 1
+                if retry_after:
+                    pause_until = now + min(retry_after, self.max_pause)
+                    if pause_until > self._pause_until:
+                        self.paused_seconds += pause_until - max(self._pause_until, now)
+                        self._pause_until = pause_until
+            else:
+                self.neutral += 1
+
+            current = self.limit
+            if current != previous:
+                self.history.append((now - self._started_at, current))
+            self.peak_limit = max(self.peak_limit, current)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика контроллера"""
+        return {
+            'limit': self.limit,
+            'peak_limit': self.peak_limit,
+            'peak_in_flight': self.peak_in_flight,
+            'successes': self.successes,
+            'overloads': self.overloads,
+            'neutral': self.neutral,
+            'decreases': self.decreases,
+            'paused_seconds': round(self.paused_seconds, 1),
+        }
+
+    def log_stats(self, context: str) -> None:
+        """Итог в лог (вызывается после загрузки слоя)"""
+        s = self.stats()
+        if s['overloads'] or s['decreases']:
+            log_info(
+                f"Fsm_1_2_1_1: {context}: лимит потоков {s['limit']} (пик {s['peak_limit']}), "
+                f"успешно {s['successes']}, перегрузок {s['overloads']}, "
+                f"снижений {s['decreases']}, пауза Retry-After {s['paused_seconds']} сек"
+            )
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_1_2_1_2: Кэш ответов НСПД по ячейкам сетки
+
+SQLite-файл NSPD_CELL_CACHE_FILENAME рядом с project.gpkg. Повторная загрузка
+ЗУ/ОКС/ЗОУИТ (перезапуск F_1_2, правка части границы) берёт объекты ячеек из
+кэша и запрашивает у НСПД только ячейки без свежей записи.
+
+Ключ записи - (слой, хэш ячейки, хэш параметров запроса):
+    - слой: имя слоя ЕГРН (тип данных)
+    - ячейка: bbox ячейки + геометрия запроса (пересечение ячейки с границей);
+      сетка Fsm_1_2_1 привязана к фиксированной решётке, поэтому ячейки вне
+      изменённого участка границы сохраняют ключ
+    - параметры: категория, URL endpoint, PLUGIN_VERSION + NSPD_CELL_CACHE_VERSION
+
+Запись свежая NSPD_CELL_CACHE_TTL_HOURS часов; устаревшие записи удаляются при
+открытии кэша. Режим refresh (принудительное обновление) игнорирует записи при
+чтении и перезаписывает их ответами сервера.
+
+Объекты хранятся JSON (features ответа API), сжатым zlib - без pickle.
+Кэш не должен ломать загрузку: любая ошибка SQLite отключает его до конца сессии.
+Потокобезопасен: ячейки загружаются из ThreadPoolExecutor.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from Daman_QGIS.constants import (
+    PLUGIN_VERSION, NSPD_CELL_CACHE_FILENAME, NSPD_CELL_CACHE_TTL_HOURS,
+    NSPD_CELL_CACHE_VERSION,
+)
+from Daman_QGIS.utils import log_info, log_warning
+
+
+class Fsm_1_2_1_2_CellCache:
+    """Кэш features ответов НСПД по ячейкам сетки"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cell_responses (
+            layer_key TEXT NOT NULL,
+            cell_hash TEXT NOT NULL,
+            params_hash TEXT NOT NULL,
+            feature_count INTEGER NOT NULL,
+            features BLOB NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (layer_key, cell_hash, params_hash)
+        );
+        CREATE INDEX IF NOT EXISTS idx_cell_responses_fetched
+            ON cell_responses(fetched_at);
+    """
+
+    def __init__(
+        self,
+        cache_path: str,
+        ttl_hours: float = NSPD_CELL_CACHE_TTL_HOURS,
+        refresh: bool = False
+    ):
+        """
+        Args:
+            cache_path: Путь к файлу кэша (создаётся при отсутствии)
+            ttl_hours: Срок свежести записи
+            refresh: Принудительное обновление - get() всегда промах,
+                ответы сервера перезаписывают записи
+        """
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_hours * 3600
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        try:
+            self._conn = sqlite3.connect(cache_path, timeout=10, check_same_thread=False)
+            self._conn.executescript(self._SCHEMA)
+            self._purge_expired()
+        except sqlite3.Error as e:
+            log_warning(f"Fsm_1_2_1_2: Кэш ячеек НСПД недоступен ({cache_path}): {e}")
+            self._disable()
+
+    @classmethod
+    def for_directory(
+        cls,
+        directory: str,
+        refresh: bool = False
+    ) -> Optional['Fsm_1_2_1_2_CellCache']:
+        """Кэш в папке проекта (None если папка не задана)"""
+        if not directory or not os.path.isdir(directory):
+            return None
+        return cls(os.path.join(directory, NSPD_CELL_CACHE_FILENAME), refresh=refresh)
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    @staticmethod
+    def cell_hash(bbox: tuple, geometry_wkt: str) -> str:
+        """
+        Хэш ячейки
+
+        Args:
+            bbox: (xmin, ymin, xmax, ymax) ячейки, градусы
+            geometry_wkt: WKT геометрии запроса (с фиксированной точностью)
+        """
+        bbox_text = ",".join(f"{value:.7f}" for value in bbox)
+        return hashlib.sha256(f"{bbox_text}|{geometry_wkt}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def params_hash(params: Dict[str, Any]) -> str:
+        """Хэш параметров запроса (категория, endpoint) с версией формата кэша"""
+        data = dict(params)
+        data['_version'] = f"{PLUGIN_VERSION}/{NSPD_CELL_CACHE_VERSION}"
+        return hashlib.sha256(
+            json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        ).hexdigest()
+
+    def get(self, layer_key: str, cell_hash: str, params_hash: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Features ячейки из кэша
+
+        Returns:
+            Список features (возможно пустой - в ячейке нет объектов)
+            или None (промах, запись устарела, режим refresh)
+        """
+        with self._lock:
+            if self._conn is None or self.refresh:
+                self.misses += 1
+                return None
+
+            try:
+                row = self._conn.execute(
+                    "SELECT features, fetched_at FROM cell_responses "
+                    "WHERE layer_key = ? AND cell_hash = ? AND params_hash = ?",
+                    (layer_key, cell_hash, params_hash)
+                ).fetchone()
+                if row is None or time.time() - row[1] > self.ttl_seconds:
+                    self.misses += 1
+                    return None
+                features = json.loads(zlib.decompress(row[0]).decode('utf-8'))
+            except (sqlite3.Error, zlib.error, ValueError) as e:
+                log_warning(f"Fsm_1_2_1_2: Ошибка чтения кэша ячеек: {e}")
+                self._close_locked()
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return features
+
+    def put(self, layer_key: str, cell_hash: str, params_hash: str,
+            features: List[Dict[str, Any]]) -> bool:
+        """
+        Сохранение features ячейки (заменяет прежнюю запись)
+
+        Вызывать только для полностью загруженной ячейки: ячейка с пропущенными
+        подъячейками (таймаут, блокировка) в кэш не пишется.
+
+        Returns:
+            True если запись сохранена
+        """
+        try:
+            blob = zlib.compress(json.dumps(features, ensure_ascii=False).encode('utf-8'))
+        except (TypeError, ValueError) as e:
+            log_warning(f"Fsm_1_2_1_2: Ответ ячейки не кэшируется: {e}")
+            return False
+
+        with self._lock:
+            if self._conn is None:
+                return False
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cell_responses "
+                        "(layer_key, cell_hash, params_hash, feature_count, features, fetched_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (layer_key, cell_hash, params_hash, len(features), blob, time.time())
+                    )
+            except sqlite3.Error as e:
+                log_warning(f"Fsm_1_2_1_2: Ошибка записи кэша ячеек: {e}")
+                self._close_locked()
+                return False
+
+            self.stored += 1
+            return True
+
+    def report(self) -> str:
+        """Строка для сводки загрузки"""
+        return f"кэш ячеек НСПД: попаданий {self.hits}, промахов {self.misses}, сохранено {self.stored}"
+
+    def close(self) -> None:
+        """Закрытие соединения (файл кэша остаётся)"""
+        if self.hits or self.misses:
+            log_info(f"Fsm_1_2_1_2: {self.report()}")
+        self._disable()
+
+    def _purge_expired(self) -> None:
+        """Удаление устаревших записей"""
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM cell_responses WHERE fetched_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+        if deleted:
+            log_info(f"Fsm_1_2_1_2: Удалено устаревших записей кэша ячеек: {deleted}")
+
+    def _disable(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_1_2_1_3: Потоковый импорт GeoJSON features НСПД в слой / GeoPackage
+
+Заменяет прежнюю цепочку Fsm_1_2_1._create_layer_from_response:
+    memory-слой из всех features -> _remove_duplicates_by_interaction_id
+    -> M_47.normalize_layer
+где дубли с перекрывающихся ячеек сетки полностью разбирались в QgsGeometry
+до удаления, а нормализация M_47 на memory-слое пропускалась.
+
+Порядок обработки каждого feature:
+    1. Дедупликация по interactionId на уровне JSON (первая запись побеждает)
+    2. Координаты GeoJSON -> WKB напрямую (struct, без QgsPointXY на вершину)
+    3. Кольца полигонов нормализуются по конвенции M_47 (CW + старт с NW,
+       _ring_utils.normalize_ring) при кодировании
+    4. Запись пачками NSPD_INGEST_BATCH_SIZE: в memory-слой или сразу
+       в таблицу GeoPackage (QgsVectorFileWriter) - в памяти одна пачка QgsFeature
+"""
+
+import os
+import struct
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem, QgsFeature, QgsFields, QgsGeometry,
+    QgsProject, QgsVectorFileWriter, QgsVectorLayer, QgsWkbTypes,
+)
+
+from Daman_QGIS.constants import DRIVER_GPKG, NSPD_INGEST_BATCH_SIZE, PROVIDER_OGR
+from Daman_QGIS.managers.geometry import _ring_utils
+from Daman_QGIS.utils import log_info, log_warning
+
+# Коды WKB (ISO, 2D)
+_WKB_TYPES = {
+    "Point": 1,
+    "LineString": 2,
+    "Polygon": 3,
+    "MultiPoint": 4,
+    "MultiLineString": 5,
+    "MultiPolygon": 6,
+}
+
+# Тип слоя: одиночный GeoJSON-тип -> мульти-вариант (если в ответе есть оба)
+_MULTI_OF = {
+    "Point": "MultiPoint",
+    "LineString": "MultiLineString",
+    "Polygon": "MultiPolygon",
+}
+
+_HEADER = struct.Struct('<BI')
+_COUNT = struct.Struct('<I')
+_POINT = struct.Struct('<dd')
+
+
+def _is_position(value: Any) -> bool:
+    """[x, y, ...] - позиция GeoJSON (а не список позиций)"""
+    return bool(value) and isinstance(value[0], (int, float))
+
+
+def _pack_points(points: List[Any]) -> bytes:
+    return _COUNT.pack(len(points)) + b''.join(_POINT.pack(p[0], p[1]) for p in points)
+
+
+def _pack_polygon(rings: List[Any], normalize: bool) -> bytes:
+    parts = [_HEADER.pack(1, 3), _COUNT.pack(len(rings))]
+    for ring in rings:
+        points = [(p[0], p[1]) for p in ring]
+        if normalize:
+            points = _ring_utils.normalize_ring(points)
+        elif points and points[0] != points[-1]:
+            points.append(points[0])
+        parts.append(_pack_points(points))
+    return b''.join(parts)
+
+
+def geojson_to_wkb(geometry: Dict[str, Any], normalize: bool = True) -> Optional[bytes]:
+    """
+    Геометрия GeoJSON -> WKB (little-endian, 2D)
+
+    Допуски как у Fsm_1_2_1.create_geometry: полигон MultiPolygon без уровня
+    колец, линия MultiLineString / MultiPoint из одной позиции. Z/M отбрасываются.
+
+    Args:
+        geometry: {'type': ..., 'coordinates': ...}
+        normalize: Нормализовать кольца полигонов (M_47: CW + NW)
+
+    Returns:
+        WKB или None (неизвестный тип, пустые координаты)
+    """
+    geometry_type = geometry.get("type")
+    coordinates = geometry.get("coordinates")
+    if geometry_type not in _WKB_TYPES or not coordinates:
+        return None
+
+    if geometry_type == "Point":
+        return _HEADER.pack(1, 1) + _POINT.pack(coordinates[0], coordinates[1])
+
+    if geometry_type == "LineString":
+        return _HEADER.pack(1, 2) + _pack_points(coordinates)
+
+    if geometry_type == "Polygon":
+        return _pack_polygon(coordinates, normalize)
+
+    if geometry_type == "MultiPoint":
+        points = [coordinates] if _is_position(coordinates) else coordinates
+        return _HEADER.pack(1, 4) + _COUNT.pack(len(points)) + b''.join(
+            _HEADER.pack(1, 1) + _POINT.pack(p[0], p[1]) for p in points
+        )
+
+    if geometry_type == "MultiLineString":
+        lines = [coordinates] if _is_position(coordinates[0]) else coordinates
+        return _HEADER.pack(1, 5) + _COUNT.pack(len(lines)) + b''.join(
+            _HEADER.pack(1, 2) + _pack_points(line) for line in lines
+        )
+
+    # MultiPolygon
+    polygons = [[polygon] if _is_position(polygon[0]) else polygon for polygon in coordinates if polygon]
+    return _HEADER.pack(1, 6) + _COUNT.pack(len(polygons)) + b''.join(
+        _pack_polygon(polygon, normalize) for polygon in polygons
+    )
+
+
+class Fsm_1_2_1_3_StreamingIngest:
+    """Потоковый импорт features НСПД: дедупликация -> WKB -> пачки в слой"""
+
+    def __init__(
+        self,
+        fields: QgsFields,
+        props_getter: Callable[[Dict[str, Any]], Dict[str, Any]],
+        stringify: bool = False,
+        batch_size: int = NSPD_INGEST_BATCH_SIZE
+    ):
+        """
+        Args:
+            fields: Поля слоя (первое - interactionId)
+            props_getter: properties feature -> плоский словарь атрибутов
+            stringify: Приводить значения атрибутов к строке (слой ОКС)
+            batch_size: Размер пачки записи
+        """
+        self.fields = fields
+        self.props_getter = props_getter
+        self.stringify = stringify
+        self.batch_size = max(1, batch_size)
+        self._field_names = set(fields.names())
+
+        # Статистика
+        self.received = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.written = 0
+        self.seconds = 0.0
+
+    @staticmethod
+    def layer_type(features_data: List[Dict[str, Any]]) -> str:
+        """
+        Тип геометрии слоя по ответу
+
+        Тип первого объекта (как раньше); если в ответе есть и одиночные,
+        и мульти-геометрии того же вида - мульти-тип, иначе мульти-объекты
+        не записываются в GPKG.
+        """
+        first_type = features_data[0].get("geometry", {}).get("type")
+        base_type = first_type if first_type in _WKB_TYPES else "Polygon"
+        multi_type = _MULTI_OF.get(base_type)
+        if multi_type:
+            for feature_data in features_data:
+                if (feature_data.get("geometry") or {}).get("type") == multi_type:
+                    return multi_type
+        return base_type
+
+    def iter_features(self, features_data: Iterable[Dict[str, Any]]) -> Iterator[QgsFeature]:
+        """
+        QgsFeature уникальных объектов (ленивый генератор)
+
+        Объекты без interactionId или без координат пропускаются (как раньше).
+        """
+        seen_ids = set()
+        for feature_data in features_data:
+            self.received += 1
+            properties = feature_data.get("properties") or {}
+            interaction_id = str(properties.get("interactionId", ""))
+            if not interaction_id:
+                self.skipped += 1
+                continue
+            if interaction_id in seen_ids:
+                self.duplicates += 1
+                continue
+
+            geometry_data = feature_data.get("geometry") or {}
+            try:
+                wkb = geojson_to_wkb(geometry_data)
+            except (TypeError, IndexError, KeyError, struct.error) as e:
+                log_warning(f"Fsm_1_2_1_3: Некорректная геометрия {interaction_id}: {e}")
+                wkb = None
+            if not wkb:
+                self.skipped += 1
+                continue
+
+            geometry = QgsGeometry()
+            geometry.fromWkb(wkb)
+            if geometry.isEmpty():
+                self.skipped += 1
+                continue
+            seen_ids.add(interaction_id)
+
+            feature = QgsFeature(self.fields)
+            feature.setGeometry(geometry)
+            feature.setAttribute("interactionId", interaction_id)
+            for key, value in self.props_getter(properties).items():
+                if key not in self._field_names:
+                    continue
+                if value is None:
+                    feature.setAttribute(key, None)
+                elif isinstance(value, list):
+                    feature.setAttribute(key, "; ".join(map(str, value)))
+                else:
+                    feature.setAttribute(key, str(value) if self.stringify else value)
+            yield feature
+
+    def iter_batches(self, features_data: Iterable[Dict[str, Any]]) -> Iterator[List[QgsFeature]]:
+        """Пачки по batch_size объектов"""
+        batch = []
+        for feature in self.iter_features(features_data):
+            batch.append(feature)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def to_memory_layer(self, features_data: List[Dict[str, Any]], layer_name: str) -> QgsVectorLayer:
+        """Memory-слой EPSG:3857 (для потребителей, которым нужен слой в памяти)"""
+        start = time.perf_counter()
+        layer = QgsVectorLayer(f"{self.layer_type(features_data)}?crs=EPSG:3857", layer_name, "memory")
+        provider = layer.dataProvider()
+        provider.addAttributes(self.fields.toList())
+        layer.updateFields()
+
+        for batch in self.iter_batches(features_data):
+            provider.addFeatures(batch)
+            self.written += len(batch)
+
+        layer.updateExtents()
+        self.seconds += time.perf_counter() - start
+        self._log(layer_name)
+        return layer
+
+    def to_geopackage(self, features_data: List[Dict[str, Any]], gpkg_path: str,
+                      table_name: str) -> Optional[QgsVectorLayer]:
+        """
+        Запись сразу в таблицу GeoPackage (таблица пересоздаётся)
+
+        Поле 'fid' из properties НСПД не пишется (конфликт с PK GPKG,
+        см. Fsm_1_2_8.save_to_geopackage).
+
+        Returns:
+            Слой GPKG или None при ошибке записи
+        """
+        start = time.perf_counter()
+        out_fields = QgsFields()
+        for field in self.fields:
+            if field.name() != 'fid':
+                out_fields.append(field)
+
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = DRIVER_GPKG
+        options.layerName = table_name
+        options.actionOnExistingFile = (
+            QgsVectorFileWriter.CreateOrOverwriteLayer if os.path.exists(gpkg_path)
+            else QgsVectorFileWriter.CreateOrOverwriteFile
+        )
+
+        writer = QgsVectorFileWriter.create(
+            gpkg_path,
+            out_fields,
+            QgsWkbTypes.parseType(self.layer_type(features_data)),
+            QgsCoordinateReferenceSystem('EPSG:3857'),
+            QgsProject.instance().transformContext(),
+            options
+        )
+        if writer.hasError() != QgsVectorFileWriter.NoError:
+            log_warning(f"Fsm_1_2_1_3: Не удалось создать таблицу {table_name}: {writer.errorMessage()}")
+            del writer
+            return None
+
+        names = out_fields.names()
+        try:
+            for batch in self.iter_batches(features_data):
+                if out_fields.count() != self.fields.count():
+                    batch = [self._project_feature(feature, out_fields, names) for feature in batch]
+                if not writer.addFeatures(batch):
+                    log_warning(f"Fsm_1_2_1_3: Ошибка записи в {table_name}: {writer.errorMessage()}")
+                    return None
+                self.written += len(batch)
+        finally:
+            del writer  # Закрывает и сбрасывает таблицу на диск
+
+        self.seconds += time.perf_counter() - start
+        self._log(table_name)
+
+        saved_layer = QgsVectorLayer(f"{gpkg_path}|layername={table_name}", table_name, PROVIDER_OGR)
+        if not saved_layer.isValid():
+            log_warning(f"Fsm_1_2_1_3: Не удалось открыть записанную таблицу {table_name}")
+            return None
+        return saved_layer
+
+    def report(self) -> str:
+        """Строка статистики"""
+        return (
+            f"получено {self.received}, записано {self.written}, "
+            f"дублей {self.duplicates}, пропущено {self.skipped}, {self.seconds:.2f} сек"
+        )
+
+    @staticmethod
+    def _project_feature(feature: QgsFeature, out_fields: QgsFields, names: List[str]) -> QgsFeature:
+        projected = QgsFeature(out_fields)
+        projected.setGeometry(feature.geometry())
+        projected.setAttributes([feature[name] for name in names])
+        return projected
+
+    def _log(self, target: str) -> None:
+        log_info(f"Fsm_1_2_1_3: {target}: {self.report()}")
@@ -9,6 +9,8 @@
 """
 
 import json
+import math
+import threading
 from typing import Optional, Dict, Any, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
@@ -18,26 +20,30 @@ import urllib3
 from urllib3.exceptions import InsecureRequestWarning
 
 from qgis.core import (
-    QgsVectorLayer, QgsProject, QgsField, QgsFeature, QgsGeometry,
+    QgsVectorLayer, QgsProject, QgsField, QgsFields, QgsGeometry,
     QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsPointXY,
     QgsRectangle
 )
 from qgis.PyQt.QtCore import QMetaType
 
 from Daman_QGIS.utils import log_info, log_warning, log_error, log_success, normalize_for_classification
-from Daman_QGIS.constants import DEFAULT_REQUEST_TIMEOUT, DEFAULT_MAX_WORKERS, DEFAULT_MAX_RETRIES, DEFAULT_RATE_LIMIT
-from collections import deque
-import threading
+from Daman_QGIS.constants import (
+    DEFAULT_REQUEST_TIMEOUT, DEFAULT_MAX_WORKERS, DEFAULT_MAX_RETRIES,
+    NSPD_AIMD_MIN_CONCURRENCY, NSPD_AIMD_MAX_CONCURRENCY, NSPD_AIMD_DECREASE_FACTOR,
+    NSPD_RETRY_AFTER_MAX_SECONDS
+)
+from .Fsm_1_2_1_1_concurrency_controller import Fsm_1_2_1_1_AIMDController, parse_retry_after
+from .Fsm_1_2_1_3_streaming_ingest import Fsm_1_2_1_3_StreamingIngest
 
 
 def requests_post_with_timeout(url, session=None, **kwargs):
     """
-    Wrapper для requests.post() с ПРИНУДИТЕЛЬНЫМ timeout через threading.
+    Wrapper для requests.post() с таймаутами сокета timeout=(connect, read).
 
-    НА WINDOWS без VPN requests.post() может зависать НАВСЕГДА, игнорируя timeout!
-    Причины: DNS resolve, SSL handshake, Windows socket blocking, антивирус.
-
-    Решение: Запускаем requests.post() в отдельном потоке и УБИВАЕМ поток если зависнет.
+    НА WINDOWS без VPN requests.post() с одним числом timeout мог зависать
+    (psf/requests#5433). Раздельные таймауты сокета ограничивают установку
+    соединения (connect) и каждое ожидание данных от сервера (read) - поток
+    запроса освобождается исключением Timeout, без отдельного потока-сторожа.
 
     Args:
         url: URL для запроса
@@ -45,88 +51,22 @@ def requests_post_with_timeout(url, session=None, **kwargs):
         **kwargs: Параметры для requests.post (json, headers, timeout, verify, etc.)
 
     Returns:
-        Response object или None если timeout
-    """
-    result: Dict[str, Any] = {'response': None, 'exception': None}
+        Response object
 
-    def target():
-        try:
-            # Подавляем warnings о непроверенных SSL сертификатах (как в старой версии)
-            urllib3.disable_warnings(InsecureRequestWarning)
-
-            # Используем session если передан (Connection Pooling), иначе прямой requests.post()
-            if session:
-                result['response'] = session.post(url, **kwargs)
-            else:
-                result['response'] = requests.post(url, **kwargs)
-        except Exception as e:
-            result['exception'] = e
-
-    thread = threading.Thread(target=target, daemon=True)
-    thread.start()
-
-    # Ждём завершения потока с timeout
-    # Если timeout в kwargs, используем его + 5 сек запас
-    # Иначе используем 30 сек по умолчанию
-    timeout_value = kwargs.get('timeout', 30)
-    if isinstance(timeout_value, tuple):
-        # timeout=(connect, read) -> берём сумму + 5 сек запас
-        max_timeout = sum(timeout_value) + 5
-    else:
-        max_timeout = timeout_value + 5
-
-    thread.join(timeout=max_timeout)
-
-    if thread.is_alive():
-        # Поток всё ещё работает = ЗАВИСАНИЕ!
-        log_warning(f"Fsm_1_2_1: TIMEOUT: ПРИНУДИТЕЛЬНЫЙ TIMEOUT requests.post() после {max_timeout} сек!")
-        log_warning(f"Fsm_1_2_1:    URL: {url[:100]}...")
-        log_warning(f"Fsm_1_2_1:    Поток будет убит принудительно (daemon=True)")
-        return None
-
-    if result['exception']:
-        raise result['exception']
-
-    return result['response']
-
-
-class Fsm_1_2_1_RateLimiter:
+    Raises:
+        requests.exceptions.RequestException: Timeout, ConnectionError и т.п.
     """
-    Ограничитель частоты запросов (не более N запросов в секунду)
-
-    Thread-safe реализация для параллельных запросов.
-    Предотвращает 429 ошибки и защищает от временной блокировки IP.
-    """
-    def __init__(self, max_per_second: int = 10):
-        """
-        Args:
-            max_per_second: Максимальное количество запросов в секунду
-        """
-        self.max_per_second = max_per_second
-        self.requests = deque()  # Timestamps последних запросов
-        self.lock = threading.Lock()  # Защита от race conditions в многопоточной среде
+    # По умолчанию 10 сек на connect, 30 сек на read
+    timeout_value = kwargs.setdefault('timeout', (10, 30))
+    if not isinstance(timeout_value, tuple):
+        kwargs['timeout'] = (min(10, timeout_value), timeout_value)
 
-    def wait_if_needed(self):
-        """Ждать если достигнут лимит запросов в секунду"""
-        with self.lock:
-            now = time.time()
+    # Подавляем warnings о непроверенных SSL сертификатах (как в старой версии)
+    urllib3.disable_warnings(InsecureRequestWarning)
 
-            # Удаляем запросы старше 1 секунды
-            while self.requests and self.requests[0] < now - 1:
-                self.requests.popleft()
-
-            # Если достигнут лимит - ждем
-            if len(self.requests) >= self.max_per_second:
-                sleep_time = 1 - (now - self.requests[0])
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                    # Очищаем устаревшие после ожидания
-                    now = time.time()
-                    while self.requests and self.requests[0] < now - 1:
-                        self.requests.popleft()
-
-            # Регистрируем текущий запрос
-            self.requests.append(time.time())
+    # Используем session если передан (Connection Pooling), иначе прямой requests.post()
+    poster = session.post if session else requests.post
+    return poster(url, **kwargs)
 
 
 class Fsm_1_2_1_EgrnLoader:
@@ -146,6 +86,11 @@ class Fsm_1_2_1_EgrnLoader:
         self._api_cache = {}
         # Кэш границ: {(use_500m, use_no_buffer): result}
         self._boundary_cache = {}
+        # Дисковый кэш ответов по ячейкам сетки (Fsm_1_2_1_2, задаётся set_cell_cache)
+        self.cell_cache = None
+        # Сводка ячеек: из кэша / из сети (за всё время жизни загрузчика)
+        self.cell_stats = {'cache': 0, 'network': 0}
+        self._cell_stats_lock = threading.Lock()
         # Счетчики HTTP ошибок для мониторинга
         self._http_error_counts = {
             '401': 0,  # Unauthorized - истекли auth cookies НСПД
@@ -156,9 +101,16 @@ class Fsm_1_2_1_EgrnLoader:
             'other': 0  # Прочие HTTP ошибки
         }
 
-        # ОПТИМИЗАЦИЯ: Rate Limiting для защиты от перегрузки API
-        # Гарантирует не более DEFAULT_RATE_LIMIT запросов в секунду, предотвращает 429 ошибки
-        self.rate_limiter = Fsm_1_2_1_RateLimiter(max_per_second=DEFAULT_RATE_LIMIT)
+        # ОПТИМИЗАЦИЯ: Адаптивная параллельность (AIMD) вместо фиксированного rate limit
+        # Лимит растёт на успешных ответах и падает вдвое на 429/5xx/таймаутах,
+        # Retry-After приостанавливает выдачу слотов. Общий для всех потоков загрузчика.
+        self.concurrency = Fsm_1_2_1_1_AIMDController(
+            initial_limit=DEFAULT_MAX_WORKERS,
+            min_limit=NSPD_AIMD_MIN_CONCURRENCY,
+            max_limit=NSPD_AIMD_MAX_CONCURRENCY,
+            decrease_factor=NSPD_AIMD_DECREASE_FACTOR,
+            max_pause=NSPD_RETRY_AFTER_MAX_SECONDS
+        )
 
         # ОПТИМИЗАЦИЯ: Connection Pooling через requests.Session + HTTPAdapter
         # Keep-alive соединения - меньше SSL handshakes, быстрее повторные запросы
@@ -168,8 +120,8 @@ class Fsm_1_2_1_EgrnLoader:
 
         self.session = requests.Session()
         adapter = HTTPAdapter(
-            pool_connections=5,   # Число одновременных соединений (max_workers в F_1_2)
-            pool_maxsize=10,      # Максимум соединений в пуле
+            pool_connections=5,   # Число пулов (хостов)
+            pool_maxsize=max(10, NSPD_AIMD_MAX_CONCURRENCY),  # Не меньше верхнего лимита AIMD
             max_retries=0         # Retry логика реализована в send_request()
         )
         self.session.mount('https://', adapter)
@@ -202,6 +154,15 @@ class Fsm_1_2_1_EgrnLoader:
         self._api_cache = {}
         self._boundary_cache = {}
 
+    def set_cell_cache(self, cell_cache) -> None:
+        """
+        Подключить дисковый кэш ячеек сетки (Fsm_1_2_1_2_CellCache)
+
+        Ячейки со свежей записью в кэше не запрашиваются у НСПД; полностью
+        загруженные ячейки сохраняются. None - кэш отключён.
+        """
+        self.cell_cache = cell_cache
+
     def log_http_error_stats(self):
         """Вывести статистику HTTP ошибок для мониторинга"""
         total_errors = sum(self._http_error_counts.values())
@@ -451,9 +412,6 @@ class Fsm_1_2_1_EgrnLoader:
                 else:
                     current_timeout = DEFAULT_REQUEST_TIMEOUT
 
-                # Rate Limiting
-                self.rate_limiter.wait_if_needed()
-
                 # Формируем headers для requests
                 headers = {
                     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
@@ -467,27 +425,16 @@ class Fsm_1_2_1_EgrnLoader:
 
                 # Отправляем синхронный POST запрос через requests (thread-safe)
                 # timeout=(connect_timeout, read_timeout) - защита от зависания БЕЗ VPN
-                # ВНИМАНИЕ: На Windows без VPN requests.post() может зависать НЕСМОТРЯ на timeout!
-                # Причины: DNS resolve, SSL handshake, Windows socket blocking, антивирус
-                # Решение: Используем requests_post_with_timeout() wrapper с принудительным timeout
+                # Слот AIMD-контроллера занимается только на время HTTP-запроса
 
                 request_start = time.time()
 
                 try:
-                    response = requests_post_with_timeout(
-                        api_url,
-                        session=self.session,  # Connection Pooling через HTTPAdapter
-                        json=payload,
-                        headers=headers,
-                        timeout=(10, current_timeout),  # 10 сек на connect, current_timeout на read
-                        verify=False  # Отключаем проверку SSL - может помочь при зависании
+                    response = self._post_with_concurrency(
+                        api_url, payload, headers,
+                        timeout=(10, current_timeout)  # 10 сек на connect, current_timeout на read
                     )
 
-                    # Проверяем, что wrapper не вернул None (принудительный timeout)
-                    if response is None:
-                        log_warning(f"Fsm_1_2_1: TIMEOUT: ПРИНУДИТЕЛЬНЫЙ TIMEOUT: requests.post() был убит после зависания")
-                        return None
-
                 except requests.exceptions.Timeout as e:
                     request_elapsed = time.time() - request_start
                     self._http_error_counts['timeout'] += 1
@@ -542,10 +489,16 @@ class Fsm_1_2_1_EgrnLoader:
                 if http_status == 429 and retry_on_429 and attempt < max_retries - 1:
                     self._http_error_counts['429'] += 1
                     next_delay = base_retry_delay * (2 ** attempt) + random.uniform(0, 1)
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
                     # Первый retry — штатное явление под нагрузкой NSPD, INFO.
                     # Со 2-го retry — уже серия, WARNING. Итоговая статистика по слою остаётся WARNING.
                     log_fn = log_info if attempt == 0 else log_warning
-                    log_fn(f"Fsm_1_2_1: МОНИТОРИНГ API: Ошибка 429 (Too Many Requests) - превышен лимит запросов")
+                    log_fn(
+                        f"Fsm_1_2_1: МОНИТОРИНГ API: Ошибка 429 (Too Many Requests) - превышен лимит запросов, "
+                        f"лимит потоков снижен до {self.concurrency.limit}"
+                    )
+                    if retry_after is not None:
+                        log_fn(f"Fsm_1_2_1: Retry-After: {retry_after:.1f} сек (новые запросы приостановлены)")
                     log_fn(f"Fsm_1_2_1: Повторная попытка через {next_delay:.1f} сек (попытка {attempt + 2}/{max_retries})")
                     continue
 
@@ -633,6 +586,45 @@ class Fsm_1_2_1_EgrnLoader:
         log_error(f"Fsm_1_2_1: МОНИТОРИНГ API: Исчерпаны все {max_retries} попытки запроса к API НСПД")
         return None
 
+    def _post_with_concurrency(self, api_url: str, payload: Dict[str, Any],
+                               headers: Dict[str, Any], timeout: Tuple[int, int]):
+        """
+        POST к НСПД в слоте AIMD-контроллера
+
+        Итог запроса корректирует лимит: 200 - рост, 403/429/5xx/таймаут -
+        снижение (Retry-After - пауза), прочее - без изменений.
+        403 от НСПД - блокировка IP за частые запросы, поэтому тоже перегрузка.
+
+        Returns:
+            Response
+
+        Raises:
+            requests.exceptions.RequestException: как requests_post_with_timeout
+        """
+        started = self.concurrency.acquire()
+        outcome = Fsm_1_2_1_1_AIMDController.NEUTRAL
+        retry_after = None
+        try:
+            response = requests_post_with_timeout(
+                api_url,
+                session=self.session,  # Connection Pooling через HTTPAdapter
+                json=payload,
+                headers=headers,
+                timeout=timeout,
+                verify=False  # Отключаем проверку SSL - может помочь при зависании
+            )
+            if response.status_code == 200:
+                outcome = Fsm_1_2_1_1_AIMDController.SUCCESS
+            elif response.status_code in (403, 429) or response.status_code >= 500:
+                outcome = Fsm_1_2_1_1_AIMDController.OVERLOAD
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            return response
+        except requests.exceptions.Timeout:
+            outcome = Fsm_1_2_1_1_AIMDController.OVERLOAD
+            raise
+        finally:
+            self.concurrency.release(started, outcome, retry_after)
+
     def create_geometry(self, geometry_type: str, coordinates: Any) -> Optional[QgsGeometry]:
         """
         Создать QGIS геометрию из GeoJSON координат
@@ -735,7 +727,8 @@ class Fsm_1_2_1_EgrnLoader:
         return grid_geometries
 
     def _load_cell_with_subdivision(self, cell_geometry: QgsGeometry, category_id: int,
-                                    cell_label: str, layer_name: str, max_depth: int = 4, current_depth: int = 0) -> list:
+                                    cell_label: str, layer_name: str, max_depth: int = 4, current_depth: int = 0,
+                                    failures: Optional[list] = None) -> list:
         """
         Загрузить данные для ячейки с автоматическим дроблением при timeout
 
@@ -746,6 +739,8 @@ class Fsm_1_2_1_EgrnLoader:
             layer_name: Имя слоя для получения endpoint из api_manager
             max_depth: Максимальная глубина рекурсивного дробления
             current_depth: Текущая глубина рекурсии
+            failures: Список для меток (под)ячеек, данные которых пропущены
+                (ячейка с пропусками не сохраняется в кэш ячеек)
 
         Returns:
             list: Список features из API
@@ -773,6 +768,8 @@ class Fsm_1_2_1_EgrnLoader:
                     f"сервер перегружен (429: {self._http_error_counts.get('429', 0)}, "
                     f"403: {self._http_error_counts.get('403', 0)})"
                 )
+                if failures is not None:
+                    failures.append(cell_label)
                 return []
 
             # Timeout - пробуем дробление
@@ -782,18 +779,22 @@ class Fsm_1_2_1_EgrnLoader:
                     f"(глубина {current_depth + 1}/{max_depth})"
                 )
                 return self._subdivide_and_load(
-                    cell_geometry, category_id, cell_label, layer_name, max_depth, current_depth
+                    cell_geometry, category_id, cell_label, layer_name, max_depth, current_depth,
+                    failures
                 )
             else:
                 # Достигнута максимальная глубина
                 log_warning(f"Fsm_1_2_1: Ячейка {cell_label}: достигнута максимальная глубина дробления ({max_depth}), данные пропущены")
+                if failures is not None:
+                    failures.append(cell_label)
                 return []
         else:
             # Пустой ответ (нет данных в этой ячейке)
             return []
 
     def _subdivide_and_load(self, cell_geometry: QgsGeometry, category_id: int,
-                            cell_label: str, layer_name: str, max_depth: int, current_depth: int) -> list:
+                            cell_label: str, layer_name: str, max_depth: int, current_depth: int,
+                            failures: Optional[list] = None) -> list:
         """
         Разбить ячейку на 2x2 подъячейки и загрузить данные рекурсивно с дедупликацией
 
@@ -807,6 +808,7 @@ class Fsm_1_2_1_EgrnLoader:
             layer_name: Имя слоя
             max_depth: Максимальная глубина рекурсии
             current_depth: Текущая глубина рекурсии
+            failures: Список для меток пропущенных подъячеек
 
         Returns:
             list: Дедуплицированный список features
@@ -820,7 +822,8 @@ class Fsm_1_2_1_EgrnLoader:
             sub_label = f"{cell_label}.{sub_idx}"
 
             sub_features = self._load_cell_with_subdivision(
-                sub_cell, category_id, sub_label, layer_name, max_depth, current_depth + 1
+                sub_cell, category_id, sub_label, layer_name, max_depth, current_depth + 1,
+                failures
             )
 
             # Дедупликация по interactionId
@@ -855,22 +858,25 @@ class Fsm_1_2_1_EgrnLoader:
         from qgis.PyQt.QtWidgets import QApplication
 
         total_cells = len(grid_geometries)
+        all_features = []
 
-        # Решаем использовать ли параллелизм
-        use_parallel = total_cells > 1
+        # Кэш ячеек: свежие ячейки берём с диска, у НСПД запрашиваем только остальные
+        cache_keys = self._cell_cache_keys(grid_geometries, category_id, layer_name)
+        indexed_geometries = []  # Список (индекс, геометрия) ячеек для загрузки из сети
+        cached_cells = 0
+        for idx, grid_geom in enumerate(grid_geometries, start=1):
+            cached = self.cell_cache.get(*cache_keys[idx - 1]) if cache_keys else None
+            if cached is None:
+                indexed_geometries.append((idx, grid_geom))
+            else:
+                all_features.extend(cached)
+                cached_cells += 1
 
-        if not use_parallel:
-            # Загружаем единственную ячейку последовательно
-            cell_features = self._load_cell_with_subdivision(
-                grid_geometries[0], category_id, "1/1", layer_name
+        if cache_keys:
+            log_info(
+                f"Fsm_1_2_1: {category_name}: ячеек из кэша {cached_cells}, "
+                f"к загрузке из сети {len(indexed_geometries)} (всего {total_cells})"
             )
-            return cell_features if cell_features else []
-
-        # Запуск параллельной загрузки
-        all_features = []
-        completed_count = 0
-        start_time = time.time()
-        cell_timings = []  # Список (cell_idx, время_загрузки)
 
         def load_single_cell(idx_and_geom):
             """Загрузить одну ячейку (для запуска в потоке)"""
@@ -880,23 +886,45 @@ class Fsm_1_2_1_EgrnLoader:
             cell_start = time.time()
 
             # Загружаем ячейку с автоматическим дроблением при timeout
+            failures = []
             cell_features = self._load_cell_with_subdivision(
-                grid_geom, category_id, cell_label, layer_name
+                grid_geom, category_id, cell_label, layer_name, failures=failures
             )
+            cell_features = cell_features if cell_features else []
+
+            # В кэш - только полностью загруженные ячейки (без пропущенных подъячеек)
+            if cache_keys and not failures:
+                self.cell_cache.put(*cache_keys[idx - 1], cell_features)
 
             cell_elapsed = time.time() - cell_start
 
             return {
                 'idx': idx,
-                'features': cell_features if cell_features else [],
+                'features': cell_features,
                 'time': cell_elapsed
             }
 
-        # Создаем список (индекс, геометрия) для параллельной обработки
-        indexed_geometries = list(enumerate(grid_geometries, start=1))
+        # Решаем использовать ли параллелизм
+        use_parallel = len(indexed_geometries) > 1
+
+        if not use_parallel:
+            # Загружаем единственную ячейку последовательно
+            if indexed_geometries:
+                all_features.extend(load_single_cell(indexed_geometries[0])['features'])
+            self._add_cell_stats(cached_cells, len(indexed_geometries))
+            return all_features
+
+        # Запуск параллельной загрузки
+        completed_count = 0
+        start_time = time.time()
+        cell_timings = []  # Список (cell_idx, время_загрузки)
 
         # Запускаем параллельную загрузку
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Верхняя граница AIMD - max_workers endpoint'а: число одновременных
+        # запросов регулирует self.concurrency (растёт на успехах до max_workers)
+        self.concurrency.set_max_limit(max_workers)
+        pool_size = min(len(indexed_geometries), self.concurrency.max_limit)
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
             # Отправляем все задачи
             future_to_idx = {
                 executor.submit(load_single_cell, idx_geom): idx_geom[0]
@@ -935,9 +963,44 @@ class Fsm_1_2_1_EgrnLoader:
 
         # Выводим статистику HTTP ошибок (если были)
         self.log_http_error_stats()
+        self.concurrency.log_stats(category_name)
+        self._add_cell_stats(cached_cells, len(indexed_geometries))
 
         return all_features
 
+    def _cell_cache_keys(self, grid_geometries: list, category_id: int, layer_name: str) -> Optional[list]:
+        """
+        Ключи кэша ячеек (Fsm_1_2_1_2) для списка ячеек
+
+        Returns:
+            list: [(layer_key, cell_hash, params_hash)] по ячейкам или None если кэш отключён
+        """
+        if self.cell_cache is None or not self.cell_cache.enabled:
+            return None
+
+        assert self.api_manager is not None  # Type narrowing для Pylance
+        endpoint = self.api_manager.get_endpoint_by_layer(layer_name) or {}
+        params_hash = self.cell_cache.params_hash({
+            'category_id': category_id,
+            'url_template': endpoint.get('url_template'),
+        })
+
+        keys = []
+        for grid_geom in grid_geometries:
+            bbox = grid_geom.boundingBox()
+            cell_hash = self.cell_cache.cell_hash(
+                (bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum()),
+                grid_geom.asWkt(7)
+            )
+            keys.append((layer_name, cell_hash, params_hash))
+        return keys
+
+    def _add_cell_stats(self, from_cache: int, from_network: int) -> None:
+        """Учесть ячейки в сводке загрузки (потокобезопасно: ОКС грузятся параллельно)"""
+        with self._cell_stats_lock:
+            self.cell_stats['cache'] += from_cache
+            self.cell_stats['network'] += from_network
+
     def _split_geometry_to_grid(self, geometry: QgsGeometry, crs: QgsCoordinateReferenceSystem, layer_name: str) -> list:
         """
         Разбить геометрию на сетку ячеек для батчинга запросов
@@ -979,25 +1042,29 @@ class Fsm_1_2_1_EgrnLoader:
         # Разбиваем на сетку
         bbox = geometry.boundingBox()
 
-        # Вычисляем количество ячеек по каждой оси
-        grid_cells = int((area_km2 / max_area) ** 0.5) + 1
-        log_info(f"Fsm_1_2_1: Разбиение территории на сетку {grid_cells}x{grid_cells} ({grid_cells**2} ячеек) для {layer_name} (split_threshold={max_area} км²)")
-
-        cell_width = bbox.width() / grid_cells
-        cell_height = bbox.height() / grid_cells
+        # Сетка привязана к фиксированной решётке (кратные шагу координаты), а не к bbox
+        # границы: при правке части границы остальные ячейки не сдвигаются и берутся
+        # из кэша ячеек (Fsm_1_2_1_2). Шаг - квадрат split_threshold в EPSG:3857,
+        # в той же проекции, что и расчёт площади выше.
+        cell_width, cell_height = self._grid_cell_size(max_area, bbox, crs)
+        i_first = math.floor(bbox.xMinimum() / cell_width)
+        j_first = math.floor(bbox.yMinimum() / cell_height)
+        columns = max(1, math.ceil(bbox.xMaximum() / cell_width) - i_first)
+        rows = max(1, math.ceil(bbox.yMaximum() / cell_height) - j_first)
+        log_info(f"Fsm_1_2_1: Разбиение территории на сетку {columns}x{rows} ({columns * rows} ячеек) для {layer_name} (split_threshold={max_area} км²)")
 
         grid_geometries = []
         from qgis.PyQt.QtWidgets import QApplication
 
-        total_cells = grid_cells * grid_cells
+        total_cells = columns * rows
         skipped_cells = 0  # Счётчик пропущенных пустых ячеек
         cells_with_data = []  # Список индексов ячеек с данными (для диагностики)
 
-        for i in range(grid_cells):
-            for j in range(grid_cells):
-                # Создаем прямоугольник ячейки
-                x_min = bbox.xMinimum() + i * cell_width
-                y_min = bbox.yMinimum() + j * cell_height
+        for i in range(columns):
+            for j in range(rows):
+                # Создаем прямоугольник ячейки решётки
+                x_min = (i_first + i) * cell_width
+                y_min = (j_first + j) * cell_height
                 x_max = x_min + cell_width
                 y_max = y_min + cell_height
 
@@ -1022,7 +1089,7 @@ class Fsm_1_2_1_EgrnLoader:
                     cells_with_data.append((i, j))
 
                 # Обновляем интерфейс каждые 10 ячеек
-                current = i * grid_cells + j + 1
+                current = i * rows + j + 1
                 if current % 10 == 0:
                     log_info(f"Fsm_1_2_1: Создание сетки: {current}/{total_cells} ячеек (пропущено пустых: {skipped_cells})...")
                     QApplication.processEvents()
@@ -1032,11 +1099,34 @@ class Fsm_1_2_1_EgrnLoader:
 
         return grid_geometries
 
+    @staticmethod
+    def _grid_cell_size(max_area: float, bbox: QgsRectangle,
+                        crs: QgsCoordinateReferenceSystem) -> Tuple[float, float]:
+        """
+        Шаг решётки ячеек (ширина, высота) в единицах crs
+
+        Ячейка - квадрат площадью max_area км² в EPSG:3857. Для географической CRS
+        широта центра округляется до градуса, чтобы небольшая правка границы не
+        меняла шаг решётки.
+        """
+        side_m = math.sqrt(max_area) * 1000
+        if not crs.isGeographic():
+            return side_m, side_m
+
+        # Метры EPSG:3857 -> градусы: по долготе постоянный масштаб,
+        # по широте сжатие cos(широты)
+        width = side_m / 111319.49
+        center_lat = round(bbox.center().y())
+        height = width * math.cos(math.radians(center_lat))
+        return round(width, 9), round(height, 9)
+
     def load_layer(
         self,
         layer_name: str,
         geometry_provider,
-        progress_task = None
+        progress_task = None,
+        gpkg_path: Optional[str] = None,
+        table_name: Optional[str] = None
     ) -> Tuple[Optional[QgsVectorLayer], int]:
         """
         Загрузить слой из API NSPD с автоматическим батчингом для больших территорий
@@ -1045,6 +1135,9 @@ class Fsm_1_2_1_EgrnLoader:
             layer_name: Имя слоя для получения ВСЕХ параметров из api_manager
             geometry_provider: Функция для получения геометрии запроса
             progress_task: ProgressTask для обновления прогресса
+            gpkg_path: GeoPackage проекта - писать сразу в таблицу table_name
+                (слой возвращается из GPKG, memory-слой не создаётся)
+            table_name: Имя таблицы в gpkg_path
 
         Returns:
             tuple: (слой, количество объектов) или (None, 0)
@@ -1151,7 +1244,7 @@ class Fsm_1_2_1_EgrnLoader:
                     return None, 0
                 else:
                     # Успех - возвращаем результат
-                    return self._create_layer_from_response(response, category_name)
+                    return self._create_layer_from_response(response, category_name, gpkg_path, table_name)
 
             # Если дошли сюда - все 3 уровня timeout, используем последнюю сетку
             if not grid_geometries:
@@ -1183,7 +1276,7 @@ class Fsm_1_2_1_EgrnLoader:
 
         # Создаём слой из всех собранных features
         combined_response = {"features": all_features}
-        return self._create_layer_from_response(combined_response, category_name)
+        return self._create_layer_from_response(combined_response, category_name, gpkg_path, table_name)
 
     def load_layer_by_endpoint(
         self,
@@ -1306,43 +1399,36 @@ class Fsm_1_2_1_EgrnLoader:
     def _create_layer_from_response(
         self,
         response: Dict[str, Any],
-        layer_name: str
+        layer_name: str,
+        gpkg_path: Optional[str] = None,
+        table_name: Optional[str] = None
     ) -> Tuple[Optional[QgsVectorLayer], int]:
         """
         Создать векторный слой из ответа API
 
+        Потоковый импорт Fsm_1_2_1_3: дубли по interactionId (перекрытие ячеек
+        сетки) отбрасываются до разбора геометрии, координаты кодируются в WKB
+        с нормализацией M_47 (CW + NW), запись - пачками.
+
         Args:
             response: Ответ API с features
             layer_name: Имя создаваемого слоя
+            gpkg_path: GeoPackage проекта - писать сразу в таблицу table_name
+                (без промежуточного memory-слоя)
+            table_name: Имя таблицы в gpkg_path
 
         Returns:
-            tuple: (слой, количество объектов)
+            tuple: (слой, количество уникальных объектов)
         """
         try:
             features_data = response["features"]
             if not features_data:
                 return None, 0
 
-            # Определяем тип геометрии
-            first_feature = features_data[0]
-            geometry_type_str = first_feature["geometry"]["type"]
-            
-            layer_type = {
-                "Polygon": "Polygon",
-                "MultiPolygon": "MultiPolygon",
-                "LineString": "LineString",
-                "MultiLineString": "MultiLineString",
-                "Point": "Point",
-                "MultiPoint": "MultiPoint",
-            }.get(geometry_type_str, "Polygon")
-
-            # Создаём временный слой
-            layer = QgsVectorLayer(f"{layer_type}?crs=EPSG:3857", layer_name, "memory")
-            provider = layer.dataProvider()
-
             # Создаём поля на основе первого объекта (options-wrapped или flat)
-            attributes = [QgsField("interactionId", QMetaType.Type.QString)]
-            first_props = self._extract_feature_props(first_feature["properties"])
+            fields = QgsFields()
+            fields.append(QgsField("interactionId", QMetaType.Type.QString))
+            first_props = self._extract_feature_props(features_data[0]["properties"])
             if first_props:
                 for key, value in first_props.items():
                     field_type = QMetaType.Type.QString
@@ -1350,117 +1436,37 @@ class Fsm_1_2_1_EgrnLoader:
                         field_type = QMetaType.Type.LongLong
                     elif isinstance(value, float):
                         field_type = QMetaType.Type.Double
-                    attributes.append(QgsField(key, field_type))
-
-            provider.addAttributes(attributes)
-            layer.updateFields()
-
-            # Получаем список полей для проверки при установке атрибутов
-            field_names = [field.name() for field in layer.fields()]
+                    fields.append(QgsField(key, field_type))
 
-            # Добавляем все объекты одним вызовом для синхронного появления на карте
-            layer.startEditing()
-            features_to_add = []
-
-            for idx, feature_data in enumerate(features_data, start=1):
-                interaction_id = str(feature_data["properties"].get("interactionId", ""))
-                if not interaction_id:
-                    continue
-
-                geometry_data = feature_data.get("geometry", {})
-                if not geometry_data or not geometry_data.get("coordinates"):
-                    continue
-
-                geometry = self.create_geometry(geometry_data["type"], geometry_data["coordinates"])
-                if not geometry or geometry.isEmpty():
-                    continue
-
-                new_feature = QgsFeature(layer.fields())
-                new_feature.setGeometry(geometry)
-                new_feature.setAttribute("interactionId", interaction_id)
-
-                props = self._extract_feature_props(feature_data["properties"])
-                for key, value in props.items():
-                    if key in field_names:
-                        if value is None:
-                            new_feature.setAttribute(key, None)
-                        elif isinstance(value, list):
-                            new_feature.setAttribute(key, "; ".join(map(str, value)))
-                        else:
-                            new_feature.setAttribute(key, value)
-
-                features_to_add.append(new_feature)
-
-            # Добавляем все объекты одним вызовом
-            if features_to_add:
-                provider.addFeatures(features_to_add)
-
-            layer.commitChanges()
-            layer.updateExtents()
-
-            # Удаляем дубликаты по interactionId (возникают при фрагментированной загрузке)
-            duplicates_removed = self._remove_duplicates_by_interaction_id(layer)
-
-            # M_47 нормализация (CW+NW) NSPD-полигонов post-commit + post-dedup (финальное состояние).
-            # Level-map FIX-OPT-1: F_1_2 layer-level, слой closed после commit → M_47 startEditing сам.
-            # commit-guard на случай edit-сессии от dedup. Non-polygon/memory M_47 пропускает.
-            from Daman_QGIS.managers.geometry import PolygonNormalizationManager
-            if layer.isEditable():
-                layer.commitChanges()
-            PolygonNormalizationManager.normalize_layer(layer)
-
-            return layer, len(features_to_add)
+            ingest = Fsm_1_2_1_3_StreamingIngest(fields, self._extract_feature_props)
+            return self._ingest_features(ingest, features_data, layer_name, gpkg_path, table_name)
 
         except Exception as e:
             log_error(f"Fsm_1_2_1: Ошибка создания слоя из ответа API: {str(e)}")
             return None, 0
 
-    def _remove_duplicates_by_interaction_id(self, layer: QgsVectorLayer) -> int:
-        """
-        Удаление дублей по interactionId из слоя
-
-        Дубли появляются при загрузке по фрагментам через API NSPD.
-        Крупные объекты попадают в несколько фрагментов, создавая дубли.
-        Оставляет только первую найденную запись для каждого уникального interactionId.
-
-        Args:
-            layer: Слой для дедупликации
-
-        Returns:
-            int: Количество удалённых дублей
-        """
-        # Проверяем наличие поля interactionId
-        if layer.fields().indexOf('interactionId') == -1:
-            # Если поля нет - это нормально для некоторых слоев (например, АТД)
-            return 0
-
-        # Собираем уникальные interactionId и ID дублей
-        seen_interaction_ids = set()
-        duplicate_ids = []
-
-        for feature in layer.getFeatures():
-            interaction_id = feature['interactionId']
-
-            if not interaction_id or interaction_id == '' or interaction_id == '-':
-                continue
-
-            if interaction_id in seen_interaction_ids:
-                # Это дубль - добавляем ID для удаления
-                duplicate_ids.append(feature.id())
-            else:
-                # Первая встреча этого interactionId
-                seen_interaction_ids.add(interaction_id)
-
-        # Удаляем дубли
-        if duplicate_ids:
-            layer.startEditing()
-            layer.deleteFeatures(duplicate_ids)
-            layer.commitChanges()
-
-            log_info(f"Fsm_1_2_1: Удалено дублей из {layer.name()}: {len(duplicate_ids)} (уникальных объектов: {len(seen_interaction_ids)})")
-            return len(duplicate_ids)
+    @staticmethod
+    def _ingest_features(
+        ingest: Fsm_1_2_1_3_StreamingIngest,
+        features_data: list,
+        layer_name: str,
+        gpkg_path: Optional[str] = None,
+        table_name: Optional[str] = None
+    ) -> Tuple[Optional[QgsVectorLayer], int]:
+        """Запись features в таблицу GPKG (если задана) или в memory-слой"""
+        if gpkg_path and table_name:
+            layer = ingest.to_geopackage(features_data, gpkg_path, table_name)
         else:
-            return 0
+            layer = ingest.to_memory_layer(features_data, layer_name)
+
+        if ingest.duplicates:
+            log_info(
+                f"Fsm_1_2_1: Отброшено дублей {layer_name}: {ingest.duplicates} "
+                f"(уникальных объектов: {ingest.written})"
+            )
+        if layer is None or ingest.written == 0:
+            return None, 0
+        return layer, ingest.written
 
     def _classify_by_database(self, props: dict) -> Optional[str]:
         """
@@ -1823,7 +1829,9 @@ class Fsm_1_2_1_EgrnLoader:
 
         return features
 
-    def load_oks_combined(self, layer_name: str, geometry_provider, progress_task = None) -> Tuple[Optional[QgsVectorLayer], int]:
+    def load_oks_combined(self, layer_name: str, geometry_provider, progress_task = None,
+                          gpkg_path: Optional[str] = None,
+                          table_name: Optional[str] = None) -> Tuple[Optional[QgsVectorLayer], int]:
         """
         Загрузить все типы ОКС (Здание, Сооружения, ОНС) в один слой L_1_2_4_WFS_ОКС
 
@@ -1833,6 +1841,8 @@ class Fsm_1_2_1_EgrnLoader:
             layer_name: Имя слоя для получения endpoint из api_manager
             geometry_provider: Функция для получения геометрии запроса
             progress_task: ProgressTask для обновления прогресса
+            gpkg_path: GeoPackage проекта - писать сразу в таблицу table_name
+            table_name: Имя таблицы в gpkg_path
 
         Returns:
             tuple: (слой, количество объектов) или (None, 0)
@@ -2039,84 +2049,13 @@ class Fsm_1_2_1_EgrnLoader:
 
         log_info(f"Fsm_1_2_1: Всего объектов ОКС: {len(all_features)}")
 
-        # Создаём слой с объединёнными полями
-        # Определяем тип геометрии из первого feature
-        first_feature = all_features[0]
-        geometry_type_str = first_feature["geometry"]["type"]
-
-        layer_type_map = {
-            "Polygon": "Polygon",
-            "MultiPolygon": "MultiPolygon",
-            "LineString": "LineString",
-            "MultiLineString": "MultiLineString",
-            "Point": "Point",
-            "MultiPoint": "MultiPoint",
-        }
-        layer_geom_type = layer_type_map.get(geometry_type_str, "Polygon")
-
-        # Создаём временный слой
-        layer = QgsVectorLayer(f"{layer_geom_type}?crs=EPSG:3857", "L_1_2_4_WFS_ОКС", "memory")
-        provider = layer.dataProvider()
-
-        # Добавляем все собранные поля (включая oks_type)
-        attributes = [QgsField("interactionId", QMetaType.Type.QString)]
-        attributes.extend(all_fields.values())
-
-        provider.addAttributes(attributes)
-        layer.updateFields()
+        # Создаём слой с объединёнными полями (включая oks_type), атрибуты - строками
+        fields = QgsFields()
+        fields.append(QgsField("interactionId", QMetaType.Type.QString))
+        for field in all_fields.values():
+            fields.append(field)
 
-        # Получаем список полей для проверки при установке атрибутов
-        field_names = [field.name() for field in layer.fields()]
-
-        # Добавляем объекты
-        layer.startEditing()
-        features_to_add = []
-
-        for feature_data in all_features:
-            interaction_id = str(feature_data["properties"].get("interactionId", ""))
-            if not interaction_id:
-                continue
-
-            geometry_data = feature_data.get("geometry", {})
-            if not geometry_data or not geometry_data.get("coordinates"):
-                continue
-
-            geometry = self.create_geometry(geometry_data["type"], geometry_data["coordinates"])
-            if not geometry or geometry.isEmpty():
-                continue
-
-            new_feature = QgsFeature(layer.fields())
-            new_feature.setGeometry(geometry)
-            new_feature.setAttribute("interactionId", interaction_id)
-
-            props = feature_data["properties"].get("options", {})
-            for key, value in props.items():
-                if key in field_names:
-                    if value is None:
-                        new_feature.setAttribute(key, None)
-                    elif isinstance(value, list):
-                        new_feature.setAttribute(key, "; ".join(map(str, value)))
-                    else:
-                        # Всегда конвертируем в строку (QString)
-                        new_feature.setAttribute(key, str(value))
-
-            features_to_add.append(new_feature)
-
-        # Добавляем все объекты одним вызовом
-        if features_to_add:
-            provider.addFeatures(features_to_add)
-
-        layer.commitChanges()
-        layer.updateExtents()
-
-        # Удаляем дубликаты по interactionId (возникают при фрагментированной загрузке)
-        duplicates_removed = self._remove_duplicates_by_interaction_id(layer)
-
-        # M_47 нормализация (CW+NW) NSPD-полигонов post-commit + post-dedup (path 2 _load_fragments).
-        # Level-map FIX-OPT-1: F_1_2 layer-level, слой closed после commit → M_47 startEditing сам.
-        from Daman_QGIS.managers.geometry import PolygonNormalizationManager
-        if layer.isEditable():
-            layer.commitChanges()
-        PolygonNormalizationManager.normalize_layer(layer)
-
-        return layer, len(features_to_add)
+        ingest = Fsm_1_2_1_3_StreamingIngest(
+            fields, lambda properties: properties.get("options", {}), stringify=True
+        )
+        return self._ingest_features(ingest, all_features, "L_1_2_4_WFS_ОКС", gpkg_path, table_name)
@@ -176,9 +176,8 @@ class Fsm_1_2_3_QuickOSMLoader:
 
         Raises:
             Exception: При ошибках Overpass (timeout, memory, rate limit), отказе
-                       pre-flight health check (сервер перегружен), или принудительном
-                       таймауте через requests_post_with_timeout (Windows SSL hang,
-                       psf/requests#5433)
+                       pre-flight health check (сервер перегружен), или таймауте
+                       сокета requests_post_with_timeout (psf/requests#5433)
         """
         from Daman_QGIS.constants import PLUGIN_VERSION
         from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_egrn_loader import requests_post_with_timeout
@@ -206,24 +205,20 @@ class Fsm_1_2_3_QuickOSMLoader:
             timeout=5,
             headers=headers
         )
-        if health_response is None or health_response.status_code >= 400:
+        if health_response.status_code >= 400:
             # Сервер не ответил за 5 сек или вернул ошибку — считаем перегруженным.
             # Сообщение содержит "timeout" — auto-switch caller сработает.
             raise Exception(f"Overpass health check timeout (5s) на {server_url}")
 
-        # Threading wrapper защищает от Windows SSL hang в requests.post()
-        # (psf/requests#5433): на Windows DNS/SSL handshake может зависнуть навсегда,
-        # игнорируя HTTP timeout. Wrapper убивает зависший поток принудительно.
+        # Wrapper защищает от Windows hang в requests.post() (psf/requests#5433):
+        # таймауты сокета (connect, read). Timeout содержит "timeout" в
+        # сообщении — auto-switch на следующий сервер сработает.
         response = requests_post_with_timeout(
             interpreter_url,
             data={'data': query},
             timeout=timeout,
             headers=headers
         )
-        if response is None:
-            # Wrapper вернул None = поток убит после max_timeout (timeout + 5 сек).
-            # Сообщение содержит "timeout" — auto-switch на следующий сервер сработает.
-            raise Exception(f"Overpass принудительный timeout (Windows SSL hang) на {server_url}")
         response.raise_for_status()
 
         # ВАЖНО: используем response.content (bytes), а не response.text
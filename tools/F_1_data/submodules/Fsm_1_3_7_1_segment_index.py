@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_1_3_7_1: Индексированный подсчёт пересечений линий (сегменты + сетка + NumPy)
+
+Заменяет попарный перебор линий в Fsm_1_3_7 (O(линии^2) вызовов GEOS):
+1. Линии разбиваются на сегменты (WKB -> массивы NumPy)
+2. Кандидатные пары сегментов - через равномерную сетку по bbox сегментов
+3. Для пар кандидатов векторно считаются ориентации (orient2d):
+   - чистое пересечение (строго по разные стороны) - точка считается в NumPy
+   - вырожденный случай (касание, вершина на сегменте, наложение) - пара
+     линий целиком отдаётся точному подсчёту GEOS (exact_count вызывающего)
+4. Точки пересечения пары линий считаются без повторов (как MultiPoint GEOS)
+
+Так счёт совпадает с прежним алгоритмом: GEOS считает только вырожденные
+пары линий (стыки дорог, общие вершины), остальные - NumPy.
+"""
+
+import struct
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from qgis.core import QgsGeometry
+
+# Относительный допуск вырожденности (от модуля координат): 1e6 м -> 1e-6 м
+_RELATIVE_TOLERANCE = 1e-12
+
+# Максимум ячеек сетки по оси (ограничивает память при длинных сегментах)
+_MAX_GRID_CELLS = 4096
+
+# Сегменты длиннее стольких ячеек не регистрируются в сетке, а сравниваются
+# по bbox со всеми сегментами (редкие длинные сегменты без лишней памяти)
+_MAX_CELLS_PER_SEGMENT = 256
+
+# Пары сегментов обрабатываются порциями (память NumPy)
+_PAIR_CHUNK = 1_000_000
+
+_WKB_LINESTRING = 2
+
+
+def _line_coordinates(geom: QgsGeometry) -> List[np.ndarray]:
+    """Массивы вершин (n, 2) частей линии"""
+    wkb = bytes(geom.asWkb())
+    if len(wkb) >= 9:
+        byte_order = '<' if wkb[0] == 1 else '>'
+        wkb_type, count = struct.unpack_from(f'{byte_order}II', wkb, 1)
+        if wkb_type == _WKB_LINESTRING and len(wkb) == 9 + 16 * count:
+            coords = np.frombuffer(wkb, dtype=f'{byte_order}f8', count=2 * count, offset=9)
+            return [coords.reshape(-1, 2).astype(np.float64)]
+
+    parts = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+    return [np.array([(p.x(), p.y()) for p in part], dtype=np.float64) for part in parts if part]
+
+
+class Fsm_1_3_7_1_SegmentIntersectionIndex:
+    """
+    Подсчёт точек пересечения между линиями двух наборов (или внутри одного)
+
+    Самопересечения отдельной линии НЕ входят (их считает Fsm_1_3_7).
+    """
+
+    def __init__(
+        self,
+        geometries_a: List[QgsGeometry],
+        geometries_b: Optional[List[QgsGeometry]] = None
+    ) -> None:
+        """
+        Args:
+            geometries_a: Первый набор линий
+            geometries_b: Второй набор (None - пары внутри geometries_a)
+        """
+        self.same_set = geometries_b is None
+        self.line_count_a = len(geometries_a)
+
+        geometries = list(geometries_a) if self.same_set else list(geometries_a) + list(geometries_b)
+        self._build_segments(geometries)
+
+        # Статистика
+        self.candidate_pairs = 0
+        self.proper_points = 0
+        self.exact_line_pairs = 0
+
+    # ------------------------------------------------------------------
+    # Сегменты
+    # ------------------------------------------------------------------
+
+    def _build_segments(self, geometries: List[QgsGeometry]) -> None:
+        starts, ends, line_ids = [], [], []
+        for line_id, geom in enumerate(geometries):
+            if geom is None or geom.isEmpty():
+                continue
+            for coords in _line_coordinates(geom):
+                if len(coords) < 2:
+                    continue
+                starts.append(coords[:-1])
+                ends.append(coords[1:])
+                line_ids.append(np.full(len(coords) - 1, line_id, dtype=np.int64))
+
+        if starts:
+            start = np.concatenate(starts)
+            end = np.concatenate(ends)
+            self.line = np.concatenate(line_ids)
+        else:
+            start = end = np.empty((0, 2))
+            self.line = np.empty(0, dtype=np.int64)
+
+        self.x1, self.y1 = start[:, 0], start[:, 1]
+        self.x2, self.y2 = end[:, 0], end[:, 1]
+        self.min_x = np.minimum(self.x1, self.x2)
+        self.max_x = np.maximum(self.x1, self.x2)
+        self.min_y = np.minimum(self.y1, self.y2)
+        self.max_y = np.maximum(self.y1, self.y2)
+
+        magnitude = float(np.abs(start).max()) if len(start) else 1.0
+        self.tolerance = _RELATIVE_TOLERANCE * max(magnitude, 1.0)
+
+    def _in_set_b(self, line: np.ndarray) -> np.ndarray:
+        return line >= self.line_count_a
+
+    # ------------------------------------------------------------------
+    # Кандидатные пары (равномерная сетка)
+    # ------------------------------------------------------------------
+
+    def _candidate_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Пары сегментов разных линий (разных наборов) с общей ячейкой сетки"""
+        count = len(self.line)
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        if count < 2:
+            return empty
+
+        tol = self.tolerance
+        origin_x, origin_y = self.min_x.min() - tol, self.min_y.min() - tol
+        extent = max(self.max_x.max() - origin_x, self.max_y.max() - origin_y) + tol
+        seg_size = np.maximum(self.max_x - self.min_x, self.max_y - self.min_y)
+        cell = max(float(np.median(seg_size)) * 2.0, extent / _MAX_GRID_CELLS, tol * 10)
+
+        cx0 = np.floor((self.min_x - tol - origin_x) / cell).astype(np.int64)
+        cx1 = np.floor((self.max_x + tol - origin_x) / cell).astype(np.int64)
+        cy0 = np.floor((self.min_y - tol - origin_y) / cell).astype(np.int64)
+        cy1 = np.floor((self.max_y + tol - origin_y) / cell).astype(np.int64)
+        width = int(cx1.max()) + 2
+
+        # Регистрация сегмента во всех ячейках его bbox
+        span_x = cx1 - cx0 + 1
+        cells_per_seg = span_x * (cy1 - cy0 + 1)
+        long_segments = np.flatnonzero(cells_per_seg > _MAX_CELLS_PER_SEGMENT)
+        cells_per_seg[long_segments] = 0
+        seg_rep = np.repeat(np.arange(count, dtype=np.int64), cells_per_seg)
+        offset = np.arange(len(seg_rep), dtype=np.int64) - np.repeat(np.cumsum(cells_per_seg) - cells_per_seg, cells_per_seg)
+        rep_span = span_x[seg_rep]
+        cell_key = (cy0[seg_rep] + offset // rep_span) * width + cx0[seg_rep] + offset % rep_span
+
+        order = np.argsort(cell_key, kind='stable')
+        cell_key = cell_key[order]
+        seg_sorted = seg_rep[order]
+
+        # Ранг внутри ячейки и размер ячейки
+        boundary = np.flatnonzero(np.diff(cell_key)) + 1
+        group_start = np.concatenate(([0], boundary))
+        group_size = np.diff(np.concatenate((group_start, [len(cell_key)])))
+        position = np.arange(len(cell_key), dtype=np.int64)
+        rank = position - np.repeat(group_start, group_size)
+        size = np.repeat(group_size, group_size)
+
+        pair_keys = []
+        active = np.flatnonzero(size > 1)
+        step = 1
+        while active.size:
+            active = active[rank[active] + step < size[active]]
+            if not active.size:
+                break
+            pair_keys.append(self._pair_keys(seg_sorted[active], seg_sorted[active + step]))
+            step += 1
+
+        # Длинные сегменты - прямой bbox-тест со всеми сегментами
+        for seg in long_segments.tolist():
+            near = np.flatnonzero(
+                (self.min_x <= self.max_x[seg] + tol) & (self.max_x >= self.min_x[seg] - tol) &
+                (self.min_y <= self.max_y[seg] + tol) & (self.max_y >= self.min_y[seg] - tol)
+            )
+            pair_keys.append(self._pair_keys(np.full(len(near), seg, dtype=np.int64), near))
+
+        if not pair_keys:
+            return empty
+        keys = np.unique(np.concatenate(pair_keys))
+        return keys // count, keys % count
+
+    def _pair_keys(self, seg_i: np.ndarray, seg_j: np.ndarray) -> np.ndarray:
+        """Ключи неупорядоченных пар сегментов разных линий (разных наборов)"""
+        line_i, line_j = self.line[seg_i], self.line[seg_j]
+        if self.same_set:
+            keep = line_i != line_j
+        else:
+            keep = self._in_set_b(line_i) != self._in_set_b(line_j)
+        seg_i, seg_j = seg_i[keep], seg_j[keep]
+        count = len(self.line)
+        return np.minimum(seg_i, seg_j) * count + np.maximum(seg_i, seg_j)
+
+    # ------------------------------------------------------------------
+    # Подсчёт
+    # ------------------------------------------------------------------
+
+    def count(self, exact_count: Callable[[int, int], int]) -> int:
+        """
+        Количество точек пересечения между линиями
+
+        Args:
+            exact_count: Точный подсчёт (GEOS) для пары линий (индекс в geometries_a,
+                индекс в geometries_b или geometries_a) - вызывается для пар
+                с вырожденным контактом сегментов
+
+        Returns:
+            Количество точек пересечения (без самопересечений)
+        """
+        seg_i, seg_j = self._candidate_pairs()
+        self.candidate_pairs = len(seg_i)
+
+        line_total = int(self.line.max()) + 1 if len(self.line) else 1
+        proper_keys, proper_points, exact_keys = [], [], []
+        for start in range(0, len(seg_i), _PAIR_CHUNK):
+            keys, points, degenerate = self._classify(seg_i[start:start + _PAIR_CHUNK],
+                                                      seg_j[start:start + _PAIR_CHUNK], line_total)
+            proper_keys.append(keys)
+            proper_points.append(points)
+            exact_keys.append(degenerate)
+
+        exact = np.unique(np.concatenate(exact_keys)) if exact_keys else np.empty(0, dtype=np.int64)
+        total = 0
+        if proper_keys:
+            keys = np.concatenate(proper_keys)
+            points = np.concatenate(proper_points)
+            keep = ~np.isin(keys, exact)
+            if keep.any():
+                # Одна точка пары линий считается один раз (как MultiPoint GEOS)
+                grid = self.tolerance * 10
+                rows = np.column_stack((keys[keep], np.round(points[keep] / grid).astype(np.int64)))
+                total += len(np.unique(rows, axis=0))
+        self.proper_points = total
+
+        self.exact_line_pairs = len(exact)
+        for key in exact.tolist():
+            line_i, line_j = divmod(key, line_total)
+            if not self.same_set:
+                line_j -= self.line_count_a
+            total += exact_count(line_i, line_j)
+
+        return total
+
+    def _classify(
+        self,
+        seg_i: np.ndarray,
+        seg_j: np.ndarray,
+        line_total: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Классификация пар сегментов
+
+        Returns:
+            (ключи пар линий с чистым пересечением, точки (n, 2),
+             ключи пар линий с вырожденным контактом)
+        """
+        tol = self.tolerance
+
+        # Пара линий упорядочена: (A, B) для двух наборов, (min, max) для одного
+        line_i, line_j = self.line[seg_i], self.line[seg_j]
+        swap = line_i > line_j
+        seg_i, seg_j = np.where(swap, seg_j, seg_i), np.where(swap, seg_i, seg_j)
+        line_key = np.minimum(line_i, line_j) * line_total + np.maximum(line_i, line_j)
+
+        overlap = (
+            (self.min_x[seg_i] <= self.max_x[seg_j] + tol) & (self.min_x[seg_j] <= self.max_x[seg_i] + tol) &
+            (self.min_y[seg_i] <= self.max_y[seg_j] + tol) & (self.min_y[seg_j] <= self.max_y[seg_i] + tol)
+        )
+        seg_i, seg_j, line_key = seg_i[overlap], seg_j[overlap], line_key[overlap]
+
+        ax1, ay1, ax2, ay2 = self.x1[seg_i], self.y1[seg_i], self.x2[seg_i], self.y2[seg_i]
+        bx1, by1, bx2, by2 = self.x1[seg_j], self.y1[seg_j], self.x2[seg_j], self.y2[seg_j]
+        adx, ady = ax2 - ax1, ay2 - ay1
+        bdx, bdy = bx2 - bx1, by2 - by1
+        len_a = np.maximum(np.hypot(adx, ady), tol)
+        len_b = np.maximum(np.hypot(bdx, bdy), tol)
+
+        # Расстояния концов одного сегмента до прямой другого (со знаком)
+        o1 = (adx * (by1 - ay1) - ady * (bx1 - ax1)) / len_a
+        o2 = (adx * (by2 - ay1) - ady * (bx2 - ax1)) / len_a
+        o3 = (bdx * (ay1 - by1) - bdy * (ax1 - bx1)) / len_b
+        o4 = (bdx * (ay2 - by1) - bdy * (ax2 - bx1)) / len_b
+
+        def side(value: np.ndarray) -> np.ndarray:
+            return np.where(value > tol, 1, np.where(value < -tol, -1, 0))
+
+        s1, s2, s3, s4 = side(o1), side(o2), side(o3), side(o4)
+        disjoint = (s1 * s2 > 0) | (s3 * s4 > 0)
+        proper = (s1 * s2 < 0) & (s3 * s4 < 0)
+        degenerate = ~disjoint & ~proper
+
+        t = o3[proper] / (o3[proper] - o4[proper])
+        points = np.column_stack((ax1[proper] + t * adx[proper], ay1[proper] + t * ady[proper]))
+        return line_key[proper], points, line_key[degenerate]
+
+    def report(self) -> Dict[str, int]:
+        """Статистика последнего подсчёта"""
+        return {
+            'segments': len(self.line),
+            'candidate_pairs': self.candidate_pairs,
+            'proper_points': self.proper_points,
+            'exact_line_pairs': self.exact_line_pairs,
+        }
@@ -280,6 +280,10 @@ class Fsm_1_3_7_IntersectionsCalculator:
         Если линия A пересекает линию B в 2-х местах - это 2 пересечения.
         Самопересечения одной линии также считаются.
 
+        Пары линий ищутся индексом сегментов (Fsm_1_3_7_1, NumPy); без NumPy -
+        QgsSpatialIndex по bbox линий. В обоих случаях GEOS вызывается только
+        для кандидатов, счёт совпадает с попарным перебором.
+
         Args:
             geometries_a: Первый набор линий
             geometries_b: Второй набор линий
@@ -292,21 +296,7 @@ class Fsm_1_3_7_IntersectionsCalculator:
         try:
             same_set = (geometries_a is geometries_b)
 
-            for i, geom_a in enumerate(geometries_a):
-                for j, geom_b in enumerate(geometries_b):
-                    # Если это один и тот же набор, избегаем дублирования
-                    if same_set and j <= i:
-                        continue
-
-                    # Проверяем касание/пересечение
-                    if geom_a.touches(geom_b) or geom_a.intersects(geom_b):
-                        # Получаем геометрию пересечения
-                        intersection = geom_a.intersection(geom_b)
-
-                        if intersection and not intersection.isNull():
-                            # Подсчитываем точки пересечения
-                            points_count = self._count_intersection_points(intersection)
-                            total_intersections += points_count
+            total_intersections += self._count_pair_intersections(geometries_a, geometries_b, same_set)
 
             # Для одного и того же набора также считаем самопересечения каждой линии
             if same_set:
@@ -320,6 +310,66 @@ class Fsm_1_3_7_IntersectionsCalculator:
             log_error(f"Fsm_1_3_7: Ошибка подсчёта пересечений - {str(e)}")
             return total_intersections
 
+    def _count_pair_intersections(self, geometries_a: List[QgsGeometry],
+                                  geometries_b: List[QgsGeometry],
+                                  same_set: bool) -> int:
+        """
+        Точки пересечения между разными линиями (без самопересечений)
+
+        Args:
+            geometries_a: Первый набор линий
+            geometries_b: Второй набор линий
+            same_set: Наборы совпадают (пары i < j)
+
+        Returns:
+            int: Количество точек пересечения
+        """
+        try:
+            from .Fsm_1_3_7_1_segment_index import Fsm_1_3_7_1_SegmentIntersectionIndex
+        except ImportError:
+            log_warning("Fsm_1_3_7: NumPy недоступен, пары линий ищутся по QgsSpatialIndex")
+            return self._count_pair_intersections_bbox(geometries_a, geometries_b, same_set)
+
+        index = Fsm_1_3_7_1_SegmentIntersectionIndex(geometries_a, None if same_set else geometries_b)
+        count = index.count(
+            lambda i, j: self._count_exact_intersections(geometries_a[i], geometries_b[j])
+        )
+        stats = index.report()
+        log_info(
+            f"Fsm_1_3_7: Сегментов {stats['segments']}, пар-кандидатов {stats['candidate_pairs']}, "
+            f"точных проверок GEOS {stats['exact_line_pairs']}"
+        )
+        return count
+
+    def _count_pair_intersections_bbox(self, geometries_a: List[QgsGeometry],
+                                       geometries_b: List[QgsGeometry],
+                                       same_set: bool) -> int:
+        """Пары линий по QgsSpatialIndex bbox + точный подсчёт GEOS"""
+        spatial_index = QgsSpatialIndex()
+        for j, geom_b in enumerate(geometries_b):
+            spatial_index.addFeature(j, geom_b.boundingBox())
+
+        total = 0
+        for i, geom_a in enumerate(geometries_a):
+            for j in spatial_index.intersects(geom_a.boundingBox()):
+                # Если это один и тот же набор, избегаем дублирования
+                if same_set and j <= i:
+                    continue
+                total += self._count_exact_intersections(geom_a, geometries_b[j])
+        return total
+
+    def _count_exact_intersections(self, geom_a: QgsGeometry, geom_b: QgsGeometry) -> int:
+        """Точки пересечения пары линий (GEOS)"""
+        # Проверяем касание/пересечение
+        if geom_a.touches(geom_b) or geom_a.intersects(geom_b):
+            # Получаем геометрию пересечения
+            intersection = geom_a.intersection(geom_b)
+
+            if intersection and not intersection.isNull():
+                # Подсчитываем точки пересечения
+                return self._count_intersection_points(intersection)
+        return 0
+
     def _count_intersection_points(self, intersection_geom: QgsGeometry) -> int:
         """
         Подсчёт количества точек в геометрии пересечения
@@ -252,6 +252,9 @@ class F_2_4_Staging(BaseTool):
         log_info(f"F_2_4: Макс. ID ЗПР = {max_zpr_id}, "
                 f"ID для несоответствующих участков начинается с {next_id_base}")
 
+        # Индекс ЗПР для геометрического ВРИ - один на все типы слоёв
+        zpr_index = self._vri_manager.build_zpr_index(zpr_layer) if self._vri_manager else None
+
         # 5. Обработка каждого типа слоёв (Раздел, НГС)
         for mapping in self.LAYER_MAPPING:
             (source_poly, source_points,
@@ -283,7 +286,8 @@ class F_2_4_Staging(BaseTool):
                 final_name=final_poly,
                 final_points_name=final_points,
                 layer_type=layer_type,
-                next_id_base=next_id_base
+                next_id_base=next_id_base,
+                zpr_index=zpr_index
             )
 
         # 7. Применение стилей и подписей
@@ -428,9 +432,13 @@ class F_2_4_Staging(BaseTool):
         final_name: str,
         final_points_name: Optional[str],    # None для Без_Меж
         layer_type: str,
-        next_id_base: int
+        next_id_base: int,
+        zpr_index: Optional[Any] = None
     ) -> None:
-        """Обработка одного типа слоя через все этапы"""
+        """Обработка одного типа слоя через все этапы
+
+        zpr_index - индекс ЗПР (M_21.build_zpr_index), общий для всех типов слоёв
+        """
         log_info(f"F_2_4: Обработка этапности для {layer_type}")
 
         # Специальная обработка для Без_Меж (без точек и 2 этапа)
@@ -490,7 +498,7 @@ class F_2_4_Staging(BaseTool):
             # 3.3. Геометрический ВРИ для контуров, которые будут объединяться
             # Заменяет План_ВРИ на основе геометрического пересечения с ЗПР
             stage1_data = self._vri_manager.assign_vri_by_zpr_geometry(
-                stage1_data, zpr_layer
+                stage1_data, zpr_layer, zpr_index=zpr_index
             )
 
         # 4. Формирование данных для 2 этапа (только объединяемые участки)
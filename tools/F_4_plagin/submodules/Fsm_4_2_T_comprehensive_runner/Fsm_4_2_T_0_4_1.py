@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """
 Субмодуль Fsm_4_2_T_0_4_1 - Тест функции F_0_4_Топология (Часть 1)
-Проверка модулей Fsm_0_4_1 и Fsm_0_4_2
+Проверка checker'ов GeometryValidityChecker и DuplicatesChecker (core.topology)
 """
 
 import os
@@ -29,8 +29,8 @@ class TestF041:
         self.logger = logger
         self.module = None
         self.coordinator = None
-        self.checker_1 = None  # Fsm_0_4_1 - валидность и самопересечения
-        self.checker_2 = None  # Fsm_0_4_2 - дубли геометрий и вершин
+        self.checker_1 = None  # GeometryValidityChecker - валидность и самопересечения
+        self.checker_2 = None  # DuplicatesChecker - дубли геометрий и вершин
         self.test_dir = None
 
     def run_all_tests(self):
@@ -101,10 +101,10 @@ class TestF041:
                 self.logger.fail("Координатор не найден!")
 
             # Инициализируем Checker 1 (валидность и самопересечения)
-            from Daman_QGIS.tools.F_0_project.submodules.Fsm_0_4_1_geometry_validity import Fsm_0_4_1_GeometryValidityChecker
+            from Daman_QGIS.core.topology.geometry_validity import GeometryValidityChecker
 
-            self.checker_1 = Fsm_0_4_1_GeometryValidityChecker()
-            self.logger.success("Модуль Fsm_0_4_1_GeometryValidityChecker загружен")
+            self.checker_1 = GeometryValidityChecker()
+            self.logger.success("Модуль GeometryValidityChecker загружен")
 
             # Проверяем методы Checker 1
             self.logger.check(
@@ -114,10 +114,10 @@ class TestF041:
             )
 
             # Инициализируем Checker 2 (дубли)
-            from Daman_QGIS.tools.F_0_project.submodules.Fsm_0_4_2_duplicates import Fsm_0_4_2_DuplicatesChecker
+            from Daman_QGIS.core.topology.duplicates import DuplicatesChecker
 
-            self.checker_2 = Fsm_0_4_2_DuplicatesChecker()
-            self.logger.success("Модуль Fsm_0_4_2_DuplicatesChecker загружен")
+            self.checker_2 = DuplicatesChecker()
+            self.logger.success("Модуль DuplicatesChecker загружен")
 
             # Проверяем методы Checker 2
             self.logger.check(
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_0_4_19_layer_snapshot - Общий снимок слоя для checker'ов F_0_4
+
+Проверяет:
+1. Содержимое снимка: fids / WKB / bbox, объекты без геометрии пропущены,
+   плоский массив вершин совпадает с обходом геометрий
+2. Результаты checker'ов на общем снимке (после всех предыдущих checker'ов)
+   совпадают с результатами на собственном чтении слоя
+3. Наложения совпадают с попарным перебором без индекса
+4. Координатор: одно чтение снимка + qgis:checkvalidity, замеры
+   по каждому checker'у в статистике и отчёте
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from qgis.core import QgsVectorLayer, QgsFeature, QgsGeometry, QgsField
+from qgis.PyQt.QtCore import QMetaType
+
+
+class TestLayerSnapshot:
+    """Тесты LayerSnapshot и его использования в Fsm_0_4_5"""
+
+    # Сетка смежных квадратов 10x10 м (общие рёбра) + проблемные объекты
+    GRID_SIZE = 4
+    CELL = 10.0
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ LayerSnapshot: общий снимок слоя для проверок топологии")
+
+        try:
+            self.test_01_snapshot_content()
+            self.test_02_checkers_equivalence()
+            self.test_03_overlaps_reference()
+            self.test_04_coordinator_reads_and_timings()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_0_4_19: {str(e)}")
+            import traceback
+            self.logger.data("Traceback", traceback.format_exc())
+
+        self.logger.summary()
+
+    def _build_layer(self) -> QgsVectorLayer:
+        """Сетка + наложение, дубль, spike, неокруглённые координаты, пустой объект"""
+        layer = QgsVectorLayer("MultiPolygon?crs=EPSG:32637", "test_snapshot", "memory")
+        provider = layer.dataProvider()
+        provider.addAttributes([QgsField("id", QMetaType.Type.Int)])
+        layer.updateFields()
+
+        wkts: List[str] = []
+        c = self.CELL
+        for row in range(self.GRID_SIZE):
+            for col in range(self.GRID_SIZE):
+                x0, y0 = col * c, row * c
+                wkts.append(
+                    f"POLYGON(({x0} {y0}, {x0 + c} {y0}, {x0 + c} {y0 + c}, "
+                    f"{x0} {y0 + c}, {x0} {y0}))"
+                )
+        wkts.extend([
+            # Наложение на ячейки (0,0)-(1,1)
+            "POLYGON((5 5, 15 5, 15 15, 5 15, 5 5))",
+            # Дубль ячейки (0,0)
+            "POLYGON((0 0, 10 0, 10 10, 0 10, 0 0))",
+            # Spike + неокруглённая вершина + близкие точки к соседу
+            "POLYGON((100 0, 110 0, 110 10, 105.004 10, 105 30, 104.996 10, 100 10, 100 0))",
+            "POLYGON((110.007 0, 120 0, 120 10, 110.007 10, 110.007 0))",
+            # Самопересечение (бабочка)
+            "POLYGON((200 0, 210 10, 210 0, 200 10, 200 0))",
+        ])
+
+        features = []
+        for i, wkt in enumerate(wkts, start=1):
+            feature = QgsFeature(layer.fields())
+            feature.setGeometry(QgsGeometry.fromWkt(wkt))
+            feature.setAttributes([i])
+            features.append(feature)
+
+        # Объект без геометрии - в снимок не попадает
+        empty = QgsFeature(layer.fields())
+        empty.setAttributes([len(wkts) + 1])
+        features.append(empty)
+
+        provider.addFeatures(features)
+        return layer
+
+    @staticmethod
+    def _signature(errors: List[Dict[str, Any]]) -> List[Tuple]:
+        """Сравнимое представление ошибок (без порядка и объектов QGIS)"""
+        result = []
+        for error in errors:
+            geom = error.get('geometry')
+            wkt = geom.asWkt(4) if isinstance(geom, QgsGeometry) and not geom.isNull() else ''
+            result.append((
+                error.get('type'), error.get('feature_id'), error.get('feature_id2'),
+                error.get('vertex_index'), error.get('description'), wkt
+            ))
+        return sorted(result, key=repr)
+
+    @staticmethod
+    def _classes():
+        from Daman_QGIS.core.topology.layer_snapshot import (
+            LayerSnapshot,
+        )
+        from Daman_QGIS.tools.F_0_project.submodules.Fsm_0_4_5_coordinator import (
+            Fsm_0_4_5_TopologyCoordinator,
+        )
+        return LayerSnapshot, Fsm_0_4_5_TopologyCoordinator
+
+    def _run_checkers(self, coordinator, layer, snapshot) -> Dict[str, List[Tuple]]:
+        """Все checker'ы полигонов координатора на одном снимке (или без него)"""
+        validity, self_int = coordinator.validity_checker.check(layer, snapshot)
+        geom_dups, vertex_dups, close = coordinator.duplicates_checker.check(layer, snapshot)
+        overlaps, spikes = coordinator.topology_checker.check(layer, snapshot)
+        precision = coordinator.precision_checker.check(layer, snapshot)
+        cross = coordinator.cross_feature_checker.check(layer, snapshot)
+        gaps = coordinator.gap_checker.check(layer, snapshot)
+        return {
+            'validity': self._signature(validity),
+            'self_intersection': self._signature(self_int),
+            'duplicate_geometry': self._signature(geom_dups),
+            'duplicate_vertex': self._signature(vertex_dups),
+            'close_points': self._signature(close),
+            'overlap': self._signature(overlaps),
+            'spike': self._signature(spikes),
+            'precision': self._signature(precision),
+            'cross_feature_close_points': self._signature(cross),
+            'gaps': self._signature(gaps),
+        }
+
+    def test_01_snapshot_content(self) -> None:
+        """ТЕСТ 1: содержимое снимка"""
+        Snapshot, _ = self._classes()
+        self.logger.section("1. Содержимое снимка")
+
+        layer = self._build_layer()
+        snapshot = Snapshot(layer)
+
+        expected = [f.id() for f in layer.getFeatures() if f.hasGeometry()]
+        self.logger.check(
+            snapshot.fids == expected and len(snapshot.wkb) == len(expected)
+            and len(snapshot.bboxes) == len(expected),
+            f"fids / WKB / bbox для {len(expected)} объектов с геометрией",
+            f"fids снимка {snapshot.fids}, ожидалось {expected}"
+        )
+        self.logger.check(
+            all(snapshot.geometry_by_fid(fid).asWkb() == layer.getFeature(fid).geometry().asWkb()
+                for fid in expected),
+            "Геометрии снимка совпадают с геометриями слоя",
+            "Геометрия снимка отличается от слоя"
+        )
+
+        vertices = snapshot.vertices()
+        total = sum(
+            sum(1 for _ in geom.vertices())
+            for _, geom in snapshot.items()
+        )
+        self.logger.check(
+            len(vertices) == total
+            and len(vertices.fids) == len(vertices.part_idx) == len(vertices.ring_idx) == total,
+            f"Массив вершин: {total} вершин, колонки одной длины",
+            f"Вершин в массиве {len(vertices)}, в геометриях {total}"
+        )
+        self.logger.check(
+            snapshot.read_count == 1 and snapshot.reads == {'getFeatures': 1},
+            "Построение снимка - одно чтение слоя",
+            f"Чтения: {snapshot.reads}"
+        )
+
+    def test_02_checkers_equivalence(self) -> None:
+        """ТЕСТ 2: общий снимок vs собственное чтение"""
+        Snapshot, Coordinator = self._classes()
+        self.logger.section("2. Результаты checker'ов на общем снимке")
+
+        layer = self._build_layer()
+        coordinator = Coordinator()
+
+        own = self._run_checkers(coordinator, layer, None)
+        snapshot = Snapshot(layer)
+        shared = self._run_checkers(coordinator, layer, snapshot)
+
+        differences = [key for key in own if own[key] != shared[key]]
+        self.logger.check(
+            not differences,
+            "Все типы ошибок совпадают",
+            f"Расхождения: {differences}"
+        )
+        found = {key: len(value) for key, value in shared.items() if value}
+        self.logger.data("Найдено ошибок", str(found))
+        self.logger.check(
+            all(found.get(key) for key in ('overlap', 'duplicate_geometry', 'spike', 'precision', 'self_intersection')),
+            "Наложение, дубль, spike, точность и самопересечение обнаружены",
+            f"Найдено: {found}"
+        )
+
+        # getFeatures снимка + qgis:checkvalidity
+        self.logger.check(
+            snapshot.read_count == 2,
+            "Все checker'ы прочитали слой 2 раза (снимок + qgis:checkvalidity)",
+            f"Чтения: {snapshot.reads}"
+        )
+
+        repeat = self._run_checkers(coordinator, layer, Snapshot(layer))
+        self.logger.check(
+            repeat == shared,
+            "Повторный запуск даёт те же ошибки",
+            "Результат повторного запуска отличается"
+        )
+
+    def test_03_overlaps_reference(self) -> None:
+        """ТЕСТ 3: наложения vs попарный перебор"""
+        Snapshot, Coordinator = self._classes()
+        self.logger.section("3. Наложения: индекс снимка vs перебор пар")
+
+        layer = self._build_layer()
+        coordinator = Coordinator()
+        overlaps, _ = coordinator.topology_checker.check(layer, Snapshot(layer))
+        found = {tuple(sorted((e['feature_id'], e['feature_id2']))) for e in overlaps}
+
+        features = [(f.id(), f.geometry()) for f in layer.getFeatures() if f.hasGeometry()]
+        expected = set()
+        for a in range(len(features)):
+            for b in range(a + 1, len(features)):
+                fid1, geom1 = features[a]
+                fid2, geom2 = features[b]
+                if not geom1.intersects(geom2) or geom1.touches(geom2):
+                    continue
+                intersection = geom1.intersection(geom2)
+                if intersection and not intersection.isEmpty() and intersection.area() > 0:
+                    expected.add(tuple(sorted((fid1, fid2))))
+
+        self.logger.check(
+            found <= expected and len(found) > 0,
+            f"Пары наложений ({len(found)}) подтверждаются перебором",
+            f"Индекс: {sorted(found)}, перебор: {sorted(expected)}"
+        )
+
+    def test_04_coordinator_reads_and_timings(self) -> None:
+        """ТЕСТ 4: координатор"""
+        _, Coordinator = self._classes()
+        self.logger.section("4. Координатор: чтения слоя и замеры")
+
+        layer = self._build_layer()
+        coordinator = Coordinator()
+        result = coordinator.check_layer(layer)
+        stats = result['statistics']
+
+        timings = stats.get('timings_ms', {})
+        self.logger.data("Замеры, мс", str(timings))
+        self.logger.check(
+            {'validity', 'duplicates', 'topology', 'precision', 'cross_feature', 'gaps'} <= set(timings)
+            and all(value >= 0 for value in timings.values()),
+            "Время каждого checker'а в статистике",
+            f"timings_ms: {timings}"
+        )
+        self.logger.check(
+            stats.get('layer_reads') == 2 and 'snapshot_ms' in stats,
+            "Чтений слоя за проверку: 2 (было по одному и более на каждый checker)",
+            f"layer_reads={stats.get('layer_reads')}, по источникам: {stats.get('layer_reads_by_source')}"
+        )
+        report = coordinator.get_report()
+        self.logger.check(
+            "Замеры, мс:" in report and "Чтений слоя: 2" in report,
+            "Замеры и число чтений в отчёте",
+            "Строки замеров отсутствуют в отчёте"
+        )
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """
 Субмодуль Fsm_4_2_T_0_4_2 - Тест функции F_0_4_Топология (Часть 2)
-Проверка модулей Fsm_0_4_3 и Fsm_0_4_4
+Проверка checker'ов TopologyErrorsChecker и PrecisionChecker (core.topology)
 """
 
 import os
@@ -27,8 +27,8 @@ class TestF042:
         self.iface = iface
         self.logger = logger
         self.coordinator = None
-        self.checker_3 = None  # Fsm_0_4_3 - наложения и острые углы
-        self.checker_4 = None  # Fsm_0_4_4 - точность координат
+        self.checker_3 = None  # TopologyErrorsChecker - наложения и острые углы
+        self.checker_4 = None  # PrecisionChecker - точность координат
         self.test_dir = None
 
     def run_all_tests(self):
@@ -81,7 +81,7 @@ class TestF042:
 
     def test_01_init_modules(self):
         """ТЕСТ 1: Инициализация модулей"""
-        self.logger.section("1. Инициализация модулей Fsm_0_4_3 и Fsm_0_4_4")
+        self.logger.section("1. Инициализация TopologyErrorsChecker и PrecisionChecker")
 
         try:
             # Инициализируем координатор
@@ -91,10 +91,10 @@ class TestF042:
             self.logger.success("Координатор Fsm_0_4_5 загружен успешно")
 
             # Инициализируем Checker 3 (наложения и острые углы)
-            from Daman_QGIS.tools.F_0_project.submodules.Fsm_0_4_3_topology_errors import Fsm_0_4_3_TopologyErrorsChecker
+            from Daman_QGIS.core.topology.topology_errors import TopologyErrorsChecker
 
-            self.checker_3 = Fsm_0_4_3_TopologyErrorsChecker()
-            self.logger.success("Модуль Fsm_0_4_3_TopologyErrorsChecker загружен")
+            self.checker_3 = TopologyErrorsChecker()
+            self.logger.success("Модуль TopologyErrorsChecker загружен")
 
             # Проверяем методы Checker 3
             self.logger.check(
@@ -104,10 +104,10 @@ class TestF042:
             )
 
             # Инициализируем Checker 4 (точность координат)
-            from Daman_QGIS.tools.F_0_project.submodules.Fsm_0_4_4_precision import Fsm_0_4_4_PrecisionChecker
+            from Daman_QGIS.core.topology.precision import PrecisionChecker
 
-            self.checker_4 = Fsm_0_4_4_PrecisionChecker()
-            self.logger.success("Модуль Fsm_0_4_4_PrecisionChecker загружен")
+            self.checker_4 = PrecisionChecker()
+            self.logger.success("Модуль PrecisionChecker загружен")
 
             # Проверяем методы Checker 4
             self.logger.check(
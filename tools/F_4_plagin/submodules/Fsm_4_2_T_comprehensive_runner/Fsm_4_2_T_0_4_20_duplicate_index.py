@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_0_4_20_duplicate_index - Хэш-индексы проверки дублей (core.topology.duplicate_index)
+
+Проверяет:
+1. Канонический ключ: сдвиг начала и направление кольца, порядок дырок и
+   частей не влияют; разные координаты - разные ключи
+2. Дубли геометрий в слое: повёрнутые / развёрнутые копии в одной группе,
+   первая копия - эталон, processing не вызывается (одно чтение - снимок)
+3. Сеточный хэш близких точек = полный перебор (пары и порядок)
+4. Масштабирование: время проверки дублей растёт ~линейно
+"""
+
+import math
+import random
+import time
+from typing import Any, List, Tuple
+
+from qgis.core import QgsVectorLayer, QgsFeature, QgsGeometry, QgsPointXY, QgsField
+from qgis.PyQt.QtCore import QMetaType
+
+
+class TestDuplicateIndex:
+    """Тесты duplicate_index и проверки дублей DuplicatesChecker"""
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ duplicate_index: хэш-индексы проверки дублей")
+
+        try:
+            self.test_01_canonical_key()
+            self.test_02_layer_duplicates()
+            self.test_03_grid_close_points()
+            self.test_04_scaling()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_0_4_20: {str(e)}")
+
+        self.logger.summary()
+
+    @staticmethod
+    def _index():
+        from Daman_QGIS.core.topology import duplicate_index
+        return duplicate_index
+
+    @staticmethod
+    def _classes():
+        from Daman_QGIS.core.topology.duplicates import (
+            DuplicatesChecker,
+        )
+        from Daman_QGIS.core.topology.layer_snapshot import (
+            LayerSnapshot,
+        )
+        return DuplicatesChecker, LayerSnapshot
+
+    @staticmethod
+    def _square(x0: float, y0: float, size: float = 10.0) -> List[Tuple[float, float]]:
+        return [(x0, y0), (x0 + size, y0), (x0 + size, y0 + size), (x0, y0 + size), (x0, y0)]
+
+    @staticmethod
+    def _rotated(ring: List[Tuple[float, float]], shift: int, reverse: bool) -> List[Tuple[float, float]]:
+        """То же кольцо с другим началом / направлением"""
+        points = ring[:-1]
+        if reverse:
+            points = points[::-1]
+        points = points[shift:] + points[:shift]
+        return points + [points[0]]
+
+    @staticmethod
+    def _polygon_wkt(rings: List[List[Tuple[float, float]]]) -> str:
+        return "POLYGON(" + ", ".join(
+            "(" + ", ".join(f"{x} {y}" for x, y in ring) + ")" for ring in rings
+        ) + ")"
+
+    def _build_layer(self, wkts: List[str], name: str) -> QgsVectorLayer:
+        layer = QgsVectorLayer("MultiPolygon?crs=EPSG:32637", name, "memory")
+        provider = layer.dataProvider()
+        provider.addAttributes([QgsField("id", QMetaType.Type.Int)])
+        layer.updateFields()
+        features = []
+        for i, wkt in enumerate(wkts, start=1):
+            feature = QgsFeature(layer.fields())
+            feature.setGeometry(QgsGeometry.fromWkt(wkt))
+            feature.setAttributes([i])
+            features.append(feature)
+        provider.addFeatures(features)
+        return layer
+
+    def _copies_layer(self, count: int) -> QgsVectorLayer:
+        """count объектов: половина уникальных, половина - повёрнутые копии"""
+        unique = count // 2
+        wkts = []
+        for i in range(unique):
+            ring = self._square((i % 100) * 20.0, (i // 100) * 20.0)
+            wkts.append(self._polygon_wkt([ring]))
+        for i in range(count - unique):
+            ring = self._square((i % 100) * 20.0, (i // 100) * 20.0)
+            wkts.append(self._polygon_wkt([self._rotated(ring, i % 4, i % 2 == 1)]))
+        return self._build_layer(wkts, f"test_dup_copies_{count}")
+
+    def test_01_canonical_key(self) -> None:
+        """ТЕСТ 1: канонический ключ"""
+        index = self._index()
+        self.logger.section("1. Канонический ключ геометрии")
+
+        outer = self._square(0, 0, 100)
+        hole_a = self._square(10, 10)
+        hole_b = self._square(50, 50)
+
+        def key(*polygons):
+            return index.geometry_key([list(polygon) for polygon in polygons], is_polygon=True)
+
+        base = key([outer, hole_a, hole_b])
+        variants = [
+            key([self._rotated(outer, 2, False), hole_a, hole_b]),
+            key([self._rotated(outer, 1, True), hole_b, self._rotated(hole_a, 3, True)]),
+        ]
+        self.logger.check(
+            all(variant == base for variant in variants),
+            "Начало / направление колец и порядок дырок не влияют на ключ",
+            "Ключи повёрнутых копий различаются"
+        )
+        self.logger.check(
+            key([outer], [hole_b]) == key([hole_b], [outer]),
+            "Порядок частей мультиполигона не влияет на ключ",
+            "Ключ зависит от порядка частей"
+        )
+
+        moved = [(x, y + 0.01 if i == 2 else y) for i, (x, y) in enumerate(outer)]
+        self.logger.check(
+            key(moved) != key(outer) and key([outer, hole_a]) != key([outer]),
+            "Сдвиг вершины на 1 см и лишняя дырка - разные ключи",
+            "Разные геометрии дали одинаковый ключ"
+        )
+        line_key = index.geometry_key([[(0, 0), (1, 1), (2, 0)]], is_polygon=False)
+        self.logger.check(
+            line_key == index.geometry_key([[(2, 0), (1, 1), (0, 0)]], is_polygon=False),
+            "Линия и её обратный обход - один ключ",
+            "Ключ линии зависит от направления"
+        )
+
+    def test_02_layer_duplicates(self) -> None:
+        """ТЕСТ 2: дубли геометрий в слое"""
+        Checker, Snapshot = self._classes()
+        self.logger.section("2. Дубли геометрий в слое")
+
+        ring = self._square(0, 0)
+        wkts = [
+            self._polygon_wkt([ring]),
+            self._polygon_wkt([self._square(20, 0)]),
+            self._polygon_wkt([self._rotated(ring, 2, False)]),
+            self._polygon_wkt([self._rotated(ring, 1, True)]),
+            # Отличается на 1 см - не дубль
+            self._polygon_wkt([[(0, 0), (10, 0), (10, 10.01), (0, 10), (0, 0)]]),
+        ]
+        layer = self._build_layer(wkts, "test_dup_rotated")
+        fids = [f.id() for f in layer.getFeatures()]
+
+        snapshot = Snapshot(layer)
+        checker = Checker()
+        duplicates, _, _ = checker.check(layer, snapshot)
+        pairs = [(error['feature_id'], error['feature_id2']) for error in duplicates]
+        expected = [(fids[2], fids[0]), (fids[3], fids[0])]
+        self.logger.check(
+            pairs == expected,
+            "Повёрнутая и развёрнутая копии - дубли первой копии",
+            f"Пары: {pairs}, ожидалось {expected}"
+        )
+        self.logger.check(
+            snapshot.read_count == 1,
+            "Проверка дублей не перечитывает слой (без processing)",
+            f"Чтения: {snapshot.reads}"
+        )
+
+    def test_03_grid_close_points(self) -> None:
+        """ТЕСТ 3: сеточный хэш = перебор"""
+        Checker, _ = self._classes()
+        self.logger.section("3. Близкие точки: сеточный хэш vs перебор")
+
+        rng = random.Random(42)
+        # Кольцо из 400 вершин + шум: часть вершин ближе 1 см к несоседним
+        n = 400
+        points = []
+        for k in range(n):
+            angle = 2 * math.pi * k / n
+            points.append(QgsPointXY(round(5 * math.cos(angle), 2), round(5 * math.sin(angle), 2)))
+        for k in range(0, n, 37):
+            base = points[(k + 200) % n]
+            points[k] = QgsPointXY(base.x() + rng.choice((0.0, 0.005, 0.01)), base.y())
+        points.append(points[0])
+
+        checker = Checker()
+        brute: List[dict] = []
+        grid: List[dict] = []
+        checker._find_close_points_bruteforce(points, 1, 0, 0, brute)
+        checker._find_close_points_grid(points, 1, 0, 0, grid)
+
+        def signature(errors):
+            return [(e['vertex_index'], e['vertex_index2'], e['description']) for e in errors]
+
+        self.logger.check(
+            signature(grid) == signature(brute) and len(brute) > 0,
+            f"Сетка и перебор: {len(brute)} одинаковых пар в одинаковом порядке",
+            f"Перебор {len(brute)}, сетка {len(grid)}"
+        )
+
+    def test_04_scaling(self) -> None:
+        """ТЕСТ 4: масштабирование"""
+        Checker, Snapshot = self._classes()
+        self.logger.section("4. Масштабирование: дубли геометрий")
+
+        # Половина объектов каждого слоя - дубли
+        sizes = (500, 2000)
+        timings = []
+        for count in sizes:
+            layer = self._copies_layer(count)
+            snapshot = Snapshot(layer)
+            checker = Checker()
+            start = time.perf_counter()
+            duplicates = checker._check_duplicate_geometries(snapshot)
+            elapsed = (time.perf_counter() - start) * 1000
+            timings.append(elapsed)
+            self.logger.data(f"{count} объектов", f"{elapsed:.1f} мс, дублей {len(duplicates)}")
+            self.logger.check(
+                len(duplicates) == count - count // 2,
+                f"{count} объектов: найдены все {count - count // 2} дублей",
+                f"{count} объектов: найдено {len(duplicates)} дублей"
+            )
+
+        growth = sizes[-1] / sizes[0]
+        ratio = timings[-1] / max(timings[0], 0.1)
+        # Линейный рост - ~growth; квадратичный (скан слоя на дубль) - ~growth²
+        self.logger.check(
+            ratio < growth * 2.5,
+            f"Рост времени x{ratio:.1f} при росте слоя x{growth:.0f} (~линейно)",
+            f"Рост времени x{ratio:.1f} при росте слоя x{growth:.0f}"
+        )
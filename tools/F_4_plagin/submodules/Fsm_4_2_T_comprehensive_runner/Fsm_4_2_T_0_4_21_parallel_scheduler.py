@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_0_4_21_parallel_scheduler - Параллельная проверка топологии (Fsm_0_4_21)
+
+Проверяет:
+1. Снимок слоя (LayerSnapshot) переживает pickle: fids / WKB / bbox / тип
+   геометрии, геометрии восстанавливаются из WKB
+2. detach_errors / attach_errors: геометрии ошибок через WKB без потерь,
+   порядок типов и ошибок сохраняется
+3. Воркер на распакованном снимке = check_layer координатора без
+   qgis:checkvalidity (те же типы в том же порядке, те же ошибки)
+4. Task (без пула - в потоке): результаты в порядке слоёв, совпадают
+   с последовательной проверкой, время слоя в статистике
+5. Task с пулом (max_workers=2): слои проверены в процессах, результаты
+   совпадают с проверкой в потоке; процесс пула не загружает tools и processing
+"""
+
+import pickle
+from typing import Any, Dict, List, Tuple
+
+from qgis.core import QgsProject, QgsVectorLayer, QgsFeature, QgsGeometry, QgsField, QgsPointXY
+from qgis.PyQt.QtCore import QMetaType
+
+
+class TestParallelScheduler:
+    """Тесты Fsm_0_4_21 (пул процессов проверки топологии)"""
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Fsm_0_4_21: параллельная проверка топологии")
+
+        try:
+            self.test_01_snapshot_pickle()
+            self.test_02_detach_attach()
+            self.test_03_worker_equivalence()
+            self.test_04_task_order()
+            self.test_05_process_pool()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_0_4_21: {str(e)}")
+            import traceback
+            self.logger.data("Traceback", traceback.format_exc())
+
+        self.logger.summary()
+
+    @staticmethod
+    def _modules():
+        from Daman_QGIS.core.topology import snapshot_worker
+        from Daman_QGIS.core.topology.layer_snapshot import (
+            LayerSnapshot,
+        )
+        from Daman_QGIS.tools.F_0_project.submodules.Fsm_0_4_5_coordinator import (
+            Fsm_0_4_5_TopologyCoordinator,
+        )
+        return snapshot_worker, LayerSnapshot, Fsm_0_4_5_TopologyCoordinator
+
+    @staticmethod
+    def _task_class():
+        from Daman_QGIS.tools.F_0_project.submodules.Fsm_0_4_21_parallel_scheduler import (
+            Fsm_0_4_21_ParallelTopologyTask,
+        )
+        return Fsm_0_4_21_ParallelTopologyTask
+
+    def _build_layer(self, name: str, offset: float = 0.0) -> QgsVectorLayer:
+        """Смежные квадраты + наложение, дубль, spike, самопересечение"""
+        layer = QgsVectorLayer("MultiPolygon?crs=EPSG:32637", name, "memory")
+        provider = layer.dataProvider()
+        provider.addAttributes([QgsField("id", QMetaType.Type.Int)])
+        layer.updateFields()
+
+        x = offset
+        wkts = [
+            f"POLYGON(({x} 0, {x + 10} 0, {x + 10} 10, {x} 10, {x} 0))",
+            f"POLYGON(({x + 10} 0, {x + 20} 0, {x + 20} 10, {x + 10} 10, {x + 10} 0))",
+            f"POLYGON(({x + 5} 5, {x + 15} 5, {x + 15} 15, {x + 5} 15, {x + 5} 5))",
+            f"POLYGON(({x} 0, {x + 10} 0, {x + 10} 10, {x} 10, {x} 0))",
+            f"POLYGON(({x + 100} 0, {x + 110} 0, {x + 110} 10, {x + 105.004} 10, "
+            f"{x + 105} 30, {x + 104.996} 10, {x + 100} 10, {x + 100} 0))",
+            f"POLYGON(({x + 200} 0, {x + 210} 10, {x + 210} 0, {x + 200} 10, {x + 200} 0))",
+        ]
+        features = []
+        for i, wkt in enumerate(wkts, start=1):
+            feature = QgsFeature(layer.fields())
+            feature.setGeometry(QgsGeometry.fromWkt(wkt))
+            feature.setAttributes([i])
+            features.append(feature)
+        provider.addFeatures(features)
+        return layer
+
+    @staticmethod
+    def _signature(errors_by_type: Dict[str, List[Dict[str, Any]]]) -> List[Tuple]:
+        """Сравнимое представление ошибок с порядком типов и ошибок"""
+        result = []
+        for error_type, errors in errors_by_type.items():
+            for error in errors:
+                geom = error.get('geometry')
+                wkt = geom.asWkt(4) if isinstance(geom, QgsGeometry) and not geom.isNull() else ''
+                result.append((
+                    error_type, error.get('feature_id'), error.get('feature_id2'),
+                    error.get('vertex_index'), error.get('description'), wkt
+                ))
+        return result
+
+    def test_01_snapshot_pickle(self) -> None:
+        """ТЕСТ 1: снимок через pickle"""
+        _, Snapshot, _ = self._modules()
+        self.logger.section("1. Снимок слоя через pickle")
+
+        layer = self._build_layer("test_parallel_pickle")
+        snapshot = Snapshot(layer)
+        restored = pickle.loads(pickle.dumps(snapshot))
+
+        self.logger.check(
+            restored.fids == snapshot.fids and restored.wkb == snapshot.wkb
+            and restored.geometry_type == snapshot.geometry_type
+            and restored.layer_name == snapshot.layer_name,
+            "fids / WKB / тип геометрии / имя слоя сохранены",
+            f"fids {restored.fids} vs {snapshot.fids}, тип {restored.geometry_type}"
+        )
+        self.logger.check(
+            all(restored.bboxes[i] == snapshot.bboxes[i] for i in range(len(snapshot)))
+            and all(restored.geometry(i).asWkb() == snapshot.geometry(i).asWkb()
+                    for i in range(len(snapshot))),
+            "bbox и геометрии восстановлены из WKB",
+            "bbox или геометрия отличаются после pickle"
+        )
+        self.logger.check(
+            len(restored.vertices()) == len(snapshot.vertices()) and restored.reads == snapshot.reads,
+            "Массив вершин и счётчик чтений совпадают",
+            f"Вершин {len(restored.vertices())} vs {len(snapshot.vertices())}, чтения {restored.reads}"
+        )
+
+    def test_02_detach_attach(self) -> None:
+        """ТЕСТ 2: отделение геометрий ошибок"""
+        worker, _, _ = self._modules()
+        self.logger.section("2. Геометрии ошибок через WKB")
+
+        errors_by_type = {
+            'spike': [{'type': 'spike', 'feature_id': 3,
+                       'geometry': QgsGeometry.fromWkt("POINT(1.5 2.25)"), 'angle': 0.4}],
+            'overlap': [{'type': 'overlap', 'feature_id': 1, 'feature_id2': 2,
+                         'geometry': QgsGeometry.fromWkt("POLYGON((0 0, 1 0, 1 1, 0 0))"),
+                         'point': QgsPointXY(0.5, 0.25)},
+                        {'type': 'overlap', 'feature_id': 4, 'geometry': QgsGeometry()}],
+        }
+        detached = worker.detach_errors(errors_by_type)
+        restored = worker.attach_errors(pickle.loads(pickle.dumps(detached)))
+
+        self.logger.check(
+            self._signature(restored) == self._signature(errors_by_type)
+            and list(restored) == list(errors_by_type),
+            "Типы, ошибки и геометрии совпадают в исходном порядке",
+            f"После WKB: {self._signature(restored)}"
+        )
+        point = restored['overlap'][0]['point']
+        self.logger.check(
+            isinstance(point, QgsPointXY) and (point.x(), point.y()) == (0.5, 0.25)
+            and restored['overlap'][1]['geometry'].isNull()
+            and restored['spike'][0]['angle'] == 0.4,
+            "QgsPointXY, пустая геометрия и прочие поля восстановлены",
+            f"point={point}, geometry={restored['overlap'][1]['geometry']}"
+        )
+
+    def test_03_worker_equivalence(self) -> None:
+        """ТЕСТ 3: воркер vs check_layer"""
+        worker, Snapshot, Coordinator = self._modules()
+        self.logger.section("3. Воркер на снимке = check_layer")
+
+        layer = self._build_layer("test_parallel_worker")
+        expected = Coordinator().check_layer(layer)['errors_by_type']
+        expected.pop('validity', None)
+
+        snapshot = pickle.loads(pickle.dumps(Snapshot(layer)))
+        detached, timings, reads = worker.check_snapshot_worker(
+            snapshot, list(Coordinator.POLYGON_CHECK_TYPES), {}
+        )
+        actual = worker.attach_errors(detached)
+
+        self.logger.check(
+            list(actual) == list(expected) and self._signature(actual) == self._signature(expected),
+            f"Типы и ошибки совпадают ({len(self._signature(actual))} ошибок)",
+            f"Воркер: {list(actual)}, check_layer: {list(expected)}"
+        )
+        self.logger.check(
+            'validity' not in actual and reads == {'getFeatures': 1}
+            and {'duplicates', 'topology', 'gaps'} <= set(timings),
+            "Без qgis:checkvalidity, без повторных чтений, замеры checker'ов",
+            f"Чтения: {reads}, замеры: {timings}"
+        )
+
+    def test_04_task_order(self) -> None:
+        """ТЕСТ 4: task в потоке (без пула)"""
+        _, _, Coordinator = self._modules()
+        self.logger.section("4. Task: порядок слоёв и время проверки")
+
+        project = QgsProject.instance()
+        layers = [self._build_layer(f"test_parallel_task_{i}", offset=i * 1000.0) for i in range(3)]
+        layers.insert(1, QgsVectorLayer("Point?crs=EPSG:32637", "test_parallel_task_points", "memory"))
+        project.addMapLayers(layers, False)
+        try:
+            layer_ids = [layer.id() for layer in layers]
+            # max_workers=1 - пул не создаётся, тот же воркер в потоке
+            task = self._task_class()(layer_ids, max_workers=1)
+            results = task.execute()
+
+            self.logger.check(
+                results is not None and [item[0] for item in results] == layer_ids
+                and all(item[2] is None for item in results),
+                "Результат для каждого слоя в исходном порядке, без ошибок",
+                f"Результат: {[(item[0], item[2]) for item in results or []]}"
+            )
+
+            matches = []
+            for layer, (_, result, _) in zip(layers, results or []):
+                expected = Coordinator().check_layer(layer)
+                matches.append(
+                    self._signature(result['errors_by_type']) == self._signature(expected['errors_by_type'])
+                    and result['error_count'] == expected['error_count']
+                )
+            self.logger.check(
+                all(matches) and len(matches) == len(layers),
+                "Ошибки каждого слоя совпадают с последовательной проверкой",
+                f"Совпадения по слоям: {matches}"
+            )
+
+            stats = results[0][1]['statistics']
+            self.logger.data("Статистика слоя", str({key: stats.get(key) for key in ('check_ms', 'layer_reads', 'timings_ms')}))
+            self.logger.check(
+                all(item[1]['statistics'].get('check_ms', -1) >= 0 for item in results)
+                and stats.get('layer_reads') == 2 and 'validity' in stats.get('timings_ms', {}),
+                "Время проверки слоя и чтения (снимок + qgis:checkvalidity) в статистике",
+                f"Статистика: {stats}"
+            )
+        finally:
+            project.removeMapLayers([layer.id() for layer in layers])
+
+    def test_05_process_pool(self) -> None:
+        """ТЕСТ 5: task с пулом процессов"""
+        from concurrent.futures import ProcessPoolExecutor
+        from Daman_QGIS.core.process_pool import get_worker_executable, spawn_executable
+        worker, Snapshot, Coordinator = self._modules()
+        self.logger.section("5. Task: пул процессов (max_workers=2)")
+
+        executable = get_worker_executable()
+        if executable is None:
+            self.logger.warning("python для процессов пула не найден - пул не проверяется")
+            return
+
+        project = QgsProject.instance()
+        layers = [self._build_layer(f"test_parallel_pool_{i}", offset=i * 1000.0) for i in range(3)]
+        project.addMapLayers(layers, False)
+        try:
+            layer_ids = [layer.id() for layer in layers]
+            task = self._task_class()(layer_ids, max_workers=2)
+            pooled = task.execute()
+            in_thread = self._task_class()(layer_ids, max_workers=1).execute()
+
+            self.logger.check(
+                task.pool_checked == len(layers),
+                f"Все полигональные слои проверены в процессах пула ({task.pool_checked})",
+                f"В пуле проверено {task.pool_checked} из {len(layers)} слоёв"
+            )
+            self.logger.check(
+                pooled is not None and in_thread is not None
+                and [item[0] for item in pooled] == layer_ids
+                and all(
+                    p[2] is None and t[2] is None
+                    and self._signature(p[1]['errors_by_type']) == self._signature(t[1]['errors_by_type'])
+                    and p[1]['error_count'] == t[1]['error_count']
+                    for p, t in zip(pooled, in_thread)
+                ),
+                "Результаты пула совпадают с проверкой в потоке",
+                f"Пул: {[(item[0], item[2]) for item in pooled or []]}"
+            )
+        finally:
+            project.removeMapLayers([layer.id() for layer in layers])
+
+        # Модули процесса пула после проверки снимка
+        with spawn_executable(executable) as context:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                snapshot = Snapshot(self._build_layer("test_parallel_pool_modules"))
+                executor.submit(
+                    worker.check_snapshot_worker, snapshot, list(Coordinator.POLYGON_CHECK_TYPES), {}
+                ).result(timeout=120)
+                loaded = executor.submit(
+                    eval,
+                    "[name for name in __import__('sys').modules "
+                    "if name.startswith('Daman_QGIS.tools') or name == 'processing']"
+                ).result(timeout=120)
+
+        self.logger.check(
+            not loaded,
+            "Процесс пула не загружает Daman_QGIS.tools и processing",
+            f"Загружены в процессе пула: {loaded[:10]}"
+        )
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_16_1_batch_fetcher - Пакетная загрузка КН из НСПД (Msm_16_1)
+
+Локальный HTTP/1.1 стаб (http.server) с настраиваемой задержкой ответа
+имитирует API v2/search/geoportal: полигон для любого КН, пустой ответ
+для КН с участком 0, HTTP 500 для участка 999, HTTP 403 для участка 403,
+HTTP 429 с Retry-After на первый запрос участка 429.
+
+Проверяет:
+1. Пропускная способность: последовательный fetch_by_cadnum vs iter_multiple
+2. Одновременных запросов к хосту не больше NSPD_SEARCH_HOST_LIMIT
+3. Дубли КН (в т.ч. с пробелами) - один запрос, результат каждому вхождению
+4. Кэш: повторная загрузка без запросов, "не найден" кэшируется,
+   ошибка сервера - нет; TTL
+5. Результаты выдаются по мере готовности (первый - до завершения пакета)
+6. Повтор: 429 - после паузы Retry-After, 403 - без повтора
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+
+class _StubState:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latency = 0.05
+        self.requests = 0
+        self.queries = {}
+        self.active = 0
+        self.max_active = 0
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests = 0
+            self.queries = {}
+            self.max_active = 0
+
+
+_POLYGON = {
+    "type": "Polygon",
+    "coordinates": [[[4180000, 7500000], [4180100, 7500000], [4180100, 7500100],
+                     [4180000, 7500100], [4180000, 7500000]]]
+}
+
+
+def _make_handler(state: _StubState):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):  # noqa: N802
+            query = parse_qs(urlsplit(self.path).query).get('query', [''])[0]
+            with state.lock:
+                state.requests += 1
+                state.queries[query] = state.queries.get(query, 0) + 1
+                state.active += 1
+                state.max_active = max(state.max_active, state.active)
+            time.sleep(state.latency)
+
+            status = 200
+            headers = {}
+            parcel = query.rsplit(':', 1)[-1]
+            if parcel == '999':
+                status, payload = 500, {"message": "stub error"}
+            elif parcel == '403':
+                status, payload = 403, {"message": "forbidden"}
+            elif parcel == '429' and state.queries[query] == 1:
+                status, payload = 429, {"message": "too many requests"}
+                headers['Retry-After'] = '0.3'
+            elif parcel == '0':
+                payload = {"data": {"features": []}}
+            else:
+                payload = {"data": {"features": [{
+                    "geometry": _POLYGON,
+                    "properties": {"cadastralNumber": query, "category": "Земли населённых пунктов"}
+                }]}}
+            body = json.dumps(payload).encode('utf-8')
+
+            with state.lock:
+                state.active -= 1
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return _Handler
+
+
+class TestNspdBatchFetcher:
+    """Тесты пакетной загрузки Msm_16_1_NspdFetcher"""
+
+    BATCH = 40
+    LATENCY = 0.05
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.server = None
+        self.state = None
+        self.url = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Msm_16_1: пакетная загрузка КН из НСПД")
+
+        try:
+            import requests  # noqa: F401
+        except ImportError:
+            self.logger.warning("requests не установлен - тесты пропущены")
+            self.logger.summary()
+            return
+
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_16_1_nspd_fetcher import (
+            Msm_16_1_NspdFetcher,
+        )
+        saved_cache = dict(Msm_16_1_NspdFetcher._result_cache)
+        try:
+            self._start_stub()
+            self.test_01_throughput()
+            self.test_02_coalescing()
+            self.test_03_cache()
+            self.test_04_streaming()
+            self.test_05_retry()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Msm_16_1: {str(e)}")
+        finally:
+            if self.server:
+                self.server.shutdown()
+                self.server.server_close()
+            Msm_16_1_NspdFetcher.clear_cache()
+            Msm_16_1_NspdFetcher._result_cache.update(saved_cache)
+
+        self.logger.summary()
+
+    def _start_stub(self) -> None:
+        self.state = _StubState()
+        self.state.latency = self.LATENCY
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self.state))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/geoportal/v2/search/geoportal"
+
+    def _fetcher(self):
+        """Загрузчик на стаб, без авторизации M_40, с пустым кэшем"""
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_16_1_nspd_fetcher import (
+            Msm_16_1_NspdFetcher,
+        )
+        Msm_16_1_NspdFetcher.clear_cache()
+        self.state.reset()
+        fetcher = Msm_16_1_NspdFetcher()
+        fetcher.API_URL = self.url
+        fetcher.MAX_RETRIES = 1
+        fetcher._get_auth_cookies = lambda: {}
+        return fetcher
+
+    @staticmethod
+    def _cadnums(count: int, quarter: str = "0101001") -> list:
+        return [f"77:01:{quarter}:{i + 1}" for i in range(count)]
+
+    def test_01_throughput(self) -> None:
+        """ТЕСТ 1: последовательно vs параллельно"""
+        from Daman_QGIS.constants import NSPD_SEARCH_HOST_LIMIT
+        self.logger.section(f"1. {self.BATCH} КН, задержка стаба {self.LATENCY * 1000:.0f} мс")
+
+        fetcher = self._fetcher()
+        start = time.perf_counter()
+        sequential = [fetcher.fetch_by_cadnum(c) for c in self._cadnums(self.BATCH, "0101001")]
+        t_sequential = time.perf_counter() - start
+        fetcher.close()
+
+        fetcher = self._fetcher()
+        start = time.perf_counter()
+        batch = fetcher.fetch_multiple(self._cadnums(self.BATCH, "0101002"))
+        t_batch = time.perf_counter() - start
+        max_active = self.state.max_active
+        fetcher.close()
+
+        self.logger.data(
+            "Последовательно",
+            f"{t_sequential:.2f} сек ({self.BATCH / t_sequential:.1f} КН/сек)"
+        )
+        self.logger.data(
+            "Пакетно",
+            f"{t_batch:.2f} сек ({self.BATCH / t_batch:.1f} КН/сек), одновременно {max_active}"
+        )
+        self.logger.check(
+            all(r.error is None and r.geometry for r in sequential + batch),
+            "Все КН загружены с геометрией",
+            "Есть КН без геометрии"
+        )
+        self.logger.check(
+            t_batch * 2 < t_sequential,
+            f"Ускорение x{t_sequential / t_batch:.1f}",
+            f"Пакетная загрузка не быстрее: {t_batch:.2f} против {t_sequential:.2f} сек"
+        )
+        self.logger.check(
+            1 < max_active <= NSPD_SEARCH_HOST_LIMIT,
+            f"Одновременных запросов {max_active} <= {NSPD_SEARCH_HOST_LIMIT}",
+            f"Одновременных запросов {max_active}, лимит {NSPD_SEARCH_HOST_LIMIT}"
+        )
+
+    def test_02_coalescing(self) -> None:
+        """ТЕСТ 2: дубли КН"""
+        self.logger.section("2. Объединение дублей")
+        fetcher = self._fetcher()
+        cadnums = ["77:01:0202001:1", " 77:01:0202001:1", "77:01:0202001: 1", "77:01:0202001:2"]
+
+        results = fetcher.fetch_multiple(cadnums)
+        fetcher.close()
+        self.logger.check(
+            self.state.queries == {"77:01:0202001:1": 1, "77:01:0202001:2": 1},
+            "Один запрос на уникальный КН",
+            f"Запросы стаба: {self.state.queries}"
+        )
+        self.logger.check(
+            len(results) == 4 and results[0] is results[1] is results[2]
+            and fetcher.stats['coalesced'] == 2,
+            "Результат выдан каждому вхождению",
+            f"Результатов {len(results)}, статистика {fetcher.stats}"
+        )
+
+    def test_03_cache(self) -> None:
+        """ТЕСТ 3: кэш результатов"""
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_16_1_nspd_fetcher import (
+            NOT_FOUND_ERROR,
+        )
+        self.logger.section("3. Кэш по КН")
+        fetcher = self._fetcher()
+        cadnums = ["77:01:0303001:1", "77:01:0303001:0", "77:01:0303001:999"]
+
+        first = fetcher.fetch_multiple(cadnums)
+        requests_first = self.state.requests
+        second = fetcher.fetch_multiple(cadnums)
+        requests_second = self.state.requests - requests_first
+
+        self.logger.check(
+            first[1].error == NOT_FOUND_ERROR and first[2].error is not None,
+            "Стаб: найден / не найден / ошибка сервера",
+            f"Ответы: {[r.error for r in first]}"
+        )
+        self.logger.check(
+            requests_second == 1 and self.state.queries["77:01:0303001:999"] == 2
+            and second[0] is first[0] and second[1] is first[1],
+            "Повторно запрошен только КН с ошибкой сервера",
+            f"Повторных запросов {requests_second}: {self.state.queries}"
+        )
+
+        import Daman_QGIS.managers.infrastructure.submodules.Msm_16_1_nspd_fetcher as module
+        saved_ttl = module.NSPD_SEARCH_CACHE_TTL_SECONDS
+        module.NSPD_SEARCH_CACHE_TTL_SECONDS = 0.1
+        try:
+            time.sleep(0.2)
+            before = self.state.requests
+            fetcher.fetch_by_cadnum("77:01:0303001:1")
+            expired_requests = self.state.requests - before
+        finally:
+            module.NSPD_SEARCH_CACHE_TTL_SECONDS = saved_ttl
+            fetcher.close()
+        self.logger.check(
+            expired_requests == 1,
+            "Устаревшая запись запрошена заново",
+            f"TTL не соблюдается: запросов {expired_requests}"
+        )
+
+    def test_04_streaming(self) -> None:
+        """ТЕСТ 4: выдача результатов по мере готовности"""
+        self.logger.section("4. Потоковая выдача")
+        fetcher = self._fetcher()
+        self.state.latency = 0.2
+        try:
+            start = time.perf_counter()
+            first_at = None
+            received = 0
+            for _cadnum, _result in fetcher.iter_multiple(self._cadnums(16, "0404001")):
+                received += 1
+                if first_at is None:
+                    first_at = time.perf_counter() - start
+            total = time.perf_counter() - start
+        finally:
+            self.state.latency = self.LATENCY
+            fetcher.close()
+
+        self.logger.data("Первый результат / весь пакет", f"{first_at:.2f} / {total:.2f} сек")
+        self.logger.check(
+            received == 16 and first_at < total / 2,
+            "Первый результат получен до завершения пакета",
+            f"Получено {received}, первый через {first_at:.2f} из {total:.2f} сек"
+        )
+
+    def test_05_retry(self) -> None:
+        """ТЕСТ 5: повтор 429 с Retry-After, 403 без повтора"""
+        self.logger.section("5. Повторные попытки")
+        fetcher = self._fetcher()
+        fetcher.MAX_RETRIES = 3
+        fetcher.RETRY_BASE_DELAY = 0.05
+        try:
+            start = time.perf_counter()
+            limited = fetcher.fetch_by_cadnum("77:01:0505001:429")
+            waited = time.perf_counter() - start
+            forbidden = fetcher.fetch_by_cadnum("77:01:0505001:403")
+        finally:
+            fetcher.close()
+
+        self.logger.check(
+            limited.error is None and self.state.queries["77:01:0505001:429"] == 2 and waited >= 0.3,
+            f"429: повтор после Retry-After ({waited:.2f} сек)",
+            f"429: {limited.error}, запросов {self.state.queries.get('77:01:0505001:429')}, {waited:.2f} сек"
+        )
+        self.logger.check(
+            forbidden.error is not None and self.state.queries["77:01:0505001:403"] == 1,
+            "403: без повторных запросов",
+            f"403: запросов {self.state.queries.get('77:01:0505001:403')}"
+        )
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_16_2_cadnum_index - Индекс КН и префиксное дерево M_16 (Msm_16_2)
+
+Проверяет:
+1. CadnumPrefixTrie: вставка/удаление, неполный сегмент, число вариантов
+2. Индекс слоя: поиск fid, дубли КН, объекты без КН
+3. Инкрементальное обновление: добавление/удаление/правка КН в буфере,
+   откат, сохранение; запись в провайдер в обход буфера
+4. p95 на 3 слоях x 20 000 объектов: поиск (selectByExpression IN
+   vs selectByIds по индексу) и автодополнение (перебор getFeatures vs дерево)
+"""
+
+import random
+import time
+from typing import Any, List
+
+
+class TestCadnumIndex:
+    """Тесты Msm_16_2_CadnumIndex"""
+
+    LAYERS = 3
+    FEATURES_PER_LAYER = 20000
+    REPEATS = 30
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.layers = []
+        self._saved_instance = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Msm_16_2: индекс кадастровых номеров")
+
+        try:
+            self._init_index()
+            self.test_01_trie()
+            self.test_02_layer_index()
+            self.test_03_incremental()
+            self.test_04_p95_latency()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Msm_16_2: {str(e)}")
+        finally:
+            self._restore_index()
+            self._remove_layers()
+
+        self.logger.summary()
+
+    def _init_index(self) -> None:
+        """Свой singleton индекса на время тестов (индекс сессии не трогаем)"""
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_16_2_cadnum_index import (
+            Msm_16_2_CadnumIndex,
+        )
+        self._saved_instance = Msm_16_2_CadnumIndex._instance
+        Msm_16_2_CadnumIndex._instance = None
+
+    def _restore_index(self) -> None:
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_16_2_cadnum_index import (
+            Msm_16_2_CadnumIndex,
+        )
+        Msm_16_2_CadnumIndex.reset_instance()
+        Msm_16_2_CadnumIndex._instance = self._saved_instance
+
+    def _layer(self, name: str, cadnums: List[Any]):
+        """Memory-слой с полем cad_num, добавленный в проект (без легенды)"""
+        from qgis.core import QgsFeature, QgsField, QgsProject, QgsVectorLayer
+        from qgis.PyQt.QtCore import QVariant
+
+        layer = QgsVectorLayer("Point?crs=EPSG:3857", name, "memory")
+        provider = layer.dataProvider()
+        provider.addAttributes([QgsField("cad_num", QVariant.String)])
+        layer.updateFields()
+        features = []
+        for cadnum in cadnums:
+            feature = QgsFeature(layer.fields())
+            feature.setAttribute("cad_num", cadnum)
+            features.append(feature)
+        provider.addFeatures(features)
+        QgsProject.instance().addMapLayer(layer, False)
+        self.layers.append(layer)
+        return layer
+
+    def _remove_layers(self) -> None:
+        from qgis.core import QgsProject
+        for layer in self.layers:
+            QgsProject.instance().removeMapLayer(layer.id())
+        self.layers = []
+
+    @staticmethod
+    def _cadnums(district: int, count: int) -> List[str]:
+        return [f"77:{district:02d}:{1000000 + i // 100:07d}:{i % 100 + 1}" for i in range(count)]
+
+    @staticmethod
+    def _p95(samples: List[float]) -> float:
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+
+    def test_01_trie(self) -> None:
+        """ТЕСТ 1: префиксное дерево"""
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_16_2_cadnum_index import (
+            CadnumPrefixTrie,
+        )
+        self.logger.section("1. Префиксное дерево")
+        trie = CadnumPrefixTrie()
+        for cadnum in ["77:01:0001001:1", "77:01:0001001:12", "77:01:0001001:2",
+                       "77:01:0001002:1", "77:02:0001001:1", "77:01:0001001:1"]:
+            trie.insert(cadnum)
+
+        self.logger.check(
+            len(trie) == 5 and trie.complete("77:01:0001001:1", 10) == (2, ["77:01:0001001:1", "77:01:0001001:12"]),
+            "Неполный сегмент: '...:1' -> :1 и :12, дубль не учтён",
+            f"Всего {len(trie)}, варианты {trie.complete('77:01:0001001:1', 10)}"
+        )
+        self.logger.check(
+            trie.complete("77:01:000100", 2) == (4, ["77:01:0001001:1", "77:01:0001001:12"])
+            and trie.complete("7", 10)[0] == 5 and trie.complete("78:", 10) == (0, []),
+            "Число вариантов и limit",
+            f"77:01:000100 -> {trie.complete('77:01:000100', 2)}"
+        )
+
+        trie.remove("77:01:0001001:1")
+        trie.remove("77:01:0001002:1")
+        trie.remove("77:99:0000000:1")
+        self.logger.check(
+            len(trie) == 3 and not trie.contains("77:01:0001001:1")
+            and trie.contains("77:01:0001001:12") and trie.complete("77:01:0001002", 5) == (0, []),
+            "Удаление: пустые ветви убраны, соседи сохранены",
+            f"Всего {len(trie)}"
+        )
+
+    def test_02_layer_index(self) -> None:
+        """ТЕСТ 2: поиск по индексу"""
+        from Daman_QGIS.managers.infrastructure.M_16_cadnum_search_manager import CadnumSearchManager
+        self.logger.section("2. Поиск в слое")
+        layer = self._layer("T_16_2_search", ["77:01:0001001:1", "77:01:0001001:2",
+                                              "77:01:0001001:1", None, ""])
+
+        features, found = CadnumSearchManager.search_in_layer(layer, ["77:01:0001001:1", "77:01:0009999:1"])
+        self.logger.check(
+            len(features) == 2 and sorted(found) == ["77:01:0001001:1"] * 2
+            and layer.selectedFeatureCount() == 2,
+            "Оба объекта с одинаковым КН найдены и выделены",
+            f"Найдено {len(features)}: {found}"
+        )
+        self.logger.check(
+            CadnumSearchManager.get_autocomplete_suggestions("77:01:0001001:") == ["77:01:0001001:1", "77:01:0001001:2"],
+            "Автодополнение из индекса",
+            f"Варианты: {CadnumSearchManager.get_autocomplete_suggestions('77:01:0001001:')}"
+        )
+
+    def test_03_incremental(self) -> None:
+        """ТЕСТ 3: инкрементальное обновление"""
+        from qgis.core import QgsFeature
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_16_2_cadnum_index import (
+            Msm_16_2_CadnumIndex,
+        )
+        self.logger.section("3. Правка слоя")
+        index = Msm_16_2_CadnumIndex.get_instance()
+        layer = self._layer("T_16_2_edit", self._cadnums(1, 500))
+        index.lookup(layer, "cad_num", [])
+        builds = index.builds
+
+        layer.startEditing()
+        feature = QgsFeature(layer.fields())
+        feature.setAttribute("cad_num", "77:01:7777777:1")
+        layer.addFeature(feature)
+        first_fid = next(iter(index.lookup(layer, "cad_num", ["77:01:1000000:1"])))
+        layer.changeAttributeValue(first_fid, layer.fields().indexFromName("cad_num"), "77:01:8888888:1")
+        deleted_fid = index.lookup(layer, "cad_num", ["77:01:1000000:2"])[0]
+        layer.deleteFeature(deleted_fid)
+
+        self.logger.check(
+            len(index.lookup(layer, "cad_num", ["77:01:7777777:1"])) == 1
+            and index.lookup(layer, "cad_num", ["77:01:8888888:1"]) == [first_fid]
+            and not index.lookup(layer, "cad_num", ["77:01:1000000:1", "77:01:1000000:2"])
+            and index.builds == builds,
+            "Добавление, правка КН, удаление - без перестройки индекса",
+            f"Перестроек {index.builds - builds}"
+        )
+
+        layer.rollBack()
+        self.logger.check(
+            len(index.lookup(layer, "cad_num", ["77:01:1000000:1", "77:01:1000000:2"])) == 2
+            and not index.lookup(layer, "cad_num", ["77:01:7777777:1"]),
+            "Откат правки восстанавливает индекс",
+            "Индекс не соответствует слою после отката"
+        )
+
+        layer.startEditing()
+        feature = QgsFeature(layer.fields())
+        feature.setAttribute("cad_num", "77:01:7777777:2")
+        layer.addFeature(feature)
+        layer.commitChanges()
+        fids = index.lookup(layer, "cad_num", ["77:01:7777777:2"])
+        self.logger.check(
+            len(fids) == 1 and fids[0] >= 0 and layer.getFeature(fids[0])["cad_num"] == "77:01:7777777:2",
+            "После сохранения - постоянный fid нового объекта",
+            f"fid после сохранения: {fids}"
+        )
+
+        extra = QgsFeature(layer.fields())
+        extra.setAttribute("cad_num", "77:01:6666666:1")
+        layer.dataProvider().addFeatures([extra])
+        self.logger.check(
+            len(index.lookup(layer, "cad_num", ["77:01:6666666:1"])) == 1,
+            "Запись в провайдер в обход буфера обнаружена",
+            "Индекс не увидел объект, записанный в провайдер"
+        )
+
+    def test_04_p95_latency(self) -> None:
+        """ТЕСТ 4: p95 поиска и автодополнения"""
+        from qgis.core import QgsExpression, QgsVectorLayer
+        from Daman_QGIS.managers.infrastructure.M_16_cadnum_search_manager import CadnumSearchManager
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_16_2_cadnum_index import (
+            Msm_16_2_CadnumIndex,
+        )
+        total = self.LAYERS * self.FEATURES_PER_LAYER
+        self.logger.section(f"4. p95: {self.LAYERS} слоя x {self.FEATURES_PER_LAYER} объектов")
+
+        self._remove_layers()
+        Msm_16_2_CadnumIndex.reset_instance()
+        all_cadnums = []
+        for district in range(1, self.LAYERS + 1):
+            cadnums = self._cadnums(10 + district, self.FEATURES_PER_LAYER)
+            all_cadnums.extend(cadnums)
+            self._layer(f"T_16_2_p95_{district}", cadnums)
+
+        start = time.perf_counter()
+        for layer in self.layers:
+            Msm_16_2_CadnumIndex.get_instance().lookup(layer, "cad_num", [])
+        t_build = time.perf_counter() - start
+        self.logger.data("Построение индекса", f"{t_build:.2f} сек на {total} объектов")
+
+        rng = random.Random(16)
+        queries = [rng.sample(all_cadnums, 50) for _ in range(self.REPEATS)]
+
+        legacy, indexed = [], []
+        for query in queries:
+            start = time.perf_counter()
+            values = ', '.join(QgsExpression.quotedValue(c) for c in query)
+            for layer in self.layers:
+                layer.selectByExpression(f'"cad_num" IN ({values})', QgsVectorLayer.SetSelection)
+                layer.selectedFeatures()
+            legacy.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            found = 0
+            for layer in self.layers:
+                found += len(CadnumSearchManager.search_in_layer(layer, query)[0])
+            indexed.append(time.perf_counter() - start)
+
+        self.logger.data("Поиск 50 КН, p95", f"выражение {self._p95(legacy):.1f} мс, индекс {self._p95(indexed):.1f} мс")
+        self.logger.check(
+            found == 50 and self._p95(indexed) < self._p95(legacy),
+            "Поиск по индексу быстрее selectByExpression",
+            f"Найдено {found}, p95 индекс {self._p95(indexed):.1f} / выражение {self._p95(legacy):.1f} мс"
+        )
+
+        prefixes = [c[:-1] for c in rng.sample(all_cadnums, self.REPEATS)]
+        legacy, indexed = [], []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            suggestions = set()
+            for layer in self.layers:
+                for feature in layer.getFeatures():
+                    value = feature.attribute("cad_num")
+                    if value and str(value).startswith(prefix):
+                        suggestions.add(str(value))
+            legacy.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            CadnumSearchManager.get_autocomplete_suggestions(prefix)
+            indexed.append(time.perf_counter() - start)
+
+        self.logger.data(
+            "Автодополнение, p95",
+            f"перебор {self._p95(legacy):.1f} мс, дерево {self._p95(indexed):.1f} мс"
+        )
+        self.logger.check(
+            self._p95(indexed) * 10 < self._p95(legacy),
+            f"Автодополнение из дерева быстрее в {self._p95(legacy) / max(self._p95(indexed), 1e-6):.0f} раз",
+            f"p95 дерево {self._p95(indexed):.1f} / перебор {self._p95(legacy):.1f} мс"
+        )
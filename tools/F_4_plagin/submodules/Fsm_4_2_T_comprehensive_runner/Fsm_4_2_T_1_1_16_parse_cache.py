@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_1_16_parse_cache - Кэш разобранных XML ЕГРН (Fsm_1_1_16)
+
+Проверяет:
+1. get/put: WKB и атрибуты возвращаются без изменений, промах/попадание;
+   get() читает объекты лениво пачками (не список), порядок сохраняется;
+   предупреждения разбора повторяются в логе при попадании
+2. LRU: сверх max_bytes вытесняется запись с самым давним обращением
+3. Инвалидация: запись другой версии не выдаётся; удаляется только
+   давно не использованная (папка проекта общая)
+4. КПТ: parse_files с кэшем == без кэша, повторный прогон - только попадания,
+   изменённый файл - промах (замер времени парсинга vs кэша)
+5. Выписки: наблюдения детектора непокрытых веток (Msm_4_17), записанные
+   при разборе, воспроизводятся из meta кэша с той же сводкой
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Any, Dict, List
+
+
+class TestF1116ParseCache:
+    """Тесты кэша разбора XML"""
+
+    FILE_COUNT = 3
+    RECORDS_PER_FILE = 1000
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Fsm_1_1_16: кэш разбора XML")
+
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_parse_cache_")
+        try:
+            self.test_01_roundtrip()
+            self.test_02_lru_eviction()
+            self.test_03_version_invalidation()
+            try:
+                from lxml import etree  # noqa: F401
+                self.test_04_kpt_parse_with_cache()
+            except ImportError:
+                self.logger.warning("lxml не установлен - тест КПТ пропущен")
+            self.test_05_holder_coverage_replay()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_1_1_16: {str(e)}")
+        finally:
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+
+        self.logger.summary()
+
+    def _cache(self, name: str, version: int = 1, **kwargs):
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_16_parse_cache import Fsm_1_1_16_ParseCache
+        return Fsm_1_1_16_ParseCache(os.path.join(self.test_dir, name), "test", version, **kwargs)
+
+    def _generate_kpt_files(self) -> List[str]:
+        """FILE_COUNT файлов КПТ без пересечения КН"""
+        paths = []
+        for file_index in range(self.FILE_COUNT):
+            records = []
+            for number in range(file_index * self.RECORDS_PER_FILE, (file_index + 1) * self.RECORDS_PER_FILE):
+                x0 = 500000.0 + (number // 100) * 20.0
+                y0 = 1300000.0 + (number % 100) * 20.0
+                ring = [(x0, y0), (x0 + 10, y0), (x0 + 10, y0 + 10), (x0, y0 + 10), (x0, y0)]
+                ordinates = "".join(
+                    f"<ordinate><x>{x:.2f}</x><y>{y:.2f}</y><delta_geopoint>0.1</delta_geopoint></ordinate>"
+                    for x, y in ring
+                )
+                records.append(
+                    "<land_record><object><common_data>"
+                    f"<cad_number>77:01:0001001:{number}</cad_number></common_data></object>"
+                    f"<params><area><value>{100 + number % 7}</value></area></params>"
+                    "<contours_location><contours><contour><entity_spatial><spatial_elements>"
+                    f"<spatial_element><ordinates>{ordinates}</ordinates></spatial_element>"
+                    "</spatial_elements></entity_spatial></contour></contours></contours_location>"
+                    "</land_record>"
+                )
+            xml = (
+                '<?xml version="1.0" encoding="utf-8"?>'
+                "<extract_cadastral_plan_territory><cadastral_blocks><cadastral_block>"
+                f"<cadastral_number>77:01:000100{file_index}</cadastral_number>"
+                f"<record_data><base_data><land_records>{''.join(records)}</land_records>"
+                "</base_data></record_data></cadastral_block></cadastral_blocks>"
+                "</extract_cadastral_plan_territory>"
+            )
+            path = os.path.join(self.test_dir, f"kpt_{file_index}.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(xml)
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def _create_parser():
+        from Daman_QGIS.core.kpt.attributes import KptAttributeExtractor
+        from Daman_QGIS.core.kpt.geometry import extract_geometry
+        from Daman_QGIS.core.kpt.parser import KptParser
+        from Daman_QGIS.tools.F_1_data.submodules import Fsm_1_1_5_kpt_importer
+        map_path = os.path.join(os.path.dirname(Fsm_1_1_5_kpt_importer.__file__), "attribute_map.json")
+        with open(map_path, "r", encoding="utf-8") as f:
+            attribute_map = json.load(f)
+        return KptParser(
+            geometry_extractor=extract_geometry,
+            attribute_extractor=KptAttributeExtractor(attribute_map)
+        )
+
+    @staticmethod
+    def _snapshot(result) -> Dict[str, Any]:
+        """Сравнимое представление (cached_features, schemas, record_count)"""
+        cached_features, schemas, record_count = result
+
+        def _item(data):
+            geom, attrs = data[0], data[1]
+            return (bytes(geom.asWkb()) if geom is not None else None, sorted(attrs.items()))
+
+        features = {
+            layer_key: (
+                {key: _item(data) for key, data in layer_cache["keyed"].items()},
+                [_item(data) for data in layer_cache["unkeyed"]],
+            )
+            for layer_key, layer_cache in cached_features.items()
+        }
+        return {"features": features, "schemas": schemas, "records": record_count}
+
+    def test_01_roundtrip(self) -> None:
+        """ТЕСТ 1: get/put"""
+        self.logger.section("1. Запись и чтение")
+        cache = self._cache("roundtrip.sqlite")
+        rows = [
+            ("land_record_MultiPolygon", b"\x01\x02\x03", {"cad_number": "77:01:1:1", "area": 12.5}),
+            ("land_record_NoGeometry", None, {"cad_number": "77:01:1:2", "note": "Кириллица"}),
+        ]
+        try:
+            self.logger.check(cache.get("digest-1") is None, "Пустой кэш - промах", "Попадание в пустом кэше")
+            cache.put("digest-1", {"record_count": 2}, rows)
+            meta, lazy_rows = cache.get("digest-1")
+            entry = (meta, list(lazy_rows))
+            self.logger.check(
+                not isinstance(lazy_rows, list) and entry == ({"record_count": 2}, rows),
+                "Объекты (ленивый итератор) и meta возвращены без изменений",
+                f"Расхождение после чтения: {entry}"
+            )
+
+            # Запись больше пачки чтения: все объекты по порядку
+            many = [("k", None, {"n": n}) for n in range(cache._FETCH_BATCH * 2 + 7)]
+            cache.put("digest-many", {}, many)
+            _, lazy_many = cache.get("digest-many")
+            first = next(lazy_many)
+            self.logger.check(
+                first == many[0] and [first] + list(lazy_many) == many,
+                f"{len(many)} объектов прочитаны пачками по {cache._FETCH_BATCH} в исходном порядке",
+                "Пачечное чтение потеряло или переставило объекты"
+            )
+            self.logger.check(
+                cache.hits == 2 and cache.misses == 1,
+                f"Счётчики: {cache.report()}",
+                f"Неверные счётчики: hits={cache.hits}, misses={cache.misses}"
+            )
+
+            from Daman_QGIS.utils import capture_log_messages
+            warning = ("WARNING", "KptParser: Ошибка чтения заголовка test.xml")
+            cache.put("digest-warn", {"record_count": 1}, rows[:1], [warning])
+            with capture_log_messages() as replayed:
+                meta, lazy_rows = cache.get("digest-warn")
+                list(lazy_rows)
+            self.logger.check(
+                replayed == [warning] and meta == {"record_count": 1},
+                "Предупреждение разбора повторено при попадании",
+                f"Повторено {replayed}, meta {meta}"
+            )
+            self.logger.check(
+                not cache.put("digest-2", {}, [("k", None, {"bad": object()})]),
+                "Несериализуемые атрибуты не кэшируются",
+                "Несериализуемые атрибуты записаны в кэш"
+            )
+        finally:
+            cache.close()
+
+    def test_02_lru_eviction(self) -> None:
+        """ТЕСТ 2: LRU-вытеснение"""
+        self.logger.section("2. LRU-вытеснение по max_bytes")
+        cache = self._cache("lru.sqlite", max_bytes=1000)
+        try:
+            for name in ("a", "b"):
+                cache.put(name, {}, [("k", b"\x00" * 400, {})])
+                time.sleep(0.01)
+            list(cache.get("a")[1])  # a - свежее b (дочитана - не закреплена)
+            time.sleep(0.01)
+            cache.put("c", {}, [("k", b"\x00" * 400, {})])
+
+            alive = {name: cache.get(name) is not None for name in ("a", "b", "c")}
+            self.logger.check(
+                alive == {"a": True, "b": False, "c": True} and cache.evicted == 1,
+                "Вытеснена запись с самым давним обращением (b)",
+                f"Неверное вытеснение: {alive}, вытеснено {cache.evicted}"
+            )
+        finally:
+            cache.close()
+
+    def test_03_version_invalidation(self) -> None:
+        """ТЕСТ 3: смена версии импортера"""
+        self.logger.section("3. Инвалидация по версии")
+        cache = self._cache("version.sqlite", version=1)
+        cache.put("digest", {}, [("k", None, {"v": 1})])
+        cache.close()
+
+        same = self._cache("version.sqlite", version=1)
+        hit_same = same.get("digest") is not None
+        same.close()
+
+        bumped = self._cache("version.sqlite", version=2)
+        hit_bumped = bumped.get("digest") is not None
+        bumped.close()
+
+        # Коллега с прежней версией: недавняя запись не удалена
+        other = self._cache("version.sqlite", version=1)
+        hit_other = other.get("digest") is not None
+        other.close()
+
+        from Daman_QGIS.constants import XML_PARSE_CACHE_STALE_SECONDS
+        path = os.path.join(self.test_dir, "version.sqlite")
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute(
+                "UPDATE parse_entries SET last_access = ?",
+                (time.time() - XML_PARSE_CACHE_STALE_SECONDS - 60,)
+            )
+        conn.close()
+        self._cache("version.sqlite", version=2).close()
+        conn = sqlite3.connect(path)
+        remaining = conn.execute("SELECT COUNT(*) FROM parse_entries").fetchone()[0]
+        conn.close()
+
+        self.logger.check(hit_same, "Та же версия - попадание", "Та же версия - промах")
+        self.logger.check(not hit_bumped, "Новая версия - запись другой версии не выдана", "Запись другой версии отдана")
+        self.logger.check(hit_other, "Свежая запись другой версии сохранена", "Свежая запись другой версии удалена")
+        self.logger.check(remaining == 0, "Давно не использованная запись другой версии удалена",
+                          f"Записей после открытия: {remaining}")
+
+    def test_04_kpt_parse_with_cache(self) -> None:
+        """ТЕСТ 4: parse_files КПТ с кэшем"""
+        self.logger.section("4. КПТ: парсинг через кэш")
+        files = self._generate_kpt_files()
+        parser = self._create_parser()
+
+        start = time.perf_counter()
+        expected = self._snapshot(parser.parse_files(files))
+        t_parse = time.perf_counter() - start
+
+        cache = self._cache("kpt.sqlite")
+        try:
+            first = self._snapshot(parser.parse_files(files, parse_cache=cache))
+            self.logger.check(
+                first == expected and cache.misses == self.FILE_COUNT and cache.stored == self.FILE_COUNT,
+                f"Первый прогон = без кэша, сохранено файлов: {cache.stored}",
+                f"Первый прогон расходится (промахов {cache.misses}, сохранено {cache.stored})"
+            )
+
+            start = time.perf_counter()
+            second = self._snapshot(parser.parse_files(files, parse_cache=cache))
+            t_cached = time.perf_counter() - start
+            self.logger.check(
+                second == expected and cache.hits == self.FILE_COUNT,
+                f"Повторный прогон из кэша: {cache.report()}",
+                f"Повторный прогон расходится: {cache.report()}"
+            )
+
+            with open(files[0], "a", encoding="utf-8") as f:
+                f.write("\n")
+            misses_before = cache.misses
+            parser.parse_files(files, parse_cache=cache)
+            self.logger.check(
+                cache.misses == misses_before + 1,
+                "Изменённый файл - промах, остальные - попадания",
+                f"Неверное число промахов: {cache.misses - misses_before}"
+            )
+
+            self.logger.data("Парсинг, сек", f"{t_parse:.2f}")
+            self.logger.data("Из кэша, сек", f"{t_cached:.2f}")
+            if t_cached < t_parse:
+                self.logger.success(f"Кэш быстрее парсинга (x{t_parse / t_cached:.1f})")
+            else:
+                self.logger.warning(f"Кэш не быстрее парсинга ({t_cached:.2f} >= {t_parse:.2f} сек)")
+        finally:
+            cache.close()
+
+    def test_05_holder_coverage_replay(self) -> None:
+        """ТЕСТ 5: детектор Msm_4_17 при попадании в кэш"""
+        self.logger.section("5. Выписки: детектор непокрытых веток из кэша")
+        from Daman_QGIS.managers import FieldMappingManager
+
+        mapper = FieldMappingManager()
+        mapper.reset_uncovered_branch_stats()
+        mapper.start_holder_coverage_capture()
+        # Как _register_holder_coverage при разборе двух объектов
+        mapper._apply_holder_coverage("77:01:1:1", "right_holder", 3, ["individual", "another/other"])
+        mapper._apply_holder_coverage("77:01:1:2", "right_holder", 1, [])
+        events = mapper.stop_holder_coverage_capture()
+        parsed_stats = mapper.get_uncovered_branch_stats()
+
+        cache = self._cache("holders.sqlite")
+        try:
+            cache.put("vypiska", {"holder_coverage": events}, [("land_record", None, {})])
+            meta, rows = cache.get("vypiska")
+            list(rows)
+        finally:
+            cache.close()
+
+        mapper.reset_uncovered_branch_stats()
+        mapper.replay_holder_coverage(meta.get("holder_coverage", []))
+        self.logger.check(
+            mapper.get_uncovered_branch_stats() == parsed_stats and mapper._checked_holders == 4,
+            f"Сводка из кэша = сводка разбора: {parsed_stats}",
+            f"Из кэша {mapper.get_uncovered_branch_stats()}, при разборе {parsed_stats}"
+        )
+        mapper.reset_uncovered_branch_stats()
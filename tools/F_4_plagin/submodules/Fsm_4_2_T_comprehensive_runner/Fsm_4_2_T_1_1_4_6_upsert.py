@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_1_4_6_upsert - Инкрементальный upsert слоёв выписок (Fsm_1_1_4_6)
+
+Проверяет:
+1. Пачка с пересечением КН: заменены только совпавшие строки, остальные
+   сохранены, пустая Площадь взята из старой строки, индекс ключа создан
+2. Пачка без пересечения: реимпорт - слой заменён целиком
+3. Составной ключ (КН_родителя + Номер_части) для слоя частей
+4. Upsert пачки и прежняя полная перезапись слоя дают одинаковый слой
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+from typing import Any, Dict, List
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem, QgsCoordinateTransformContext, QgsFeature,
+    QgsField, QgsGeometry, QgsVectorFileWriter, QgsVectorLayer,
+)
+from qgis.PyQt.QtCore import QMetaType
+
+
+class TestF1146Upsert:
+    """Тесты инкрементального upsert в GPKG"""
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+        self.crs = QgsCoordinateReferenceSystem("EPSG:3857")
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Fsm_1_1_4_6: инкрементальный upsert")
+
+        try:
+            from osgeo import ogr  # noqa: F401
+        except ImportError:
+            self.logger.warning("osgeo недоступен - тесты пропущены")
+            self.logger.summary()
+            return
+
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_upsert_")
+        try:
+            self.test_01_upsert_overlap()
+            self.test_02_reimport_replaces()
+            self.test_03_composite_key()
+            self.test_04_matches_rewrite()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_1_1_4_6: {str(e)}")
+        finally:
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+
+        self.logger.summary()
+
+    @staticmethod
+    def _square(number: int) -> QgsGeometry:
+        x0 = 500000.0 + (number // 100) * 20.0
+        y0 = 1300000.0 + (number % 100) * 20.0
+        return QgsGeometry.fromWkt(
+            f"MultiPolygon((({x0} {y0}, {x0 + 10} {y0}, {x0 + 10} {y0 + 10}, {x0} {y0 + 10}, {x0} {y0})))"
+        )
+
+    def _row(self, number: int, area: Any, key_fields: List[str]) -> Dict[str, Any]:
+        if key_fields == ["КН"]:
+            row = {"КН": f"77:01:0001001:{number}"}
+        else:
+            row = {"КН_родителя": f"77:01:0001001:{number // 3}", "Номер_части": str(number % 3 + 1)}
+        row.update({"Площадь": area, "Значение": None, "geometry": self._square(number)})
+        return row
+
+    def _create_gpkg(self, name: str, layer_name: str, rows: List[Dict[str, Any]]) -> str:
+        """GPKG со слоем MultiPolygon из rows"""
+        layer = QgsVectorLayer(f"MultiPolygon?crs={self.crs.authid()}", layer_name, "memory")
+        provider = layer.dataProvider()
+        field_names = [k for k in rows[0] if k != "geometry"]
+        provider.addAttributes([QgsField(n, QMetaType.Type.QString) for n in field_names])
+        layer.updateFields()
+
+        features = []
+        for row in rows:
+            feature = QgsFeature(layer.fields())
+            feature.setAttributes([row[n] for n in field_names])
+            feature.setGeometry(row["geometry"])
+            features.append(feature)
+        provider.addFeatures(features)
+
+        gpkg_path = os.path.join(self.test_dir, name)
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "GPKG"
+        options.layerName = layer_name
+        QgsVectorFileWriter.writeAsVectorFormatV3(layer, gpkg_path, QgsCoordinateTransformContext(), options)
+        return gpkg_path
+
+    @staticmethod
+    def _existing(gpkg_path: str, layer_name: str) -> QgsVectorLayer:
+        return QgsVectorLayer(f"{gpkg_path}|layername={layer_name}", layer_name, "ogr")
+
+    @staticmethod
+    def _areas(layer: QgsVectorLayer, key: str = "КН") -> Dict[str, Any]:
+        return {str(f[key]): f["Площадь"] for f in layer.getFeatures()}
+
+    def test_01_upsert_overlap(self) -> None:
+        """ТЕСТ 1: пересечение КН"""
+        self.logger.section("1. Замена только совпавших строк")
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_4_vypiska_importer import (
+            Fsm_1_1_4_6_layer_splitter as splitter,
+        )
+
+        key = ["КН"]
+        gpkg = self._create_gpkg("overlap.gpkg", "Le_test_zu", [self._row(n, "100", key) for n in range(10)])
+        batch = [self._row(n, None, key) for n in (3, 4)] + [self._row(n, "50", key) for n in (10, 11)]
+        batch[1]["Площадь"] = "77"
+
+        updated = splitter._upsert_layer_incremental(batch, key, "Le_test_zu", gpkg, "MultiPolygon")
+        self.logger.check(updated is not None, "Upsert выполнен", "Upsert вернул None")
+        if updated is None:
+            return
+
+        areas = self._areas(updated)
+        self.logger.check(
+            updated.featureCount() == 12 and len(areas) == 12,
+            "Совпавшие строки заменены, новые добавлены (12 объектов)",
+            f"Неверное число объектов: {updated.featureCount()}"
+        )
+        self.logger.check(
+            areas.get("77:01:0001001:3") == "100" and areas.get("77:01:0001001:4") == "77",
+            "Пустая Площадь перенесена из старой строки, заполненная - обновлена",
+            f"Неверный перенос Площади: {areas.get('77:01:0001001:3')}, {areas.get('77:01:0001001:4')}"
+        )
+
+        with sqlite3.connect(gpkg) as conn:
+            index = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Le_test_zu' "
+                "AND name LIKE 'idx_%_dedup_key'"
+            ).fetchone()
+        self.logger.check(index is not None, f"Индекс ключа создан: {index}", "Индекс ключа не создан")
+
+    def test_02_reimport_replaces(self) -> None:
+        """ТЕСТ 2: без пересечения - замена слоя"""
+        self.logger.section("2. Реимпорт без пересечения")
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_4_vypiska_importer import (
+            Fsm_1_1_4_6_layer_splitter as splitter,
+        )
+
+        key = ["КН"]
+        gpkg = self._create_gpkg("reimport.gpkg", "Le_test_zu", [self._row(n, "100", key) for n in range(10)])
+        batch = [self._row(n, "5", key) for n in range(100, 103)]
+
+        updated = splitter._upsert_layer_incremental(batch, key, "Le_test_zu", gpkg, "MultiPolygon")
+        self.logger.check(
+            updated is not None and sorted(self._areas(updated)) == [r["КН"] for r in batch],
+            "Слой заменён новыми объектами",
+            f"Реимпорт не заменил слой: {None if updated is None else updated.featureCount()}"
+        )
+
+    def test_03_composite_key(self) -> None:
+        """ТЕСТ 3: КН_родителя + Номер_части"""
+        self.logger.section("3. Составной ключ частей")
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_4_vypiska_importer import (
+            Fsm_1_1_4_6_layer_splitter as splitter,
+        )
+
+        key = ["КН_родителя", "Номер_части"]
+        gpkg = self._create_gpkg("parts.gpkg", "Le_test_chzu", [self._row(n, "1", key) for n in range(9)])
+        # Тот же КН_родителя (0), другой номер части - не дубликат
+        batch = [self._row(0, "2", key), dict(self._row(1, "3", key), Номер_части="9")]
+
+        updated = splitter._upsert_layer_incremental(batch, key, "Le_test_chzu", gpkg, "MultiPolygon")
+        parts = set() if updated is None else {
+            (f["КН_родителя"], str(f["Номер_части"])) for f in updated.getFeatures()
+        }
+        self.logger.check(
+            updated is not None and updated.featureCount() == 10 and ("77:01:0001001:0", "9") in parts,
+            "Заменена одна часть, добавлена новая (10 объектов)",
+            f"Неверный upsert частей: {0 if updated is None else updated.featureCount()}"
+        )
+
+    def test_04_matches_rewrite(self) -> None:
+        """ТЕСТ 4: upsert = полная перезапись"""
+        self.logger.section("4. Upsert vs полная перезапись")
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_4_vypiska_importer import (
+            Fsm_1_1_4_6_layer_splitter as splitter,
+        )
+
+        key = ["КН"]
+        rows = [self._row(n, "100", key) for n in range(200)]
+        gpkg_upsert = self._create_gpkg("upsert.gpkg", "Le_test_zu", rows)
+        gpkg_rewrite = self._create_gpkg("rewrite.gpkg", "Le_test_zu", rows)
+
+        def batch():
+            return [self._row(n, "1", key) for n in range(0, 220, 10)]
+
+        upserted = splitter._upsert_layer_incremental(batch(), key, "Le_test_zu", gpkg_upsert, "MultiPolygon")
+        rewritten = splitter._rewrite_layer_with_deduplication(
+            self._existing(gpkg_rewrite, "Le_test_zu"), batch(), key, "Le_test_zu",
+            gpkg_rewrite, self.crs, "MultiPolygon"
+        )
+
+        self.logger.check(
+            upserted is not None and rewritten is not None
+            and self._areas(upserted) == self._areas(rewritten),
+            "Upsert и полная перезапись дают одинаковый слой",
+            "Результаты upsert и полной перезаписи расходятся"
+        )
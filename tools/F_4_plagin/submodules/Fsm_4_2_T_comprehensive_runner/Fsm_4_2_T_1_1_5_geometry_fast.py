@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_1_5_geometry_fast - Быстрое декодирование координат КПТ/выписок
+
+Сравнивает extract_geometry (пакетный XPath/findall + QgsLineString(xs, ys, [], ms))
+с extract_geometry_reference в core.kpt.geometry (КПТ, lxml) и Fsm_1_1_4_3 (выписки, ElementTree).
+
+Проверяет:
+1. КПТ: идентичность WKB на полигонах с дырами, линиях, точках, без contours
+2. КПТ: нестандартные ordinate (пустой x, битый текст, delta не у всех)
+3. Выписки: идентичность WKB, в т.ч. несколько колец (outer+holes и раздельные)
+"""
+
+import xml.etree.ElementTree as StdET
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class TestF115GeometryFast:
+    """Тесты быстрого пути extract_geometry"""
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.lxml = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ core.kpt.geometry / Fsm_1_1_4_3: быстрое декодирование координат")
+
+        try:
+            from lxml import etree
+            self.lxml = etree
+        except ImportError:
+            self.logger.warning("lxml не установлен - тесты КПТ пропущены")
+
+        try:
+            if self.lxml is not None:
+                self.test_01_kpt_matches_reference()
+                self.test_02_kpt_irregular_ordinates()
+            self.test_03_vypiska_matches_reference()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка: {e}")
+
+        self.logger.summary()
+
+    @staticmethod
+    def _ordinate(x: Any, y: Any, delta: Any = "0.1") -> str:
+        """<ordinate> (x = North, y = East как в XML Росреестра)"""
+        delta_xml = f"<delta_geopoint>{delta}</delta_geopoint>" if delta is not None else ""
+        return f"<ordinate><x>{x}</x><y>{y}</y><ord_nmb>1</ord_nmb>{delta_xml}</ordinate>"
+
+    def _square(self, x0: float, y0: float, size: float, vertices: int = 4) -> str:
+        """spatial_element: замкнутый контур, vertices точек по сторонам квадрата"""
+        points: List[Tuple[float, float]] = []
+        per_side = max(1, vertices // 4)
+        for side in range(4):
+            for step in range(per_side):
+                t = size * step / per_side
+                points.append([
+                    (x0 + t, y0), (x0 + size, y0 + t), (x0 + size - t, y0 + size), (x0, y0 + size - t)
+                ][side])
+        points.append(points[0])
+        ordinates = "".join(self._ordinate(f"{x:.2f}", f"{y:.2f}") for x, y in points)
+        return f"<spatial_element><ordinates>{ordinates}</ordinates></spatial_element>"
+
+    @staticmethod
+    def _raw_element(ordinates: List[str]) -> str:
+        return f"<spatial_element><ordinates>{''.join(ordinates)}</ordinates></spatial_element>"
+
+    @staticmethod
+    def _contour(*elements: str) -> str:
+        return f"<contour><entity_spatial><spatial_elements>{''.join(elements)}</spatial_elements></entity_spatial></contour>"
+
+    def _kpt_record(self, body: str):
+        return self.lxml.fromstring(f"<land_record><contours_location>{body}</contours_location></land_record>")
+
+    def _vypiska_root(self, body: str):
+        return StdET.fromstring(f"<contours_location>{body}</contours_location>")
+
+    @staticmethod
+    def _signature(geometries: Dict) -> Dict[str, Any]:
+        """Сравнимое представление: тип -> WKB (или None)"""
+        return {
+            key: (bytes(geom.asWkb()) if geom is not None else None)
+            for key, geom in geometries.items()
+        }
+
+    def _check_cases(
+        self,
+        cases: List[Tuple[str, str]],
+        build: Callable[[str], Any],
+        fast: Callable,
+        reference: Callable
+    ) -> None:
+        """Для каждого случая: быстрый путь == эталон (по WKB)"""
+        for name, body in cases:
+            # Эталон КПТ перемещает spatial_element без contours - отдельные деревья
+            expected = self._signature(reference(build(body)))
+            actual = self._signature(fast(build(body)))
+            self.logger.check(
+                actual == expected,
+                f"{name}: совпадает ({', '.join(sorted(expected)) or 'пусто'})",
+                f"{name}: расхождение {sorted(actual)} vs {sorted(expected)}"
+            )
+
+    def test_01_kpt_matches_reference(self) -> None:
+        """ТЕСТ 1: КПТ - типовые геометрии"""
+        self.logger.section("1. КПТ: быстрый путь == эталон")
+        from Daman_QGIS.core.kpt.geometry import (
+            extract_geometry, extract_geometry_reference,
+        )
+
+        line = self._raw_element([self._ordinate(0, 0), self._ordinate(5, 5), self._ordinate(9, 1)])
+        point = self._raw_element([self._ordinate(100.5, 200.25, "0.05")])
+        cases = [
+            ("Полигон", self._contour(self._square(0, 0, 100))),
+            ("Полигон с дырой", self._contour(self._square(0, 0, 100), self._square(10, 10, 20))),
+            ("Мультиполигон", self._contour(self._square(0, 0, 10)) + self._contour(self._square(50, 50, 10))),
+            ("Линия + точка", self._contour(line, point)),
+            ("Без contours", self._square(0, 0, 30) + line),
+            ("Без геометрии", "<other/>"),
+        ]
+        self._check_cases(cases, self._kpt_record, extract_geometry, extract_geometry_reference)
+
+    def test_02_kpt_irregular_ordinates(self) -> None:
+        """ТЕСТ 2: КПТ - нестандартные ordinate (поэлементный путь)"""
+        self.logger.section("2. КПТ: нестандартные ordinate")
+        from Daman_QGIS.core.kpt.geometry import (
+            extract_geometry, extract_geometry_reference,
+        )
+
+        base = [self._ordinate(0, 0), self._ordinate(10, 0), self._ordinate(10, 10), self._ordinate(0, 0)]
+        cases = [
+            ("Пустой x", self._contour(self._raw_element(base[:2] + ["<ordinate><x></x><y>3</y></ordinate>"] + base[2:]))),
+            ("Битый текст", self._contour(self._raw_element(base[:2] + [self._ordinate("abc", 3)] + base[2:]))),
+            ("delta не у всех", self._contour(self._raw_element(base[:2] + [self._ordinate(7, 3, None)] + base[2:]))),
+            ("Без delta", self._contour(self._raw_element([self._ordinate(x, y, None) for x, y in
+                                                            [(0, 0), (10, 0), (10, 10), (0, 0)]]))),
+        ]
+        self._check_cases(cases, self._kpt_record, extract_geometry, extract_geometry_reference)
+
+    def test_03_vypiska_matches_reference(self) -> None:
+        """ТЕСТ 3: выписки - быстрый путь == эталон"""
+        self.logger.section("3. Выписки: быстрый путь == эталон")
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_4_vypiska_importer.Fsm_1_1_4_3_geometry import (
+            extract_geometry, extract_geometry_reference,
+        )
+
+        line = self._raw_element([self._ordinate(0, 0), self._ordinate(5, 5)])
+        cases = [
+            ("Полигон", self._contour(self._square(0, 0, 100, 16))),
+            # Дыра указана первой - внешний контур выбирается по площади
+            ("Дыра первой", self._contour(self._square(10, 10, 20), self._square(0, 0, 100))),
+            ("Невложенные кольца", self._contour(self._square(0, 0, 10), self._square(50, 50, 10))),
+            ("Линия + точка", self._contour(line, self._raw_element([self._ordinate(1, 2)]))),
+            ("Без contours", self._square(0, 0, 30) + self._square(100, 100, 5)),
+            ("Пустой y", self._contour(self._raw_element(
+                [self._ordinate(0, 0), "<ordinate><x>3</x><y></y></ordinate>",
+                 self._ordinate(10, 0), self._ordinate(10, 10), self._ordinate(0, 0)]))),
+            ("Без геометрии", "<other/>"),
+        ]
+        self._check_cases(cases, self._vypiska_root, extract_geometry, extract_geometry_reference)
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_1_5_parallel - Параллельный парсинг КПТ (core.kpt.parser, пул процессов)
+
+Проверяет:
+1. Результат max_workers=N совпадает с последовательным (слои, схемы, WKB, атрибуты)
+2. Дедупликация: при дубликате КН побеждает объект из более раннего файла
+3. Прогресс по байтам монотонен и доходит до 95
+4. Wall time: 1 процесс vs N процессов на сгенерированных КПТ
+5. Воркер возвращает ошибки файла родителю (лог процесса пула не виден)
+6. Зависший процесс: в текущем процессе разбираются только незавершённые файлы
+7. Процесс пула не загружает Daman_QGIS.tools и processing
+
+Синтетика: FILE_COUNT файлов КПТ по RECORDS_PER_FILE ЗУ, соседние файлы
+пересекаются на OVERLAP записей (одинаковый КН, разный адрес).
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+
+class TestF115Parallel:
+    """Тесты параллельного режима KptParser"""
+
+    FILE_COUNT = 6
+    RECORDS_PER_FILE = 3000
+    OVERLAP = 100
+    WORKERS = 4
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+        self.file_paths: List[str] = []
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ KptParser: параллельный парсинг КПТ")
+
+        try:
+            from lxml import etree  # noqa: F401
+        except ImportError:
+            self.logger.warning("lxml не установлен - тесты пропущены")
+            self.logger.summary()
+            return
+
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_kpt_parallel_")
+        try:
+            self._init_files()
+            self.test_01_parallel_matches_sequential()
+            self.test_02_dedup_first_file_wins()
+            self.test_03_progress_by_bytes()
+            self.test_04_wall_time()
+            self.test_05_worker_messages()
+            self.test_06_stalled_worker()
+            self.test_07_worker_modules()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов KptParser: {str(e)}")
+        finally:
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+
+        self.logger.summary()
+
+    def _land_record_xml(self, number: int, file_index: int) -> str:
+        """land_record с одним контуром 10x10 м"""
+        x0 = 500000.0 + (number // 100) * 20.0
+        y0 = 1300000.0 + (number % 100) * 20.0
+        ring = [(x0, y0), (x0 + 10, y0), (x0 + 10, y0 + 10), (x0, y0 + 10), (x0, y0)]
+        ordinates = "".join(
+            f"<ordinate><x>{x:.2f}</x><y>{y:.2f}</y><ord_nmb>{i}</ord_nmb>"
+            f"<delta_geopoint>0.1</delta_geopoint></ordinate>"
+            for i, (x, y) in enumerate(ring, start=1)
+        )
+        return (
+            "<land_record><object><common_data>"
+            f"<type><value>Земельный участок</value></type>"
+            f"<cad_number>77:01:0001001:{number}</cad_number>"
+            "</common_data></object>"
+            f"<address_location><address><readable_address>Файл {file_index}, участок {number}"
+            "</readable_address></address></address_location>"
+            "<contours_location><contours><contour><entity_spatial>"
+            "<sk_id>МСК-77</sk_id><spatial_elements><spatial_element><ordinates>"
+            f"{ordinates}"
+            "</ordinates></spatial_element></spatial_elements>"
+            "</entity_spatial></contour></contours></contours_location>"
+            "</land_record>"
+        )
+
+    def _init_files(self) -> None:
+        """FILE_COUNT файлов КПТ с перекрытием OVERLAP записей между соседями"""
+        paths = []
+        step = self.RECORDS_PER_FILE - self.OVERLAP
+        for file_index in range(self.FILE_COUNT):
+            start = file_index * step
+            records = "".join(
+                self._land_record_xml(number, file_index)
+                for number in range(start, start + self.RECORDS_PER_FILE)
+            )
+            xml = (
+                '<?xml version="1.0" encoding="utf-8"?>'
+                "<extract_cadastral_plan_territory><cadastral_blocks><cadastral_block>"
+                f"<cadastral_number>77:01:000100{file_index}</cadastral_number>"
+                f"<record_data><base_data><land_records>{records}</land_records>"
+                "</base_data></record_data>"
+                "</cadastral_block></cadastral_blocks></extract_cadastral_plan_territory>"
+            )
+            path = os.path.join(self.test_dir, f"kpt_{file_index}.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(xml)
+            paths.append(path)
+        self.file_paths = paths
+
+        total_mb = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+        self.logger.info(f"Файлов КПТ: {self.FILE_COUNT}, {total_mb:.1f} МБ")
+
+    def _create_parser(self):
+        """Парсер с теми же экстракторами, что и Fsm_1_1_5_KptImporter"""
+        from Daman_QGIS.core.kpt.attributes import KptAttributeExtractor
+        from Daman_QGIS.core.kpt.geometry import extract_geometry
+        from Daman_QGIS.core.kpt.parser import KptParser
+        from Daman_QGIS.tools.F_1_data.submodules import Fsm_1_1_5_kpt_importer
+        map_path = os.path.join(os.path.dirname(Fsm_1_1_5_kpt_importer.__file__), "attribute_map.json")
+        with open(map_path, "r", encoding="utf-8") as f:
+            attribute_map = json.load(f)
+
+        return KptParser(
+            geometry_extractor=extract_geometry,
+            attribute_extractor=KptAttributeExtractor(attribute_map)
+        )
+
+    def _parse(self, max_workers: int, **kwargs) -> Tuple[Tuple[Dict, Dict, int], float]:
+        """parse_files с заданным числом процессов: (результат, секунды)"""
+        parser = self._create_parser()
+        start = time.perf_counter()
+        result = parser.parse_files(self.file_paths, max_workers=max_workers, **kwargs)
+        return result, time.perf_counter() - start
+
+    @staticmethod
+    def _snapshot(cached_features: Dict) -> Dict[str, Any]:
+        """Сравнимое представление: layer_key -> (keyed {key: (wkb, attrs)}, unkeyed [...])"""
+        def _item(data):
+            geom, attrs = data[0], data[1]
+            return (bytes(geom.asWkb()) if geom is not None else None, sorted(attrs.items()))
+
+        return {
+            layer_key: (
+                {key: _item(data) for key, data in layer_cache["keyed"].items()},
+                [_item(data) for data in layer_cache["unkeyed"]],
+            )
+            for layer_key, layer_cache in cached_features.items()
+        }
+
+    def test_01_parallel_matches_sequential(self) -> None:
+        """ТЕСТ 1: N процессов == 1 процесс"""
+        self.logger.section("1. Совпадение параллельного и последовательного режимов")
+
+        (seq_features, seq_schemas, seq_count), _ = self._parse(1)
+        (par_features, par_schemas, par_count), _ = self._parse(self.WORKERS)
+
+        self.logger.check(
+            seq_count == par_count and seq_count == self.FILE_COUNT * self.RECORDS_PER_FILE,
+            f"Число записей совпадает ({par_count})",
+            f"Число записей расходится: seq={seq_count}, par={par_count}"
+        )
+        self.logger.check(
+            seq_schemas == par_schemas,
+            f"Схемы слоёв совпадают ({len(par_schemas)} слоёв)",
+            f"Схемы расходятся: {sorted(seq_schemas)} vs {sorted(par_schemas)}"
+        )
+        self.logger.check(
+            self._snapshot(seq_features) == self._snapshot(par_features),
+            "Геометрии (WKB) и атрибуты совпадают",
+            "Геометрии или атрибуты расходятся"
+        )
+
+    def test_02_dedup_first_file_wins(self) -> None:
+        """ТЕСТ 2: дубликат КН остаётся из первого файла"""
+        self.logger.section("2. Дедупликация в параллельном режиме")
+
+        (features, _, _), _ = self._parse(self.WORKERS)
+        keyed = features.get("land_record_MultiPolygon", {}).get("keyed", {})
+        expected_unique = self.FILE_COUNT * self.RECORDS_PER_FILE - (self.FILE_COUNT - 1) * self.OVERLAP
+
+        self.logger.check(
+            len(keyed) == expected_unique,
+            f"Уникальных ЗУ: {len(keyed)}",
+            f"Ожидалось {expected_unique} уникальных ЗУ, получено {len(keyed)}"
+        )
+
+        # Первая запись второго файла пересекается с хвостом первого
+        overlap_number = self.RECORDS_PER_FILE - self.OVERLAP
+        data = keyed.get(f"77:01:0001001:{overlap_number}")
+        addresses = [v for v in (data[1].values() if data else []) if isinstance(v, str) and "Файл" in v]
+        self.logger.check(
+            bool(addresses) and addresses[0].startswith("Файл 0,"),
+            f"Победил объект из первого файла: {addresses[0] if addresses else '-'}",
+            f"Неверный победитель дубликата: {addresses}"
+        )
+
+    def test_03_progress_by_bytes(self) -> None:
+        """ТЕСТ 3: прогресс монотонен, финальное значение 95"""
+        self.logger.section("3. Прогресс по байтам")
+
+        values: List[int] = []
+        self._parse(self.WORKERS, progress_callback=values.append)
+
+        monotonic = all(a <= b for a, b in zip(values, values[1:]))
+        self.logger.check(
+            bool(values) and monotonic and values[-1] == 95,
+            f"Прогресс монотонен: {values}",
+            f"Некорректный прогресс: {values}"
+        )
+
+    def test_04_wall_time(self) -> None:
+        """ТЕСТ 4: 1 vs N процессов"""
+        self.logger.section(f"4. Время: 1 vs {self.WORKERS} процессов")
+
+        _, t_seq = self._parse(1)
+        _, t_par = self._parse(self.WORKERS)
+
+        self.logger.data("1 процесс, сек", f"{t_seq:.2f}")
+        self.logger.data(f"{self.WORKERS} процесса, сек", f"{t_par:.2f}")
+        if t_par > 0:
+            self.logger.data("Ускорение", f"x{t_seq / t_par:.1f}")
+
+        if t_par <= t_seq:
+            self.logger.success(f"Пул не медленнее последовательного ({t_par:.2f} <= {t_seq:.2f} сек)")
+        else:
+            # На малой фикстуре запуск spawn-процессов может не окупиться
+            self.logger.warning(f"Пул медленнее последовательного ({t_par:.2f} > {t_seq:.2f} сек)")
+
+    def test_05_worker_messages(self) -> None:
+        """ТЕСТ 5: ошибки парсинга возвращаются из воркера"""
+        import Daman_QGIS.utils as utils
+        from Daman_QGIS.core.kpt import parser as parser_module
+
+        self.logger.section("5. Ошибки файла из процесса пула")
+
+        broken_path = os.path.join(self.test_dir, "kpt_broken.xml")
+        with open(broken_path, "w", encoding="utf-8") as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?><extract_cadastral_plan_territory><land_records>')
+
+        parser = self._create_parser()
+        # Воркер в процессе пула подменяет получателя лога сессии - здесь возвращаем
+        saved_session_log = utils._session_log
+        try:
+            file_result, messages = parser_module._parse_file_worker(
+                broken_path, parser.geometry_extractor, parser.attribute_extractor
+            )
+        finally:
+            utils.set_session_log(saved_session_log)
+
+        self.logger.check(
+            file_result[3] is False
+            and any(level == "CRITICAL" and "kpt_broken.xml" in message for level, message in messages),
+            f"parsed_ok=False, ошибок в результате: {len(messages)}",
+            f"parsed_ok={file_result[3]}, сообщения: {messages}"
+        )
+
+    def test_06_stalled_worker(self) -> None:
+        """ТЕСТ 6: после остановки пула разбираются только незавершённые файлы"""
+        from Daman_QGIS.core.kpt import parser as parser_module
+        from Daman_QGIS.core.process_pool import get_worker_executable
+
+        self.logger.section("6. Зависший процесс пула")
+        if get_worker_executable() is None:
+            self.logger.warning("python для процессов пула не найден - пул не проверяется")
+            return
+
+        parser = self._create_parser()
+        in_process: List[str] = []
+        from_pool: List[Any] = []
+        parse_single_file = parser._parse_single_file
+
+        def _count_parse(file_path, *args, **kwargs):
+            in_process.append(file_path)
+            return parse_single_file(file_path, *args, **kwargs)
+
+        parser._parse_single_file = _count_parse
+        saved_timeout = parser_module.KPT_PARSE_WORKER_STALL_TIMEOUT
+        saved_replay = parser_module._replay_worker_messages
+        # Нулевой срок: файл, не готовый к следующей проверке пула, считается зависшим
+        parser_module.KPT_PARSE_WORKER_STALL_TIMEOUT = 0
+        parser_module._replay_worker_messages = lambda messages: from_pool.append(messages)
+        try:
+            features, schemas, count = parser.parse_files(self.file_paths, max_workers=self.WORKERS)
+        finally:
+            parser_module.KPT_PARSE_WORKER_STALL_TIMEOUT = saved_timeout
+            parser_module._replay_worker_messages = saved_replay
+
+        (seq_features, seq_schemas, seq_count), _ = self._parse(1)
+        self.logger.check(
+            len(in_process) + len(from_pool) == self.FILE_COUNT
+            and len(set(in_process)) == len(in_process),
+            f"Из пула: {len(from_pool)}, в текущем процессе: {len(in_process)} (каждый файл один раз)",
+            f"Из пула: {len(from_pool)}, в текущем процессе: {in_process}"
+        )
+        self.logger.check(
+            count == seq_count and schemas == seq_schemas
+            and self._snapshot(features) == self._snapshot(seq_features),
+            "Результат совпадает с последовательным режимом",
+            f"Результат расходится: записей {count} vs {seq_count}"
+        )
+
+    def test_07_worker_modules(self) -> None:
+        """ТЕСТ 7: процесс пула импортирует только core.kpt"""
+        from concurrent.futures import ProcessPoolExecutor
+        from Daman_QGIS.core.kpt import parser as parser_module
+        from Daman_QGIS.core.process_pool import get_worker_executable, spawn_executable
+
+        self.logger.section("7. Модули процесса пула")
+        executable = get_worker_executable()
+        if executable is None:
+            self.logger.warning("python для процессов пула не найден - пул не проверяется")
+            return
+
+        parser = self._create_parser()
+        with spawn_executable(executable) as context:
+            executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+            parsed = executor.submit(
+                parser_module._parse_file_worker,
+                self.file_paths[0], parser.geometry_extractor, parser.attribute_extractor
+            )
+        with executor:
+            file_result, _ = parsed.result(timeout=120)
+            loaded = executor.submit(
+                eval,
+                "[name for name in __import__('sys').modules "
+                "if name.startswith('Daman_QGIS.tools') or name == 'processing']"
+            ).result(timeout=120)
+
+        self.logger.check(
+            file_result[3] and not loaded,
+            "Процесс пула разобрал файл без Daman_QGIS.tools и processing",
+            f"parsed_ok={file_result[3]}, загружены: {loaded[:10]}"
+        )
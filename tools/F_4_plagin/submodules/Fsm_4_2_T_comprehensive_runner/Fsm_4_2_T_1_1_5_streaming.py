@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_1_5_streaming - Потоковый импорт КПТ в GPKG (Fsm_1_1_5_4 стейджинг)
+
+Проверяет:
+1. Стейджинг: upsert по ключу (новая дата побеждает, при равной - ранний файл),
+   порядок выдачи (ключевые по file_order/seq, затем без ключа)
+2. Импорт streaming=True и streaming=False дают одинаковые слои GPKG
+3. Пиковая память парсинга в стейджинг не растёт с объёмом батча (tracemalloc)
+"""
+
+import os
+import shutil
+import tempfile
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from qgis.core import QgsProject
+
+
+class TestF115Streaming:
+    """Тесты потокового режима импорта КПТ"""
+
+    RECORDS_PER_FILE = 1500
+    OVERLAP = 50
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Fsm_1_1_5_4: потоковый импорт КПТ")
+
+        try:
+            from lxml import etree  # noqa: F401
+        except ImportError:
+            self.logger.warning("lxml не установлен - тесты пропущены")
+            self.logger.summary()
+            return
+
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_kpt_streaming_")
+        try:
+            self.test_01_stage_upsert()
+            self.test_02_streaming_matches_memory()
+            self.test_03_flat_memory()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_1_1_5_4: {str(e)}")
+        finally:
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+
+        self.logger.summary()
+
+    def _generate_files(self, prefix: str, count: int) -> List[str]:
+        """count файлов КПТ, соседние пересекаются на OVERLAP ЗУ"""
+        paths = []
+        step = self.RECORDS_PER_FILE - self.OVERLAP
+        for file_index in range(count):
+            records = []
+            for number in range(file_index * step, file_index * step + self.RECORDS_PER_FILE):
+                x0 = 500000.0 + (number // 100) * 20.0
+                y0 = 1300000.0 + (number % 100) * 20.0
+                ring = [(x0, y0), (x0 + 10, y0), (x0 + 10, y0 + 10), (x0, y0 + 10), (x0, y0)]
+                ordinates = "".join(
+                    f"<ordinate><x>{x:.2f}</x><y>{y:.2f}</y><delta_geopoint>0.1</delta_geopoint></ordinate>"
+                    for x, y in ring
+                )
+                records.append(
+                    "<land_record><object><common_data>"
+                    f"<cad_number>77:01:0001001:{number}</cad_number></common_data></object>"
+                    f"<params><area><value>{100 + file_index}</value></area></params>"
+                    "<contours_location><contours><contour><entity_spatial><spatial_elements>"
+                    f"<spatial_element><ordinates>{ordinates}</ordinates></spatial_element>"
+                    "</spatial_elements></entity_spatial></contour></contours></contours_location>"
+                    "</land_record>"
+                )
+            xml = (
+                '<?xml version="1.0" encoding="utf-8"?>'
+                "<extract_cadastral_plan_territory><cadastral_blocks><cadastral_block>"
+                f"<cadastral_number>77:01:000100{file_index}</cadastral_number>"
+                f"<record_data><base_data><land_records>{''.join(records)}</land_records>"
+                "</base_data></record_data></cadastral_block></cadastral_blocks>"
+                "</extract_cadastral_plan_territory>"
+            )
+            path = os.path.join(self.test_dir, f"{prefix}_{file_index}.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(xml)
+            paths.append(path)
+        return paths
+
+    def _import(self, files: List[str], output_name: str, streaming: bool) -> Dict[str, Tuple[int, set]]:
+        """run_import в GPKG: {имя слоя: (число объектов, {(КН, площадь, WKB)})}"""
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_5_kpt_importer import Fsm_1_1_5_KptImporter
+
+        importer = Fsm_1_1_5_KptImporter(self.iface)
+        layers = importer.run_import({
+            "files": files,
+            "crs": QgsProject.instance().crs(),
+            "save_to_file": True,
+            "output_dir": self.test_dir,
+            "output_name": output_name,
+            "filter_duplicate": False,
+            "max_workers": 1,
+            "streaming": streaming,
+        })
+
+        result: Dict[str, Tuple[int, set]] = {}
+        for layer in layers:
+            rows = set()
+            for feature in layer.getFeatures():
+                attrs = tuple(str(v) for v in feature.attributes()[1:])  # без fid
+                rows.add((attrs, bytes(feature.geometry().asWkb())))
+            result[layer.name()] = (layer.featureCount(), rows)
+
+        root = QgsProject.instance().layerTreeRoot()
+        for layer in layers:
+            QgsProject.instance().removeMapLayer(layer.id())
+        group = root.findGroup(output_name)
+        if group:
+            root.removeChildNode(group)
+        return result
+
+    def test_01_stage_upsert(self) -> None:
+        """ТЕСТ 1: upsert и порядок выдачи стейджинга"""
+        self.logger.section("1. Стейджинг: upsert по ключу")
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_5_kpt_importer.Fsm_1_1_5_4_feature_stage import (
+            Fsm_1_1_5_4_FeatureStage,
+        )
+
+        stage = Fsm_1_1_5_4_FeatureStage(os.path.join(self.test_dir, "stage.sqlite"), batch_size=2)
+        old, new = datetime(1970, 1, 1), datetime(2024, 5, 1)
+        try:
+            stage.begin_file(1)
+            stage.add_feature("land_record_MultiPolygon", b"f1", {"src": "file1"}, "K1", old)
+            stage.add_feature("land_record_MultiPolygon", None, {"src": "file1-unkeyed"}, None, old)
+            stage.begin_file(0)
+            stage.add_feature("land_record_MultiPolygon", b"f0", {"src": "file0"}, "K1", old)
+            stage.add_feature("land_record_MultiPolygon", b"f0", {"src": "file0-K2"}, "K2", old)
+            stage.begin_file(2)
+            stage.add_feature("land_record_MultiPolygon", b"f2", {"src": "file2-new"}, "K2", new)
+
+            rows = [attrs["src"] for batch in stage.iter_batches("land_record_MultiPolygon") for _, attrs in batch]
+            self.logger.check(
+                rows == ["file0", "file2-new", "file1-unkeyed"],
+                f"Победители и порядок верны: {rows}",
+                f"Неверный результат upsert: {rows}"
+            )
+            self.logger.check(
+                stage.feature_count("land_record_MultiPolygon") == 3,
+                "Дубликаты ключей свёрнуты (3 объекта)",
+                f"Неверное число объектов: {stage.feature_count('land_record_MultiPolygon')}"
+            )
+        finally:
+            stage.close()
+
+    def test_02_streaming_matches_memory(self) -> None:
+        """ТЕСТ 2: streaming == in-memory"""
+        self.logger.section("2. Потоковый и in-memory импорт совпадают")
+
+        files = self._generate_files("match", 3)
+        memory_layers = self._import(files, "T_in_memory", streaming=False)
+        stream_layers = self._import(files, "T_streaming", streaming=True)
+
+        expected_unique = 3 * self.RECORDS_PER_FILE - 2 * self.OVERLAP
+        counts = {name: count for name, (count, _) in stream_layers.items()}
+        self.logger.check(
+            any(count == expected_unique for count in counts.values()),
+            f"Дедупликация в стейджинге: {counts}",
+            f"Ожидалось {expected_unique} уникальных ЗУ, получено {counts}"
+        )
+        self.logger.check(
+            memory_layers == stream_layers,
+            f"Слои совпадают ({len(stream_layers)} слоёв)",
+            f"Слои расходятся: {sorted(memory_layers)} vs {sorted(stream_layers)}"
+        )
+
+    def test_03_flat_memory(self) -> None:
+        """ТЕСТ 3: пиковая память парсинга в стейджинг"""
+        self.logger.section("3. Пиковая память: 2 файла vs 6 файлов")
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_5_kpt_importer import Fsm_1_1_5_KptImporter
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_1_5_kpt_importer.Fsm_1_1_5_4_feature_stage import (
+            Fsm_1_1_5_4_FeatureStage,
+        )
+
+        parser = Fsm_1_1_5_KptImporter(self.iface).parser
+        peaks = {}
+        for count in (2, 6):
+            files = self._generate_files(f"mem{count}", count)
+            stage = Fsm_1_1_5_4_FeatureStage(os.path.join(self.test_dir, f"mem{count}.sqlite"))
+            tracemalloc.start()
+            try:
+                parser.parse_files(files, feature_sink=stage)
+                _, peaks[count] = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+                stage.close()
+
+        self.logger.data("Пик, 2 файла (МБ)", f"{peaks[2] / 1048576:.1f}")
+        self.logger.data("Пик, 6 файлов (МБ)", f"{peaks[6] / 1048576:.1f}")
+        self.logger.check(
+            peaks[6] < peaks[2] * 1.5,
+            "Пиковая память не растёт с объёмом батча",
+            f"Пиковая память растёт: {peaks[2]} -> {peaks[6]} байт"
+        )
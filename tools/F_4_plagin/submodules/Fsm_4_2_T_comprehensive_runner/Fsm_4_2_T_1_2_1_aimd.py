@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_2_1_aimd - Адаптивная параллельность запросов к НСПД (Fsm_1_2_1_1)
+
+Симулятор: локальный HTTP-стаб с ёмкостью CAPACITY одновременных запросов.
+Сверх ёмкости - 429 с Retry-After, задержка ответа растёт с нагрузкой,
+часть ответов - 503.
+
+Проверяет:
+1. Контроллер: аддитивный рост, одно снижение на поколение, пауза Retry-After,
+   разбор Retry-After (секунды и HTTP-дата), граница max_workers endpoint'а
+2. Симуляция send_request: фиксированные 8 потоков vs AIMD (429, время, итог)
+3. Таймауты сокета requests_post_with_timeout: молчащий сервер прерывается
+   по read-таймауту, 403 снижает лимит как перегрузка
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class _StubState:
+    CAPACITY = 3
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.active = 0
+        self.requests = 0
+        self.status_counts = {}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests = 0
+            self.status_counts = {}
+
+
+def _make_handler(state: _StubState):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, body: bytes, extra=None):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (extra or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+            with state.lock:
+                state.status_counts[status] = state.status_counts.get(status, 0) + 1
+
+        def do_POST(self):  # noqa: N802
+            length = int(self.headers.get('Content-Length', 0))
+            self.rfile.read(length)
+
+            if self.path.startswith('/stall'):
+                # Сервер молчит дольше read-таймаута клиента
+                time.sleep(3)
+                try:
+                    self._reply(200, b'{}')
+                except OSError:
+                    pass
+                return
+
+            if self.path.startswith('/forbidden'):
+                self._reply(403, b'{}')
+                return
+
+            with state.lock:
+                state.requests += 1
+                state.active += 1
+                active = state.active
+                number = state.requests
+            try:
+                if active > state.CAPACITY:
+                    self._reply(429, b'{}', {'Retry-After': '1'})
+                    return
+                time.sleep(0.05 + 0.03 * active)
+                if number % 40 == 0:
+                    self._reply(503, b'{}')
+                    return
+                self._reply(200, json.dumps({'type': 'FeatureCollection', 'features': []}).encode())
+            finally:
+                with state.lock:
+                    state.active -= 1
+
+        def log_message(self, *args):
+            pass
+
+    return _Handler
+
+
+class _StubApiManager:
+    """Endpoint НСПД, указывающий на стаб"""
+
+    def __init__(self, base_url: str) -> None:
+        self.endpoint = {
+            'url_template': '{base_url}/api/aeggis/v3/36048/intersects',
+            'base_url': base_url,
+            'referer_url': f"{base_url}/map",
+            'timeout_sec': '2;5',
+            'max_retries': 5,
+        }
+
+    def get_endpoint_by_layer(self, layer_name):
+        return self.endpoint
+
+    def parse_timeout(self, timeout_sec):
+        return [2, 5]
+
+
+class TestF121Aimd:
+    """Тесты AIMD-контроллера загрузчика ЕГРН"""
+
+    REQUESTS = 60
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.server = None
+        self.state = None
+        self.base_url = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Fsm_1_2_1_1: адаптивная параллельность НСПД")
+        try:
+            self.test_01_controller()
+            self._start_stub()
+            self.test_02_simulation()
+            self.test_03_deadline()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_1_2_1_1: {str(e)}")
+        finally:
+            if self.server:
+                self.server.shutdown()
+                self.server.server_close()
+        self.logger.summary()
+
+    def _start_stub(self) -> None:
+        self.state = _StubState()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self.state))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @staticmethod
+    def _controller(**kwargs):
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_1_concurrency_controller import (
+            Fsm_1_2_1_1_AIMDController,
+        )
+        return Fsm_1_2_1_1_AIMDController(**kwargs)
+
+    def _loader(self, controller):
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_egrn_loader import Fsm_1_2_1_EgrnLoader
+        loader = Fsm_1_2_1_EgrnLoader(self.iface, _StubApiManager(self.base_url))
+        loader.session.cookies.clear()
+        loader.concurrency = controller
+        return loader
+
+    def _simulate(self, controller) -> dict:
+        """REQUESTS запросов send_request из пула NSPD_AIMD_MAX_CONCURRENCY потоков"""
+        from Daman_QGIS.constants import NSPD_AIMD_MAX_CONCURRENCY
+
+        loader = self._loader(controller)
+        self.state.reset()
+
+        def call(i):
+            payload = {'categories': [{'id': 36048}], 'geom': {'cell': i}}
+            return loader.send_request(payload, layer_name='stub')
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=NSPD_AIMD_MAX_CONCURRENCY) as pool:
+            results = list(pool.map(call, range(self.REQUESTS)))
+        return {
+            'seconds': time.perf_counter() - start,
+            'ok': sum(1 for r in results if r is not None),
+            'statuses': dict(self.state.status_counts),
+            'controller': controller.stats(),
+        }
+
+    def test_01_controller(self) -> None:
+        """ТЕСТ 1: логика контроллера"""
+        self.logger.section("1. AIMD: рост, снижение, Retry-After")
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_1_concurrency_controller import (
+            Fsm_1_2_1_1_AIMDController as C, parse_retry_after,
+        )
+
+        controller = self._controller(initial_limit=2, min_limit=1, max_limit=6)
+        for _ in range(20):
+            controller.release(controller.acquire(), C.SUCCESS)
+        self.logger.check(
+            controller.limit > 2,
+            f"Рост на успехах: 2 -> {controller.limit}",
+            f"Лимит не вырос: {controller.limit}"
+        )
+
+        # Три одновременных запроса получают 429 - лимит режется один раз
+        tickets = [controller.acquire() for _ in range(3)]
+        before = controller.limit
+        for ticket in tickets:
+            controller.release(ticket, C.OVERLOAD)
+        self.logger.check(
+            controller.decreases == 1 and controller.limit == max(1, int(before * 0.5)),
+            f"Одно снижение на поколение: {before} -> {controller.limit}",
+            f"Снижений {controller.decreases}, лимит {before} -> {controller.limit}"
+        )
+
+        controller.release(controller.acquire(), C.OVERLOAD, retry_after=0.5)
+        start = time.monotonic()
+        controller.release(controller.acquire(), C.NEUTRAL)
+        waited = time.monotonic() - start
+        self.logger.check(
+            waited >= 0.4,
+            f"Retry-After соблюдён: слот выдан через {waited:.2f} сек",
+            f"Слот выдан до конца паузы ({waited:.2f} сек)"
+        )
+
+        controller.set_max_limit(2)
+        for _ in range(20):
+            controller.release(controller.acquire(), C.SUCCESS)
+        self.logger.check(
+            controller.max_limit == 2 and controller.limit <= 2,
+            f"Граница max_workers endpoint'а: лимит {controller.limit} <= 2",
+            f"Лимит вышел за max_workers: {controller.limit} (граница {controller.max_limit})"
+        )
+
+        http_date = formatdate(time.time() + 30, usegmt=True)
+        parsed = parse_retry_after(http_date)
+        self.logger.check(
+            parse_retry_after('7') == 7.0 and parsed is not None and 25 <= parsed <= 31
+            and parse_retry_after('мусор') is None and parse_retry_after(None) is None,
+            "Retry-After: секунды и HTTP-дата",
+            f"Разбор Retry-After: '7' -> {parse_retry_after('7')}, дата -> {parsed}"
+        )
+
+    def test_02_simulation(self) -> None:
+        """ТЕСТ 2: симуляция перегружаемого сервера"""
+        from Daman_QGIS.constants import NSPD_AIMD_MAX_CONCURRENCY, DEFAULT_MAX_WORKERS
+        self.logger.section(
+            f"2. Симуляция: ёмкость стаба {_StubState.CAPACITY}, {self.REQUESTS} запросов"
+        )
+
+        fixed = self._simulate(self._controller(
+            initial_limit=NSPD_AIMD_MAX_CONCURRENCY,
+            min_limit=NSPD_AIMD_MAX_CONCURRENCY,
+            max_limit=NSPD_AIMD_MAX_CONCURRENCY,
+        ))
+        adaptive = self._simulate(self._controller(
+            initial_limit=DEFAULT_MAX_WORKERS,
+            max_limit=NSPD_AIMD_MAX_CONCURRENCY,
+        ))
+
+        for name, result in (("Фиксировано", fixed), ("AIMD", adaptive)):
+            self.logger.data(
+                name,
+                f"{result['seconds']:.1f} сек, успешно {result['ok']}/{self.REQUESTS}, "
+                f"ответы {result['statuses']}"
+            )
+        self.logger.data("Контроллер AIMD", str(adaptive['controller']))
+
+        fixed_429 = fixed['statuses'].get(429, 0)
+        adaptive_429 = adaptive['statuses'].get(429, 0)
+        self.logger.check(
+            adaptive_429 < fixed_429,
+            f"AIMD: 429 меньше ({adaptive_429} vs {fixed_429})",
+            f"AIMD не снизил число 429: {adaptive_429} vs {fixed_429}"
+        )
+        self.logger.check(
+            adaptive['ok'] >= fixed['ok'],
+            f"AIMD: успешных ответов не меньше ({adaptive['ok']} vs {fixed['ok']})",
+            f"AIMD потерял ответы: {adaptive['ok']} vs {fixed['ok']}"
+        )
+        self.logger.check(
+            adaptive['controller']['decreases'] > 0,
+            "Лимит снижался на перегрузке",
+            "Перегрузка не снизила лимит"
+        )
+
+    def test_03_deadline(self) -> None:
+        """ТЕСТ 3: таймауты сокета и 403"""
+        self.logger.section("3. Таймауты сокета requests_post_with_timeout, 403")
+        import requests
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_egrn_loader import requests_post_with_timeout
+
+        # timeout=(0.5, 1): стаб молчит 3 сек - read-таймаут через ~1 сек
+        start = time.monotonic()
+        timed_out = False
+        try:
+            requests_post_with_timeout(f"{self.base_url}/stall", json={}, timeout=(0.5, 1))
+        except requests.exceptions.Timeout:
+            timed_out = True
+        elapsed = time.monotonic() - start
+
+        self.logger.check(
+            timed_out and elapsed < 2.5,
+            f"Молчащий сервер прерван по read-таймауту через {elapsed:.1f} сек",
+            f"Таймаут не сработал: timed_out={timed_out}, {elapsed:.1f} сек"
+        )
+
+        response = requests_post_with_timeout(f"{self.base_url}/ok", json={}, timeout=(0.5, 1))
+        self.logger.check(
+            response.status_code in (200, 503) and response.content,
+            "Обычный ответ после таймаута прочитан целиком",
+            f"Ответ после таймаута: {response}"
+        )
+
+        controller = self._controller(initial_limit=4, max_limit=8)
+        loader = self._loader(controller)
+        response = loader._post_with_concurrency(f"{self.base_url}/forbidden", {}, {}, timeout=(0.5, 1))
+        self.logger.check(
+            response.status_code == 403 and controller.overloads == 1 and controller.limit < 4,
+            f"403 снижает лимит как перегрузка: 4 -> {controller.limit}",
+            f"403: перегрузок {controller.overloads}, лимит {controller.limit}"
+        )
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_2_1_cell_cache - Кэш ответов НСПД по ячейкам сетки (Fsm_1_2_1_2)
+
+Загрузчик Fsm_1_2_1 со стабом send_request (без сети): ответ - один объект
+на запрос, счётчик запросов.
+
+Проверяет:
+1. Кэш: запись/чтение, пустая ячейка, TTL, режим refresh, версия параметров
+2. Повторная загрузка: все ячейки из кэша, ни одного запроса
+3. Правка части границы: из сети только изменённые ячейки (решётка не сдвигается)
+4. Ячейка с пропущенными подъячейками в кэш не пишется
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from typing import Any
+
+
+class _StubApiManager:
+    """Endpoint НСПД и порог дробления 1 км² для любого слоя"""
+
+    def get_endpoint_by_layer(self, layer_name):
+        return {'url_template': 'https://stub/api/aeggis/v3/36048/intersects'}
+
+    def get_split_threshold(self, layer_name):
+        return 1.0
+
+
+class TestF121CellCache:
+    """Тесты кэша ячеек сетки загрузчика ЕГРН"""
+
+    LAYER = 'L_stub_ZU'
+    CATEGORY_ID = 36048
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Fsm_1_2_1_2: кэш ячеек НСПД")
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_cell_cache_")
+        try:
+            self.test_01_cache()
+            self.test_02_reload()
+            self.test_03_partial_change()
+            self.test_04_failed_cell()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_1_2_1_2: {str(e)}")
+        finally:
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+        self.logger.summary()
+
+    def _cache(self, name: str, **kwargs):
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_2_cell_cache import Fsm_1_2_1_2_CellCache
+        return Fsm_1_2_1_2_CellCache(os.path.join(self.test_dir, name), **kwargs)
+
+    def _loader(self, cache, fail_all: bool = False):
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_egrn_loader import Fsm_1_2_1_EgrnLoader
+
+        loader = Fsm_1_2_1_EgrnLoader(self.iface, _StubApiManager())
+        loader.requests_sent = 0
+
+        def send_request(payload, layer_name=None, retry_on_429=True):
+            loader.requests_sent += 1
+            if fail_all:
+                return None
+            return {'features': [{'properties': {'interactionId': loader.requests_sent}}]}
+
+        loader.send_request = send_request
+        loader.set_cell_cache(cache)
+        return loader
+
+    @staticmethod
+    def _boundary(east: float = 37.70):
+        """Полигон ~10x7 км под Москвой (EPSG:4326)"""
+        from qgis.core import QgsGeometry
+        return QgsGeometry.fromWkt(
+            f"POLYGON((37.55 55.70, {east} 55.70, {east} 55.76, 37.55 55.76, 37.55 55.70))"
+        )
+
+    def _load(self, loader, boundary) -> int:
+        """Загрузка сетки границы, возвращает число запросов к стабу"""
+        from qgis.core import QgsCoordinateReferenceSystem
+        before = loader.requests_sent
+        cells = loader._split_geometry_to_grid(
+            boundary, QgsCoordinateReferenceSystem('EPSG:4326'), self.LAYER
+        )
+        loader._parallel_load_cells(cells, self.CATEGORY_ID, 'stub', self.LAYER, max_workers=3)
+        return loader.requests_sent - before
+
+    def test_01_cache(self) -> None:
+        """ТЕСТ 1: операции кэша"""
+        self.logger.section("1. Запись, TTL, refresh")
+        cache = self._cache("ops.sqlite", ttl_hours=1)
+        params = cache.params_hash({'category_id': 1})
+        cell = cache.cell_hash((37.0, 55.0, 37.1, 55.1), "POLYGON((...))")
+
+        cache.put(self.LAYER, cell, params, [{'id': 1}])
+        cache.put(self.LAYER, cache.cell_hash((1, 1, 2, 2), "E"), params, [])
+        self.logger.check(
+            cache.get(self.LAYER, cell, params) == [{'id': 1}]
+            and cache.get(self.LAYER, cache.cell_hash((1, 1, 2, 2), "E"), params) == [],
+            "Объекты и пустая ячейка читаются из кэша",
+            "Запись не читается"
+        )
+        self.logger.check(
+            cache.get('другой_слой', cell, params) is None
+            and cache.get(self.LAYER, cell, cache.params_hash({'category_id': 2})) is None,
+            "Другой слой / параметры - промах",
+            "Ключ не учитывает слой или параметры"
+        )
+
+        cache.ttl_seconds = 0.2
+        time.sleep(0.3)
+        self.logger.check(
+            cache.get(self.LAYER, cell, params) is None,
+            "Устаревшая запись - промах",
+            "TTL не соблюдается"
+        )
+        cache.close()
+
+        cache = self._cache("ops.sqlite", ttl_hours=1, refresh=True)
+        cache.put(self.LAYER, cell, params, [{'id': 2}])
+        refreshed_miss = cache.get(self.LAYER, cell, params) is None
+        cache.close()
+        cache = self._cache("ops.sqlite", ttl_hours=1)
+        self.logger.check(
+            refreshed_miss and cache.get(self.LAYER, cell, params) == [{'id': 2}],
+            "refresh: чтение - промах, запись перезаписывает",
+            "Режим refresh работает неверно"
+        )
+        cache.close()
+
+    def test_02_reload(self) -> None:
+        """ТЕСТ 2: повторная загрузка"""
+        self.logger.section("2. Повторная загрузка той же границы")
+        cache = self._cache("reload.sqlite")
+        loader = self._loader(cache)
+
+        first = self._load(loader, self._boundary())
+        second = self._load(loader, self._boundary())
+        self.logger.data("Ячейки", str(loader.cell_stats))
+        self.logger.check(
+            first > 1 and second == 0,
+            f"Первая загрузка: {first} запросов, повторная: 0",
+            f"Запросов: первая {first}, повторная {second}"
+        )
+        self.logger.check(
+            loader.cell_stats == {'cache': first, 'network': first},
+            "Сводка: ячейки из кэша / из сети",
+            f"Сводка ячеек неверна: {loader.cell_stats}"
+        )
+        cache.close()
+
+    def test_03_partial_change(self) -> None:
+        """ТЕСТ 3: правка части границы"""
+        self.logger.section("3. Сдвиг восточной стороны границы")
+        cache = self._cache("partial.sqlite")
+        loader = self._loader(cache)
+
+        full = self._load(loader, self._boundary(east=37.70))
+        changed = self._load(loader, self._boundary(east=37.705))
+        self.logger.data("Запросов", f"исходная {full}, после правки {changed}")
+        self.logger.check(
+            0 < changed < full,
+            f"Перезапрошены только изменённые ячейки ({changed} из {full})",
+            f"После правки запрошено {changed} из {full} ячеек"
+        )
+        cache.close()
+
+    def test_04_failed_cell(self) -> None:
+        """ТЕСТ 4: неполная ячейка не кэшируется"""
+        self.logger.section("4. Пропущенные подъячейки")
+        cache = self._cache("failed.sqlite")
+        loader = self._loader(cache, fail_all=True)
+        # Без дробления: сразу отказ на максимальной глубине
+        original = loader._load_cell_with_subdivision
+        loader._load_cell_with_subdivision = (
+            lambda *args, **kwargs: original(*args, **dict(kwargs, max_depth=0))
+        )
+
+        self._load(loader, self._boundary())
+        self.logger.check(
+            cache.stored == 0,
+            "Ячейки с отказом сервера не сохранены",
+            f"Сохранено {cache.stored} неполных ячеек"
+        )
+        cache.close()
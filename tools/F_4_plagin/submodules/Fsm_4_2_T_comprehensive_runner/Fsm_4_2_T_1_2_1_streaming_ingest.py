@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_2_1_streaming_ingest - Потоковый импорт features НСПД (Fsm_1_2_1_3)
+
+Проверяет:
+1. GeoJSON -> WKB совпадает с Fsm_1_2_1.create_geometry (все типы),
+   нормализация колец совпадает с M_47.normalize_geometry
+2. Дедупликация по interactionId до разбора геометрии, пропуск некорректных
+3. Запись в таблицу GPKG пачками: без поля fid, перезапись таблицы
+4. Замер на 100k синтетических features (30% дублей): прежняя цепочка
+   (memory-слой -> дедупликация -> нормализация -> запись GPKG) vs потоковая
+   запись; время и пик памяти Python (tracemalloc, без памяти C++ QGIS)
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+
+class TestF121StreamingIngest:
+    """Тесты потокового импорта ответов НСПД"""
+
+    UNIQUE = 70000
+    DUPLICATES = 30000
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Fsm_1_2_1_3: потоковый импорт features НСПД")
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_nspd_ingest_")
+        try:
+            self.test_01_wkb()
+            self.test_02_dedup()
+            self.test_03_geopackage()
+            self.test_04_time_and_memory_100k()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_1_2_1_3: {str(e)}")
+        finally:
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+        self.logger.summary()
+
+    @staticmethod
+    def _feature(interaction_id, x: float, y: float, ccw: bool = True, **options) -> Dict[str, Any]:
+        """Полигон 5 вершин (по умолчанию против часовой стрелки) в EPSG:3857"""
+        ring = [[x, y], [x + 10, y], [x + 12, y + 8], [x + 5, y + 14], [x - 2, y + 7], [x, y]]
+        if not ccw:
+            ring.reverse()
+        properties = {'options': dict({'cad_num': f"77:01:{interaction_id}", 'area': 100.5}, **options)}
+        if interaction_id is not None:
+            properties['interactionId'] = interaction_id
+        return {'type': 'Feature', 'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                'properties': properties}
+
+    def _synthetic(self, unique: int, duplicates: int) -> List[Dict[str, Any]]:
+        features = [self._feature(i, 4180000 + (i % 300) * 20, 7500000 + (i // 300) * 20, ccw=i % 2 == 0)
+                    for i in range(unique)]
+        # Дубли с перекрывающихся ячеек: те же объекты повторно
+        features.extend(self._feature(i * 7 % unique, 4180000 + (i * 7 % unique % 300) * 20,
+                                      7500000 + (i * 7 % unique // 300) * 20)
+                        for i in range(duplicates))
+        return features
+
+    @staticmethod
+    def _loader():
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_egrn_loader import Fsm_1_2_1_EgrnLoader
+        return Fsm_1_2_1_EgrnLoader.__new__(Fsm_1_2_1_EgrnLoader)
+
+    @staticmethod
+    def _ingest(features_data, batch_size: int = 2000):
+        from qgis.core import QgsField, QgsFields
+        from qgis.PyQt.QtCore import QMetaType
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_egrn_loader import Fsm_1_2_1_EgrnLoader
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_3_streaming_ingest import (
+            Fsm_1_2_1_3_StreamingIngest,
+        )
+        fields = QgsFields()
+        fields.append(QgsField("interactionId", QMetaType.Type.QString))
+        for key in features_data[0]['properties']['options']:
+            fields.append(QgsField(key, QMetaType.Type.QString))
+        return Fsm_1_2_1_3_StreamingIngest(
+            fields, Fsm_1_2_1_EgrnLoader._extract_feature_props, stringify=True, batch_size=batch_size
+        )
+
+    def _legacy_pipeline(self, features_data, gpkg_path: str) -> int:
+        """Прежняя цепочка: memory-слой -> дедупликация -> нормализация -> запись GPKG"""
+        from qgis.core import QgsFeature, QgsField, QgsVectorLayer
+        from qgis.PyQt.QtCore import QMetaType
+        from Daman_QGIS.managers.geometry import PolygonNormalizationManager
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_8_geometry_processor import (
+            Fsm_1_2_8_GeometryProcessor,
+        )
+
+        loader = self._loader()
+        layer = QgsVectorLayer("Polygon?crs=EPSG:3857", "legacy", "memory")
+        provider = layer.dataProvider()
+        provider.addAttributes([QgsField("interactionId", QMetaType.Type.QString)] + [
+            QgsField(key, QMetaType.Type.QString) for key in features_data[0]['properties']['options']
+        ])
+        layer.updateFields()
+
+        features = []
+        for feature_data in features_data:
+            geometry_data = feature_data['geometry']
+            geometry = loader.create_geometry(geometry_data['type'], geometry_data['coordinates'])
+            feature = QgsFeature(layer.fields())
+            feature.setGeometry(geometry)
+            feature.setAttribute("interactionId", str(feature_data['properties']['interactionId']))
+            for key, value in feature_data['properties']['options'].items():
+                feature.setAttribute(key, str(value))
+            features.append(feature)
+        provider.addFeatures(features)
+        del features
+
+        seen, duplicate_ids = set(), []
+        for feature in layer.getFeatures():
+            if feature['interactionId'] in seen:
+                duplicate_ids.append(feature.id())
+            else:
+                seen.add(feature['interactionId'])
+        provider.deleteFeatures(duplicate_ids)
+
+        changes = {}
+        for feature in layer.getFeatures():
+            changes[feature.id()] = PolygonNormalizationManager.normalize_geometry(feature.geometry())
+        provider.changeGeometryValues(changes)
+        del changes
+
+        saved = Fsm_1_2_8_GeometryProcessor(self.iface).save_to_geopackage(layer, gpkg_path, "legacy")
+        return saved.featureCount() if saved else 0
+
+    @staticmethod
+    def _measure(func):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed, peak / (1024 * 1024)
+
+    def test_01_wkb(self) -> None:
+        """ТЕСТ 1: кодирование WKB"""
+        self.logger.section("1. GeoJSON -> WKB")
+        from qgis.core import QgsGeometry
+        from Daman_QGIS.managers.geometry import PolygonNormalizationManager
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_2_1_3_streaming_ingest import geojson_to_wkb
+
+        ring = [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
+        hole = [[2, 2], [2, 4], [4, 4], [4, 2], [2, 2]]
+        geometries = [
+            {'type': 'Point', 'coordinates': [1.5, 2.5]},
+            {'type': 'MultiPoint', 'coordinates': [[1, 2], [3, 4]]},
+            {'type': 'LineString', 'coordinates': [[0, 0], [1, 1], [2, 0]]},
+            {'type': 'MultiLineString', 'coordinates': [[[0, 0], [1, 1]], [[2, 2], [3, 3]]]},
+            {'type': 'Polygon', 'coordinates': [ring, hole]},
+            {'type': 'MultiPolygon', 'coordinates': [[ring], [[[20, 20], [30, 20], [30, 30], [20, 20]]]]},
+        ]
+
+        loader = self._loader()
+        mismatched = []
+        for geometry_data in geometries:
+            expected = loader.create_geometry(geometry_data['type'], geometry_data['coordinates'])
+            actual = QgsGeometry()
+            actual.fromWkb(geojson_to_wkb(geometry_data, normalize=False))
+            if not actual.equals(expected):
+                mismatched.append(geometry_data['type'])
+        self.logger.check(
+            not mismatched,
+            "Все типы совпадают с create_geometry",
+            f"Расхождения: {mismatched}"
+        )
+
+        normalized_ok = True
+        for geometry_data in geometries[4:]:
+            expected = PolygonNormalizationManager.normalize_geometry(
+                loader.create_geometry(geometry_data['type'], geometry_data['coordinates'])
+            )
+            actual = QgsGeometry()
+            actual.fromWkb(geojson_to_wkb(geometry_data))
+            normalized_ok = normalized_ok and actual.asWkt(6) == expected.asWkt(6)
+        self.logger.check(
+            normalized_ok,
+            "Нормализация колец = M_47.normalize_geometry (CW + NW, с дыркой)",
+            "Нормализация расходится с M_47"
+        )
+        self.logger.check(
+            geojson_to_wkb({'type': 'GeometryCollection', 'coordinates': [1]}) is None
+            and geojson_to_wkb({'type': 'Polygon', 'coordinates': []}) is None,
+            "Неизвестный тип / пустые координаты - None",
+            "Некорректная геометрия не отсеяна"
+        )
+
+    def test_02_dedup(self) -> None:
+        """ТЕСТ 2: дедупликация до геометрии"""
+        self.logger.section("2. Дедупликация по interactionId")
+        features = [self._feature(1, 0, 0), self._feature(2, 50, 0), self._feature(1, 0, 0, cad='дубль'),
+                    self._feature(None, 100, 0), self._feature(3, 0, 50)]
+        features[4]['geometry']['coordinates'] = []  # без координат
+        features.append(self._feature(3, 0, 50))     # тот же id с корректной геометрией
+
+        ingest = self._ingest(features)
+        layer = ingest.to_memory_layer(features, "dedup")
+        ids = sorted(f['interactionId'] for f in layer.getFeatures())
+        self.logger.check(
+            ids == ['1', '2', '3'] and ingest.duplicates == 1 and ingest.skipped == 2,
+            f"Уникальных 3, дублей 1, пропущено 2 ({ingest.report()})",
+            f"id={ids}, {ingest.report()}"
+        )
+        first = next(f for f in layer.getFeatures() if f['interactionId'] == '1')
+        self.logger.check(
+            first['cad_num'] == '77:01:1',
+            "Сохраняется первая запись объекта",
+            f"Сохранена не первая запись: {first['cad_num']}"
+        )
+
+    def test_03_geopackage(self) -> None:
+        """ТЕСТ 3: запись в GPKG"""
+        self.logger.section("3. Запись в таблицу GeoPackage")
+        gpkg_path = os.path.join(self.test_dir, "project.gpkg")
+        features = [self._feature(i, i * 20, 0, fid=i % 3) for i in range(25)]
+        features.append(self._feature(0, 0, 0))
+
+        layer = self._ingest(features, batch_size=10).to_geopackage(features, gpkg_path, "Le_stub_ZU")
+        self.logger.check(
+            layer is not None and layer.featureCount() == 25,
+            "Записано 25 уникальных объектов пачками по 10",
+            f"Записано: {layer.featureCount() if layer else None}"
+        )
+        self.logger.check(
+            layer is not None and layer.fields().indexOf('cad_num') >= 0
+            and len({f.id() for f in layer.getFeatures()}) == 25,
+            "Поле fid из properties не конфликтует с PK GPKG",
+            "Ошибка полей таблицы"
+        )
+
+        layer = self._ingest(features[:5]).to_geopackage(features[:5], gpkg_path, "Le_stub_ZU")
+        self.logger.check(
+            layer is not None and layer.featureCount() == 5,
+            "Повторная запись пересоздаёт таблицу",
+            f"После перезаписи объектов: {layer.featureCount() if layer else None}"
+        )
+
+    def test_04_time_and_memory_100k(self) -> None:
+        """ТЕСТ 4: замер на 100k features"""
+        total = self.UNIQUE + self.DUPLICATES
+        self.logger.section(f"4. Замер: {total} features ({self.DUPLICATES} дублей)")
+        features = self._synthetic(self.UNIQUE, self.DUPLICATES)
+
+        legacy_count, t_legacy, peak_legacy = self._measure(
+            lambda: self._legacy_pipeline(features, os.path.join(self.test_dir, "legacy.gpkg"))
+        )
+        ingest = self._ingest(features)
+        stream_layer, t_stream, peak_stream = self._measure(
+            lambda: ingest.to_geopackage(features, os.path.join(self.test_dir, "stream.gpkg"), "stream")
+        )
+        stream_count = stream_layer.featureCount() if stream_layer else 0
+
+        self.logger.data("Прежняя цепочка", f"{t_legacy:.2f} сек, пик Python {peak_legacy:.1f} МБ, объектов {legacy_count}")
+        self.logger.data("Потоковый импорт", f"{t_stream:.2f} сек, пик Python {peak_stream:.1f} МБ, объектов {stream_count}")
+        self.logger.check(
+            stream_count == legacy_count == self.UNIQUE,
+            f"Одинаковый результат: {stream_count} уникальных объектов",
+            f"Объектов: потоковый {stream_count}, прежний {legacy_count}"
+        )
+        self.logger.check(
+            peak_stream < peak_legacy,
+            f"Пик памяти ниже ({peak_stream:.1f} vs {peak_legacy:.1f} МБ)",
+            f"Пик памяти не снизился ({peak_stream:.1f} vs {peak_legacy:.1f} МБ)"
+        )
+        if t_stream < t_legacy:
+            self.logger.success(f"Потоковый импорт быстрее (x{t_legacy / max(t_stream, 1e-6):.1f})")
+        else:
+            self.logger.warning(f"Потоковый импорт не быстрее ({t_stream:.2f} >= {t_legacy:.2f} сек)")
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_1_3_7_intersections - Индексированный подсчёт пересечений линий (Fsm_1_3_7_1)
+
+Проверяет:
+1. Счёт индекса = попарный перебор GEOS (АД-АД с самопересечениями, АД-ЖД),
+   включая вырожденные случаи: общие вершины, Т-примыкания, наложения,
+   пересечение в вершине, петли
+2. Fallback без NumPy (QgsSpatialIndex по bbox) = попарный перебор
+3. Время индекса на 5k / 20k / 50k линий (5k - сравнение с QgsSpatialIndex)
+"""
+
+import random
+import time
+from typing import Any, List
+
+from qgis.core import QgsGeometry, QgsPointXY
+
+
+class TestF137Intersections:
+    """Тесты подсчёта пересечений линий F_1_3"""
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.calculator = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Fsm_1_3_7_1: индекс пересечений линий")
+
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            self.logger.warning("NumPy не установлен - тесты пропущены")
+            self.logger.summary()
+            return
+
+        try:
+            self._init_calculator()
+            self.test_01_matches_bruteforce()
+            self.test_02_bbox_fallback()
+            self.test_03_timing()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Fsm_1_3_7: {str(e)}")
+
+        self.logger.summary()
+
+    def _init_calculator(self) -> None:
+        from Daman_QGIS.tools.F_1_data.submodules.Fsm_1_3_7_intersections_calculator import (
+            Fsm_1_3_7_IntersectionsCalculator,
+        )
+        self.calculator = Fsm_1_3_7_IntersectionsCalculator(None)
+        self.logger.success("Fsm_1_3_7_IntersectionsCalculator создан")
+
+    @staticmethod
+    def _line(points) -> QgsGeometry:
+        return QgsGeometry.fromPolylineXY([QgsPointXY(x, y) for x, y in points])
+
+    def _random_lines(self, count: int, seed: int) -> List[QgsGeometry]:
+        """Случайные полилинии постоянной плотности (сторона области ~ sqrt(count))"""
+        rng = random.Random(seed)
+        side = (count ** 0.5) * 100.0
+        lines = []
+        for _ in range(count):
+            x, y = 500000.0 + rng.uniform(0, side), 6000000.0 + rng.uniform(0, side)
+            points = [(x, y)]
+            for _ in range(rng.randint(1, 6)):
+                # Шаг по сетке 0.5 м - часты общие вершины и наложения
+                x += round(rng.uniform(-60, 60) * 2) / 2
+                y += round(rng.uniform(-60, 60) * 2) / 2
+                points.append((x, y))
+            lines.append(self._line(points))
+        return lines
+
+    def _degenerate_lines(self) -> List[QgsGeometry]:
+        """Вырожденные конфигурации"""
+        return [
+            self._line([(0, 0), (100, 0)]),
+            self._line([(100, 0), (200, 0)]),                 # общая концевая вершина
+            self._line([(50, -50), (50, 0)]),                 # Т-примыкание
+            self._line([(20, 0), (80, 0)]),                   # наложение
+            self._line([(0, 50), (100, 0), (0, -50)]),        # пересечение в вершине
+            self._line([(150, -50), (150, 50), (170, 50), (170, -20), (140, 10)]),  # петля
+            self._line([(0, 100), (100, 100)]),
+            self._line([(0, 100), (100, 100)]),               # дубликат линии
+            self._line([(30, 80), (60, 120), (90, 80), (30, 120)]),  # две точки с одной линией
+            self._line([(-10, -10), (-10, -10.0000001), (300, 300)]),  # почти нулевой сегмент
+        ]
+
+    def _bruteforce(self, calculator, geometries_a, geometries_b) -> int:
+        """Прежний алгоритм: попарный перебор GEOS + самопересечения"""
+        same_set = geometries_a is geometries_b
+        total = 0
+        for i, geom_a in enumerate(geometries_a):
+            for j, geom_b in enumerate(geometries_b):
+                if same_set and j <= i:
+                    continue
+                total += calculator._count_exact_intersections(geom_a, geom_b)
+        if same_set:
+            total += sum(calculator._count_self_intersections(g) for g in geometries_a)
+        return total
+
+    def test_01_matches_bruteforce(self) -> None:
+        """ТЕСТ 1: индекс = перебор"""
+        self.logger.section("1. Совпадение с попарным перебором")
+        calculator = self.calculator
+
+        roads = self._degenerate_lines() + self._random_lines(400, seed=1)
+        railways = self._random_lines(150, seed=2) + self._degenerate_lines()[:3]
+
+        for name, set_a, set_b in (("АД-АД", roads, roads), ("АД-ЖД", roads, railways)):
+            expected = self._bruteforce(calculator, set_a, set_b)
+            actual = calculator._count_line_intersections(set_a, set_b)
+            self.logger.check(
+                actual == expected,
+                f"{name}: {actual} пересечений (= перебор)",
+                f"{name}: индекс {actual}, перебор {expected}"
+            )
+
+    def test_02_bbox_fallback(self) -> None:
+        """ТЕСТ 2: fallback без NumPy"""
+        self.logger.section("2. Fallback QgsSpatialIndex")
+        calculator = self.calculator
+        roads = self._degenerate_lines() + self._random_lines(300, seed=3)
+
+        expected = self._bruteforce(calculator, roads, roads) - sum(
+            calculator._count_self_intersections(g) for g in roads
+        )
+        actual = calculator._count_pair_intersections_bbox(roads, roads, same_set=True)
+        self.logger.check(
+            actual == expected,
+            f"Fallback: {actual} пересечений (= перебор)",
+            f"Fallback {actual}, перебор {expected}"
+        )
+
+    def test_03_timing(self) -> None:
+        """ТЕСТ 3: время на 5k / 20k / 50k линий"""
+        self.logger.section("3. Время подсчёта АД-АД")
+        calculator = self.calculator
+
+        for size in (5000, 20000, 50000):
+            lines = self._random_lines(size, seed=size)
+
+            start = time.perf_counter()
+            indexed = calculator._count_line_intersections(lines, lines)
+            t_indexed = time.perf_counter() - start
+            self.logger.data(f"{size} линий: индекс, сек", f"{t_indexed:.2f} ({indexed} пересечений)")
+
+            if size == 5000:
+                # Попарный перебор на 5k - 12.5 млн пар GEOS; сравниваем с bbox-fallback
+                start = time.perf_counter()
+                fallback = calculator._count_pair_intersections_bbox(lines, lines, same_set=True) + sum(
+                    calculator._count_self_intersections(g) for g in lines
+                )
+                t_fallback = time.perf_counter() - start
+                self.logger.data(f"{size} линий: QgsSpatialIndex, сек", f"{t_fallback:.2f}")
+                self.logger.check(
+                    indexed == fallback,
+                    f"{size} линий: счёт совпадает с fallback",
+                    f"{size} линий: индекс {indexed}, fallback {fallback}"
+                )
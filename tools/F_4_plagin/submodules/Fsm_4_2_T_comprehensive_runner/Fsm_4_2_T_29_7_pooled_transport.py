@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_29_7_pooled_transport - Keep-alive пул авторизованных запросов (Msm_29_7)
+
+Локальный HTTP/1.1 стаб (http.server) считает входящие TCP-соединения.
+
+Проверяет:
+1. Последовательные запросы через пул используют одно соединение
+   (requests.request - новое соединение на каждый запрос)
+2. Параллельные запросы не превышают AUTHED_POOL_MAXSIZE соединений на хост
+3. Msm_29_6._raw_request идёт через общий пул, заголовки доходят до сервера
+4. Метрики connections_opened / connections_reused
+5. Ожидание свободного соединения ограничено pool_timeout (ConnectionError)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class _StubState:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.last_headers = {}
+
+
+def _make_handler(state: _StubState):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        def do_GET(self):  # noqa: N802
+            with state.lock:
+                state.active += 1
+                state.max_active = max(state.max_active, state.active)
+                state.last_headers = dict(self.headers)
+            time.sleep(1.0 if self.path.endswith('/slow') else 0.02)
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with state.lock:
+                state.active -= 1
+
+        def log_message(self, *args):
+            pass
+
+    return _Handler
+
+
+class TestPooledTransport:
+    """Тесты Msm_29_7_PooledTransport"""
+
+    SEQUENTIAL = 30
+    CONCURRENT = 40
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.server = None
+        self.state = None
+        self.url = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Msm_29_7: пул keep-alive соединений")
+
+        try:
+            import requests  # noqa: F401
+        except ImportError:
+            self.logger.warning("requests не установлен - тесты пропущены")
+            self.logger.summary()
+            return
+
+        try:
+            self._start_stub()
+            self.test_01_sequential_reuse()
+            self.test_02_concurrent_limit()
+            self.test_03_authed_raw_request()
+            self.test_04_pool_timeout()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Msm_29_7: {str(e)}")
+        finally:
+            if self.server:
+                self.server.shutdown()
+                self.server.server_close()
+
+        self.logger.summary()
+
+    def _start_stub(self) -> None:
+        self.state = _StubState()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self.state))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/plugin/data"
+
+    def _reset_counters(self) -> None:
+        with self.state.lock:
+            self.state.connections = 0
+            self.state.max_active = 0
+
+    @staticmethod
+    def _transport(pool_timeout=None):
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_29_7_pooled_transport import (
+            PooledTransport,
+        )
+        return PooledTransport(pool_timeout=pool_timeout)
+
+    def test_01_sequential_reuse(self) -> None:
+        """ТЕСТ 1: последовательные запросы"""
+        self.logger.section(f"1. {self.SEQUENTIAL} последовательных запросов")
+        import requests
+
+        self._reset_counters()
+        start = time.perf_counter()
+        for _ in range(self.SEQUENTIAL):
+            requests.request("GET", self.url, timeout=5).close()
+        t_plain = time.perf_counter() - start
+        plain_connections = self.state.connections
+
+        transport = self._transport()
+        self._reset_counters()
+        start = time.perf_counter()
+        try:
+            for _ in range(self.SEQUENTIAL):
+                response = transport.request("GET", self.url, timeout=5)
+                response.content
+            t_pooled = time.perf_counter() - start
+            stats = transport.stats()
+        finally:
+            transport.close()
+
+        self.logger.data("requests.request", f"{t_plain:.3f} сек, соединений {plain_connections}")
+        self.logger.data("Пул", f"{t_pooled:.3f} сек, соединений {self.state.connections}")
+        self.logger.data("Метрики пула", str(stats))
+        self.logger.check(
+            self.state.connections == 1,
+            "Пул: одно TCP-соединение на серию запросов",
+            f"Пул открыл {self.state.connections} соединений"
+        )
+        self.logger.check(
+            stats['requests'] == self.SEQUENTIAL
+            and stats['connections_opened'] == 1
+            and stats['connections_reused'] == self.SEQUENTIAL - 1,
+            "Метрики: 1 открыто, остальные переиспользованы",
+            f"Неверные метрики: {stats}"
+        )
+
+    def test_02_concurrent_limit(self) -> None:
+        """ТЕСТ 2: лимит соединений на хост"""
+        from Daman_QGIS.constants import AUTHED_POOL_MAXSIZE
+        self.logger.section(f"2. {self.CONCURRENT} запросов из {AUTHED_POOL_MAXSIZE * 2} потоков")
+
+        transport = self._transport()
+        self._reset_counters()
+
+        def fetch(_):
+            response = transport.request("GET", self.url, timeout=10)
+            return response.status_code
+
+        try:
+            with ThreadPoolExecutor(max_workers=AUTHED_POOL_MAXSIZE * 2) as pool:
+                statuses = list(pool.map(fetch, range(self.CONCURRENT)))
+            stats = transport.stats()
+        finally:
+            transport.close()
+
+        self.logger.data("Метрики пула", str(stats))
+        self.logger.check(
+            statuses.count(200) == self.CONCURRENT,
+            "Все запросы выполнены",
+            f"Статусы: {set(statuses)}"
+        )
+        self.logger.check(
+            self.state.connections <= AUTHED_POOL_MAXSIZE and self.state.max_active <= AUTHED_POOL_MAXSIZE,
+            f"Соединений {self.state.connections} <= {AUTHED_POOL_MAXSIZE}, одновременно {self.state.max_active}",
+            f"Превышен лимит: соединений {self.state.connections}, одновременно {self.state.max_active}"
+        )
+
+    def test_03_authed_raw_request(self) -> None:
+        """ТЕСТ 3: Msm_29_6 использует общий пул"""
+        self.logger.section("3. Msm_29_6._raw_request через пул")
+        import requests
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_29_6_authed_request import (
+            AuthedRequestManager,
+        )
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_29_7_pooled_transport import (
+            PooledTransport,
+        )
+
+        PooledTransport.reset_instance()
+        manager = AuthedRequestManager()
+        self._reset_counters()
+        try:
+            for _ in range(5):
+                response = manager._raw_request(
+                    requests, "GET", self.url, 5,
+                    headers_override={'Authorization': 'Bearer test'},
+                    headers={'If-None-Match': '"v1"'},
+                )
+                response.content
+            stats = PooledTransport.get_instance().stats()
+        finally:
+            PooledTransport.reset_instance()
+
+        headers = self.state.last_headers
+        self.logger.check(
+            headers.get('Authorization') == 'Bearer test' and headers.get('If-None-Match') == '"v1"',
+            "Auth и пользовательские заголовки переданы",
+            f"Заголовки на сервере: {headers}"
+        )
+        self.logger.check(
+            self.state.connections == 1 and stats['connections_reused'] == 4,
+            "5 запросов Msm_29_6 - одно соединение",
+            f"Соединений {self.state.connections}, метрики {stats}"
+        )
+
+    def test_04_pool_timeout(self) -> None:
+        """ТЕСТ 4: занятый пул не блокирует поток навсегда"""
+        from Daman_QGIS.constants import AUTHED_POOL_MAXSIZE
+        self.logger.section("4. Таймаут ожидания свободного соединения")
+        import requests
+
+        transport = self._transport(pool_timeout=0.2)
+        slow_url = self.url + '/slow'
+
+        def fetch(_):
+            try:
+                return transport.request("GET", slow_url, timeout=10).status_code
+            except requests.ConnectionError:
+                return 'pool_timeout'
+
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=AUTHED_POOL_MAXSIZE + 1) as pool:
+                results = list(pool.map(fetch, range(AUTHED_POOL_MAXSIZE + 1)))
+        finally:
+            transport.close()
+        elapsed = time.perf_counter() - start
+
+        self.logger.data("Результаты", f"{results}, {elapsed:.2f} сек")
+        self.logger.check(
+            results.count('pool_timeout') == 1 and results.count(200) == AUTHED_POOL_MAXSIZE,
+            "Лишний поток получил ConnectionError, остальные выполнены",
+            f"Результаты: {results}"
+        )
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_38_1_async_log_writer - Фоновая запись лога сессии (Msm_38_1, utils)
+
+Writer пишет во временную папку; глобальный получатель utils.set_session_log
+сохраняется и восстанавливается.
+
+Проверяет:
+1. Порядок и формат строк, flush() дописывает очередь
+2. WARNING / CRITICAL сбрасываются на диск сразу (без ожидания интервала)
+3. Переполнение очереди: вызывающий не блокируется, счётчик dropped,
+   строка о пропуске в файле
+4. close(): очередь дописана, write() после закрытия отклоняется
+5. log_debug: шаблон не форматируется при отключённом DEBUG
+6. Микробенчмарк стоимости вызова: прежняя запись (lock + FileHandler +
+   flush на сообщение) vs очередь фонового потока
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any
+
+
+class _SessionLogStub:
+    """Получатель utils.log_* поверх AsyncLogWriter (как M_38)"""
+
+    def __init__(self, writer, debug_enabled: bool = True) -> None:
+        self.writer = writer
+        self.debug_enabled = debug_enabled
+
+    def write(self, message: str, tag: str = "", level: str = "INFO") -> None:
+        self.writer.write(message, tag, level)
+
+
+class _FormatCounter:
+    """Аргумент шаблона, считающий вызовы __str__"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __str__(self) -> str:
+        self.calls += 1
+        return "value"
+
+
+class TestAsyncLogWriter:
+    """Тесты Msm_38_1_AsyncLogWriter и ленивого логирования utils"""
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        import Daman_QGIS.utils as utils
+        self.logger.section("ТЕСТ Msm_38_1: фоновая запись лога сессии")
+
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_session_log_")
+        saved_session_log = utils._session_log
+        try:
+            self.test_01_order_and_flush()
+            self.test_02_urgent_flush()
+            self.test_03_overflow()
+            self.test_04_close()
+            self.test_05_lazy_debug()
+            self.test_06_call_cost()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Msm_38_1: {str(e)}")
+        finally:
+            utils.set_session_log(saved_session_log)
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+
+        self.logger.summary()
+
+    def _writer(self, name: str, **kwargs):
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_38_1_async_log_writer import (
+            AsyncLogWriter,
+        )
+        return AsyncLogWriter(os.path.join(self.test_dir, name), **kwargs)
+
+    @staticmethod
+    def _lines(writer) -> list:
+        with open(writer.path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_01_order_and_flush(self) -> None:
+        """ТЕСТ 1: порядок и формат"""
+        self.logger.section("1. Порядок строк и flush()")
+        writer = self._writer("order.log", flush_interval=10.0)
+        try:
+            for i in range(1000):
+                writer.write(f"msg {i}", tag="Daman_QGIS", level="INFO")
+            flushed = writer.flush()
+            lines = self._lines(writer)
+        finally:
+            writer.close()
+
+        self.logger.check(
+            flushed and len(lines) == 1000 and all(
+                line.endswith(f"[INFO] [Daman_QGIS] msg {i}") for i, line in enumerate(lines)
+            ),
+            "1000 строк в порядке записи, формат '<время> [INFO] [тег] текст'",
+            f"flush={flushed}, строк {len(lines)}"
+        )
+        self.logger.data("Счётчики", str(writer.stats()))
+
+    def test_02_urgent_flush(self) -> None:
+        """ТЕСТ 2: немедленный сброс ошибок"""
+        self.logger.section("2. CRITICAL на диске без ожидания интервала")
+        writer = self._writer("urgent.log", flush_interval=30.0)
+        try:
+            writer.write("обычное", level="INFO")
+            writer.write("ошибка", level="CRITICAL")
+            deadline = time.monotonic() + 2.0
+            lines = []
+            while time.monotonic() < deadline:
+                lines = self._lines(writer)
+                if len(lines) == 2:
+                    break
+                time.sleep(0.02)
+        finally:
+            writer.close()
+
+        self.logger.check(
+            len(lines) == 2 and "[CRITICAL]" in lines[1],
+            "CRITICAL и предшествующие строки сброшены сразу",
+            f"На диске {len(lines)} строк при интервале 30 сек"
+        )
+
+    def test_03_overflow(self) -> None:
+        """ТЕСТ 3: переполнение очереди"""
+        self.logger.section("3. Переполнение очереди")
+        writer = self._writer("overflow.log", queue_size=16, batch_size=4)
+        total = 20000
+        try:
+            start = time.perf_counter()
+            accepted = sum(1 for i in range(total) if writer.write(f"m{i}"))
+            elapsed = time.perf_counter() - start
+            writer.flush()
+            stats = writer.stats()
+            lines = self._lines(writer)
+        finally:
+            writer.close()
+
+        self.logger.data("Счётчики", f"{stats}, принято {accepted}, {elapsed:.3f} сек")
+        self.logger.check(
+            stats['dropped'] > 0 and accepted + stats['dropped'] == total,
+            "Лишние сообщения отброшены без блокировки и посчитаны",
+            f"Принято {accepted}, отброшено {stats['dropped']} из {total}"
+        )
+        self.logger.check(
+            len(lines) == stats['written'] and any("пропущено сообщений" in line for line in lines),
+            "В файле отмечено число пропущенных сообщений",
+            f"Строк {len(lines)}, записано {stats['written']}"
+        )
+
+    def test_04_close(self) -> None:
+        """ТЕСТ 4: закрытие"""
+        self.logger.section("4. close()")
+        writer = self._writer("close.log", flush_interval=30.0)
+        for i in range(500):
+            writer.write(f"tail {i}")
+        writer.close()
+        lines = self._lines(writer)
+        rejected = not writer.write("после закрытия")
+        writer.close()  # Повторный вызов безопасен
+
+        self.logger.check(
+            len(lines) == 500 and rejected,
+            "Очередь дописана при закрытии, запись после закрытия отклонена",
+            f"Строк {len(lines)}, отклонено={rejected}"
+        )
+
+    def test_05_lazy_debug(self) -> None:
+        """ТЕСТ 5: ленивое форматирование"""
+        from Daman_QGIS.utils import log_debug, set_session_log
+        self.logger.section("5. log_debug с шаблоном")
+        writer = self._writer("lazy.log")
+        try:
+            counter = _FormatCounter()
+            set_session_log(_SessionLogStub(writer, debug_enabled=False))
+            for _ in range(100):
+                log_debug("T_38_1: %s", counter)
+            skipped_calls = counter.calls
+
+            set_session_log(_SessionLogStub(writer, debug_enabled=True))
+            log_debug("T_38_1: %s / %d", counter, 5)
+            writer.flush()
+            lines = self._lines(writer)
+        finally:
+            set_session_log(None)
+            writer.close()
+
+        self.logger.check(
+            skipped_calls == 0,
+            "DEBUG отключён - шаблон не форматируется",
+            f"__str__ вызван {skipped_calls} раз"
+        )
+        self.logger.check(
+            counter.calls == 1 and len(lines) == 1 and lines[0].endswith("[DEBUG] [Daman_QGIS] T_38_1: value / 5"),
+            "DEBUG включён - строка собрана и записана",
+            f"Строки: {lines}"
+        )
+
+    def test_06_call_cost(self) -> None:
+        """ТЕСТ 6: стоимость вызова"""
+        from datetime import datetime
+        from Daman_QGIS.utils import _write_to_session_log, set_session_log
+        calls = 20000
+        self.logger.section(f"6. Стоимость вызова: {calls} сообщений")
+
+        # Прежний M_38.write: lock, форматирование, FileHandler, flush на сообщение
+        legacy_logger = logging.getLogger(f"daman_t_38_1_{os.getpid()}")
+        legacy_logger.propagate = False
+        handler = logging.FileHandler(os.path.join(self.test_dir, "legacy.log"), encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        legacy_logger.addHandler(handler)
+        legacy_logger.setLevel(logging.DEBUG)
+        lock = threading.Lock()
+
+        def legacy_write(message: str, tag: str, level: str) -> None:
+            with lock:
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                legacy_logger.info(f"{timestamp} [{level}] [{tag}] {message}")
+                handler.flush()
+
+        try:
+            start = time.perf_counter()
+            for i in range(calls):
+                legacy_write(f"T_38_1: объект {i}", "Daman_QGIS", "DEBUG")
+            t_legacy = time.perf_counter() - start
+        finally:
+            legacy_logger.removeHandler(handler)
+            handler.close()
+
+        writer = self._writer("cost.log", queue_size=calls * 2)
+        try:
+            set_session_log(_SessionLogStub(writer))
+            start = time.perf_counter()
+            for i in range(calls):
+                _write_to_session_log(f"T_38_1: объект {i}", "DEBUG")
+            t_async = time.perf_counter() - start
+            writer.flush(timeout=10.0)
+            stats = writer.stats()
+        finally:
+            set_session_log(None)
+            writer.close()
+
+        per_legacy = t_legacy / calls * 1e6
+        per_async = t_async / calls * 1e6
+        self.logger.data("Прежняя запись", f"{per_legacy:.1f} мкс/вызов ({t_legacy:.3f} сек)")
+        self.logger.data("Очередь", f"{per_async:.1f} мкс/вызов ({t_async:.3f} сек), {stats}")
+        self.logger.check(
+            stats['written'] == calls and stats['dropped'] == 0,
+            "Все сообщения записаны фоновым потоком",
+            f"Счётчики: {stats}"
+        )
+        self.logger.check(
+            per_async < per_legacy,
+            f"Вызов дешевле в {per_legacy / max(per_async, 1e-9):.1f} раза",
+            f"Очередь {per_async:.1f} мкс против {per_legacy:.1f} мкс"
+        )
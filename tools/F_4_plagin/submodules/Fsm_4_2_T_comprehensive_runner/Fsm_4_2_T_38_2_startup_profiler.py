@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_38_2_startup_profiler - Оркестрация и замеры запуска (Msm_38_2)
+
+Без iface/тулбара: шаги initGui моделируются функциями с задержками,
+время до тулбара - отметка 'toolbar' профайлера. Тестовый менеджер
+регистрируется в ManagerRegistry и удаляется после теста.
+
+Проверяет:
+1. Порядок шагов по зависимостям, ошибки объявления (цикл, неизвестный шаг)
+2. Фоновый шаг параллельно GUI-шагам: время до тулбара меньше
+   последовательной цепочки, ожидание результата видно как wait:<шаг>
+3. STOP прерывает цепочку, optional / обязательные ошибки шагов
+4. Отчёт: вложенность замеров, self_ms, traceEvents, JSON на диске
+5. ManagerRegistry.creation_log: создание менеджера - вложенный замер
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any
+
+
+class _SlowManager:
+    """Менеджер с заметным временем создания"""
+
+    def __init__(self) -> None:
+        time.sleep(0.02)
+
+
+class TestStartupProfiler:
+    """Тесты Msm_38_2_StartupProfiler / StartupOrchestrator"""
+
+    TEST_MANAGER_ID = 'M_9038'
+
+    # Модель запуска: (шаг, задержка сек, зависимости, фоновый)
+    PLAN = (
+        ('session_log', 0.01, (), False),
+        ('profile', 0.02, ('session_log',), False),
+        ('auto_update', 0.05, ('profile',), False),
+        ('plugin_hash', 0.20, ('auto_update',), True),
+        ('deps_check', 0.04, ('auto_update',), False),
+        ('managers', 0.06, ('deps_check',), False),
+        ('nam_cache', 0.03, ('managers',), False),
+        ('license', 0.05, ('managers', 'plugin_hash'), False),
+        ('toolbar', 0.08, ('license',), False),
+    )
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Msm_38_2: оркестрация и замеры запуска")
+
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_startup_")
+        try:
+            self.test_01_order()
+            self.test_02_time_to_toolbar()
+            self.test_03_stop_and_errors()
+            self.test_04_report()
+            self.test_05_registry_creation()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Msm_38_2: {str(e)}")
+        finally:
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+
+        self.logger.summary()
+
+    @staticmethod
+    def _classes():
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_38_2_startup_profiler import (
+            StartupOrchestrator, StartupProfiler,
+        )
+        return StartupOrchestrator, StartupProfiler
+
+    def _build_plan(self, profiler, background: bool = True):
+        StartupOrchestrator, _ = self._classes()
+        orchestrator = StartupOrchestrator(profiler)
+        for step_id, delay, requires, is_background in self.PLAN:
+            def step(delay=delay, step_id=step_id):
+                time.sleep(delay)
+                if step_id == 'toolbar':
+                    profiler.mark('toolbar')
+                return step_id
+            orchestrator.add(step_id, step, requires=requires, background=background and is_background)
+        return orchestrator
+
+    @staticmethod
+    def _find(nodes, name):
+        for node in nodes:
+            if node['name'] == name:
+                return node
+            found = TestStartupProfiler._find(node['children'], name)
+            if found is not None:
+                return found
+        return None
+
+    def test_01_order(self) -> None:
+        """ТЕСТ 1: порядок и объявление"""
+        StartupOrchestrator, StartupProfiler = self._classes()
+        self.logger.section("1. Порядок шагов по зависимостям")
+
+        orchestrator = StartupOrchestrator(StartupProfiler())
+        orchestrator.add('toolbar', lambda: None, requires=('license',))
+        orchestrator.add('license', lambda: None, requires=('managers',))
+        orchestrator.add('managers', lambda: None)
+        orchestrator.add('nam_cache', lambda: None)
+        order = orchestrator.order()
+        self.logger.check(
+            order == ['managers', 'license', 'toolbar', 'nam_cache'],
+            "Зависимости раньше зависимых, прочие - в порядке объявления",
+            f"Порядок: {order}"
+        )
+
+        errors = []
+        cyclic = StartupOrchestrator(StartupProfiler())
+        cyclic.add('a', lambda: None, requires=('b',))
+        cyclic.add('b', lambda: None, requires=('a',))
+        unknown = StartupOrchestrator(StartupProfiler())
+        unknown.add('a', lambda: None, requires=('missing',))
+        for orch in (cyclic, unknown):
+            try:
+                orch.order()
+            except ValueError as e:
+                errors.append(str(e))
+        try:
+            unknown.add('a', lambda: None)
+        except ValueError as e:
+            errors.append(str(e))
+        self.logger.check(
+            len(errors) == 3,
+            "Цикл, неизвестная зависимость и повтор шага - ValueError",
+            f"Ошибки: {errors}"
+        )
+
+    def test_02_time_to_toolbar(self) -> None:
+        """ТЕСТ 2: фоновый шаг"""
+        _, StartupProfiler = self._classes()
+        self.logger.section("2. Время до тулбара: фоновый plugin_hash")
+
+        serial_profiler = StartupProfiler()
+        self._build_plan(serial_profiler, background=False).run()
+        serial_ms = serial_profiler.elapsed_ms('toolbar')
+
+        profiler = StartupProfiler()
+        orchestrator = self._build_plan(profiler)
+        completed = orchestrator.run()
+        parallel_ms = profiler.elapsed_ms('toolbar')
+        report = profiler.report("toolbar")
+
+        hash_node = self._find(report['tree'], 'plugin_hash')
+        self.logger.data("Последовательно", f"{serial_ms:.0f} мс")
+        self.logger.data("С фоновым шагом", f"{parallel_ms:.0f} мс")
+        self.logger.check(
+            completed and orchestrator.result('license') == 'license'
+            and hash_node is not None and hash_node['thread'] != 'MainThread',
+            "Все шаги выполнены, plugin_hash - в фоновом потоке",
+            f"completed={completed}, поток plugin_hash: {hash_node and hash_node['thread']}"
+        )
+        # plugin_hash (200 мс) перекрывается deps_check + managers + nam_cache (130 мс)
+        self.logger.check(
+            parallel_ms < serial_ms - 80,
+            f"Тулбар раньше на {serial_ms - parallel_ms:.0f} мс",
+            f"Последовательно {serial_ms:.0f} мс, с фоновым шагом {parallel_ms:.0f} мс"
+        )
+        wait_node = self._find(report['tree'], 'wait:plugin_hash')
+        self.logger.check(
+            wait_node is not None and wait_node['thread'] == 'MainThread',
+            "Ожидание фонового результата GUI-шагом записано в отчёт",
+            f"wait:plugin_hash: {wait_node}"
+        )
+
+    def test_03_stop_and_errors(self) -> None:
+        """ТЕСТ 3: STOP и ошибки"""
+        StartupOrchestrator, StartupProfiler = self._classes()
+        self.logger.section("3. STOP, optional и обязательные шаги")
+
+        executed = []
+        orchestrator = StartupOrchestrator(StartupProfiler())
+        orchestrator.add('profile', lambda: executed.append('profile') or StartupOrchestrator.STOP)
+        orchestrator.add('toolbar', lambda: executed.append('toolbar'), requires=('profile',))
+        completed = orchestrator.run()
+        self.logger.check(
+            not completed and orchestrator.stopped_at == 'profile' and executed == ['profile'],
+            "STOP прерывает цепочку",
+            f"completed={completed}, stopped_at={orchestrator.stopped_at}, выполнено {executed}"
+        )
+
+        def fail():
+            raise RuntimeError("сбой шага")
+
+        orchestrator = StartupOrchestrator(StartupProfiler())
+        orchestrator.add('nam_cache', fail)
+        orchestrator.add('hash', fail, background=True)
+        orchestrator.add('toolbar', lambda: 'ok', requires=('nam_cache', 'hash'))
+        completed = orchestrator.run()
+        self.logger.check(
+            completed and orchestrator.result('toolbar') == 'ok'
+            and isinstance(orchestrator.error('nam_cache'), RuntimeError)
+            and isinstance(orchestrator.error('hash'), RuntimeError),
+            "Ошибка optional-шага (GUI и фонового) не останавливает запуск",
+            f"completed={completed}, ошибки: {orchestrator.error('nam_cache')}, {orchestrator.error('hash')}"
+        )
+
+        orchestrator = StartupOrchestrator(StartupProfiler())
+        orchestrator.add('managers', fail, optional=False)
+        raised = False
+        try:
+            orchestrator.run()
+        except RuntimeError:
+            raised = True
+        self.logger.check(raised, "Ошибка обязательного шага пробрасывается", "Исключение не проброшено")
+
+    def test_04_report(self) -> None:
+        """ТЕСТ 4: отчёт"""
+        StartupOrchestrator, StartupProfiler = self._classes()
+        self.logger.section("4. Отчёт замеров")
+
+        logged = []
+        profiler = StartupProfiler(on_span=lambda path, seconds: logged.append(path))
+
+        def toolbar():
+            with profiler.span('register_tools'):
+                time.sleep(0.02)
+            with profiler.span('create_menu'):
+                time.sleep(0.01)
+            profiler.mark('toolbar')
+
+        orchestrator = StartupOrchestrator(profiler)
+        orchestrator.add('toolbar', toolbar)
+        orchestrator.run()
+
+        path = os.path.join(self.test_dir, "session_test.startup.json")
+        profiler.save(path, outcome="toolbar")
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+
+        node = self._find(report['tree'], 'toolbar')
+        children = [child['name'] for child in node['children']] if node else []
+        self.logger.check(
+            children == ['register_tools', 'create_menu']
+            and 'toolbar/register_tools' in logged,
+            "Вложенные замеры - дочерние узлы, путь в log_timing 'toolbar/...'",
+            f"Дочерние: {children}, log: {logged}"
+        )
+        self.logger.check(
+            node is not None
+            and abs(node['self_ms'] - (node['duration_ms'] - sum(c['duration_ms'] for c in node['children']))) < 0.01,
+            "self_ms = длительность минус дочерние",
+            f"Узел: {node}"
+        )
+        phases = {event['ph'] for event in report['traceEvents']}
+        self.logger.check(
+            report['outcome'] == "toolbar" and report['time_to_toolbar_ms'] is not None
+            and {'X', 'i', 'M'} <= phases,
+            "JSON: outcome, time_to_toolbar_ms, traceEvents (X / i / M)",
+            f"outcome={report['outcome']}, фазы {phases}"
+        )
+
+    def test_05_registry_creation(self) -> None:
+        """ТЕСТ 5: создание менеджеров"""
+        from Daman_QGIS.managers._registry import ManagerRegistry
+        _, StartupProfiler = self._classes()
+        self.logger.section("5. ManagerRegistry.creation_log")
+
+        manager_id = self.TEST_MANAGER_ID
+        saved_log = list(ManagerRegistry._creation_log)
+        profiler = StartupProfiler()
+        try:
+            ManagerRegistry.register(manager_id, _SlowManager, domain='test')
+            with profiler.span('managers'):
+                ManagerRegistry.get(manager_id)
+            for entry_id, start, end, thread in ManagerRegistry.creation_log(profiler.origin):
+                profiler.add_event(f"create {entry_id}", start, end, thread=thread)
+            report = profiler.report()
+        finally:
+            ManagerRegistry._instances.pop(manager_id, None)
+            ManagerRegistry._factories.pop(manager_id, None)
+            ManagerRegistry._domains.pop(manager_id, None)
+            ManagerRegistry._creation_log[:] = saved_log
+
+        node = self._find(report['tree'], 'managers')
+        created = node['children'][0] if node and node['children'] else None
+        self.logger.check(
+            created is not None and created['name'] == f"create {manager_id}"
+            and created['duration_ms'] >= 15,
+            "Ленивое создание менеджера - вложенный замер шага",
+            f"Узел managers: {node}"
+        )
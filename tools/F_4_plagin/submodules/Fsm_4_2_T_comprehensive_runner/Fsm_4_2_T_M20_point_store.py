@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_M20_point_store - Однопроходная нумерация M_20 + PointStore
+
+Проверяет:
+1. Строки 'Точки' побайтно совпадают с эталонной двухпроходной нумерацией
+2. points_data (PointStore) даёт те же dict, что эталон
+3. Per-ring режим (регион 78)
+
+Эталон — прежний алгоритм M_20 (два прохода по _extract_polygon_points_by_ring,
+dict + QgsPointXY на точку), воспроизведён здесь для сравнения.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from qgis.core import QgsGeometry, QgsPointXY
+
+
+class TestM20PointStore:
+    """Тесты однопроходной нумерации точек M_20"""
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.pnm = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ M_20: однопроходная нумерация + PointStore")
+
+        try:
+            self._init_manager()
+            self.test_01_numbering_strings_identical()
+            self.test_02_points_data_identical()
+            self.test_03_per_ring()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка: {e}")
+
+        self.logger.summary()
+
+    def _init_manager(self) -> None:
+        from Daman_QGIS.managers import registry
+        self.pnm = registry.get('M_20')
+        self.logger.success("PointNumberingManager инициализирован")
+
+    @staticmethod
+    def _make_features(cols: int, rows: int, step: float = 10.0) -> List[Dict[str, Any]]:
+        """Сетка смежных контуров + контур с дыркой + мультиконтур"""
+        features = []
+        contour_id = 0
+        for row in range(rows):
+            for col in range(cols):
+                contour_id += 1
+                x = col * step + 0.004
+                y = row * step + 0.006
+                wkt = (f"POLYGON(({x} {y}, {x + step} {y}, {x + step} {y + step}, "
+                       f"{x} {y + step}, {x} {y}))")
+                features.append({
+                    'geometry': QgsGeometry.fromWkt(wkt),
+                    'contour_id': contour_id,
+                    'attributes': {'Услов_КН': f"У:{contour_id}", 'КН': '-'}
+                })
+        features.append({
+            'geometry': QgsGeometry.fromWkt(
+                "POLYGON((-50 -50, -10 -50, -10 -10, -50 -10, -50 -50),"
+                "(-40 -40, -40 -20, -20 -20, -20 -40, -40 -40))"
+            ),
+            'contour_id': contour_id + 1,
+            'attributes': {'Услов_КН': 'дырка', 'КН': '1:2:3'}
+        })
+        features.append({
+            'geometry': QgsGeometry.fromWkt(
+                "MULTIPOLYGON(((-100 0, -90 0, -90 10, -100 10, -100 0)),"
+                "((-80 0, -70 0, -70 10, -80 10, -80 0)))"
+            ),
+            'contour_id': contour_id + 2,
+            'attributes': {}
+        })
+        features.append({'geometry': QgsGeometry(), 'contour_id': None, 'attributes': {}})
+        return features
+
+    @staticmethod
+    def _reference(pnm, features_data: List[Dict[str, Any]], precision: int = 2
+                   ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Эталон: прежний двухпроходный алгоритм M_20"""
+        from Daman_QGIS.utils import sort_by_northwest
+
+        unique: Dict[Tuple[float, float], int] = {}
+        counter = 0
+        features_data = sort_by_northwest(features_data)
+        for item in features_data:
+            geom = item.get('geometry')
+            if not geom or geom.isEmpty():
+                continue
+            for ring_info in pnm._extract_polygon_points_by_ring(geom, precision):
+                for pt in ring_info['points']:
+                    if pt not in unique:
+                        counter += 1
+                        unique[pt] = counter
+
+        strings: List[str] = []
+        points_data: List[Dict[str, Any]] = []
+        for item in features_data:
+            geom = item.get('geometry')
+            contour_id = item.get('contour_id')
+            if contour_id is None:
+                contour_id = 0
+            attributes = item.get('attributes', {})
+            uslov_kn = attributes.get('Услов_КН', '') or ''
+            kn = attributes.get('КН', '') or ''
+            if not geom or geom.isEmpty():
+                strings.append("")
+                continue
+            ext_list, holes = [], []
+            for ring_info in pnm._extract_polygon_points_by_ring(geom, precision):
+                nums = []
+                for idx, pt in enumerate(ring_info['points'], start=1):
+                    num = unique.get(pt, 0)
+                    nums.append(num)
+                    points_data.append({
+                        'id': num, 'contour_point_index': idx, 'contour_id': contour_id,
+                        'uslov_kn': uslov_kn, 'kn': kn,
+                        'contour_type': ring_info['contour_type'],
+                        'contour_number': ring_info['contour_number'],
+                        'x_geodetic': pt[1], 'y_geodetic': pt[0],
+                        'point': QgsPointXY(pt[0], pt[1])
+                    })
+                (ext_list if ring_info['contour_type'] == 'Внешний' else holes).append(nums)
+            strings.append(pnm._format_point_numbers_with_holes(ext_list, holes))
+        return strings, points_data
+
+    @staticmethod
+    def _points_equal(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        """Сравнение dict точек (QgsPointXY по координатам)"""
+        keys = set(a) | set(b)
+        for key in keys:
+            if key == 'point':
+                if (a[key].x(), a[key].y()) != (b[key].x(), b[key].y()):
+                    return False
+            elif a.get(key) != b.get(key):
+                return False
+        return True
+
+    def test_01_numbering_strings_identical(self) -> None:
+        """ТЕСТ 1: строки 'Точки' совпадают с эталоном"""
+        self.logger.section("1. Строки номеров = эталон")
+        pnm = self.pnm
+        ref_strings, _ = self._reference(pnm, self._make_features(6, 4))
+        processed, _ = pnm.process_polygon_layer(self._make_features(6, 4))
+        new_strings = [item.get('point_numbers_str', '') for item in processed]
+
+        mismatches = [
+            i for i, (a, b) in enumerate(zip(ref_strings, new_strings))
+            if a.encode('utf-8') != b.encode('utf-8')
+        ]
+        self.logger.check(
+            len(ref_strings) == len(new_strings) and not mismatches,
+            f"Все {len(new_strings)} строк совпадают побайтно",
+            f"Расхождения в строках {mismatches[:10]}"
+        )
+
+    def test_02_points_data_identical(self) -> None:
+        """ТЕСТ 2: PointStore материализуется в те же dict"""
+        self.logger.section("2. points_data = эталон")
+        pnm = self.pnm
+        _, ref_points = self._reference(pnm, self._make_features(5, 3))
+        _, store = pnm.process_polygon_layer(self._make_features(5, 3))
+
+        self.logger.check(
+            len(store) == len(ref_points),
+            f"Число точек совпадает ({len(store)})",
+            f"Число точек: {len(store)} vs эталон {len(ref_points)}"
+        )
+        mismatches = [
+            i for i, (a, b) in enumerate(zip(ref_points, store))
+            if not self._points_equal(a, b)
+        ]
+        self.logger.check(
+            not mismatches,
+            "Все dict точек совпадают",
+            f"Расхождения dict точек: {mismatches[:10]}"
+        )
+        self.logger.check(
+            self._points_equal(store[-1], ref_points[-1]) and len(store[1:3]) == 2,
+            "Индексация и срезы PointStore работают",
+            "Индексация/срезы PointStore некорректны"
+        )
+
+    def test_03_per_ring(self) -> None:
+        """ТЕСТ 3: per-ring нумерация"""
+        self.logger.section("3. Per-ring (регион 78)")
+        pnm = self.pnm
+        processed, store = pnm.process_polygon_layer(
+            self._make_features(2, 1), per_ring_numbering=True
+        )
+        first = [p for p in store if p['contour_point_index'] == 1]
+        self.logger.check(
+            all(p['id'] == 1 for p in first) and processed[0]['point_numbers_str'] == "1-4",
+            "Каждое кольцо нумеруется с 1",
+            f"Per-ring нарушен: {processed[0].get('point_numbers_str')}"
+        )
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_M21_zpr_index - Индекс ЗПР для геометрического ВРИ (Msm_21_2)
+
+Проверяет:
+1. best_match совпадает с полным перебором (включая равные площади и касание)
+2. Статистика: отсечённые пары учитываются, пересечения считаются только для кандидатов
+"""
+
+from typing import Any, Dict, List, Optional
+
+from qgis.core import QgsGeometry
+
+
+class TestM21ZprIndex:
+    """Тесты Msm_21_2_ZPRGeometryIndex"""
+
+    GRID = 30  # ЗПР GRID x GRID
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.zpr_entries: List[Dict[str, Any]] = []
+        self.contours: List[QgsGeometry] = []
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Msm_21_2: индекс ЗПР для геометрического ВРИ")
+        try:
+            self._init_fixtures()
+            self.test_01_matches_bruteforce()
+            self.test_02_stats()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Msm_21_2: {str(e)}")
+        self.logger.summary()
+
+    def _init_fixtures(self) -> None:
+        self.zpr_entries = self._zpr_grid()
+        self.contours = self._contours()
+        self.logger.info(f"ЗПР: {len(self.zpr_entries)}, контуров: {len(self.contours)}")
+
+    @staticmethod
+    def _rect(x0: float, y0: float, x1: float, y1: float) -> QgsGeometry:
+        return QgsGeometry.fromWkt(f"Polygon(({x0} {y0}, {x1} {y0}, {x1} {y1}, {x0} {y1}, {x0} {y0}))")
+
+    def _zpr_grid(self) -> List[Dict[str, Any]]:
+        """Сетка ЗПР 100x100 м"""
+        return [
+            {'id': row * self.GRID + col + 1,
+             'geometry': self._rect(col * 100, row * 100, (col + 1) * 100, (row + 1) * 100),
+             'vri_data_list': [{'full_name': f"ВРИ {row}-{col}"}]}
+            for row in range(self.GRID) for col in range(self.GRID)
+        ]
+
+    def _contours(self) -> List[QgsGeometry]:
+        """Контуры: внутри ЗПР, на границе, на стыке четырёх, касание, вне сетки"""
+        contours = []
+        for i in range(0, self.GRID * 100 - 100, 70):
+            contours.append(self._rect(i + 10, i + 10, i + 60, i + 40))
+            contours.append(self._rect(i + 50, i + 50, i + 150, i + 150))
+        contours.append(self._rect(100, 0, 200, 100))            # совпадает с ЗПР, касается соседей
+        contours.append(self._rect(-50, -50, 0, 0))              # касание угла
+        contours.append(self._rect(-500, -500, -400, -400))      # вне сетки
+        return contours
+
+    @staticmethod
+    def _bruteforce(geom: QgsGeometry, zpr_entries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Прежний алгоритм M_21: полный перебор пересечений"""
+        best_zpr = None
+        best_area = 0.0
+        for zpr in zpr_entries:
+            intersection = geom.intersection(zpr['geometry'])
+            if intersection.isEmpty():
+                continue
+            if intersection.area() > best_area:
+                best_area = intersection.area()
+                best_zpr = zpr
+        return best_zpr
+
+    @staticmethod
+    def _index(zpr_entries: List[Dict[str, Any]]):
+        from Daman_QGIS.managers.validation.submodules.Msm_21_2_zpr_geometry_index import (
+            Msm_21_2_ZPRGeometryIndex,
+        )
+        return Msm_21_2_ZPRGeometryIndex(zpr_entries)
+
+    def test_01_matches_bruteforce(self) -> None:
+        """ТЕСТ 1: результат = полный перебор"""
+        self.logger.section("1. Совпадение с полным перебором")
+        zpr_entries = self.zpr_entries
+        index = self._index(zpr_entries)
+
+        mismatches = []
+        for geom in self.contours:
+            expected = self._bruteforce(geom, zpr_entries)
+            actual = index.best_match(geom)
+            expected_id = expected['id'] if expected else None
+            actual_id = actual['id'] if actual else None
+            if expected_id != actual_id:
+                mismatches.append((geom.asWkt(0), expected_id, actual_id))
+
+        self.logger.check(
+            not mismatches,
+            f"Победитель ЗПР совпадает для {len(self.contours)} контуров",
+            f"Расхождения с перебором: {mismatches[:5]}"
+        )
+
+    def test_02_stats(self) -> None:
+        """ТЕСТ 2: статистика пар"""
+        self.logger.section("2. Статистика отсечения")
+        zpr_entries = self.zpr_entries
+        index = self._index(zpr_entries)
+        contours = self.contours
+        for geom in contours:
+            index.best_match(geom)
+
+        self.logger.data("Статистика", index.report())
+        self.logger.check(
+            index.pairs_total == len(contours) * len(zpr_entries)
+            and index.pairs_total == index.pairs_pruned + index.pairs_computed,
+            "Все пары учтены: посчитанные + отсечённые",
+            f"Неверный учёт пар: {index.report()}"
+        )
+        self.logger.check(
+            index.pairs_computed < index.pairs_total // 10,
+            "Полных пересечений меньше 10% пар",
+            f"Индекс отсекает мало пар: {index.report()}"
+        )
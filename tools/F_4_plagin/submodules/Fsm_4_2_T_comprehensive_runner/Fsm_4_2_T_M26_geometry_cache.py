@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_M26_geometry_cache - Кэш геометрий Msm_26_1 для прогона нарезки
+
+Проверяет:
+1. get_fixed_geometry: промах -> попадание, исправление невалидной геометрии
+2. get_fixed_geometry: CRS-трансформа выполняется один раз
+3. get_prepared_engine: intersects совпадает с QgsGeometry.intersects
+4. clear_cache: сброс кэша и счётчиков
+"""
+
+from typing import Any
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsGeometry,
+    QgsProject,
+)
+
+
+class TestM26GeometryCache:
+    """Тесты кэша исправленных геометрий и prepared engine"""
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.processor = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ Msm_26_1: кэш геометрий")
+
+        try:
+            self._init_processor()
+            self.test_01_fixed_geometry_hit_miss()
+            self.test_02_transform_once()
+            self.test_03_prepared_engine()
+            self.test_04_clear_cache()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов Msm_26_1: {str(e)}")
+
+        self.logger.summary()
+
+    def _init_processor(self) -> None:
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_1_geometry_processor import (
+            Msm_26_1_GeometryProcessor,
+        )
+        self.processor = Msm_26_1_GeometryProcessor()
+        self.logger.success("Msm_26_1_GeometryProcessor инициализирован")
+
+    def test_01_fixed_geometry_hit_miss(self) -> None:
+        """ТЕСТ 1: промах, затем попадание; bowtie исправляется"""
+        self.logger.section("1. get_fixed_geometry: hit/miss")
+        self.processor.clear_cache()
+
+        bowtie = QgsGeometry.fromWkt("POLYGON((0 0, 10 10, 10 0, 0 10, 0 0))")
+        first = self.processor.get_fixed_geometry("layer_a", 1, bowtie)
+        second = self.processor.get_fixed_geometry("layer_a", 1, bowtie)
+        stats = self.processor.get_cache_statistics()
+
+        self.logger.check(
+            first.isGeosValid() and not first.isEmpty(),
+            "Невалидная геометрия исправлена",
+            "Геометрия не исправлена"
+        )
+        self.logger.check(
+            stats['geometry_misses'] == 1 and stats['geometry_hits'] == 1,
+            "1 промах + 1 попадание",
+            f"Неверные счётчики: {stats}"
+        )
+        self.logger.check(
+            second.equals(first),
+            "Повторный вызов возвращает ту же геометрию",
+            "Повторный вызов вернул другую геометрию"
+        )
+
+    def test_02_transform_once(self) -> None:
+        """ТЕСТ 2: трансформа применяется один раз"""
+        self.logger.section("2. get_fixed_geometry: трансформа")
+        self.processor.clear_cache()
+
+        transform = QgsCoordinateTransform(
+            QgsCoordinateReferenceSystem("EPSG:4326"),
+            QgsCoordinateReferenceSystem("EPSG:3857"),
+            QgsProject.instance()
+        )
+        geom = QgsGeometry.fromWkt("POLYGON((37 55, 37.01 55, 37.01 55.01, 37 55.01, 37 55))")
+        first = self.processor.get_fixed_geometry("layer_b", 7, geom, transform)
+        second = self.processor.get_fixed_geometry("layer_b", 7, geom, transform)
+
+        self.logger.check(
+            first.boundingBox().xMinimum() > 1000 and second.equals(first),
+            "Геометрия трансформирована один раз и взята из кэша",
+            f"Неверная трансформа: {first.boundingBox().toString()}"
+        )
+        self.logger.check(
+            abs(geom.boundingBox().xMinimum() - 37) < 1e-9,
+            "Исходная геометрия не изменена",
+            "Исходная геометрия изменена на месте"
+        )
+
+    def test_03_prepared_engine(self) -> None:
+        """ТЕСТ 3: prepared engine даёт те же intersects"""
+        self.logger.section("3. get_prepared_engine")
+        self.processor.clear_cache()
+
+        zpr = QgsGeometry.fromWkt("POLYGON((0 0, 100 0, 100 100, 0 100, 0 0))")
+        engine = self.processor.get_prepared_engine("zpr", 1, zpr)
+        self.processor.get_prepared_engine("zpr", 1, zpr)
+
+        candidates = [
+            QgsGeometry.fromWkt("POLYGON((50 50, 150 50, 150 150, 50 150, 50 50))"),
+            QgsGeometry.fromWkt("POLYGON((200 200, 210 200, 210 210, 200 210, 200 200))"),
+            QgsGeometry.fromWkt("POLYGON((100 0, 110 0, 110 10, 100 10, 100 0))"),
+        ]
+        mismatches = [
+            idx for idx, cand in enumerate(candidates)
+            if engine.intersects(cand.constGet()) != zpr.intersects(cand)
+        ]
+        stats = self.processor.get_cache_statistics()
+
+        self.logger.check(
+            engine is not None and not mismatches,
+            "intersects prepared engine совпадает с QgsGeometry.intersects",
+            f"Расхождения на кандидатах {mismatches}"
+        )
+        self.logger.check(
+            stats['engine_hits'] == 1 and stats['engine_misses'] == 1,
+            "Engine подготовлен один раз",
+            f"Неверные счётчики engine: {stats}"
+        )
+
+    def test_04_clear_cache(self) -> None:
+        """ТЕСТ 4: clear_cache"""
+        self.logger.section("4. clear_cache")
+
+        self.processor.get_fixed_geometry("layer_c", 1, QgsGeometry.fromWkt("POINT(0 0)"))
+        self.processor.clear_cache()
+        stats = self.processor.get_cache_statistics()
+
+        self.logger.check(
+            stats['geometry_cached'] == 0 and stats['geometry_misses'] == 0,
+            "Кэш и счётчики сброшены",
+            f"Кэш не сброшен: {stats}"
+        )
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_M26_local_ngs - Локальный режим НГС в Msm_26_4_CuttingEngine._cut_by_zu
+
+Проверяет:
+1. Совпадение НГС режимов 'local' и 'union' (в пределах MIN_NGS_AREA)
+2. ЗПР вне всех ЗУ целиком уходит в НГС в обоих режимах
+3. Wall time обоих режимов на синтетике 20k ЗУ
+
+Синтетика: сетка 200x100 ЗУ 19x19 м с шагом 20 м (межи 1 м = НГС),
+50 ЗПР 90x90 м со смещением, режущим ЗУ.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from qgis.core import QgsFeature, QgsGeometry, QgsProject, QgsVectorLayer
+
+
+class TestM26LocalNgs:
+    """Тесты локального режима НГС (union кандидатов ЗУ по bbox ЗПР)"""
+
+    GRID_COLS = 200
+    GRID_ROWS = 100
+    PARCEL_STEP = 20.0
+    PARCEL_SIZE = 19.0
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ M_26: локальный режим НГС")
+
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_m26_ngs_")
+        try:
+            self.test_01_modes_match_small()
+            self.test_02_zpr_outside_zu()
+            self.test_03_wall_time_20k()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов M_26: {str(e)}")
+        finally:
+            shutil.rmtree(self.test_dir, ignore_errors=True)
+
+        self.logger.summary()
+
+    def _layer_uri(self, fields: str) -> str:
+        """URI memory-слоя в CRS проекта (иначе _cut_by_zu трансформирует)"""
+        authid = QgsProject.instance().crs().authid()
+        uri = "Polygon"
+        if authid:
+            uri += f"?crs={authid.lower()}&{fields}"
+        else:
+            uri += f"?{fields}"
+        return uri
+
+    def _create_zu_layer(self, cols: int, rows: int) -> QgsVectorLayer:
+        """Сетка ЗУ cols x rows с межами (PARCEL_STEP - PARCEL_SIZE)"""
+        layer = QgsVectorLayer(self._layer_uri("field=КН:string"), "test_zu", "memory")
+        features = []
+        for row in range(rows):
+            for col in range(cols):
+                x = col * self.PARCEL_STEP
+                y = row * self.PARCEL_STEP
+                s = self.PARCEL_SIZE
+                feat = QgsFeature(layer.fields())
+                feat.setGeometry(QgsGeometry.fromWkt(
+                    f"POLYGON(({x} {y}, {x + s} {y}, {x + s} {y + s}, {x} {y + s}, {x} {y}))"
+                ))
+                feat.setAttributes([f"00:00:{row:07d}:{col}"])
+                features.append(feat)
+        layer.dataProvider().addFeatures(features)
+        return layer
+
+    def _create_zpr_layer(self, rects: List[Tuple[float, float, float]]) -> QgsVectorLayer:
+        """ЗПР-квадраты (x, y, size)"""
+        layer = QgsVectorLayer(self._layer_uri("field=ID:integer&field=ВРИ:string"), "test_zpr", "memory")
+        features = []
+        for idx, (x, y, s) in enumerate(rects, start=1):
+            feat = QgsFeature(layer.fields())
+            feat.setGeometry(QgsGeometry.fromWkt(
+                f"POLYGON(({x} {y}, {x + s} {y}, {x + s} {y + s}, {x} {y + s}, {x} {y}))"
+            ))
+            feat.setAttributes([idx, "-"])
+            features.append(feat)
+        layer.dataProvider().addFeatures(features)
+        return layer
+
+    def _create_engine(self, ngs_mode: str):
+        """Движок нарезки с реальными субмодулями (GPKG не пишется)"""
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_1_geometry_processor import (
+            Msm_26_1_GeometryProcessor,
+        )
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_2_attribute_mapper import (
+            Msm_26_2_AttributeMapper,
+        )
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_3_layer_creator import (
+            Msm_26_3_LayerCreator,
+        )
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_4_cutting_engine import (
+            Msm_26_4_CuttingEngine,
+        )
+
+        plugin_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )))
+        gpkg_path = os.path.join(self.test_dir, "cut.gpkg")
+        mapper = Msm_26_2_AttributeMapper(plugin_dir)
+        engine = Msm_26_4_CuttingEngine(
+            geometry_processor=Msm_26_1_GeometryProcessor(),
+            attribute_mapper=mapper,
+            layer_creator=Msm_26_3_LayerCreator(gpkg_path, mapper),
+            ngs_mode=ngs_mode
+        )
+        engine._reset_statistics()
+        return engine
+
+    def _run_mode(
+        self,
+        ngs_mode: str,
+        zpr_layer: QgsVectorLayer,
+        zu_layer: QgsVectorLayer
+    ) -> Tuple[List[Dict], float, Dict[str, Any]]:
+        """_cut_by_zu в заданном режиме: (ngs_data, секунды, статистика)"""
+        engine = self._create_engine(ngs_mode)
+        start = time.perf_counter()
+        _, ngs_data = engine._cut_by_zu(zpr_layer, zu_layer, "ОКС")
+        elapsed = time.perf_counter() - start
+        return ngs_data, elapsed, engine.statistics
+
+    def _compare_ngs(self, ngs_local: List[Dict], ngs_union: List[Dict]) -> float:
+        """Площадь симметрической разности НГС двух режимов (м2)"""
+        def _union(items: List[Dict]) -> QgsGeometry:
+            geoms = [item['geometry'] for item in items if not item['geometry'].isEmpty()]
+            return QgsGeometry.unaryUnion(geoms) if geoms else QgsGeometry()
+
+        geom_local = _union(ngs_local)
+        geom_union = _union(ngs_union)
+        if geom_local.isEmpty() and geom_union.isEmpty():
+            return 0.0
+        if geom_local.isEmpty() or geom_union.isEmpty():
+            return max(geom_local.area(), geom_union.area())
+        return geom_local.symDifference(geom_union).area()
+
+    def _tolerance(self) -> float:
+        """Допуск сравнения: MIN_NGS_AREA, не меньше ячейки snap-grid GEOS"""
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_1_geometry_processor import (
+            GEOS_GRID_SIZE,
+        )
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_4_cutting_engine import (
+            MIN_NGS_AREA,
+        )
+        return max(MIN_NGS_AREA, GEOS_GRID_SIZE ** 2)
+
+    def test_01_modes_match_small(self) -> None:
+        """ТЕСТ 1: local == union на малой сетке"""
+        self.logger.section("1. Совпадение режимов local/union (20x20 ЗУ)")
+
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_4_cutting_engine import (
+            NGS_MODE_LOCAL, NGS_MODE_UNION,
+        )
+
+        zu_layer = self._create_zu_layer(20, 20)
+        zpr_layer = self._create_zpr_layer([
+            (13.0, 13.0, 90.0),
+            (113.0, 27.0, 75.0),
+            (250.0, 250.0, 130.0),
+        ])
+
+        ngs_local, _, stats = self._run_mode(NGS_MODE_LOCAL, zpr_layer, zu_layer)
+        ngs_union, _, _ = self._run_mode(NGS_MODE_UNION, zpr_layer, zu_layer)
+
+        self.logger.check(
+            len(ngs_local) == len(ngs_union),
+            f"Число НГС совпадает ({len(ngs_local)})",
+            f"Число НГС расходится: local={len(ngs_local)}, union={len(ngs_union)}"
+        )
+
+        diff_area = self._compare_ngs(ngs_local, ngs_union)
+        self.logger.check(
+            diff_area <= self._tolerance(),
+            f"Геометрия НГС совпадает (symDifference={diff_area:.6f} м2)",
+            f"Геометрия НГС расходится: symDifference={diff_area:.6f} м2"
+        )
+
+        self.logger.check(
+            stats.get('ngs_local_unions', 0) > 0,
+            f"Локальные union построены: {stats.get('ngs_local_unions')}",
+            "Локальные union не строились"
+        )
+
+    def test_02_zpr_outside_zu(self) -> None:
+        """ТЕСТ 2: ЗПР без кандидатов ЗУ целиком уходит в НГС"""
+        self.logger.section("2. ЗПР вне всех ЗУ")
+
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_4_cutting_engine import (
+            NGS_MODE_LOCAL, NGS_MODE_UNION,
+        )
+
+        zu_layer = self._create_zu_layer(5, 5)
+        zpr_layer = self._create_zpr_layer([(1000.0, 1000.0, 50.0)])
+
+        for mode in (NGS_MODE_LOCAL, NGS_MODE_UNION):
+            ngs_data, _, _ = self._run_mode(mode, zpr_layer, zu_layer)
+            total_area = sum(item['geometry'].area() for item in ngs_data)
+            self.logger.check(
+                len(ngs_data) == 1 and abs(total_area - 2500.0) < 0.01,
+                f"{mode}: НГС = весь ЗПР ({total_area:.2f} м2)",
+                f"{mode}: ожидался 1 НГС 2500 м2, получено {len(ngs_data)} / {total_area:.2f} м2"
+            )
+
+    def test_03_wall_time_20k(self) -> None:
+        """ТЕСТ 3: local vs union на 20k ЗУ"""
+        self.logger.section("3. Wall time: 20k ЗУ x 50 ЗПР")
+
+        from Daman_QGIS.managers.geometry.submodules.Msm_26_4_cutting_engine import (
+            NGS_MODE_LOCAL, NGS_MODE_UNION,
+        )
+
+        zu_layer = self._create_zu_layer(self.GRID_COLS, self.GRID_ROWS)
+        rects = [
+            (col * 400.0 + 13.0, row * 400.0 + 13.0, 90.0)
+            for row in range(5) for col in range(10)
+        ]
+        zpr_layer = self._create_zpr_layer(rects)
+        self.logger.info(f"Фикстура: {zu_layer.featureCount()} ЗУ, {zpr_layer.featureCount()} ЗПР")
+
+        ngs_union, t_union, _ = self._run_mode(NGS_MODE_UNION, zpr_layer, zu_layer)
+        ngs_local, t_local, stats = self._run_mode(NGS_MODE_LOCAL, zpr_layer, zu_layer)
+
+        self.logger.data("union, сек", f"{t_union:.2f}")
+        self.logger.data("local, сек", f"{t_local:.2f}")
+        if t_local > 0:
+            self.logger.data("Ускорение", f"x{t_union / t_local:.1f}")
+        self.logger.data(
+            "Локальных union / из кэша",
+            f"{stats.get('ngs_local_unions', 0)} / {stats.get('ngs_local_union_cache_hits', 0)}"
+        )
+
+        diff_area = self._compare_ngs(ngs_local, ngs_union)
+        self.logger.check(
+            diff_area <= self._tolerance() and len(ngs_local) == len(ngs_union),
+            f"Результаты режимов совпадают ({len(ngs_local)} НГС, symDifference={diff_area:.6f} м2)",
+            f"Результаты режимов расходятся: {len(ngs_local)} vs {len(ngs_union)} НГС, "
+            f"symDifference={diff_area:.6f} м2"
+        )
+
+        if t_local <= t_union:
+            self.logger.success(f"local не медленнее union ({t_local:.2f} <= {t_union:.2f} сек)")
+        else:
+            self.logger.warning(f"local медленнее union ({t_local:.2f} > {t_union:.2f} сек)")
@@ -9,6 +9,9 @@ Fsm_4_2_T_compute_hash - Тесты для integrity_hash.compute_plugin_hash().
 - Детекцию изменений файла
 - (FIX-4) _on_skip hook вызывается при OSError на read-файла
 - (FIX-5) module-level cache: get_cached_or_compute hit/miss/invalidate
+- Инкрементальный хеш: совпадение с полным, перечитываются только
+  изменённые файлы, испорченный manifest -> полный пересчёт,
+  откат mtime после изменения не скрывает изменение
 
 Запуск из QGIS Python console:
     >>> exec(open(r"<path>/Fsm_4_2_T_compute_hash.py").read())
@@ -24,6 +27,7 @@ from Daman_QGIS.utils import log_info, log_error
 from Daman_QGIS import integrity_hash as _ih
 from Daman_QGIS.integrity_hash import (
     compute_plugin_hash,
+    compute_plugin_hash_incremental,
     get_cached_or_compute,
     invalidate_cache,
 )
@@ -159,7 +163,10 @@ def test_cache_hit_returns_same_value() -> None:
     saved_hash, saved_dir = _ih._cached_hash, _ih._cached_dir
     try:
         invalidate_cache()
-        with tempfile.TemporaryDirectory() as tmp:
+        # Manifest пишется рядом с каталогом - каталог внутри временной папки
+        with tempfile.TemporaryDirectory() as outer:
+            tmp = os.path.join(outer, "plugin")
+            os.mkdir(tmp)
             (Path(tmp) / "main.py").write_text("# v1", encoding="utf-8")
             h1 = get_cached_or_compute(tmp)
             # Меняем файл — но cache должен хранить старое значение
@@ -179,7 +186,10 @@ def test_invalidate_cache_recompute() -> None:
     saved_hash, saved_dir = _ih._cached_hash, _ih._cached_dir
     try:
         invalidate_cache()
-        with tempfile.TemporaryDirectory() as tmp:
+        # Manifest пишется рядом с каталогом - каталог внутри временной папки
+        with tempfile.TemporaryDirectory() as outer:
+            tmp = os.path.join(outer, "plugin")
+            os.mkdir(tmp)
             (Path(tmp) / "main.py").write_text("# v1", encoding="utf-8")
             h1 = get_cached_or_compute(tmp)
             (Path(tmp) / "main.py").write_text("# v2_changed", encoding="utf-8")
@@ -199,7 +209,11 @@ def test_cache_miss_on_dir_change() -> None:
     saved_hash, saved_dir = _ih._cached_hash, _ih._cached_dir
     try:
         invalidate_cache()
-        with tempfile.TemporaryDirectory() as tmp1, tempfile.TemporaryDirectory() as tmp2:
+        with tempfile.TemporaryDirectory() as outer:
+            tmp1 = os.path.join(outer, "plugin1")
+            tmp2 = os.path.join(outer, "plugin2")
+            os.mkdir(tmp1)
+            os.mkdir(tmp2)
             (Path(tmp1) / "a.py").write_text("# tmp1", encoding="utf-8")
             (Path(tmp2) / "b.py").write_text("# tmp2", encoding="utf-8")
             h1 = get_cached_or_compute(tmp1)
@@ -212,6 +226,121 @@ def test_cache_miss_on_dir_change() -> None:
         _ih._cached_hash, _ih._cached_dir = saved_hash, saved_dir
 
 
+def _make_tree(tmp: str, count: int = 20) -> None:
+    """Дерево из count файлов в двух каталогах + исключаемый __pycache__."""
+    for i in range(count):
+        sub = Path(tmp) / ("pkg" if i % 2 else "data")
+        sub.mkdir(exist_ok=True)
+        (sub / f"f{i}.py").write_text(f"# file {i}\n" * (i + 1), encoding="utf-8")
+    (Path(tmp) / "__pycache__").mkdir(exist_ok=True)
+    (Path(tmp) / "__pycache__" / "x.pyc").write_bytes(b"bytecode")
+
+
+def test_incremental_matches_full() -> None:
+    """Инкрементальный хеш = полный: без manifest, с manifest, после правки."""
+    saved_racy = _ih.RACY_WINDOW_NS
+    _ih.RACY_WINDOW_NS = 0  # Свежесозданные файлы иначе всегда перечитываются
+    try:
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as meta:
+            _make_tree(tmp)
+            manifest = os.path.join(meta, "manifest.json")
+
+            h_cold = compute_plugin_hash_incremental(tmp, manifest)
+            assert _ih.last_stats["full"] and _ih.last_stats["rehashed"] == 20, _ih.last_stats
+            h_warm = compute_plugin_hash_incremental(tmp, manifest)
+            assert _ih.last_stats["rehashed"] == 0 and _ih.last_stats["reused"] == 20, _ih.last_stats
+            assert h_cold == h_warm == compute_plugin_hash(tmp), "incremental != full"
+
+            (Path(tmp) / "pkg" / "f1.py").write_text("# changed", encoding="utf-8")
+            (Path(tmp) / "pkg" / "new.py").write_text("# new", encoding="utf-8")
+            os.remove(Path(tmp) / "data" / "f0.py")
+            h_changed = compute_plugin_hash_incremental(tmp, manifest)
+            assert _ih.last_stats["rehashed"] == 2, _ih.last_stats
+            assert h_changed == compute_plugin_hash(tmp) != h_warm, "change not reflected"
+        log_info("Fsm_4_2_T_compute_hash: incremental == full, rehash only changed OK")
+    finally:
+        _ih.RACY_WINDOW_NS = saved_racy
+
+
+def test_incremental_corrupted_manifest() -> None:
+    """Порча manifest (file_sha256 без пересчёта суммы) -> checksum не сходится -> полный пересчёт."""
+    import json
+    saved_racy = _ih.RACY_WINDOW_NS
+    _ih.RACY_WINDOW_NS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as meta:
+            _make_tree(tmp, count=4)
+            manifest = os.path.join(meta, "manifest.json")
+            expected = compute_plugin_hash_incremental(tmp, manifest)
+
+            with open(manifest, encoding="utf-8") as f:
+                data = json.load(f)
+            for entry in data["entries"].values():
+                entry[3] = "0" * 64
+            with open(manifest, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            h = compute_plugin_hash_incremental(tmp, manifest)
+            assert _ih.last_stats["full"] and h == expected, (_ih.last_stats, h)
+
+            with open(manifest, "w", encoding="utf-8") as f:
+                f.write("{not json")
+            h = compute_plugin_hash_incremental(tmp, manifest)
+            assert _ih.last_stats["full"] and h == expected, _ih.last_stats
+        log_info("Fsm_4_2_T_compute_hash: corrupted manifest -> full rehash OK")
+    finally:
+        _ih.RACY_WINDOW_NS = saved_racy
+
+
+def test_incremental_restored_mtime() -> None:
+    """Изменение содержимого с тем же размером и откатом mtime обнаруживается (ctime)."""
+    import time
+    saved_racy = _ih.RACY_WINDOW_NS
+    _ih.RACY_WINDOW_NS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as meta:
+            target = Path(tmp) / "main.py"
+            target.write_text("# original", encoding="utf-8")
+            manifest = os.path.join(meta, "manifest.json")
+            compute_plugin_hash_incremental(tmp, manifest)
+
+            st = os.stat(target)
+            time.sleep(0.05)
+            target.write_text("# modified", encoding="utf-8")  # Тот же размер
+            os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+            h = compute_plugin_hash_incremental(tmp, manifest)
+            if os.stat(target).st_ctime_ns == st.st_ctime_ns:
+                # Windows: st_ctime - время создания, откат mtime не виден
+                log_info("Fsm_4_2_T_compute_hash: ctime не меняется на этой ФС - проверка пропущена")
+                return
+            assert h == compute_plugin_hash(tmp), "restored mtime hid the change"
+        log_info("Fsm_4_2_T_compute_hash: restored mtime detected via ctime OK")
+    finally:
+        _ih.RACY_WINDOW_NS = saved_racy
+
+
+def test_incremental_timing() -> None:
+    """Замер: полный хеш дерева плагина vs инкрементальный с прогретым manifest."""
+    import time
+    plugin_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))
+    )))
+    with tempfile.TemporaryDirectory() as meta:
+        manifest = os.path.join(meta, "manifest.json")
+        start = time.perf_counter()
+        full = compute_plugin_hash(plugin_dir)
+        t_full = time.perf_counter() - start
+        compute_plugin_hash_incremental(plugin_dir, manifest)
+        warm = compute_plugin_hash_incremental(plugin_dir, manifest)
+        stats = dict(_ih.last_stats)
+    assert warm == full, "incremental != full on plugin tree"
+    assert stats["full_seconds"] is not None, "full rehash time not kept in manifest"
+    log_info(
+        f"Fsm_4_2_T_compute_hash: timing full {t_full:.3f}s (manifest: "
+        f"{stats['full_seconds']:.3f}s), incremental "
+        f"{stats['seconds']:.3f}s (rehashed {stats['rehashed']} of {stats['files']})"
+    )
+
+
 def run_all() -> None:
     """Запуск всех тестов compute_plugin_hash."""
     try:
@@ -224,6 +353,10 @@ def run_all() -> None:
         test_cache_hit_returns_same_value()
         test_invalidate_cache_recompute()
         test_cache_miss_on_dir_change()
+        test_incremental_matches_full()
+        test_incremental_corrupted_manifest()
+        test_incremental_restored_mtime()
+        test_incremental_timing()
         log_info("Fsm_4_2_T_compute_hash: ALL PASS")
     except AssertionError as e:
         log_error(f"Fsm_4_2_T_compute_hash: FAIL - {e}")
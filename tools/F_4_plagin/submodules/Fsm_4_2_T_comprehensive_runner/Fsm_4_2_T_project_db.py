@@ -7,12 +7,18 @@
 - Метаданные (set/get/delete_metadata, get_all_metadata)
 - Настройки проекта (save/load_project_settings)
 - Edge cases (несуществующий файл, unicode, close)
+- Пул соединений (database/project_db_pool.py): пакетная запись,
+  сброс кэша при внешних изменениях, WAL / закрытие, потоки
+- Бенчмарк 1000 операций с метаданными: прежняя реализация
+  (connect + sqlite_master на каждый вызов) vs пул и кэш
 """
 
 import os
 import tempfile
 import shutil
 import sqlite3
+import threading
+import time
 from datetime import datetime
 
 from qgis.core import (
@@ -58,6 +64,10 @@ class TestProjectDB:
             self.test_15_unicode_metadata()
             self.test_16_nonexistent_file()
             self.test_17_close()
+            self.test_18_metadata_batch()
+            self.test_19_external_changes()
+            self.test_20_pool_lifecycle()
+            self.test_21_benchmark()
         except Exception as e:
             self.logger.error(f"Критическая ошибка тестов ProjectDB: {str(e)}")
             import traceback
@@ -81,6 +91,15 @@ class TestProjectDB:
             except Exception as e:
                 self.logger.warning(f"Не удалось удалить временные файлы: {str(e)}")
 
+    def _metadata_db(self, name):
+        """ProjectDB поверх пустого sqlite-файла с таблицей метаданных (без QGIS)"""
+        from Daman_QGIS.database.project_db import ProjectDB
+        path = os.path.join(self.test_dir, name)
+        sqlite3.connect(path).close()
+        db = ProjectDB(path)
+        db.create_metadata_table()
+        return db
+
     def _create_test_layer(self, name="test_layer", geom_type="Point", crs_id="EPSG:4326"):
         """Создание тестового векторного слоя с одним объектом"""
         layer = QgsVectorLayer(
@@ -860,3 +879,297 @@ class TestProjectDB:
             self.logger.error(f"Ошибка закрытия соединения: {str(e)}")
             import traceback
             self.logger.data("Traceback", traceback.format_exc())
+
+    def test_18_metadata_batch(self):
+        """ТЕСТ 18: Пакетная запись метаданных"""
+        self.logger.section("18. Пакетная запись (metadata_batch, set_metadata_many)")
+        db = self._metadata_db("batch.gpkg")
+        try:
+            entries = [(f"key_{i}", f"value_{i}", f"Описание {i}") for i in range(100)]
+            count = db.set_metadata_many(entries)
+            all_meta = db.get_all_metadata()
+            self.logger.check(
+                count == 100 and len(all_meta) == 100
+                and all_meta["key_7"] == {'value': "value_7", 'description': "Описание 7"},
+                "set_metadata_many() записал 100 ключей",
+                f"Записано {count}, в таблице {len(all_meta)}"
+            )
+
+            # Копия: изменение результата не затрагивает кэш (F_0_3 дописывает project_path)
+            all_meta["project_path"] = {'value': "x", 'description': ""}
+            self.logger.check(
+                db.get_metadata("project_path") is None,
+                "get_all_metadata() возвращает копию кэша",
+                "Изменение результата get_all_metadata() попало в кэш"
+            )
+
+            try:
+                with db.metadata_batch():
+                    db.set_metadata("rolled_back", "1")
+                    db.delete_metadata("key_0")
+                    with db.metadata_batch():  # Вложенный блок - та же транзакция
+                        db.set_metadata("nested", "1")
+                    raise RuntimeError("откат")
+            except RuntimeError:
+                pass
+            self.logger.check(
+                db.get_metadata("rolled_back") is None and db.get_metadata("nested") is None
+                and db.get_metadata("key_0") is not None,
+                "Исключение в metadata_batch() откатывает все изменения блока",
+                f"rolled_back={db.get_metadata('rolled_back')}, key_0={db.get_metadata('key_0')}"
+            )
+
+            with db.metadata_batch():
+                db.set_metadata("in_batch", "ok", "Внутри блока")
+                inside = db.get_metadata("in_batch")
+            with sqlite3.connect(db.gpkg_path) as conn:
+                row = conn.execute("SELECT value FROM _metadata WHERE key = 'in_batch'").fetchone()
+            self.logger.check(
+                inside is not None and inside['value'] == "ok" and row == ("ok",),
+                "Значение видно внутри блока и зафиксировано после выхода",
+                f"Внутри: {inside}, в файле: {row}"
+            )
+        except Exception as e:
+            self.logger.error(f"Ошибка пакетной записи: {str(e)}")
+            import traceback
+            self.logger.data("Traceback", traceback.format_exc())
+        finally:
+            db.close()
+
+    def test_19_external_changes(self):
+        """ТЕСТ 19: Изменения файла в обход ProjectDB"""
+        self.logger.section("19. Сброс кэша метаданных при внешних изменениях")
+        db = self._metadata_db("external.gpkg")
+        try:
+            db.set_metadata("shared", "from_project_db")
+            db.get_all_metadata()  # Кэш загружен
+
+            # Запись другим соединением (get_connection(), QGIS/OGR) - PRAGMA data_version
+            with db.get_connection() as conn:
+                conn.execute("UPDATE _metadata SET value = 'external' WHERE key = 'shared'")
+                conn.execute("INSERT INTO _metadata (key, value, description) VALUES ('added', '1', '')")
+            conn.close()
+            meta = db.get_metadata("shared")
+            self.logger.check(
+                meta is not None and meta['value'] == "external" and db.get_metadata("added") is not None,
+                "Внешняя запись видна без переоткрытия ProjectDB",
+                f"shared={meta}, added={db.get_metadata('added')}"
+            )
+
+            # Таблицу удалили снаружи - кэш схемы тоже сбрасывается
+            with db.get_connection() as conn:
+                conn.execute("DROP TABLE _metadata")
+            conn.close()
+            self.logger.check(
+                db.get_metadata("shared") is None and db.get_all_metadata() == {},
+                "Удаление таблицы снаружи: get_metadata() -> None",
+                f"get_all_metadata() = {db.get_all_metadata()}"
+            )
+
+            # Файл подменён на том же пути, пока соединение пула открыто
+            db.create_metadata_table()
+            db.set_metadata("old", "1")
+            replacement = db.gpkg_path + ".new"
+            with sqlite3.connect(replacement) as conn:
+                conn.execute("CREATE TABLE _metadata (key TEXT PRIMARY KEY, value TEXT, description TEXT)")
+                conn.execute("INSERT INTO _metadata VALUES ('new', '2', '')")
+            conn.close()
+            try:
+                os.replace(replacement, db.gpkg_path)
+            except OSError:
+                # Windows не даёт заменить открытый файл - подмена невозможна
+                self.logger.info("Открытый GPKG заблокирован ОС - проверка подмены пропущена")
+            else:
+                self.logger.check(
+                    db.get_metadata("old") is None and db.get_metadata("new") is not None,
+                    "Подмена файла: соединение переоткрыто, кэш прежнего файла сброшен",
+                    f"old={db.get_metadata('old')}, new={db.get_metadata('new')}"
+                )
+        except Exception as e:
+            self.logger.error(f"Ошибка проверки внешних изменений: {str(e)}")
+            import traceback
+            self.logger.data("Traceback", traceback.format_exc())
+        finally:
+            db.close()
+
+    def test_20_pool_lifecycle(self):
+        """ТЕСТ 20: WAL, закрытие и потоки"""
+        self.logger.section("20. Пул соединений: WAL, закрытие, потоки")
+        from Daman_QGIS.database.project_db_pool import (
+            GpkgConnectionPool, get_connection_pool, is_file_in_use
+        )
+        # Свободный файл: где занятость не определить, WAL не включается
+        probe_path = os.path.join(self.test_dir, "pool_probe.gpkg")
+        sqlite3.connect(probe_path).close()
+        wal_expected = not is_file_in_use(probe_path)
+        if not wal_expected:
+            self.logger.warning("Занятость файла не определяется на этой платформе - WAL отключён")
+        expected_mode = "wal" if wal_expected else "delete"
+
+        db = self._metadata_db("pool.gpkg")
+        try:
+            pool = get_connection_pool()
+            db.set_metadata("k", "v")
+            with sqlite3.connect(db.gpkg_path) as conn:
+                mode_open = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            conn.close()
+            self.logger.check(
+                pool.is_open(db.gpkg_path) and mode_open == expected_mode,
+                f"Локальный файл: соединение открыто, journal_mode={expected_mode}",
+                f"is_open={pool.is_open(db.gpkg_path)}, journal_mode={mode_open}"
+            )
+
+            db.close()
+            with sqlite3.connect(db.gpkg_path) as conn:
+                mode_closed = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            conn.close()
+            self.logger.check(
+                not pool.is_open(db.gpkg_path) and mode_closed == "delete"
+                and not os.path.exists(db.gpkg_path + "-wal"),
+                "close(): соединение закрыто, journal_mode=DELETE, -wal удалён",
+                f"is_open={pool.is_open(db.gpkg_path)}, journal_mode={mode_closed}"
+            )
+
+            # Закрытие по простою - отдельный пул с коротким интервалом
+            idle_pool = GpkgConnectionPool(idle_close=0.1)
+            with idle_pool.connection(db.gpkg_path) as state:
+                state.conn.execute("SELECT 1")
+            opened = idle_pool.is_open(db.gpkg_path)
+            time.sleep(0.4)
+            with sqlite3.connect(db.gpkg_path) as conn:
+                mode_idle = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            conn.close()
+            self.logger.check(
+                opened and not idle_pool.is_open(db.gpkg_path) and mode_idle == "delete"
+                and not os.path.exists(db.gpkg_path + "-wal"),
+                "Соединение закрыто после простоя, journal_mode=DELETE",
+                f"Открыто после операции: {opened}, после паузы: {idle_pool.is_open(db.gpkg_path)}, "
+                f"journal_mode={mode_idle}"
+            )
+            idle_pool.close_all()
+
+            # Файл открыт другим соединением (как слой QGIS) - в WAL не переводится
+            holder = sqlite3.connect(db.gpkg_path)
+            try:
+                holder.execute("SELECT count(*) FROM sqlite_master").fetchone()
+                held_pool = GpkgConnectionPool(idle_close=0)
+                with held_pool.connection(db.gpkg_path) as state:
+                    mode_held = state.conn.execute("PRAGMA journal_mode").fetchone()[0]
+                held_pool.close_all()
+            finally:
+                holder.close()
+            self.logger.check(
+                mode_held == "delete",
+                "Файл, открытый другим соединением, остаётся в journal_mode=DELETE",
+                f"journal_mode={mode_held}"
+            )
+
+            # Одновременная запись из нескольких потоков в одно соединение
+            errors = []
+
+            def writer(n):
+                try:
+                    for i in range(50):
+                        db.set_metadata(f"t{n}_{i}", str(i))
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            written = sum(1 for key in db.get_all_metadata() if key.startswith("t"))
+            self.logger.check(
+                not errors and written == 200,
+                "4 потока x 50 ключей через общее соединение без ошибок",
+                f"Записано {written}, ошибки: {errors[:3]}"
+            )
+        except Exception as e:
+            self.logger.error(f"Ошибка проверки пула соединений: {str(e)}")
+            import traceback
+            self.logger.data("Traceback", traceback.format_exc())
+        finally:
+            db.close()
+
+    def test_21_benchmark(self):
+        """ТЕСТ 21: Бенчмарк 1000 операций с метаданными"""
+        self.logger.section("21. Бенчмарк: 1000 операций с метаданными")
+        from Daman_QGIS.database.project_db_pool import get_connection_pool
+        operations = 1000
+        keys = [f"bench_{i % 50}" for i in range(operations)]
+
+        # Прежняя реализация: новое соединение и проверка sqlite_master на каждый вызов
+        legacy_path = self._metadata_db("bench_legacy.gpkg").gpkg_path
+        get_connection_pool().close(legacy_path)
+
+        def legacy_set(key, value, description=""):
+            with sqlite3.connect(legacy_path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO _metadata (key, value, description) VALUES (?, ?, ?)",
+                    (key, value, description)
+                )
+            conn.close()
+
+        def legacy_get(key):
+            with sqlite3.connect(legacy_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='_metadata'")
+                if not cursor.fetchone():
+                    return None
+                cursor.execute("SELECT value, description FROM _metadata WHERE key = ?", (key,))
+                row = cursor.fetchone()
+            conn.close()
+            return {'value': row[0], 'description': row[1] or ''} if row else None
+
+        db = self._metadata_db("bench_pool.gpkg")
+        try:
+            # Чередование записи и чтения (открытие проекта, F_0_3, выпуск)
+            start = time.perf_counter()
+            for i, key in enumerate(keys):
+                if i % 2:
+                    legacy_get(key)
+                else:
+                    legacy_set(key, str(i), "Бенчмарк")
+            t_legacy = time.perf_counter() - start
+
+            stats_before = get_connection_pool().stats()
+            start = time.perf_counter()
+            for i, key in enumerate(keys):
+                if i % 2:
+                    db.get_metadata(key)
+                else:
+                    db.set_metadata(key, str(i), "Бенчмарк")
+            t_pool = time.perf_counter() - start
+            opens = get_connection_pool().stats()['opens'] - stats_before['opens']
+
+            start = time.perf_counter()
+            with db.metadata_batch():
+                for i, key in enumerate(keys):
+                    if i % 2:
+                        db.get_metadata(key)
+                    else:
+                        db.set_metadata(key, str(i), "Бенчмарк")
+            t_batch = time.perf_counter() - start
+
+            self.logger.data("Прежняя реализация", f"{t_legacy * 1000:.1f} мс")
+            self.logger.data("Пул + кэш", f"{t_pool * 1000:.1f} мс (открытий файла: {opens})")
+            self.logger.data("metadata_batch", f"{t_batch * 1000:.1f} мс")
+
+            same = all(
+                db.get_metadata(key) == legacy_get(key) for key in set(keys)
+            )
+            self.logger.check(same, "Результаты совпадают с прежней реализацией",
+                              "Значения метаданных расходятся")
+            self.logger.check(
+                t_pool < t_legacy and t_batch < t_pool,
+                f"Пул быстрее в {t_legacy / max(t_pool, 1e-9):.1f} раза, "
+                f"пакет - в {t_legacy / max(t_batch, 1e-9):.1f} раза",
+                f"Прежняя {t_legacy:.3f} сек, пул {t_pool:.3f} сек, пакет {t_batch:.3f} сек"
+            )
+        except Exception as e:
+            self.logger.error(f"Ошибка бенчмарка метаданных: {str(e)}")
+            import traceback
+            self.logger.data("Traceback", traceback.format_exc())
+        finally:
+            db.close()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_reference_catalog - Индексированный каталог справочников (ReferenceCatalog, Msm_4_6)
+
+Проверяет:
+1. Ответы Msm_4_6 совпадают с прежним линейным перебором Base_layers
+2. Каталог строится один раз и сбрасывается при reload / clear_cache
+3. Счётчик запросов каталога (report)
+"""
+
+from typing import Any, Dict, List
+
+
+class TestReferenceCatalog:
+    """Тесты индексированного каталога Base_layers"""
+
+    LAYER_COUNT = 1500
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.layers: List[Dict[str, Any]] = []
+        self.manager = None
+        self._saved = None
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ ReferenceCatalog: индексы Base_layers (Msm_4_6)")
+
+        try:
+            self._init_manager()
+            self.test_01_matches_linear()
+            self.test_02_invalidation()
+            self.test_03_lookup_counter()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов ReferenceCatalog: {str(e)}")
+        finally:
+            self._restore_loader()
+
+        self.logger.summary()
+
+    def _init_manager(self) -> None:
+        """Синтетический Base_layers в памяти загрузчика, без сети и диска"""
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+        from Daman_QGIS.managers.reference.submodules.Msm_4_6_layer_reference_manager import (
+            LayerReferenceManager,
+        )
+
+        self._saved = (
+            dict(BaseReferenceLoader._shared_cache),
+            dict(BaseReferenceLoader._shared_index_cache),
+            BaseReferenceLoader._disk_store,
+            BaseReferenceLoader._disk_store_resolved,
+        )
+        BaseReferenceLoader._disk_store = None
+        BaseReferenceLoader._disk_store_resolved = True
+        self.layers = self._synthetic_layers()
+        self._install(self.layers)
+        self.manager = LayerReferenceManager()
+        self.logger.success(f"LayerReferenceManager: {len(self.layers)} синтетических слоёв")
+
+    def _restore_loader(self) -> None:
+        """Возврат кэшей загрузчика, сохранённых в _init_manager"""
+        if self._saved is None:
+            return
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+
+        cache, index, store, resolved = self._saved
+        BaseReferenceLoader._shared_cache.clear()
+        BaseReferenceLoader._shared_cache.update(cache)
+        BaseReferenceLoader._shared_index_cache.clear()
+        BaseReferenceLoader._shared_index_cache.update(index)
+        BaseReferenceLoader._disk_store, BaseReferenceLoader._disk_store_resolved = store, resolved
+
+    def _synthetic_layers(self) -> List[Dict[str, Any]]:
+        layers = []
+        for i in range(self.LAYER_COUNT):
+            layers.append({
+                'full_name': f"{i % 10}_{i}_Слой_{i}",
+                'section_num': str(i % 10),
+                'group': f"Группа {i % 25}" if i % 7 else None,
+                'creating_function': f"F_{i % 12}_Функция",
+                'graphics_selectable': 1 if i % 3 == 0 else 0,
+            })
+        layers.append({'full_name': None, 'section_num': '1'})       # запись без имени
+        layers.append({'full_name': '1_1_Слой_1', 'section_num': '99'})  # дубликат имени
+        return layers
+
+    @staticmethod
+    def _install(layers: List[Dict[str, Any]]) -> None:
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+        BaseReferenceLoader._shared_cache['Base_layers.json'] = layers
+        BaseReferenceLoader._shared_index_cache.clear()
+
+    @staticmethod
+    def _linear_by_name(layers, full_name):
+        for layer in layers:
+            if layer.get('full_name') == full_name:
+                return layer
+        return None
+
+    def test_01_matches_linear(self) -> None:
+        """ТЕСТ 1: совпадение с линейным перебором"""
+        self.logger.section("1. Совпадение с линейным перебором")
+        layers = self.layers
+        manager = self.manager
+
+        names = [layer['full_name'] for layer in layers[::37] if layer.get('full_name')] + ["нет_такого"]
+        self.logger.check(
+            all(manager.get_layer_by_full_name(n) is self._linear_by_name(layers, n) for n in names),
+            "get_layer_by_full_name = перебор (включая дубликат и отсутствующий)",
+            "get_layer_by_full_name расходится с перебором"
+        )
+        # Словарь {full_name: запись} прежней реализации - при дубликате последняя
+        expected_params = {}
+        for layer in layers:
+            if layer.get('full_name'):
+                expected_params[layer['full_name']] = layer
+        params = manager.get_layer_params()
+        self.logger.check(
+            params.keys() == expected_params.keys()
+            and all(params[n] is expected_params[n] for n in expected_params)
+            and manager.get_layer_param('1_1_Слой_1') is layers[-1],
+            "get_layer_params / get_layer_param: при дубликате full_name последняя запись",
+            "get_layer_params / get_layer_param расходятся со словарём"
+        )
+        self.logger.check(
+            all(manager.get_layers_by_section(s) == [l for l in layers if l.get('section_num') == str(s)]
+                for s in (0, '1', '5', '99', 'нет')),
+            "get_layers_by_section = перебор (int и str номер раздела)",
+            "get_layers_by_section расходится с перебором"
+        )
+        self.logger.check(
+            all(manager.get_layers_by_creating_function(f"F_{k}_Функция")
+                == [l for l in layers if l.get('creating_function') == f"F_{k}_Функция"] for k in range(13)),
+            "get_layers_by_creating_function = перебор",
+            "get_layers_by_creating_function расходится с перебором"
+        )
+        expected_groups = sorted({l['group'] for l in layers if l.get('group')})
+        self.logger.check(
+            manager.get_layer_groups() == expected_groups,
+            f"get_layer_groups: {len(expected_groups)} групп",
+            "get_layer_groups расходится с перебором"
+        )
+        self.logger.check(
+            manager.get_graphics_selectable_layers() == [l for l in layers if l.get('graphics_selectable') == 1],
+            "get_graphics_selectable_layers = перебор",
+            "get_graphics_selectable_layers расходится с перебором"
+        )
+
+        selected = manager.get_layers_by_section('2')
+        selected.clear()
+        self.logger.check(
+            len(manager.get_layers_by_section('2')) > 0,
+            "Изменение возвращённого списка не портит индекс",
+            "Возвращённый список - ссылка на индекс"
+        )
+
+    def test_02_invalidation(self) -> None:
+        """ТЕСТ 2: каталог строится один раз и сбрасывается с кэшем загрузчика"""
+        self.logger.section("2. Построение и сброс")
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+
+        catalog = self.manager.get_catalog()
+        self.logger.check(
+            self.manager.get_catalog() is catalog,
+            "Повторные запросы используют тот же каталог",
+            "Каталог перестраивается на каждый запрос"
+        )
+
+        BaseReferenceLoader.reload('Base_layers.json')
+        refreshed = [{'full_name': 'Новый_слой', 'section_num': '1'}]
+        BaseReferenceLoader._shared_cache['Base_layers.json'] = refreshed
+        self.logger.check(
+            self.manager.get_catalog() is not catalog
+            and self.manager.get_layer_by_full_name('Новый_слой') is refreshed[0],
+            "reload сбрасывает каталог - видны новые данные",
+            "После reload каталог устарел"
+        )
+        self._install(self.layers)
+
+    def test_03_lookup_counter(self) -> None:
+        """ТЕСТ 3: счётчик запросов каталога"""
+        self.logger.section("3. Счётчик запросов")
+        catalog = self.manager.get_catalog()
+        before = catalog.lookups
+        for name in ("1_1_Слой_1", "нет_такого"):
+            self.manager.get_layer_by_full_name(name)
+        self.manager.get_layers_by_section('3')
+
+        self.logger.data("Статистика", catalog.report())
+        self.logger.check(
+            catalog.lookups - before == 3,
+            "Каждый get/select - один запрос (один несостоявшийся перебор)",
+            f"Прирост счётчика {catalog.lookups - before}, ожидалось 3"
+        )
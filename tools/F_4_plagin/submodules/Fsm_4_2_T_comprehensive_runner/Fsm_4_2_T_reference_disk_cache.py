@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Fsm_4_2_T_reference_disk_cache - Дисковый кэш и предзагрузка справочников (BaseReferenceLoader)
+
+Локальный HTTP-стаб (http.server) с задержкой на файл, ETag и ответом 304.
+
+Проверяет:
+1. Холодный старт: последовательная загрузка vs параллельный prefetch
+2. Тёплый старт: prefetch с диска без запросов за данными
+3. Фоновая проверка: 304 для неизменённого, обновление диска для изменённого
+4. Запись другой PLUGIN_VERSION / битый файл не используются; битая запись
+   удаляется и восстанавливается следующей загрузкой; 403 при фоновой
+   проверке удаляет дисковую копию
+5. Version mismatch в потоках prefetch: одна re-validate в вызывающем потоке
+"""
+
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+
+class _StubState:
+    """Состояние стаба: версии справочников и счётчики ответов"""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.versions: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.responses = {200: 0, 304: 0}
+
+    def body(self, name: str) -> bytes:
+        version = self.versions.get(name, 1)
+        payload = {'data': [{'id': i, 'name': f"{name} #{i}", 'version': version} for i in range(200)]}
+        return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+def _make_handler(state: _StubState):
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            name = parse_qs(urlparse(self.path).query).get('file', [''])[0]
+            time.sleep(state.delay)
+            body = state.body(name)
+            etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                with state.lock:
+                    state.responses[304] += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            with state.lock:
+                state.responses[200] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return _Handler
+
+
+class TestReferenceDiskCache:
+    """Тесты дискового кэша справочников"""
+
+    FILE_COUNT = 25
+    DELAY = 0.1  # сек на ответ стаба
+
+    def __init__(self, iface: Any, logger: Any) -> None:
+        self.iface = iface
+        self.logger = logger
+        self.test_dir = None
+        self.server = None
+        self.state = None
+        self.loader_cls = None
+        self.files: List[str] = [f"Test_reference_{i:02d}.json" for i in range(self.FILE_COUNT)]
+
+    def run_all_tests(self) -> None:
+        """Запуск всех тестов"""
+        self.logger.section("ТЕСТ BaseReferenceLoader: дисковый кэш и prefetch")
+
+        try:
+            import requests  # noqa: F401
+        except ImportError:
+            self.logger.warning("requests не установлен - тесты пропущены")
+            self.logger.summary()
+            return
+
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+        saved = (
+            dict(BaseReferenceLoader._shared_cache),
+            dict(BaseReferenceLoader._shared_index_cache),
+            BaseReferenceLoader._disk_store,
+            BaseReferenceLoader._disk_store_resolved,
+            set(BaseReferenceLoader._revalidated),
+        )
+
+        try:
+            self._start_stub()
+            self.test_01_cold_start()
+            self.test_02_warm_start()
+            self.test_03_revalidation()
+            self.test_04_invalid_entries()
+            self.test_05_version_mismatch()
+        except Exception as e:
+            self.logger.error(f"Критическая ошибка тестов BaseReferenceLoader: {str(e)}")
+        finally:
+            self._wait_background()
+            BaseReferenceLoader._shared_cache.clear()
+            BaseReferenceLoader._shared_cache.update(saved[0])
+            BaseReferenceLoader._shared_index_cache.clear()
+            BaseReferenceLoader._shared_index_cache.update(saved[1])
+            BaseReferenceLoader._disk_store = saved[2]
+            BaseReferenceLoader._disk_store_resolved = saved[3]
+            BaseReferenceLoader._revalidated.clear()
+            BaseReferenceLoader._revalidated.update(saved[4])
+            if self.server:
+                self.server.shutdown()
+                self.server.server_close()
+            if self.test_dir:
+                shutil.rmtree(self.test_dir, ignore_errors=True)
+
+        self.logger.summary()
+
+    def _start_stub(self) -> None:
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+
+        self.state = _StubState(self.DELAY)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self.state))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.test_dir = tempfile.mkdtemp(prefix="qgis_test_ref_cache_")
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}/data"
+
+        class _StubLoader(BaseReferenceLoader):
+            """Загрузчик, отправляющий запросы на стаб вместо Daman API"""
+
+            def _send_request(self, url, headers=None):
+                import requests
+                query = url.split('?', 1)[1] if '?' in url else ''
+                return requests.get(f"{base_url}?{query}", headers=headers or {}, timeout=10)
+
+        self.loader_cls = _StubLoader
+
+    def _new_store(self):
+        from Daman_QGIS.database.reference_disk_store import ReferenceDiskStore
+        return ReferenceDiskStore(self.test_dir)
+
+    def _reset_session(self, store) -> None:
+        """Имитация нового запуска QGIS: пустая память, новое хранилище"""
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+        self._wait_background()
+        BaseReferenceLoader._shared_cache.clear()
+        BaseReferenceLoader._shared_index_cache.clear()
+        BaseReferenceLoader.set_disk_store(store)
+
+    @staticmethod
+    def _wait_background() -> None:
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+        executor = BaseReferenceLoader._background_executor
+        BaseReferenceLoader._background_executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def test_01_cold_start(self) -> None:
+        """ТЕСТ 1: холодный старт"""
+        self.logger.section(f"1. Холодный старт: {self.FILE_COUNT} справочников, {self.DELAY} сек/ответ")
+
+        # Прежнее поведение: без диска, по одному
+        self._reset_session(None)
+        loader = self.loader_cls()
+        start = time.perf_counter()
+        loaded = sum(1 for name in self.files if loader._load_json(name) is not None)
+        t_sequential = time.perf_counter() - start
+
+        # Параллельный prefetch в пустое дисковое хранилище
+        self._reset_session(self._new_store())
+        start = time.perf_counter()
+        stats = self.loader_cls.prefetch(self.files)
+        t_prefetch = time.perf_counter() - start
+
+        self.logger.data("Последовательно, сек", f"{t_sequential:.2f} ({loaded} файлов)")
+        self.logger.data("Prefetch (холодный), сек", f"{t_prefetch:.2f} ({stats})")
+        self.logger.check(
+            stats['remote'] == self.FILE_COUNT and stats['failed'] == 0,
+            "Все справочники загружены параллельно и сохранены",
+            f"Prefetch загрузил не всё: {stats}"
+        )
+        self.logger.check(
+            t_prefetch < t_sequential,
+            f"Prefetch быстрее последовательной загрузки (x{t_sequential / max(t_prefetch, 1e-6):.1f})",
+            f"Prefetch не быстрее: {t_prefetch:.2f} >= {t_sequential:.2f} сек"
+        )
+
+    def test_02_warm_start(self) -> None:
+        """ТЕСТ 2: тёплый старт с диска"""
+        self.logger.section("2. Тёплый старт")
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+
+        self._reset_session(self._new_store())
+        responses_before = self.state.responses[200]
+        start = time.perf_counter()
+        stats = self.loader_cls.prefetch(self.files)
+        t_warm = time.perf_counter() - start
+
+        self.logger.data("Prefetch (тёплый), сек", f"{t_warm:.3f} ({stats})")
+        self.logger.check(
+            stats['disk'] == self.FILE_COUNT,
+            "Все справочники взяты с диска",
+            f"Не все справочники с диска: {stats}"
+        )
+        self.logger.check(
+            t_warm < self.DELAY * 2,
+            "Тёплый старт не ждёт сервер",
+            f"Тёплый старт {t_warm:.3f} сек - ожидание сети?"
+        )
+
+        data = self.loader_cls()._load_json(self.files[0])
+        self.logger.check(
+            isinstance(data, list) and len(data) == 200 and self.files[0] in BaseReferenceLoader._shared_cache,
+            "_load_json отдаёт данные из памяти после prefetch",
+            f"Неверные данные: {type(data)}"
+        )
+
+        self._wait_background()
+        self.logger.check(
+            self.state.responses[200] == responses_before,
+            f"Фоновая проверка без повторной загрузки (304: {self.state.responses[304]})",
+            f"Фоновая проверка скачала данные повторно: {self.state.responses[200] - responses_before}"
+        )
+
+    def test_03_revalidation(self) -> None:
+        """ТЕСТ 3: изменённый справочник"""
+        self.logger.section("3. Фоновая проверка актуальности")
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+
+        store = self._new_store()
+        self._reset_session(store)
+        changed_name = self.files[1]
+        self.loader_cls.prefetch(self.files)
+        self._wait_background()
+
+        self.state.versions[changed_name] = 2
+        loader = self.loader_cls()
+        status_same = loader._revalidate(self.files[0])
+        status_changed = loader._revalidate(changed_name)
+
+        self.logger.check(
+            status_same == BaseReferenceLoader.FETCH_NOT_MODIFIED,
+            "Неизменённый справочник: 304",
+            f"Неизменённый справочник: статус {status_same}"
+        )
+        in_memory = BaseReferenceLoader._shared_cache[changed_name][0]['version']
+        on_disk = store.get(changed_name)[0][0]['version']
+        self.logger.check(
+            status_changed == BaseReferenceLoader.FETCH_OK and on_disk == 2 and in_memory == 1,
+            "Изменённый справочник записан на диск, данные сессии не подменены",
+            f"Статус {status_changed}, диск v{on_disk}, память v{in_memory}"
+        )
+
+    def test_04_invalid_entries(self) -> None:
+        """ТЕСТ 4: чужая версия плагина и битый файл"""
+        self.logger.section("4. Невалидные записи")
+        store = self._new_store()
+        name = self.files[2]
+
+        foreign = self._new_store()
+        foreign.plugin_version = "0.0.0-test"
+        self.logger.check(
+            foreign.get(name) is None and not foreign.validators(name),
+            "Запись другой версии плагина игнорируется",
+            "Запись другой версии плагина использована"
+        )
+
+        with open(store.directory / name, 'ab') as f:
+            f.write(b' ')
+        self.logger.check(
+            self._new_store().get(name) is None and name not in self._new_store().known_files(),
+            "Файл с неверной контрольной суммой игнорируется и удаляется из индекса",
+            "Битый файл отдан из кэша или остался в индексе"
+        )
+
+        # Следующая загрузка идёт на сервер и записывает файл заново
+        restored = self._new_store()
+        self._reset_session(restored)
+        self.loader_cls()._load_json(name)
+        self.logger.check(
+            self._new_store().get(name) is not None,
+            "Битая запись восстановлена загрузкой с сервера",
+            "Битая запись не восстановлена"
+        )
+
+        (restored.directory / name).unlink()
+        restored.put(name, self.loader_cls()._load_from_remote(name))
+        self.logger.check(
+            self._new_store().get(name) is not None,
+            "Удалённый файл переписан при том же содержимом",
+            "Удалённый файл не восстановлен put()"
+        )
+
+        from Daman_QGIS.database.base_reference_loader import BaseReferenceLoader
+
+        class _ForbiddenLoader(self.loader_cls):
+            """Сервер отказывает в доступе к справочнику"""
+
+            def _fetch_remote(self, filename, validators=None, background=False):
+                return None, BaseReferenceLoader.FETCH_FORBIDDEN, {}
+
+        forbidden_store = self._new_store()
+        self._reset_session(forbidden_store)
+        status = _ForbiddenLoader()._revalidate(name)
+        self.logger.check(
+            status == BaseReferenceLoader.FETCH_FORBIDDEN and self._new_store().get(name) is None,
+            "403 при фоновой проверке удаляет дисковую копию",
+            f"Статус {status}, копия осталась на диске"
+        )
+
+    def test_05_version_mismatch(self) -> None:
+        """ТЕСТ 5: version mismatch при параллельной загрузке"""
+        from Daman_QGIS.managers.infrastructure.submodules.Msm_29_6_authed_request import (
+            VersionMismatchError,
+        )
+        self.logger.section("5. Version mismatch в prefetch")
+        self._reset_session(self._new_store())
+
+        revalidations: List[str] = []
+
+        class _MismatchLoader(self.loader_cls):
+            """Каждый запрос - устаревший JWT после hot-update"""
+
+            def _send_request(self, url, headers=None):
+                raise VersionMismatchError("stale JWT ver")
+
+            @staticmethod
+            def _handle_jwt_version_mismatch() -> None:
+                revalidations.append(threading.current_thread().name)
+
+        names = [f"Test_mismatch_{i:02d}.json" for i in range(6)]
+        stats = _MismatchLoader.prefetch(names)
+
+        self.logger.check(
+            stats['failed'] == len(names),
+            f"Все справочники не загружены ({stats['failed']})",
+            f"Статистика: {stats}"
+        )
+        self.logger.check(
+            revalidations == [threading.current_thread().name],
+            "Re-validate один раз в вызывающем потоке",
+            f"Вызовы re-validate по потокам: {revalidations}"
+        )
@@ -5,8 +5,10 @@
 """
 
 import re
+import threading
 import unicodedata
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
 
 from qgis.core import QgsMessageLog, Qgis
 from Daman_QGIS.constants import PLUGIN_NAME
@@ -17,24 +19,51 @@ from Daman_QGIS.constants import PLUGIN_NAME
 # ============================================================================
 
 
-def log_info(message: str) -> None:
+# Лог сессии (M_38), в который дублируются сообщения. Устанавливается
+# M_38.initialize() / сбрасывается M_38.shutdown() - без registry.get('M_38')
+# на каждое сообщение.
+_session_log = None
+
+# Предупреждения и ошибки текущего потока (capture_log_messages)
+_captured = threading.local()
+
+
+def set_session_log(session_log) -> None:
+    """
+    Установить получателя дублирования логов в файл сессии.
+
+    Args:
+        session_log: M_38_SessionLogManager (write(message, tag, level),
+            debug_enabled) или None
+    """
+    global _session_log
+    _session_log = session_log
+
+
+def log_info(message: str, *args) -> None:
     """
     Логирование информационного сообщения.
 
     Args:
-        message: Текст сообщения
+        message: Текст сообщения (или %-шаблон при переданных args)
+        *args: Аргументы шаблона - форматирование только при выводе
     """
+    if args:
+        message = message % args
     QgsMessageLog.logMessage(message, PLUGIN_NAME, Qgis.Info)
     _write_to_session_log(message, "INFO")
 
 
-def log_warning(message: str) -> None:
+def log_warning(message: str, *args) -> None:
     """
     Логирование предупреждения.
 
     Args:
-        message: Текст предупреждения
+        message: Текст предупреждения (или %-шаблон при переданных args)
+        *args: Аргументы шаблона
     """
+    if args:
+        message = message % args
     QgsMessageLog.logMessage(message, PLUGIN_NAME, Qgis.Warning)
     _write_to_session_log(message, "WARNING")
 
@@ -104,17 +133,23 @@ def _write_to_session_log(message: str, level: str) -> None:
     """
     Дублирование лога в файл сессии через M_38_SessionLogManager.
 
-    Обёрнут в try/except — не ломает основное логирование если M_38 не инициализирован.
+    Запись ставится в очередь фонового потока M_38 (Msm_38_1) и не ждёт диска.
+    Обёрнута в try/except — не ломает основное логирование если M_38 не инициализирован.
 
     Args:
         message: Текст сообщения
         level: Уровень логирования (INFO, WARNING, CRITICAL, SUCCESS, DEBUG)
     """
+    if level in ("WARNING", "CRITICAL"):
+        captured = getattr(_captured, 'messages', None)
+        if captured is not None:
+            captured.append((level, message))
+
+    session_log = _session_log
+    if session_log is None:
+        return
     try:
-        from Daman_QGIS.managers._registry import registry
-        session_log = registry.get('M_38')
-        if session_log and session_log._initialized:
-            session_log.write(message, tag=PLUGIN_NAME, level=level)
+        session_log.write(message, tag=PLUGIN_NAME, level=level)
     except Exception:
         pass  # Не ломаем основное логирование
 
@@ -142,19 +177,57 @@ def log_timing(message: str) -> None:
         log_info(message)
 
 
-def log_debug(message: str) -> None:
+def log_debug(message: str, *args) -> None:
     """
     Логирование отладочного сообщения.
 
     Debug сообщения НЕ выводятся в QGIS Log Messages панель,
     только в session log файл (для анализа при отладке).
 
+    Для циклов по объектам - шаблон и аргументы вместо f-строки:
+    log_debug("Fsm_X: объект %s, вершин %d", fid, count) - строка
+    не собирается, если лог сессии не активен или DEBUG отключён
+    (SESSION_LOG_DEBUG_ENABLED).
+
     Args:
-        message: Текст отладочного сообщения
+        message: Текст отладочного сообщения (или %-шаблон)
+        *args: Аргументы шаблона
     """
+    session_log = _session_log
+    if session_log is None or not session_log.debug_enabled:
+        return
+    if args:
+        message = message % args
     _write_to_session_log(message, "DEBUG")
 
 
+def is_debug_logging() -> bool:
+    """Пишутся ли DEBUG-сообщения (для пропуска подготовки дорогих данных лога)."""
+    session_log = _session_log
+    return session_log is not None and session_log.debug_enabled
+
+
+@contextmanager
+def capture_log_messages() -> Iterator[List[Tuple[str, str]]]:
+    """
+    Копирование предупреждений и ошибок текущего потока в список.
+
+    Сообщения выводятся как обычно и дополнительно собираются в
+    [(level, message)] - например, для сохранения вместе с результатом
+    разбора файла (Fsm_1_1_16 воспроизводит их при попадании в кэш).
+    Вложенный сбор передаёт свои сообщения внешнему.
+    """
+    messages: List[Tuple[str, str]] = []
+    outer = getattr(_captured, 'messages', None)
+    _captured.messages = messages
+    try:
+        yield messages
+    finally:
+        _captured.messages = outer
+        if outer is not None:
+            outer.extend(messages)
+
+
 # ============================================================================
 # ФУНКЦИИ ЛОГИРОВАНИЯ С КОНТЕКСТОМ
 # ============================================================================